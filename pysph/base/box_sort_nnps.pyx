@@ -30,6 +30,15 @@ cdef class BoxSortNNPS(LinkedListNNPS):
     is to use a std::map to obtain a linear cell index from the actual
     flattened cell index.
     """
+    def __init__(self, int dim, list particles, double radius_scale=2.0,
+                 int ghost_layers=1, domain=None,
+                 bint fixed_h=False, bint cache=False, bint sort_gids=False):
+        LinkedListNNPS.__init__(
+            self, dim, particles, radius_scale, ghost_layers, domain,
+            fixed_h, cache, sort_gids
+        )
+        # Only the cells occupied when the particles are refreshed exist.
+        self.supports_append = False
 
     #### Private protocol ################################################
 
@@ -164,6 +173,9 @@ cdef class DictBoxSortNNPS(NNPS):
             cache, sort_gids
         )
 
+        # The bins only depend on the positions and the cell size.
+        self.supports_h_padding = True
+
         # initialize the cells dict
         self.cells = {}
 
@@ -42,6 +42,9 @@ cdef class CellIndexingNNPS(NNPS):
             cache, sort_gids
         )
 
+        # The bins only depend on the positions and the cell size.
+        self.supports_h_padding = True
+
         self.radius_scale2 = radius_scale*radius_scale
         cdef NNPSParticleArrayWrapper pa_wrapper
         cdef int i, num_particles
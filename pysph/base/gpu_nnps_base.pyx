@@ -2,6 +2,8 @@
 # distutils: language=c++
 
 # Library imports.
+from time import perf_counter
+
 import numpy as np
 cimport numpy as np
 
@@ -242,6 +244,7 @@ cdef class GPUNNPS(NNPSBase):
         cdef ParticleArray pa
 
         cdef DomainManager domain = self.domain
+        cdef double start = perf_counter()
 
         # use cell sizes computed by the domain.
         self.cell_size = domain.manager.cell_size
@@ -260,6 +263,17 @@ cdef class GPUNNPS(NNPSBase):
             for cache in self.cache:
                 cache.update()
 
+        self.update_time = perf_counter() - start
+        self.total_update_time += self.update_time
+        self.n_updates += 1
+
+    def begin_update(self, double halo_width=0.0):
+        """The particles are only binned by `end_update`."""
+        pass
+
+    def end_update(self):
+        self.update()
+
     def update_domain(self):
         self.domain.update()
 
@@ -67,6 +67,10 @@ cdef class LinkedListNNPS(NNPS):
             cache, sort_gids
         )
 
+        # The bins only depend on the positions and the cell size.
+        self.supports_h_padding = True
+        self.supports_append = True
+
         # initialize the head and next for each particle array
         self.heads = [UIntArray() for i in range(self.narrays)]
         self.nexts = [UIntArray() for i in range(self.narrays)]
@@ -206,6 +210,26 @@ cdef class LinkedListNNPS(NNPS):
                 indices.append(<long>_next)
                 _next = next.data[_next]
 
+    def get_bin_occupancy(self, int pa_index):
+        """Return the size of the cells and the number of particles in each
+        occupied cell of the `pa_index` array.
+        """
+        cdef UIntArray head = self.heads[pa_index]
+        cdef UIntArray next = self.nexts[pa_index]
+        cdef np.ndarray[np.int64_t, ndim=1] occupancy = np.zeros(
+            self.n_cells, dtype=np.int64
+        )
+        cdef ZOLTAN_ID_TYPE _next
+        cdef long i
+
+        for i in range(self.n_cells):
+            _next = head.data[i]
+            while (_next != UINT_MAX):
+                occupancy[i] += 1
+                _next = next.data[_next]
+        return (dict(kind='cells', cell_size=self.cell_size),
+                occupancy[occupancy > 0])
+
     cpdef set_context(self, int src_index, int dst_index):
         """Setup the context before asking for neighbors.  The `dst_index`
         represents the particles for whom the neighbors are to be determined
@@ -265,6 +289,14 @@ cdef class LinkedListNNPS(NNPS):
         cdef cPoint pnt = cPoint_new(0, 0, 0)
         cdef int _cid
 
+        # particles may have been appended since the refresh
+        num_particles = pa_wrapper.get_number_of_particles()
+        if next.length < num_particles:
+            i = next.length
+            next.resize(num_particles)
+            for i in range(i, num_particles):
+                next.data[i] = UINT_MAX
+
         # now bin the particles
         num_particles = indices.length
         for indexi in range(num_particles):
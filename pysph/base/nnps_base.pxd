@@ -295,6 +295,10 @@ cdef class NNPSBase:
     cdef IntArray cell_shifts         # cell shifts
     cdef public int n_cells           # number of cells
 
+    cdef public double update_time        # time taken by the last update
+    cdef public double total_update_time  # time taken by all updates
+    cdef public long n_updates            # number of updates
+
     # Testing function for brute force neighbor search. The return
     # list is of the same type of the local and global ids (uint)
     cpdef brute_force_neighbors(self, int src_index, int dst_index,
@@ -321,6 +325,16 @@ cdef class NNPS(NNPSBase):
 
     cdef public bint sort_gids        # Sort neighbors by their gids.
 
+    cdef public double h_padding      # Relative padding of the cell size.
+    cdef public bint supports_h_padding  # If the bins only need positions.
+    cdef public bint reuse_unchanged_bins  # Skip binning unmoved particles.
+    cdef public long n_reused_bins    # number of updates reusing the bins
+    cdef list _binned_positions       # Positions when last binned.
+    cdef list _binned_h               # h when last binned (if needed).
+    cdef public bint supports_append  # If particles can be added to bins.
+    cdef list _num_binned             # Particles binned by begin_update.
+    cdef double _begin_update_time    # Time taken by begin_update.
+
     ##########################################################################
     # Member functions
     ##########################################################################
@@ -339,6 +353,12 @@ cdef class NNPS(NNPSBase):
     # compute the min and max for the particle coordinates
     cdef _compute_bounds(self)
 
+    # record the time taken by an update
+    cdef _record_update_time(self, double start)
+
+    # check if the particles can be searched without binning them again
+    cdef bint _can_reuse_bins(self)
+
     cdef void find_nearest_neighbors(self, size_t d_idx, UIntArray nbrs) nogil
 
     cdef void get_nearest_neighbors(self, size_t d_idx,
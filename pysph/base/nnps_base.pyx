@@ -1,6 +1,9 @@
 # cython: language_level=3, embedsignature=True
 # distutils: language=c++
 # Library imports.
+import itertools
+from time import perf_counter
+
 import numpy as np
 cimport numpy as np
 
@@ -26,9 +29,8 @@ from cpython.list cimport PyList_GetItem, PyList_SetItem, PyList_GET_ITEM
 cimport cython
 
 from compyle.config import get_config
-from compyle.array import get_backend, Array
-from compyle.parallel import Elementwise
-from compyle.types import annotate
+# This avoids importing compyle.array, which is slow, on the CPU.
+from pysph.base.particle_array import get_backend
 
 
 IF OPENMP:
@@ -216,6 +218,86 @@ cpdef UIntArray arange_uint(int start, int stop=-1):
     return arange
 
 ##############################################################################
+def _get_summary(values, int bins):
+    """Return the summary statistics and the histogram of the values."""
+    if len(values) == 0:
+        return dict(min=0, max=0, mean=0.0, std=0.0, total=0,
+                    histogram=[], bin_edges=[])
+    hist, edges = np.histogram(values, bins=bins)
+    return dict(
+        min=int(values.min()), max=int(values.max()),
+        mean=float(values.mean()), std=float(values.std()),
+        total=int(values.sum()), histogram=hist.tolist(),
+        bin_edges=edges.tolist()
+    )
+
+
+def _get_cell_candidates(src, dst, double cell_size, int dim):
+    """Bin the source particles in cells of the given size and return the
+    number of source particles in the cells adjacent to each destination
+    particle and the number of particles in each occupied cell.
+    """
+    n_src = src.x.length
+    n_dst = dst.x.length
+    if n_src == 0 or n_dst == 0 or cell_size <= 0.0:
+        return np.zeros(n_dst, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    s_pos = [x.get_npy_array()[:n_src] for x in (src.x, src.y, src.z)][:dim]
+    d_pos = [x.get_npy_array()[:n_dst] for x in (dst.x, dst.y, dst.z)][:dim]
+    xmin = [min(s.min(), d.min()) for s, d in zip(s_pos, d_pos)]
+    # Shift by one cell so the adjacent cells have non-negative indices.
+    s_cid = [np.floor((x - x0)/cell_size).astype(np.int64) + 1
+             for x, x0 in zip(s_pos, xmin)]
+    d_cid = [np.floor((x - x0)/cell_size).astype(np.int64) + 1
+             for x, x0 in zip(d_pos, xmin)]
+    shape = tuple(max(s.max(), d.max()) + 2 for s, d in zip(s_cid, d_cid))
+    keys, occupancy = np.unique(
+        np.ravel_multi_index(s_cid, shape), return_counts=True
+    )
+    candidates = np.zeros(n_dst, dtype=np.int64)
+    for shift in itertools.product((-1, 0, 1), repeat=dim):
+        cid = [c + o for c, o in zip(d_cid, shift)]
+        key = np.ravel_multi_index(cid, shape)
+        idx = np.searchsorted(keys, key)
+        idx[idx == len(keys)] = 0
+        found = keys[idx] == key
+        candidates[found] += occupancy[idx[found]]
+    return candidates, occupancy
+
+
+cpdef long count_neighbors(NNPS nnps, int src_index, int dst_index):
+    """Find the neighbors of all the particles in the `dst_index` array from
+    the `src_index` array and return the total number of neighbors.
+
+    This makes the same queries as the compiled equations do, with or
+    without the neighbor cache, and in parallel with OpenMP when it is
+    used by the equations, and is used to time the NNPS.
+    """
+    cdef long n_dst = nnps.particles[dst_index].get_number_of_particles()
+    cdef int n_threads = 1
+    if get_config().use_openmp:
+        n_threads = get_number_of_threads()
+    cdef list nbr_refs = [UIntArray() for i in range(n_threads)]
+    cdef void** nbrs = <void**>aligned_malloc(sizeof(void*)*n_threads)
+    cdef int tid
+    for tid in range(n_threads):
+        nbrs[tid] = <void*>nbr_refs[tid]
+    cdef long i, total = 0
+    nnps.set_context(src_index, dst_index)
+    if n_threads > 1:
+        with nogil, parallel():
+            tid = threadid()
+            for i in prange(n_dst):
+                nnps.get_nearest_neighbors(i, <UIntArray>nbrs[tid])
+                total += (<UIntArray>nbrs[tid]).length
+    else:
+        with nogil:
+            for i in range(n_dst):
+                nnps.get_nearest_neighbors(i, <UIntArray>nbrs[0])
+                total += (<UIntArray>nbrs[0]).length
+    aligned_free(nbrs)
+    return total
+
+
 cdef class NNPSParticleArrayWrapper:
     def __init__(self, ParticleArray pa):
         self.pa = pa
@@ -1338,6 +1420,83 @@ cdef class NNPSBase:
         self.cell_shifts.data[1] = 0
         self.cell_shifts.data[2] = 1
 
+        # Timing of the updates.
+        self.update_time = 0.0
+        self.total_update_time = 0.0
+        self.n_updates = 0
+
+    def get_neighbor_statistics(self, int src_index, int dst_index,
+                                int bins=20):
+        """Return statistics of the neighbors of the particles in the
+        `dst_index` array from the particles of the `src_index` array.
+
+        This is meant to help choose the NNPS parameters and to find
+        clumping of the particles, it finds the neighbors of every particle
+        so is expensive.
+
+        The candidates are the source particles in the cells of size
+        `cell_size` adjacent to each destination particle, i.e. the
+        particles a cell based search checks.  The `accept_ratio` is the
+        fraction of these that are neighbors.  The `cells` are the
+        occupancy of the bins of this NNPS, see `get_bin_occupancy`.
+
+        Parameters
+        ----------
+
+        src_index: int
+            Index of the array of the neighbors.
+        dst_index: int
+            Index of the array of the query particles.
+        bins: int
+            Number of bins of the histograms.
+
+        Returns
+        -------
+
+        A dictionary with the counts of particles, the `neighbors`, the
+        `candidates`, the `accept_ratio` and the occupancy of the `cells`.
+        """
+        cdef NNPSParticleArrayWrapper src = self.pa_wrappers[src_index]
+        cdef NNPSParticleArrayWrapper dst = self.pa_wrappers[dst_index]
+        cdef long n_dst = dst.get_number_of_particles()
+        cdef long n_src = src.get_number_of_particles()
+        cdef UIntArray nbrs = UIntArray()
+        cdef np.ndarray[np.int64_t, ndim=1] counts = np.zeros(
+            n_dst, dtype=np.int64
+        )
+        cdef long i
+        for i in range(n_dst):
+            self.get_nearest_particles(src_index, dst_index, i, nbrs)
+            counts[i] = nbrs.length
+
+        n_cand, occupancy = _get_cell_candidates(
+            src, dst, self.cell_size, self.dim
+        )
+        bin_info, occupancy = self.get_bin_occupancy(src_index)
+        total = int(counts.sum())
+        total_cand = int(n_cand.sum())
+        return dict(
+            src=src.name, dst=dst.name, n_src=n_src, n_dst=n_dst,
+            neighbors=_get_summary(counts, bins),
+            candidates=_get_summary(n_cand, bins),
+            accept_ratio=float(total)/total_cand if total_cand > 0 else 0.0,
+            cells=dict(bin_info, **_get_summary(occupancy, bins)),
+        )
+
+    def get_bin_occupancy(self, int pa_index):
+        """Return a dictionary describing the bins of the `pa_index` array
+        and the number of particles in each occupied bin.
+
+        The NNPS must have been updated.  This bins the particles in cells
+        of size `cell_size`, the NNPS that bin the particles themselves
+        return the occupancy of their own cells or leaves.
+        """
+        cdef NNPSParticleArrayWrapper pa = self.pa_wrappers[pa_index]
+        n_cand, occupancy = _get_cell_candidates(
+            pa, pa, self.cell_size, self.dim
+        )
+        return dict(kind='cells', cell_size=self.cell_size), occupancy
+
     cpdef brute_force_neighbors(self, int src_index, int dst_index,
                                 size_t d_idx, UIntArray nbrs):
         cdef NNPSParticleArrayWrapper src = self.pa_wrappers[src_index]
@@ -1470,6 +1629,22 @@ cdef class NNPS(NNPSBase):
                 _cache.append(NeighborCache(self, d_idx, s_idx))
         self.cache = _cache
 
+        # No padding of the cell size by default, subclasses whose bins
+        # only depend on the positions and the cell size may support it.
+        self.h_padding = 0.0
+        self.supports_h_padding = False
+        self.reuse_unchanged_bins = False
+        self.n_reused_bins = 0
+        self._binned_positions = []
+        self._binned_h = []
+
+        # Subclasses whose bins can take particles appended to the arrays
+        # after they are binned may bin the local particles in parallel
+        # runs before the remote particles are received.
+        self.supports_append = False
+        self._num_binned = None
+        self._begin_update_time = 0.0
+
     #### Public protocol #################################################
 
     def set_in_parallel(self, bint in_parallel):
@@ -1484,6 +1659,51 @@ cdef class NNPS(NNPSBase):
     def update_domain(self):
         self.domain.update()
 
+    def set_h_padding(self, double h_padding):
+        """Pad the cell size used for binning by the given fraction.
+
+        When only the smoothing lengths change, as in iterations for a
+        variable h, the particles are not binned again by `update` as long
+        as the search radius fits in the padded cells.  Only the cached
+        neighbors are recomputed in this case.  A larger padding allows
+        larger changes in h but increases the number of candidate neighbors
+        that are checked.
+
+        Parameters
+        ----------
+
+        h_padding : double
+            Fraction by which the cell size is increased, 0 disables it.
+        """
+        if h_padding < 0.0:
+            raise ValueError('h_padding must be non-negative.')
+        if h_padding > 0.0 and not self.supports_h_padding:
+            raise ValueError(
+                '%s does not support h_padding.' % self.__class__.__name__
+            )
+        self.h_padding = h_padding
+        self._binned_positions = []
+
+    def set_reuse_unchanged_bins(self, bint reuse):
+        """Do not bin the particles again in `update` if they have not
+        moved since they were last binned.
+
+        This is useful when the NNPS is also updated outside the
+        integrator, for example by a post step tool sharing the solver's
+        NNPS, so the integrator's next update does not repeat the work.
+        The positions (and h for NNPS whose bins depend on it) are copied
+        at each update to detect this.
+
+        Parameters
+        ----------
+
+        reuse : bint
+            Reuse the bins of unmoved particles if True.
+        """
+        self.reuse_unchanged_bins = reuse
+        self._binned_positions = []
+        self._binned_h = []
+
     cpdef update(self):
         """Update the local data after particles have moved.
 
@@ -1503,9 +1723,21 @@ cdef class NNPS(NNPSBase):
         cdef UIntArray indices
 
         cdef DomainManager domain = self.domain
+        cdef double start = perf_counter()
+
+        if self._can_reuse_bins():
+            # The particles have not moved (or only h has changed) and the
+            # cells are large enough.
+            self.hmin = domain.manager.hmin
+            self.n_reused_bins += 1
+            if self.use_cache:
+                for cache in self.cache:
+                    cache.update()
+            self._record_update_time(start)
+            return
 
         # use cell sizes computed by the domain.
-        self.cell_size = domain.manager.cell_size
+        self.cell_size = domain.manager.cell_size*(1.0 + self.h_padding)
         self.hmin = domain.manager.hmin
 
         # compute bounds and refresh the data structure
@@ -1521,10 +1753,120 @@ cdef class NNPS(NNPSBase):
             # bin the particles
             self._bin( pa_index=i, indices=indices )
 
+        if self.h_padding > 0.0 or self.reuse_unchanged_bins:
+            self._binned_positions = []
+            self._binned_h = []
+            for pa in self.particles:
+                self._binned_positions.append([
+                    x.copy() for x in
+                    pa.get('x', 'y', 'z', only_real_particles=False)
+                ])
+                if not self.supports_h_padding:
+                    self._binned_h.append(
+                        pa.get('h', only_real_particles=False).copy()
+                    )
+
         if self.use_cache:
             for cache in self.cache:
                 cache.update()
 
+        self._record_update_time(start)
+
+    def begin_update(self, double halo_width=0.0):
+        """Bin the particles in the arrays before the remote particles of
+        a parallel run are received.
+
+        This is called while the remote exchange is in flight, the remote
+        particles appended to the arrays are then binned by `end_update`.
+        The bounds are padded by `halo_width` so they can hold the remote
+        particles.  If the NNPS cannot add particles to its bins, all the
+        work is done by `end_update`.
+
+        Parameters
+        ----------
+
+        halo_width : double
+            Distance from the local particles within which the remote
+            particles are expected.
+        """
+        cdef int i
+        cdef double start = perf_counter()
+        self._num_binned = None
+        if not self.supports_append or self.h_padding > 0.0 or \
+                self.reuse_unchanged_bins:
+            return
+
+        self.cell_size = self.domain.manager.cell_size
+        self.hmin = self.domain.manager.hmin
+
+        self._compute_bounds()
+        # The unused dimensions are not padded as they have a single cell.
+        for i in range(self.dim):
+            self.xmin.data[i] -= halo_width
+            self.xmax.data[i] += halo_width
+        self._refresh()
+
+        self._num_binned = []
+        for i in range(self.narrays):
+            num_particles = self.particles[i].get_number_of_particles()
+            self._bin(pa_index=i, indices=arange_uint(num_particles))
+            self._num_binned.append(num_particles)
+        self._begin_update_time = perf_counter() - start
+
+    def end_update(self):
+        """Bin the particles appended to the arrays since `begin_update`.
+
+        The NNPS is updated as usual if `begin_update` did not bin the
+        particles or if the appended particles are outside its bounds.
+        """
+        cdef int i
+        cdef ParticleArray pa
+        cdef double start = perf_counter()
+        cdef list num_binned = self._num_binned
+        self._num_binned = None
+        if num_binned is None or not self._appended_in_bounds(num_binned):
+            self.update()
+            return
+
+        for i in range(self.narrays):
+            pa = self.particles[i]
+            num_particles = pa.get_number_of_particles()
+            if num_particles > num_binned[i]:
+                self._bin(
+                    pa_index=i,
+                    indices=arange_uint(num_binned[i], num_particles)
+                )
+
+        if self.use_cache:
+            for cache in self.cache:
+                cache.update()
+
+        self._record_update_time(start - self._begin_update_time)
+
+    def _appended_in_bounds(self, list num_binned):
+        """Return True if the particles appended since `begin_update` are
+        within the bounds of the bins.
+        """
+        cdef int i, j
+        cdef ParticleArray pa
+        xmin = self.xmin.get_npy_array()
+        xmax = self.xmax.get_npy_array()
+        for i in range(self.narrays):
+            pa = self.particles[i]
+            if pa.get_number_of_particles() < num_binned[i]:
+                return False
+            coords = pa.get('x', 'y', 'z', only_real_particles=False)
+            for j in range(3):
+                x = coords[j][num_binned[i]:]
+                if len(x) == 0:
+                    break
+                lo, hi = x.min(), x.max()
+                # The upper bound is excluded unless the extent is zero.
+                if lo < xmin[j] or hi > xmax[j] or \
+                        (hi == xmax[j] and xmax[j] > xmin[j]):
+                    return False
+        return True
+
     cdef void get_nearest_neighbors(self, size_t d_idx, UIntArray nbrs) nogil:
         if self.use_cache:
             self.current_cache.get_neighbors_raw(d_idx, nbrs)
@@ -1533,6 +1875,33 @@ cdef class NNPS(NNPSBase):
             self.find_nearest_neighbors(d_idx, nbrs)
 
     #### Private protocol ################################################
+    cdef _record_update_time(self, double start):
+        self.update_time = perf_counter() - start
+        self.total_update_time += self.update_time
+        self.n_updates += 1
+
+    cdef bint _can_reuse_bins(self):
+        cdef ParticleArray pa
+        cdef int i, j
+        if (self.h_padding <= 0.0 and not self.reuse_unchanged_bins) or \
+           len(self._binned_positions) != self.narrays:
+            return False
+        if self.domain.manager.cell_size > self.cell_size:
+            return False
+        for i in range(self.narrays):
+            pa = self.particles[i]
+            current = pa.get('x', 'y', 'z', only_real_particles=False)
+            for j in range(3):
+                if not np.array_equal(self._binned_positions[i][j],
+                                      current[j]):
+                    return False
+            # Trees and the like are built using h.
+            if not self.supports_h_padding and not np.array_equal(
+                    self._binned_h[i],
+                    pa.get('h', only_real_particles=False)):
+                return False
+        return True
+
     cdef _compute_bounds(self):
         """Compute coordinate bounds for the particles"""
         cdef list pa_wrappers = self.pa_wrappers
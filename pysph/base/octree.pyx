@@ -398,6 +398,7 @@ cdef class Octree:
             free(self.pids)
         if self.leaf_cells != NULL:
             del self.leaf_cells
+            self.leaf_cells = NULL
 
         self.pids = <u_int*> malloc(num_particles*sizeof(u_int))
         self._next_pid = 0
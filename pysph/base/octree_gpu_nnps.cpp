@@ -0,0 +1,17699 @@
+/* Generated by Cython 0.29.37 */
+
+/* BEGIN: Cython Metadata
+{
+    "distutils": {
+        "depends": [
+            "/root/.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/core/include/numpy/arrayobject.h",
+            "/root/.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/core/include/numpy/arrayscalars.h",
+            "/root/.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/core/include/numpy/ndarrayobject.h",
+            "/root/.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/core/include/numpy/ndarraytypes.h",
+            "/root/.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/core/include/numpy/ufuncobject.h",
+            "pysph/base/nnps_base.pxd",
+            "pysph/base/nnps_base.pyx"
+        ],
+        "extra_compile_args": [
+            "-fopenmp"
+        ],
+        "extra_link_args": [
+            "-fopenmp"
+        ],
+        "include_dirs": [
+            "/root/.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/core/include",
+            "/usr/local/include/"
+        ],
+        "language": "c++",
+        "name": "pysph.base.octree_gpu_nnps",
+        "sources": [
+            "pysph/base/octree_gpu_nnps.pyx"
+        ]
+    },
+    "module_name": "pysph.base.octree_gpu_nnps"
+}
+END: Cython Metadata */
+
+#ifndef PY_SSIZE_T_CLEAN
+#define PY_SSIZE_T_CLEAN
+#endif /* PY_SSIZE_T_CLEAN */
+#include "Python.h"
+#ifndef Py_PYTHON_H
+    #error Python headers needed to compile C extensions, please install development version of Python.
+#elif PY_VERSION_HEX < 0x02060000 || (0x03000000 <= PY_VERSION_HEX && PY_VERSION_HEX < 0x03030000)
+    #error Cython requires Python 2.6+ or Python 3.3+.
+#else
+#define CYTHON_ABI "0_29_37"
+#define CYTHON_HEX_VERSION 0x001D25F0
+#define CYTHON_FUTURE_DIVISION 1
+#include <stddef.h>
+#ifndef offsetof
+  #define offsetof(type, member) ( (size_t) & ((type*)0) -> member )
+#endif
+#if !defined(WIN32) && !defined(MS_WINDOWS)
+  #ifndef __stdcall
+    #define __stdcall
+  #endif
+  #ifndef __cdecl
+    #define __cdecl
+  #endif
+  #ifndef __fastcall
+    #define __fastcall
+  #endif
+#endif
+#ifndef DL_IMPORT
+  #define DL_IMPORT(t) t
+#endif
+#ifndef DL_EXPORT
+  #define DL_EXPORT(t) t
+#endif
+#define __PYX_COMMA ,
+#ifndef HAVE_LONG_LONG
+  #if PY_VERSION_HEX >= 0x02070000
+    #define HAVE_LONG_LONG
+  #endif
+#endif
+#ifndef PY_LONG_LONG
+  #define PY_LONG_LONG LONG_LONG
+#endif
+#ifndef Py_HUGE_VAL
+  #define Py_HUGE_VAL HUGE_VAL
+#endif
+#ifdef PYPY_VERSION
+  #define CYTHON_COMPILING_IN_PYPY 1
+  #define CYTHON_COMPILING_IN_PYSTON 0
+  #define CYTHON_COMPILING_IN_CPYTHON 0
+  #define CYTHON_COMPILING_IN_NOGIL 0
+  #undef CYTHON_USE_TYPE_SLOTS
+  #define CYTHON_USE_TYPE_SLOTS 0
+  #undef CYTHON_USE_PYTYPE_LOOKUP
+  #define CYTHON_USE_PYTYPE_LOOKUP 0
+  #if PY_VERSION_HEX < 0x03050000
+    #undef CYTHON_USE_ASYNC_SLOTS
+    #define CYTHON_USE_ASYNC_SLOTS 0
+  #elif !defined(CYTHON_USE_ASYNC_SLOTS)
+    #define CYTHON_USE_ASYNC_SLOTS 1
+  #endif
+  #undef CYTHON_USE_PYLIST_INTERNALS
+  #define CYTHON_USE_PYLIST_INTERNALS 0
+  #undef CYTHON_USE_UNICODE_INTERNALS
+  #define CYTHON_USE_UNICODE_INTERNALS 0
+  #undef CYTHON_USE_UNICODE_WRITER
+  #define CYTHON_USE_UNICODE_WRITER 0
+  #undef CYTHON_USE_PYLONG_INTERNALS
+  #define CYTHON_USE_PYLONG_INTERNALS 0
+  #undef CYTHON_AVOID_BORROWED_REFS
+  #define CYTHON_AVOID_BORROWED_REFS 1
+  #undef CYTHON_ASSUME_SAFE_MACROS
+  #define CYTHON_ASSUME_SAFE_MACROS 0
+  #undef CYTHON_UNPACK_METHODS
+  #define CYTHON_UNPACK_METHODS 0
+  #undef CYTHON_FAST_THREAD_STATE
+  #define CYTHON_FAST_THREAD_STATE 0
+  #undef CYTHON_FAST_PYCALL
+  #define CYTHON_FAST_PYCALL 0
+  #if PY_VERSION_HEX < 0x03090000
+    #undef CYTHON_PEP489_MULTI_PHASE_INIT
+    #define CYTHON_PEP489_MULTI_PHASE_INIT 0
+  #elif !defined(CYTHON_PEP489_MULTI_PHASE_INIT)
+    #define CYTHON_PEP489_MULTI_PHASE_INIT 1
+  #endif
+  #undef CYTHON_USE_TP_FINALIZE
+  #define CYTHON_USE_TP_FINALIZE (PY_VERSION_HEX >= 0x030400a1 && PYPY_VERSION_NUM >= 0x07030C00)
+  #undef CYTHON_USE_DICT_VERSIONS
+  #define CYTHON_USE_DICT_VERSIONS 0
+  #undef CYTHON_USE_EXC_INFO_STACK
+  #define CYTHON_USE_EXC_INFO_STACK 0
+  #ifndef CYTHON_UPDATE_DESCRIPTOR_DOC
+    #define CYTHON_UPDATE_DESCRIPTOR_DOC 0
+  #endif
+#elif defined(PYSTON_VERSION)
+  #define CYTHON_COMPILING_IN_PYPY 0
+  #define CYTHON_COMPILING_IN_PYSTON 1
+  #define CYTHON_COMPILING_IN_CPYTHON 0
+  #define CYTHON_COMPILING_IN_NOGIL 0
+  #ifndef CYTHON_USE_TYPE_SLOTS
+    #define CYTHON_USE_TYPE_SLOTS 1
+  #endif
+  #undef CYTHON_USE_PYTYPE_LOOKUP
+  #define CYTHON_USE_PYTYPE_LOOKUP 0
+  #undef CYTHON_USE_ASYNC_SLOTS
+  #define CYTHON_USE_ASYNC_SLOTS 0
+  #undef CYTHON_USE_PYLIST_INTERNALS
+  #define CYTHON_USE_PYLIST_INTERNALS 0
+  #ifndef CYTHON_USE_UNICODE_INTERNALS
+    #define CYTHON_USE_UNICODE_INTERNALS 1
+  #endif
+  #undef CYTHON_USE_UNICODE_WRITER
+  #define CYTHON_USE_UNICODE_WRITER 0
+  #undef CYTHON_USE_PYLONG_INTERNALS
+  #define CYTHON_USE_PYLONG_INTERNALS 0
+  #ifndef CYTHON_AVOID_BORROWED_REFS
+    #define CYTHON_AVOID_BORROWED_REFS 0
+  #endif
+  #ifndef CYTHON_ASSUME_SAFE_MACROS
+    #define CYTHON_ASSUME_SAFE_MACROS 1
+  #endif
+  #ifndef CYTHON_UNPACK_METHODS
+    #define CYTHON_UNPACK_METHODS 1
+  #endif
+  #undef CYTHON_FAST_THREAD_STATE
+  #define CYTHON_FAST_THREAD_STATE 0
+  #undef CYTHON_FAST_PYCALL
+  #define CYTHON_FAST_PYCALL 0
+  #undef CYTHON_PEP489_MULTI_PHASE_INIT
+  #define CYTHON_PEP489_MULTI_PHASE_INIT 0
+  #undef CYTHON_USE_TP_FINALIZE
+  #define CYTHON_USE_TP_FINALIZE 0
+  #undef CYTHON_USE_DICT_VERSIONS
+  #define CYTHON_USE_DICT_VERSIONS 0
+  #undef CYTHON_USE_EXC_INFO_STACK
+  #define CYTHON_USE_EXC_INFO_STACK 0
+  #ifndef CYTHON_UPDATE_DESCRIPTOR_DOC
+    #define CYTHON_UPDATE_DESCRIPTOR_DOC 0
+  #endif
+#elif defined(PY_NOGIL)
+  #define CYTHON_COMPILING_IN_PYPY 0
+  #define CYTHON_COMPILING_IN_PYSTON 0
+  #define CYTHON_COMPILING_IN_CPYTHON 0
+  #define CYTHON_COMPILING_IN_NOGIL 1
+  #ifndef CYTHON_USE_TYPE_SLOTS
+    #define CYTHON_USE_TYPE_SLOTS 1
+  #endif
+  #undef CYTHON_USE_PYTYPE_LOOKUP
+  #define CYTHON_USE_PYTYPE_LOOKUP 0
+  #ifndef CYTHON_USE_ASYNC_SLOTS
+    #define CYTHON_USE_ASYNC_SLOTS 1
+  #endif
+  #undef CYTHON_USE_PYLIST_INTERNALS
+  #define CYTHON_USE_PYLIST_INTERNALS 0
+  #ifndef CYTHON_USE_UNICODE_INTERNALS
+    #define CYTHON_USE_UNICODE_INTERNALS 1
+  #endif
+  #undef CYTHON_USE_UNICODE_WRITER
+  #define CYTHON_USE_UNICODE_WRITER 0
+  #undef CYTHON_USE_PYLONG_INTERNALS
+  #define CYTHON_USE_PYLONG_INTERNALS 0
+  #ifndef CYTHON_AVOID_BORROWED_REFS
+    #define CYTHON_AVOID_BORROWED_REFS 0
+  #endif
+  #ifndef CYTHON_ASSUME_SAFE_MACROS
+    #define CYTHON_ASSUME_SAFE_MACROS 1
+  #endif
+  #ifndef CYTHON_UNPACK_METHODS
+    #define CYTHON_UNPACK_METHODS 1
+  #endif
+  #undef CYTHON_FAST_THREAD_STATE
+  #define CYTHON_FAST_THREAD_STATE 0
+  #undef CYTHON_FAST_PYCALL
+  #define CYTHON_FAST_PYCALL 0
+  #ifndef CYTHON_PEP489_MULTI_PHASE_INIT
+    #define CYTHON_PEP489_MULTI_PHASE_INIT 1
+  #endif
+  #ifndef CYTHON_USE_TP_FINALIZE
+    #define CYTHON_USE_TP_FINALIZE 1
+  #endif
+  #undef CYTHON_USE_DICT_VERSIONS
+  #define CYTHON_USE_DICT_VERSIONS 0
+  #undef CYTHON_USE_EXC_INFO_STACK
+  #define CYTHON_USE_EXC_INFO_STACK 0
+#else
+  #define CYTHON_COMPILING_IN_PYPY 0
+  #define CYTHON_COMPILING_IN_PYSTON 0
+  #define CYTHON_COMPILING_IN_CPYTHON 1
+  #define CYTHON_COMPILING_IN_NOGIL 0
+  #ifndef CYTHON_USE_TYPE_SLOTS
+    #define CYTHON_USE_TYPE_SLOTS 1
+  #endif
+  #if PY_VERSION_HEX < 0x02070000
+    #undef CYTHON_USE_PYTYPE_LOOKUP
+    #define CYTHON_USE_PYTYPE_LOOKUP 0
+  #elif !defined(CYTHON_USE_PYTYPE_LOOKUP)
+    #define CYTHON_USE_PYTYPE_LOOKUP 1
+  #endif
+  #if PY_MAJOR_VERSION < 3
+    #undef CYTHON_USE_ASYNC_SLOTS
+    #define CYTHON_USE_ASYNC_SLOTS 0
+  #elif !defined(CYTHON_USE_ASYNC_SLOTS)
+    #define CYTHON_USE_ASYNC_SLOTS 1
+  #endif
+  #if PY_VERSION_HEX < 0x02070000
+    #undef CYTHON_USE_PYLONG_INTERNALS
+    #define CYTHON_USE_PYLONG_INTERNALS 0
+  #elif !defined(CYTHON_USE_PYLONG_INTERNALS)
+    #define CYTHON_USE_PYLONG_INTERNALS (PY_VERSION_HEX < 0x030C00A5)
+  #endif
+  #ifndef CYTHON_USE_PYLIST_INTERNALS
+    #define CYTHON_USE_PYLIST_INTERNALS 1
+  #endif
+  #ifndef CYTHON_USE_UNICODE_INTERNALS
+    #define CYTHON_USE_UNICODE_INTERNALS 1
+  #endif
+  #if PY_VERSION_HEX < 0x030300F0 || PY_VERSION_HEX >= 0x030B00A2
+    #undef CYTHON_USE_UNICODE_WRITER
+    #define CYTHON_USE_UNICODE_WRITER 0
+  #elif !defined(CYTHON_USE_UNICODE_WRITER)
+    #define CYTHON_USE_UNICODE_WRITER 1
+  #endif
+  #ifndef CYTHON_AVOID_BORROWED_REFS
+    #define CYTHON_AVOID_BORROWED_REFS 0
+  #endif
+  #ifndef CYTHON_ASSUME_SAFE_MACROS
+    #define CYTHON_ASSUME_SAFE_MACROS 1
+  #endif
+  #ifndef CYTHON_UNPACK_METHODS
+    #define CYTHON_UNPACK_METHODS 1
+  #endif
+  #if PY_VERSION_HEX >= 0x030B00A4
+    #undef CYTHON_FAST_THREAD_STATE
+    #define CYTHON_FAST_THREAD_STATE 0
+  #elif !defined(CYTHON_FAST_THREAD_STATE)
+    #define CYTHON_FAST_THREAD_STATE 1
+  #endif
+  #ifndef CYTHON_FAST_PYCALL
+    #define CYTHON_FAST_PYCALL (PY_VERSION_HEX < 0x030A0000)
+  #endif
+  #ifndef CYTHON_PEP489_MULTI_PHASE_INIT
+    #define CYTHON_PEP489_MULTI_PHASE_INIT (PY_VERSION_HEX >= 0x03050000)
+  #endif
+  #ifndef CYTHON_USE_TP_FINALIZE
+    #define CYTHON_USE_TP_FINALIZE (PY_VERSION_HEX >= 0x030400a1)
+  #endif
+  #ifndef CYTHON_USE_DICT_VERSIONS
+    #define CYTHON_USE_DICT_VERSIONS ((PY_VERSION_HEX >= 0x030600B1) && (PY_VERSION_HEX < 0x030C00A5))
+  #endif
+  #if PY_VERSION_HEX >= 0x030B00A4
+    #undef CYTHON_USE_EXC_INFO_STACK
+    #define CYTHON_USE_EXC_INFO_STACK 0
+  #elif !defined(CYTHON_USE_EXC_INFO_STACK)
+    #define CYTHON_USE_EXC_INFO_STACK (PY_VERSION_HEX >= 0x030700A3)
+  #endif
+  #ifndef CYTHON_UPDATE_DESCRIPTOR_DOC
+    #define CYTHON_UPDATE_DESCRIPTOR_DOC 1
+  #endif
+#endif
+#if !defined(CYTHON_FAST_PYCCALL)
+#define CYTHON_FAST_PYCCALL  (CYTHON_FAST_PYCALL && PY_VERSION_HEX >= 0x030600B1)
+#endif
+#if CYTHON_USE_PYLONG_INTERNALS
+  #if PY_MAJOR_VERSION < 3
+    #include "longintrepr.h"
+  #endif
+  #undef SHIFT
+  #undef BASE
+  #undef MASK
+  #ifdef SIZEOF_VOID_P
+    enum { __pyx_check_sizeof_voidp = 1 / (int)(SIZEOF_VOID_P == sizeof(void*)) };
+  #endif
+#endif
+#ifndef __has_attribute
+  #define __has_attribute(x) 0
+#endif
+#ifndef __has_cpp_attribute
+  #define __has_cpp_attribute(x) 0
+#endif
+#ifndef CYTHON_RESTRICT
+  #if defined(__GNUC__)
+    #define CYTHON_RESTRICT __restrict__
+  #elif defined(_MSC_VER) && _MSC_VER >= 1400
+    #define CYTHON_RESTRICT __restrict
+  #elif defined (__STDC_VERSION__) && __STDC_VERSION__ >= 199901L
+    #define CYTHON_RESTRICT restrict
+  #else
+    #define CYTHON_RESTRICT
+  #endif
+#endif
+#ifndef CYTHON_UNUSED
+# if defined(__GNUC__)
+#   if !(defined(__cplusplus)) || (__GNUC__ > 3 || (__GNUC__ == 3 && __GNUC_MINOR__ >= 4))
+#     define CYTHON_UNUSED __attribute__ ((__unused__))
+#   else
+#     define CYTHON_UNUSED
+#   endif
+# elif defined(__ICC) || (defined(__INTEL_COMPILER) && !defined(_MSC_VER))
+#   define CYTHON_UNUSED __attribute__ ((__unused__))
+# else
+#   define CYTHON_UNUSED
+# endif
+#endif
+#ifndef CYTHON_MAYBE_UNUSED_VAR
+#  if defined(__cplusplus)
+     template<class T> void CYTHON_MAYBE_UNUSED_VAR( const T& ) { }
+#  else
+#    define CYTHON_MAYBE_UNUSED_VAR(x) (void)(x)
+#  endif
+#endif
+#ifndef CYTHON_NCP_UNUSED
+# if CYTHON_COMPILING_IN_CPYTHON
+#  define CYTHON_NCP_UNUSED
+# else
+#  define CYTHON_NCP_UNUSED CYTHON_UNUSED
+# endif
+#endif
+#define __Pyx_void_to_None(void_result) ((void)(void_result), Py_INCREF(Py_None), Py_None)
+#ifdef _MSC_VER
+    #ifndef _MSC_STDINT_H_
+        #if _MSC_VER < 1300
+           typedef unsigned char     uint8_t;
+           typedef unsigned int      uint32_t;
+        #else
+           typedef unsigned __int8   uint8_t;
+           typedef unsigned __int32  uint32_t;
+        #endif
+    #endif
+#else
+   #include <stdint.h>
+#endif
+#ifndef CYTHON_FALLTHROUGH
+  #if defined(__cplusplus) && __cplusplus >= 201103L
+    #if __has_cpp_attribute(fallthrough)
+      #define CYTHON_FALLTHROUGH [[fallthrough]]
+    #elif __has_cpp_attribute(clang::fallthrough)
+      #define CYTHON_FALLTHROUGH [[clang::fallthrough]]
+    #elif __has_cpp_attribute(gnu::fallthrough)
+      #define CYTHON_FALLTHROUGH [[gnu::fallthrough]]
+    #endif
+  #endif
+  #ifndef CYTHON_FALLTHROUGH
+    #if __has_attribute(fallthrough)
+      #define CYTHON_FALLTHROUGH __attribute__((fallthrough))
+    #else
+      #define CYTHON_FALLTHROUGH
+    #endif
+  #endif
+  #if defined(__clang__ ) && defined(__apple_build_version__)
+    #if __apple_build_version__ < 7000000
+      #undef  CYTHON_FALLTHROUGH
+      #define CYTHON_FALLTHROUGH
+    #endif
+  #endif
+#endif
+
+#ifndef __cplusplus
+  #error "Cython files generated with the C++ option must be compiled with a C++ compiler."
+#endif
+#ifndef CYTHON_INLINE
+  #if defined(__clang__)
+    #define CYTHON_INLINE __inline__ __attribute__ ((__unused__))
+  #else
+    #define CYTHON_INLINE inline
+  #endif
+#endif
+template<typename T>
+void __Pyx_call_destructor(T& x) {
+    x.~T();
+}
+template<typename T>
+class __Pyx_FakeReference {
+  public:
+    __Pyx_FakeReference() : ptr(NULL) { }
+    __Pyx_FakeReference(const T& ref) : ptr(const_cast<T*>(&ref)) { }
+    T *operator->() { return ptr; }
+    T *operator&() { return ptr; }
+    operator T&() { return *ptr; }
+    template<typename U> bool operator ==(U other) { return *ptr == other; }
+    template<typename U> bool operator !=(U other) { return *ptr != other; }
+  private:
+    T *ptr;
+};
+
+#define __PYX_BUILD_PY_SSIZE_T "n"
+#define CYTHON_FORMAT_SSIZE_T "z"
+#if PY_MAJOR_VERSION < 3
+  #define __Pyx_BUILTIN_MODULE_NAME "__builtin__"
+  #define __Pyx_PyCode_New(a, k, l, s, f, code, c, n, v, fv, cell, fn, name, fline, lnos)\
+          PyCode_New(a+k, l, s, f, code, c, n, v, fv, cell, fn, name, fline, lnos)
+  #define __Pyx_DefaultClassType PyClass_Type
+#else
+  #define __Pyx_BUILTIN_MODULE_NAME "builtins"
+  #define __Pyx_DefaultClassType PyType_Type
+#if PY_VERSION_HEX >= 0x030B00A1
+    static CYTHON_INLINE PyCodeObject* __Pyx_PyCode_New(int a, int k, int l, int s, int f,
+                                                    PyObject *code, PyObject *c, PyObject* n, PyObject *v,
+                                                    PyObject *fv, PyObject *cell, PyObject* fn,
+                                                    PyObject *name, int fline, PyObject *lnos) {
+        PyObject *kwds=NULL, *argcount=NULL, *posonlyargcount=NULL, *kwonlyargcount=NULL;
+        PyObject *nlocals=NULL, *stacksize=NULL, *flags=NULL, *replace=NULL, *call_result=NULL, *empty=NULL;
+        const char *fn_cstr=NULL;
+        const char *name_cstr=NULL;
+        PyCodeObject* co=NULL;
+        PyObject *type, *value, *traceback;
+        PyErr_Fetch(&type, &value, &traceback);
+        if (!(kwds=PyDict_New())) goto end;
+        if (!(argcount=PyLong_FromLong(a))) goto end;
+        if (PyDict_SetItemString(kwds, "co_argcount", argcount) != 0) goto end;
+        if (!(posonlyargcount=PyLong_FromLong(0))) goto end;
+        if (PyDict_SetItemString(kwds, "co_posonlyargcount", posonlyargcount) != 0) goto end;
+        if (!(kwonlyargcount=PyLong_FromLong(k))) goto end;
+        if (PyDict_SetItemString(kwds, "co_kwonlyargcount", kwonlyargcount) != 0) goto end;
+        if (!(nlocals=PyLong_FromLong(l))) goto end;
+        if (PyDict_SetItemString(kwds, "co_nlocals", nlocals) != 0) goto end;
+        if (!(stacksize=PyLong_FromLong(s))) goto end;
+        if (PyDict_SetItemString(kwds, "co_stacksize", stacksize) != 0) goto end;
+        if (!(flags=PyLong_FromLong(f))) goto end;
+        if (PyDict_SetItemString(kwds, "co_flags", flags) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_code", code) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_consts", c) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_names", n) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_varnames", v) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_freevars", fv) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_cellvars", cell) != 0) goto end;
+        if (PyDict_SetItemString(kwds, "co_linetable", lnos) != 0) goto end;
+        if (!(fn_cstr=PyUnicode_AsUTF8AndSize(fn, NULL))) goto end;
+        if (!(name_cstr=PyUnicode_AsUTF8AndSize(name, NULL))) goto end;
+        if (!(co = PyCode_NewEmpty(fn_cstr, name_cstr, fline))) goto end;
+        if (!(replace = PyObject_GetAttrString((PyObject*)co, "replace"))) goto cleanup_code_too;
+        if (!(empty = PyTuple_New(0))) goto cleanup_code_too; // unfortunately __pyx_empty_tuple isn't available here
+        if (!(call_result = PyObject_Call(replace, empty, kwds))) goto cleanup_code_too;
+        Py_XDECREF((PyObject*)co);
+        co = (PyCodeObject*)call_result;
+        call_result = NULL;
+        if (0) {
+            cleanup_code_too:
+            Py_XDECREF((PyObject*)co);
+            co = NULL;
+        }
+        end:
+        Py_XDECREF(kwds);
+        Py_XDECREF(argcount);
+        Py_XDECREF(posonlyargcount);
+        Py_XDECREF(kwonlyargcount);
+        Py_XDECREF(nlocals);
+        Py_XDECREF(stacksize);
+        Py_XDECREF(replace);
+        Py_XDECREF(call_result);
+        Py_XDECREF(empty);
+        if (type) {
+            PyErr_Restore(type, value, traceback);
+        }
+        return co;
+    }
+#else
+  #define __Pyx_PyCode_New(a, k, l, s, f, code, c, n, v, fv, cell, fn, name, fline, lnos)\
+          PyCode_New(a, k, l, s, f, code, c, n, v, fv, cell, fn, name, fline, lnos)
+#endif
+  #define __Pyx_DefaultClassType PyType_Type
+#endif
+#if PY_VERSION_HEX >= 0x030900F0 && !CYTHON_COMPILING_IN_PYPY
+  #define __Pyx_PyObject_GC_IsFinalized(o) PyObject_GC_IsFinalized(o)
+#else
+  #define __Pyx_PyObject_GC_IsFinalized(o) _PyGC_FINALIZED(o)
+#endif
+#ifndef Py_TPFLAGS_CHECKTYPES
+  #define Py_TPFLAGS_CHECKTYPES 0
+#endif
+#ifndef Py_TPFLAGS_HAVE_INDEX
+  #define Py_TPFLAGS_HAVE_INDEX 0
+#endif
+#ifndef Py_TPFLAGS_HAVE_NEWBUFFER
+  #define Py_TPFLAGS_HAVE_NEWBUFFER 0
+#endif
+#ifndef Py_TPFLAGS_HAVE_FINALIZE
+  #define Py_TPFLAGS_HAVE_FINALIZE 0
+#endif
+#ifndef METH_STACKLESS
+  #define METH_STACKLESS 0
+#endif
+#if PY_VERSION_HEX <= 0x030700A3 || !defined(METH_FASTCALL)
+  #ifndef METH_FASTCALL
+     #define METH_FASTCALL 0x80
+  #endif
+  typedef PyObject *(*__Pyx_PyCFunctionFast) (PyObject *self, PyObject *const *args, Py_ssize_t nargs);
+  typedef PyObject *(*__Pyx_PyCFunctionFastWithKeywords) (PyObject *self, PyObject *const *args,
+                                                          Py_ssize_t nargs, PyObject *kwnames);
+#else
+  #define __Pyx_PyCFunctionFast _PyCFunctionFast
+  #define __Pyx_PyCFunctionFastWithKeywords _PyCFunctionFastWithKeywords
+#endif
+#if CYTHON_FAST_PYCCALL
+#define __Pyx_PyFastCFunction_Check(func)\
+    ((PyCFunction_Check(func) && (METH_FASTCALL == (PyCFunction_GET_FLAGS(func) & ~(METH_CLASS | METH_STATIC | METH_COEXIST | METH_KEYWORDS | METH_STACKLESS)))))
+#else
+#define __Pyx_PyFastCFunction_Check(func) 0
+#endif
+#if CYTHON_COMPILING_IN_PYPY && !defined(PyObject_Malloc)
+  #define PyObject_Malloc(s)   PyMem_Malloc(s)
+  #define PyObject_Free(p)     PyMem_Free(p)
+  #define PyObject_Realloc(p)  PyMem_Realloc(p)
+#endif
+#if CYTHON_COMPILING_IN_CPYTHON && PY_VERSION_HEX < 0x030400A1
+  #define PyMem_RawMalloc(n)           PyMem_Malloc(n)
+  #define PyMem_RawRealloc(p, n)       PyMem_Realloc(p, n)
+  #define PyMem_RawFree(p)             PyMem_Free(p)
+#endif
+#if CYTHON_COMPILING_IN_PYSTON
+  #define __Pyx_PyCode_HasFreeVars(co)  PyCode_HasFreeVars(co)
+  #define __Pyx_PyFrame_SetLineNumber(frame, lineno) PyFrame_SetLineNumber(frame, lineno)
+#else
+  #define __Pyx_PyCode_HasFreeVars(co)  (PyCode_GetNumFree(co) > 0)
+  #define __Pyx_PyFrame_SetLineNumber(frame, lineno)  (frame)->f_lineno = (lineno)
+#endif
+#if !CYTHON_FAST_THREAD_STATE || PY_VERSION_HEX < 0x02070000
+  #define __Pyx_PyThreadState_Current PyThreadState_GET()
+#elif PY_VERSION_HEX >= 0x03060000
+  #define __Pyx_PyThreadState_Current _PyThreadState_UncheckedGet()
+#elif PY_VERSION_HEX >= 0x03000000
+  #define __Pyx_PyThreadState_Current PyThreadState_GET()
+#else
+  #define __Pyx_PyThreadState_Current _PyThreadState_Current
+#endif
+#if PY_VERSION_HEX < 0x030700A2 && !defined(PyThread_tss_create) && !defined(Py_tss_NEEDS_INIT)
+#include "pythread.h"
+#define Py_tss_NEEDS_INIT 0
+typedef int Py_tss_t;
+static CYTHON_INLINE int PyThread_tss_create(Py_tss_t *key) {
+  *key = PyThread_create_key();
+  return 0;
+}
+static CYTHON_INLINE Py_tss_t * PyThread_tss_alloc(void) {
+  Py_tss_t *key = (Py_tss_t *)PyObject_Malloc(sizeof(Py_tss_t));
+  *key = Py_tss_NEEDS_INIT;
+  return key;
+}
+static CYTHON_INLINE void PyThread_tss_free(Py_tss_t *key) {
+  PyObject_Free(key);
+}
+static CYTHON_INLINE int PyThread_tss_is_created(Py_tss_t *key) {
+  return *key != Py_tss_NEEDS_INIT;
+}
+static CYTHON_INLINE void PyThread_tss_delete(Py_tss_t *key) {
+  PyThread_delete_key(*key);
+  *key = Py_tss_NEEDS_INIT;
+}
+static CYTHON_INLINE int PyThread_tss_set(Py_tss_t *key, void *value) {
+  return PyThread_set_key_value(*key, value);
+}
+static CYTHON_INLINE void * PyThread_tss_get(Py_tss_t *key) {
+  return PyThread_get_key_value(*key);
+}
+#endif
+#if CYTHON_COMPILING_IN_CPYTHON || defined(_PyDict_NewPresized)
+#define __Pyx_PyDict_NewPresized(n)  ((n <= 8) ? PyDict_New() : _PyDict_NewPresized(n))
+#else
+#define __Pyx_PyDict_NewPresized(n)  PyDict_New()
+#endif
+#if PY_MAJOR_VERSION >= 3 || CYTHON_FUTURE_DIVISION
+  #define __Pyx_PyNumber_Divide(x,y)         PyNumber_TrueDivide(x,y)
+  #define __Pyx_PyNumber_InPlaceDivide(x,y)  PyNumber_InPlaceTrueDivide(x,y)
+#else
+  #define __Pyx_PyNumber_Divide(x,y)         PyNumber_Divide(x,y)
+  #define __Pyx_PyNumber_InPlaceDivide(x,y)  PyNumber_InPlaceDivide(x,y)
+#endif
+#if CYTHON_COMPILING_IN_CPYTHON && PY_VERSION_HEX >= 0x030500A1 && CYTHON_USE_UNICODE_INTERNALS
+#define __Pyx_PyDict_GetItemStr(dict, name)  _PyDict_GetItem_KnownHash(dict, name, ((PyASCIIObject *) name)->hash)
+#else
+#define __Pyx_PyDict_GetItemStr(dict, name)  PyDict_GetItem(dict, name)
+#endif
+#if PY_VERSION_HEX > 0x03030000 && defined(PyUnicode_KIND)
+  #define CYTHON_PEP393_ENABLED 1
+  #if PY_VERSION_HEX >= 0x030C0000
+    #define __Pyx_PyUnicode_READY(op)       (0)
+  #else
+    #define __Pyx_PyUnicode_READY(op)       (likely(PyUnicode_IS_READY(op)) ?\
+                                                0 : _PyUnicode_Ready((PyObject *)(op)))
+  #endif
+  #define __Pyx_PyUnicode_GET_LENGTH(u)   PyUnicode_GET_LENGTH(u)
+  #define __Pyx_PyUnicode_READ_CHAR(u, i) PyUnicode_READ_CHAR(u, i)
+  #define __Pyx_PyUnicode_MAX_CHAR_VALUE(u)   PyUnicode_MAX_CHAR_VALUE(u)
+  #define __Pyx_PyUnicode_KIND(u)         PyUnicode_KIND(u)
+  #define __Pyx_PyUnicode_DATA(u)         PyUnicode_DATA(u)
+  #define __Pyx_PyUnicode_READ(k, d, i)   PyUnicode_READ(k, d, i)
+  #define __Pyx_PyUnicode_WRITE(k, d, i, ch)  PyUnicode_WRITE(k, d, i, ch)
+  #if PY_VERSION_HEX >= 0x030C0000
+    #define __Pyx_PyUnicode_IS_TRUE(u)      (0 != PyUnicode_GET_LENGTH(u))
+  #else
+    #if CYTHON_COMPILING_IN_CPYTHON && PY_VERSION_HEX >= 0x03090000
+    #define __Pyx_PyUnicode_IS_TRUE(u)      (0 != (likely(PyUnicode_IS_READY(u)) ? PyUnicode_GET_LENGTH(u) : ((PyCompactUnicodeObject *)(u))->wstr_length))
+    #else
+    #define __Pyx_PyUnicode_IS_TRUE(u)      (0 != (likely(PyUnicode_IS_READY(u)) ? PyUnicode_GET_LENGTH(u) : PyUnicode_GET_SIZE(u)))
+    #endif
+  #endif
+#else
+  #define CYTHON_PEP393_ENABLED 0
+  #define PyUnicode_1BYTE_KIND  1
+  #define PyUnicode_2BYTE_KIND  2
+  #define PyUnicode_4BYTE_KIND  4
+  #define __Pyx_PyUnicode_READY(op)       (0)
+  #define __Pyx_PyUnicode_GET_LENGTH(u)   PyUnicode_GET_SIZE(u)
+  #define __Pyx_PyUnicode_READ_CHAR(u, i) ((Py_UCS4)(PyUnicode_AS_UNICODE(u)[i]))
+  #define __Pyx_PyUnicode_MAX_CHAR_VALUE(u)   ((sizeof(Py_UNICODE) == 2) ? 65535 : 1114111)
+  #define __Pyx_PyUnicode_KIND(u)         (sizeof(Py_UNICODE))
+  #define __Pyx_PyUnicode_DATA(u)         ((void*)PyUnicode_AS_UNICODE(u))
+  #define __Pyx_PyUnicode_READ(k, d, i)   ((void)(k), (Py_UCS4)(((Py_UNICODE*)d)[i]))
+  #define __Pyx_PyUnicode_WRITE(k, d, i, ch)  (((void)(k)), ((Py_UNICODE*)d)[i] = ch)
+  #define __Pyx_PyUnicode_IS_TRUE(u)      (0 != PyUnicode_GET_SIZE(u))
+#endif
+#if CYTHON_COMPILING_IN_PYPY
+  #define __Pyx_PyUnicode_Concat(a, b)      PyNumber_Add(a, b)
+  #define __Pyx_PyUnicode_ConcatSafe(a, b)  PyNumber_Add(a, b)
+#else
+  #define __Pyx_PyUnicode_Concat(a, b)      PyUnicode_Concat(a, b)
+  #define __Pyx_PyUnicode_ConcatSafe(a, b)  ((unlikely((a) == Py_None) || unlikely((b) == Py_None)) ?\
+      PyNumber_Add(a, b) : __Pyx_PyUnicode_Concat(a, b))
+#endif
+#if CYTHON_COMPILING_IN_PYPY && !defined(PyUnicode_Contains)
+  #define PyUnicode_Contains(u, s)  PySequence_Contains(u, s)
+#endif
+#if CYTHON_COMPILING_IN_PYPY && !defined(PyByteArray_Check)
+  #define PyByteArray_Check(obj)  PyObject_TypeCheck(obj, &PyByteArray_Type)
+#endif
+#if CYTHON_COMPILING_IN_PYPY && !defined(PyObject_Format)
+  #define PyObject_Format(obj, fmt)  PyObject_CallMethod(obj, "__format__", "O", fmt)
+#endif
+#define __Pyx_PyString_FormatSafe(a, b)   ((unlikely((a) == Py_None || (PyString_Check(b) && !PyString_CheckExact(b)))) ? PyNumber_Remainder(a, b) : __Pyx_PyString_Format(a, b))
+#define __Pyx_PyUnicode_FormatSafe(a, b)  ((unlikely((a) == Py_None || (PyUnicode_Check(b) && !PyUnicode_CheckExact(b)))) ? PyNumber_Remainder(a, b) : PyUnicode_Format(a, b))
+#if PY_MAJOR_VERSION >= 3
+  #define __Pyx_PyString_Format(a, b)  PyUnicode_Format(a, b)
+#else
+  #define __Pyx_PyString_Format(a, b)  PyString_Format(a, b)
+#endif
+#if PY_MAJOR_VERSION < 3 && !defined(PyObject_ASCII)
+  #define PyObject_ASCII(o)            PyObject_Repr(o)
+#endif
+#if PY_MAJOR_VERSION >= 3
+  #define PyBaseString_Type            PyUnicode_Type
+  #define PyStringObject               PyUnicodeObject
+  #define PyString_Type                PyUnicode_Type
+  #define PyString_Check               PyUnicode_Check
+  #define PyString_CheckExact          PyUnicode_CheckExact
+#ifndef PyObject_Unicode
+  #define PyObject_Unicode             PyObject_Str
+#endif
+#endif
+#if PY_MAJOR_VERSION >= 3
+  #define __Pyx_PyBaseString_Check(obj) PyUnicode_Check(obj)
+  #define __Pyx_PyBaseString_CheckExact(obj) PyUnicode_CheckExact(obj)
+#else
+  #define __Pyx_PyBaseString_Check(obj) (PyString_Check(obj) || PyUnicode_Check(obj))
+  #define __Pyx_PyBaseString_CheckExact(obj) (PyString_CheckExact(obj) || PyUnicode_CheckExact(obj))
+#endif
+#ifndef PySet_CheckExact
+  #define PySet_CheckExact(obj)        (Py_TYPE(obj) == &PySet_Type)
+#endif
+#if PY_VERSION_HEX >= 0x030900A4
+  #define __Pyx_SET_REFCNT(obj, refcnt) Py_SET_REFCNT(obj, refcnt)
+  #define __Pyx_SET_SIZE(obj, size) Py_SET_SIZE(obj, size)
+#else
+  #define __Pyx_SET_REFCNT(obj, refcnt) Py_REFCNT(obj) = (refcnt)
+  #define __Pyx_SET_SIZE(obj, size) Py_SIZE(obj) = (size)
+#endif
+#if CYTHON_ASSUME_SAFE_MACROS
+  #define __Pyx_PySequence_SIZE(seq)  Py_SIZE(seq)
+#else
+  #define __Pyx_PySequence_SIZE(seq)  PySequence_Size(seq)
+#endif
+#if PY_MAJOR_VERSION >= 3
+  #define PyIntObject                  PyLongObject
+  #define PyInt_Type                   PyLong_Type
+  #define PyInt_Check(op)              PyLong_Check(op)
+  #define PyInt_CheckExact(op)         PyLong_CheckExact(op)
+  #define PyInt_FromString             PyLong_FromString
+  #define PyInt_FromUnicode            PyLong_FromUnicode
+  #define PyInt_FromLong               PyLong_FromLong
+  #define PyInt_FromSize_t             PyLong_FromSize_t
+  #define PyInt_FromSsize_t            PyLong_FromSsize_t
+  #define PyInt_AsLong                 PyLong_AsLong
+  #define PyInt_AS_LONG                PyLong_AS_LONG
+  #define PyInt_AsSsize_t              PyLong_AsSsize_t
+  #define PyInt_AsUnsignedLongMask     PyLong_AsUnsignedLongMask
+  #define PyInt_AsUnsignedLongLongMask PyLong_AsUnsignedLongLongMask
+  #define PyNumber_Int                 PyNumber_Long
+#endif
+#if PY_MAJOR_VERSION >= 3
+  #define PyBoolObject                 PyLongObject
+#endif
+#if PY_MAJOR_VERSION >= 3 && CYTHON_COMPILING_IN_PYPY
+  #ifndef PyUnicode_InternFromString
+    #define PyUnicode_InternFromString(s) PyUnicode_FromString(s)
+  #endif
+#endif
+#if PY_VERSION_HEX < 0x030200A4
+  typedef long Py_hash_t;
+  #define __Pyx_PyInt_FromHash_t PyInt_FromLong
+  #define __Pyx_PyInt_AsHash_t   __Pyx_PyIndex_AsHash_t
+#else
+  #define __Pyx_PyInt_FromHash_t PyInt_FromSsize_t
+  #define __Pyx_PyInt_AsHash_t   __Pyx_PyIndex_AsSsize_t
+#endif
+#if PY_MAJOR_VERSION >= 3
+  #define __Pyx_PyMethod_New(func, self, klass) ((self) ? ((void)(klass), PyMethod_New(func, self)) : __Pyx_NewRef(func))
+#else
+  #define __Pyx_PyMethod_New(func, self, klass) PyMethod_New(func, self, klass)
+#endif
+#if CYTHON_USE_ASYNC_SLOTS
+  #if PY_VERSION_HEX >= 0x030500B1
+    #define __Pyx_PyAsyncMethodsStruct PyAsyncMethods
+    #define __Pyx_PyType_AsAsync(obj) (Py_TYPE(obj)->tp_as_async)
+  #else
+    #define __Pyx_PyType_AsAsync(obj) ((__Pyx_PyAsyncMethodsStruct*) (Py_TYPE(obj)->tp_reserved))
+  #endif
+#else
+  #define __Pyx_PyType_AsAsync(obj) NULL
+#endif
+#ifndef __Pyx_PyAsyncMethodsStruct
+    typedef struct {
+        unaryfunc am_await;
+        unaryfunc am_aiter;
+        unaryfunc am_anext;
+    } __Pyx_PyAsyncMethodsStruct;
+#endif
+
+#if defined(_WIN32) || defined(WIN32) || defined(MS_WINDOWS)
+  #if !defined(_USE_MATH_DEFINES)
+    #define _USE_MATH_DEFINES
+  #endif
+#endif
+#include <math.h>
+#ifdef NAN
+#define __PYX_NAN() ((float) NAN)
+#else
+static CYTHON_INLINE float __PYX_NAN() {
+  float value;
+  memset(&value, 0xFF, sizeof(value));
+  return value;
+}
+#endif
+#if defined(__CYGWIN__) && defined(_LDBL_EQ_DBL)
+#define __Pyx_truncl trunc
+#else
+#define __Pyx_truncl truncl
+#endif
+
+#define __PYX_MARK_ERR_POS(f_index, lineno) \
+    { __pyx_filename = __pyx_f[f_index]; (void)__pyx_filename; __pyx_lineno = lineno; (void)__pyx_lineno; __pyx_clineno = __LINE__; (void)__pyx_clineno; }
+#define __PYX_ERR(f_index, lineno, Ln_error) \
+    { __PYX_MARK_ERR_POS(f_index, lineno) goto Ln_error; }
+
+#ifndef __PYX_EXTERN_C
+  #ifdef __cplusplus
+    #define __PYX_EXTERN_C extern "C"
+  #else
+    #define __PYX_EXTERN_C extern
+  #endif
+#endif
+
+#define __PYX_HAVE__pysph__base__octree_gpu_nnps
+#define __PYX_HAVE_API__pysph__base__octree_gpu_nnps
+/* Early includes */
+#include <string.h>
+#include <stdio.h>
+#include "numpy/arrayobject.h"
+#include "numpy/ndarrayobject.h"
+#include "numpy/ndarraytypes.h"
+#include "numpy/arrayscalars.h"
+#include "numpy/ufuncobject.h"
+
+    /* NumPy API declarations from "numpy/__init__.pxd" */
+    
+#include "ios"
+#include "new"
+#include "stdexcept"
+#include "typeinfo"
+#include <utility>
+
+    #if __cplusplus >= 201103L || (defined(_MSC_VER) && _MSC_VER >= 1600)
+    // move should be defined for these versions of MSVC, but __cplusplus isn't set usefully
+    #include <type_traits>
+
+    namespace cython_std {
+    template <typename T> typename std::remove_reference<T>::type&& move(T& t) noexcept { return std::move(t); }
+    template <typename T> typename std::remove_reference<T>::type&& move(T&& t) noexcept { return std::move(t); }
+    }
+
+    #endif
+    
+#include <map>
+#include <vector>
+#include "math.h"
+#include "limits.h"
+#ifdef _OPENMP
+#include <omp.h>
+#endif /* _OPENMP */
+
+#if defined(PYREX_WITHOUT_ASSERTIONS) && !defined(CYTHON_WITHOUT_ASSERTIONS)
+#define CYTHON_WITHOUT_ASSERTIONS
+#endif
+
+typedef struct {PyObject **p; const char *s; const Py_ssize_t n; const char* encoding;
+                const char is_unicode; const char is_str; const char intern; } __Pyx_StringTabEntry;
+
+#define __PYX_DEFAULT_STRING_ENCODING_IS_ASCII 0
+#define __PYX_DEFAULT_STRING_ENCODING_IS_UTF8 0
+#define __PYX_DEFAULT_STRING_ENCODING_IS_DEFAULT (PY_MAJOR_VERSION >= 3 && __PYX_DEFAULT_STRING_ENCODING_IS_UTF8)
+#define __PYX_DEFAULT_STRING_ENCODING ""
+#define __Pyx_PyObject_FromString __Pyx_PyBytes_FromString
+#define __Pyx_PyObject_FromStringAndSize __Pyx_PyBytes_FromStringAndSize
+#define __Pyx_uchar_cast(c) ((unsigned char)c)
+#define __Pyx_long_cast(x) ((long)x)
+#define __Pyx_fits_Py_ssize_t(v, type, is_signed)  (\
+    (sizeof(type) < sizeof(Py_ssize_t))  ||\
+    (sizeof(type) > sizeof(Py_ssize_t) &&\
+          likely(v < (type)PY_SSIZE_T_MAX ||\
+                 v == (type)PY_SSIZE_T_MAX)  &&\
+          (!is_signed || likely(v > (type)PY_SSIZE_T_MIN ||\
+                                v == (type)PY_SSIZE_T_MIN)))  ||\
+    (sizeof(type) == sizeof(Py_ssize_t) &&\
+          (is_signed || likely(v < (type)PY_SSIZE_T_MAX ||\
+                               v == (type)PY_SSIZE_T_MAX)))  )
+static CYTHON_INLINE int __Pyx_is_valid_index(Py_ssize_t i, Py_ssize_t limit) {
+    return (size_t) i < (size_t) limit;
+}
+#if defined (__cplusplus) && __cplusplus >= 201103L
+    #include <cstdlib>
+    #define __Pyx_sst_abs(value) std::abs(value)
+#elif SIZEOF_INT >= SIZEOF_SIZE_T
+    #define __Pyx_sst_abs(value) abs(value)
+#elif SIZEOF_LONG >= SIZEOF_SIZE_T
+    #define __Pyx_sst_abs(value) labs(value)
+#elif defined (_MSC_VER)
+    #define __Pyx_sst_abs(value) ((Py_ssize_t)_abs64(value))
+#elif defined (__STDC_VERSION__) && __STDC_VERSION__ >= 199901L
+    #define __Pyx_sst_abs(value) llabs(value)
+#elif defined (__GNUC__)
+    #define __Pyx_sst_abs(value) __builtin_llabs(value)
+#else
+    #define __Pyx_sst_abs(value) ((value<0) ? -value : value)
+#endif
+static CYTHON_INLINE const char* __Pyx_PyObject_AsString(PyObject*);
+static CYTHON_INLINE const char* __Pyx_PyObject_AsStringAndSize(PyObject*, Py_ssize_t* length);
+#define __Pyx_PyByteArray_FromString(s) PyByteArray_FromStringAndSize((const char*)s, strlen((const char*)s))
+#define __Pyx_PyByteArray_FromStringAndSize(s, l) PyByteArray_FromStringAndSize((const char*)s, l)
+#define __Pyx_PyBytes_FromString        PyBytes_FromString
+#define __Pyx_PyBytes_FromStringAndSize PyBytes_FromStringAndSize
+static CYTHON_INLINE PyObject* __Pyx_PyUnicode_FromString(const char*);
+#if PY_MAJOR_VERSION < 3
+    #define __Pyx_PyStr_FromString        __Pyx_PyBytes_FromString
+    #define __Pyx_PyStr_FromStringAndSize __Pyx_PyBytes_FromStringAndSize
+#else
+    #define __Pyx_PyStr_FromString        __Pyx_PyUnicode_FromString
+    #define __Pyx_PyStr_FromStringAndSize __Pyx_PyUnicode_FromStringAndSize
+#endif
+#define __Pyx_PyBytes_AsWritableString(s)     ((char*) PyBytes_AS_STRING(s))
+#define __Pyx_PyBytes_AsWritableSString(s)    ((signed char*) PyBytes_AS_STRING(s))
+#define __Pyx_PyBytes_AsWritableUString(s)    ((unsigned char*) PyBytes_AS_STRING(s))
+#define __Pyx_PyBytes_AsString(s)     ((const char*) PyBytes_AS_STRING(s))
+#define __Pyx_PyBytes_AsSString(s)    ((const signed char*) PyBytes_AS_STRING(s))
+#define __Pyx_PyBytes_AsUString(s)    ((const unsigned char*) PyBytes_AS_STRING(s))
+#define __Pyx_PyObject_AsWritableString(s)    ((char*) __Pyx_PyObject_AsString(s))
+#define __Pyx_PyObject_AsWritableSString(s)    ((signed char*) __Pyx_PyObject_AsString(s))
+#define __Pyx_PyObject_AsWritableUString(s)    ((unsigned char*) __Pyx_PyObject_AsString(s))
+#define __Pyx_PyObject_AsSString(s)    ((const signed char*) __Pyx_PyObject_AsString(s))
+#define __Pyx_PyObject_AsUString(s)    ((const unsigned char*) __Pyx_PyObject_AsString(s))
+#define __Pyx_PyObject_FromCString(s)  __Pyx_PyObject_FromString((const char*)s)
+#define __Pyx_PyBytes_FromCString(s)   __Pyx_PyBytes_FromString((const char*)s)
+#define __Pyx_PyByteArray_FromCString(s)   __Pyx_PyByteArray_FromString((const char*)s)
+#define __Pyx_PyStr_FromCString(s)     __Pyx_PyStr_FromString((const char*)s)
+#define __Pyx_PyUnicode_FromCString(s) __Pyx_PyUnicode_FromString((const char*)s)
+static CYTHON_INLINE size_t __Pyx_Py_UNICODE_strlen(const Py_UNICODE *u) {
+    const Py_UNICODE *u_end = u;
+    while (*u_end++) ;
+    return (size_t)(u_end - u - 1);
+}
+#define __Pyx_PyUnicode_FromUnicode(u)       PyUnicode_FromUnicode(u, __Pyx_Py_UNICODE_strlen(u))
+#define __Pyx_PyUnicode_FromUnicodeAndLength PyUnicode_FromUnicode
+#define __Pyx_PyUnicode_AsUnicode            PyUnicode_AsUnicode
+#define __Pyx_NewRef(obj) (Py_INCREF(obj), obj)
+#define __Pyx_Owned_Py_None(b) __Pyx_NewRef(Py_None)
+static CYTHON_INLINE PyObject * __Pyx_PyBool_FromLong(long b);
+static CYTHON_INLINE int __Pyx_PyObject_IsTrue(PyObject*);
+static CYTHON_INLINE int __Pyx_PyObject_IsTrueAndDecref(PyObject*);
+static CYTHON_INLINE PyObject* __Pyx_PyNumber_IntOrLong(PyObject* x);
+#define __Pyx_PySequence_Tuple(obj)\
+    (likely(PyTuple_CheckExact(obj)) ? __Pyx_NewRef(obj) : PySequence_Tuple(obj))
+static CYTHON_INLINE Py_ssize_t __Pyx_PyIndex_AsSsize_t(PyObject*);
+static CYTHON_INLINE PyObject * __Pyx_PyInt_FromSize_t(size_t);
+static CYTHON_INLINE Py_hash_t __Pyx_PyIndex_AsHash_t(PyObject*);
+#if CYTHON_ASSUME_SAFE_MACROS
+#define __pyx_PyFloat_AsDouble(x) (PyFloat_CheckExact(x) ? PyFloat_AS_DOUBLE(x) : PyFloat_AsDouble(x))
+#else
+#define __pyx_PyFloat_AsDouble(x) PyFloat_AsDouble(x)
+#endif
+#define __pyx_PyFloat_AsFloat(x) ((float) __pyx_PyFloat_AsDouble(x))
+#if PY_MAJOR_VERSION >= 3
+#define __Pyx_PyNumber_Int(x) (PyLong_CheckExact(x) ? __Pyx_NewRef(x) : PyNumber_Long(x))
+#else
+#define __Pyx_PyNumber_Int(x) (PyInt_CheckExact(x) ? __Pyx_NewRef(x) : PyNumber_Int(x))
+#endif
+#define __Pyx_PyNumber_Float(x) (PyFloat_CheckExact(x) ? __Pyx_NewRef(x) : PyNumber_Float(x))
+#if PY_MAJOR_VERSION < 3 && __PYX_DEFAULT_STRING_ENCODING_IS_ASCII
+static int __Pyx_sys_getdefaultencoding_not_ascii;
+static int __Pyx_init_sys_getdefaultencoding_params(void) {
+    PyObject* sys;
+    PyObject* default_encoding = NULL;
+    PyObject* ascii_chars_u = NULL;
+    PyObject* ascii_chars_b = NULL;
+    const char* default_encoding_c;
+    sys = PyImport_ImportModule("sys");
+    if (!sys) goto bad;
+    default_encoding = PyObject_CallMethod(sys, (char*) "getdefaultencoding", NULL);
+    Py_DECREF(sys);
+    if (!default_encoding) goto bad;
+    default_encoding_c = PyBytes_AsString(default_encoding);
+    if (!default_encoding_c) goto bad;
+    if (strcmp(default_encoding_c, "ascii") == 0) {
+        __Pyx_sys_getdefaultencoding_not_ascii = 0;
+    } else {
+        char ascii_chars[128];
+        int c;
+        for (c = 0; c < 128; c++) {
+            ascii_chars[c] = c;
+        }
+        __Pyx_sys_getdefaultencoding_not_ascii = 1;
+        ascii_chars_u = PyUnicode_DecodeASCII(ascii_chars, 128, NULL);
+        if (!ascii_chars_u) goto bad;
+        ascii_chars_b = PyUnicode_AsEncodedString(ascii_chars_u, default_encoding_c, NULL);
+        if (!ascii_chars_b || !PyBytes_Check(ascii_chars_b) || memcmp(ascii_chars, PyBytes_AS_STRING(ascii_chars_b), 128) != 0) {
+            PyErr_Format(
+                PyExc_ValueError,
+                "This module compiled with c_string_encoding=ascii, but default encoding '%.200s' is not a superset of ascii.",
+                default_encoding_c);
+            goto bad;
+        }
+        Py_DECREF(ascii_chars_u);
+        Py_DECREF(ascii_chars_b);
+    }
+    Py_DECREF(default_encoding);
+    return 0;
+bad:
+    Py_XDECREF(default_encoding);
+    Py_XDECREF(ascii_chars_u);
+    Py_XDECREF(ascii_chars_b);
+    return -1;
+}
+#endif
+#if __PYX_DEFAULT_STRING_ENCODING_IS_DEFAULT && PY_MAJOR_VERSION >= 3
+#define __Pyx_PyUnicode_FromStringAndSize(c_str, size) PyUnicode_DecodeUTF8(c_str, size, NULL)
+#else
+#define __Pyx_PyUnicode_FromStringAndSize(c_str, size) PyUnicode_Decode(c_str, size, __PYX_DEFAULT_STRING_ENCODING, NULL)
+#if __PYX_DEFAULT_STRING_ENCODING_IS_DEFAULT
+static char* __PYX_DEFAULT_STRING_ENCODING;
+static int __Pyx_init_sys_getdefaultencoding_params(void) {
+    PyObject* sys;
+    PyObject* default_encoding = NULL;
+    char* default_encoding_c;
+    sys = PyImport_ImportModule("sys");
+    if (!sys) goto bad;
+    default_encoding = PyObject_CallMethod(sys, (char*) (const char*) "getdefaultencoding", NULL);
+    Py_DECREF(sys);
+    if (!default_encoding) goto bad;
+    default_encoding_c = PyBytes_AsString(default_encoding);
+    if (!default_encoding_c) goto bad;
+    __PYX_DEFAULT_STRING_ENCODING = (char*) malloc(strlen(default_encoding_c) + 1);
+    if (!__PYX_DEFAULT_STRING_ENCODING) goto bad;
+    strcpy(__PYX_DEFAULT_STRING_ENCODING, default_encoding_c);
+    Py_DECREF(default_encoding);
+    return 0;
+bad:
+    Py_XDECREF(default_encoding);
+    return -1;
+}
+#endif
+#endif
+
+
+/* Test for GCC > 2.95 */
+#if defined(__GNUC__)     && (__GNUC__ > 2 || (__GNUC__ == 2 && (__GNUC_MINOR__ > 95)))
+  #define likely(x)   __builtin_expect(!!(x), 1)
+  #define unlikely(x) __builtin_expect(!!(x), 0)
+#else /* !__GNUC__ or GCC < 2.95 */
+  #define likely(x)   (x)
+  #define unlikely(x) (x)
+#endif /* __GNUC__ */
+static CYTHON_INLINE void __Pyx_pretend_to_initialize(void* ptr) { (void)ptr; }
+
+static PyObject *__pyx_m = NULL;
+static PyObject *__pyx_d;
+static PyObject *__pyx_b;
+static PyObject *__pyx_cython_runtime = NULL;
+static PyObject *__pyx_empty_tuple;
+static PyObject *__pyx_empty_bytes;
+static PyObject *__pyx_empty_unicode;
+static int __pyx_lineno;
+static int __pyx_clineno = 0;
+static const char * __pyx_cfilenm= __FILE__;
+static const char *__pyx_filename;
+
+/* Header.proto */
+#if !defined(CYTHON_CCOMPLEX)
+  #if defined(__cplusplus)
+    #define CYTHON_CCOMPLEX 1
+  #elif (defined(_Complex_I) && !defined(_MSC_VER))
+    #define CYTHON_CCOMPLEX 1
+  #else
+    #define CYTHON_CCOMPLEX 0
+  #endif
+#endif
+#if CYTHON_CCOMPLEX
+  #ifdef __cplusplus
+    #include <complex>
+  #else
+    #include <complex.h>
+  #endif
+#endif
+#if CYTHON_CCOMPLEX && !defined(__cplusplus) && defined(__sun__) && defined(__GNUC__)
+  #undef _Complex_I
+  #define _Complex_I 1.0fj
+#endif
+
+
+static const char *__pyx_f[] = {
+  "pysph/base/octree_gpu_nnps.pyx",
+  "pysph/base/octree_gpu_nnps.pxd",
+  "stringsource",
+  "__init__.pxd",
+  "pysph/base/point.pxd",
+  "type.pxd",
+  "carray.pxd",
+  "pysph/base/particle_array.pxd",
+  "pysph/base/nnps_base.pxd",
+  "pysph/base/gpu_nnps_base.pxd",
+};
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":688
+ * # in Cython to enable them only on the right systems.
+ * 
+ * ctypedef npy_int8       int8_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_int16      int16_t
+ * ctypedef npy_int32      int32_t
+ */
+typedef npy_int8 __pyx_t_5numpy_int8_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":689
+ * 
+ * ctypedef npy_int8       int8_t
+ * ctypedef npy_int16      int16_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_int32      int32_t
+ * ctypedef npy_int64      int64_t
+ */
+typedef npy_int16 __pyx_t_5numpy_int16_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":690
+ * ctypedef npy_int8       int8_t
+ * ctypedef npy_int16      int16_t
+ * ctypedef npy_int32      int32_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_int64      int64_t
+ * #ctypedef npy_int96      int96_t
+ */
+typedef npy_int32 __pyx_t_5numpy_int32_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":691
+ * ctypedef npy_int16      int16_t
+ * ctypedef npy_int32      int32_t
+ * ctypedef npy_int64      int64_t             # <<<<<<<<<<<<<<
+ * #ctypedef npy_int96      int96_t
+ * #ctypedef npy_int128     int128_t
+ */
+typedef npy_int64 __pyx_t_5numpy_int64_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":695
+ * #ctypedef npy_int128     int128_t
+ * 
+ * ctypedef npy_uint8      uint8_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_uint16     uint16_t
+ * ctypedef npy_uint32     uint32_t
+ */
+typedef npy_uint8 __pyx_t_5numpy_uint8_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":696
+ * 
+ * ctypedef npy_uint8      uint8_t
+ * ctypedef npy_uint16     uint16_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_uint32     uint32_t
+ * ctypedef npy_uint64     uint64_t
+ */
+typedef npy_uint16 __pyx_t_5numpy_uint16_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":697
+ * ctypedef npy_uint8      uint8_t
+ * ctypedef npy_uint16     uint16_t
+ * ctypedef npy_uint32     uint32_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_uint64     uint64_t
+ * #ctypedef npy_uint96     uint96_t
+ */
+typedef npy_uint32 __pyx_t_5numpy_uint32_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":698
+ * ctypedef npy_uint16     uint16_t
+ * ctypedef npy_uint32     uint32_t
+ * ctypedef npy_uint64     uint64_t             # <<<<<<<<<<<<<<
+ * #ctypedef npy_uint96     uint96_t
+ * #ctypedef npy_uint128    uint128_t
+ */
+typedef npy_uint64 __pyx_t_5numpy_uint64_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":702
+ * #ctypedef npy_uint128    uint128_t
+ * 
+ * ctypedef npy_float32    float32_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_float64    float64_t
+ * #ctypedef npy_float80    float80_t
+ */
+typedef npy_float32 __pyx_t_5numpy_float32_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":703
+ * 
+ * ctypedef npy_float32    float32_t
+ * ctypedef npy_float64    float64_t             # <<<<<<<<<<<<<<
+ * #ctypedef npy_float80    float80_t
+ * #ctypedef npy_float128   float128_t
+ */
+typedef npy_float64 __pyx_t_5numpy_float64_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":712
+ * # The int types are mapped a bit surprising --
+ * # numpy.int corresponds to 'l' and numpy.long to 'q'
+ * ctypedef npy_long       int_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_longlong   longlong_t
+ * 
+ */
+typedef npy_long __pyx_t_5numpy_int_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":713
+ * # numpy.int corresponds to 'l' and numpy.long to 'q'
+ * ctypedef npy_long       int_t
+ * ctypedef npy_longlong   longlong_t             # <<<<<<<<<<<<<<
+ * 
+ * ctypedef npy_ulong      uint_t
+ */
+typedef npy_longlong __pyx_t_5numpy_longlong_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":715
+ * ctypedef npy_longlong   longlong_t
+ * 
+ * ctypedef npy_ulong      uint_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_ulonglong  ulonglong_t
+ * 
+ */
+typedef npy_ulong __pyx_t_5numpy_uint_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":716
+ * 
+ * ctypedef npy_ulong      uint_t
+ * ctypedef npy_ulonglong  ulonglong_t             # <<<<<<<<<<<<<<
+ * 
+ * ctypedef npy_intp       intp_t
+ */
+typedef npy_ulonglong __pyx_t_5numpy_ulonglong_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":718
+ * ctypedef npy_ulonglong  ulonglong_t
+ * 
+ * ctypedef npy_intp       intp_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_uintp      uintp_t
+ * 
+ */
+typedef npy_intp __pyx_t_5numpy_intp_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":719
+ * 
+ * ctypedef npy_intp       intp_t
+ * ctypedef npy_uintp      uintp_t             # <<<<<<<<<<<<<<
+ * 
+ * ctypedef npy_double     float_t
+ */
+typedef npy_uintp __pyx_t_5numpy_uintp_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":721
+ * ctypedef npy_uintp      uintp_t
+ * 
+ * ctypedef npy_double     float_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_double     double_t
+ * ctypedef npy_longdouble longdouble_t
+ */
+typedef npy_double __pyx_t_5numpy_float_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":722
+ * 
+ * ctypedef npy_double     float_t
+ * ctypedef npy_double     double_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_longdouble longdouble_t
+ * 
+ */
+typedef npy_double __pyx_t_5numpy_double_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":723
+ * ctypedef npy_double     float_t
+ * ctypedef npy_double     double_t
+ * ctypedef npy_longdouble longdouble_t             # <<<<<<<<<<<<<<
+ * 
+ * ctypedef npy_cfloat      cfloat_t
+ */
+typedef npy_longdouble __pyx_t_5numpy_longdouble_t;
+
+/* "pysph/base/nnps_base.pxd":30
+ * 
+ * # ZOLTAN ID TYPE AND PTR
+ * ctypedef unsigned int ZOLTAN_ID_TYPE             # <<<<<<<<<<<<<<
+ * ctypedef unsigned int* ZOLTAN_ID_PTR
+ * 
+ */
+typedef unsigned int __pyx_t_5pysph_4base_9nnps_base_ZOLTAN_ID_TYPE;
+/* Declarations.proto */
+#if CYTHON_CCOMPLEX
+  #ifdef __cplusplus
+    typedef ::std::complex< float > __pyx_t_float_complex;
+  #else
+    typedef float _Complex __pyx_t_float_complex;
+  #endif
+#else
+    typedef struct { float real, imag; } __pyx_t_float_complex;
+#endif
+static CYTHON_INLINE __pyx_t_float_complex __pyx_t_float_complex_from_parts(float, float);
+
+/* Declarations.proto */
+#if CYTHON_CCOMPLEX
+  #ifdef __cplusplus
+    typedef ::std::complex< double > __pyx_t_double_complex;
+  #else
+    typedef double _Complex __pyx_t_double_complex;
+  #endif
+#else
+    typedef struct { double real, imag; } __pyx_t_double_complex;
+#endif
+static CYTHON_INLINE __pyx_t_double_complex __pyx_t_double_complex_from_parts(double, double);
+
+
+/*--- Type declarations ---*/
+struct __pyx_obj_7cyarray_6carray_BaseArrayIter;
+struct __pyx_obj_7cyarray_6carray_BaseArray;
+struct __pyx_obj_7cyarray_6carray_IntArray;
+struct __pyx_obj_7cyarray_6carray_UIntArray;
+struct __pyx_obj_7cyarray_6carray_LongArray;
+struct __pyx_obj_7cyarray_6carray_FloatArray;
+struct __pyx_obj_7cyarray_6carray_DoubleArray;
+struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray;
+struct __pyx_obj_5pysph_4base_5point_Point;
+struct __pyx_obj_5pysph_4base_5point_IntPoint;
+struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper;
+struct __pyx_obj_5pysph_4base_9nnps_base_DomainManager;
+struct __pyx_obj_5pysph_4base_9nnps_base_DomainManagerBase;
+struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager;
+struct __pyx_obj_5pysph_4base_9nnps_base_Cell;
+struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache;
+struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase;
+struct __pyx_obj_5pysph_4base_9nnps_base_NNPS;
+struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache;
+struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS;
+struct __pyx_obj_5pysph_4base_13gpu_nnps_base_BruteForceNNPS;
+struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS;
+struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":725
+ * ctypedef npy_longdouble longdouble_t
+ * 
+ * ctypedef npy_cfloat      cfloat_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_cdouble     cdouble_t
+ * ctypedef npy_clongdouble clongdouble_t
+ */
+typedef npy_cfloat __pyx_t_5numpy_cfloat_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":726
+ * 
+ * ctypedef npy_cfloat      cfloat_t
+ * ctypedef npy_cdouble     cdouble_t             # <<<<<<<<<<<<<<
+ * ctypedef npy_clongdouble clongdouble_t
+ * 
+ */
+typedef npy_cdouble __pyx_t_5numpy_cdouble_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":727
+ * ctypedef npy_cfloat      cfloat_t
+ * ctypedef npy_cdouble     cdouble_t
+ * ctypedef npy_clongdouble clongdouble_t             # <<<<<<<<<<<<<<
+ * 
+ * ctypedef npy_cdouble     complex_t
+ */
+typedef npy_clongdouble __pyx_t_5numpy_clongdouble_t;
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":729
+ * ctypedef npy_clongdouble clongdouble_t
+ * 
+ * ctypedef npy_cdouble     complex_t             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline object PyArray_MultiIterNew1(a):
+ */
+typedef npy_cdouble __pyx_t_5numpy_complex_t;
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_c_align_array;
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_remove;
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_align_array;
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_copy_values;
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_copy_subset;
+struct __pyx_opt_args_7cyarray_6carray_8IntArray_c_align_array;
+struct __pyx_opt_args_7cyarray_6carray_8IntArray_remove;
+struct __pyx_opt_args_7cyarray_6carray_9UIntArray_c_align_array;
+struct __pyx_opt_args_7cyarray_6carray_9UIntArray_remove;
+struct __pyx_opt_args_7cyarray_6carray_9LongArray_c_align_array;
+struct __pyx_opt_args_7cyarray_6carray_9LongArray_remove;
+struct __pyx_opt_args_7cyarray_6carray_10FloatArray_c_align_array;
+struct __pyx_opt_args_7cyarray_6carray_10FloatArray_remove;
+struct __pyx_opt_args_7cyarray_6carray_11DoubleArray_c_align_array;
+struct __pyx_opt_args_7cyarray_6carray_11DoubleArray_remove;
+
+/* "cyarray/carray.pxd":33
+ *     cdef np.ndarray _npy_array
+ * 
+ *     cdef void c_align_array(self, LongArray new_indices, int stride=*) noexcept nogil             # <<<<<<<<<<<<<<
+ *     cdef void c_reserve(self, long size) noexcept nogil
+ *     cdef void c_reset(self) noexcept nogil
+ */
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_c_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":44
+ *     cpdef set_data(self, np.ndarray)
+ *     cpdef squeeze(self)
+ *     cpdef remove(self, np.ndarray index_list, bint input_sorted=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef extend(self, np.ndarray in_array)
+ *     cpdef reset(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_remove {
+  int __pyx_n;
+  int input_sorted;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":48
+ *     cpdef reset(self)
+ * 
+ *     cpdef align_array(self, LongArray new_indices, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef str get_c_type(self)
+ *     cpdef copy_values(self, LongArray indices, BaseArray dest, int stride=*, int start=*)
+ */
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":50
+ *     cpdef align_array(self, LongArray new_indices, int stride=*)
+ *     cpdef str get_c_type(self)
+ *     cpdef copy_values(self, LongArray indices, BaseArray dest, int stride=*, int start=*)             # <<<<<<<<<<<<<<
+ *     cpdef copy_subset(self, BaseArray source, long start_index=*, long end_index=*, int stride=*)
+ *     cpdef update_min_max(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_copy_values {
+  int __pyx_n;
+  int stride;
+  int start;
+};
+
+/* "cyarray/carray.pxd":51
+ *     cpdef str get_c_type(self)
+ *     cpdef copy_values(self, LongArray indices, BaseArray dest, int stride=*, int start=*)
+ *     cpdef copy_subset(self, BaseArray source, long start_index=*, long end_index=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef update_min_max(self)
+ * 
+ */
+struct __pyx_opt_args_7cyarray_6carray_9BaseArray_copy_subset {
+  int __pyx_n;
+  long start_index;
+  long end_index;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":65
+ * 
+ *     cdef _setup_npy_array(self)
+ *     cdef void c_align_array(self, LongArray new_indices, int stride=*) noexcept nogil             # <<<<<<<<<<<<<<
+ *     cdef void c_append(self, int value) noexcept nogil
+ *     cdef void c_set_view(self, int *array, long length) noexcept nogil
+ */
+struct __pyx_opt_args_7cyarray_6carray_8IntArray_c_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":79
+ *     cpdef set_view(self, IntArray, long start, long end)
+ *     cpdef squeeze(self)
+ *     cpdef remove(self, np.ndarray index_list, bint input_sorted=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef extend(self, np.ndarray in_array)
+ *     cpdef reset(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_8IntArray_remove {
+  int __pyx_n;
+  int input_sorted;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":95
+ * 
+ *     cdef _setup_npy_array(self)
+ *     cdef void c_align_array(self, LongArray new_indices, int stride=*) noexcept nogil             # <<<<<<<<<<<<<<
+ *     cdef void c_append(self, unsigned int value) noexcept nogil
+ *     cdef void c_set_view(self, unsigned int *array, long length) noexcept nogil
+ */
+struct __pyx_opt_args_7cyarray_6carray_9UIntArray_c_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":109
+ *     cpdef set_view(self, UIntArray, long start, long end)
+ *     cpdef squeeze(self)
+ *     cpdef remove(self, np.ndarray index_list, bint input_sorted=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef extend(self, np.ndarray in_array)
+ *     cpdef reset(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_9UIntArray_remove {
+  int __pyx_n;
+  int input_sorted;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":125
+ * 
+ *     cdef _setup_npy_array(self)
+ *     cdef void c_align_array(self, LongArray new_indices, int stride=*) noexcept nogil             # <<<<<<<<<<<<<<
+ *     cdef void c_append(self, long value) noexcept nogil
+ *     cdef void c_set_view(self, long *array, long length) noexcept nogil
+ */
+struct __pyx_opt_args_7cyarray_6carray_9LongArray_c_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":139
+ *     cpdef set_view(self, LongArray, long start, long end)
+ *     cpdef squeeze(self)
+ *     cpdef remove(self, np.ndarray index_list, bint input_sorted=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef extend(self, np.ndarray in_array)
+ *     cpdef reset(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_9LongArray_remove {
+  int __pyx_n;
+  int input_sorted;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":155
+ * 
+ *     cdef _setup_npy_array(self)
+ *     cdef void c_align_array(self, LongArray new_indices, int stride=*) noexcept nogil             # <<<<<<<<<<<<<<
+ *     cdef void c_append(self, float value) noexcept nogil
+ *     cdef void c_set_view(self, float *array, long length) noexcept nogil
+ */
+struct __pyx_opt_args_7cyarray_6carray_10FloatArray_c_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":169
+ *     cpdef set_view(self, FloatArray, long start, long end)
+ *     cpdef squeeze(self)
+ *     cpdef remove(self, np.ndarray index_list, bint input_sorted=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef extend(self, np.ndarray in_array)
+ *     cpdef reset(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_10FloatArray_remove {
+  int __pyx_n;
+  int input_sorted;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":185
+ * 
+ *     cdef _setup_npy_array(self)
+ *     cdef void c_align_array(self, LongArray new_indices, int stride=*) noexcept nogil             # <<<<<<<<<<<<<<
+ *     cdef void c_append(self, double value) noexcept nogil
+ *     cdef void c_set_view(self, double *array, long length) noexcept nogil
+ */
+struct __pyx_opt_args_7cyarray_6carray_11DoubleArray_c_align_array {
+  int __pyx_n;
+  int stride;
+};
+
+/* "cyarray/carray.pxd":199
+ *     cpdef set_view(self, DoubleArray, long start, long end)
+ *     cpdef squeeze(self)
+ *     cpdef remove(self, np.ndarray index_list, bint input_sorted=*, int stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef extend(self, np.ndarray in_array)
+ *     cpdef reset(self)
+ */
+struct __pyx_opt_args_7cyarray_6carray_11DoubleArray_remove {
+  int __pyx_n;
+  int input_sorted;
+  int stride;
+};
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_get_number_of_particles;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_remove_particles;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_remove_tagged_particles;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_add_property;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_append_parray;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_empty_clone;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_ensure_properties;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_extract_particles;
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_copy_properties;
+
+/* "particle_array.pxd":21
+ * # etc. Cython modules can directly use the enum name.
+ * 
+ * cdef enum ParticleTag:             # <<<<<<<<<<<<<<
+ *     Local = 0
+ *     Remote
+ */
+enum __pyx_t_5pysph_4base_14particle_array_ParticleTag {
+  __pyx_e_5pysph_4base_14particle_array_Local = 0,
+  __pyx_e_5pysph_4base_14particle_array_Remote,
+  __pyx_e_5pysph_4base_14particle_array_Ghost
+};
+
+/* "particle_array.pxd":89
+ *     cpdef BaseArray get_carray(self, str prop)
+ * 
+ *     cpdef int get_number_of_particles(self, bint real=*)             # <<<<<<<<<<<<<<
+ *     cpdef remove_particles(self, indices, align=*)
+ *     cpdef remove_tagged_particles(self, int tag, bint align=*)
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_get_number_of_particles {
+  int __pyx_n;
+  int real;
+};
+
+/* "particle_array.pxd":90
+ * 
+ *     cpdef int get_number_of_particles(self, bint real=*)
+ *     cpdef remove_particles(self, indices, align=*)             # <<<<<<<<<<<<<<
+ *     cpdef remove_tagged_particles(self, int tag, bint align=*)
+ * 
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_remove_particles {
+  int __pyx_n;
+  PyObject *align;
+};
+
+/* "particle_array.pxd":91
+ *     cpdef int get_number_of_particles(self, bint real=*)
+ *     cpdef remove_particles(self, indices, align=*)
+ *     cpdef remove_tagged_particles(self, int tag, bint align=*)             # <<<<<<<<<<<<<<
+ * 
+ *     # function to add any property
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_remove_tagged_particles {
+  int __pyx_n;
+  int align;
+};
+
+/* "particle_array.pxd":95
+ *     # function to add any property
+ *     cpdef add_constant(self, str name, data)
+ *     cpdef add_property(self, str name, str type=*, default=*, data=*, stride=*)             # <<<<<<<<<<<<<<
+ *     cpdef remove_property(self, str prop_name)
+ * 
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_add_property {
+  int __pyx_n;
+  PyObject *type;
+  PyObject *__pyx_default;
+  PyObject *data;
+  PyObject *stride;
+};
+
+/* "particle_array.pxd":107
+ * 
+ *     # add particles from the parray to self.
+ *     cpdef int append_parray(self, ParticleArray parray, bint align=*,             # <<<<<<<<<<<<<<
+ *             bint update_constants=*) except -1
+ * 
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_append_parray {
+  int __pyx_n;
+  int align;
+  int update_constants;
+};
+
+/* "particle_array.pxd":110
+ *             bint update_constants=*) except -1
+ * 
+ *     cpdef ParticleArray empty_clone(self, props=*)             # <<<<<<<<<<<<<<
+ * 
+ *     cpdef ensure_properties(self, ParticleArray src, list props=*)
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_empty_clone {
+  int __pyx_n;
+  PyObject *props;
+};
+
+/* "particle_array.pxd":112
+ *     cpdef ParticleArray empty_clone(self, props=*)
+ * 
+ *     cpdef ensure_properties(self, ParticleArray src, list props=*)             # <<<<<<<<<<<<<<
+ * 
+ *     # create a new particle array with the given particles indices and the
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_ensure_properties {
+  int __pyx_n;
+  PyObject *props;
+};
+
+/* "particle_array.pxd":116
+ *     # create a new particle array with the given particles indices and the
+ *     # properties.
+ *     cpdef ParticleArray extract_particles(self, indices, ParticleArray dest_array=*,             # <<<<<<<<<<<<<<
+ *                             bint align=*, list props=*)
+ * 
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_extract_particles {
+  int __pyx_n;
+  struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *dest_array;
+  int align;
+  PyObject *props;
+};
+
+/* "particle_array.pxd":122
+ *     cpdef set_tag(self, long tag_value, LongArray indices)
+ * 
+ *     cpdef copy_properties(self, ParticleArray source, long start_index=*, long             # <<<<<<<<<<<<<<
+ *                           end_index=*)
+ * 
+ */
+struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_copy_properties {
+  int __pyx_n;
+  long start_index;
+  long end_index;
+};
+struct __pyx_t_5pysph_4base_5point_cPoint;
+struct __pyx_t_5pysph_4base_5point_cIntPoint;
+
+/* "point.pxd":12
+ *     cdef int INT_MAX
+ * 
+ * cdef struct cPoint:             # <<<<<<<<<<<<<<
+ *     double x, y, z
+ * 
+ */
+struct __pyx_t_5pysph_4base_5point_cPoint {
+  double x;
+  double y;
+  double z;
+};
+
+/* "point.pxd":99
+ * 
+ * 
+ * cdef struct cIntPoint:             # <<<<<<<<<<<<<<
+ *     int x, y, z
+ * 
+ */
+struct __pyx_t_5pysph_4base_5point_cIntPoint {
+  int x;
+  int y;
+  int z;
+};
+struct __pyx_opt_args_5pysph_4base_9nnps_base_arange_uint;
+struct __pyx_opt_args_5pysph_4base_9nnps_base_16CPUDomainManager__add_to_array;
+
+/* "pysph/base/nnps_base.pxd":31
+ * # ZOLTAN ID TYPE AND PTR
+ * ctypedef unsigned int ZOLTAN_ID_TYPE
+ * ctypedef unsigned int* ZOLTAN_ID_PTR             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double norm2(double x, double y, double z) nogil:
+ */
+typedef unsigned int *__pyx_t_5pysph_4base_9nnps_base_ZOLTAN_ID_PTR;
+
+/* "pysph/base/nnps_base.pxd":137
+ * cdef cIntPoint find_cell_id(cPoint pnt, double cell_size)
+ * 
+ * cpdef UIntArray arange_uint(int start, int stop=*)             # <<<<<<<<<<<<<<
+ * 
+ * # Basic particle array wrapper used for NNPS
+ */
+struct __pyx_opt_args_5pysph_4base_9nnps_base_arange_uint {
+  int __pyx_n;
+  int stop;
+};
+
+/* "pysph/base/nnps_base.pxd":200
+ * 
+ *     # Convenience function to add a value to a carray
+ *     cdef _add_to_array(self, DoubleArray arr, double disp, int start=*)             # <<<<<<<<<<<<<<
+ * 
+ *     # Convenience function to multiply a value to a carray
+ */
+struct __pyx_opt_args_5pysph_4base_9nnps_base_16CPUDomainManager__add_to_array {
+  int __pyx_n;
+  int start;
+};
+
+/* "cyarray/carray.pxd":24
+ * cdef class LongArray(BaseArray)
+ * 
+ * cdef class BaseArrayIter:             # <<<<<<<<<<<<<<
+ *     cdef BaseArray arr
+ *     cdef long i
+ */
+struct __pyx_obj_7cyarray_6carray_BaseArrayIter {
+  PyObject_HEAD
+  struct __pyx_obj_7cyarray_6carray_BaseArray *arr;
+  long i;
+};
+
+
+/* "cyarray/carray.pxd":21
+ * 
+ * # forward declaration
+ * cdef class BaseArray             # <<<<<<<<<<<<<<
+ * cdef class LongArray(BaseArray)
+ * 
+ */
+struct __pyx_obj_7cyarray_6carray_BaseArray {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_7cyarray_6carray_BaseArray *__pyx_vtab;
+  long length;
+  long alloc;
+  PyArrayObject *_npy_array;
+};
+
+
+/* "cyarray/carray.pxd":57
+ * # `IntArray` class.
+ * # ###########################################################################
+ * cdef class IntArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of ints. """
+ *     cdef int *data
+ */
+struct __pyx_obj_7cyarray_6carray_IntArray {
+  struct __pyx_obj_7cyarray_6carray_BaseArray __pyx_base;
+  int *data;
+  int *_old_data;
+  int minimum;
+  int maximum;
+  struct __pyx_obj_7cyarray_6carray_IntArray *_parent;
+};
+
+
+/* "cyarray/carray.pxd":87
+ * # `UIntArray` class.
+ * # ###########################################################################
+ * cdef class UIntArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of unsigned ints. """
+ *     cdef unsigned int *data
+ */
+struct __pyx_obj_7cyarray_6carray_UIntArray {
+  struct __pyx_obj_7cyarray_6carray_BaseArray __pyx_base;
+  unsigned int *data;
+  unsigned int *_old_data;
+  unsigned int minimum;
+  unsigned int maximum;
+  struct __pyx_obj_7cyarray_6carray_UIntArray *_parent;
+};
+
+
+/* "cyarray/carray.pxd":22
+ * # forward declaration
+ * cdef class BaseArray
+ * cdef class LongArray(BaseArray)             # <<<<<<<<<<<<<<
+ * 
+ * cdef class BaseArrayIter:
+ */
+struct __pyx_obj_7cyarray_6carray_LongArray {
+  struct __pyx_obj_7cyarray_6carray_BaseArray __pyx_base;
+  long *data;
+  long *_old_data;
+  long minimum;
+  long maximum;
+  struct __pyx_obj_7cyarray_6carray_LongArray *_parent;
+};
+
+
+/* "cyarray/carray.pxd":147
+ * # `FloatArray` class.
+ * # ###########################################################################
+ * cdef class FloatArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of floats. """
+ *     cdef float *data
+ */
+struct __pyx_obj_7cyarray_6carray_FloatArray {
+  struct __pyx_obj_7cyarray_6carray_BaseArray __pyx_base;
+  float *data;
+  float *_old_data;
+  float minimum;
+  float maximum;
+  struct __pyx_obj_7cyarray_6carray_FloatArray *_parent;
+};
+
+
+/* "cyarray/carray.pxd":177
+ * # `DoubleArray` class.
+ * # ###########################################################################
+ * cdef class DoubleArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of doubles. """
+ *     cdef double *data
+ */
+struct __pyx_obj_7cyarray_6carray_DoubleArray {
+  struct __pyx_obj_7cyarray_6carray_BaseArray __pyx_base;
+  double *data;
+  double *_old_data;
+  double minimum;
+  double maximum;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *_parent;
+};
+
+
+/* "particle_array.pxd":34
+ * cpdef int get_ghost_tag()
+ * 
+ * cdef class ParticleArray:             # <<<<<<<<<<<<<<
+ *     """
+ *     Maintains various properties for particles.
+ */
+struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_14particle_array_ParticleArray *__pyx_vtab;
+  PyObject *backend;
+  PyObject *properties;
+  PyObject *property_arrays;
+  PyObject *stride;
+  PyObject *output_property_arrays;
+  PyObject *constants;
+  PyObject *default_values;
+  PyObject *name;
+  long num_real_particles;
+  PyObject *lb_props;
+  PyObject *gpu;
+  double time;
+};
+
+
+/* "point.pxd":51
+ *     return cPoint_new(p.x/norm, p.y/norm, p.z/norm)
+ * 
+ * cdef class Point:             # <<<<<<<<<<<<<<
+ *     """ Class to represent point in 3D. """
+ *     cdef cPoint data
+ */
+struct __pyx_obj_5pysph_4base_5point_Point {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_5point_Point *__pyx_vtab;
+  struct __pyx_t_5pysph_4base_5point_cPoint data;
+};
+
+
+/* "point.pxd":135
+ *     return (pa.x == pb.x and pa.y == pb.y and pa.z == pb.z)
+ * 
+ * cdef class IntPoint:             # <<<<<<<<<<<<<<
+ *     cdef cIntPoint data
+ * 
+ */
+struct __pyx_obj_5pysph_4base_5point_IntPoint {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_5point_IntPoint *__pyx_vtab;
+  struct __pyx_t_5pysph_4base_5point_cIntPoint data;
+};
+
+
+/* "pysph/base/nnps_base.pxd":140
+ * 
+ * # Basic particle array wrapper used for NNPS
+ * cdef class NNPSParticleArrayWrapper:             # <<<<<<<<<<<<<<
+ *     cdef public DoubleArray x,y,z,h
+ *     cdef public UIntArray gid
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *__pyx_vtab;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *x;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *y;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *z;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *h;
+  struct __pyx_obj_7cyarray_6carray_UIntArray *gid;
+  struct __pyx_obj_7cyarray_6carray_IntArray *tag;
+  struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *pa;
+  PyObject *name;
+  int np;
+};
+
+
+/* "pysph/base/nnps_base.pxd":153
+ * 
+ * 
+ * cdef class DomainManager:             # <<<<<<<<<<<<<<
+ *     cdef public object backend
+ *     cdef public object manager
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_DomainManager {
+  PyObject_HEAD
+  PyObject *backend;
+  PyObject *manager;
+};
+
+
+/* "pysph/base/nnps_base.pxd":158
+ * 
+ * 
+ * cdef class DomainManagerBase:             # <<<<<<<<<<<<<<
+ *     cdef public double xmin, xmax
+ *     cdef public double ymin, ymax
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_DomainManagerBase {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_DomainManagerBase *__pyx_vtab;
+  double xmin;
+  double xmax;
+  double ymin;
+  double ymax;
+  double zmin;
+  double zmax;
+  double xtranslate;
+  double ytranslate;
+  double ztranslate;
+  int dim;
+  int periodic_in_x;
+  int periodic_in_y;
+  int periodic_in_z;
+  int is_periodic;
+  int mirror_in_x;
+  int mirror_in_y;
+  int mirror_in_z;
+  int is_mirror;
+  PyObject *props;
+  PyObject *copy_props;
+  PyObject *pa_wrappers;
+  int narrays;
+  double cell_size;
+  double hmin;
+  int in_parallel;
+  double radius_scale;
+  double n_layers;
+};
+
+
+/* "pysph/base/nnps_base.pxd":190
+ * 
+ * # Domain limits for the simulation
+ * cdef class CPUDomainManager(DomainManagerBase):             # <<<<<<<<<<<<<<
+ *     cdef public bint use_double
+ *     cdef public object dtype
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager {
+  struct __pyx_obj_5pysph_4base_9nnps_base_DomainManagerBase __pyx_base;
+  int use_double;
+  PyObject *dtype;
+  double dtype_max;
+  PyObject *ghosts;
+};
+
+
+/* "pysph/base/nnps_base.pxd":223
+ * 
+ * # Cell to hold particle indices
+ * cdef class Cell:             # <<<<<<<<<<<<<<
+ *     ############################################################################
+ *     # Data Attributes
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_Cell {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_Cell *__pyx_vtab;
+  struct __pyx_t_5pysph_4base_5point_cIntPoint _cid;
+  int is_boundary;
+  int narrays;
+  PyObject *lindices;
+  PyObject *gindices;
+  PyObject *nparticles;
+  double cell_size;
+  struct __pyx_t_5pysph_4base_5point_cPoint centroid;
+  struct __pyx_t_5pysph_4base_5point_cPoint boxmin;
+  struct __pyx_t_5pysph_4base_5point_cPoint boxmax;
+  int layers;
+  struct __pyx_obj_7cyarray_6carray_IntArray *nbrprocs;
+  double size;
+};
+
+
+/* "pysph/base/nnps_base.pxd":253
+ *                                int layers)
+ * 
+ * cdef class NeighborCache:             # <<<<<<<<<<<<<<
+ *     cdef int _dst_index
+ *     cdef int _src_index
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NeighborCache *__pyx_vtab;
+  int _dst_index;
+  int _src_index;
+  int _narrays;
+  PyObject *_particles;
+  int _n_threads;
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *_nnps;
+  struct __pyx_obj_7cyarray_6carray_UIntArray *_pid_to_tid;
+  struct __pyx_obj_7cyarray_6carray_UIntArray *_start_stop;
+  struct __pyx_obj_7cyarray_6carray_IntArray *_cached;
+  void **_neighbors;
+  PyObject *_neighbor_arrays;
+  int _last_avg_nbr_size;
+};
+
+
+/* "pysph/base/nnps_base.pxd":277
+ *     cdef void _find_neighbors(self, long d_idx) nogil
+ * 
+ * cdef class NNPSBase:             # <<<<<<<<<<<<<<
+ *     ##########################################################################
+ *     # Data Attributes
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase *__pyx_vtab;
+  PyObject *particles;
+  PyObject *pa_wrappers;
+  int narrays;
+  int use_cache;
+  PyObject *cache;
+  int src_index;
+  int dst_index;
+  struct __pyx_obj_5pysph_4base_9nnps_base_DomainManager *domain;
+  int is_periodic;
+  int dim;
+  double cell_size;
+  double hmin;
+  double radius_scale;
+  struct __pyx_obj_7cyarray_6carray_IntArray *cell_shifts;
+  int n_cells;
+  double update_time;
+  double total_update_time;
+  long n_updates;
+};
+
+
+/* "pysph/base/nnps_base.pxd":317
+ * 
+ * # Nearest neighbor locator
+ * cdef class NNPS(NNPSBase):             # <<<<<<<<<<<<<<
+ *     ##########################################################################
+ *     # Data Attributes
+ */
+struct __pyx_obj_5pysph_4base_9nnps_base_NNPS {
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase __pyx_base;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *xmin;
+  struct __pyx_obj_7cyarray_6carray_DoubleArray *xmax;
+  struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *current_cache;
+  double _last_domain_size;
+  int sort_gids;
+  double h_padding;
+  int supports_h_padding;
+  int reuse_unchanged_bins;
+  long n_reused_bins;
+  PyObject *_binned_positions;
+  PyObject *_binned_h;
+  int supports_append;
+  PyObject *_num_binned;
+  double _begin_update_time;
+};
+
+
+/* "pysph/base/gpu_nnps_base.pxd":35
+ * 
+ * 
+ * cdef class GPUNeighborCache:             # <<<<<<<<<<<<<<
+ *     cdef object backend
+ *     cdef int _dst_index
+ */
+struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache {
+  PyObject_HEAD
+  struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *__pyx_vtab;
+  PyObject *backend;
+  int _dst_index;
+  int _src_index;
+  int _narrays;
+  PyObject *_particles;
+  int _cached;
+  int _copied_to_cpu;
+  struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *_nnps;
+  PyObject *_neighbors_gpu;
+  PyObject *_nbr_lengths_gpu;
+  PyObject *_start_idx_gpu;
+  PyObject *_get_start_indices;
+  PyArrayObject *_neighbors_cpu;
+  PyArrayObject *_nbr_lengths;
+  PyArrayObject *_start_idx;
+  unsigned int *_neighbors_cpu_ptr;
+  unsigned int *_nbr_lengths_ptr;
+  unsigned int *_start_idx_ptr;
+};
+
+
+/* "pysph/base/gpu_nnps_base.pxd":69
+ *     cpdef get_neighbors_gpu(self)
+ * 
+ * cdef class GPUNNPS(NNPSBase):             # <<<<<<<<<<<<<<
+ * 
+ *     cdef public object backend
+ */
+struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS {
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase __pyx_base;
+  PyObject *backend;
+  PyObject *queue;
+  double radius_scale2;
+  struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *current_cache;
+  int sort_gids;
+  int use_double;
+  PyObject *dtype;
+  PyObject *dtype_max;
+  double _last_domain_size;
+  PyArrayObject *xmin;
+  PyArrayObject *xmax;
+};
+
+
+/* "pysph/base/gpu_nnps_base.pxd":106
+ *     cpdef _refresh(self)
+ * 
+ * cdef class BruteForceNNPS(GPUNNPS):             # <<<<<<<<<<<<<<
+ *     cdef NNPSParticleArrayWrapper src, dst # Current source and destination.
+ *     cdef str preamble
+ */
+struct __pyx_obj_5pysph_4base_13gpu_nnps_base_BruteForceNNPS {
+  struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS __pyx_base;
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *src;
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *dst;
+  PyObject *preamble;
+};
+
+
+/* "pysph/base/octree_gpu_nnps.pxd":6
+ * 
+ * 
+ * cdef class OctreeGPUNNPS(GPUNNPS):             # <<<<<<<<<<<<<<
+ *     cdef NNPSParticleArrayWrapper src, dst # Current source and destination.
+ * 
+ */
+struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS {
+  struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS __pyx_base;
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *src;
+  struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *dst;
+  PyObject *pids;
+  PyObject *pid_keys;
+  PyObject *cids;
+  PyObject *cid_to_idx;
+  PyObject *max_cid;
+  PyObject *dst_to_src;
+  PyObject *overflow_cid_to_idx;
+  PyObject *curr_cid;
+  PyObject *max_cid_src;
+  PyObject *helper;
+  PyObject *radix_sort;
+  PyObject *make_vec;
+  int allow_sort;
+  int dst_src;
+  PyObject *neighbor_cid_counts;
+  PyObject *neighbor_cids;
+  PyObject *octrees;
+  int use_elementwise;
+  int use_partitions;
+  PyObject *leaf_size;
+};
+
+
+/* "pysph/base/octree_gpu_nnps.pyx":63
+ *             self.spatially_order_particles(pa_index)
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):             # <<<<<<<<<<<<<<
+ *         def update():
+ *             self.octrees[pa_index]._sort()
+ */
+struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices {
+  PyObject_HEAD
+  int __pyx_v_pa_index;
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self;
+};
+
+
+
+/* "cyarray/carray.pxd":21
+ * 
+ * # forward declaration
+ * cdef class BaseArray             # <<<<<<<<<<<<<<
+ * cdef class LongArray(BaseArray)
+ * 
+ */
+
+struct __pyx_vtabstruct_7cyarray_6carray_BaseArray {
+  void (*c_align_array)(struct __pyx_obj_7cyarray_6carray_BaseArray *, struct __pyx_obj_7cyarray_6carray_LongArray *, struct __pyx_opt_args_7cyarray_6carray_9BaseArray_c_align_array *__pyx_optional_args);
+  void (*c_reserve)(struct __pyx_obj_7cyarray_6carray_BaseArray *, long);
+  void (*c_reset)(struct __pyx_obj_7cyarray_6carray_BaseArray *);
+  void (*c_resize)(struct __pyx_obj_7cyarray_6carray_BaseArray *, long);
+  void (*c_squeeze)(struct __pyx_obj_7cyarray_6carray_BaseArray *);
+  PyObject *(*reserve)(struct __pyx_obj_7cyarray_6carray_BaseArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*resize)(struct __pyx_obj_7cyarray_6carray_BaseArray *, long, int __pyx_skip_dispatch);
+  PyArrayObject *(*get_npy_array)(struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch);
+  PyObject *(*set_data)(struct __pyx_obj_7cyarray_6carray_BaseArray *, PyArrayObject *, int __pyx_skip_dispatch);
+  PyObject *(*squeeze)(struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch);
+  PyObject *(*remove)(struct __pyx_obj_7cyarray_6carray_BaseArray *, PyArrayObject *, int __pyx_skip_dispatch, struct __pyx_opt_args_7cyarray_6carray_9BaseArray_remove *__pyx_optional_args);
+  PyObject *(*extend)(struct __pyx_obj_7cyarray_6carray_BaseArray *, PyArrayObject *, int __pyx_skip_dispatch);
+  PyObject *(*reset)(struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch);
+  PyObject *(*align_array)(struct __pyx_obj_7cyarray_6carray_BaseArray *, struct __pyx_obj_7cyarray_6carray_LongArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_7cyarray_6carray_9BaseArray_align_array *__pyx_optional_args);
+  PyObject *(*get_c_type)(struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch);
+  PyObject *(*copy_values)(struct __pyx_obj_7cyarray_6carray_BaseArray *, struct __pyx_obj_7cyarray_6carray_LongArray *, struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_7cyarray_6carray_9BaseArray_copy_values *__pyx_optional_args);
+  PyObject *(*copy_subset)(struct __pyx_obj_7cyarray_6carray_BaseArray *, struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_7cyarray_6carray_9BaseArray_copy_subset *__pyx_optional_args);
+  PyObject *(*update_min_max)(struct __pyx_obj_7cyarray_6carray_BaseArray *, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_7cyarray_6carray_BaseArray *__pyx_vtabptr_7cyarray_6carray_BaseArray;
+
+
+/* "cyarray/carray.pxd":22
+ * # forward declaration
+ * cdef class BaseArray
+ * cdef class LongArray(BaseArray)             # <<<<<<<<<<<<<<
+ * 
+ * cdef class BaseArrayIter:
+ */
+
+struct __pyx_vtabstruct_7cyarray_6carray_LongArray {
+  struct __pyx_vtabstruct_7cyarray_6carray_BaseArray __pyx_base;
+  PyObject *(*_setup_npy_array)(struct __pyx_obj_7cyarray_6carray_LongArray *);
+  void (*c_append)(struct __pyx_obj_7cyarray_6carray_LongArray *, long);
+  void (*c_set_view)(struct __pyx_obj_7cyarray_6carray_LongArray *, long *, long);
+  long *(*get_data_ptr)(struct __pyx_obj_7cyarray_6carray_LongArray *);
+  long (*get)(struct __pyx_obj_7cyarray_6carray_LongArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*set)(struct __pyx_obj_7cyarray_6carray_LongArray *, long, long, int __pyx_skip_dispatch);
+  PyObject *(*append)(struct __pyx_obj_7cyarray_6carray_LongArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*set_view)(struct __pyx_obj_7cyarray_6carray_LongArray *, struct __pyx_obj_7cyarray_6carray_LongArray *, long, long, int __pyx_skip_dispatch);
+  long (*index)(struct __pyx_obj_7cyarray_6carray_LongArray *, long, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_7cyarray_6carray_LongArray *__pyx_vtabptr_7cyarray_6carray_LongArray;
+
+
+/* "cyarray/carray.pxd":57
+ * # `IntArray` class.
+ * # ###########################################################################
+ * cdef class IntArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of ints. """
+ *     cdef int *data
+ */
+
+struct __pyx_vtabstruct_7cyarray_6carray_IntArray {
+  struct __pyx_vtabstruct_7cyarray_6carray_BaseArray __pyx_base;
+  PyObject *(*_setup_npy_array)(struct __pyx_obj_7cyarray_6carray_IntArray *);
+  void (*c_append)(struct __pyx_obj_7cyarray_6carray_IntArray *, int);
+  void (*c_set_view)(struct __pyx_obj_7cyarray_6carray_IntArray *, int *, long);
+  int *(*get_data_ptr)(struct __pyx_obj_7cyarray_6carray_IntArray *);
+  int (*get)(struct __pyx_obj_7cyarray_6carray_IntArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*set)(struct __pyx_obj_7cyarray_6carray_IntArray *, long, int, int __pyx_skip_dispatch);
+  PyObject *(*append)(struct __pyx_obj_7cyarray_6carray_IntArray *, int, int __pyx_skip_dispatch);
+  PyObject *(*set_view)(struct __pyx_obj_7cyarray_6carray_IntArray *, struct __pyx_obj_7cyarray_6carray_IntArray *, long, long, int __pyx_skip_dispatch);
+  long (*index)(struct __pyx_obj_7cyarray_6carray_IntArray *, int, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_7cyarray_6carray_IntArray *__pyx_vtabptr_7cyarray_6carray_IntArray;
+
+
+/* "cyarray/carray.pxd":87
+ * # `UIntArray` class.
+ * # ###########################################################################
+ * cdef class UIntArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of unsigned ints. """
+ *     cdef unsigned int *data
+ */
+
+struct __pyx_vtabstruct_7cyarray_6carray_UIntArray {
+  struct __pyx_vtabstruct_7cyarray_6carray_BaseArray __pyx_base;
+  PyObject *(*_setup_npy_array)(struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  void (*c_append)(struct __pyx_obj_7cyarray_6carray_UIntArray *, unsigned int);
+  void (*c_set_view)(struct __pyx_obj_7cyarray_6carray_UIntArray *, unsigned int *, long);
+  unsigned int *(*get_data_ptr)(struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  unsigned int (*get)(struct __pyx_obj_7cyarray_6carray_UIntArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*set)(struct __pyx_obj_7cyarray_6carray_UIntArray *, long, unsigned int, int __pyx_skip_dispatch);
+  PyObject *(*append)(struct __pyx_obj_7cyarray_6carray_UIntArray *, unsigned int, int __pyx_skip_dispatch);
+  PyObject *(*set_view)(struct __pyx_obj_7cyarray_6carray_UIntArray *, struct __pyx_obj_7cyarray_6carray_UIntArray *, long, long, int __pyx_skip_dispatch);
+  long (*index)(struct __pyx_obj_7cyarray_6carray_UIntArray *, unsigned int, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_7cyarray_6carray_UIntArray *__pyx_vtabptr_7cyarray_6carray_UIntArray;
+
+
+/* "cyarray/carray.pxd":147
+ * # `FloatArray` class.
+ * # ###########################################################################
+ * cdef class FloatArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of floats. """
+ *     cdef float *data
+ */
+
+struct __pyx_vtabstruct_7cyarray_6carray_FloatArray {
+  struct __pyx_vtabstruct_7cyarray_6carray_BaseArray __pyx_base;
+  PyObject *(*_setup_npy_array)(struct __pyx_obj_7cyarray_6carray_FloatArray *);
+  void (*c_append)(struct __pyx_obj_7cyarray_6carray_FloatArray *, float);
+  void (*c_set_view)(struct __pyx_obj_7cyarray_6carray_FloatArray *, float *, long);
+  float *(*get_data_ptr)(struct __pyx_obj_7cyarray_6carray_FloatArray *);
+  float (*get)(struct __pyx_obj_7cyarray_6carray_FloatArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*set)(struct __pyx_obj_7cyarray_6carray_FloatArray *, long, float, int __pyx_skip_dispatch);
+  PyObject *(*append)(struct __pyx_obj_7cyarray_6carray_FloatArray *, float, int __pyx_skip_dispatch);
+  PyObject *(*set_view)(struct __pyx_obj_7cyarray_6carray_FloatArray *, struct __pyx_obj_7cyarray_6carray_FloatArray *, long, long, int __pyx_skip_dispatch);
+  long (*index)(struct __pyx_obj_7cyarray_6carray_FloatArray *, float, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_7cyarray_6carray_FloatArray *__pyx_vtabptr_7cyarray_6carray_FloatArray;
+
+
+/* "cyarray/carray.pxd":177
+ * # `DoubleArray` class.
+ * # ###########################################################################
+ * cdef class DoubleArray(BaseArray):             # <<<<<<<<<<<<<<
+ *     """This class defines a managed array of doubles. """
+ *     cdef double *data
+ */
+
+struct __pyx_vtabstruct_7cyarray_6carray_DoubleArray {
+  struct __pyx_vtabstruct_7cyarray_6carray_BaseArray __pyx_base;
+  PyObject *(*_setup_npy_array)(struct __pyx_obj_7cyarray_6carray_DoubleArray *);
+  void (*c_append)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, double);
+  void (*c_set_view)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, double *, long);
+  double *(*get_data_ptr)(struct __pyx_obj_7cyarray_6carray_DoubleArray *);
+  double (*get)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, long, int __pyx_skip_dispatch);
+  PyObject *(*set)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, long, double, int __pyx_skip_dispatch);
+  PyObject *(*append)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, double, int __pyx_skip_dispatch);
+  PyObject *(*set_view)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, struct __pyx_obj_7cyarray_6carray_DoubleArray *, long, long, int __pyx_skip_dispatch);
+  long (*index)(struct __pyx_obj_7cyarray_6carray_DoubleArray *, double, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_7cyarray_6carray_DoubleArray *__pyx_vtabptr_7cyarray_6carray_DoubleArray;
+
+
+/* "particle_array.pxd":34
+ * cpdef int get_ghost_tag()
+ * 
+ * cdef class ParticleArray:             # <<<<<<<<<<<<<<
+ *     """
+ *     Maintains various properties for particles.
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_14particle_array_ParticleArray {
+  PyObject *(*_create_c_array_from_npy_array)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyArrayObject *);
+  PyObject *(*_check_property)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *);
+  PyArrayObject *(*_get_real_particle_prop)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *);
+  PyObject *(*set_time)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, double, int __pyx_skip_dispatch);
+  double (*get_time)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch);
+  PyObject *(*set_name)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch);
+  PyObject *(*get_lb_props)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch);
+  PyObject *(*set_num_real_particles)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, long, int __pyx_skip_dispatch);
+  struct __pyx_obj_7cyarray_6carray_BaseArray *(*get_carray)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch);
+  int (*get_number_of_particles)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_get_number_of_particles *__pyx_optional_args);
+  PyObject *(*remove_particles)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_remove_particles *__pyx_optional_args);
+  PyObject *(*remove_tagged_particles)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_remove_tagged_particles *__pyx_optional_args);
+  PyObject *(*add_constant)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, PyObject *, int __pyx_skip_dispatch);
+  PyObject *(*add_property)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_add_property *__pyx_optional_args);
+  PyObject *(*remove_property)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch);
+  PyObject *(*extend)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int, int __pyx_skip_dispatch);
+  PyObject *(*has_array)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch);
+  int (*align_particles)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch);
+  int (*append_parray)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_append_parray *__pyx_optional_args);
+  struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *(*empty_clone)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_empty_clone *__pyx_optional_args);
+  PyObject *(*ensure_properties)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_ensure_properties *__pyx_optional_args);
+  struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *(*extract_particles)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_extract_particles *__pyx_optional_args);
+  PyObject *(*set_tag)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, long, struct __pyx_obj_7cyarray_6carray_LongArray *, int __pyx_skip_dispatch);
+  PyObject *(*copy_properties)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int __pyx_skip_dispatch, struct __pyx_opt_args_5pysph_4base_14particle_array_13ParticleArray_copy_properties *__pyx_optional_args);
+  PyObject *(*copy_over_properties)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch);
+  PyObject *(*set_pid)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, int, int __pyx_skip_dispatch);
+  PyObject *(*set_to_zero)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, PyObject *, int __pyx_skip_dispatch);
+  PyObject *(*resize)(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray *, long, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_14particle_array_ParticleArray *__pyx_vtabptr_5pysph_4base_14particle_array_ParticleArray;
+
+
+/* "point.pxd":51
+ *     return cPoint_new(p.x/norm, p.y/norm, p.z/norm)
+ * 
+ * cdef class Point:             # <<<<<<<<<<<<<<
+ *     """ Class to represent point in 3D. """
+ *     cdef cPoint data
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_5point_Point {
+  PyObject *(*set)(struct __pyx_obj_5pysph_4base_5point_Point *, double, double, double, int __pyx_skip_dispatch);
+  PyObject *(*set_from_cPoint)(struct __pyx_obj_5pysph_4base_5point_Point *, struct __pyx_t_5pysph_4base_5point_cPoint);
+  PyArrayObject *(*asarray)(struct __pyx_obj_5pysph_4base_5point_Point *, int __pyx_skip_dispatch);
+  double (*norm)(struct __pyx_obj_5pysph_4base_5point_Point *, int __pyx_skip_dispatch);
+  double (*length)(struct __pyx_obj_5pysph_4base_5point_Point *, int __pyx_skip_dispatch);
+  double (*dot)(struct __pyx_obj_5pysph_4base_5point_Point *, struct __pyx_obj_5pysph_4base_5point_Point *, int __pyx_skip_dispatch);
+  struct __pyx_obj_5pysph_4base_5point_Point *(*cross)(struct __pyx_obj_5pysph_4base_5point_Point *, struct __pyx_obj_5pysph_4base_5point_Point *, int __pyx_skip_dispatch);
+  double (*distance)(struct __pyx_obj_5pysph_4base_5point_Point *, struct __pyx_obj_5pysph_4base_5point_Point *, int __pyx_skip_dispatch);
+  struct __pyx_t_5pysph_4base_5point_cPoint (*to_cPoint)(struct __pyx_obj_5pysph_4base_5point_Point *);
+};
+static struct __pyx_vtabstruct_5pysph_4base_5point_Point *__pyx_vtabptr_5pysph_4base_5point_Point;
+
+
+/* "point.pxd":135
+ *     return (pa.x == pb.x and pa.y == pb.y and pa.z == pb.z)
+ * 
+ * cdef class IntPoint:             # <<<<<<<<<<<<<<
+ *     cdef cIntPoint data
+ * 
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_5point_IntPoint {
+  PyArrayObject *(*asarray)(struct __pyx_obj_5pysph_4base_5point_IntPoint *, int __pyx_skip_dispatch);
+  int (*is_equal)(struct __pyx_obj_5pysph_4base_5point_IntPoint *, struct __pyx_obj_5pysph_4base_5point_IntPoint *);
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *(*diff)(struct __pyx_obj_5pysph_4base_5point_IntPoint *, struct __pyx_obj_5pysph_4base_5point_IntPoint *);
+  PyObject *(*to_tuple)(struct __pyx_obj_5pysph_4base_5point_IntPoint *);
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *(*copy)(struct __pyx_obj_5pysph_4base_5point_IntPoint *);
+};
+static struct __pyx_vtabstruct_5pysph_4base_5point_IntPoint *__pyx_vtabptr_5pysph_4base_5point_IntPoint;
+
+
+/* "pysph/base/nnps_base.pxd":140
+ * 
+ * # Basic particle array wrapper used for NNPS
+ * cdef class NNPSParticleArrayWrapper:             # <<<<<<<<<<<<<<
+ *     cdef public DoubleArray x,y,z,h
+ *     cdef public UIntArray gid
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper {
+  int (*get_number_of_particles)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *__pyx_vtabptr_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper;
+
+
+/* "pysph/base/nnps_base.pxd":158
+ * 
+ * 
+ * cdef class DomainManagerBase:             # <<<<<<<<<<<<<<
+ *     cdef public double xmin, xmax
+ *     cdef public double ymin, ymax
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_DomainManagerBase {
+  PyObject *(*_remove_ghosts)(struct __pyx_obj_5pysph_4base_9nnps_base_DomainManagerBase *, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_DomainManagerBase *__pyx_vtabptr_5pysph_4base_9nnps_base_DomainManagerBase;
+
+
+/* "pysph/base/nnps_base.pxd":190
+ * 
+ * # Domain limits for the simulation
+ * cdef class CPUDomainManager(DomainManagerBase):             # <<<<<<<<<<<<<<
+ *     cdef public bint use_double
+ *     cdef public object dtype
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_CPUDomainManager {
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_DomainManagerBase __pyx_base;
+  PyObject *(*_box_wrap_periodic)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *);
+  PyObject *(*_add_to_array)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *, struct __pyx_obj_7cyarray_6carray_DoubleArray *, double, struct __pyx_opt_args_5pysph_4base_9nnps_base_16CPUDomainManager__add_to_array *__pyx_optional_args);
+  PyObject *(*_mul_to_array)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *, struct __pyx_obj_7cyarray_6carray_DoubleArray *, double);
+  PyObject *(*_add_array_to_array)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *, struct __pyx_obj_7cyarray_6carray_DoubleArray *, struct __pyx_obj_7cyarray_6carray_DoubleArray *);
+  PyObject *(*_change_velocity)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *, struct __pyx_obj_7cyarray_6carray_DoubleArray *, double);
+  PyObject *(*_create_ghosts_periodic)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *);
+  PyObject *(*_create_ghosts_mirror)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *);
+  PyObject *(*_compute_cell_size_for_binning)(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager *);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_CPUDomainManager *__pyx_vtabptr_5pysph_4base_9nnps_base_CPUDomainManager;
+
+
+/* "pysph/base/nnps_base.pxd":223
+ * 
+ * # Cell to hold particle indices
+ * cdef class Cell:             # <<<<<<<<<<<<<<
+ *     ############################################################################
+ *     # Data Attributes
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_Cell {
+  PyObject *(*set_indices)(struct __pyx_obj_5pysph_4base_9nnps_base_Cell *, int, struct __pyx_obj_7cyarray_6carray_UIntArray *, struct __pyx_obj_7cyarray_6carray_UIntArray *, int __pyx_skip_dispatch);
+  PyObject *(*_compute_bounding_box)(struct __pyx_obj_5pysph_4base_9nnps_base_Cell *, double, int);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_Cell *__pyx_vtabptr_5pysph_4base_9nnps_base_Cell;
+
+
+/* "pysph/base/nnps_base.pxd":253
+ *                                int layers)
+ * 
+ * cdef class NeighborCache:             # <<<<<<<<<<<<<<
+ *     cdef int _dst_index
+ *     cdef int _src_index
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NeighborCache {
+  void (*get_neighbors_raw)(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  PyObject *(*get_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *, int, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *, int __pyx_skip_dispatch);
+  PyObject *(*find_all_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *, int __pyx_skip_dispatch);
+  PyObject *(*update)(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *, int __pyx_skip_dispatch);
+  void (*_update_last_avg_nbr_size)(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *);
+  void (*_find_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache *, long);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NeighborCache *__pyx_vtabptr_5pysph_4base_9nnps_base_NeighborCache;
+
+
+/* "pysph/base/nnps_base.pxd":277
+ *     cdef void _find_neighbors(self, long d_idx) nogil
+ * 
+ * cdef class NNPSBase:             # <<<<<<<<<<<<<<
+ *     ##########################################################################
+ *     # Data Attributes
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase {
+  PyObject *(*brute_force_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *, int, int, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *, int __pyx_skip_dispatch);
+  PyObject *(*get_nearest_particles_no_cache)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *, int, int, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *, int, int __pyx_skip_dispatch);
+  void (*find_nearest_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  PyObject *(*get_nearest_particles)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *, int, int, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *, int __pyx_skip_dispatch);
+  PyObject *(*set_context)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *, int, int, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase *__pyx_vtabptr_5pysph_4base_9nnps_base_NNPSBase;
+
+
+/* "pysph/base/nnps_base.pxd":317
+ * 
+ * # Nearest neighbor locator
+ * cdef class NNPS(NNPSBase):             # <<<<<<<<<<<<<<
+ *     ##########################################################################
+ *     # Data Attributes
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPS {
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase __pyx_base;
+  PyObject *(*update)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, int __pyx_skip_dispatch);
+  PyObject *(*_bin)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, int, struct __pyx_obj_7cyarray_6carray_UIntArray *, int __pyx_skip_dispatch);
+  void (*_sort_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, unsigned int *, size_t, unsigned int *);
+  PyObject *(*_compute_bounds)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *);
+  PyObject *(*_record_update_time)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, double);
+  int (*_can_reuse_bins)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *);
+  void (*get_nearest_neighbors)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  PyObject *(*get_spatially_ordered_indices)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, int, struct __pyx_obj_7cyarray_6carray_LongArray *, int __pyx_skip_dispatch);
+  PyObject *(*spatially_order_particles)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, int, int __pyx_skip_dispatch);
+  PyObject *(*_refresh)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS *, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPS *__pyx_vtabptr_5pysph_4base_9nnps_base_NNPS;
+
+
+/* "pysph/base/gpu_nnps_base.pxd":35
+ * 
+ * 
+ * cdef class GPUNeighborCache:             # <<<<<<<<<<<<<<
+ *     cdef object backend
+ *     cdef int _dst_index
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNeighborCache {
+  void (*copy_to_cpu)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *);
+  void (*get_neighbors_raw)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  void (*get_neighbors_raw_gpu)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *);
+  PyObject *(*update)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *, int __pyx_skip_dispatch);
+  void (*_find_neighbors)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *);
+  PyObject *(*get_neighbors)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *, int, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *, int __pyx_skip_dispatch);
+  PyObject *(*get_neighbors_gpu)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNeighborCache;
+
+
+/* "pysph/base/gpu_nnps_base.pxd":69
+ *     cpdef get_neighbors_gpu(self)
+ * 
+ * cdef class GPUNNPS(NNPSBase):             # <<<<<<<<<<<<<<
+ * 
+ *     cdef public object backend
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNNPS {
+  struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase __pyx_base;
+  PyObject *(*get_nearest_particles_gpu)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int, int, int __pyx_skip_dispatch);
+  PyObject *(*spatially_order_particles)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int, int __pyx_skip_dispatch);
+  void (*get_nearest_neighbors)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, size_t, struct __pyx_obj_7cyarray_6carray_UIntArray *);
+  void (*find_neighbor_lengths)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, PyObject *);
+  void (*find_nearest_neighbors_gpu)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, PyObject *, PyObject *);
+  PyObject *(*_compute_bounds)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *);
+  PyObject *(*update)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int __pyx_skip_dispatch);
+  PyObject *(*_bin)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int, int __pyx_skip_dispatch);
+  PyObject *(*_refresh)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNNPS *__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNNPS;
+
+
+/* "pysph/base/gpu_nnps_base.pxd":106
+ *     cpdef _refresh(self)
+ * 
+ * cdef class BruteForceNNPS(GPUNNPS):             # <<<<<<<<<<<<<<
+ *     cdef NNPSParticleArrayWrapper src, dst # Current source and destination.
+ *     cdef str preamble
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_BruteForceNNPS {
+  struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNNPS __pyx_base;
+};
+static struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_BruteForceNNPS *__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_BruteForceNNPS;
+
+
+/* "pysph/base/octree_gpu_nnps.pyx":6
+ * from pysph.base.tree.point_tree import PointTree
+ * 
+ * cdef class OctreeGPUNNPS(GPUNNPS):             # <<<<<<<<<<<<<<
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,
+ */
+
+struct __pyx_vtabstruct_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS {
+  struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNNPS __pyx_base;
+  PyObject *(*get_kernel_args)(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *, PyObject *, int __pyx_skip_dispatch);
+};
+static struct __pyx_vtabstruct_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_vtabptr_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS;
+
+/* --- Runtime support code (head) --- */
+/* Refnanny.proto */
+#ifndef CYTHON_REFNANNY
+  #define CYTHON_REFNANNY 0
+#endif
+#if CYTHON_REFNANNY
+  typedef struct {
+    void (*INCREF)(void*, PyObject*, int);
+    void (*DECREF)(void*, PyObject*, int);
+    void (*GOTREF)(void*, PyObject*, int);
+    void (*GIVEREF)(void*, PyObject*, int);
+    void* (*SetupContext)(const char*, int, const char*);
+    void (*FinishContext)(void**);
+  } __Pyx_RefNannyAPIStruct;
+  static __Pyx_RefNannyAPIStruct *__Pyx_RefNanny = NULL;
+  static __Pyx_RefNannyAPIStruct *__Pyx_RefNannyImportAPI(const char *modname);
+  #define __Pyx_RefNannyDeclarations void *__pyx_refnanny = NULL;
+#ifdef WITH_THREAD
+  #define __Pyx_RefNannySetupContext(name, acquire_gil)\
+          if (acquire_gil) {\
+              PyGILState_STATE __pyx_gilstate_save = PyGILState_Ensure();\
+              __pyx_refnanny = __Pyx_RefNanny->SetupContext((name), __LINE__, __FILE__);\
+              PyGILState_Release(__pyx_gilstate_save);\
+          } else {\
+              __pyx_refnanny = __Pyx_RefNanny->SetupContext((name), __LINE__, __FILE__);\
+          }
+#else
+  #define __Pyx_RefNannySetupContext(name, acquire_gil)\
+          __pyx_refnanny = __Pyx_RefNanny->SetupContext((name), __LINE__, __FILE__)
+#endif
+  #define __Pyx_RefNannyFinishContext()\
+          __Pyx_RefNanny->FinishContext(&__pyx_refnanny)
+  #define __Pyx_INCREF(r)  __Pyx_RefNanny->INCREF(__pyx_refnanny, (PyObject *)(r), __LINE__)
+  #define __Pyx_DECREF(r)  __Pyx_RefNanny->DECREF(__pyx_refnanny, (PyObject *)(r), __LINE__)
+  #define __Pyx_GOTREF(r)  __Pyx_RefNanny->GOTREF(__pyx_refnanny, (PyObject *)(r), __LINE__)
+  #define __Pyx_GIVEREF(r) __Pyx_RefNanny->GIVEREF(__pyx_refnanny, (PyObject *)(r), __LINE__)
+  #define __Pyx_XINCREF(r)  do { if((r) != NULL) {__Pyx_INCREF(r); }} while(0)
+  #define __Pyx_XDECREF(r)  do { if((r) != NULL) {__Pyx_DECREF(r); }} while(0)
+  #define __Pyx_XGOTREF(r)  do { if((r) != NULL) {__Pyx_GOTREF(r); }} while(0)
+  #define __Pyx_XGIVEREF(r) do { if((r) != NULL) {__Pyx_GIVEREF(r);}} while(0)
+#else
+  #define __Pyx_RefNannyDeclarations
+  #define __Pyx_RefNannySetupContext(name, acquire_gil)
+  #define __Pyx_RefNannyFinishContext()
+  #define __Pyx_INCREF(r) Py_INCREF(r)
+  #define __Pyx_DECREF(r) Py_DECREF(r)
+  #define __Pyx_GOTREF(r)
+  #define __Pyx_GIVEREF(r)
+  #define __Pyx_XINCREF(r) Py_XINCREF(r)
+  #define __Pyx_XDECREF(r) Py_XDECREF(r)
+  #define __Pyx_XGOTREF(r)
+  #define __Pyx_XGIVEREF(r)
+#endif
+#define __Pyx_XDECREF_SET(r, v) do {\
+        PyObject *tmp = (PyObject *) r;\
+        r = v; __Pyx_XDECREF(tmp);\
+    } while (0)
+#define __Pyx_DECREF_SET(r, v) do {\
+        PyObject *tmp = (PyObject *) r;\
+        r = v; __Pyx_DECREF(tmp);\
+    } while (0)
+#define __Pyx_CLEAR(r)    do { PyObject* tmp = ((PyObject*)(r)); r = NULL; __Pyx_DECREF(tmp);} while(0)
+#define __Pyx_XCLEAR(r)   do { if((r) != NULL) {PyObject* tmp = ((PyObject*)(r)); r = NULL; __Pyx_DECREF(tmp);}} while(0)
+
+/* PyObjectGetAttrStr.proto */
+#if CYTHON_USE_TYPE_SLOTS
+static CYTHON_INLINE PyObject* __Pyx_PyObject_GetAttrStr(PyObject* obj, PyObject* attr_name);
+#else
+#define __Pyx_PyObject_GetAttrStr(o,n) PyObject_GetAttr(o,n)
+#endif
+
+/* GetBuiltinName.proto */
+static PyObject *__Pyx_GetBuiltinName(PyObject *name);
+
+/* RaiseArgTupleInvalid.proto */
+static void __Pyx_RaiseArgtupleInvalid(const char* func_name, int exact,
+    Py_ssize_t num_min, Py_ssize_t num_max, Py_ssize_t num_found);
+
+/* RaiseDoubleKeywords.proto */
+static void __Pyx_RaiseDoubleKeywordsError(const char* func_name, PyObject* kw_name);
+
+/* ParseKeywords.proto */
+static int __Pyx_ParseOptionalKeywords(PyObject *kwds, PyObject **argnames[],\
+    PyObject *kwds2, PyObject *values[], Py_ssize_t num_pos_args,\
+    const char* function_name);
+
+/* ArgTypeTest.proto */
+#define __Pyx_ArgTypeTest(obj, type, none_allowed, name, exact)\
+    ((likely((Py_TYPE(obj) == type) | (none_allowed && (obj == Py_None)))) ? 1 :\
+        __Pyx__ArgTypeTest(obj, type, name, exact))
+static int __Pyx__ArgTypeTest(PyObject *obj, PyTypeObject *type, const char *name, int exact);
+
+/* PyObjectCall.proto */
+#if CYTHON_COMPILING_IN_CPYTHON
+static CYTHON_INLINE PyObject* __Pyx_PyObject_Call(PyObject *func, PyObject *arg, PyObject *kw);
+#else
+#define __Pyx_PyObject_Call(func, arg, kw) PyObject_Call(func, arg, kw)
+#endif
+
+/* Import.proto */
+static PyObject *__Pyx_Import(PyObject *name, PyObject *from_list, int level);
+
+/* ImportFrom.proto */
+static PyObject* __Pyx_ImportFrom(PyObject* module, PyObject* name);
+
+/* PyCFunctionFastCall.proto */
+#if CYTHON_FAST_PYCCALL
+static CYTHON_INLINE PyObject *__Pyx_PyCFunction_FastCall(PyObject *func, PyObject **args, Py_ssize_t nargs);
+#else
+#define __Pyx_PyCFunction_FastCall(func, args, nargs)  (assert(0), NULL)
+#endif
+
+/* PyFunctionFastCall.proto */
+#if CYTHON_FAST_PYCALL
+#define __Pyx_PyFunction_FastCall(func, args, nargs)\
+    __Pyx_PyFunction_FastCallDict((func), (args), (nargs), NULL)
+#if 1 || PY_VERSION_HEX < 0x030600B1
+static PyObject *__Pyx_PyFunction_FastCallDict(PyObject *func, PyObject **args, Py_ssize_t nargs, PyObject *kwargs);
+#else
+#define __Pyx_PyFunction_FastCallDict(func, args, nargs, kwargs) _PyFunction_FastCallDict(func, args, nargs, kwargs)
+#endif
+#define __Pyx_BUILD_ASSERT_EXPR(cond)\
+    (sizeof(char [1 - 2*!(cond)]) - 1)
+#ifndef Py_MEMBER_SIZE
+#define Py_MEMBER_SIZE(type, member) sizeof(((type *)0)->member)
+#endif
+#if CYTHON_FAST_PYCALL
+  static size_t __pyx_pyframe_localsplus_offset = 0;
+  #include "frameobject.h"
+#if PY_VERSION_HEX >= 0x030b00a6
+  #ifndef Py_BUILD_CORE
+    #define Py_BUILD_CORE 1
+  #endif
+  #include "internal/pycore_frame.h"
+#endif
+  #define __Pxy_PyFrame_Initialize_Offsets()\
+    ((void)__Pyx_BUILD_ASSERT_EXPR(sizeof(PyFrameObject) == offsetof(PyFrameObject, f_localsplus) + Py_MEMBER_SIZE(PyFrameObject, f_localsplus)),\
+     (void)(__pyx_pyframe_localsplus_offset = ((size_t)PyFrame_Type.tp_basicsize) - Py_MEMBER_SIZE(PyFrameObject, f_localsplus)))
+  #define __Pyx_PyFrame_GetLocalsplus(frame)\
+    (assert(__pyx_pyframe_localsplus_offset), (PyObject **)(((char *)(frame)) + __pyx_pyframe_localsplus_offset))
+#endif // CYTHON_FAST_PYCALL
+#endif
+
+/* PyObjectCall2Args.proto */
+static CYTHON_UNUSED PyObject* __Pyx_PyObject_Call2Args(PyObject* function, PyObject* arg1, PyObject* arg2);
+
+/* PyObjectCallMethO.proto */
+#if CYTHON_COMPILING_IN_CPYTHON
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallMethO(PyObject *func, PyObject *arg);
+#endif
+
+/* PyObjectCallOneArg.proto */
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallOneArg(PyObject *func, PyObject *arg);
+
+/* ListAppend.proto */
+#if CYTHON_USE_PYLIST_INTERNALS && CYTHON_ASSUME_SAFE_MACROS
+static CYTHON_INLINE int __Pyx_PyList_Append(PyObject* list, PyObject* x) {
+    PyListObject* L = (PyListObject*) list;
+    Py_ssize_t len = Py_SIZE(list);
+    if (likely(L->allocated > len) & likely(len > (L->allocated >> 1))) {
+        Py_INCREF(x);
+        PyList_SET_ITEM(list, len, x);
+        __Pyx_SET_SIZE(list, len + 1);
+        return 0;
+    }
+    return PyList_Append(list, x);
+}
+#else
+#define __Pyx_PyList_Append(L,x) PyList_Append(L,x)
+#endif
+
+/* PyDictVersioning.proto */
+#if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_TYPE_SLOTS
+#define __PYX_DICT_VERSION_INIT  ((PY_UINT64_T) -1)
+#define __PYX_GET_DICT_VERSION(dict)  (((PyDictObject*)(dict))->ma_version_tag)
+#define __PYX_UPDATE_DICT_CACHE(dict, value, cache_var, version_var)\
+    (version_var) = __PYX_GET_DICT_VERSION(dict);\
+    (cache_var) = (value);
+#define __PYX_PY_DICT_LOOKUP_IF_MODIFIED(VAR, DICT, LOOKUP) {\
+    static PY_UINT64_T __pyx_dict_version = 0;\
+    static PyObject *__pyx_dict_cached_value = NULL;\
+    if (likely(__PYX_GET_DICT_VERSION(DICT) == __pyx_dict_version)) {\
+        (VAR) = __pyx_dict_cached_value;\
+    } else {\
+        (VAR) = __pyx_dict_cached_value = (LOOKUP);\
+        __pyx_dict_version = __PYX_GET_DICT_VERSION(DICT);\
+    }\
+}
+static CYTHON_INLINE PY_UINT64_T __Pyx_get_tp_dict_version(PyObject *obj);
+static CYTHON_INLINE PY_UINT64_T __Pyx_get_object_dict_version(PyObject *obj);
+static CYTHON_INLINE int __Pyx_object_dict_version_matches(PyObject* obj, PY_UINT64_T tp_dict_version, PY_UINT64_T obj_dict_version);
+#else
+#define __PYX_GET_DICT_VERSION(dict)  (0)
+#define __PYX_UPDATE_DICT_CACHE(dict, value, cache_var, version_var)
+#define __PYX_PY_DICT_LOOKUP_IF_MODIFIED(VAR, DICT, LOOKUP)  (VAR) = (LOOKUP);
+#endif
+
+/* GetModuleGlobalName.proto */
+#if CYTHON_USE_DICT_VERSIONS
+#define __Pyx_GetModuleGlobalName(var, name)  do {\
+    static PY_UINT64_T __pyx_dict_version = 0;\
+    static PyObject *__pyx_dict_cached_value = NULL;\
+    (var) = (likely(__pyx_dict_version == __PYX_GET_DICT_VERSION(__pyx_d))) ?\
+        (likely(__pyx_dict_cached_value) ? __Pyx_NewRef(__pyx_dict_cached_value) : __Pyx_GetBuiltinName(name)) :\
+        __Pyx__GetModuleGlobalName(name, &__pyx_dict_version, &__pyx_dict_cached_value);\
+} while(0)
+#define __Pyx_GetModuleGlobalNameUncached(var, name)  do {\
+    PY_UINT64_T __pyx_dict_version;\
+    PyObject *__pyx_dict_cached_value;\
+    (var) = __Pyx__GetModuleGlobalName(name, &__pyx_dict_version, &__pyx_dict_cached_value);\
+} while(0)
+static PyObject *__Pyx__GetModuleGlobalName(PyObject *name, PY_UINT64_T *dict_version, PyObject **dict_cached_value);
+#else
+#define __Pyx_GetModuleGlobalName(var, name)  (var) = __Pyx__GetModuleGlobalName(name)
+#define __Pyx_GetModuleGlobalNameUncached(var, name)  (var) = __Pyx__GetModuleGlobalName(name)
+static CYTHON_INLINE PyObject *__Pyx__GetModuleGlobalName(PyObject *name);
+#endif
+
+/* GetItemInt.proto */
+#define __Pyx_GetItemInt(o, i, type, is_signed, to_py_func, is_list, wraparound, boundscheck)\
+    (__Pyx_fits_Py_ssize_t(i, type, is_signed) ?\
+    __Pyx_GetItemInt_Fast(o, (Py_ssize_t)i, is_list, wraparound, boundscheck) :\
+    (is_list ? (PyErr_SetString(PyExc_IndexError, "list index out of range"), (PyObject*)NULL) :\
+               __Pyx_GetItemInt_Generic(o, to_py_func(i))))
+#define __Pyx_GetItemInt_List(o, i, type, is_signed, to_py_func, is_list, wraparound, boundscheck)\
+    (__Pyx_fits_Py_ssize_t(i, type, is_signed) ?\
+    __Pyx_GetItemInt_List_Fast(o, (Py_ssize_t)i, wraparound, boundscheck) :\
+    (PyErr_SetString(PyExc_IndexError, "list index out of range"), (PyObject*)NULL))
+static CYTHON_INLINE PyObject *__Pyx_GetItemInt_List_Fast(PyObject *o, Py_ssize_t i,
+                                                              int wraparound, int boundscheck);
+#define __Pyx_GetItemInt_Tuple(o, i, type, is_signed, to_py_func, is_list, wraparound, boundscheck)\
+    (__Pyx_fits_Py_ssize_t(i, type, is_signed) ?\
+    __Pyx_GetItemInt_Tuple_Fast(o, (Py_ssize_t)i, wraparound, boundscheck) :\
+    (PyErr_SetString(PyExc_IndexError, "tuple index out of range"), (PyObject*)NULL))
+static CYTHON_INLINE PyObject *__Pyx_GetItemInt_Tuple_Fast(PyObject *o, Py_ssize_t i,
+                                                              int wraparound, int boundscheck);
+static PyObject *__Pyx_GetItemInt_Generic(PyObject *o, PyObject* j);
+static CYTHON_INLINE PyObject *__Pyx_GetItemInt_Fast(PyObject *o, Py_ssize_t i,
+                                                     int is_list, int wraparound, int boundscheck);
+
+/* PyObjectCallNoArg.proto */
+#if CYTHON_COMPILING_IN_CPYTHON
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallNoArg(PyObject *func);
+#else
+#define __Pyx_PyObject_CallNoArg(func) __Pyx_PyObject_Call(func, __pyx_empty_tuple, NULL)
+#endif
+
+/* None.proto */
+static CYTHON_INLINE void __Pyx_RaiseClosureNameError(const char *varname);
+
+/* FetchCommonType.proto */
+static PyTypeObject* __Pyx_FetchCommonType(PyTypeObject* type);
+
+/* CythonFunctionShared.proto */
+#define __Pyx_CyFunction_USED 1
+#define __Pyx_CYFUNCTION_STATICMETHOD  0x01
+#define __Pyx_CYFUNCTION_CLASSMETHOD   0x02
+#define __Pyx_CYFUNCTION_CCLASS        0x04
+#define __Pyx_CyFunction_GetClosure(f)\
+    (((__pyx_CyFunctionObject *) (f))->func_closure)
+#define __Pyx_CyFunction_GetClassObj(f)\
+    (((__pyx_CyFunctionObject *) (f))->func_classobj)
+#define __Pyx_CyFunction_Defaults(type, f)\
+    ((type *)(((__pyx_CyFunctionObject *) (f))->defaults))
+#define __Pyx_CyFunction_SetDefaultsGetter(f, g)\
+    ((__pyx_CyFunctionObject *) (f))->defaults_getter = (g)
+typedef struct {
+    PyCFunctionObject func;
+#if PY_VERSION_HEX < 0x030500A0
+    PyObject *func_weakreflist;
+#endif
+    PyObject *func_dict;
+    PyObject *func_name;
+    PyObject *func_qualname;
+    PyObject *func_doc;
+    PyObject *func_globals;
+    PyObject *func_code;
+    PyObject *func_closure;
+    PyObject *func_classobj;
+    void *defaults;
+    int defaults_pyobjects;
+    size_t defaults_size;  // used by FusedFunction for copying defaults
+    int flags;
+    PyObject *defaults_tuple;
+    PyObject *defaults_kwdict;
+    PyObject *(*defaults_getter)(PyObject *);
+    PyObject *func_annotations;
+} __pyx_CyFunctionObject;
+static PyTypeObject *__pyx_CyFunctionType = 0;
+#define __Pyx_CyFunction_Check(obj)  (__Pyx_TypeCheck(obj, __pyx_CyFunctionType))
+static PyObject *__Pyx_CyFunction_Init(__pyx_CyFunctionObject* op, PyMethodDef *ml,
+                                      int flags, PyObject* qualname,
+                                      PyObject *self,
+                                      PyObject *module, PyObject *globals,
+                                      PyObject* code);
+static CYTHON_INLINE void *__Pyx_CyFunction_InitDefaults(PyObject *m,
+                                                         size_t size,
+                                                         int pyobjects);
+static CYTHON_INLINE void __Pyx_CyFunction_SetDefaultsTuple(PyObject *m,
+                                                            PyObject *tuple);
+static CYTHON_INLINE void __Pyx_CyFunction_SetDefaultsKwDict(PyObject *m,
+                                                             PyObject *dict);
+static CYTHON_INLINE void __Pyx_CyFunction_SetAnnotationsDict(PyObject *m,
+                                                              PyObject *dict);
+static int __pyx_CyFunction_init(void);
+
+/* CythonFunction.proto */
+static PyObject *__Pyx_CyFunction_New(PyMethodDef *ml,
+                                      int flags, PyObject* qualname,
+                                      PyObject *closure,
+                                      PyObject *module, PyObject *globals,
+                                      PyObject* code);
+
+/* RaiseTooManyValuesToUnpack.proto */
+static CYTHON_INLINE void __Pyx_RaiseTooManyValuesError(Py_ssize_t expected);
+
+/* RaiseNeedMoreValuesToUnpack.proto */
+static CYTHON_INLINE void __Pyx_RaiseNeedMoreValuesError(Py_ssize_t index);
+
+/* IterFinish.proto */
+static CYTHON_INLINE int __Pyx_IterFinish(void);
+
+/* UnpackItemEndCheck.proto */
+static int __Pyx_IternextUnpackEndCheck(PyObject *retval, Py_ssize_t expected);
+
+/* PyThreadStateGet.proto */
+#if CYTHON_FAST_THREAD_STATE
+#define __Pyx_PyThreadState_declare  PyThreadState *__pyx_tstate;
+#define __Pyx_PyThreadState_assign  __pyx_tstate = __Pyx_PyThreadState_Current;
+#define __Pyx_PyErr_Occurred()  __pyx_tstate->curexc_type
+#else
+#define __Pyx_PyThreadState_declare
+#define __Pyx_PyThreadState_assign
+#define __Pyx_PyErr_Occurred()  PyErr_Occurred()
+#endif
+
+/* PyErrFetchRestore.proto */
+#if CYTHON_FAST_THREAD_STATE
+#define __Pyx_PyErr_Clear() __Pyx_ErrRestore(NULL, NULL, NULL)
+#define __Pyx_ErrRestoreWithState(type, value, tb)  __Pyx_ErrRestoreInState(PyThreadState_GET(), type, value, tb)
+#define __Pyx_ErrFetchWithState(type, value, tb)    __Pyx_ErrFetchInState(PyThreadState_GET(), type, value, tb)
+#define __Pyx_ErrRestore(type, value, tb)  __Pyx_ErrRestoreInState(__pyx_tstate, type, value, tb)
+#define __Pyx_ErrFetch(type, value, tb)    __Pyx_ErrFetchInState(__pyx_tstate, type, value, tb)
+static CYTHON_INLINE void __Pyx_ErrRestoreInState(PyThreadState *tstate, PyObject *type, PyObject *value, PyObject *tb);
+static CYTHON_INLINE void __Pyx_ErrFetchInState(PyThreadState *tstate, PyObject **type, PyObject **value, PyObject **tb);
+#if CYTHON_COMPILING_IN_CPYTHON
+#define __Pyx_PyErr_SetNone(exc) (Py_INCREF(exc), __Pyx_ErrRestore((exc), NULL, NULL))
+#else
+#define __Pyx_PyErr_SetNone(exc) PyErr_SetNone(exc)
+#endif
+#else
+#define __Pyx_PyErr_Clear() PyErr_Clear()
+#define __Pyx_PyErr_SetNone(exc) PyErr_SetNone(exc)
+#define __Pyx_ErrRestoreWithState(type, value, tb)  PyErr_Restore(type, value, tb)
+#define __Pyx_ErrFetchWithState(type, value, tb)  PyErr_Fetch(type, value, tb)
+#define __Pyx_ErrRestoreInState(tstate, type, value, tb)  PyErr_Restore(type, value, tb)
+#define __Pyx_ErrFetchInState(tstate, type, value, tb)  PyErr_Fetch(type, value, tb)
+#define __Pyx_ErrRestore(type, value, tb)  PyErr_Restore(type, value, tb)
+#define __Pyx_ErrFetch(type, value, tb)  PyErr_Fetch(type, value, tb)
+#endif
+
+/* WriteUnraisableException.proto */
+static void __Pyx_WriteUnraisable(const char *name, int clineno,
+                                  int lineno, const char *filename,
+                                  int full_traceback, int nogil);
+
+/* PyErrExceptionMatches.proto */
+#if CYTHON_FAST_THREAD_STATE
+#define __Pyx_PyErr_ExceptionMatches(err) __Pyx_PyErr_ExceptionMatchesInState(__pyx_tstate, err)
+static CYTHON_INLINE int __Pyx_PyErr_ExceptionMatchesInState(PyThreadState* tstate, PyObject* err);
+#else
+#define __Pyx_PyErr_ExceptionMatches(err)  PyErr_ExceptionMatches(err)
+#endif
+
+/* GetAttr.proto */
+static CYTHON_INLINE PyObject *__Pyx_GetAttr(PyObject *, PyObject *);
+
+/* GetAttr3.proto */
+static CYTHON_INLINE PyObject *__Pyx_GetAttr3(PyObject *, PyObject *, PyObject *);
+
+/* PySequenceContains.proto */
+static CYTHON_INLINE int __Pyx_PySequence_ContainsTF(PyObject* item, PyObject* seq, int eq) {
+    int result = PySequence_Contains(seq, item);
+    return unlikely(result < 0) ? result : (result == (eq == Py_EQ));
+}
+
+/* RaiseException.proto */
+static void __Pyx_Raise(PyObject *type, PyObject *value, PyObject *tb, PyObject *cause);
+
+/* ExtTypeTest.proto */
+static CYTHON_INLINE int __Pyx_TypeTest(PyObject *obj, PyTypeObject *type);
+
+/* HasAttr.proto */
+static CYTHON_INLINE int __Pyx_HasAttr(PyObject *, PyObject *);
+
+/* GetTopmostException.proto */
+#if CYTHON_USE_EXC_INFO_STACK
+static _PyErr_StackItem * __Pyx_PyErr_GetTopmostException(PyThreadState *tstate);
+#endif
+
+/* SaveResetException.proto */
+#if CYTHON_FAST_THREAD_STATE
+#define __Pyx_ExceptionSave(type, value, tb)  __Pyx__ExceptionSave(__pyx_tstate, type, value, tb)
+static CYTHON_INLINE void __Pyx__ExceptionSave(PyThreadState *tstate, PyObject **type, PyObject **value, PyObject **tb);
+#define __Pyx_ExceptionReset(type, value, tb)  __Pyx__ExceptionReset(__pyx_tstate, type, value, tb)
+static CYTHON_INLINE void __Pyx__ExceptionReset(PyThreadState *tstate, PyObject *type, PyObject *value, PyObject *tb);
+#else
+#define __Pyx_ExceptionSave(type, value, tb)   PyErr_GetExcInfo(type, value, tb)
+#define __Pyx_ExceptionReset(type, value, tb)  PyErr_SetExcInfo(type, value, tb)
+#endif
+
+/* GetException.proto */
+#if CYTHON_FAST_THREAD_STATE
+#define __Pyx_GetException(type, value, tb)  __Pyx__GetException(__pyx_tstate, type, value, tb)
+static int __Pyx__GetException(PyThreadState *tstate, PyObject **type, PyObject **value, PyObject **tb);
+#else
+static int __Pyx_GetException(PyObject **type, PyObject **value, PyObject **tb);
+#endif
+
+/* tp_new.proto */
+#define __Pyx_tp_new(type_obj, args) __Pyx_tp_new_kwargs(type_obj, args, NULL)
+static CYTHON_INLINE PyObject* __Pyx_tp_new_kwargs(PyObject* type_obj, PyObject* args, PyObject* kwargs) {
+    return (PyObject*) (((PyTypeObject*)type_obj)->tp_new((PyTypeObject*)type_obj, args, kwargs));
+}
+
+/* PyObjectSetAttrStr.proto */
+#if CYTHON_USE_TYPE_SLOTS
+#define __Pyx_PyObject_DelAttrStr(o,n) __Pyx_PyObject_SetAttrStr(o, n, NULL)
+static CYTHON_INLINE int __Pyx_PyObject_SetAttrStr(PyObject* obj, PyObject* attr_name, PyObject* value);
+#else
+#define __Pyx_PyObject_DelAttrStr(o,n)   PyObject_DelAttr(o,n)
+#define __Pyx_PyObject_SetAttrStr(o,n,v) PyObject_SetAttr(o,n,v)
+#endif
+
+/* CallNextTpDealloc.proto */
+static void __Pyx_call_next_tp_dealloc(PyObject* obj, destructor current_tp_dealloc);
+
+/* CallNextTpTraverse.proto */
+static int __Pyx_call_next_tp_traverse(PyObject* obj, visitproc v, void *a, traverseproc current_tp_traverse);
+
+/* CallNextTpClear.proto */
+static void __Pyx_call_next_tp_clear(PyObject* obj, inquiry current_tp_dealloc);
+
+/* IncludeStringH.proto */
+#include <string.h>
+
+/* TypeImport.proto */
+#ifndef __PYX_HAVE_RT_ImportType_proto_0_29_37
+#define __PYX_HAVE_RT_ImportType_proto_0_29_37
+#if __STDC_VERSION__ >= 201112L
+#include <stdalign.h>
+#endif
+#if __STDC_VERSION__ >= 201112L || __cplusplus >= 201103L
+#define __PYX_GET_STRUCT_ALIGNMENT_0_29_37(s) alignof(s)
+#else
+#define __PYX_GET_STRUCT_ALIGNMENT_0_29_37(s) sizeof(void*)
+#endif
+enum __Pyx_ImportType_CheckSize_0_29_37 {
+   __Pyx_ImportType_CheckSize_Error_0_29_37 = 0,
+   __Pyx_ImportType_CheckSize_Warn_0_29_37 = 1,
+   __Pyx_ImportType_CheckSize_Ignore_0_29_37 = 2
+};
+static PyTypeObject *__Pyx_ImportType_0_29_37(PyObject* module, const char *module_name, const char *class_name, size_t size, size_t alignment, enum __Pyx_ImportType_CheckSize_0_29_37 check_size);
+#endif
+
+/* GetVTable.proto */
+static void* __Pyx_GetVtable(PyObject *dict);
+
+/* PyObject_GenericGetAttrNoDict.proto */
+#if CYTHON_USE_TYPE_SLOTS && CYTHON_USE_PYTYPE_LOOKUP && PY_VERSION_HEX < 0x03070000
+static CYTHON_INLINE PyObject* __Pyx_PyObject_GenericGetAttrNoDict(PyObject* obj, PyObject* attr_name);
+#else
+#define __Pyx_PyObject_GenericGetAttrNoDict PyObject_GenericGetAttr
+#endif
+
+/* PyObject_GenericGetAttr.proto */
+#if CYTHON_USE_TYPE_SLOTS && CYTHON_USE_PYTYPE_LOOKUP && PY_VERSION_HEX < 0x03070000
+static PyObject* __Pyx_PyObject_GenericGetAttr(PyObject* obj, PyObject* attr_name);
+#else
+#define __Pyx_PyObject_GenericGetAttr PyObject_GenericGetAttr
+#endif
+
+/* SetVTable.proto */
+static int __Pyx_SetVtable(PyObject *dict, void *vtable);
+
+/* PyObjectGetAttrStrNoError.proto */
+static CYTHON_INLINE PyObject* __Pyx_PyObject_GetAttrStrNoError(PyObject* obj, PyObject* attr_name);
+
+/* SetupReduce.proto */
+static int __Pyx_setup_reduce(PyObject* type_obj);
+
+/* CLineInTraceback.proto */
+#ifdef CYTHON_CLINE_IN_TRACEBACK
+#define __Pyx_CLineForTraceback(tstate, c_line)  (((CYTHON_CLINE_IN_TRACEBACK)) ? c_line : 0)
+#else
+static int __Pyx_CLineForTraceback(PyThreadState *tstate, int c_line);
+#endif
+
+/* CodeObjectCache.proto */
+typedef struct {
+    PyCodeObject* code_object;
+    int code_line;
+} __Pyx_CodeObjectCacheEntry;
+struct __Pyx_CodeObjectCache {
+    int count;
+    int max_count;
+    __Pyx_CodeObjectCacheEntry* entries;
+};
+static struct __Pyx_CodeObjectCache __pyx_code_cache = {0,0,NULL};
+static int __pyx_bisect_code_objects(__Pyx_CodeObjectCacheEntry* entries, int count, int code_line);
+static PyCodeObject *__pyx_find_code_object(int code_line);
+static void __pyx_insert_code_object(int code_line, PyCodeObject* code_object);
+
+/* AddTraceback.proto */
+static void __Pyx_AddTraceback(const char *funcname, int c_line,
+                               int py_line, const char *filename);
+
+/* GCCDiagnostics.proto */
+#if defined(__GNUC__) && (__GNUC__ > 4 || (__GNUC__ == 4 && __GNUC_MINOR__ >= 6))
+#define __Pyx_HAS_GCC_DIAGNOSTIC
+#endif
+
+/* RealImag.proto */
+#if CYTHON_CCOMPLEX
+  #ifdef __cplusplus
+    #define __Pyx_CREAL(z) ((z).real())
+    #define __Pyx_CIMAG(z) ((z).imag())
+  #else
+    #define __Pyx_CREAL(z) (__real__(z))
+    #define __Pyx_CIMAG(z) (__imag__(z))
+  #endif
+#else
+    #define __Pyx_CREAL(z) ((z).real)
+    #define __Pyx_CIMAG(z) ((z).imag)
+#endif
+#if defined(__cplusplus) && CYTHON_CCOMPLEX\
+        && (defined(_WIN32) || defined(__clang__) || (defined(__GNUC__) && (__GNUC__ >= 5 || __GNUC__ == 4 && __GNUC_MINOR__ >= 4 )) || __cplusplus >= 201103)
+    #define __Pyx_SET_CREAL(z,x) ((z).real(x))
+    #define __Pyx_SET_CIMAG(z,y) ((z).imag(y))
+#else
+    #define __Pyx_SET_CREAL(z,x) __Pyx_CREAL(z) = (x)
+    #define __Pyx_SET_CIMAG(z,y) __Pyx_CIMAG(z) = (y)
+#endif
+
+/* Arithmetic.proto */
+#if CYTHON_CCOMPLEX
+    #define __Pyx_c_eq_float(a, b)   ((a)==(b))
+    #define __Pyx_c_sum_float(a, b)  ((a)+(b))
+    #define __Pyx_c_diff_float(a, b) ((a)-(b))
+    #define __Pyx_c_prod_float(a, b) ((a)*(b))
+    #define __Pyx_c_quot_float(a, b) ((a)/(b))
+    #define __Pyx_c_neg_float(a)     (-(a))
+  #ifdef __cplusplus
+    #define __Pyx_c_is_zero_float(z) ((z)==(float)0)
+    #define __Pyx_c_conj_float(z)    (::std::conj(z))
+    #if 1
+        #define __Pyx_c_abs_float(z)     (::std::abs(z))
+        #define __Pyx_c_pow_float(a, b)  (::std::pow(a, b))
+    #endif
+  #else
+    #define __Pyx_c_is_zero_float(z) ((z)==0)
+    #define __Pyx_c_conj_float(z)    (conjf(z))
+    #if 1
+        #define __Pyx_c_abs_float(z)     (cabsf(z))
+        #define __Pyx_c_pow_float(a, b)  (cpowf(a, b))
+    #endif
+ #endif
+#else
+    static CYTHON_INLINE int __Pyx_c_eq_float(__pyx_t_float_complex, __pyx_t_float_complex);
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_sum_float(__pyx_t_float_complex, __pyx_t_float_complex);
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_diff_float(__pyx_t_float_complex, __pyx_t_float_complex);
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_prod_float(__pyx_t_float_complex, __pyx_t_float_complex);
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_quot_float(__pyx_t_float_complex, __pyx_t_float_complex);
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_neg_float(__pyx_t_float_complex);
+    static CYTHON_INLINE int __Pyx_c_is_zero_float(__pyx_t_float_complex);
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_conj_float(__pyx_t_float_complex);
+    #if 1
+        static CYTHON_INLINE float __Pyx_c_abs_float(__pyx_t_float_complex);
+        static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_pow_float(__pyx_t_float_complex, __pyx_t_float_complex);
+    #endif
+#endif
+
+/* Arithmetic.proto */
+#if CYTHON_CCOMPLEX
+    #define __Pyx_c_eq_double(a, b)   ((a)==(b))
+    #define __Pyx_c_sum_double(a, b)  ((a)+(b))
+    #define __Pyx_c_diff_double(a, b) ((a)-(b))
+    #define __Pyx_c_prod_double(a, b) ((a)*(b))
+    #define __Pyx_c_quot_double(a, b) ((a)/(b))
+    #define __Pyx_c_neg_double(a)     (-(a))
+  #ifdef __cplusplus
+    #define __Pyx_c_is_zero_double(z) ((z)==(double)0)
+    #define __Pyx_c_conj_double(z)    (::std::conj(z))
+    #if 1
+        #define __Pyx_c_abs_double(z)     (::std::abs(z))
+        #define __Pyx_c_pow_double(a, b)  (::std::pow(a, b))
+    #endif
+  #else
+    #define __Pyx_c_is_zero_double(z) ((z)==0)
+    #define __Pyx_c_conj_double(z)    (conj(z))
+    #if 1
+        #define __Pyx_c_abs_double(z)     (cabs(z))
+        #define __Pyx_c_pow_double(a, b)  (cpow(a, b))
+    #endif
+ #endif
+#else
+    static CYTHON_INLINE int __Pyx_c_eq_double(__pyx_t_double_complex, __pyx_t_double_complex);
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_sum_double(__pyx_t_double_complex, __pyx_t_double_complex);
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_diff_double(__pyx_t_double_complex, __pyx_t_double_complex);
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_prod_double(__pyx_t_double_complex, __pyx_t_double_complex);
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_quot_double(__pyx_t_double_complex, __pyx_t_double_complex);
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_neg_double(__pyx_t_double_complex);
+    static CYTHON_INLINE int __Pyx_c_is_zero_double(__pyx_t_double_complex);
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_conj_double(__pyx_t_double_complex);
+    #if 1
+        static CYTHON_INLINE double __Pyx_c_abs_double(__pyx_t_double_complex);
+        static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_pow_double(__pyx_t_double_complex, __pyx_t_double_complex);
+    #endif
+#endif
+
+/* CIntToPy.proto */
+static CYTHON_INLINE PyObject* __Pyx_PyInt_From_int(int value);
+
+/* CIntFromPy.proto */
+static CYTHON_INLINE int __Pyx_PyInt_As_int(PyObject *);
+
+/* CIntToPy.proto */
+static CYTHON_INLINE PyObject* __Pyx_PyInt_From_long(long value);
+
+/* CIntFromPy.proto */
+static CYTHON_INLINE long __Pyx_PyInt_As_long(PyObject *);
+
+/* FastTypeChecks.proto */
+#if CYTHON_COMPILING_IN_CPYTHON
+#define __Pyx_TypeCheck(obj, type) __Pyx_IsSubtype(Py_TYPE(obj), (PyTypeObject *)type)
+static CYTHON_INLINE int __Pyx_IsSubtype(PyTypeObject *a, PyTypeObject *b);
+static CYTHON_INLINE int __Pyx_PyErr_GivenExceptionMatches(PyObject *err, PyObject *type);
+static CYTHON_INLINE int __Pyx_PyErr_GivenExceptionMatches2(PyObject *err, PyObject *type1, PyObject *type2);
+#else
+#define __Pyx_TypeCheck(obj, type) PyObject_TypeCheck(obj, (PyTypeObject *)type)
+#define __Pyx_PyErr_GivenExceptionMatches(err, type) PyErr_GivenExceptionMatches(err, type)
+#define __Pyx_PyErr_GivenExceptionMatches2(err, type1, type2) (PyErr_GivenExceptionMatches(err, type1) || PyErr_GivenExceptionMatches(err, type2))
+#endif
+#define __Pyx_PyException_Check(obj) __Pyx_TypeCheck(obj, PyExc_Exception)
+
+/* CheckBinaryVersion.proto */
+static int __Pyx_check_binary_version(void);
+
+/* InitStrings.proto */
+static int __Pyx_InitStrings(__Pyx_StringTabEntry *t);
+
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__bin(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_pa_index, int __pyx_skip_dispatch); /* proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__refresh(CYTHON_UNUSED struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_skip_dispatch); /* proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_set_context(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_src_index, int __pyx_v_dst_index, int __pyx_skip_dispatch); /* proto*/
+static void __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_find_neighbor_lengths(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_nbr_lengths); /* proto*/
+static void __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_find_nearest_neighbors_gpu(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_nbrs, PyObject *__pyx_v_start_indices); /* proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_get_kernel_args(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, CYTHON_UNUSED PyObject *__pyx_v_c_type, int __pyx_skip_dispatch); /* proto*/
+
+/* Module declarations from 'cpython.buffer' */
+
+/* Module declarations from 'libc.string' */
+
+/* Module declarations from 'libc.stdio' */
+
+/* Module declarations from '__builtin__' */
+
+/* Module declarations from 'cpython.type' */
+static PyTypeObject *__pyx_ptype_7cpython_4type_type = 0;
+
+/* Module declarations from 'cpython' */
+
+/* Module declarations from 'cpython.object' */
+
+/* Module declarations from 'cpython.ref' */
+
+/* Module declarations from 'cpython.mem' */
+
+/* Module declarations from 'numpy' */
+
+/* Module declarations from 'numpy' */
+static PyTypeObject *__pyx_ptype_5numpy_dtype = 0;
+static PyTypeObject *__pyx_ptype_5numpy_flatiter = 0;
+static PyTypeObject *__pyx_ptype_5numpy_broadcast = 0;
+static PyTypeObject *__pyx_ptype_5numpy_ndarray = 0;
+static PyTypeObject *__pyx_ptype_5numpy_generic = 0;
+static PyTypeObject *__pyx_ptype_5numpy_number = 0;
+static PyTypeObject *__pyx_ptype_5numpy_integer = 0;
+static PyTypeObject *__pyx_ptype_5numpy_signedinteger = 0;
+static PyTypeObject *__pyx_ptype_5numpy_unsignedinteger = 0;
+static PyTypeObject *__pyx_ptype_5numpy_inexact = 0;
+static PyTypeObject *__pyx_ptype_5numpy_floating = 0;
+static PyTypeObject *__pyx_ptype_5numpy_complexfloating = 0;
+static PyTypeObject *__pyx_ptype_5numpy_flexible = 0;
+static PyTypeObject *__pyx_ptype_5numpy_character = 0;
+static PyTypeObject *__pyx_ptype_5numpy_ufunc = 0;
+
+/* Module declarations from 'cython' */
+
+/* Module declarations from 'libcpp.utility' */
+
+/* Module declarations from 'libcpp.map' */
+
+/* Module declarations from 'libcpp.vector' */
+
+/* Module declarations from 'cyarray.carray' */
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_BaseArray = 0;
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_LongArray = 0;
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_BaseArrayIter = 0;
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_IntArray = 0;
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_UIntArray = 0;
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_FloatArray = 0;
+static PyTypeObject *__pyx_ptype_7cyarray_6carray_DoubleArray = 0;
+
+/* Module declarations from 'pysph.base.particle_array' */
+static PyTypeObject *__pyx_ptype_5pysph_4base_14particle_array_ParticleArray = 0;
+
+/* Module declarations from 'pysph.base.point' */
+static PyTypeObject *__pyx_ptype_5pysph_4base_5point_Point = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_5point_IntPoint = 0;
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cPoint __pyx_f_5pysph_4base_5point_cPoint_new(double, double, double); /*proto*/
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_norm(struct __pyx_t_5pysph_4base_5point_cPoint); /*proto*/
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_length(struct __pyx_t_5pysph_4base_5point_cPoint); /*proto*/
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_Point *__pyx_f_5pysph_4base_5point_Point_new(double, double, double); /*proto*/
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_f_5pysph_4base_5point_cIntPoint_new(int, int, int); /*proto*/
+static CYTHON_INLINE long __pyx_f_5pysph_4base_5point_cIntPoint_norm(struct __pyx_t_5pysph_4base_5point_cIntPoint); /*proto*/
+static CYTHON_INLINE long __pyx_f_5pysph_4base_5point_cIntPoint_distance2(struct __pyx_t_5pysph_4base_5point_cIntPoint, struct __pyx_t_5pysph_4base_5point_cIntPoint); /*proto*/
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_f_5pysph_4base_5point_IntPoint_new(int, int, int); /*proto*/
+
+/* Module declarations from 'pysph.base.nnps_base' */
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_DomainManager = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_DomainManagerBase = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_CPUDomainManager = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_Cell = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_NeighborCache = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_NNPSBase = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_9nnps_base_NNPS = 0;
+static CYTHON_INLINE int __pyx_f_5pysph_4base_9nnps_base_real_to_int(double, double); /*proto*/
+static CYTHON_INLINE long __pyx_f_5pysph_4base_9nnps_base_flatten_raw(int, int, int, int *, int); /*proto*/
+
+/* Module declarations from 'pysph.base.gpu_nnps_base' */
+static PyTypeObject *__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNeighborCache = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_13gpu_nnps_base_BruteForceNNPS = 0;
+
+/* Module declarations from 'pysph.base.octree_gpu_nnps' */
+static PyTypeObject *__pyx_ptype_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS = 0;
+static PyTypeObject *__pyx_ptype_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices = 0;
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS__set_state(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *, PyObject *); /*proto*/
+#define __Pyx_MODULE_NAME "pysph.base.octree_gpu_nnps"
+extern int __pyx_module_is_main_pysph__base__octree_gpu_nnps;
+int __pyx_module_is_main_pysph__base__octree_gpu_nnps = 0;
+
+/* Implementation of 'pysph.base.octree_gpu_nnps' */
+static PyObject *__pyx_builtin_range;
+static PyObject *__pyx_builtin_ImportError;
+static const char __pyx_k_h[] = "h";
+static const char __pyx_k_x[] = "x";
+static const char __pyx_k_y[] = "y";
+static const char __pyx_k_z[] = "z";
+static const char __pyx_k_np[] = "np";
+static const char __pyx_k_pa[] = "pa";
+static const char __pyx_k_bin[] = "_bin";
+static const char __pyx_k_dev[] = "dev";
+static const char __pyx_k_dim[] = "dim";
+static const char __pyx_k_gpu[] = "gpu";
+static const char __pyx_k_new[] = "__new__";
+static const char __pyx_k_cids[] = "cids";
+static const char __pyx_k_data[] = "data";
+static const char __pyx_k_dict[] = "__dict__";
+static const char __pyx_k_hmin[] = "hmin";
+static const char __pyx_k_init[] = "__init__";
+static const char __pyx_k_main[] = "__main__";
+static const char __pyx_k_name[] = "__name__";
+static const char __pyx_k_pids[] = "pids";
+static const char __pyx_k_sort[] = "_sort";
+static const char __pyx_k_test[] = "__test__";
+static const char __pyx_k_warn[] = "warn";
+static const char __pyx_k_cache[] = "cache";
+static const char __pyx_k_numpy[] = "numpy";
+static const char __pyx_k_range[] = "range";
+static const char __pyx_k_domain[] = "domain";
+static const char __pyx_k_import[] = "__import__";
+static const char __pyx_k_pickle[] = "pickle";
+static const char __pyx_k_reduce[] = "__reduce__";
+static const char __pyx_k_update[] = "update";
+static const char __pyx_k_backend[] = "backend";
+static const char __pyx_k_fixed_h[] = "fixed_h";
+static const char __pyx_k_float32[] = "float32";
+static const char __pyx_k_pbounds[] = "pbounds";
+static const char __pyx_k_refresh[] = "refresh";
+static const char __pyx_k_getstate[] = "__getstate__";
+static const char __pyx_k_pyx_type[] = "__pyx_type";
+static const char __pyx_k_setstate[] = "__setstate__";
+static const char __pyx_k_warnings[] = "warnings";
+static const char __pyx_k_PointTree[] = "PointTree";
+static const char __pyx_k_dst_index[] = "dst_index";
+static const char __pyx_k_leaf_size[] = "leaf_size";
+static const char __pyx_k_particles[] = "particles";
+static const char __pyx_k_pyx_state[] = "__pyx_state";
+static const char __pyx_k_reduce_ex[] = "__reduce_ex__";
+static const char __pyx_k_refresh_2[] = "_refresh";
+static const char __pyx_k_sort_gids[] = "sort_gids";
+static const char __pyx_k_src_index[] = "src_index";
+static const char __pyx_k_allow_sort[] = "allow_sort";
+static const char __pyx_k_pyx_result[] = "__pyx_result";
+static const char __pyx_k_pyx_vtable[] = "__pyx_vtable__";
+static const char __pyx_k_use_double[] = "use_double";
+static const char __pyx_k_ImportError[] = "ImportError";
+static const char __pyx_k_PickleError[] = "PickleError";
+static const char __pyx_k_set_context[] = "set_context";
+static const char __pyx_k_unique_cids[] = "unique_cids";
+static const char __pyx_k_ghost_layers[] = "ghost_layers";
+static const char __pyx_k_pyx_checksum[] = "__pyx_checksum";
+static const char __pyx_k_radius_scale[] = "radius_scale";
+static const char __pyx_k_stringsource[] = "stringsource";
+static const char __pyx_k_OctreeGPUNNPS[] = "OctreeGPUNNPS";
+static const char __pyx_k_reduce_cython[] = "__reduce_cython__";
+static const char __pyx_k_find_neighbors[] = "find_neighbors";
+static const char __pyx_k_use_partitions[] = "use_partitions";
+static const char __pyx_k_get_kernel_args[] = "get_kernel_args";
+static const char __pyx_k_pyx_PickleError[] = "__pyx_PickleError";
+static const char __pyx_k_set_node_bounds[] = "set_node_bounds";
+static const char __pyx_k_setstate_cython[] = "__setstate_cython__";
+static const char __pyx_k_use_elementwise[] = "use_elementwise";
+static const char __pyx_k_unique_cid_count[] = "unique_cid_count";
+static const char __pyx_k_is_valid_nnps_wgs[] = "_is_valid_nnps_wgs";
+static const char __pyx_k_cline_in_traceback[] = "cline_in_traceback";
+static const char __pyx_k_find_neighbor_cids[] = "find_neighbor_cids";
+static const char __pyx_k_find_neighbor_lengths[] = "find_neighbor_lengths";
+static const char __pyx_k_find_neighbors_elementwise[] = "find_neighbors_elementwise";
+static const char __pyx_k_pysph_base_octree_gpu_nnps[] = "pysph.base.octree_gpu_nnps";
+static const char __pyx_k_pysph_base_tree_point_tree[] = "pysph.base.tree.point_tree";
+static const char __pyx_k_pyx_unpickle_OctreeGPUNNPS[] = "__pyx_unpickle_OctreeGPUNNPS";
+static const char __pyx_k_pysph_base_octree_gpu_nnps_pyx[] = "pysph/base/octree_gpu_nnps.pyx";
+static const char __pyx_k_numpy_core_multiarray_failed_to[] = "numpy.core.multiarray failed to import";
+static const char __pyx_k_Incompatible_checksums_0x_x_vs_0[] = "Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))";
+static const char __pyx_k_Octree_NNPS_by_default_uses_sing[] = "Octree NNPS by default uses single precision arithmetic forfinding neighbors. A few particles outside of the original search radius might be included.";
+static const char __pyx_k_Octree_NNPS_with_given_leaf_size[] = "Octree NNPS with given leaf size (%d) is not supported for given device. Switching to a elementwise version of the Octree NNPS";
+static const char __pyx_k_find_neighbor_lengths_elementwis[] = "find_neighbor_lengths_elementwise";
+static const char __pyx_k_get_spatially_ordered_indices_lo[] = "get_spatially_ordered_indices.<locals>.update";
+static const char __pyx_k_numpy_core_umath_failed_to_impor[] = "numpy.core.umath failed to import";
+static PyObject *__pyx_n_s_ImportError;
+static PyObject *__pyx_kp_s_Incompatible_checksums_0x_x_vs_0;
+static PyObject *__pyx_n_s_OctreeGPUNNPS;
+static PyObject *__pyx_kp_u_Octree_NNPS_by_default_uses_sing;
+static PyObject *__pyx_kp_u_Octree_NNPS_with_given_leaf_size;
+static PyObject *__pyx_n_s_PickleError;
+static PyObject *__pyx_n_s_PointTree;
+static PyObject *__pyx_n_s_allow_sort;
+static PyObject *__pyx_n_s_backend;
+static PyObject *__pyx_n_s_bin;
+static PyObject *__pyx_n_s_cache;
+static PyObject *__pyx_n_s_cids;
+static PyObject *__pyx_n_s_cline_in_traceback;
+static PyObject *__pyx_n_s_data;
+static PyObject *__pyx_n_s_dev;
+static PyObject *__pyx_n_s_dict;
+static PyObject *__pyx_n_s_dim;
+static PyObject *__pyx_n_s_domain;
+static PyObject *__pyx_n_s_dst_index;
+static PyObject *__pyx_n_s_find_neighbor_cids;
+static PyObject *__pyx_n_s_find_neighbor_lengths;
+static PyObject *__pyx_n_s_find_neighbor_lengths_elementwis;
+static PyObject *__pyx_n_s_find_neighbors;
+static PyObject *__pyx_n_s_find_neighbors_elementwise;
+static PyObject *__pyx_n_s_fixed_h;
+static PyObject *__pyx_n_s_float32;
+static PyObject *__pyx_n_s_get_kernel_args;
+static PyObject *__pyx_n_s_get_spatially_ordered_indices_lo;
+static PyObject *__pyx_n_s_getstate;
+static PyObject *__pyx_n_s_ghost_layers;
+static PyObject *__pyx_n_s_gpu;
+static PyObject *__pyx_n_s_h;
+static PyObject *__pyx_n_s_hmin;
+static PyObject *__pyx_n_s_import;
+static PyObject *__pyx_n_s_init;
+static PyObject *__pyx_n_s_is_valid_nnps_wgs;
+static PyObject *__pyx_n_s_leaf_size;
+static PyObject *__pyx_n_s_main;
+static PyObject *__pyx_n_s_name;
+static PyObject *__pyx_n_s_new;
+static PyObject *__pyx_n_s_np;
+static PyObject *__pyx_n_s_numpy;
+static PyObject *__pyx_kp_u_numpy_core_multiarray_failed_to;
+static PyObject *__pyx_kp_u_numpy_core_umath_failed_to_impor;
+static PyObject *__pyx_n_s_pa;
+static PyObject *__pyx_n_s_particles;
+static PyObject *__pyx_n_s_pbounds;
+static PyObject *__pyx_n_s_pickle;
+static PyObject *__pyx_n_s_pids;
+static PyObject *__pyx_n_s_pysph_base_octree_gpu_nnps;
+static PyObject *__pyx_kp_s_pysph_base_octree_gpu_nnps_pyx;
+static PyObject *__pyx_n_s_pysph_base_tree_point_tree;
+static PyObject *__pyx_n_s_pyx_PickleError;
+static PyObject *__pyx_n_s_pyx_checksum;
+static PyObject *__pyx_n_s_pyx_result;
+static PyObject *__pyx_n_s_pyx_state;
+static PyObject *__pyx_n_s_pyx_type;
+static PyObject *__pyx_n_s_pyx_unpickle_OctreeGPUNNPS;
+static PyObject *__pyx_n_s_pyx_vtable;
+static PyObject *__pyx_n_s_radius_scale;
+static PyObject *__pyx_n_s_range;
+static PyObject *__pyx_n_s_reduce;
+static PyObject *__pyx_n_s_reduce_cython;
+static PyObject *__pyx_n_s_reduce_ex;
+static PyObject *__pyx_n_s_refresh;
+static PyObject *__pyx_n_s_refresh_2;
+static PyObject *__pyx_n_s_set_context;
+static PyObject *__pyx_n_s_set_node_bounds;
+static PyObject *__pyx_n_s_setstate;
+static PyObject *__pyx_n_s_setstate_cython;
+static PyObject *__pyx_n_s_sort;
+static PyObject *__pyx_n_s_sort_gids;
+static PyObject *__pyx_n_s_src_index;
+static PyObject *__pyx_kp_s_stringsource;
+static PyObject *__pyx_n_s_test;
+static PyObject *__pyx_n_s_unique_cid_count;
+static PyObject *__pyx_n_s_unique_cids;
+static PyObject *__pyx_n_s_update;
+static PyObject *__pyx_n_s_use_double;
+static PyObject *__pyx_n_s_use_elementwise;
+static PyObject *__pyx_n_s_use_partitions;
+static PyObject *__pyx_n_s_warn;
+static PyObject *__pyx_n_s_warnings;
+static PyObject *__pyx_n_s_x;
+static PyObject *__pyx_n_s_y;
+static PyObject *__pyx_n_s_z;
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS___init__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_dim, PyObject *__pyx_v_particles, double __pyx_v_radius_scale, int __pyx_v_ghost_layers, PyObject *__pyx_v_domain, CYTHON_UNUSED int __pyx_v_fixed_h, int __pyx_v_cache, int __pyx_v_sort_gids, PyObject *__pyx_v_allow_sort, PyObject *__pyx_v_leaf_size, int __pyx_v_use_elementwise, int __pyx_v_use_partitions, PyObject *__pyx_v_backend); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_2_bin(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_pa_index); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_update(PyObject *__pyx_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4get_spatially_ordered_indices(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_pa_index); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_6_refresh(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8set_context(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_src_index, int __pyx_v_dst_index); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10get_kernel_args(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_c_type); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value); /* proto */
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_12__reduce_cython__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14__setstate_cython__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v___pyx_state); /* proto */
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS(CYTHON_UNUSED PyObject *__pyx_self, PyObject *__pyx_v___pyx_type, long __pyx_v___pyx_checksum, PyObject *__pyx_v___pyx_state); /* proto */
+static PyObject *__pyx_tp_new_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS(PyTypeObject *t, PyObject *a, PyObject *k); /*proto*/
+static PyObject *__pyx_tp_new_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices(PyTypeObject *t, PyObject *a, PyObject *k); /*proto*/
+static PyObject *__pyx_int_32;
+static PyObject *__pyx_int_146956597;
+static PyObject *__pyx_int_225412702;
+static PyObject *__pyx_int_231585360;
+static PyObject *__pyx_codeobj_;
+static PyObject *__pyx_tuple__2;
+static PyObject *__pyx_tuple__3;
+static PyObject *__pyx_tuple__4;
+static PyObject *__pyx_tuple__5;
+static PyObject *__pyx_codeobj__6;
+/* Late includes */
+
+/* "pysph/base/octree_gpu_nnps.pyx":7
+ * 
+ * cdef class OctreeGPUNNPS(GPUNNPS):
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,             # <<<<<<<<<<<<<<
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,
+ *                  bint cache=True, bint sort_gids=False,
+ */
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_1__init__(PyObject *__pyx_v_self, PyObject *__pyx_args, PyObject *__pyx_kwds); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_1__init__(PyObject *__pyx_v_self, PyObject *__pyx_args, PyObject *__pyx_kwds) {
+  int __pyx_v_dim;
+  PyObject *__pyx_v_particles = 0;
+  double __pyx_v_radius_scale;
+  int __pyx_v_ghost_layers;
+  PyObject *__pyx_v_domain = 0;
+  CYTHON_UNUSED int __pyx_v_fixed_h;
+  int __pyx_v_cache;
+  int __pyx_v_sort_gids;
+  PyObject *__pyx_v_allow_sort = 0;
+  PyObject *__pyx_v_leaf_size = 0;
+  int __pyx_v_use_elementwise;
+  int __pyx_v_use_partitions;
+  PyObject *__pyx_v_backend = 0;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__init__ (wrapper)", 0);
+  {
+    static PyObject **__pyx_pyargnames[] = {&__pyx_n_s_dim,&__pyx_n_s_particles,&__pyx_n_s_radius_scale,&__pyx_n_s_ghost_layers,&__pyx_n_s_domain,&__pyx_n_s_fixed_h,&__pyx_n_s_cache,&__pyx_n_s_sort_gids,&__pyx_n_s_allow_sort,&__pyx_n_s_leaf_size,&__pyx_n_s_use_elementwise,&__pyx_n_s_use_partitions,&__pyx_n_s_backend,0};
+    PyObject* values[13] = {0,0,0,0,0,0,0,0,0,0,0,0,0};
+
+    /* "pysph/base/octree_gpu_nnps.pyx":8
+ * cdef class OctreeGPUNNPS(GPUNNPS):
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,             # <<<<<<<<<<<<<<
+ *                  bint cache=True, bint sort_gids=False,
+ *                  allow_sort=False, leaf_size=32,
+ */
+    values[4] = ((PyObject *)Py_None);
+
+    /* "pysph/base/octree_gpu_nnps.pyx":10
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,
+ *                  bint cache=True, bint sort_gids=False,
+ *                  allow_sort=False, leaf_size=32,             # <<<<<<<<<<<<<<
+ *                  bint use_elementwise=False, bint use_partitions=False,
+ *                  backend=None):
+ */
+    values[8] = ((PyObject *)Py_False);
+    values[9] = ((PyObject *)__pyx_int_32);
+
+    /* "pysph/base/octree_gpu_nnps.pyx":12
+ *                  allow_sort=False, leaf_size=32,
+ *                  bint use_elementwise=False, bint use_partitions=False,
+ *                  backend=None):             # <<<<<<<<<<<<<<
+ *         GPUNNPS.__init__(
+ *             self, dim, particles, radius_scale, ghost_layers, domain,
+ */
+    values[12] = ((PyObject *)Py_None);
+    if (unlikely(__pyx_kwds)) {
+      Py_ssize_t kw_args;
+      const Py_ssize_t pos_args = PyTuple_GET_SIZE(__pyx_args);
+      switch (pos_args) {
+        case 13: values[12] = PyTuple_GET_ITEM(__pyx_args, 12);
+        CYTHON_FALLTHROUGH;
+        case 12: values[11] = PyTuple_GET_ITEM(__pyx_args, 11);
+        CYTHON_FALLTHROUGH;
+        case 11: values[10] = PyTuple_GET_ITEM(__pyx_args, 10);
+        CYTHON_FALLTHROUGH;
+        case 10: values[9] = PyTuple_GET_ITEM(__pyx_args, 9);
+        CYTHON_FALLTHROUGH;
+        case  9: values[8] = PyTuple_GET_ITEM(__pyx_args, 8);
+        CYTHON_FALLTHROUGH;
+        case  8: values[7] = PyTuple_GET_ITEM(__pyx_args, 7);
+        CYTHON_FALLTHROUGH;
+        case  7: values[6] = PyTuple_GET_ITEM(__pyx_args, 6);
+        CYTHON_FALLTHROUGH;
+        case  6: values[5] = PyTuple_GET_ITEM(__pyx_args, 5);
+        CYTHON_FALLTHROUGH;
+        case  5: values[4] = PyTuple_GET_ITEM(__pyx_args, 4);
+        CYTHON_FALLTHROUGH;
+        case  4: values[3] = PyTuple_GET_ITEM(__pyx_args, 3);
+        CYTHON_FALLTHROUGH;
+        case  3: values[2] = PyTuple_GET_ITEM(__pyx_args, 2);
+        CYTHON_FALLTHROUGH;
+        case  2: values[1] = PyTuple_GET_ITEM(__pyx_args, 1);
+        CYTHON_FALLTHROUGH;
+        case  1: values[0] = PyTuple_GET_ITEM(__pyx_args, 0);
+        CYTHON_FALLTHROUGH;
+        case  0: break;
+        default: goto __pyx_L5_argtuple_error;
+      }
+      kw_args = PyDict_Size(__pyx_kwds);
+      switch (pos_args) {
+        case  0:
+        if (likely((values[0] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_dim)) != 0)) kw_args--;
+        else goto __pyx_L5_argtuple_error;
+        CYTHON_FALLTHROUGH;
+        case  1:
+        if (likely((values[1] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_particles)) != 0)) kw_args--;
+        else {
+          __Pyx_RaiseArgtupleInvalid("__init__", 0, 2, 13, 1); __PYX_ERR(0, 7, __pyx_L3_error)
+        }
+        CYTHON_FALLTHROUGH;
+        case  2:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_radius_scale);
+          if (value) { values[2] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  3:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_ghost_layers);
+          if (value) { values[3] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  4:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_domain);
+          if (value) { values[4] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  5:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_fixed_h);
+          if (value) { values[5] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  6:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_cache);
+          if (value) { values[6] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  7:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_sort_gids);
+          if (value) { values[7] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  8:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_allow_sort);
+          if (value) { values[8] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case  9:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_leaf_size);
+          if (value) { values[9] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case 10:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_use_elementwise);
+          if (value) { values[10] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case 11:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_use_partitions);
+          if (value) { values[11] = value; kw_args--; }
+        }
+        CYTHON_FALLTHROUGH;
+        case 12:
+        if (kw_args > 0) {
+          PyObject* value = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_backend);
+          if (value) { values[12] = value; kw_args--; }
+        }
+      }
+      if (unlikely(kw_args > 0)) {
+        if (unlikely(__Pyx_ParseOptionalKeywords(__pyx_kwds, __pyx_pyargnames, 0, values, pos_args, "__init__") < 0)) __PYX_ERR(0, 7, __pyx_L3_error)
+      }
+    } else {
+      switch (PyTuple_GET_SIZE(__pyx_args)) {
+        case 13: values[12] = PyTuple_GET_ITEM(__pyx_args, 12);
+        CYTHON_FALLTHROUGH;
+        case 12: values[11] = PyTuple_GET_ITEM(__pyx_args, 11);
+        CYTHON_FALLTHROUGH;
+        case 11: values[10] = PyTuple_GET_ITEM(__pyx_args, 10);
+        CYTHON_FALLTHROUGH;
+        case 10: values[9] = PyTuple_GET_ITEM(__pyx_args, 9);
+        CYTHON_FALLTHROUGH;
+        case  9: values[8] = PyTuple_GET_ITEM(__pyx_args, 8);
+        CYTHON_FALLTHROUGH;
+        case  8: values[7] = PyTuple_GET_ITEM(__pyx_args, 7);
+        CYTHON_FALLTHROUGH;
+        case  7: values[6] = PyTuple_GET_ITEM(__pyx_args, 6);
+        CYTHON_FALLTHROUGH;
+        case  6: values[5] = PyTuple_GET_ITEM(__pyx_args, 5);
+        CYTHON_FALLTHROUGH;
+        case  5: values[4] = PyTuple_GET_ITEM(__pyx_args, 4);
+        CYTHON_FALLTHROUGH;
+        case  4: values[3] = PyTuple_GET_ITEM(__pyx_args, 3);
+        CYTHON_FALLTHROUGH;
+        case  3: values[2] = PyTuple_GET_ITEM(__pyx_args, 2);
+        CYTHON_FALLTHROUGH;
+        case  2: values[1] = PyTuple_GET_ITEM(__pyx_args, 1);
+        values[0] = PyTuple_GET_ITEM(__pyx_args, 0);
+        break;
+        default: goto __pyx_L5_argtuple_error;
+      }
+    }
+    __pyx_v_dim = __Pyx_PyInt_As_int(values[0]); if (unlikely((__pyx_v_dim == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 7, __pyx_L3_error)
+    __pyx_v_particles = ((PyObject*)values[1]);
+    if (values[2]) {
+      __pyx_v_radius_scale = __pyx_PyFloat_AsDouble(values[2]); if (unlikely((__pyx_v_radius_scale == (double)-1) && PyErr_Occurred())) __PYX_ERR(0, 7, __pyx_L3_error)
+    } else {
+      __pyx_v_radius_scale = ((double)2.0);
+    }
+    if (values[3]) {
+      __pyx_v_ghost_layers = __Pyx_PyInt_As_int(values[3]); if (unlikely((__pyx_v_ghost_layers == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 8, __pyx_L3_error)
+    } else {
+      __pyx_v_ghost_layers = ((int)1);
+    }
+    __pyx_v_domain = values[4];
+    if (values[5]) {
+      __pyx_v_fixed_h = __Pyx_PyObject_IsTrue(values[5]); if (unlikely((__pyx_v_fixed_h == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 8, __pyx_L3_error)
+    } else {
+
+      /* "pysph/base/octree_gpu_nnps.pyx":8
+ * cdef class OctreeGPUNNPS(GPUNNPS):
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,             # <<<<<<<<<<<<<<
+ *                  bint cache=True, bint sort_gids=False,
+ *                  allow_sort=False, leaf_size=32,
+ */
+      __pyx_v_fixed_h = ((int)0);
+    }
+    if (values[6]) {
+      __pyx_v_cache = __Pyx_PyObject_IsTrue(values[6]); if (unlikely((__pyx_v_cache == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 9, __pyx_L3_error)
+    } else {
+
+      /* "pysph/base/octree_gpu_nnps.pyx":9
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,
+ *                  bint cache=True, bint sort_gids=False,             # <<<<<<<<<<<<<<
+ *                  allow_sort=False, leaf_size=32,
+ *                  bint use_elementwise=False, bint use_partitions=False,
+ */
+      __pyx_v_cache = ((int)1);
+    }
+    if (values[7]) {
+      __pyx_v_sort_gids = __Pyx_PyObject_IsTrue(values[7]); if (unlikely((__pyx_v_sort_gids == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 9, __pyx_L3_error)
+    } else {
+      __pyx_v_sort_gids = ((int)0);
+    }
+    __pyx_v_allow_sort = values[8];
+    __pyx_v_leaf_size = values[9];
+    if (values[10]) {
+      __pyx_v_use_elementwise = __Pyx_PyObject_IsTrue(values[10]); if (unlikely((__pyx_v_use_elementwise == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 11, __pyx_L3_error)
+    } else {
+
+      /* "pysph/base/octree_gpu_nnps.pyx":11
+ *                  bint cache=True, bint sort_gids=False,
+ *                  allow_sort=False, leaf_size=32,
+ *                  bint use_elementwise=False, bint use_partitions=False,             # <<<<<<<<<<<<<<
+ *                  backend=None):
+ *         GPUNNPS.__init__(
+ */
+      __pyx_v_use_elementwise = ((int)0);
+    }
+    if (values[11]) {
+      __pyx_v_use_partitions = __Pyx_PyObject_IsTrue(values[11]); if (unlikely((__pyx_v_use_partitions == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 11, __pyx_L3_error)
+    } else {
+      __pyx_v_use_partitions = ((int)0);
+    }
+    __pyx_v_backend = values[12];
+  }
+  goto __pyx_L4_argument_unpacking_done;
+  __pyx_L5_argtuple_error:;
+  __Pyx_RaiseArgtupleInvalid("__init__", 0, 2, 13, PyTuple_GET_SIZE(__pyx_args)); __PYX_ERR(0, 7, __pyx_L3_error)
+  __pyx_L3_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.__init__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __Pyx_RefNannyFinishContext();
+  return -1;
+  __pyx_L4_argument_unpacking_done:;
+  if (unlikely(!__Pyx_ArgTypeTest(((PyObject *)__pyx_v_particles), (&PyList_Type), 1, "particles", 1))) __PYX_ERR(0, 7, __pyx_L1_error)
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS___init__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), __pyx_v_dim, __pyx_v_particles, __pyx_v_radius_scale, __pyx_v_ghost_layers, __pyx_v_domain, __pyx_v_fixed_h, __pyx_v_cache, __pyx_v_sort_gids, __pyx_v_allow_sort, __pyx_v_leaf_size, __pyx_v_use_elementwise, __pyx_v_use_partitions, __pyx_v_backend);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":7
+ * 
+ * cdef class OctreeGPUNNPS(GPUNNPS):
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,             # <<<<<<<<<<<<<<
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,
+ *                  bint cache=True, bint sort_gids=False,
+ */
+
+  /* function exit code */
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS___init__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_dim, PyObject *__pyx_v_particles, double __pyx_v_radius_scale, int __pyx_v_ghost_layers, PyObject *__pyx_v_domain, CYTHON_UNUSED int __pyx_v_fixed_h, int __pyx_v_cache, int __pyx_v_sort_gids, PyObject *__pyx_v_allow_sort, PyObject *__pyx_v_leaf_size, int __pyx_v_use_elementwise, int __pyx_v_use_partitions, PyObject *__pyx_v_backend) {
+  int __pyx_v_i;
+  PyObject *__pyx_v_warn = NULL;
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  PyObject *__pyx_t_7 = NULL;
+  int __pyx_t_8;
+  int __pyx_t_9;
+  int __pyx_t_10;
+  int __pyx_t_11;
+  int __pyx_t_12;
+  int __pyx_t_13;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__init__", 0);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":13
+ *                  bint use_elementwise=False, bint use_partitions=False,
+ *                  backend=None):
+ *         GPUNNPS.__init__(             # <<<<<<<<<<<<<<
+ *             self, dim, particles, radius_scale, ghost_layers, domain,
+ *             cache, sort_gids, backend=backend
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS), __pyx_n_s_init); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 13, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":14
+ *                  backend=None):
+ *         GPUNNPS.__init__(
+ *             self, dim, particles, radius_scale, ghost_layers, domain,             # <<<<<<<<<<<<<<
+ *             cache, sort_gids, backend=backend
+ *         )
+ */
+  __pyx_t_2 = __Pyx_PyInt_From_int(__pyx_v_dim); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 14, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyFloat_FromDouble(__pyx_v_radius_scale); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 14, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_4 = __Pyx_PyInt_From_int(__pyx_v_ghost_layers); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 14, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":15
+ *         GPUNNPS.__init__(
+ *             self, dim, particles, radius_scale, ghost_layers, domain,
+ *             cache, sort_gids, backend=backend             # <<<<<<<<<<<<<<
+ *         )
+ * 
+ */
+  __pyx_t_5 = __Pyx_PyBool_FromLong(__pyx_v_cache); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 15, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __pyx_t_6 = __Pyx_PyBool_FromLong(__pyx_v_sort_gids); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 15, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":13
+ *                  bint use_elementwise=False, bint use_partitions=False,
+ *                  backend=None):
+ *         GPUNNPS.__init__(             # <<<<<<<<<<<<<<
+ *             self, dim, particles, radius_scale, ghost_layers, domain,
+ *             cache, sort_gids, backend=backend
+ */
+  __pyx_t_7 = PyTuple_New(8); if (unlikely(!__pyx_t_7)) __PYX_ERR(0, 13, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_7);
+  __Pyx_INCREF(((PyObject *)__pyx_v_self));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self));
+  PyTuple_SET_ITEM(__pyx_t_7, 0, ((PyObject *)__pyx_v_self));
+  __Pyx_GIVEREF(__pyx_t_2);
+  PyTuple_SET_ITEM(__pyx_t_7, 1, __pyx_t_2);
+  __Pyx_INCREF(__pyx_v_particles);
+  __Pyx_GIVEREF(__pyx_v_particles);
+  PyTuple_SET_ITEM(__pyx_t_7, 2, __pyx_v_particles);
+  __Pyx_GIVEREF(__pyx_t_3);
+  PyTuple_SET_ITEM(__pyx_t_7, 3, __pyx_t_3);
+  __Pyx_GIVEREF(__pyx_t_4);
+  PyTuple_SET_ITEM(__pyx_t_7, 4, __pyx_t_4);
+  __Pyx_INCREF(__pyx_v_domain);
+  __Pyx_GIVEREF(__pyx_v_domain);
+  PyTuple_SET_ITEM(__pyx_t_7, 5, __pyx_v_domain);
+  __Pyx_GIVEREF(__pyx_t_5);
+  PyTuple_SET_ITEM(__pyx_t_7, 6, __pyx_t_5);
+  __Pyx_GIVEREF(__pyx_t_6);
+  PyTuple_SET_ITEM(__pyx_t_7, 7, __pyx_t_6);
+  __pyx_t_2 = 0;
+  __pyx_t_3 = 0;
+  __pyx_t_4 = 0;
+  __pyx_t_5 = 0;
+  __pyx_t_6 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":15
+ *         GPUNNPS.__init__(
+ *             self, dim, particles, radius_scale, ghost_layers, domain,
+ *             cache, sort_gids, backend=backend             # <<<<<<<<<<<<<<
+ *         )
+ * 
+ */
+  __pyx_t_6 = __Pyx_PyDict_NewPresized(1); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 15, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+  if (PyDict_SetItem(__pyx_t_6, __pyx_n_s_backend, __pyx_v_backend) < 0) __PYX_ERR(0, 15, __pyx_L1_error)
+
+  /* "pysph/base/octree_gpu_nnps.pyx":13
+ *                  bint use_elementwise=False, bint use_partitions=False,
+ *                  backend=None):
+ *         GPUNNPS.__init__(             # <<<<<<<<<<<<<<
+ *             self, dim, particles, radius_scale, ghost_layers, domain,
+ *             cache, sort_gids, backend=backend
+ */
+  __pyx_t_5 = __Pyx_PyObject_Call(__pyx_t_1, __pyx_t_7, __pyx_t_6); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 13, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_7); __pyx_t_7 = 0;
+  __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":18
+ *         )
+ * 
+ *         self.src_index = -1             # <<<<<<<<<<<<<<
+ *         self.dst_index = -1
+ *         self.sort_gids = sort_gids
+ */
+  __pyx_v_self->__pyx_base.__pyx_base.src_index = -1;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":19
+ * 
+ *         self.src_index = -1
+ *         self.dst_index = -1             # <<<<<<<<<<<<<<
+ *         self.sort_gids = sort_gids
+ *         self.leaf_size = leaf_size
+ */
+  __pyx_v_self->__pyx_base.__pyx_base.dst_index = -1;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":20
+ *         self.src_index = -1
+ *         self.dst_index = -1
+ *         self.sort_gids = sort_gids             # <<<<<<<<<<<<<<
+ *         self.leaf_size = leaf_size
+ * 
+ */
+  __pyx_v_self->__pyx_base.sort_gids = __pyx_v_sort_gids;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":21
+ *         self.dst_index = -1
+ *         self.sort_gids = sort_gids
+ *         self.leaf_size = leaf_size             # <<<<<<<<<<<<<<
+ * 
+ *         cdef NNPSParticleArrayWrapper pa_wrapper
+ */
+  __Pyx_INCREF(__pyx_v_leaf_size);
+  __Pyx_GIVEREF(__pyx_v_leaf_size);
+  __Pyx_GOTREF(__pyx_v_self->leaf_size);
+  __Pyx_DECREF(__pyx_v_self->leaf_size);
+  __pyx_v_self->leaf_size = __pyx_v_leaf_size;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":26
+ *         cdef int i, num_particles
+ * 
+ *         self.octrees = []             # <<<<<<<<<<<<<<
+ * 
+ *         if self.use_double:
+ */
+  __pyx_t_5 = PyList_New(0); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 26, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_GIVEREF(__pyx_t_5);
+  __Pyx_GOTREF(__pyx_v_self->octrees);
+  __Pyx_DECREF(__pyx_v_self->octrees);
+  __pyx_v_self->octrees = ((PyObject*)__pyx_t_5);
+  __pyx_t_5 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":28
+ *         self.octrees = []
+ * 
+ *         if self.use_double:             # <<<<<<<<<<<<<<
+ *             from warnings import warn
+ *             warn("Octree NNPS by default uses single precision arithmetic for"
+ */
+  __pyx_t_8 = (__pyx_v_self->__pyx_base.use_double != 0);
+  if (__pyx_t_8) {
+
+    /* "pysph/base/octree_gpu_nnps.pyx":29
+ * 
+ *         if self.use_double:
+ *             from warnings import warn             # <<<<<<<<<<<<<<
+ *             warn("Octree NNPS by default uses single precision arithmetic for"
+ *                  "finding neighbors. A few particles outside of the original "
+ */
+    __pyx_t_5 = PyList_New(1); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 29, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_5);
+    __Pyx_INCREF(__pyx_n_s_warn);
+    __Pyx_GIVEREF(__pyx_n_s_warn);
+    PyList_SET_ITEM(__pyx_t_5, 0, __pyx_n_s_warn);
+    __pyx_t_6 = __Pyx_Import(__pyx_n_s_warnings, __pyx_t_5, 0); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 29, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_6);
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+    __pyx_t_5 = __Pyx_ImportFrom(__pyx_t_6, __pyx_n_s_warn); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 29, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_5);
+    __Pyx_INCREF(__pyx_t_5);
+    __pyx_v_warn = __pyx_t_5;
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+    __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":30
+ *         if self.use_double:
+ *             from warnings import warn
+ *             warn("Octree NNPS by default uses single precision arithmetic for"             # <<<<<<<<<<<<<<
+ *                  "finding neighbors. A few particles outside of the original "
+ *                  "search radius might be included.")
+ */
+    __Pyx_INCREF(__pyx_v_warn);
+    __pyx_t_5 = __pyx_v_warn; __pyx_t_7 = NULL;
+    if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_5))) {
+      __pyx_t_7 = PyMethod_GET_SELF(__pyx_t_5);
+      if (likely(__pyx_t_7)) {
+        PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_5);
+        __Pyx_INCREF(__pyx_t_7);
+        __Pyx_INCREF(function);
+        __Pyx_DECREF_SET(__pyx_t_5, function);
+      }
+    }
+    __pyx_t_6 = (__pyx_t_7) ? __Pyx_PyObject_Call2Args(__pyx_t_5, __pyx_t_7, __pyx_kp_u_Octree_NNPS_by_default_uses_sing) : __Pyx_PyObject_CallOneArg(__pyx_t_5, __pyx_kp_u_Octree_NNPS_by_default_uses_sing);
+    __Pyx_XDECREF(__pyx_t_7); __pyx_t_7 = 0;
+    if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 30, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_6);
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+    __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":28
+ *         self.octrees = []
+ * 
+ *         if self.use_double:             # <<<<<<<<<<<<<<
+ *             from warnings import warn
+ *             warn("Octree NNPS by default uses single precision arithmetic for"
+ */
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":34
+ *                  "search radius might be included.")
+ * 
+ *         for i in range(self.narrays):             # <<<<<<<<<<<<<<
+ *             self.octrees.append(PointTree(pa=self.pa_wrappers[i].pa,
+ *                                           radius_scale=radius_scale,
+ */
+  __pyx_t_9 = __pyx_v_self->__pyx_base.__pyx_base.narrays;
+  __pyx_t_10 = __pyx_t_9;
+  for (__pyx_t_11 = 0; __pyx_t_11 < __pyx_t_10; __pyx_t_11+=1) {
+    __pyx_v_i = __pyx_t_11;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":35
+ * 
+ *         for i in range(self.narrays):
+ *             self.octrees.append(PointTree(pa=self.pa_wrappers[i].pa,             # <<<<<<<<<<<<<<
+ *                                           radius_scale=radius_scale,
+ *                                           use_double=self.use_double,
+ */
+    if (unlikely(__pyx_v_self->octrees == Py_None)) {
+      PyErr_Format(PyExc_AttributeError, "'NoneType' object has no attribute '%.30s'", "append");
+      __PYX_ERR(0, 35, __pyx_L1_error)
+    }
+    __Pyx_GetModuleGlobalName(__pyx_t_6, __pyx_n_s_PointTree); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_6);
+    __pyx_t_5 = __Pyx_PyDict_NewPresized(5); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_5);
+    if (unlikely(__pyx_v_self->__pyx_base.__pyx_base.pa_wrappers == Py_None)) {
+      PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+      __PYX_ERR(0, 35, __pyx_L1_error)
+    }
+    __pyx_t_7 = __Pyx_GetItemInt_List(__pyx_v_self->__pyx_base.__pyx_base.pa_wrappers, __pyx_v_i, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_7)) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_7);
+    __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_t_7, __pyx_n_s_pa); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_7); __pyx_t_7 = 0;
+    if (PyDict_SetItem(__pyx_t_5, __pyx_n_s_pa, __pyx_t_1) < 0) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":36
+ *         for i in range(self.narrays):
+ *             self.octrees.append(PointTree(pa=self.pa_wrappers[i].pa,
+ *                                           radius_scale=radius_scale,             # <<<<<<<<<<<<<<
+ *                                           use_double=self.use_double,
+ *                                           leaf_size=leaf_size, dim=dim))
+ */
+    __pyx_t_1 = PyFloat_FromDouble(__pyx_v_radius_scale); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 36, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    if (PyDict_SetItem(__pyx_t_5, __pyx_n_s_radius_scale, __pyx_t_1) < 0) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":37
+ *             self.octrees.append(PointTree(pa=self.pa_wrappers[i].pa,
+ *                                           radius_scale=radius_scale,
+ *                                           use_double=self.use_double,             # <<<<<<<<<<<<<<
+ *                                           leaf_size=leaf_size, dim=dim))
+ *         self.use_elementwise = use_elementwise
+ */
+    __pyx_t_1 = __Pyx_PyBool_FromLong(__pyx_v_self->__pyx_base.use_double); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 37, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    if (PyDict_SetItem(__pyx_t_5, __pyx_n_s_use_double, __pyx_t_1) < 0) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":38
+ *                                           radius_scale=radius_scale,
+ *                                           use_double=self.use_double,
+ *                                           leaf_size=leaf_size, dim=dim))             # <<<<<<<<<<<<<<
+ *         self.use_elementwise = use_elementwise
+ *         self.use_partitions = use_partitions
+ */
+    if (PyDict_SetItem(__pyx_t_5, __pyx_n_s_leaf_size, __pyx_v_leaf_size) < 0) __PYX_ERR(0, 35, __pyx_L1_error)
+    __pyx_t_1 = __Pyx_PyInt_From_int(__pyx_v_dim); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 38, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    if (PyDict_SetItem(__pyx_t_5, __pyx_n_s_dim, __pyx_t_1) < 0) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":35
+ * 
+ *         for i in range(self.narrays):
+ *             self.octrees.append(PointTree(pa=self.pa_wrappers[i].pa,             # <<<<<<<<<<<<<<
+ *                                           radius_scale=radius_scale,
+ *                                           use_double=self.use_double,
+ */
+    __pyx_t_1 = __Pyx_PyObject_Call(__pyx_t_6, __pyx_empty_tuple, __pyx_t_5); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+    __pyx_t_12 = __Pyx_PyList_Append(__pyx_v_self->octrees, __pyx_t_1); if (unlikely(__pyx_t_12 == ((int)-1))) __PYX_ERR(0, 35, __pyx_L1_error)
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":39
+ *                                           use_double=self.use_double,
+ *                                           leaf_size=leaf_size, dim=dim))
+ *         self.use_elementwise = use_elementwise             # <<<<<<<<<<<<<<
+ *         self.use_partitions = use_partitions
+ *         self.allow_sort = allow_sort
+ */
+  __pyx_v_self->use_elementwise = __pyx_v_use_elementwise;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":40
+ *                                           leaf_size=leaf_size, dim=dim))
+ *         self.use_elementwise = use_elementwise
+ *         self.use_partitions = use_partitions             # <<<<<<<<<<<<<<
+ *         self.allow_sort = allow_sort
+ *         self.domain.update()
+ */
+  __pyx_v_self->use_partitions = __pyx_v_use_partitions;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":41
+ *         self.use_elementwise = use_elementwise
+ *         self.use_partitions = use_partitions
+ *         self.allow_sort = allow_sort             # <<<<<<<<<<<<<<
+ *         self.domain.update()
+ *         self.update()
+ */
+  __pyx_t_8 = __Pyx_PyObject_IsTrue(__pyx_v_allow_sort); if (unlikely((__pyx_t_8 == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 41, __pyx_L1_error)
+  __pyx_v_self->allow_sort = __pyx_t_8;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":42
+ *         self.use_partitions = use_partitions
+ *         self.allow_sort = allow_sort
+ *         self.domain.update()             # <<<<<<<<<<<<<<
+ *         self.update()
+ * 
+ */
+  __pyx_t_5 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.domain), __pyx_n_s_update); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 42, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __pyx_t_6 = NULL;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_5))) {
+    __pyx_t_6 = PyMethod_GET_SELF(__pyx_t_5);
+    if (likely(__pyx_t_6)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_5);
+      __Pyx_INCREF(__pyx_t_6);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_5, function);
+    }
+  }
+  __pyx_t_1 = (__pyx_t_6) ? __Pyx_PyObject_CallOneArg(__pyx_t_5, __pyx_t_6) : __Pyx_PyObject_CallNoArg(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6); __pyx_t_6 = 0;
+  if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 42, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":43
+ *         self.allow_sort = allow_sort
+ *         self.domain.update()
+ *         self.update()             # <<<<<<<<<<<<<<
+ * 
+ *         # Check if device supports required workgroup size,
+ */
+  __pyx_t_1 = ((struct __pyx_vtabstruct_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self->__pyx_base.__pyx_base.__pyx_vtab)->__pyx_base.update(((struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *)__pyx_v_self), 0); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 43, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":47
+ *         # Check if device supports required workgroup size,
+ *         # else default to elementwise nnps
+ *         if not self.octrees[0]._is_valid_nnps_wgs():             # <<<<<<<<<<<<<<
+ *             from warnings import warn
+ *             warn("Octree NNPS with given leaf size (%d) is "
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 47, __pyx_L1_error)
+  }
+  __pyx_t_5 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, 0, long, 1, __Pyx_PyInt_From_long, 1, 0, 1); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 47, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __pyx_t_6 = __Pyx_PyObject_GetAttrStr(__pyx_t_5, __pyx_n_s_is_valid_nnps_wgs); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 47, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __pyx_t_5 = NULL;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_6))) {
+    __pyx_t_5 = PyMethod_GET_SELF(__pyx_t_6);
+    if (likely(__pyx_t_5)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_6);
+      __Pyx_INCREF(__pyx_t_5);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_6, function);
+    }
+  }
+  __pyx_t_1 = (__pyx_t_5) ? __Pyx_PyObject_CallOneArg(__pyx_t_6, __pyx_t_5) : __Pyx_PyObject_CallNoArg(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_5); __pyx_t_5 = 0;
+  if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 47, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+  __pyx_t_8 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely(__pyx_t_8 < 0)) __PYX_ERR(0, 47, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_13 = ((!__pyx_t_8) != 0);
+  if (__pyx_t_13) {
+
+    /* "pysph/base/octree_gpu_nnps.pyx":48
+ *         # else default to elementwise nnps
+ *         if not self.octrees[0]._is_valid_nnps_wgs():
+ *             from warnings import warn             # <<<<<<<<<<<<<<
+ *             warn("Octree NNPS with given leaf size (%d) is "
+ *                  "not supported for given device. Switching to a elementwise "
+ */
+    __pyx_t_1 = PyList_New(1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 48, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_INCREF(__pyx_n_s_warn);
+    __Pyx_GIVEREF(__pyx_n_s_warn);
+    PyList_SET_ITEM(__pyx_t_1, 0, __pyx_n_s_warn);
+    __pyx_t_6 = __Pyx_Import(__pyx_n_s_warnings, __pyx_t_1, 0); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 48, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_6);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __pyx_t_1 = __Pyx_ImportFrom(__pyx_t_6, __pyx_n_s_warn); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 48, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_INCREF(__pyx_t_1);
+    __Pyx_XDECREF_SET(__pyx_v_warn, __pyx_t_1);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":51
+ *             warn("Octree NNPS with given leaf size (%d) is "
+ *                  "not supported for given device. Switching to a elementwise "
+ *                  "version of the Octree NNPS" % leaf_size)             # <<<<<<<<<<<<<<
+ * 
+ *             self.use_elementwise = True
+ */
+    __pyx_t_1 = __Pyx_PyUnicode_FormatSafe(__pyx_kp_u_Octree_NNPS_with_given_leaf_size, __pyx_v_leaf_size); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 51, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_INCREF(__pyx_v_warn);
+    __pyx_t_5 = __pyx_v_warn; __pyx_t_7 = NULL;
+    if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_5))) {
+      __pyx_t_7 = PyMethod_GET_SELF(__pyx_t_5);
+      if (likely(__pyx_t_7)) {
+        PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_5);
+        __Pyx_INCREF(__pyx_t_7);
+        __Pyx_INCREF(function);
+        __Pyx_DECREF_SET(__pyx_t_5, function);
+      }
+    }
+    __pyx_t_6 = (__pyx_t_7) ? __Pyx_PyObject_Call2Args(__pyx_t_5, __pyx_t_7, __pyx_t_1) : __Pyx_PyObject_CallOneArg(__pyx_t_5, __pyx_t_1);
+    __Pyx_XDECREF(__pyx_t_7); __pyx_t_7 = 0;
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 49, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_6);
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+    __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":53
+ *                  "version of the Octree NNPS" % leaf_size)
+ * 
+ *             self.use_elementwise = True             # <<<<<<<<<<<<<<
+ * 
+ *     cpdef _bin(self, int pa_index):
+ */
+    __pyx_v_self->use_elementwise = 1;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":47
+ *         # Check if device supports required workgroup size,
+ *         # else default to elementwise nnps
+ *         if not self.octrees[0]._is_valid_nnps_wgs():             # <<<<<<<<<<<<<<
+ *             from warnings import warn
+ *             warn("Octree NNPS with given leaf size (%d) is "
+ */
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":7
+ * 
+ * cdef class OctreeGPUNNPS(GPUNNPS):
+ *     def __init__(self, int dim, list particles, double radius_scale=2.0,             # <<<<<<<<<<<<<<
+ *                  int ghost_layers=1, domain=None, bint fixed_h=False,
+ *                  bint cache=True, bint sort_gids=False,
+ */
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_7);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.__init__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_warn);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":55
+ *             self.use_elementwise = True
+ * 
+ *     cpdef _bin(self, int pa_index):             # <<<<<<<<<<<<<<
+ *         self.octrees[pa_index].refresh(self.xmin, self.xmax,
+ *                                        self.domain.manager.hmin)
+ */
+
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_3_bin(PyObject *__pyx_v_self, PyObject *__pyx_arg_pa_index); /*proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__bin(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_pa_index, int __pyx_skip_dispatch) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  int __pyx_t_6;
+  int __pyx_t_7;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("_bin", 0);
+  /* Check if called by wrapper */
+  if (unlikely(__pyx_skip_dispatch)) ;
+  /* Check if overridden in Python */
+  else if (unlikely((Py_TYPE(((PyObject *)__pyx_v_self))->tp_dictoffset != 0) || (Py_TYPE(((PyObject *)__pyx_v_self))->tp_flags & (Py_TPFLAGS_IS_ABSTRACT | Py_TPFLAGS_HEAPTYPE)))) {
+    #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    static PY_UINT64_T __pyx_tp_dict_version = __PYX_DICT_VERSION_INIT, __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+    if (unlikely(!__Pyx_object_dict_version_matches(((PyObject *)__pyx_v_self), __pyx_tp_dict_version, __pyx_obj_dict_version))) {
+      PY_UINT64_T __pyx_type_dict_guard = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      #endif
+      __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_self), __pyx_n_s_bin); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 55, __pyx_L1_error)
+      __Pyx_GOTREF(__pyx_t_1);
+      if (!PyCFunction_Check(__pyx_t_1) || (PyCFunction_GET_FUNCTION(__pyx_t_1) != (PyCFunction)(void*)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_3_bin)) {
+        __Pyx_XDECREF(__pyx_r);
+        __pyx_t_3 = __Pyx_PyInt_From_int(__pyx_v_pa_index); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 55, __pyx_L1_error)
+        __Pyx_GOTREF(__pyx_t_3);
+        __Pyx_INCREF(__pyx_t_1);
+        __pyx_t_4 = __pyx_t_1; __pyx_t_5 = NULL;
+        if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_4))) {
+          __pyx_t_5 = PyMethod_GET_SELF(__pyx_t_4);
+          if (likely(__pyx_t_5)) {
+            PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_4);
+            __Pyx_INCREF(__pyx_t_5);
+            __Pyx_INCREF(function);
+            __Pyx_DECREF_SET(__pyx_t_4, function);
+          }
+        }
+        __pyx_t_2 = (__pyx_t_5) ? __Pyx_PyObject_Call2Args(__pyx_t_4, __pyx_t_5, __pyx_t_3) : __Pyx_PyObject_CallOneArg(__pyx_t_4, __pyx_t_3);
+        __Pyx_XDECREF(__pyx_t_5); __pyx_t_5 = 0;
+        __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+        if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 55, __pyx_L1_error)
+        __Pyx_GOTREF(__pyx_t_2);
+        __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+        __pyx_r = __pyx_t_2;
+        __pyx_t_2 = 0;
+        __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+        goto __pyx_L0;
+      }
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+      __pyx_tp_dict_version = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      __pyx_obj_dict_version = __Pyx_get_object_dict_version(((PyObject *)__pyx_v_self));
+      if (unlikely(__pyx_type_dict_guard != __pyx_tp_dict_version)) {
+        __pyx_tp_dict_version = __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+      }
+      #endif
+      __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    }
+    #endif
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":56
+ * 
+ *     cpdef _bin(self, int pa_index):
+ *         self.octrees[pa_index].refresh(self.xmin, self.xmax,             # <<<<<<<<<<<<<<
+ *                                        self.domain.manager.hmin)
+ *         self.octrees[pa_index].set_node_bounds()
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 56, __pyx_L1_error)
+  }
+  __pyx_t_2 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_pa_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 56, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(__pyx_t_2, __pyx_n_s_refresh); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 56, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":57
+ *     cpdef _bin(self, int pa_index):
+ *         self.octrees[pa_index].refresh(self.xmin, self.xmax,
+ *                                        self.domain.manager.hmin)             # <<<<<<<<<<<<<<
+ *         self.octrees[pa_index].set_node_bounds()
+ * 
+ */
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_v_self->__pyx_base.__pyx_base.domain->manager, __pyx_n_s_hmin); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 57, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = NULL;
+  __pyx_t_6 = 0;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_4))) {
+    __pyx_t_3 = PyMethod_GET_SELF(__pyx_t_4);
+    if (likely(__pyx_t_3)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_4);
+      __Pyx_INCREF(__pyx_t_3);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_4, function);
+      __pyx_t_6 = 1;
+    }
+  }
+  #if CYTHON_FAST_PYCALL
+  if (PyFunction_Check(__pyx_t_4)) {
+    PyObject *__pyx_temp[4] = {__pyx_t_3, ((PyObject *)__pyx_v_self->__pyx_base.xmin), ((PyObject *)__pyx_v_self->__pyx_base.xmax), __pyx_t_2};
+    __pyx_t_1 = __Pyx_PyFunction_FastCall(__pyx_t_4, __pyx_temp+1-__pyx_t_6, 3+__pyx_t_6); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 56, __pyx_L1_error)
+    __Pyx_XDECREF(__pyx_t_3); __pyx_t_3 = 0;
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  } else
+  #endif
+  #if CYTHON_FAST_PYCCALL
+  if (__Pyx_PyFastCFunction_Check(__pyx_t_4)) {
+    PyObject *__pyx_temp[4] = {__pyx_t_3, ((PyObject *)__pyx_v_self->__pyx_base.xmin), ((PyObject *)__pyx_v_self->__pyx_base.xmax), __pyx_t_2};
+    __pyx_t_1 = __Pyx_PyCFunction_FastCall(__pyx_t_4, __pyx_temp+1-__pyx_t_6, 3+__pyx_t_6); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 56, __pyx_L1_error)
+    __Pyx_XDECREF(__pyx_t_3); __pyx_t_3 = 0;
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  } else
+  #endif
+  {
+    __pyx_t_5 = PyTuple_New(3+__pyx_t_6); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 56, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_5);
+    if (__pyx_t_3) {
+      __Pyx_GIVEREF(__pyx_t_3); PyTuple_SET_ITEM(__pyx_t_5, 0, __pyx_t_3); __pyx_t_3 = NULL;
+    }
+    __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.xmin));
+    __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.xmin));
+    PyTuple_SET_ITEM(__pyx_t_5, 0+__pyx_t_6, ((PyObject *)__pyx_v_self->__pyx_base.xmin));
+    __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.xmax));
+    __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.xmax));
+    PyTuple_SET_ITEM(__pyx_t_5, 1+__pyx_t_6, ((PyObject *)__pyx_v_self->__pyx_base.xmax));
+    __Pyx_GIVEREF(__pyx_t_2);
+    PyTuple_SET_ITEM(__pyx_t_5, 2+__pyx_t_6, __pyx_t_2);
+    __pyx_t_2 = 0;
+    __pyx_t_1 = __Pyx_PyObject_Call(__pyx_t_4, __pyx_t_5, NULL); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 56, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  }
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":58
+ *         self.octrees[pa_index].refresh(self.xmin, self.xmax,
+ *                                        self.domain.manager.hmin)
+ *         self.octrees[pa_index].set_node_bounds()             # <<<<<<<<<<<<<<
+ * 
+ *         if self.allow_sort:
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 58, __pyx_L1_error)
+  }
+  __pyx_t_4 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_pa_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 58, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_5 = __Pyx_PyObject_GetAttrStr(__pyx_t_4, __pyx_n_s_set_node_bounds); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 58, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = NULL;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_5))) {
+    __pyx_t_4 = PyMethod_GET_SELF(__pyx_t_5);
+    if (likely(__pyx_t_4)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_5);
+      __Pyx_INCREF(__pyx_t_4);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_5, function);
+    }
+  }
+  __pyx_t_1 = (__pyx_t_4) ? __Pyx_PyObject_CallOneArg(__pyx_t_5, __pyx_t_4) : __Pyx_PyObject_CallNoArg(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_4); __pyx_t_4 = 0;
+  if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 58, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":60
+ *         self.octrees[pa_index].set_node_bounds()
+ * 
+ *         if self.allow_sort:             # <<<<<<<<<<<<<<
+ *             self.spatially_order_particles(pa_index)
+ * 
+ */
+  __pyx_t_7 = (__pyx_v_self->allow_sort != 0);
+  if (__pyx_t_7) {
+
+    /* "pysph/base/octree_gpu_nnps.pyx":61
+ * 
+ *         if self.allow_sort:
+ *             self.spatially_order_particles(pa_index)             # <<<<<<<<<<<<<<
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):
+ */
+    __pyx_t_1 = ((struct __pyx_vtabstruct_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self->__pyx_base.__pyx_base.__pyx_vtab)->__pyx_base.spatially_order_particles(((struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *)__pyx_v_self), __pyx_v_pa_index, 0); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 61, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":60
+ *         self.octrees[pa_index].set_node_bounds()
+ * 
+ *         if self.allow_sort:             # <<<<<<<<<<<<<<
+ *             self.spatially_order_particles(pa_index)
+ * 
+ */
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":55
+ *             self.use_elementwise = True
+ * 
+ *     cpdef _bin(self, int pa_index):             # <<<<<<<<<<<<<<
+ *         self.octrees[pa_index].refresh(self.xmin, self.xmax,
+ *                                        self.domain.manager.hmin)
+ */
+
+  /* function exit code */
+  __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS._bin", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_3_bin(PyObject *__pyx_v_self, PyObject *__pyx_arg_pa_index); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_2_bin[] = "OctreeGPUNNPS._bin(self, int pa_index)";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_3_bin(PyObject *__pyx_v_self, PyObject *__pyx_arg_pa_index) {
+  int __pyx_v_pa_index;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("_bin (wrapper)", 0);
+  assert(__pyx_arg_pa_index); {
+    __pyx_v_pa_index = __Pyx_PyInt_As_int(__pyx_arg_pa_index); if (unlikely((__pyx_v_pa_index == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 55, __pyx_L3_error)
+  }
+  goto __pyx_L4_argument_unpacking_done;
+  __pyx_L3_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS._bin", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __Pyx_RefNannyFinishContext();
+  return NULL;
+  __pyx_L4_argument_unpacking_done:;
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_2_bin(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((int)__pyx_v_pa_index));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_2_bin(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_pa_index) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("_bin", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__bin(__pyx_v_self, __pyx_v_pa_index, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 55, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS._bin", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":63
+ *             self.spatially_order_particles(pa_index)
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):             # <<<<<<<<<<<<<<
+ *         def update():
+ *             self.octrees[pa_index]._sort()
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_5get_spatially_ordered_indices(PyObject *__pyx_v_self, PyObject *__pyx_arg_pa_index); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4get_spatially_ordered_indices[] = "OctreeGPUNNPS.get_spatially_ordered_indices(self, int pa_index)";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_5get_spatially_ordered_indices(PyObject *__pyx_v_self, PyObject *__pyx_arg_pa_index) {
+  int __pyx_v_pa_index;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("get_spatially_ordered_indices (wrapper)", 0);
+  assert(__pyx_arg_pa_index); {
+    __pyx_v_pa_index = __Pyx_PyInt_As_int(__pyx_arg_pa_index); if (unlikely((__pyx_v_pa_index == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 63, __pyx_L3_error)
+  }
+  goto __pyx_L4_argument_unpacking_done;
+  __pyx_L3_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.get_spatially_ordered_indices", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __Pyx_RefNannyFinishContext();
+  return NULL;
+  __pyx_L4_argument_unpacking_done:;
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4get_spatially_ordered_indices(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((int)__pyx_v_pa_index));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":64
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):
+ *         def update():             # <<<<<<<<<<<<<<
+ *             self.octrees[pa_index]._sort()
+ * 
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_1update(PyObject *__pyx_self, CYTHON_UNUSED PyObject *unused); /*proto*/
+static PyMethodDef __pyx_mdef_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_1update = {"update", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_1update, METH_NOARGS, 0};
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_1update(PyObject *__pyx_self, CYTHON_UNUSED PyObject *unused) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("update (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_update(__pyx_self);
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_update(PyObject *__pyx_self) {
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *__pyx_cur_scope;
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *__pyx_outer_scope;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("update", 0);
+  __pyx_outer_scope = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *) __Pyx_CyFunction_GetClosure(__pyx_self);
+  __pyx_cur_scope = __pyx_outer_scope;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":65
+ *     def get_spatially_ordered_indices(self, int pa_index):
+ *         def update():
+ *             self.octrees[pa_index]._sort()             # <<<<<<<<<<<<<<
+ * 
+ *         return self.octrees[pa_index].pids, update
+ */
+  if (unlikely(!__pyx_cur_scope->__pyx_v_self)) { __Pyx_RaiseClosureNameError("self"); __PYX_ERR(0, 65, __pyx_L1_error) }
+  if (unlikely(__pyx_cur_scope->__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 65, __pyx_L1_error)
+  }
+  __pyx_t_2 = __Pyx_GetItemInt_List(__pyx_cur_scope->__pyx_v_self->octrees, __pyx_cur_scope->__pyx_v_pa_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 65, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(__pyx_t_2, __pyx_n_s_sort); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 65, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_2 = NULL;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_3))) {
+    __pyx_t_2 = PyMethod_GET_SELF(__pyx_t_3);
+    if (likely(__pyx_t_2)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_3);
+      __Pyx_INCREF(__pyx_t_2);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_3, function);
+    }
+  }
+  __pyx_t_1 = (__pyx_t_2) ? __Pyx_PyObject_CallOneArg(__pyx_t_3, __pyx_t_2) : __Pyx_PyObject_CallNoArg(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_2); __pyx_t_2 = 0;
+  if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 65, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":64
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):
+ *         def update():             # <<<<<<<<<<<<<<
+ *             self.octrees[pa_index]._sort()
+ * 
+ */
+
+  /* function exit code */
+  __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.get_spatially_ordered_indices.update", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":63
+ *             self.spatially_order_particles(pa_index)
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):             # <<<<<<<<<<<<<<
+ *         def update():
+ *             self.octrees[pa_index]._sort()
+ */
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4get_spatially_ordered_indices(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_pa_index) {
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *__pyx_cur_scope;
+  PyObject *__pyx_v_update = 0;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("get_spatially_ordered_indices", 0);
+  __pyx_cur_scope = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *)__pyx_tp_new_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices(__pyx_ptype_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices, __pyx_empty_tuple, NULL);
+  if (unlikely(!__pyx_cur_scope)) {
+    __pyx_cur_scope = ((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *)Py_None);
+    __Pyx_INCREF(Py_None);
+    __PYX_ERR(0, 63, __pyx_L1_error)
+  } else {
+    __Pyx_GOTREF(__pyx_cur_scope);
+  }
+  __pyx_cur_scope->__pyx_v_self = __pyx_v_self;
+  __Pyx_INCREF((PyObject *)__pyx_cur_scope->__pyx_v_self);
+  __Pyx_GIVEREF((PyObject *)__pyx_cur_scope->__pyx_v_self);
+  __pyx_cur_scope->__pyx_v_pa_index = __pyx_v_pa_index;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":64
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):
+ *         def update():             # <<<<<<<<<<<<<<
+ *             self.octrees[pa_index]._sort()
+ * 
+ */
+  __pyx_t_1 = __Pyx_CyFunction_New(&__pyx_mdef_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_29get_spatially_ordered_indices_1update, 0, __pyx_n_s_get_spatially_ordered_indices_lo, ((PyObject*)__pyx_cur_scope), __pyx_n_s_pysph_base_octree_gpu_nnps, __pyx_d, ((PyObject *)__pyx_codeobj_)); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 64, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_update = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":67
+ *             self.octrees[pa_index]._sort()
+ * 
+ *         return self.octrees[pa_index].pids, update             # <<<<<<<<<<<<<<
+ * 
+ *     cpdef _refresh(self):
+ */
+  __Pyx_XDECREF(__pyx_r);
+  if (unlikely(__pyx_cur_scope->__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 67, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_cur_scope->__pyx_v_self->octrees, __pyx_cur_scope->__pyx_v_pa_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 67, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_t_1, __pyx_n_s_pids); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 67, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyTuple_New(2); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 67, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_2);
+  PyTuple_SET_ITEM(__pyx_t_1, 0, __pyx_t_2);
+  __Pyx_INCREF(__pyx_v_update);
+  __Pyx_GIVEREF(__pyx_v_update);
+  PyTuple_SET_ITEM(__pyx_t_1, 1, __pyx_v_update);
+  __pyx_t_2 = 0;
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":63
+ *             self.spatially_order_particles(pa_index)
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):             # <<<<<<<<<<<<<<
+ *         def update():
+ *             self.octrees[pa_index]._sort()
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.get_spatially_ordered_indices", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_update);
+  __Pyx_DECREF(((PyObject *)__pyx_cur_scope));
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":69
+ *         return self.octrees[pa_index].pids, update
+ * 
+ *     cpdef _refresh(self):             # <<<<<<<<<<<<<<
+ *         pass
+ * 
+ */
+
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7_refresh(PyObject *__pyx_v_self, CYTHON_UNUSED PyObject *unused); /*proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__refresh(CYTHON_UNUSED struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_skip_dispatch) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("_refresh", 0);
+  /* Check if called by wrapper */
+  if (unlikely(__pyx_skip_dispatch)) ;
+  /* Check if overridden in Python */
+  else if (unlikely((Py_TYPE(((PyObject *)__pyx_v_self))->tp_dictoffset != 0) || (Py_TYPE(((PyObject *)__pyx_v_self))->tp_flags & (Py_TPFLAGS_IS_ABSTRACT | Py_TPFLAGS_HEAPTYPE)))) {
+    #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    static PY_UINT64_T __pyx_tp_dict_version = __PYX_DICT_VERSION_INIT, __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+    if (unlikely(!__Pyx_object_dict_version_matches(((PyObject *)__pyx_v_self), __pyx_tp_dict_version, __pyx_obj_dict_version))) {
+      PY_UINT64_T __pyx_type_dict_guard = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      #endif
+      __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_self), __pyx_n_s_refresh_2); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 69, __pyx_L1_error)
+      __Pyx_GOTREF(__pyx_t_1);
+      if (!PyCFunction_Check(__pyx_t_1) || (PyCFunction_GET_FUNCTION(__pyx_t_1) != (PyCFunction)(void*)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7_refresh)) {
+        __Pyx_XDECREF(__pyx_r);
+        __Pyx_INCREF(__pyx_t_1);
+        __pyx_t_3 = __pyx_t_1; __pyx_t_4 = NULL;
+        if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_3))) {
+          __pyx_t_4 = PyMethod_GET_SELF(__pyx_t_3);
+          if (likely(__pyx_t_4)) {
+            PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_3);
+            __Pyx_INCREF(__pyx_t_4);
+            __Pyx_INCREF(function);
+            __Pyx_DECREF_SET(__pyx_t_3, function);
+          }
+        }
+        __pyx_t_2 = (__pyx_t_4) ? __Pyx_PyObject_CallOneArg(__pyx_t_3, __pyx_t_4) : __Pyx_PyObject_CallNoArg(__pyx_t_3);
+        __Pyx_XDECREF(__pyx_t_4); __pyx_t_4 = 0;
+        if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 69, __pyx_L1_error)
+        __Pyx_GOTREF(__pyx_t_2);
+        __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+        __pyx_r = __pyx_t_2;
+        __pyx_t_2 = 0;
+        __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+        goto __pyx_L0;
+      }
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+      __pyx_tp_dict_version = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      __pyx_obj_dict_version = __Pyx_get_object_dict_version(((PyObject *)__pyx_v_self));
+      if (unlikely(__pyx_type_dict_guard != __pyx_tp_dict_version)) {
+        __pyx_tp_dict_version = __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+      }
+      #endif
+      __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    }
+    #endif
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":70
+ * 
+ *     cpdef _refresh(self):
+ *         pass             # <<<<<<<<<<<<<<
+ * 
+ *     cpdef set_context(self, int src_index, int dst_index):
+ */
+
+  /* function exit code */
+  __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS._refresh", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":69
+ *         return self.octrees[pa_index].pids, update
+ * 
+ *     cpdef _refresh(self):             # <<<<<<<<<<<<<<
+ *         pass
+ * 
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7_refresh(PyObject *__pyx_v_self, CYTHON_UNUSED PyObject *unused); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_6_refresh[] = "OctreeGPUNNPS._refresh(self)";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7_refresh(PyObject *__pyx_v_self, CYTHON_UNUSED PyObject *unused) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("_refresh (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_6_refresh(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_6_refresh(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("_refresh", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__refresh(__pyx_v_self, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 69, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS._refresh", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":72
+ *         pass
+ * 
+ *     cpdef set_context(self, int src_index, int dst_index):             # <<<<<<<<<<<<<<
+ *         """Setup the context before asking for neighbors.  The `dst_index`
+ *         represents the particles for whom the neighbors are to be determined
+ */
+
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9set_context(PyObject *__pyx_v_self, PyObject *__pyx_args, PyObject *__pyx_kwds); /*proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_set_context(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_src_index, int __pyx_v_dst_index, int __pyx_skip_dispatch) {
+  PyObject *__pyx_v_octree_src = NULL;
+  PyObject *__pyx_v_octree_dst = NULL;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  int __pyx_t_7;
+  PyObject *__pyx_t_8 = NULL;
+  PyObject *(*__pyx_t_9)(PyObject *);
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("set_context", 0);
+  /* Check if called by wrapper */
+  if (unlikely(__pyx_skip_dispatch)) ;
+  /* Check if overridden in Python */
+  else if (unlikely((Py_TYPE(((PyObject *)__pyx_v_self))->tp_dictoffset != 0) || (Py_TYPE(((PyObject *)__pyx_v_self))->tp_flags & (Py_TPFLAGS_IS_ABSTRACT | Py_TPFLAGS_HEAPTYPE)))) {
+    #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    static PY_UINT64_T __pyx_tp_dict_version = __PYX_DICT_VERSION_INIT, __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+    if (unlikely(!__Pyx_object_dict_version_matches(((PyObject *)__pyx_v_self), __pyx_tp_dict_version, __pyx_obj_dict_version))) {
+      PY_UINT64_T __pyx_type_dict_guard = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      #endif
+      __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_self), __pyx_n_s_set_context); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 72, __pyx_L1_error)
+      __Pyx_GOTREF(__pyx_t_1);
+      if (!PyCFunction_Check(__pyx_t_1) || (PyCFunction_GET_FUNCTION(__pyx_t_1) != (PyCFunction)(void*)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9set_context)) {
+        __Pyx_XDECREF(__pyx_r);
+        __pyx_t_3 = __Pyx_PyInt_From_int(__pyx_v_src_index); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 72, __pyx_L1_error)
+        __Pyx_GOTREF(__pyx_t_3);
+        __pyx_t_4 = __Pyx_PyInt_From_int(__pyx_v_dst_index); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 72, __pyx_L1_error)
+        __Pyx_GOTREF(__pyx_t_4);
+        __Pyx_INCREF(__pyx_t_1);
+        __pyx_t_5 = __pyx_t_1; __pyx_t_6 = NULL;
+        __pyx_t_7 = 0;
+        if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_5))) {
+          __pyx_t_6 = PyMethod_GET_SELF(__pyx_t_5);
+          if (likely(__pyx_t_6)) {
+            PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_5);
+            __Pyx_INCREF(__pyx_t_6);
+            __Pyx_INCREF(function);
+            __Pyx_DECREF_SET(__pyx_t_5, function);
+            __pyx_t_7 = 1;
+          }
+        }
+        #if CYTHON_FAST_PYCALL
+        if (PyFunction_Check(__pyx_t_5)) {
+          PyObject *__pyx_temp[3] = {__pyx_t_6, __pyx_t_3, __pyx_t_4};
+          __pyx_t_2 = __Pyx_PyFunction_FastCall(__pyx_t_5, __pyx_temp+1-__pyx_t_7, 2+__pyx_t_7); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 72, __pyx_L1_error)
+          __Pyx_XDECREF(__pyx_t_6); __pyx_t_6 = 0;
+          __Pyx_GOTREF(__pyx_t_2);
+          __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+          __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+        } else
+        #endif
+        #if CYTHON_FAST_PYCCALL
+        if (__Pyx_PyFastCFunction_Check(__pyx_t_5)) {
+          PyObject *__pyx_temp[3] = {__pyx_t_6, __pyx_t_3, __pyx_t_4};
+          __pyx_t_2 = __Pyx_PyCFunction_FastCall(__pyx_t_5, __pyx_temp+1-__pyx_t_7, 2+__pyx_t_7); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 72, __pyx_L1_error)
+          __Pyx_XDECREF(__pyx_t_6); __pyx_t_6 = 0;
+          __Pyx_GOTREF(__pyx_t_2);
+          __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+          __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+        } else
+        #endif
+        {
+          __pyx_t_8 = PyTuple_New(2+__pyx_t_7); if (unlikely(!__pyx_t_8)) __PYX_ERR(0, 72, __pyx_L1_error)
+          __Pyx_GOTREF(__pyx_t_8);
+          if (__pyx_t_6) {
+            __Pyx_GIVEREF(__pyx_t_6); PyTuple_SET_ITEM(__pyx_t_8, 0, __pyx_t_6); __pyx_t_6 = NULL;
+          }
+          __Pyx_GIVEREF(__pyx_t_3);
+          PyTuple_SET_ITEM(__pyx_t_8, 0+__pyx_t_7, __pyx_t_3);
+          __Pyx_GIVEREF(__pyx_t_4);
+          PyTuple_SET_ITEM(__pyx_t_8, 1+__pyx_t_7, __pyx_t_4);
+          __pyx_t_3 = 0;
+          __pyx_t_4 = 0;
+          __pyx_t_2 = __Pyx_PyObject_Call(__pyx_t_5, __pyx_t_8, NULL); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 72, __pyx_L1_error)
+          __Pyx_GOTREF(__pyx_t_2);
+          __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+        }
+        __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+        __pyx_r = __pyx_t_2;
+        __pyx_t_2 = 0;
+        __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+        goto __pyx_L0;
+      }
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+      __pyx_tp_dict_version = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      __pyx_obj_dict_version = __Pyx_get_object_dict_version(((PyObject *)__pyx_v_self));
+      if (unlikely(__pyx_type_dict_guard != __pyx_tp_dict_version)) {
+        __pyx_tp_dict_version = __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+      }
+      #endif
+      __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    }
+    #endif
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":83
+ *          dst_index: int: the destination index of the particle array.
+ *         """
+ *         GPUNNPS.set_context(self, src_index, dst_index)             # <<<<<<<<<<<<<<
+ * 
+ *         self.src_index = src_index
+ */
+  __pyx_t_1 = __pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNNPS->__pyx_base.set_context(((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *)__pyx_v_self), __pyx_v_src_index, __pyx_v_dst_index, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 83, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":85
+ *         GPUNNPS.set_context(self, src_index, dst_index)
+ * 
+ *         self.src_index = src_index             # <<<<<<<<<<<<<<
+ *         self.dst_index = dst_index
+ * 
+ */
+  __pyx_v_self->__pyx_base.__pyx_base.src_index = __pyx_v_src_index;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":86
+ * 
+ *         self.src_index = src_index
+ *         self.dst_index = dst_index             # <<<<<<<<<<<<<<
+ * 
+ *         octree_src = self.octrees[src_index]
+ */
+  __pyx_v_self->__pyx_base.__pyx_base.dst_index = __pyx_v_dst_index;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":88
+ *         self.dst_index = dst_index
+ * 
+ *         octree_src = self.octrees[src_index]             # <<<<<<<<<<<<<<
+ *         octree_dst = self.octrees[dst_index]
+ *         self.dst_src = src_index != dst_index
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 88, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_src_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 88, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":89
+ * 
+ *         octree_src = self.octrees[src_index]
+ *         octree_dst = self.octrees[dst_index]             # <<<<<<<<<<<<<<
+ *         self.dst_src = src_index != dst_index
+ * 
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 89, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_dst_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 89, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_dst = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":90
+ *         octree_src = self.octrees[src_index]
+ *         octree_dst = self.octrees[dst_index]
+ *         self.dst_src = src_index != dst_index             # <<<<<<<<<<<<<<
+ * 
+ *         self.neighbor_cid_counts, self.neighbor_cids = octree_dst.find_neighbor_cids(
+ */
+  __pyx_v_self->dst_src = (__pyx_v_src_index != __pyx_v_dst_index);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":92
+ *         self.dst_src = src_index != dst_index
+ * 
+ *         self.neighbor_cid_counts, self.neighbor_cids = octree_dst.find_neighbor_cids(             # <<<<<<<<<<<<<<
+ *             octree_src)
+ * 
+ */
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_find_neighbor_cids); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 92, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":93
+ * 
+ *         self.neighbor_cid_counts, self.neighbor_cids = octree_dst.find_neighbor_cids(
+ *             octree_src)             # <<<<<<<<<<<<<<
+ * 
+ *     cdef void find_neighbor_lengths(self, nbr_lengths):
+ */
+  __pyx_t_5 = NULL;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_2))) {
+    __pyx_t_5 = PyMethod_GET_SELF(__pyx_t_2);
+    if (likely(__pyx_t_5)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_2);
+      __Pyx_INCREF(__pyx_t_5);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_2, function);
+    }
+  }
+  __pyx_t_1 = (__pyx_t_5) ? __Pyx_PyObject_Call2Args(__pyx_t_2, __pyx_t_5, __pyx_v_octree_src) : __Pyx_PyObject_CallOneArg(__pyx_t_2, __pyx_v_octree_src);
+  __Pyx_XDECREF(__pyx_t_5); __pyx_t_5 = 0;
+  if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 92, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  if ((likely(PyTuple_CheckExact(__pyx_t_1))) || (PyList_CheckExact(__pyx_t_1))) {
+    PyObject* sequence = __pyx_t_1;
+    Py_ssize_t size = __Pyx_PySequence_SIZE(sequence);
+    if (unlikely(size != 2)) {
+      if (size > 2) __Pyx_RaiseTooManyValuesError(2);
+      else if (size >= 0) __Pyx_RaiseNeedMoreValuesError(size);
+      __PYX_ERR(0, 92, __pyx_L1_error)
+    }
+    #if CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS
+    if (likely(PyTuple_CheckExact(sequence))) {
+      __pyx_t_2 = PyTuple_GET_ITEM(sequence, 0); 
+      __pyx_t_5 = PyTuple_GET_ITEM(sequence, 1); 
+    } else {
+      __pyx_t_2 = PyList_GET_ITEM(sequence, 0); 
+      __pyx_t_5 = PyList_GET_ITEM(sequence, 1); 
+    }
+    __Pyx_INCREF(__pyx_t_2);
+    __Pyx_INCREF(__pyx_t_5);
+    #else
+    __pyx_t_2 = PySequence_ITEM(sequence, 0); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 92, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_2);
+    __pyx_t_5 = PySequence_ITEM(sequence, 1); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 92, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_5);
+    #endif
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  } else {
+    Py_ssize_t index = -1;
+    __pyx_t_8 = PyObject_GetIter(__pyx_t_1); if (unlikely(!__pyx_t_8)) __PYX_ERR(0, 92, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_8);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __pyx_t_9 = Py_TYPE(__pyx_t_8)->tp_iternext;
+    index = 0; __pyx_t_2 = __pyx_t_9(__pyx_t_8); if (unlikely(!__pyx_t_2)) goto __pyx_L3_unpacking_failed;
+    __Pyx_GOTREF(__pyx_t_2);
+    index = 1; __pyx_t_5 = __pyx_t_9(__pyx_t_8); if (unlikely(!__pyx_t_5)) goto __pyx_L3_unpacking_failed;
+    __Pyx_GOTREF(__pyx_t_5);
+    if (__Pyx_IternextUnpackEndCheck(__pyx_t_9(__pyx_t_8), 2) < 0) __PYX_ERR(0, 92, __pyx_L1_error)
+    __pyx_t_9 = NULL;
+    __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+    goto __pyx_L4_unpacking_done;
+    __pyx_L3_unpacking_failed:;
+    __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+    __pyx_t_9 = NULL;
+    if (__Pyx_IterFinish() == 0) __Pyx_RaiseNeedMoreValuesError(index);
+    __PYX_ERR(0, 92, __pyx_L1_error)
+    __pyx_L4_unpacking_done:;
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":92
+ *         self.dst_src = src_index != dst_index
+ * 
+ *         self.neighbor_cid_counts, self.neighbor_cids = octree_dst.find_neighbor_cids(             # <<<<<<<<<<<<<<
+ *             octree_src)
+ * 
+ */
+  __Pyx_GIVEREF(__pyx_t_2);
+  __Pyx_GOTREF(__pyx_v_self->neighbor_cid_counts);
+  __Pyx_DECREF(__pyx_v_self->neighbor_cid_counts);
+  __pyx_v_self->neighbor_cid_counts = __pyx_t_2;
+  __pyx_t_2 = 0;
+  __Pyx_GIVEREF(__pyx_t_5);
+  __Pyx_GOTREF(__pyx_v_self->neighbor_cids);
+  __Pyx_DECREF(__pyx_v_self->neighbor_cids);
+  __pyx_v_self->neighbor_cids = __pyx_t_5;
+  __pyx_t_5 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":72
+ *         pass
+ * 
+ *     cpdef set_context(self, int src_index, int dst_index):             # <<<<<<<<<<<<<<
+ *         """Setup the context before asking for neighbors.  The `dst_index`
+ *         represents the particles for whom the neighbors are to be determined
+ */
+
+  /* function exit code */
+  __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_8);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.set_context", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_octree_src);
+  __Pyx_XDECREF(__pyx_v_octree_dst);
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9set_context(PyObject *__pyx_v_self, PyObject *__pyx_args, PyObject *__pyx_kwds); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8set_context[] = "OctreeGPUNNPS.set_context(self, int src_index, int dst_index)\nSetup the context before asking for neighbors.  The `dst_index`\n        represents the particles for whom the neighbors are to be determined\n        from the particle array with index `src_index`.\n\n        Parameters\n        ----------\n\n         src_index: int: the source index of the particle array.\n         dst_index: int: the destination index of the particle array.\n        ";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9set_context(PyObject *__pyx_v_self, PyObject *__pyx_args, PyObject *__pyx_kwds) {
+  int __pyx_v_src_index;
+  int __pyx_v_dst_index;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("set_context (wrapper)", 0);
+  {
+    static PyObject **__pyx_pyargnames[] = {&__pyx_n_s_src_index,&__pyx_n_s_dst_index,0};
+    PyObject* values[2] = {0,0};
+    if (unlikely(__pyx_kwds)) {
+      Py_ssize_t kw_args;
+      const Py_ssize_t pos_args = PyTuple_GET_SIZE(__pyx_args);
+      switch (pos_args) {
+        case  2: values[1] = PyTuple_GET_ITEM(__pyx_args, 1);
+        CYTHON_FALLTHROUGH;
+        case  1: values[0] = PyTuple_GET_ITEM(__pyx_args, 0);
+        CYTHON_FALLTHROUGH;
+        case  0: break;
+        default: goto __pyx_L5_argtuple_error;
+      }
+      kw_args = PyDict_Size(__pyx_kwds);
+      switch (pos_args) {
+        case  0:
+        if (likely((values[0] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_src_index)) != 0)) kw_args--;
+        else goto __pyx_L5_argtuple_error;
+        CYTHON_FALLTHROUGH;
+        case  1:
+        if (likely((values[1] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_dst_index)) != 0)) kw_args--;
+        else {
+          __Pyx_RaiseArgtupleInvalid("set_context", 1, 2, 2, 1); __PYX_ERR(0, 72, __pyx_L3_error)
+        }
+      }
+      if (unlikely(kw_args > 0)) {
+        if (unlikely(__Pyx_ParseOptionalKeywords(__pyx_kwds, __pyx_pyargnames, 0, values, pos_args, "set_context") < 0)) __PYX_ERR(0, 72, __pyx_L3_error)
+      }
+    } else if (PyTuple_GET_SIZE(__pyx_args) != 2) {
+      goto __pyx_L5_argtuple_error;
+    } else {
+      values[0] = PyTuple_GET_ITEM(__pyx_args, 0);
+      values[1] = PyTuple_GET_ITEM(__pyx_args, 1);
+    }
+    __pyx_v_src_index = __Pyx_PyInt_As_int(values[0]); if (unlikely((__pyx_v_src_index == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 72, __pyx_L3_error)
+    __pyx_v_dst_index = __Pyx_PyInt_As_int(values[1]); if (unlikely((__pyx_v_dst_index == (int)-1) && PyErr_Occurred())) __PYX_ERR(0, 72, __pyx_L3_error)
+  }
+  goto __pyx_L4_argument_unpacking_done;
+  __pyx_L5_argtuple_error:;
+  __Pyx_RaiseArgtupleInvalid("set_context", 1, 2, 2, PyTuple_GET_SIZE(__pyx_args)); __PYX_ERR(0, 72, __pyx_L3_error)
+  __pyx_L3_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.set_context", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __Pyx_RefNannyFinishContext();
+  return NULL;
+  __pyx_L4_argument_unpacking_done:;
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8set_context(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), __pyx_v_src_index, __pyx_v_dst_index);
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8set_context(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, int __pyx_v_src_index, int __pyx_v_dst_index) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("set_context", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_set_context(__pyx_v_self, __pyx_v_src_index, __pyx_v_dst_index, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.set_context", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":95
+ *             octree_src)
+ * 
+ *     cdef void find_neighbor_lengths(self, nbr_lengths):             # <<<<<<<<<<<<<<
+ *         octree_src = self.octrees[self.src_index]
+ *         octree_dst = self.octrees[self.dst_index]
+ */
+
+static void __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_find_neighbor_lengths(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_nbr_lengths) {
+  PyObject *__pyx_v_octree_src = NULL;
+  PyObject *__pyx_v_octree_dst = NULL;
+  PyObject *__pyx_v_args = NULL;
+  PyObject *__pyx_v_find_neighbor_lengths = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_t_2;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("find_neighbor_lengths", 0);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":96
+ * 
+ *     cdef void find_neighbor_lengths(self, nbr_lengths):
+ *         octree_src = self.octrees[self.src_index]             # <<<<<<<<<<<<<<
+ *         octree_dst = self.octrees[self.dst_index]
+ * 
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 96, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_self->__pyx_base.__pyx_base.src_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 96, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":97
+ *     cdef void find_neighbor_lengths(self, nbr_lengths):
+ *         octree_src = self.octrees[self.src_index]
+ *         octree_dst = self.octrees[self.dst_index]             # <<<<<<<<<<<<<<
+ * 
+ *         args = []
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 97, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_self->__pyx_base.__pyx_base.dst_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 97, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_dst = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":99
+ *         octree_dst = self.octrees[self.dst_index]
+ * 
+ *         args = []             # <<<<<<<<<<<<<<
+ *         if self.use_elementwise:
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths_elementwise
+ */
+  __pyx_t_1 = PyList_New(0); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 99, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_args = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":100
+ * 
+ *         args = []
+ *         if self.use_elementwise:             # <<<<<<<<<<<<<<
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths_elementwise
+ *         else:
+ */
+  __pyx_t_2 = (__pyx_v_self->use_elementwise != 0);
+  if (__pyx_t_2) {
+
+    /* "pysph/base/octree_gpu_nnps.pyx":101
+ *         args = []
+ *         if self.use_elementwise:
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths_elementwise             # <<<<<<<<<<<<<<
+ *         else:
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths
+ */
+    __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_find_neighbor_lengths_elementwis); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 101, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __pyx_v_find_neighbor_lengths = __pyx_t_1;
+    __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":100
+ * 
+ *         args = []
+ *         if self.use_elementwise:             # <<<<<<<<<<<<<<
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths_elementwise
+ *         else:
+ */
+    goto __pyx_L3;
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":103
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths_elementwise
+ *         else:
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths             # <<<<<<<<<<<<<<
+ * 
+ *         find_neighbor_lengths(
+ */
+  /*else*/ {
+    __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_find_neighbor_lengths); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 103, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __pyx_v_find_neighbor_lengths = __pyx_t_1;
+    __pyx_t_1 = 0;
+  }
+  __pyx_L3:;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":105
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths
+ * 
+ *         find_neighbor_lengths(             # <<<<<<<<<<<<<<
+ *             self.neighbor_cid_counts, self.neighbor_cids, octree_src,
+ *             nbr_lengths, *args
+ */
+  __pyx_t_1 = PyTuple_New(4); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 105, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cid_counts);
+  __Pyx_GIVEREF(__pyx_v_self->neighbor_cid_counts);
+  PyTuple_SET_ITEM(__pyx_t_1, 0, __pyx_v_self->neighbor_cid_counts);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cids);
+  __Pyx_GIVEREF(__pyx_v_self->neighbor_cids);
+  PyTuple_SET_ITEM(__pyx_t_1, 1, __pyx_v_self->neighbor_cids);
+  __Pyx_INCREF(__pyx_v_octree_src);
+  __Pyx_GIVEREF(__pyx_v_octree_src);
+  PyTuple_SET_ITEM(__pyx_t_1, 2, __pyx_v_octree_src);
+  __Pyx_INCREF(__pyx_v_nbr_lengths);
+  __Pyx_GIVEREF(__pyx_v_nbr_lengths);
+  PyTuple_SET_ITEM(__pyx_t_1, 3, __pyx_v_nbr_lengths);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":107
+ *         find_neighbor_lengths(
+ *             self.neighbor_cid_counts, self.neighbor_cids, octree_src,
+ *             nbr_lengths, *args             # <<<<<<<<<<<<<<
+ *         )
+ * 
+ */
+  __pyx_t_3 = PySequence_Tuple(__pyx_v_args); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 105, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":105
+ *             find_neighbor_lengths = octree_dst.find_neighbor_lengths
+ * 
+ *         find_neighbor_lengths(             # <<<<<<<<<<<<<<
+ *             self.neighbor_cid_counts, self.neighbor_cids, octree_src,
+ *             nbr_lengths, *args
+ */
+  __pyx_t_4 = PyNumber_Add(__pyx_t_1, __pyx_t_3); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 105, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_Call(__pyx_v_find_neighbor_lengths, __pyx_t_4, NULL); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 105, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":95
+ *             octree_src)
+ * 
+ *     cdef void find_neighbor_lengths(self, nbr_lengths):             # <<<<<<<<<<<<<<
+ *         octree_src = self.octrees[self.src_index]
+ *         octree_dst = self.octrees[self.dst_index]
+ */
+
+  /* function exit code */
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_WriteUnraisable("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.find_neighbor_lengths", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_octree_src);
+  __Pyx_XDECREF(__pyx_v_octree_dst);
+  __Pyx_XDECREF(__pyx_v_args);
+  __Pyx_XDECREF(__pyx_v_find_neighbor_lengths);
+  __Pyx_RefNannyFinishContext();
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":110
+ *         )
+ * 
+ *     cdef void find_nearest_neighbors_gpu(self, nbrs, start_indices):             # <<<<<<<<<<<<<<
+ *         octree_src = self.octrees[self.src_index]
+ *         octree_dst = self.octrees[self.dst_index]
+ */
+
+static void __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_find_nearest_neighbors_gpu(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_nbrs, PyObject *__pyx_v_start_indices) {
+  PyObject *__pyx_v_octree_src = NULL;
+  PyObject *__pyx_v_octree_dst = NULL;
+  PyObject *__pyx_v_args = NULL;
+  PyObject *__pyx_v_find_neighbors = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_t_2;
+  int __pyx_t_3;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("find_nearest_neighbors_gpu", 0);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":111
+ * 
+ *     cdef void find_nearest_neighbors_gpu(self, nbrs, start_indices):
+ *         octree_src = self.octrees[self.src_index]             # <<<<<<<<<<<<<<
+ *         octree_dst = self.octrees[self.dst_index]
+ * 
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 111, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_self->__pyx_base.__pyx_base.src_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 111, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":112
+ *     cdef void find_nearest_neighbors_gpu(self, nbrs, start_indices):
+ *         octree_src = self.octrees[self.src_index]
+ *         octree_dst = self.octrees[self.dst_index]             # <<<<<<<<<<<<<<
+ * 
+ *         args = []
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 112, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_self->__pyx_base.__pyx_base.dst_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 112, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_dst = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":114
+ *         octree_dst = self.octrees[self.dst_index]
+ * 
+ *         args = []             # <<<<<<<<<<<<<<
+ *         if self.use_elementwise:
+ *             find_neighbors = octree_dst.find_neighbors_elementwise
+ */
+  __pyx_t_1 = PyList_New(0); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 114, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_args = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":115
+ * 
+ *         args = []
+ *         if self.use_elementwise:             # <<<<<<<<<<<<<<
+ *             find_neighbors = octree_dst.find_neighbors_elementwise
+ *         else:
+ */
+  __pyx_t_2 = (__pyx_v_self->use_elementwise != 0);
+  if (__pyx_t_2) {
+
+    /* "pysph/base/octree_gpu_nnps.pyx":116
+ *         args = []
+ *         if self.use_elementwise:
+ *             find_neighbors = octree_dst.find_neighbors_elementwise             # <<<<<<<<<<<<<<
+ *         else:
+ *             find_neighbors = octree_dst.find_neighbors
+ */
+    __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_find_neighbors_elementwise); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 116, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __pyx_v_find_neighbors = __pyx_t_1;
+    __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":115
+ * 
+ *         args = []
+ *         if self.use_elementwise:             # <<<<<<<<<<<<<<
+ *             find_neighbors = octree_dst.find_neighbors_elementwise
+ *         else:
+ */
+    goto __pyx_L3;
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":118
+ *             find_neighbors = octree_dst.find_neighbors_elementwise
+ *         else:
+ *             find_neighbors = octree_dst.find_neighbors             # <<<<<<<<<<<<<<
+ *             args.append(self.use_partitions)
+ * 
+ */
+  /*else*/ {
+    __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_find_neighbors); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 118, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __pyx_v_find_neighbors = __pyx_t_1;
+    __pyx_t_1 = 0;
+
+    /* "pysph/base/octree_gpu_nnps.pyx":119
+ *         else:
+ *             find_neighbors = octree_dst.find_neighbors
+ *             args.append(self.use_partitions)             # <<<<<<<<<<<<<<
+ * 
+ *         find_neighbors(
+ */
+    __pyx_t_1 = __Pyx_PyBool_FromLong(__pyx_v_self->use_partitions); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 119, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __pyx_t_3 = __Pyx_PyList_Append(__pyx_v_args, __pyx_t_1); if (unlikely(__pyx_t_3 == ((int)-1))) __PYX_ERR(0, 119, __pyx_L1_error)
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  }
+  __pyx_L3:;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":121
+ *             args.append(self.use_partitions)
+ * 
+ *         find_neighbors(             # <<<<<<<<<<<<<<
+ *             self.neighbor_cid_counts, self.neighbor_cids, octree_src,
+ *             start_indices, nbrs, *args
+ */
+  __pyx_t_1 = PyTuple_New(5); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 121, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cid_counts);
+  __Pyx_GIVEREF(__pyx_v_self->neighbor_cid_counts);
+  PyTuple_SET_ITEM(__pyx_t_1, 0, __pyx_v_self->neighbor_cid_counts);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cids);
+  __Pyx_GIVEREF(__pyx_v_self->neighbor_cids);
+  PyTuple_SET_ITEM(__pyx_t_1, 1, __pyx_v_self->neighbor_cids);
+  __Pyx_INCREF(__pyx_v_octree_src);
+  __Pyx_GIVEREF(__pyx_v_octree_src);
+  PyTuple_SET_ITEM(__pyx_t_1, 2, __pyx_v_octree_src);
+  __Pyx_INCREF(__pyx_v_start_indices);
+  __Pyx_GIVEREF(__pyx_v_start_indices);
+  PyTuple_SET_ITEM(__pyx_t_1, 3, __pyx_v_start_indices);
+  __Pyx_INCREF(__pyx_v_nbrs);
+  __Pyx_GIVEREF(__pyx_v_nbrs);
+  PyTuple_SET_ITEM(__pyx_t_1, 4, __pyx_v_nbrs);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":123
+ *         find_neighbors(
+ *             self.neighbor_cid_counts, self.neighbor_cids, octree_src,
+ *             start_indices, nbrs, *args             # <<<<<<<<<<<<<<
+ *         )
+ * 
+ */
+  __pyx_t_4 = PySequence_Tuple(__pyx_v_args); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 121, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":121
+ *             args.append(self.use_partitions)
+ * 
+ *         find_neighbors(             # <<<<<<<<<<<<<<
+ *             self.neighbor_cid_counts, self.neighbor_cids, octree_src,
+ *             start_indices, nbrs, *args
+ */
+  __pyx_t_5 = PyNumber_Add(__pyx_t_1, __pyx_t_4); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 121, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = __Pyx_PyObject_Call(__pyx_v_find_neighbors, __pyx_t_5, NULL); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 121, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":110
+ *         )
+ * 
+ *     cdef void find_nearest_neighbors_gpu(self, nbrs, start_indices):             # <<<<<<<<<<<<<<
+ *         octree_src = self.octrees[self.src_index]
+ *         octree_dst = self.octrees[self.dst_index]
+ */
+
+  /* function exit code */
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_WriteUnraisable("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.find_nearest_neighbors_gpu", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_octree_src);
+  __Pyx_XDECREF(__pyx_v_octree_dst);
+  __Pyx_XDECREF(__pyx_v_args);
+  __Pyx_XDECREF(__pyx_v_find_neighbors);
+  __Pyx_RefNannyFinishContext();
+}
+
+/* "pysph/base/octree_gpu_nnps.pyx":126
+ *         )
+ * 
+ *     cpdef get_kernel_args(self, c_type):             # <<<<<<<<<<<<<<
+ *         octree_dst = self.octrees[self.dst_index]
+ *         octree_src = self.octrees[self.src_index]
+ */
+
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_11get_kernel_args(PyObject *__pyx_v_self, PyObject *__pyx_v_c_type); /*proto*/
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_get_kernel_args(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, CYTHON_UNUSED PyObject *__pyx_v_c_type, int __pyx_skip_dispatch) {
+  PyObject *__pyx_v_octree_dst = NULL;
+  PyObject *__pyx_v_octree_src = NULL;
+  PyObject *__pyx_v_pa_gpu_dst = NULL;
+  PyObject *__pyx_v_pa_gpu_src = NULL;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  PyObject *__pyx_t_7 = NULL;
+  PyObject *__pyx_t_8 = NULL;
+  PyObject *__pyx_t_9 = NULL;
+  PyObject *__pyx_t_10 = NULL;
+  PyObject *__pyx_t_11 = NULL;
+  PyObject *__pyx_t_12 = NULL;
+  PyObject *__pyx_t_13 = NULL;
+  PyObject *__pyx_t_14 = NULL;
+  PyObject *__pyx_t_15 = NULL;
+  PyObject *__pyx_t_16 = NULL;
+  PyObject *__pyx_t_17 = NULL;
+  PyObject *__pyx_t_18 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("get_kernel_args", 0);
+  /* Check if called by wrapper */
+  if (unlikely(__pyx_skip_dispatch)) ;
+  /* Check if overridden in Python */
+  else if (unlikely((Py_TYPE(((PyObject *)__pyx_v_self))->tp_dictoffset != 0) || (Py_TYPE(((PyObject *)__pyx_v_self))->tp_flags & (Py_TPFLAGS_IS_ABSTRACT | Py_TPFLAGS_HEAPTYPE)))) {
+    #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    static PY_UINT64_T __pyx_tp_dict_version = __PYX_DICT_VERSION_INIT, __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+    if (unlikely(!__Pyx_object_dict_version_matches(((PyObject *)__pyx_v_self), __pyx_tp_dict_version, __pyx_obj_dict_version))) {
+      PY_UINT64_T __pyx_type_dict_guard = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      #endif
+      __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_self), __pyx_n_s_get_kernel_args); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 126, __pyx_L1_error)
+      __Pyx_GOTREF(__pyx_t_1);
+      if (!PyCFunction_Check(__pyx_t_1) || (PyCFunction_GET_FUNCTION(__pyx_t_1) != (PyCFunction)(void*)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_11get_kernel_args)) {
+        __Pyx_XDECREF(__pyx_r);
+        __Pyx_INCREF(__pyx_t_1);
+        __pyx_t_3 = __pyx_t_1; __pyx_t_4 = NULL;
+        if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_3))) {
+          __pyx_t_4 = PyMethod_GET_SELF(__pyx_t_3);
+          if (likely(__pyx_t_4)) {
+            PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_3);
+            __Pyx_INCREF(__pyx_t_4);
+            __Pyx_INCREF(function);
+            __Pyx_DECREF_SET(__pyx_t_3, function);
+          }
+        }
+        __pyx_t_2 = (__pyx_t_4) ? __Pyx_PyObject_Call2Args(__pyx_t_3, __pyx_t_4, __pyx_v_c_type) : __Pyx_PyObject_CallOneArg(__pyx_t_3, __pyx_v_c_type);
+        __Pyx_XDECREF(__pyx_t_4); __pyx_t_4 = 0;
+        if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 126, __pyx_L1_error)
+        __Pyx_GOTREF(__pyx_t_2);
+        __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+        __pyx_r = __pyx_t_2;
+        __pyx_t_2 = 0;
+        __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+        goto __pyx_L0;
+      }
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+      __pyx_tp_dict_version = __Pyx_get_tp_dict_version(((PyObject *)__pyx_v_self));
+      __pyx_obj_dict_version = __Pyx_get_object_dict_version(((PyObject *)__pyx_v_self));
+      if (unlikely(__pyx_type_dict_guard != __pyx_tp_dict_version)) {
+        __pyx_tp_dict_version = __pyx_obj_dict_version = __PYX_DICT_VERSION_INIT;
+      }
+      #endif
+      __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+      #if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_PYTYPE_LOOKUP && CYTHON_USE_TYPE_SLOTS
+    }
+    #endif
+  }
+
+  /* "pysph/base/octree_gpu_nnps.pyx":127
+ * 
+ *     cpdef get_kernel_args(self, c_type):
+ *         octree_dst = self.octrees[self.dst_index]             # <<<<<<<<<<<<<<
+ *         octree_src = self.octrees[self.src_index]
+ *         pa_gpu_dst = octree_dst.pa.gpu
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 127, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_self->__pyx_base.__pyx_base.dst_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 127, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_dst = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":128
+ *     cpdef get_kernel_args(self, c_type):
+ *         octree_dst = self.octrees[self.dst_index]
+ *         octree_src = self.octrees[self.src_index]             # <<<<<<<<<<<<<<
+ *         pa_gpu_dst = octree_dst.pa.gpu
+ *         pa_gpu_src = octree_src.pa.gpu
+ */
+  if (unlikely(__pyx_v_self->octrees == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(0, 128, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_List(__pyx_v_self->octrees, __pyx_v_self->__pyx_base.__pyx_base.src_index, int, 1, __Pyx_PyInt_From_int, 1, 1, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 128, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_v_octree_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":129
+ *         octree_dst = self.octrees[self.dst_index]
+ *         octree_src = self.octrees[self.src_index]
+ *         pa_gpu_dst = octree_dst.pa.gpu             # <<<<<<<<<<<<<<
+ *         pa_gpu_src = octree_src.pa.gpu
+ * 
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_pa); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 129, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_t_1, __pyx_n_s_gpu); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 129, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v_pa_gpu_dst = __pyx_t_2;
+  __pyx_t_2 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":130
+ *         octree_src = self.octrees[self.src_index]
+ *         pa_gpu_dst = octree_dst.pa.gpu
+ *         pa_gpu_src = octree_src.pa.gpu             # <<<<<<<<<<<<<<
+ * 
+ *         return [
+ */
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_src, __pyx_n_s_pa); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 130, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_t_2, __pyx_n_s_gpu); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 130, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_v_pa_gpu_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":132
+ *         pa_gpu_src = octree_src.pa.gpu
+ * 
+ *         return [             # <<<<<<<<<<<<<<
+ *                    octree_dst.unique_cids.dev.data,
+ *                    octree_src.pids.dev.data,
+ */
+  __Pyx_XDECREF(__pyx_r);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":133
+ * 
+ *         return [
+ *                    octree_dst.unique_cids.dev.data,             # <<<<<<<<<<<<<<
+ *                    octree_src.pids.dev.data,
+ *                    octree_dst.pids.dev.data,
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_unique_cids); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 133, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_t_1, __pyx_n_s_dev); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 133, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(__pyx_t_2, __pyx_n_s_data); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 133, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":134
+ *         return [
+ *                    octree_dst.unique_cids.dev.data,
+ *                    octree_src.pids.dev.data,             # <<<<<<<<<<<<<<
+ *                    octree_dst.pids.dev.data,
+ *                    octree_dst.cids.dev.data,
+ */
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_src, __pyx_n_s_pids); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 134, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(__pyx_t_2, __pyx_n_s_dev); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 134, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(__pyx_t_3, __pyx_n_s_data); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 134, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":135
+ *                    octree_dst.unique_cids.dev.data,
+ *                    octree_src.pids.dev.data,
+ *                    octree_dst.pids.dev.data,             # <<<<<<<<<<<<<<
+ *                    octree_dst.cids.dev.data,
+ *                    octree_src.pbounds.dev.data, octree_dst.pbounds.dev.data,
+ */
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_pids); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 135, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(__pyx_t_3, __pyx_n_s_dev); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 135, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(__pyx_t_4, __pyx_n_s_data); if (unlikely(!__pyx_t_3)) __PYX_ERR(0, 135, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":136
+ *                    octree_src.pids.dev.data,
+ *                    octree_dst.pids.dev.data,
+ *                    octree_dst.cids.dev.data,             # <<<<<<<<<<<<<<
+ *                    octree_src.pbounds.dev.data, octree_dst.pbounds.dev.data,
+ *                    np.float32(octree_dst.radius_scale),
+ */
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_cids); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 136, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_5 = __Pyx_PyObject_GetAttrStr(__pyx_t_4, __pyx_n_s_dev); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 136, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(__pyx_t_5, __pyx_n_s_data); if (unlikely(!__pyx_t_4)) __PYX_ERR(0, 136, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":137
+ *                    octree_dst.pids.dev.data,
+ *                    octree_dst.cids.dev.data,
+ *                    octree_src.pbounds.dev.data, octree_dst.pbounds.dev.data,             # <<<<<<<<<<<<<<
+ *                    np.float32(octree_dst.radius_scale),
+ *                    self.neighbor_cid_counts.dev.data,
+ */
+  __pyx_t_5 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_src, __pyx_n_s_pbounds); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 137, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __pyx_t_6 = __Pyx_PyObject_GetAttrStr(__pyx_t_5, __pyx_n_s_dev); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 137, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __pyx_t_5 = __Pyx_PyObject_GetAttrStr(__pyx_t_6, __pyx_n_s_data); if (unlikely(!__pyx_t_5)) __PYX_ERR(0, 137, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+  __pyx_t_6 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_pbounds); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 137, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+  __pyx_t_7 = __Pyx_PyObject_GetAttrStr(__pyx_t_6, __pyx_n_s_dev); if (unlikely(!__pyx_t_7)) __PYX_ERR(0, 137, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_7);
+  __Pyx_DECREF(__pyx_t_6); __pyx_t_6 = 0;
+  __pyx_t_6 = __Pyx_PyObject_GetAttrStr(__pyx_t_7, __pyx_n_s_data); if (unlikely(!__pyx_t_6)) __PYX_ERR(0, 137, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+  __Pyx_DECREF(__pyx_t_7); __pyx_t_7 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":138
+ *                    octree_dst.cids.dev.data,
+ *                    octree_src.pbounds.dev.data, octree_dst.pbounds.dev.data,
+ *                    np.float32(octree_dst.radius_scale),             # <<<<<<<<<<<<<<
+ *                    self.neighbor_cid_counts.dev.data,
+ *                    self.neighbor_cids.dev.data,
+ */
+  __Pyx_GetModuleGlobalName(__pyx_t_8, __pyx_n_s_np); if (unlikely(!__pyx_t_8)) __PYX_ERR(0, 138, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_8);
+  __pyx_t_9 = __Pyx_PyObject_GetAttrStr(__pyx_t_8, __pyx_n_s_float32); if (unlikely(!__pyx_t_9)) __PYX_ERR(0, 138, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_9);
+  __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+  __pyx_t_8 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_radius_scale); if (unlikely(!__pyx_t_8)) __PYX_ERR(0, 138, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_8);
+  __pyx_t_10 = NULL;
+  if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_9))) {
+    __pyx_t_10 = PyMethod_GET_SELF(__pyx_t_9);
+    if (likely(__pyx_t_10)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_9);
+      __Pyx_INCREF(__pyx_t_10);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_9, function);
+    }
+  }
+  __pyx_t_7 = (__pyx_t_10) ? __Pyx_PyObject_Call2Args(__pyx_t_9, __pyx_t_10, __pyx_t_8) : __Pyx_PyObject_CallOneArg(__pyx_t_9, __pyx_t_8);
+  __Pyx_XDECREF(__pyx_t_10); __pyx_t_10 = 0;
+  __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+  if (unlikely(!__pyx_t_7)) __PYX_ERR(0, 138, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_7);
+  __Pyx_DECREF(__pyx_t_9); __pyx_t_9 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":139
+ *                    octree_src.pbounds.dev.data, octree_dst.pbounds.dev.data,
+ *                    np.float32(octree_dst.radius_scale),
+ *                    self.neighbor_cid_counts.dev.data,             # <<<<<<<<<<<<<<
+ *                    self.neighbor_cids.dev.data,
+ *                    pa_gpu_dst.x.dev.data, pa_gpu_dst.y.dev.data,
+ */
+  __pyx_t_9 = __Pyx_PyObject_GetAttrStr(__pyx_v_self->neighbor_cid_counts, __pyx_n_s_dev); if (unlikely(!__pyx_t_9)) __PYX_ERR(0, 139, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_9);
+  __pyx_t_8 = __Pyx_PyObject_GetAttrStr(__pyx_t_9, __pyx_n_s_data); if (unlikely(!__pyx_t_8)) __PYX_ERR(0, 139, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_8);
+  __Pyx_DECREF(__pyx_t_9); __pyx_t_9 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":140
+ *                    np.float32(octree_dst.radius_scale),
+ *                    self.neighbor_cid_counts.dev.data,
+ *                    self.neighbor_cids.dev.data,             # <<<<<<<<<<<<<<
+ *                    pa_gpu_dst.x.dev.data, pa_gpu_dst.y.dev.data,
+ *                    pa_gpu_dst.z.dev.data, pa_gpu_dst.h.dev.data,
+ */
+  __pyx_t_9 = __Pyx_PyObject_GetAttrStr(__pyx_v_self->neighbor_cids, __pyx_n_s_dev); if (unlikely(!__pyx_t_9)) __PYX_ERR(0, 140, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_9);
+  __pyx_t_10 = __Pyx_PyObject_GetAttrStr(__pyx_t_9, __pyx_n_s_data); if (unlikely(!__pyx_t_10)) __PYX_ERR(0, 140, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_10);
+  __Pyx_DECREF(__pyx_t_9); __pyx_t_9 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":141
+ *                    self.neighbor_cid_counts.dev.data,
+ *                    self.neighbor_cids.dev.data,
+ *                    pa_gpu_dst.x.dev.data, pa_gpu_dst.y.dev.data,             # <<<<<<<<<<<<<<
+ *                    pa_gpu_dst.z.dev.data, pa_gpu_dst.h.dev.data,
+ *                    pa_gpu_src.x.dev.data, pa_gpu_src.y.dev.data,
+ */
+  __pyx_t_9 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_dst, __pyx_n_s_x); if (unlikely(!__pyx_t_9)) __PYX_ERR(0, 141, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_9);
+  __pyx_t_11 = __Pyx_PyObject_GetAttrStr(__pyx_t_9, __pyx_n_s_dev); if (unlikely(!__pyx_t_11)) __PYX_ERR(0, 141, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_11);
+  __Pyx_DECREF(__pyx_t_9); __pyx_t_9 = 0;
+  __pyx_t_9 = __Pyx_PyObject_GetAttrStr(__pyx_t_11, __pyx_n_s_data); if (unlikely(!__pyx_t_9)) __PYX_ERR(0, 141, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_9);
+  __Pyx_DECREF(__pyx_t_11); __pyx_t_11 = 0;
+  __pyx_t_11 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_dst, __pyx_n_s_y); if (unlikely(!__pyx_t_11)) __PYX_ERR(0, 141, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_11);
+  __pyx_t_12 = __Pyx_PyObject_GetAttrStr(__pyx_t_11, __pyx_n_s_dev); if (unlikely(!__pyx_t_12)) __PYX_ERR(0, 141, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_12);
+  __Pyx_DECREF(__pyx_t_11); __pyx_t_11 = 0;
+  __pyx_t_11 = __Pyx_PyObject_GetAttrStr(__pyx_t_12, __pyx_n_s_data); if (unlikely(!__pyx_t_11)) __PYX_ERR(0, 141, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_11);
+  __Pyx_DECREF(__pyx_t_12); __pyx_t_12 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":142
+ *                    self.neighbor_cids.dev.data,
+ *                    pa_gpu_dst.x.dev.data, pa_gpu_dst.y.dev.data,
+ *                    pa_gpu_dst.z.dev.data, pa_gpu_dst.h.dev.data,             # <<<<<<<<<<<<<<
+ *                    pa_gpu_src.x.dev.data, pa_gpu_src.y.dev.data,
+ *                    pa_gpu_src.z.dev.data, pa_gpu_src.h.dev.data
+ */
+  __pyx_t_12 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_dst, __pyx_n_s_z); if (unlikely(!__pyx_t_12)) __PYX_ERR(0, 142, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_12);
+  __pyx_t_13 = __Pyx_PyObject_GetAttrStr(__pyx_t_12, __pyx_n_s_dev); if (unlikely(!__pyx_t_13)) __PYX_ERR(0, 142, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_13);
+  __Pyx_DECREF(__pyx_t_12); __pyx_t_12 = 0;
+  __pyx_t_12 = __Pyx_PyObject_GetAttrStr(__pyx_t_13, __pyx_n_s_data); if (unlikely(!__pyx_t_12)) __PYX_ERR(0, 142, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_12);
+  __Pyx_DECREF(__pyx_t_13); __pyx_t_13 = 0;
+  __pyx_t_13 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_dst, __pyx_n_s_h); if (unlikely(!__pyx_t_13)) __PYX_ERR(0, 142, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_13);
+  __pyx_t_14 = __Pyx_PyObject_GetAttrStr(__pyx_t_13, __pyx_n_s_dev); if (unlikely(!__pyx_t_14)) __PYX_ERR(0, 142, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_14);
+  __Pyx_DECREF(__pyx_t_13); __pyx_t_13 = 0;
+  __pyx_t_13 = __Pyx_PyObject_GetAttrStr(__pyx_t_14, __pyx_n_s_data); if (unlikely(!__pyx_t_13)) __PYX_ERR(0, 142, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_13);
+  __Pyx_DECREF(__pyx_t_14); __pyx_t_14 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":143
+ *                    pa_gpu_dst.x.dev.data, pa_gpu_dst.y.dev.data,
+ *                    pa_gpu_dst.z.dev.data, pa_gpu_dst.h.dev.data,
+ *                    pa_gpu_src.x.dev.data, pa_gpu_src.y.dev.data,             # <<<<<<<<<<<<<<
+ *                    pa_gpu_src.z.dev.data, pa_gpu_src.h.dev.data
+ *                ], [
+ */
+  __pyx_t_14 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_src, __pyx_n_s_x); if (unlikely(!__pyx_t_14)) __PYX_ERR(0, 143, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_14);
+  __pyx_t_15 = __Pyx_PyObject_GetAttrStr(__pyx_t_14, __pyx_n_s_dev); if (unlikely(!__pyx_t_15)) __PYX_ERR(0, 143, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_15);
+  __Pyx_DECREF(__pyx_t_14); __pyx_t_14 = 0;
+  __pyx_t_14 = __Pyx_PyObject_GetAttrStr(__pyx_t_15, __pyx_n_s_data); if (unlikely(!__pyx_t_14)) __PYX_ERR(0, 143, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_14);
+  __Pyx_DECREF(__pyx_t_15); __pyx_t_15 = 0;
+  __pyx_t_15 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_src, __pyx_n_s_y); if (unlikely(!__pyx_t_15)) __PYX_ERR(0, 143, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_15);
+  __pyx_t_16 = __Pyx_PyObject_GetAttrStr(__pyx_t_15, __pyx_n_s_dev); if (unlikely(!__pyx_t_16)) __PYX_ERR(0, 143, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __Pyx_DECREF(__pyx_t_15); __pyx_t_15 = 0;
+  __pyx_t_15 = __Pyx_PyObject_GetAttrStr(__pyx_t_16, __pyx_n_s_data); if (unlikely(!__pyx_t_15)) __PYX_ERR(0, 143, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_15);
+  __Pyx_DECREF(__pyx_t_16); __pyx_t_16 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":144
+ *                    pa_gpu_dst.z.dev.data, pa_gpu_dst.h.dev.data,
+ *                    pa_gpu_src.x.dev.data, pa_gpu_src.y.dev.data,
+ *                    pa_gpu_src.z.dev.data, pa_gpu_src.h.dev.data             # <<<<<<<<<<<<<<
+ *                ], [
+ *                    (self.leaf_size * octree_dst.unique_cid_count,),
+ */
+  __pyx_t_16 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_src, __pyx_n_s_z); if (unlikely(!__pyx_t_16)) __PYX_ERR(0, 144, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __pyx_t_17 = __Pyx_PyObject_GetAttrStr(__pyx_t_16, __pyx_n_s_dev); if (unlikely(!__pyx_t_17)) __PYX_ERR(0, 144, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_17);
+  __Pyx_DECREF(__pyx_t_16); __pyx_t_16 = 0;
+  __pyx_t_16 = __Pyx_PyObject_GetAttrStr(__pyx_t_17, __pyx_n_s_data); if (unlikely(!__pyx_t_16)) __PYX_ERR(0, 144, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __Pyx_DECREF(__pyx_t_17); __pyx_t_17 = 0;
+  __pyx_t_17 = __Pyx_PyObject_GetAttrStr(__pyx_v_pa_gpu_src, __pyx_n_s_h); if (unlikely(!__pyx_t_17)) __PYX_ERR(0, 144, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_17);
+  __pyx_t_18 = __Pyx_PyObject_GetAttrStr(__pyx_t_17, __pyx_n_s_dev); if (unlikely(!__pyx_t_18)) __PYX_ERR(0, 144, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_18);
+  __Pyx_DECREF(__pyx_t_17); __pyx_t_17 = 0;
+  __pyx_t_17 = __Pyx_PyObject_GetAttrStr(__pyx_t_18, __pyx_n_s_data); if (unlikely(!__pyx_t_17)) __PYX_ERR(0, 144, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_17);
+  __Pyx_DECREF(__pyx_t_18); __pyx_t_18 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":132
+ *         pa_gpu_src = octree_src.pa.gpu
+ * 
+ *         return [             # <<<<<<<<<<<<<<
+ *                    octree_dst.unique_cids.dev.data,
+ *                    octree_src.pids.dev.data,
+ */
+  __pyx_t_18 = PyList_New(17); if (unlikely(!__pyx_t_18)) __PYX_ERR(0, 132, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_18);
+  __Pyx_GIVEREF(__pyx_t_1);
+  PyList_SET_ITEM(__pyx_t_18, 0, __pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_2);
+  PyList_SET_ITEM(__pyx_t_18, 1, __pyx_t_2);
+  __Pyx_GIVEREF(__pyx_t_3);
+  PyList_SET_ITEM(__pyx_t_18, 2, __pyx_t_3);
+  __Pyx_GIVEREF(__pyx_t_4);
+  PyList_SET_ITEM(__pyx_t_18, 3, __pyx_t_4);
+  __Pyx_GIVEREF(__pyx_t_5);
+  PyList_SET_ITEM(__pyx_t_18, 4, __pyx_t_5);
+  __Pyx_GIVEREF(__pyx_t_6);
+  PyList_SET_ITEM(__pyx_t_18, 5, __pyx_t_6);
+  __Pyx_GIVEREF(__pyx_t_7);
+  PyList_SET_ITEM(__pyx_t_18, 6, __pyx_t_7);
+  __Pyx_GIVEREF(__pyx_t_8);
+  PyList_SET_ITEM(__pyx_t_18, 7, __pyx_t_8);
+  __Pyx_GIVEREF(__pyx_t_10);
+  PyList_SET_ITEM(__pyx_t_18, 8, __pyx_t_10);
+  __Pyx_GIVEREF(__pyx_t_9);
+  PyList_SET_ITEM(__pyx_t_18, 9, __pyx_t_9);
+  __Pyx_GIVEREF(__pyx_t_11);
+  PyList_SET_ITEM(__pyx_t_18, 10, __pyx_t_11);
+  __Pyx_GIVEREF(__pyx_t_12);
+  PyList_SET_ITEM(__pyx_t_18, 11, __pyx_t_12);
+  __Pyx_GIVEREF(__pyx_t_13);
+  PyList_SET_ITEM(__pyx_t_18, 12, __pyx_t_13);
+  __Pyx_GIVEREF(__pyx_t_14);
+  PyList_SET_ITEM(__pyx_t_18, 13, __pyx_t_14);
+  __Pyx_GIVEREF(__pyx_t_15);
+  PyList_SET_ITEM(__pyx_t_18, 14, __pyx_t_15);
+  __Pyx_GIVEREF(__pyx_t_16);
+  PyList_SET_ITEM(__pyx_t_18, 15, __pyx_t_16);
+  __Pyx_GIVEREF(__pyx_t_17);
+  PyList_SET_ITEM(__pyx_t_18, 16, __pyx_t_17);
+  __pyx_t_1 = 0;
+  __pyx_t_2 = 0;
+  __pyx_t_3 = 0;
+  __pyx_t_4 = 0;
+  __pyx_t_5 = 0;
+  __pyx_t_6 = 0;
+  __pyx_t_7 = 0;
+  __pyx_t_8 = 0;
+  __pyx_t_10 = 0;
+  __pyx_t_9 = 0;
+  __pyx_t_11 = 0;
+  __pyx_t_12 = 0;
+  __pyx_t_13 = 0;
+  __pyx_t_14 = 0;
+  __pyx_t_15 = 0;
+  __pyx_t_16 = 0;
+  __pyx_t_17 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":146
+ *                    pa_gpu_src.z.dev.data, pa_gpu_src.h.dev.data
+ *                ], [
+ *                    (self.leaf_size * octree_dst.unique_cid_count,),             # <<<<<<<<<<<<<<
+ *                    (self.leaf_size,)
+ *                ]
+ */
+  __pyx_t_17 = __Pyx_PyObject_GetAttrStr(__pyx_v_octree_dst, __pyx_n_s_unique_cid_count); if (unlikely(!__pyx_t_17)) __PYX_ERR(0, 146, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_17);
+  __pyx_t_16 = PyNumber_Multiply(__pyx_v_self->leaf_size, __pyx_t_17); if (unlikely(!__pyx_t_16)) __PYX_ERR(0, 146, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __Pyx_DECREF(__pyx_t_17); __pyx_t_17 = 0;
+  __pyx_t_17 = PyTuple_New(1); if (unlikely(!__pyx_t_17)) __PYX_ERR(0, 146, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_17);
+  __Pyx_GIVEREF(__pyx_t_16);
+  PyTuple_SET_ITEM(__pyx_t_17, 0, __pyx_t_16);
+  __pyx_t_16 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":147
+ *                ], [
+ *                    (self.leaf_size * octree_dst.unique_cid_count,),
+ *                    (self.leaf_size,)             # <<<<<<<<<<<<<<
+ *                ]
+ */
+  __pyx_t_16 = PyTuple_New(1); if (unlikely(!__pyx_t_16)) __PYX_ERR(0, 147, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __Pyx_INCREF(__pyx_v_self->leaf_size);
+  __Pyx_GIVEREF(__pyx_v_self->leaf_size);
+  PyTuple_SET_ITEM(__pyx_t_16, 0, __pyx_v_self->leaf_size);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":145
+ *                    pa_gpu_src.x.dev.data, pa_gpu_src.y.dev.data,
+ *                    pa_gpu_src.z.dev.data, pa_gpu_src.h.dev.data
+ *                ], [             # <<<<<<<<<<<<<<
+ *                    (self.leaf_size * octree_dst.unique_cid_count,),
+ *                    (self.leaf_size,)
+ */
+  __pyx_t_15 = PyList_New(2); if (unlikely(!__pyx_t_15)) __PYX_ERR(0, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_15);
+  __Pyx_GIVEREF(__pyx_t_17);
+  PyList_SET_ITEM(__pyx_t_15, 0, __pyx_t_17);
+  __Pyx_GIVEREF(__pyx_t_16);
+  PyList_SET_ITEM(__pyx_t_15, 1, __pyx_t_16);
+  __pyx_t_17 = 0;
+  __pyx_t_16 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":132
+ *         pa_gpu_src = octree_src.pa.gpu
+ * 
+ *         return [             # <<<<<<<<<<<<<<
+ *                    octree_dst.unique_cids.dev.data,
+ *                    octree_src.pids.dev.data,
+ */
+  __pyx_t_16 = PyTuple_New(2); if (unlikely(!__pyx_t_16)) __PYX_ERR(0, 132, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __Pyx_GIVEREF(__pyx_t_18);
+  PyTuple_SET_ITEM(__pyx_t_16, 0, __pyx_t_18);
+  __Pyx_GIVEREF(__pyx_t_15);
+  PyTuple_SET_ITEM(__pyx_t_16, 1, __pyx_t_15);
+  __pyx_t_18 = 0;
+  __pyx_t_15 = 0;
+  __pyx_r = __pyx_t_16;
+  __pyx_t_16 = 0;
+  goto __pyx_L0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":126
+ *         )
+ * 
+ *     cpdef get_kernel_args(self, c_type):             # <<<<<<<<<<<<<<
+ *         octree_dst = self.octrees[self.dst_index]
+ *         octree_src = self.octrees[self.src_index]
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_7);
+  __Pyx_XDECREF(__pyx_t_8);
+  __Pyx_XDECREF(__pyx_t_9);
+  __Pyx_XDECREF(__pyx_t_10);
+  __Pyx_XDECREF(__pyx_t_11);
+  __Pyx_XDECREF(__pyx_t_12);
+  __Pyx_XDECREF(__pyx_t_13);
+  __Pyx_XDECREF(__pyx_t_14);
+  __Pyx_XDECREF(__pyx_t_15);
+  __Pyx_XDECREF(__pyx_t_16);
+  __Pyx_XDECREF(__pyx_t_17);
+  __Pyx_XDECREF(__pyx_t_18);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.get_kernel_args", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_octree_dst);
+  __Pyx_XDECREF(__pyx_v_octree_src);
+  __Pyx_XDECREF(__pyx_v_pa_gpu_dst);
+  __Pyx_XDECREF(__pyx_v_pa_gpu_src);
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_11get_kernel_args(PyObject *__pyx_v_self, PyObject *__pyx_v_c_type); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10get_kernel_args[] = "OctreeGPUNNPS.get_kernel_args(self, c_type)";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_11get_kernel_args(PyObject *__pyx_v_self, PyObject *__pyx_v_c_type) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("get_kernel_args (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10get_kernel_args(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_c_type));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10get_kernel_args(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_c_type) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("get_kernel_args", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_get_kernel_args(__pyx_v_self, __pyx_v_c_type, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 126, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.get_kernel_args", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":9
+ *     cdef NNPSParticleArrayWrapper src, dst # Current source and destination.
+ * 
+ *     cdef public list pids             # <<<<<<<<<<<<<<
+ *     cdef public list pid_keys
+ *     cdef public list cids
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->pids);
+  __pyx_r = __pyx_v_self->pids;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  if (!(likely(PyList_CheckExact(__pyx_v_value))||((__pyx_v_value) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_v_value)->tp_name), 0))) __PYX_ERR(1, 9, __pyx_L1_error)
+  __pyx_t_1 = __pyx_v_value;
+  __Pyx_INCREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v_self->pids);
+  __Pyx_DECREF(__pyx_v_self->pids);
+  __pyx_v_self->pids = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.pids.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->pids);
+  __Pyx_DECREF(__pyx_v_self->pids);
+  __pyx_v_self->pids = ((PyObject*)Py_None);
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":10
+ * 
+ *     cdef public list pids
+ *     cdef public list pid_keys             # <<<<<<<<<<<<<<
+ *     cdef public list cids
+ *     cdef public list cid_to_idx
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->pid_keys);
+  __pyx_r = __pyx_v_self->pid_keys;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  if (!(likely(PyList_CheckExact(__pyx_v_value))||((__pyx_v_value) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_v_value)->tp_name), 0))) __PYX_ERR(1, 10, __pyx_L1_error)
+  __pyx_t_1 = __pyx_v_value;
+  __Pyx_INCREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v_self->pid_keys);
+  __Pyx_DECREF(__pyx_v_self->pid_keys);
+  __pyx_v_self->pid_keys = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.pid_keys.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->pid_keys);
+  __Pyx_DECREF(__pyx_v_self->pid_keys);
+  __pyx_v_self->pid_keys = ((PyObject*)Py_None);
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":11
+ *     cdef public list pids
+ *     cdef public list pid_keys
+ *     cdef public list cids             # <<<<<<<<<<<<<<
+ *     cdef public list cid_to_idx
+ *     cdef public list max_cid
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->cids);
+  __pyx_r = __pyx_v_self->cids;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  if (!(likely(PyList_CheckExact(__pyx_v_value))||((__pyx_v_value) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_v_value)->tp_name), 0))) __PYX_ERR(1, 11, __pyx_L1_error)
+  __pyx_t_1 = __pyx_v_value;
+  __Pyx_INCREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v_self->cids);
+  __Pyx_DECREF(__pyx_v_self->cids);
+  __pyx_v_self->cids = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.cids.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->cids);
+  __Pyx_DECREF(__pyx_v_self->cids);
+  __pyx_v_self->cids = ((PyObject*)Py_None);
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":12
+ *     cdef public list pid_keys
+ *     cdef public list cids
+ *     cdef public list cid_to_idx             # <<<<<<<<<<<<<<
+ *     cdef public list max_cid
+ *     cdef public object dst_to_src
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->cid_to_idx);
+  __pyx_r = __pyx_v_self->cid_to_idx;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  if (!(likely(PyList_CheckExact(__pyx_v_value))||((__pyx_v_value) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_v_value)->tp_name), 0))) __PYX_ERR(1, 12, __pyx_L1_error)
+  __pyx_t_1 = __pyx_v_value;
+  __Pyx_INCREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v_self->cid_to_idx);
+  __Pyx_DECREF(__pyx_v_self->cid_to_idx);
+  __pyx_v_self->cid_to_idx = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.cid_to_idx.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->cid_to_idx);
+  __Pyx_DECREF(__pyx_v_self->cid_to_idx);
+  __pyx_v_self->cid_to_idx = ((PyObject*)Py_None);
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":13
+ *     cdef public list cids
+ *     cdef public list cid_to_idx
+ *     cdef public list max_cid             # <<<<<<<<<<<<<<
+ *     cdef public object dst_to_src
+ *     cdef object overflow_cid_to_idx
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->max_cid);
+  __pyx_r = __pyx_v_self->max_cid;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  if (!(likely(PyList_CheckExact(__pyx_v_value))||((__pyx_v_value) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_v_value)->tp_name), 0))) __PYX_ERR(1, 13, __pyx_L1_error)
+  __pyx_t_1 = __pyx_v_value;
+  __Pyx_INCREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v_self->max_cid);
+  __Pyx_DECREF(__pyx_v_self->max_cid);
+  __pyx_v_self->max_cid = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.max_cid.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->max_cid);
+  __Pyx_DECREF(__pyx_v_self->max_cid);
+  __pyx_v_self->max_cid = ((PyObject*)Py_None);
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":14
+ *     cdef public list cid_to_idx
+ *     cdef public list max_cid
+ *     cdef public object dst_to_src             # <<<<<<<<<<<<<<
+ *     cdef object overflow_cid_to_idx
+ *     cdef object curr_cid
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->dst_to_src);
+  __pyx_r = __pyx_v_self->dst_to_src;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __Pyx_INCREF(__pyx_v_value);
+  __Pyx_GIVEREF(__pyx_v_value);
+  __Pyx_GOTREF(__pyx_v_self->dst_to_src);
+  __Pyx_DECREF(__pyx_v_self->dst_to_src);
+  __pyx_v_self->dst_to_src = __pyx_v_value;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->dst_to_src);
+  __Pyx_DECREF(__pyx_v_self->dst_to_src);
+  __pyx_v_self->dst_to_src = Py_None;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":23
+ *     cdef object make_vec
+ * 
+ *     cdef public bint allow_sort             # <<<<<<<<<<<<<<
+ *     cdef bint dst_src
+ * 
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __Pyx_PyBool_FromLong(__pyx_v_self->allow_sort); if (unlikely(!__pyx_t_1)) __PYX_ERR(1, 23, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.allow_sort.__get__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __pyx_t_1 = __Pyx_PyObject_IsTrue(__pyx_v_value); if (unlikely((__pyx_t_1 == (int)-1) && PyErr_Occurred())) __PYX_ERR(1, 23, __pyx_L1_error)
+  __pyx_v_self->allow_sort = __pyx_t_1;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.allow_sort.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":26
+ *     cdef bint dst_src
+ * 
+ *     cdef public object neighbor_cid_counts             # <<<<<<<<<<<<<<
+ *     cdef public object neighbor_cids
+ *     cdef public list octrees
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cid_counts);
+  __pyx_r = __pyx_v_self->neighbor_cid_counts;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __Pyx_INCREF(__pyx_v_value);
+  __Pyx_GIVEREF(__pyx_v_value);
+  __Pyx_GOTREF(__pyx_v_self->neighbor_cid_counts);
+  __Pyx_DECREF(__pyx_v_self->neighbor_cid_counts);
+  __pyx_v_self->neighbor_cid_counts = __pyx_v_value;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->neighbor_cid_counts);
+  __Pyx_DECREF(__pyx_v_self->neighbor_cid_counts);
+  __pyx_v_self->neighbor_cid_counts = Py_None;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":27
+ * 
+ *     cdef public object neighbor_cid_counts
+ *     cdef public object neighbor_cids             # <<<<<<<<<<<<<<
+ *     cdef public list octrees
+ *     cdef public bint use_elementwise
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cids);
+  __pyx_r = __pyx_v_self->neighbor_cids;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __Pyx_INCREF(__pyx_v_value);
+  __Pyx_GIVEREF(__pyx_v_value);
+  __Pyx_GOTREF(__pyx_v_self->neighbor_cids);
+  __Pyx_DECREF(__pyx_v_self->neighbor_cids);
+  __pyx_v_self->neighbor_cids = __pyx_v_value;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->neighbor_cids);
+  __Pyx_DECREF(__pyx_v_self->neighbor_cids);
+  __pyx_v_self->neighbor_cids = Py_None;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":28
+ *     cdef public object neighbor_cid_counts
+ *     cdef public object neighbor_cids
+ *     cdef public list octrees             # <<<<<<<<<<<<<<
+ *     cdef public bint use_elementwise
+ *     cdef public bint use_partitions
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->octrees);
+  __pyx_r = __pyx_v_self->octrees;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  if (!(likely(PyList_CheckExact(__pyx_v_value))||((__pyx_v_value) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_v_value)->tp_name), 0))) __PYX_ERR(1, 28, __pyx_L1_error)
+  __pyx_t_1 = __pyx_v_value;
+  __Pyx_INCREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v_self->octrees);
+  __Pyx_DECREF(__pyx_v_self->octrees);
+  __pyx_v_self->octrees = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.octrees.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->octrees);
+  __Pyx_DECREF(__pyx_v_self->octrees);
+  __pyx_v_self->octrees = ((PyObject*)Py_None);
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":29
+ *     cdef public object neighbor_cids
+ *     cdef public list octrees
+ *     cdef public bint use_elementwise             # <<<<<<<<<<<<<<
+ *     cdef public bint use_partitions
+ *     cdef public object leaf_size
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __Pyx_PyBool_FromLong(__pyx_v_self->use_elementwise); if (unlikely(!__pyx_t_1)) __PYX_ERR(1, 29, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.use_elementwise.__get__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __pyx_t_1 = __Pyx_PyObject_IsTrue(__pyx_v_value); if (unlikely((__pyx_t_1 == (int)-1) && PyErr_Occurred())) __PYX_ERR(1, 29, __pyx_L1_error)
+  __pyx_v_self->use_elementwise = __pyx_t_1;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.use_elementwise.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":30
+ *     cdef public list octrees
+ *     cdef public bint use_elementwise
+ *     cdef public bint use_partitions             # <<<<<<<<<<<<<<
+ *     cdef public object leaf_size
+ * 
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = __Pyx_PyBool_FromLong(__pyx_v_self->use_partitions); if (unlikely(!__pyx_t_1)) __PYX_ERR(1, 30, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.use_partitions.__get__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __pyx_t_1 = __Pyx_PyObject_IsTrue(__pyx_v_value); if (unlikely((__pyx_t_1 == (int)-1) && PyErr_Occurred())) __PYX_ERR(1, 30, __pyx_L1_error)
+  __pyx_v_self->use_partitions = __pyx_t_1;
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.use_partitions.__set__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/octree_gpu_nnps.pxd":31
+ *     cdef public bint use_elementwise
+ *     cdef public bint use_partitions
+ *     cdef public object leaf_size             # <<<<<<<<<<<<<<
+ * 
+ *     cpdef _bin(self, int pa_index)
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_1__get__(PyObject *__pyx_v_self); /*proto*/
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_1__get__(PyObject *__pyx_v_self) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size___get__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size___get__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__get__", 0);
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v_self->leaf_size);
+  __pyx_r = __pyx_v_self->leaf_size;
+  goto __pyx_L0;
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_3__set__(PyObject *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_2__set__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v_value));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_2__set__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v_value) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__set__", 0);
+  __Pyx_INCREF(__pyx_v_value);
+  __Pyx_GIVEREF(__pyx_v_value);
+  __Pyx_GOTREF(__pyx_v_self->leaf_size);
+  __Pyx_DECREF(__pyx_v_self->leaf_size);
+  __pyx_v_self->leaf_size = __pyx_v_value;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* Python wrapper */
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_5__del__(PyObject *__pyx_v_self); /*proto*/
+static int __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_5__del__(PyObject *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_4__del__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static int __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_4__del__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__del__", 0);
+  __Pyx_INCREF(Py_None);
+  __Pyx_GIVEREF(Py_None);
+  __Pyx_GOTREF(__pyx_v_self->leaf_size);
+  __Pyx_DECREF(__pyx_v_self->leaf_size);
+  __pyx_v_self->leaf_size = Py_None;
+
+  /* function exit code */
+  __pyx_r = 0;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "(tree fragment)":1
+ * def __reduce_cython__(self):             # <<<<<<<<<<<<<<
+ *     cdef tuple state
+ *     cdef object _dict
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13__reduce_cython__(PyObject *__pyx_v_self, CYTHON_UNUSED PyObject *unused); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_12__reduce_cython__[] = "OctreeGPUNNPS.__reduce_cython__(self)";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13__reduce_cython__(PyObject *__pyx_v_self, CYTHON_UNUSED PyObject *unused) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__reduce_cython__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_12__reduce_cython__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_12__reduce_cython__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self) {
+  PyObject *__pyx_v_state = 0;
+  PyObject *__pyx_v__dict = 0;
+  int __pyx_v_use_setstate;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  PyObject *__pyx_t_7 = NULL;
+  PyObject *__pyx_t_8 = NULL;
+  PyObject *__pyx_t_9 = NULL;
+  PyObject *__pyx_t_10 = NULL;
+  PyObject *__pyx_t_11 = NULL;
+  PyObject *__pyx_t_12 = NULL;
+  PyObject *__pyx_t_13 = NULL;
+  PyObject *__pyx_t_14 = NULL;
+  PyObject *__pyx_t_15 = NULL;
+  PyObject *__pyx_t_16 = NULL;
+  PyObject *__pyx_t_17 = NULL;
+  PyObject *__pyx_t_18 = NULL;
+  PyObject *__pyx_t_19 = NULL;
+  PyObject *__pyx_t_20 = NULL;
+  PyObject *__pyx_t_21 = NULL;
+  PyObject *__pyx_t_22 = NULL;
+  int __pyx_t_23;
+  int __pyx_t_24;
+  int __pyx_t_25;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__reduce_cython__", 0);
+
+  /* "(tree fragment)":5
+ *     cdef object _dict
+ *     cdef bint use_setstate
+ *     state = (self._last_domain_size, self.allow_sort, self.backend, self.cache, self.cell_shifts, self.cell_size, self.cid_to_idx, self.cids, self.curr_cid, self.current_cache, self.dim, self.domain, self.dst, self.dst_index, self.dst_src, self.dst_to_src, self.dtype, self.dtype_max, self.helper, self.hmin, self.is_periodic, self.leaf_size, self.make_vec, self.max_cid, self.max_cid_src, self.n_cells, self.n_updates, self.narrays, self.neighbor_cid_counts, self.neighbor_cids, self.octrees, self.overflow_cid_to_idx, self.pa_wrappers, self.particles, self.pid_keys, self.pids, self.queue, self.radius_scale, self.radius_scale2, self.radix_sort, self.sort_gids, self.src, self.src_index, self.total_update_time, self.update_time, self.use_cache, self.use_double, self.use_elementwise, self.use_partitions, self.xmax, self.xmin)             # <<<<<<<<<<<<<<
+ *     _dict = getattr(self, '__dict__', None)
+ *     if _dict is not None:
+ */
+  __pyx_t_1 = PyFloat_FromDouble(__pyx_v_self->__pyx_base._last_domain_size); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyBool_FromLong(__pyx_v_self->allow_sort); if (unlikely(!__pyx_t_2)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyFloat_FromDouble(__pyx_v_self->__pyx_base.__pyx_base.cell_size); if (unlikely(!__pyx_t_3)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_4 = __Pyx_PyInt_From_int(__pyx_v_self->__pyx_base.__pyx_base.dim); if (unlikely(!__pyx_t_4)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_5 = __Pyx_PyInt_From_int(__pyx_v_self->__pyx_base.__pyx_base.dst_index); if (unlikely(!__pyx_t_5)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __pyx_t_6 = __Pyx_PyBool_FromLong(__pyx_v_self->dst_src); if (unlikely(!__pyx_t_6)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_6);
+  __pyx_t_7 = PyFloat_FromDouble(__pyx_v_self->__pyx_base.__pyx_base.hmin); if (unlikely(!__pyx_t_7)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_7);
+  __pyx_t_8 = __Pyx_PyBool_FromLong(__pyx_v_self->__pyx_base.__pyx_base.is_periodic); if (unlikely(!__pyx_t_8)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_8);
+  __pyx_t_9 = __Pyx_PyInt_From_int(__pyx_v_self->__pyx_base.__pyx_base.n_cells); if (unlikely(!__pyx_t_9)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_9);
+  __pyx_t_10 = __Pyx_PyInt_From_long(__pyx_v_self->__pyx_base.__pyx_base.n_updates); if (unlikely(!__pyx_t_10)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_10);
+  __pyx_t_11 = __Pyx_PyInt_From_int(__pyx_v_self->__pyx_base.__pyx_base.narrays); if (unlikely(!__pyx_t_11)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_11);
+  __pyx_t_12 = PyFloat_FromDouble(__pyx_v_self->__pyx_base.__pyx_base.radius_scale); if (unlikely(!__pyx_t_12)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_12);
+  __pyx_t_13 = PyFloat_FromDouble(__pyx_v_self->__pyx_base.radius_scale2); if (unlikely(!__pyx_t_13)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_13);
+  __pyx_t_14 = __Pyx_PyBool_FromLong(__pyx_v_self->__pyx_base.sort_gids); if (unlikely(!__pyx_t_14)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_14);
+  __pyx_t_15 = __Pyx_PyInt_From_int(__pyx_v_self->__pyx_base.__pyx_base.src_index); if (unlikely(!__pyx_t_15)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_15);
+  __pyx_t_16 = PyFloat_FromDouble(__pyx_v_self->__pyx_base.__pyx_base.total_update_time); if (unlikely(!__pyx_t_16)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_16);
+  __pyx_t_17 = PyFloat_FromDouble(__pyx_v_self->__pyx_base.__pyx_base.update_time); if (unlikely(!__pyx_t_17)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_17);
+  __pyx_t_18 = __Pyx_PyBool_FromLong(__pyx_v_self->__pyx_base.__pyx_base.use_cache); if (unlikely(!__pyx_t_18)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_18);
+  __pyx_t_19 = __Pyx_PyBool_FromLong(__pyx_v_self->__pyx_base.use_double); if (unlikely(!__pyx_t_19)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_19);
+  __pyx_t_20 = __Pyx_PyBool_FromLong(__pyx_v_self->use_elementwise); if (unlikely(!__pyx_t_20)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_20);
+  __pyx_t_21 = __Pyx_PyBool_FromLong(__pyx_v_self->use_partitions); if (unlikely(!__pyx_t_21)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_21);
+  __pyx_t_22 = PyTuple_New(51); if (unlikely(!__pyx_t_22)) __PYX_ERR(2, 5, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_22);
+  __Pyx_GIVEREF(__pyx_t_1);
+  PyTuple_SET_ITEM(__pyx_t_22, 0, __pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_2);
+  PyTuple_SET_ITEM(__pyx_t_22, 1, __pyx_t_2);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.backend);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.backend);
+  PyTuple_SET_ITEM(__pyx_t_22, 2, __pyx_v_self->__pyx_base.backend);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.__pyx_base.cache);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.__pyx_base.cache);
+  PyTuple_SET_ITEM(__pyx_t_22, 3, __pyx_v_self->__pyx_base.__pyx_base.cache);
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.cell_shifts));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.cell_shifts));
+  PyTuple_SET_ITEM(__pyx_t_22, 4, ((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.cell_shifts));
+  __Pyx_GIVEREF(__pyx_t_3);
+  PyTuple_SET_ITEM(__pyx_t_22, 5, __pyx_t_3);
+  __Pyx_INCREF(__pyx_v_self->cid_to_idx);
+  __Pyx_GIVEREF(__pyx_v_self->cid_to_idx);
+  PyTuple_SET_ITEM(__pyx_t_22, 6, __pyx_v_self->cid_to_idx);
+  __Pyx_INCREF(__pyx_v_self->cids);
+  __Pyx_GIVEREF(__pyx_v_self->cids);
+  PyTuple_SET_ITEM(__pyx_t_22, 7, __pyx_v_self->cids);
+  __Pyx_INCREF(__pyx_v_self->curr_cid);
+  __Pyx_GIVEREF(__pyx_v_self->curr_cid);
+  PyTuple_SET_ITEM(__pyx_t_22, 8, __pyx_v_self->curr_cid);
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.current_cache));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.current_cache));
+  PyTuple_SET_ITEM(__pyx_t_22, 9, ((PyObject *)__pyx_v_self->__pyx_base.current_cache));
+  __Pyx_GIVEREF(__pyx_t_4);
+  PyTuple_SET_ITEM(__pyx_t_22, 10, __pyx_t_4);
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.domain));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.domain));
+  PyTuple_SET_ITEM(__pyx_t_22, 11, ((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.domain));
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->dst));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->dst));
+  PyTuple_SET_ITEM(__pyx_t_22, 12, ((PyObject *)__pyx_v_self->dst));
+  __Pyx_GIVEREF(__pyx_t_5);
+  PyTuple_SET_ITEM(__pyx_t_22, 13, __pyx_t_5);
+  __Pyx_GIVEREF(__pyx_t_6);
+  PyTuple_SET_ITEM(__pyx_t_22, 14, __pyx_t_6);
+  __Pyx_INCREF(__pyx_v_self->dst_to_src);
+  __Pyx_GIVEREF(__pyx_v_self->dst_to_src);
+  PyTuple_SET_ITEM(__pyx_t_22, 15, __pyx_v_self->dst_to_src);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.dtype);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.dtype);
+  PyTuple_SET_ITEM(__pyx_t_22, 16, __pyx_v_self->__pyx_base.dtype);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.dtype_max);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.dtype_max);
+  PyTuple_SET_ITEM(__pyx_t_22, 17, __pyx_v_self->__pyx_base.dtype_max);
+  __Pyx_INCREF(__pyx_v_self->helper);
+  __Pyx_GIVEREF(__pyx_v_self->helper);
+  PyTuple_SET_ITEM(__pyx_t_22, 18, __pyx_v_self->helper);
+  __Pyx_GIVEREF(__pyx_t_7);
+  PyTuple_SET_ITEM(__pyx_t_22, 19, __pyx_t_7);
+  __Pyx_GIVEREF(__pyx_t_8);
+  PyTuple_SET_ITEM(__pyx_t_22, 20, __pyx_t_8);
+  __Pyx_INCREF(__pyx_v_self->leaf_size);
+  __Pyx_GIVEREF(__pyx_v_self->leaf_size);
+  PyTuple_SET_ITEM(__pyx_t_22, 21, __pyx_v_self->leaf_size);
+  __Pyx_INCREF(__pyx_v_self->make_vec);
+  __Pyx_GIVEREF(__pyx_v_self->make_vec);
+  PyTuple_SET_ITEM(__pyx_t_22, 22, __pyx_v_self->make_vec);
+  __Pyx_INCREF(__pyx_v_self->max_cid);
+  __Pyx_GIVEREF(__pyx_v_self->max_cid);
+  PyTuple_SET_ITEM(__pyx_t_22, 23, __pyx_v_self->max_cid);
+  __Pyx_INCREF(__pyx_v_self->max_cid_src);
+  __Pyx_GIVEREF(__pyx_v_self->max_cid_src);
+  PyTuple_SET_ITEM(__pyx_t_22, 24, __pyx_v_self->max_cid_src);
+  __Pyx_GIVEREF(__pyx_t_9);
+  PyTuple_SET_ITEM(__pyx_t_22, 25, __pyx_t_9);
+  __Pyx_GIVEREF(__pyx_t_10);
+  PyTuple_SET_ITEM(__pyx_t_22, 26, __pyx_t_10);
+  __Pyx_GIVEREF(__pyx_t_11);
+  PyTuple_SET_ITEM(__pyx_t_22, 27, __pyx_t_11);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cid_counts);
+  __Pyx_GIVEREF(__pyx_v_self->neighbor_cid_counts);
+  PyTuple_SET_ITEM(__pyx_t_22, 28, __pyx_v_self->neighbor_cid_counts);
+  __Pyx_INCREF(__pyx_v_self->neighbor_cids);
+  __Pyx_GIVEREF(__pyx_v_self->neighbor_cids);
+  PyTuple_SET_ITEM(__pyx_t_22, 29, __pyx_v_self->neighbor_cids);
+  __Pyx_INCREF(__pyx_v_self->octrees);
+  __Pyx_GIVEREF(__pyx_v_self->octrees);
+  PyTuple_SET_ITEM(__pyx_t_22, 30, __pyx_v_self->octrees);
+  __Pyx_INCREF(__pyx_v_self->overflow_cid_to_idx);
+  __Pyx_GIVEREF(__pyx_v_self->overflow_cid_to_idx);
+  PyTuple_SET_ITEM(__pyx_t_22, 31, __pyx_v_self->overflow_cid_to_idx);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.__pyx_base.pa_wrappers);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.__pyx_base.pa_wrappers);
+  PyTuple_SET_ITEM(__pyx_t_22, 32, __pyx_v_self->__pyx_base.__pyx_base.pa_wrappers);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.__pyx_base.particles);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.__pyx_base.particles);
+  PyTuple_SET_ITEM(__pyx_t_22, 33, __pyx_v_self->__pyx_base.__pyx_base.particles);
+  __Pyx_INCREF(__pyx_v_self->pid_keys);
+  __Pyx_GIVEREF(__pyx_v_self->pid_keys);
+  PyTuple_SET_ITEM(__pyx_t_22, 34, __pyx_v_self->pid_keys);
+  __Pyx_INCREF(__pyx_v_self->pids);
+  __Pyx_GIVEREF(__pyx_v_self->pids);
+  PyTuple_SET_ITEM(__pyx_t_22, 35, __pyx_v_self->pids);
+  __Pyx_INCREF(__pyx_v_self->__pyx_base.queue);
+  __Pyx_GIVEREF(__pyx_v_self->__pyx_base.queue);
+  PyTuple_SET_ITEM(__pyx_t_22, 36, __pyx_v_self->__pyx_base.queue);
+  __Pyx_GIVEREF(__pyx_t_12);
+  PyTuple_SET_ITEM(__pyx_t_22, 37, __pyx_t_12);
+  __Pyx_GIVEREF(__pyx_t_13);
+  PyTuple_SET_ITEM(__pyx_t_22, 38, __pyx_t_13);
+  __Pyx_INCREF(__pyx_v_self->radix_sort);
+  __Pyx_GIVEREF(__pyx_v_self->radix_sort);
+  PyTuple_SET_ITEM(__pyx_t_22, 39, __pyx_v_self->radix_sort);
+  __Pyx_GIVEREF(__pyx_t_14);
+  PyTuple_SET_ITEM(__pyx_t_22, 40, __pyx_t_14);
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->src));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->src));
+  PyTuple_SET_ITEM(__pyx_t_22, 41, ((PyObject *)__pyx_v_self->src));
+  __Pyx_GIVEREF(__pyx_t_15);
+  PyTuple_SET_ITEM(__pyx_t_22, 42, __pyx_t_15);
+  __Pyx_GIVEREF(__pyx_t_16);
+  PyTuple_SET_ITEM(__pyx_t_22, 43, __pyx_t_16);
+  __Pyx_GIVEREF(__pyx_t_17);
+  PyTuple_SET_ITEM(__pyx_t_22, 44, __pyx_t_17);
+  __Pyx_GIVEREF(__pyx_t_18);
+  PyTuple_SET_ITEM(__pyx_t_22, 45, __pyx_t_18);
+  __Pyx_GIVEREF(__pyx_t_19);
+  PyTuple_SET_ITEM(__pyx_t_22, 46, __pyx_t_19);
+  __Pyx_GIVEREF(__pyx_t_20);
+  PyTuple_SET_ITEM(__pyx_t_22, 47, __pyx_t_20);
+  __Pyx_GIVEREF(__pyx_t_21);
+  PyTuple_SET_ITEM(__pyx_t_22, 48, __pyx_t_21);
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.xmax));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.xmax));
+  PyTuple_SET_ITEM(__pyx_t_22, 49, ((PyObject *)__pyx_v_self->__pyx_base.xmax));
+  __Pyx_INCREF(((PyObject *)__pyx_v_self->__pyx_base.xmin));
+  __Pyx_GIVEREF(((PyObject *)__pyx_v_self->__pyx_base.xmin));
+  PyTuple_SET_ITEM(__pyx_t_22, 50, ((PyObject *)__pyx_v_self->__pyx_base.xmin));
+  __pyx_t_1 = 0;
+  __pyx_t_2 = 0;
+  __pyx_t_3 = 0;
+  __pyx_t_4 = 0;
+  __pyx_t_5 = 0;
+  __pyx_t_6 = 0;
+  __pyx_t_7 = 0;
+  __pyx_t_8 = 0;
+  __pyx_t_9 = 0;
+  __pyx_t_10 = 0;
+  __pyx_t_11 = 0;
+  __pyx_t_12 = 0;
+  __pyx_t_13 = 0;
+  __pyx_t_14 = 0;
+  __pyx_t_15 = 0;
+  __pyx_t_16 = 0;
+  __pyx_t_17 = 0;
+  __pyx_t_18 = 0;
+  __pyx_t_19 = 0;
+  __pyx_t_20 = 0;
+  __pyx_t_21 = 0;
+  __pyx_v_state = ((PyObject*)__pyx_t_22);
+  __pyx_t_22 = 0;
+
+  /* "(tree fragment)":6
+ *     cdef bint use_setstate
+ *     state = (self._last_domain_size, self.allow_sort, self.backend, self.cache, self.cell_shifts, self.cell_size, self.cid_to_idx, self.cids, self.curr_cid, self.current_cache, self.dim, self.domain, self.dst, self.dst_index, self.dst_src, self.dst_to_src, self.dtype, self.dtype_max, self.helper, self.hmin, self.is_periodic, self.leaf_size, self.make_vec, self.max_cid, self.max_cid_src, self.n_cells, self.n_updates, self.narrays, self.neighbor_cid_counts, self.neighbor_cids, self.octrees, self.overflow_cid_to_idx, self.pa_wrappers, self.particles, self.pid_keys, self.pids, self.queue, self.radius_scale, self.radius_scale2, self.radix_sort, self.sort_gids, self.src, self.src_index, self.total_update_time, self.update_time, self.use_cache, self.use_double, self.use_elementwise, self.use_partitions, self.xmax, self.xmin)
+ *     _dict = getattr(self, '__dict__', None)             # <<<<<<<<<<<<<<
+ *     if _dict is not None:
+ *         state += (_dict,)
+ */
+  __pyx_t_22 = __Pyx_GetAttr3(((PyObject *)__pyx_v_self), __pyx_n_s_dict, Py_None); if (unlikely(!__pyx_t_22)) __PYX_ERR(2, 6, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_22);
+  __pyx_v__dict = __pyx_t_22;
+  __pyx_t_22 = 0;
+
+  /* "(tree fragment)":7
+ *     state = (self._last_domain_size, self.allow_sort, self.backend, self.cache, self.cell_shifts, self.cell_size, self.cid_to_idx, self.cids, self.curr_cid, self.current_cache, self.dim, self.domain, self.dst, self.dst_index, self.dst_src, self.dst_to_src, self.dtype, self.dtype_max, self.helper, self.hmin, self.is_periodic, self.leaf_size, self.make_vec, self.max_cid, self.max_cid_src, self.n_cells, self.n_updates, self.narrays, self.neighbor_cid_counts, self.neighbor_cids, self.octrees, self.overflow_cid_to_idx, self.pa_wrappers, self.particles, self.pid_keys, self.pids, self.queue, self.radius_scale, self.radius_scale2, self.radix_sort, self.sort_gids, self.src, self.src_index, self.total_update_time, self.update_time, self.use_cache, self.use_double, self.use_elementwise, self.use_partitions, self.xmax, self.xmin)
+ *     _dict = getattr(self, '__dict__', None)
+ *     if _dict is not None:             # <<<<<<<<<<<<<<
+ *         state += (_dict,)
+ *         use_setstate = True
+ */
+  __pyx_t_23 = (__pyx_v__dict != Py_None);
+  __pyx_t_24 = (__pyx_t_23 != 0);
+  if (__pyx_t_24) {
+
+    /* "(tree fragment)":8
+ *     _dict = getattr(self, '__dict__', None)
+ *     if _dict is not None:
+ *         state += (_dict,)             # <<<<<<<<<<<<<<
+ *         use_setstate = True
+ *     else:
+ */
+    __pyx_t_22 = PyTuple_New(1); if (unlikely(!__pyx_t_22)) __PYX_ERR(2, 8, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_22);
+    __Pyx_INCREF(__pyx_v__dict);
+    __Pyx_GIVEREF(__pyx_v__dict);
+    PyTuple_SET_ITEM(__pyx_t_22, 0, __pyx_v__dict);
+    __pyx_t_21 = PyNumber_InPlaceAdd(__pyx_v_state, __pyx_t_22); if (unlikely(!__pyx_t_21)) __PYX_ERR(2, 8, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_21);
+    __Pyx_DECREF(__pyx_t_22); __pyx_t_22 = 0;
+    __Pyx_DECREF_SET(__pyx_v_state, ((PyObject*)__pyx_t_21));
+    __pyx_t_21 = 0;
+
+    /* "(tree fragment)":9
+ *     if _dict is not None:
+ *         state += (_dict,)
+ *         use_setstate = True             # <<<<<<<<<<<<<<
+ *     else:
+ *         use_setstate = self.backend is not None or self.cache is not None or self.cell_shifts is not None or self.cid_to_idx is not None or self.cids is not None or self.curr_cid is not None or self.current_cache is not None or self.domain is not None or self.dst is not None or self.dst_to_src is not None or self.dtype is not None or self.dtype_max is not None or self.helper is not None or self.leaf_size is not None or self.make_vec is not None or self.max_cid is not None or self.max_cid_src is not None or self.neighbor_cid_counts is not None or self.neighbor_cids is not None or self.octrees is not None or self.overflow_cid_to_idx is not None or self.pa_wrappers is not None or self.particles is not None or self.pid_keys is not None or self.pids is not None or self.queue is not None or self.radix_sort is not None or self.src is not None or self.xmax is not None or self.xmin is not None
+ */
+    __pyx_v_use_setstate = 1;
+
+    /* "(tree fragment)":7
+ *     state = (self._last_domain_size, self.allow_sort, self.backend, self.cache, self.cell_shifts, self.cell_size, self.cid_to_idx, self.cids, self.curr_cid, self.current_cache, self.dim, self.domain, self.dst, self.dst_index, self.dst_src, self.dst_to_src, self.dtype, self.dtype_max, self.helper, self.hmin, self.is_periodic, self.leaf_size, self.make_vec, self.max_cid, self.max_cid_src, self.n_cells, self.n_updates, self.narrays, self.neighbor_cid_counts, self.neighbor_cids, self.octrees, self.overflow_cid_to_idx, self.pa_wrappers, self.particles, self.pid_keys, self.pids, self.queue, self.radius_scale, self.radius_scale2, self.radix_sort, self.sort_gids, self.src, self.src_index, self.total_update_time, self.update_time, self.use_cache, self.use_double, self.use_elementwise, self.use_partitions, self.xmax, self.xmin)
+ *     _dict = getattr(self, '__dict__', None)
+ *     if _dict is not None:             # <<<<<<<<<<<<<<
+ *         state += (_dict,)
+ *         use_setstate = True
+ */
+    goto __pyx_L3;
+  }
+
+  /* "(tree fragment)":11
+ *         use_setstate = True
+ *     else:
+ *         use_setstate = self.backend is not None or self.cache is not None or self.cell_shifts is not None or self.cid_to_idx is not None or self.cids is not None or self.curr_cid is not None or self.current_cache is not None or self.domain is not None or self.dst is not None or self.dst_to_src is not None or self.dtype is not None or self.dtype_max is not None or self.helper is not None or self.leaf_size is not None or self.make_vec is not None or self.max_cid is not None or self.max_cid_src is not None or self.neighbor_cid_counts is not None or self.neighbor_cids is not None or self.octrees is not None or self.overflow_cid_to_idx is not None or self.pa_wrappers is not None or self.particles is not None or self.pid_keys is not None or self.pids is not None or self.queue is not None or self.radix_sort is not None or self.src is not None or self.xmax is not None or self.xmin is not None             # <<<<<<<<<<<<<<
+ *     if use_setstate:
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, None), state
+ */
+  /*else*/ {
+    __pyx_t_23 = (__pyx_v_self->__pyx_base.backend != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->__pyx_base.__pyx_base.cache != ((PyObject*)Py_None));
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.cell_shifts) != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->cid_to_idx != ((PyObject*)Py_None));
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->cids != ((PyObject*)Py_None));
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->curr_cid != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (((PyObject *)__pyx_v_self->__pyx_base.current_cache) != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (((PyObject *)__pyx_v_self->__pyx_base.__pyx_base.domain) != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (((PyObject *)__pyx_v_self->dst) != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->dst_to_src != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->__pyx_base.dtype != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->__pyx_base.dtype_max != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->helper != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->leaf_size != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->make_vec != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->max_cid != ((PyObject*)Py_None));
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->max_cid_src != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->neighbor_cid_counts != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->neighbor_cids != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->octrees != ((PyObject*)Py_None));
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->overflow_cid_to_idx != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->__pyx_base.__pyx_base.pa_wrappers != ((PyObject*)Py_None));
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->__pyx_base.__pyx_base.particles != ((PyObject*)Py_None));
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->pid_keys != ((PyObject*)Py_None));
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->pids != ((PyObject*)Py_None));
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (__pyx_v_self->__pyx_base.queue != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (__pyx_v_self->radix_sort != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (((PyObject *)__pyx_v_self->src) != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    if (!__pyx_t_23) {
+    } else {
+      __pyx_t_24 = __pyx_t_23;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_23 = (((PyObject *)__pyx_v_self->__pyx_base.xmax) != Py_None);
+    __pyx_t_25 = (__pyx_t_23 != 0);
+    if (!__pyx_t_25) {
+    } else {
+      __pyx_t_24 = __pyx_t_25;
+      goto __pyx_L4_bool_binop_done;
+    }
+    __pyx_t_25 = (((PyObject *)__pyx_v_self->__pyx_base.xmin) != Py_None);
+    __pyx_t_23 = (__pyx_t_25 != 0);
+    __pyx_t_24 = __pyx_t_23;
+    __pyx_L4_bool_binop_done:;
+    __pyx_v_use_setstate = __pyx_t_24;
+  }
+  __pyx_L3:;
+
+  /* "(tree fragment)":12
+ *     else:
+ *         use_setstate = self.backend is not None or self.cache is not None or self.cell_shifts is not None or self.cid_to_idx is not None or self.cids is not None or self.curr_cid is not None or self.current_cache is not None or self.domain is not None or self.dst is not None or self.dst_to_src is not None or self.dtype is not None or self.dtype_max is not None or self.helper is not None or self.leaf_size is not None or self.make_vec is not None or self.max_cid is not None or self.max_cid_src is not None or self.neighbor_cid_counts is not None or self.neighbor_cids is not None or self.octrees is not None or self.overflow_cid_to_idx is not None or self.pa_wrappers is not None or self.particles is not None or self.pid_keys is not None or self.pids is not None or self.queue is not None or self.radix_sort is not None or self.src is not None or self.xmax is not None or self.xmin is not None
+ *     if use_setstate:             # <<<<<<<<<<<<<<
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, None), state
+ *     else:
+ */
+  __pyx_t_24 = (__pyx_v_use_setstate != 0);
+  if (__pyx_t_24) {
+
+    /* "(tree fragment)":13
+ *         use_setstate = self.backend is not None or self.cache is not None or self.cell_shifts is not None or self.cid_to_idx is not None or self.cids is not None or self.curr_cid is not None or self.current_cache is not None or self.domain is not None or self.dst is not None or self.dst_to_src is not None or self.dtype is not None or self.dtype_max is not None or self.helper is not None or self.leaf_size is not None or self.make_vec is not None or self.max_cid is not None or self.max_cid_src is not None or self.neighbor_cid_counts is not None or self.neighbor_cids is not None or self.octrees is not None or self.overflow_cid_to_idx is not None or self.pa_wrappers is not None or self.particles is not None or self.pid_keys is not None or self.pids is not None or self.queue is not None or self.radix_sort is not None or self.src is not None or self.xmax is not None or self.xmin is not None
+ *     if use_setstate:
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, None), state             # <<<<<<<<<<<<<<
+ *     else:
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, state)
+ */
+    __Pyx_XDECREF(__pyx_r);
+    __Pyx_GetModuleGlobalName(__pyx_t_21, __pyx_n_s_pyx_unpickle_OctreeGPUNNPS); if (unlikely(!__pyx_t_21)) __PYX_ERR(2, 13, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_21);
+    __pyx_t_22 = PyTuple_New(3); if (unlikely(!__pyx_t_22)) __PYX_ERR(2, 13, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_22);
+    __Pyx_INCREF(((PyObject *)Py_TYPE(((PyObject *)__pyx_v_self))));
+    __Pyx_GIVEREF(((PyObject *)Py_TYPE(((PyObject *)__pyx_v_self))));
+    PyTuple_SET_ITEM(__pyx_t_22, 0, ((PyObject *)Py_TYPE(((PyObject *)__pyx_v_self))));
+    __Pyx_INCREF(__pyx_int_146956597);
+    __Pyx_GIVEREF(__pyx_int_146956597);
+    PyTuple_SET_ITEM(__pyx_t_22, 1, __pyx_int_146956597);
+    __Pyx_INCREF(Py_None);
+    __Pyx_GIVEREF(Py_None);
+    PyTuple_SET_ITEM(__pyx_t_22, 2, Py_None);
+    __pyx_t_20 = PyTuple_New(3); if (unlikely(!__pyx_t_20)) __PYX_ERR(2, 13, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_20);
+    __Pyx_GIVEREF(__pyx_t_21);
+    PyTuple_SET_ITEM(__pyx_t_20, 0, __pyx_t_21);
+    __Pyx_GIVEREF(__pyx_t_22);
+    PyTuple_SET_ITEM(__pyx_t_20, 1, __pyx_t_22);
+    __Pyx_INCREF(__pyx_v_state);
+    __Pyx_GIVEREF(__pyx_v_state);
+    PyTuple_SET_ITEM(__pyx_t_20, 2, __pyx_v_state);
+    __pyx_t_21 = 0;
+    __pyx_t_22 = 0;
+    __pyx_r = __pyx_t_20;
+    __pyx_t_20 = 0;
+    goto __pyx_L0;
+
+    /* "(tree fragment)":12
+ *     else:
+ *         use_setstate = self.backend is not None or self.cache is not None or self.cell_shifts is not None or self.cid_to_idx is not None or self.cids is not None or self.curr_cid is not None or self.current_cache is not None or self.domain is not None or self.dst is not None or self.dst_to_src is not None or self.dtype is not None or self.dtype_max is not None or self.helper is not None or self.leaf_size is not None or self.make_vec is not None or self.max_cid is not None or self.max_cid_src is not None or self.neighbor_cid_counts is not None or self.neighbor_cids is not None or self.octrees is not None or self.overflow_cid_to_idx is not None or self.pa_wrappers is not None or self.particles is not None or self.pid_keys is not None or self.pids is not None or self.queue is not None or self.radix_sort is not None or self.src is not None or self.xmax is not None or self.xmin is not None
+ *     if use_setstate:             # <<<<<<<<<<<<<<
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, None), state
+ *     else:
+ */
+  }
+
+  /* "(tree fragment)":15
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, None), state
+ *     else:
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, state)             # <<<<<<<<<<<<<<
+ * def __setstate_cython__(self, __pyx_state):
+ *     __pyx_unpickle_OctreeGPUNNPS__set_state(self, __pyx_state)
+ */
+  /*else*/ {
+    __Pyx_XDECREF(__pyx_r);
+    __Pyx_GetModuleGlobalName(__pyx_t_20, __pyx_n_s_pyx_unpickle_OctreeGPUNNPS); if (unlikely(!__pyx_t_20)) __PYX_ERR(2, 15, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_20);
+    __pyx_t_22 = PyTuple_New(3); if (unlikely(!__pyx_t_22)) __PYX_ERR(2, 15, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_22);
+    __Pyx_INCREF(((PyObject *)Py_TYPE(((PyObject *)__pyx_v_self))));
+    __Pyx_GIVEREF(((PyObject *)Py_TYPE(((PyObject *)__pyx_v_self))));
+    PyTuple_SET_ITEM(__pyx_t_22, 0, ((PyObject *)Py_TYPE(((PyObject *)__pyx_v_self))));
+    __Pyx_INCREF(__pyx_int_146956597);
+    __Pyx_GIVEREF(__pyx_int_146956597);
+    PyTuple_SET_ITEM(__pyx_t_22, 1, __pyx_int_146956597);
+    __Pyx_INCREF(__pyx_v_state);
+    __Pyx_GIVEREF(__pyx_v_state);
+    PyTuple_SET_ITEM(__pyx_t_22, 2, __pyx_v_state);
+    __pyx_t_21 = PyTuple_New(2); if (unlikely(!__pyx_t_21)) __PYX_ERR(2, 15, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_21);
+    __Pyx_GIVEREF(__pyx_t_20);
+    PyTuple_SET_ITEM(__pyx_t_21, 0, __pyx_t_20);
+    __Pyx_GIVEREF(__pyx_t_22);
+    PyTuple_SET_ITEM(__pyx_t_21, 1, __pyx_t_22);
+    __pyx_t_20 = 0;
+    __pyx_t_22 = 0;
+    __pyx_r = __pyx_t_21;
+    __pyx_t_21 = 0;
+    goto __pyx_L0;
+  }
+
+  /* "(tree fragment)":1
+ * def __reduce_cython__(self):             # <<<<<<<<<<<<<<
+ *     cdef tuple state
+ *     cdef object _dict
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_7);
+  __Pyx_XDECREF(__pyx_t_8);
+  __Pyx_XDECREF(__pyx_t_9);
+  __Pyx_XDECREF(__pyx_t_10);
+  __Pyx_XDECREF(__pyx_t_11);
+  __Pyx_XDECREF(__pyx_t_12);
+  __Pyx_XDECREF(__pyx_t_13);
+  __Pyx_XDECREF(__pyx_t_14);
+  __Pyx_XDECREF(__pyx_t_15);
+  __Pyx_XDECREF(__pyx_t_16);
+  __Pyx_XDECREF(__pyx_t_17);
+  __Pyx_XDECREF(__pyx_t_18);
+  __Pyx_XDECREF(__pyx_t_19);
+  __Pyx_XDECREF(__pyx_t_20);
+  __Pyx_XDECREF(__pyx_t_21);
+  __Pyx_XDECREF(__pyx_t_22);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.__reduce_cython__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v_state);
+  __Pyx_XDECREF(__pyx_v__dict);
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "(tree fragment)":16
+ *     else:
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, state)
+ * def __setstate_cython__(self, __pyx_state):             # <<<<<<<<<<<<<<
+ *     __pyx_unpickle_OctreeGPUNNPS__set_state(self, __pyx_state)
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15__setstate_cython__(PyObject *__pyx_v_self, PyObject *__pyx_v___pyx_state); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14__setstate_cython__[] = "OctreeGPUNNPS.__setstate_cython__(self, __pyx_state)";
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15__setstate_cython__(PyObject *__pyx_v_self, PyObject *__pyx_v___pyx_state) {
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__setstate_cython__ (wrapper)", 0);
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14__setstate_cython__(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v_self), ((PyObject *)__pyx_v___pyx_state));
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14__setstate_cython__(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v_self, PyObject *__pyx_v___pyx_state) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__setstate_cython__", 0);
+
+  /* "(tree fragment)":17
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, state)
+ * def __setstate_cython__(self, __pyx_state):
+ *     __pyx_unpickle_OctreeGPUNNPS__set_state(self, __pyx_state)             # <<<<<<<<<<<<<<
+ */
+  if (!(likely(PyTuple_CheckExact(__pyx_v___pyx_state))||((__pyx_v___pyx_state) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "tuple", Py_TYPE(__pyx_v___pyx_state)->tp_name), 0))) __PYX_ERR(2, 17, __pyx_L1_error)
+  __pyx_t_1 = __pyx_f_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS__set_state(__pyx_v_self, ((PyObject*)__pyx_v___pyx_state)); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 17, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "(tree fragment)":16
+ *     else:
+ *         return __pyx_unpickle_OctreeGPUNNPS, (type(self), 0x8c26135, state)
+ * def __setstate_cython__(self, __pyx_state):             # <<<<<<<<<<<<<<
+ *     __pyx_unpickle_OctreeGPUNNPS__set_state(self, __pyx_state)
+ */
+
+  /* function exit code */
+  __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.OctreeGPUNNPS.__setstate_cython__", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "(tree fragment)":1
+ * def __pyx_unpickle_OctreeGPUNNPS(__pyx_type, long __pyx_checksum, __pyx_state):             # <<<<<<<<<<<<<<
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ */
+
+/* Python wrapper */
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_1__pyx_unpickle_OctreeGPUNNPS(PyObject *__pyx_self, PyObject *__pyx_args, PyObject *__pyx_kwds); /*proto*/
+static char __pyx_doc_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS[] = "__pyx_unpickle_OctreeGPUNNPS(__pyx_type, long __pyx_checksum, __pyx_state)";
+static PyMethodDef __pyx_mdef_5pysph_4base_15octree_gpu_nnps_1__pyx_unpickle_OctreeGPUNNPS = {"__pyx_unpickle_OctreeGPUNNPS", (PyCFunction)(void*)(PyCFunctionWithKeywords)__pyx_pw_5pysph_4base_15octree_gpu_nnps_1__pyx_unpickle_OctreeGPUNNPS, METH_VARARGS|METH_KEYWORDS, __pyx_doc_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS};
+static PyObject *__pyx_pw_5pysph_4base_15octree_gpu_nnps_1__pyx_unpickle_OctreeGPUNNPS(PyObject *__pyx_self, PyObject *__pyx_args, PyObject *__pyx_kwds) {
+  PyObject *__pyx_v___pyx_type = 0;
+  long __pyx_v___pyx_checksum;
+  PyObject *__pyx_v___pyx_state = 0;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  PyObject *__pyx_r = 0;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__pyx_unpickle_OctreeGPUNNPS (wrapper)", 0);
+  {
+    static PyObject **__pyx_pyargnames[] = {&__pyx_n_s_pyx_type,&__pyx_n_s_pyx_checksum,&__pyx_n_s_pyx_state,0};
+    PyObject* values[3] = {0,0,0};
+    if (unlikely(__pyx_kwds)) {
+      Py_ssize_t kw_args;
+      const Py_ssize_t pos_args = PyTuple_GET_SIZE(__pyx_args);
+      switch (pos_args) {
+        case  3: values[2] = PyTuple_GET_ITEM(__pyx_args, 2);
+        CYTHON_FALLTHROUGH;
+        case  2: values[1] = PyTuple_GET_ITEM(__pyx_args, 1);
+        CYTHON_FALLTHROUGH;
+        case  1: values[0] = PyTuple_GET_ITEM(__pyx_args, 0);
+        CYTHON_FALLTHROUGH;
+        case  0: break;
+        default: goto __pyx_L5_argtuple_error;
+      }
+      kw_args = PyDict_Size(__pyx_kwds);
+      switch (pos_args) {
+        case  0:
+        if (likely((values[0] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_pyx_type)) != 0)) kw_args--;
+        else goto __pyx_L5_argtuple_error;
+        CYTHON_FALLTHROUGH;
+        case  1:
+        if (likely((values[1] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_pyx_checksum)) != 0)) kw_args--;
+        else {
+          __Pyx_RaiseArgtupleInvalid("__pyx_unpickle_OctreeGPUNNPS", 1, 3, 3, 1); __PYX_ERR(2, 1, __pyx_L3_error)
+        }
+        CYTHON_FALLTHROUGH;
+        case  2:
+        if (likely((values[2] = __Pyx_PyDict_GetItemStr(__pyx_kwds, __pyx_n_s_pyx_state)) != 0)) kw_args--;
+        else {
+          __Pyx_RaiseArgtupleInvalid("__pyx_unpickle_OctreeGPUNNPS", 1, 3, 3, 2); __PYX_ERR(2, 1, __pyx_L3_error)
+        }
+      }
+      if (unlikely(kw_args > 0)) {
+        if (unlikely(__Pyx_ParseOptionalKeywords(__pyx_kwds, __pyx_pyargnames, 0, values, pos_args, "__pyx_unpickle_OctreeGPUNNPS") < 0)) __PYX_ERR(2, 1, __pyx_L3_error)
+      }
+    } else if (PyTuple_GET_SIZE(__pyx_args) != 3) {
+      goto __pyx_L5_argtuple_error;
+    } else {
+      values[0] = PyTuple_GET_ITEM(__pyx_args, 0);
+      values[1] = PyTuple_GET_ITEM(__pyx_args, 1);
+      values[2] = PyTuple_GET_ITEM(__pyx_args, 2);
+    }
+    __pyx_v___pyx_type = values[0];
+    __pyx_v___pyx_checksum = __Pyx_PyInt_As_long(values[1]); if (unlikely((__pyx_v___pyx_checksum == (long)-1) && PyErr_Occurred())) __PYX_ERR(2, 1, __pyx_L3_error)
+    __pyx_v___pyx_state = values[2];
+  }
+  goto __pyx_L4_argument_unpacking_done;
+  __pyx_L5_argtuple_error:;
+  __Pyx_RaiseArgtupleInvalid("__pyx_unpickle_OctreeGPUNNPS", 1, 3, 3, PyTuple_GET_SIZE(__pyx_args)); __PYX_ERR(2, 1, __pyx_L3_error)
+  __pyx_L3_error:;
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.__pyx_unpickle_OctreeGPUNNPS", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __Pyx_RefNannyFinishContext();
+  return NULL;
+  __pyx_L4_argument_unpacking_done:;
+  __pyx_r = __pyx_pf_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS(__pyx_self, __pyx_v___pyx_type, __pyx_v___pyx_checksum, __pyx_v___pyx_state);
+
+  /* function exit code */
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+static PyObject *__pyx_pf_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS(CYTHON_UNUSED PyObject *__pyx_self, PyObject *__pyx_v___pyx_type, long __pyx_v___pyx_checksum, PyObject *__pyx_v___pyx_state) {
+  PyObject *__pyx_v___pyx_PickleError = 0;
+  PyObject *__pyx_v___pyx_result = 0;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_t_2;
+  int __pyx_t_3;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__pyx_unpickle_OctreeGPUNNPS", 0);
+
+  /* "(tree fragment)":4
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ *     if __pyx_checksum not in (0x8c26135, 0xd6f865e, 0xdcdb650):             # <<<<<<<<<<<<<<
+ *         from pickle import PickleError as __pyx_PickleError
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ */
+  __pyx_t_1 = __Pyx_PyInt_From_long(__pyx_v___pyx_checksum); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 4, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = (__Pyx_PySequence_ContainsTF(__pyx_t_1, __pyx_tuple__2, Py_NE)); if (unlikely(__pyx_t_2 < 0)) __PYX_ERR(2, 4, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_3 = (__pyx_t_2 != 0);
+  if (__pyx_t_3) {
+
+    /* "(tree fragment)":5
+ *     cdef object __pyx_result
+ *     if __pyx_checksum not in (0x8c26135, 0xd6f865e, 0xdcdb650):
+ *         from pickle import PickleError as __pyx_PickleError             # <<<<<<<<<<<<<<
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ *     __pyx_result = OctreeGPUNNPS.__new__(__pyx_type)
+ */
+    __pyx_t_1 = PyList_New(1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 5, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_INCREF(__pyx_n_s_PickleError);
+    __Pyx_GIVEREF(__pyx_n_s_PickleError);
+    PyList_SET_ITEM(__pyx_t_1, 0, __pyx_n_s_PickleError);
+    __pyx_t_4 = __Pyx_Import(__pyx_n_s_pickle, __pyx_t_1, 0); if (unlikely(!__pyx_t_4)) __PYX_ERR(2, 5, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_4);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __pyx_t_1 = __Pyx_ImportFrom(__pyx_t_4, __pyx_n_s_PickleError); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 5, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_INCREF(__pyx_t_1);
+    __pyx_v___pyx_PickleError = __pyx_t_1;
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+    /* "(tree fragment)":6
+ *     if __pyx_checksum not in (0x8c26135, 0xd6f865e, 0xdcdb650):
+ *         from pickle import PickleError as __pyx_PickleError
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)             # <<<<<<<<<<<<<<
+ *     __pyx_result = OctreeGPUNNPS.__new__(__pyx_type)
+ *     if __pyx_state is not None:
+ */
+    __pyx_t_1 = __Pyx_PyInt_From_long(__pyx_v___pyx_checksum); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 6, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __pyx_t_5 = __Pyx_PyString_Format(__pyx_kp_s_Incompatible_checksums_0x_x_vs_0, __pyx_t_1); if (unlikely(!__pyx_t_5)) __PYX_ERR(2, 6, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_5);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_INCREF(__pyx_v___pyx_PickleError);
+    __pyx_t_1 = __pyx_v___pyx_PickleError; __pyx_t_6 = NULL;
+    if (CYTHON_UNPACK_METHODS && unlikely(PyMethod_Check(__pyx_t_1))) {
+      __pyx_t_6 = PyMethod_GET_SELF(__pyx_t_1);
+      if (likely(__pyx_t_6)) {
+        PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_1);
+        __Pyx_INCREF(__pyx_t_6);
+        __Pyx_INCREF(function);
+        __Pyx_DECREF_SET(__pyx_t_1, function);
+      }
+    }
+    __pyx_t_4 = (__pyx_t_6) ? __Pyx_PyObject_Call2Args(__pyx_t_1, __pyx_t_6, __pyx_t_5) : __Pyx_PyObject_CallOneArg(__pyx_t_1, __pyx_t_5);
+    __Pyx_XDECREF(__pyx_t_6); __pyx_t_6 = 0;
+    __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+    if (unlikely(!__pyx_t_4)) __PYX_ERR(2, 6, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_4);
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_Raise(__pyx_t_4, 0, 0, 0);
+    __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+    __PYX_ERR(2, 6, __pyx_L1_error)
+
+    /* "(tree fragment)":4
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ *     if __pyx_checksum not in (0x8c26135, 0xd6f865e, 0xdcdb650):             # <<<<<<<<<<<<<<
+ *         from pickle import PickleError as __pyx_PickleError
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ */
+  }
+
+  /* "(tree fragment)":7
+ *         from pickle import PickleError as __pyx_PickleError
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ *     __pyx_result = OctreeGPUNNPS.__new__(__pyx_type)             # <<<<<<<<<<<<<<
+ *     if __pyx_state is not None:
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_ptype_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS), __pyx_n_s_new); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 7, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_5 = NULL;
+  if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_1))) {
+    __pyx_t_5 = PyMethod_GET_SELF(__pyx_t_1);
+    if (likely(__pyx_t_5)) {
+      PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_1);
+      __Pyx_INCREF(__pyx_t_5);
+      __Pyx_INCREF(function);
+      __Pyx_DECREF_SET(__pyx_t_1, function);
+    }
+  }
+  __pyx_t_4 = (__pyx_t_5) ? __Pyx_PyObject_Call2Args(__pyx_t_1, __pyx_t_5, __pyx_v___pyx_type) : __Pyx_PyObject_CallOneArg(__pyx_t_1, __pyx_v___pyx_type);
+  __Pyx_XDECREF(__pyx_t_5); __pyx_t_5 = 0;
+  if (unlikely(!__pyx_t_4)) __PYX_ERR(2, 7, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result = __pyx_t_4;
+  __pyx_t_4 = 0;
+
+  /* "(tree fragment)":8
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ *     __pyx_result = OctreeGPUNNPS.__new__(__pyx_type)
+ *     if __pyx_state is not None:             # <<<<<<<<<<<<<<
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)
+ *     return __pyx_result
+ */
+  __pyx_t_3 = (__pyx_v___pyx_state != Py_None);
+  __pyx_t_2 = (__pyx_t_3 != 0);
+  if (__pyx_t_2) {
+
+    /* "(tree fragment)":9
+ *     __pyx_result = OctreeGPUNNPS.__new__(__pyx_type)
+ *     if __pyx_state is not None:
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)             # <<<<<<<<<<<<<<
+ *     return __pyx_result
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):
+ */
+    if (!(likely(PyTuple_CheckExact(__pyx_v___pyx_state))||((__pyx_v___pyx_state) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "tuple", Py_TYPE(__pyx_v___pyx_state)->tp_name), 0))) __PYX_ERR(2, 9, __pyx_L1_error)
+    __pyx_t_4 = __pyx_f_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS__set_state(((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)__pyx_v___pyx_result), ((PyObject*)__pyx_v___pyx_state)); if (unlikely(!__pyx_t_4)) __PYX_ERR(2, 9, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_4);
+    __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+    /* "(tree fragment)":8
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ *     __pyx_result = OctreeGPUNNPS.__new__(__pyx_type)
+ *     if __pyx_state is not None:             # <<<<<<<<<<<<<<
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)
+ *     return __pyx_result
+ */
+  }
+
+  /* "(tree fragment)":10
+ *     if __pyx_state is not None:
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)
+ *     return __pyx_result             # <<<<<<<<<<<<<<
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(__pyx_v___pyx_result);
+  __pyx_r = __pyx_v___pyx_result;
+  goto __pyx_L0;
+
+  /* "(tree fragment)":1
+ * def __pyx_unpickle_OctreeGPUNNPS(__pyx_type, long __pyx_checksum, __pyx_state):             # <<<<<<<<<<<<<<
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.__pyx_unpickle_OctreeGPUNNPS", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = NULL;
+  __pyx_L0:;
+  __Pyx_XDECREF(__pyx_v___pyx_PickleError);
+  __Pyx_XDECREF(__pyx_v___pyx_result);
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "(tree fragment)":11
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)
+ *     return __pyx_result
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):             # <<<<<<<<<<<<<<
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]
+ *     if len(__pyx_state) > 51 and hasattr(__pyx_result, '__dict__'):
+ */
+
+static PyObject *__pyx_f_5pysph_4base_15octree_gpu_nnps___pyx_unpickle_OctreeGPUNNPS__set_state(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *__pyx_v___pyx_result, PyObject *__pyx_v___pyx_state) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  double __pyx_t_2;
+  int __pyx_t_3;
+  int __pyx_t_4;
+  long __pyx_t_5;
+  Py_ssize_t __pyx_t_6;
+  int __pyx_t_7;
+  int __pyx_t_8;
+  PyObject *__pyx_t_9 = NULL;
+  PyObject *__pyx_t_10 = NULL;
+  PyObject *__pyx_t_11 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__pyx_unpickle_OctreeGPUNNPS__set_state", 0);
+
+  /* "(tree fragment)":12
+ *     return __pyx_result
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]             # <<<<<<<<<<<<<<
+ *     if len(__pyx_state) > 51 and hasattr(__pyx_result, '__dict__'):
+ *         __pyx_result.__dict__.update(__pyx_state[51])
+ */
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 0, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base._last_domain_size = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 1, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->allow_sort = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 2, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.backend);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.backend);
+  __pyx_v___pyx_result->__pyx_base.backend = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 3, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.cache);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.cache);
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.cache = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 4, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_7cyarray_6carray_IntArray))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.cell_shifts);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->__pyx_base.__pyx_base.cell_shifts));
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.cell_shifts = ((struct __pyx_obj_7cyarray_6carray_IntArray *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 5, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.cell_size = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 6, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->cid_to_idx);
+  __Pyx_DECREF(__pyx_v___pyx_result->cid_to_idx);
+  __pyx_v___pyx_result->cid_to_idx = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 7, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->cids);
+  __Pyx_DECREF(__pyx_v___pyx_result->cids);
+  __pyx_v___pyx_result->cids = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 8, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->curr_cid);
+  __Pyx_DECREF(__pyx_v___pyx_result->curr_cid);
+  __pyx_v___pyx_result->curr_cid = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 9, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNeighborCache))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.current_cache);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->__pyx_base.current_cache));
+  __pyx_v___pyx_result->__pyx_base.current_cache = ((struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 10, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.dim = __pyx_t_4;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 11, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5pysph_4base_9nnps_base_DomainManager))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.domain);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->__pyx_base.__pyx_base.domain));
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.domain = ((struct __pyx_obj_5pysph_4base_9nnps_base_DomainManager *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 12, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->dst);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->dst));
+  __pyx_v___pyx_result->dst = ((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 13, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.dst_index = __pyx_t_4;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 14, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->dst_src = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 15, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->dst_to_src);
+  __Pyx_DECREF(__pyx_v___pyx_result->dst_to_src);
+  __pyx_v___pyx_result->dst_to_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 16, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.dtype);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.dtype);
+  __pyx_v___pyx_result->__pyx_base.dtype = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 17, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.dtype_max);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.dtype_max);
+  __pyx_v___pyx_result->__pyx_base.dtype_max = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 18, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->helper);
+  __Pyx_DECREF(__pyx_v___pyx_result->helper);
+  __pyx_v___pyx_result->helper = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 19, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.hmin = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 20, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.is_periodic = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 21, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->leaf_size);
+  __Pyx_DECREF(__pyx_v___pyx_result->leaf_size);
+  __pyx_v___pyx_result->leaf_size = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 22, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->make_vec);
+  __Pyx_DECREF(__pyx_v___pyx_result->make_vec);
+  __pyx_v___pyx_result->make_vec = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 23, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->max_cid);
+  __Pyx_DECREF(__pyx_v___pyx_result->max_cid);
+  __pyx_v___pyx_result->max_cid = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 24, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->max_cid_src);
+  __Pyx_DECREF(__pyx_v___pyx_result->max_cid_src);
+  __pyx_v___pyx_result->max_cid_src = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 25, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.n_cells = __pyx_t_4;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 26, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_5 = __Pyx_PyInt_As_long(__pyx_t_1); if (unlikely((__pyx_t_5 == (long)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.n_updates = __pyx_t_5;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 27, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.narrays = __pyx_t_4;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 28, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->neighbor_cid_counts);
+  __Pyx_DECREF(__pyx_v___pyx_result->neighbor_cid_counts);
+  __pyx_v___pyx_result->neighbor_cid_counts = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 29, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->neighbor_cids);
+  __Pyx_DECREF(__pyx_v___pyx_result->neighbor_cids);
+  __pyx_v___pyx_result->neighbor_cids = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 30, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->octrees);
+  __Pyx_DECREF(__pyx_v___pyx_result->octrees);
+  __pyx_v___pyx_result->octrees = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 31, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->overflow_cid_to_idx);
+  __Pyx_DECREF(__pyx_v___pyx_result->overflow_cid_to_idx);
+  __pyx_v___pyx_result->overflow_cid_to_idx = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 32, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.pa_wrappers);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.pa_wrappers);
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.pa_wrappers = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 33, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.particles);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.__pyx_base.particles);
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.particles = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 34, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->pid_keys);
+  __Pyx_DECREF(__pyx_v___pyx_result->pid_keys);
+  __pyx_v___pyx_result->pid_keys = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 35, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(PyList_CheckExact(__pyx_t_1))||((__pyx_t_1) == Py_None)||((void)PyErr_Format(PyExc_TypeError, "Expected %.16s, got %.200s", "list", Py_TYPE(__pyx_t_1)->tp_name), 0))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->pids);
+  __Pyx_DECREF(__pyx_v___pyx_result->pids);
+  __pyx_v___pyx_result->pids = ((PyObject*)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 36, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.queue);
+  __Pyx_DECREF(__pyx_v___pyx_result->__pyx_base.queue);
+  __pyx_v___pyx_result->__pyx_base.queue = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 37, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.radius_scale = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 38, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.radius_scale2 = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 39, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->radix_sort);
+  __Pyx_DECREF(__pyx_v___pyx_result->radix_sort);
+  __pyx_v___pyx_result->radix_sort = __pyx_t_1;
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 40, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.sort_gids = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 41, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->src);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->src));
+  __pyx_v___pyx_result->src = ((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 42, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.src_index = __pyx_t_4;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 43, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.total_update_time = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 44, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_2 == (double)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.update_time = __pyx_t_2;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 45, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.__pyx_base.use_cache = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 46, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->__pyx_base.use_double = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 47, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->use_elementwise = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 48, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_3 = __Pyx_PyObject_IsTrue(__pyx_t_1); if (unlikely((__pyx_t_3 == (int)-1) && PyErr_Occurred())) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_v___pyx_result->use_partitions = __pyx_t_3;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 49, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5numpy_ndarray))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.xmax);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->__pyx_base.xmax));
+  __pyx_v___pyx_result->__pyx_base.xmax = ((PyArrayObject *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+    __PYX_ERR(2, 12, __pyx_L1_error)
+  }
+  __pyx_t_1 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 50, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(((__pyx_t_1) == Py_None) || likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5numpy_ndarray))))) __PYX_ERR(2, 12, __pyx_L1_error)
+  __Pyx_GIVEREF(__pyx_t_1);
+  __Pyx_GOTREF(__pyx_v___pyx_result->__pyx_base.xmin);
+  __Pyx_DECREF(((PyObject *)__pyx_v___pyx_result->__pyx_base.xmin));
+  __pyx_v___pyx_result->__pyx_base.xmin = ((PyArrayObject *)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* "(tree fragment)":13
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]
+ *     if len(__pyx_state) > 51 and hasattr(__pyx_result, '__dict__'):             # <<<<<<<<<<<<<<
+ *         __pyx_result.__dict__.update(__pyx_state[51])
+ */
+  if (unlikely(__pyx_v___pyx_state == Py_None)) {
+    PyErr_SetString(PyExc_TypeError, "object of type 'NoneType' has no len()");
+    __PYX_ERR(2, 13, __pyx_L1_error)
+  }
+  __pyx_t_6 = PyTuple_GET_SIZE(__pyx_v___pyx_state); if (unlikely(__pyx_t_6 == ((Py_ssize_t)-1))) __PYX_ERR(2, 13, __pyx_L1_error)
+  __pyx_t_7 = ((__pyx_t_6 > 51) != 0);
+  if (__pyx_t_7) {
+  } else {
+    __pyx_t_3 = __pyx_t_7;
+    goto __pyx_L4_bool_binop_done;
+  }
+  __pyx_t_7 = __Pyx_HasAttr(((PyObject *)__pyx_v___pyx_result), __pyx_n_s_dict); if (unlikely(__pyx_t_7 == ((int)-1))) __PYX_ERR(2, 13, __pyx_L1_error)
+  __pyx_t_8 = (__pyx_t_7 != 0);
+  __pyx_t_3 = __pyx_t_8;
+  __pyx_L4_bool_binop_done:;
+  if (__pyx_t_3) {
+
+    /* "(tree fragment)":14
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]
+ *     if len(__pyx_state) > 51 and hasattr(__pyx_result, '__dict__'):
+ *         __pyx_result.__dict__.update(__pyx_state[51])             # <<<<<<<<<<<<<<
+ */
+    __pyx_t_9 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v___pyx_result), __pyx_n_s_dict); if (unlikely(!__pyx_t_9)) __PYX_ERR(2, 14, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_9);
+    __pyx_t_10 = __Pyx_PyObject_GetAttrStr(__pyx_t_9, __pyx_n_s_update); if (unlikely(!__pyx_t_10)) __PYX_ERR(2, 14, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_10);
+    __Pyx_DECREF(__pyx_t_9); __pyx_t_9 = 0;
+    if (unlikely(__pyx_v___pyx_state == Py_None)) {
+      PyErr_SetString(PyExc_TypeError, "'NoneType' object is not subscriptable");
+      __PYX_ERR(2, 14, __pyx_L1_error)
+    }
+    __pyx_t_9 = __Pyx_GetItemInt_Tuple(__pyx_v___pyx_state, 51, long, 1, __Pyx_PyInt_From_long, 0, 0, 1); if (unlikely(!__pyx_t_9)) __PYX_ERR(2, 14, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_9);
+    __pyx_t_11 = NULL;
+    if (CYTHON_UNPACK_METHODS && likely(PyMethod_Check(__pyx_t_10))) {
+      __pyx_t_11 = PyMethod_GET_SELF(__pyx_t_10);
+      if (likely(__pyx_t_11)) {
+        PyObject* function = PyMethod_GET_FUNCTION(__pyx_t_10);
+        __Pyx_INCREF(__pyx_t_11);
+        __Pyx_INCREF(function);
+        __Pyx_DECREF_SET(__pyx_t_10, function);
+      }
+    }
+    __pyx_t_1 = (__pyx_t_11) ? __Pyx_PyObject_Call2Args(__pyx_t_10, __pyx_t_11, __pyx_t_9) : __Pyx_PyObject_CallOneArg(__pyx_t_10, __pyx_t_9);
+    __Pyx_XDECREF(__pyx_t_11); __pyx_t_11 = 0;
+    __Pyx_DECREF(__pyx_t_9); __pyx_t_9 = 0;
+    if (unlikely(!__pyx_t_1)) __PYX_ERR(2, 14, __pyx_L1_error)
+    __Pyx_GOTREF(__pyx_t_1);
+    __Pyx_DECREF(__pyx_t_10); __pyx_t_10 = 0;
+    __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+    /* "(tree fragment)":13
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]
+ *     if len(__pyx_state) > 51 and hasattr(__pyx_result, '__dict__'):             # <<<<<<<<<<<<<<
+ *         __pyx_result.__dict__.update(__pyx_state[51])
+ */
+  }
+
+  /* "(tree fragment)":11
+ *         __pyx_unpickle_OctreeGPUNNPS__set_state(<OctreeGPUNNPS> __pyx_result, __pyx_state)
+ *     return __pyx_result
+ * cdef __pyx_unpickle_OctreeGPUNNPS__set_state(OctreeGPUNNPS __pyx_result, tuple __pyx_state):             # <<<<<<<<<<<<<<
+ *     __pyx_result._last_domain_size = __pyx_state[0]; __pyx_result.allow_sort = __pyx_state[1]; __pyx_result.backend = __pyx_state[2]; __pyx_result.cache = __pyx_state[3]; __pyx_result.cell_shifts = __pyx_state[4]; __pyx_result.cell_size = __pyx_state[5]; __pyx_result.cid_to_idx = __pyx_state[6]; __pyx_result.cids = __pyx_state[7]; __pyx_result.curr_cid = __pyx_state[8]; __pyx_result.current_cache = __pyx_state[9]; __pyx_result.dim = __pyx_state[10]; __pyx_result.domain = __pyx_state[11]; __pyx_result.dst = __pyx_state[12]; __pyx_result.dst_index = __pyx_state[13]; __pyx_result.dst_src = __pyx_state[14]; __pyx_result.dst_to_src = __pyx_state[15]; __pyx_result.dtype = __pyx_state[16]; __pyx_result.dtype_max = __pyx_state[17]; __pyx_result.helper = __pyx_state[18]; __pyx_result.hmin = __pyx_state[19]; __pyx_result.is_periodic = __pyx_state[20]; __pyx_result.leaf_size = __pyx_state[21]; __pyx_result.make_vec = __pyx_state[22]; __pyx_result.max_cid = __pyx_state[23]; __pyx_result.max_cid_src = __pyx_state[24]; __pyx_result.n_cells = __pyx_state[25]; __pyx_result.n_updates = __pyx_state[26]; __pyx_result.narrays = __pyx_state[27]; __pyx_result.neighbor_cid_counts = __pyx_state[28]; __pyx_result.neighbor_cids = __pyx_state[29]; __pyx_result.octrees = __pyx_state[30]; __pyx_result.overflow_cid_to_idx = __pyx_state[31]; __pyx_result.pa_wrappers = __pyx_state[32]; __pyx_result.particles = __pyx_state[33]; __pyx_result.pid_keys = __pyx_state[34]; __pyx_result.pids = __pyx_state[35]; __pyx_result.queue = __pyx_state[36]; __pyx_result.radius_scale = __pyx_state[37]; __pyx_result.radius_scale2 = __pyx_state[38]; __pyx_result.radix_sort = __pyx_state[39]; __pyx_result.sort_gids = __pyx_state[40]; __pyx_result.src = __pyx_state[41]; __pyx_result.src_index = __pyx_state[42]; __pyx_result.total_update_time = __pyx_state[43]; __pyx_result.update_time = __pyx_state[44]; __pyx_result.use_cache = __pyx_state[45]; __pyx_result.use_double = __pyx_state[46]; __pyx_result.use_elementwise = __pyx_state[47]; __pyx_result.use_partitions = __pyx_state[48]; __pyx_result.xmax = __pyx_state[49]; __pyx_result.xmin = __pyx_state[50]
+ *     if len(__pyx_state) > 51 and hasattr(__pyx_result, '__dict__'):
+ */
+
+  /* function exit code */
+  __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_9);
+  __Pyx_XDECREF(__pyx_t_10);
+  __Pyx_XDECREF(__pyx_t_11);
+  __Pyx_AddTraceback("pysph.base.octree_gpu_nnps.__pyx_unpickle_OctreeGPUNNPS__set_state", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":731
+ * ctypedef npy_cdouble     complex_t
+ * 
+ * cdef inline object PyArray_MultiIterNew1(a):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(1, <void*>a)
+ * 
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_PyArray_MultiIterNew1(PyObject *__pyx_v_a) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("PyArray_MultiIterNew1", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":732
+ * 
+ * cdef inline object PyArray_MultiIterNew1(a):
+ *     return PyArray_MultiIterNew(1, <void*>a)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline object PyArray_MultiIterNew2(a, b):
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = PyArray_MultiIterNew(1, ((void *)__pyx_v_a)); if (unlikely(!__pyx_t_1)) __PYX_ERR(3, 732, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":731
+ * ctypedef npy_cdouble     complex_t
+ * 
+ * cdef inline object PyArray_MultiIterNew1(a):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(1, <void*>a)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("numpy.PyArray_MultiIterNew1", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":734
+ *     return PyArray_MultiIterNew(1, <void*>a)
+ * 
+ * cdef inline object PyArray_MultiIterNew2(a, b):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(2, <void*>a, <void*>b)
+ * 
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_PyArray_MultiIterNew2(PyObject *__pyx_v_a, PyObject *__pyx_v_b) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("PyArray_MultiIterNew2", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":735
+ * 
+ * cdef inline object PyArray_MultiIterNew2(a, b):
+ *     return PyArray_MultiIterNew(2, <void*>a, <void*>b)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline object PyArray_MultiIterNew3(a, b, c):
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = PyArray_MultiIterNew(2, ((void *)__pyx_v_a), ((void *)__pyx_v_b)); if (unlikely(!__pyx_t_1)) __PYX_ERR(3, 735, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":734
+ *     return PyArray_MultiIterNew(1, <void*>a)
+ * 
+ * cdef inline object PyArray_MultiIterNew2(a, b):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(2, <void*>a, <void*>b)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("numpy.PyArray_MultiIterNew2", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":737
+ *     return PyArray_MultiIterNew(2, <void*>a, <void*>b)
+ * 
+ * cdef inline object PyArray_MultiIterNew3(a, b, c):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(3, <void*>a, <void*>b, <void*> c)
+ * 
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_PyArray_MultiIterNew3(PyObject *__pyx_v_a, PyObject *__pyx_v_b, PyObject *__pyx_v_c) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("PyArray_MultiIterNew3", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":738
+ * 
+ * cdef inline object PyArray_MultiIterNew3(a, b, c):
+ *     return PyArray_MultiIterNew(3, <void*>a, <void*>b, <void*> c)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline object PyArray_MultiIterNew4(a, b, c, d):
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = PyArray_MultiIterNew(3, ((void *)__pyx_v_a), ((void *)__pyx_v_b), ((void *)__pyx_v_c)); if (unlikely(!__pyx_t_1)) __PYX_ERR(3, 738, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":737
+ *     return PyArray_MultiIterNew(2, <void*>a, <void*>b)
+ * 
+ * cdef inline object PyArray_MultiIterNew3(a, b, c):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(3, <void*>a, <void*>b, <void*> c)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("numpy.PyArray_MultiIterNew3", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":740
+ *     return PyArray_MultiIterNew(3, <void*>a, <void*>b, <void*> c)
+ * 
+ * cdef inline object PyArray_MultiIterNew4(a, b, c, d):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(4, <void*>a, <void*>b, <void*>c, <void*> d)
+ * 
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_PyArray_MultiIterNew4(PyObject *__pyx_v_a, PyObject *__pyx_v_b, PyObject *__pyx_v_c, PyObject *__pyx_v_d) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("PyArray_MultiIterNew4", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":741
+ * 
+ * cdef inline object PyArray_MultiIterNew4(a, b, c, d):
+ *     return PyArray_MultiIterNew(4, <void*>a, <void*>b, <void*>c, <void*> d)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline object PyArray_MultiIterNew5(a, b, c, d, e):
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = PyArray_MultiIterNew(4, ((void *)__pyx_v_a), ((void *)__pyx_v_b), ((void *)__pyx_v_c), ((void *)__pyx_v_d)); if (unlikely(!__pyx_t_1)) __PYX_ERR(3, 741, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":740
+ *     return PyArray_MultiIterNew(3, <void*>a, <void*>b, <void*> c)
+ * 
+ * cdef inline object PyArray_MultiIterNew4(a, b, c, d):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(4, <void*>a, <void*>b, <void*>c, <void*> d)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("numpy.PyArray_MultiIterNew4", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":743
+ *     return PyArray_MultiIterNew(4, <void*>a, <void*>b, <void*>c, <void*> d)
+ * 
+ * cdef inline object PyArray_MultiIterNew5(a, b, c, d, e):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(5, <void*>a, <void*>b, <void*>c, <void*> d, <void*> e)
+ * 
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_PyArray_MultiIterNew5(PyObject *__pyx_v_a, PyObject *__pyx_v_b, PyObject *__pyx_v_c, PyObject *__pyx_v_d, PyObject *__pyx_v_e) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("PyArray_MultiIterNew5", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":744
+ * 
+ * cdef inline object PyArray_MultiIterNew5(a, b, c, d, e):
+ *     return PyArray_MultiIterNew(5, <void*>a, <void*>b, <void*>c, <void*> d, <void*> e)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline tuple PyDataType_SHAPE(dtype d):
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __pyx_t_1 = PyArray_MultiIterNew(5, ((void *)__pyx_v_a), ((void *)__pyx_v_b), ((void *)__pyx_v_c), ((void *)__pyx_v_d), ((void *)__pyx_v_e)); if (unlikely(!__pyx_t_1)) __PYX_ERR(3, 744, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = __pyx_t_1;
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":743
+ *     return PyArray_MultiIterNew(4, <void*>a, <void*>b, <void*>c, <void*> d)
+ * 
+ * cdef inline object PyArray_MultiIterNew5(a, b, c, d, e):             # <<<<<<<<<<<<<<
+ *     return PyArray_MultiIterNew(5, <void*>a, <void*>b, <void*>c, <void*> d, <void*> e)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("numpy.PyArray_MultiIterNew5", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":746
+ *     return PyArray_MultiIterNew(5, <void*>a, <void*>b, <void*>c, <void*> d, <void*> e)
+ * 
+ * cdef inline tuple PyDataType_SHAPE(dtype d):             # <<<<<<<<<<<<<<
+ *     if PyDataType_HASSUBARRAY(d):
+ *         return <tuple>d.subarray.shape
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_PyDataType_SHAPE(PyArray_Descr *__pyx_v_d) {
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  __Pyx_RefNannySetupContext("PyDataType_SHAPE", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":747
+ * 
+ * cdef inline tuple PyDataType_SHAPE(dtype d):
+ *     if PyDataType_HASSUBARRAY(d):             # <<<<<<<<<<<<<<
+ *         return <tuple>d.subarray.shape
+ *     else:
+ */
+  __pyx_t_1 = (PyDataType_HASSUBARRAY(__pyx_v_d) != 0);
+  if (__pyx_t_1) {
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":748
+ * cdef inline tuple PyDataType_SHAPE(dtype d):
+ *     if PyDataType_HASSUBARRAY(d):
+ *         return <tuple>d.subarray.shape             # <<<<<<<<<<<<<<
+ *     else:
+ *         return ()
+ */
+    __Pyx_XDECREF(__pyx_r);
+    __Pyx_INCREF(((PyObject*)__pyx_v_d->subarray->shape));
+    __pyx_r = ((PyObject*)__pyx_v_d->subarray->shape);
+    goto __pyx_L0;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":747
+ * 
+ * cdef inline tuple PyDataType_SHAPE(dtype d):
+ *     if PyDataType_HASSUBARRAY(d):             # <<<<<<<<<<<<<<
+ *         return <tuple>d.subarray.shape
+ *     else:
+ */
+  }
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":750
+ *         return <tuple>d.subarray.shape
+ *     else:
+ *         return ()             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  /*else*/ {
+    __Pyx_XDECREF(__pyx_r);
+    __Pyx_INCREF(__pyx_empty_tuple);
+    __pyx_r = __pyx_empty_tuple;
+    goto __pyx_L0;
+  }
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":746
+ *     return PyArray_MultiIterNew(5, <void*>a, <void*>b, <void*>c, <void*> d, <void*> e)
+ * 
+ * cdef inline tuple PyDataType_SHAPE(dtype d):             # <<<<<<<<<<<<<<
+ *     if PyDataType_HASSUBARRAY(d):
+ *         return <tuple>d.subarray.shape
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":926
+ *     int _import_umath() except -1
+ * 
+ * cdef inline void set_array_base(ndarray arr, object base):             # <<<<<<<<<<<<<<
+ *     Py_INCREF(base) # important to do this before stealing the reference below!
+ *     PyArray_SetBaseObject(arr, base)
+ */
+
+static CYTHON_INLINE void __pyx_f_5numpy_set_array_base(PyArrayObject *__pyx_v_arr, PyObject *__pyx_v_base) {
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("set_array_base", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":927
+ * 
+ * cdef inline void set_array_base(ndarray arr, object base):
+ *     Py_INCREF(base) # important to do this before stealing the reference below!             # <<<<<<<<<<<<<<
+ *     PyArray_SetBaseObject(arr, base)
+ * 
+ */
+  Py_INCREF(__pyx_v_base);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":928
+ * cdef inline void set_array_base(ndarray arr, object base):
+ *     Py_INCREF(base) # important to do this before stealing the reference below!
+ *     PyArray_SetBaseObject(arr, base)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline object get_array_base(ndarray arr):
+ */
+  __pyx_t_1 = PyArray_SetBaseObject(__pyx_v_arr, __pyx_v_base); if (unlikely(__pyx_t_1 == ((int)-1))) __PYX_ERR(3, 928, __pyx_L1_error)
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":926
+ *     int _import_umath() except -1
+ * 
+ * cdef inline void set_array_base(ndarray arr, object base):             # <<<<<<<<<<<<<<
+ *     Py_INCREF(base) # important to do this before stealing the reference below!
+ *     PyArray_SetBaseObject(arr, base)
+ */
+
+  /* function exit code */
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_WriteUnraisable("numpy.set_array_base", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":930
+ *     PyArray_SetBaseObject(arr, base)
+ * 
+ * cdef inline object get_array_base(ndarray arr):             # <<<<<<<<<<<<<<
+ *     base = PyArray_BASE(arr)
+ *     if base is NULL:
+ */
+
+static CYTHON_INLINE PyObject *__pyx_f_5numpy_get_array_base(PyArrayObject *__pyx_v_arr) {
+  PyObject *__pyx_v_base;
+  PyObject *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  __Pyx_RefNannySetupContext("get_array_base", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":931
+ * 
+ * cdef inline object get_array_base(ndarray arr):
+ *     base = PyArray_BASE(arr)             # <<<<<<<<<<<<<<
+ *     if base is NULL:
+ *         return None
+ */
+  __pyx_v_base = PyArray_BASE(__pyx_v_arr);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":932
+ * cdef inline object get_array_base(ndarray arr):
+ *     base = PyArray_BASE(arr)
+ *     if base is NULL:             # <<<<<<<<<<<<<<
+ *         return None
+ *     return <object>base
+ */
+  __pyx_t_1 = ((__pyx_v_base == NULL) != 0);
+  if (__pyx_t_1) {
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":933
+ *     base = PyArray_BASE(arr)
+ *     if base is NULL:
+ *         return None             # <<<<<<<<<<<<<<
+ *     return <object>base
+ * 
+ */
+    __Pyx_XDECREF(__pyx_r);
+    __pyx_r = Py_None; __Pyx_INCREF(Py_None);
+    goto __pyx_L0;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":932
+ * cdef inline object get_array_base(ndarray arr):
+ *     base = PyArray_BASE(arr)
+ *     if base is NULL:             # <<<<<<<<<<<<<<
+ *         return None
+ *     return <object>base
+ */
+  }
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":934
+ *     if base is NULL:
+ *         return None
+ *     return <object>base             # <<<<<<<<<<<<<<
+ * 
+ * # Versions of the import_* functions which are more suitable for
+ */
+  __Pyx_XDECREF(__pyx_r);
+  __Pyx_INCREF(((PyObject *)__pyx_v_base));
+  __pyx_r = ((PyObject *)__pyx_v_base);
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":930
+ *     PyArray_SetBaseObject(arr, base)
+ * 
+ * cdef inline object get_array_base(ndarray arr):             # <<<<<<<<<<<<<<
+ *     base = PyArray_BASE(arr)
+ *     if base is NULL:
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_XGIVEREF(__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":938
+ * # Versions of the import_* functions which are more suitable for
+ * # Cython code.
+ * cdef inline int import_array() except -1:             # <<<<<<<<<<<<<<
+ *     try:
+ *         __pyx_import_array()
+ */
+
+static CYTHON_INLINE int __pyx_f_5numpy_import_array(void) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  int __pyx_t_4;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  PyObject *__pyx_t_7 = NULL;
+  PyObject *__pyx_t_8 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("import_array", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":939
+ * # Cython code.
+ * cdef inline int import_array() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         __pyx_import_array()
+ *     except Exception:
+ */
+  {
+    __Pyx_PyThreadState_declare
+    __Pyx_PyThreadState_assign
+    __Pyx_ExceptionSave(&__pyx_t_1, &__pyx_t_2, &__pyx_t_3);
+    __Pyx_XGOTREF(__pyx_t_1);
+    __Pyx_XGOTREF(__pyx_t_2);
+    __Pyx_XGOTREF(__pyx_t_3);
+    /*try:*/ {
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":940
+ * cdef inline int import_array() except -1:
+ *     try:
+ *         __pyx_import_array()             # <<<<<<<<<<<<<<
+ *     except Exception:
+ *         raise ImportError("numpy.core.multiarray failed to import")
+ */
+      __pyx_t_4 = _import_array(); if (unlikely(__pyx_t_4 == ((int)-1))) __PYX_ERR(3, 940, __pyx_L3_error)
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":939
+ * # Cython code.
+ * cdef inline int import_array() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         __pyx_import_array()
+ *     except Exception:
+ */
+    }
+    __Pyx_XDECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_XDECREF(__pyx_t_2); __pyx_t_2 = 0;
+    __Pyx_XDECREF(__pyx_t_3); __pyx_t_3 = 0;
+    goto __pyx_L8_try_end;
+    __pyx_L3_error:;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":941
+ *     try:
+ *         __pyx_import_array()
+ *     except Exception:             # <<<<<<<<<<<<<<
+ *         raise ImportError("numpy.core.multiarray failed to import")
+ * 
+ */
+    __pyx_t_4 = __Pyx_PyErr_ExceptionMatches(((PyObject *)(&((PyTypeObject*)PyExc_Exception)[0])));
+    if (__pyx_t_4) {
+      __Pyx_AddTraceback("numpy.import_array", __pyx_clineno, __pyx_lineno, __pyx_filename);
+      if (__Pyx_GetException(&__pyx_t_5, &__pyx_t_6, &__pyx_t_7) < 0) __PYX_ERR(3, 941, __pyx_L5_except_error)
+      __Pyx_GOTREF(__pyx_t_5);
+      __Pyx_GOTREF(__pyx_t_6);
+      __Pyx_GOTREF(__pyx_t_7);
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":942
+ *         __pyx_import_array()
+ *     except Exception:
+ *         raise ImportError("numpy.core.multiarray failed to import")             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline int import_umath() except -1:
+ */
+      __pyx_t_8 = __Pyx_PyObject_Call(__pyx_builtin_ImportError, __pyx_tuple__3, NULL); if (unlikely(!__pyx_t_8)) __PYX_ERR(3, 942, __pyx_L5_except_error)
+      __Pyx_GOTREF(__pyx_t_8);
+      __Pyx_Raise(__pyx_t_8, 0, 0, 0);
+      __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+      __PYX_ERR(3, 942, __pyx_L5_except_error)
+    }
+    goto __pyx_L5_except_error;
+    __pyx_L5_except_error:;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":939
+ * # Cython code.
+ * cdef inline int import_array() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         __pyx_import_array()
+ *     except Exception:
+ */
+    __Pyx_XGIVEREF(__pyx_t_1);
+    __Pyx_XGIVEREF(__pyx_t_2);
+    __Pyx_XGIVEREF(__pyx_t_3);
+    __Pyx_ExceptionReset(__pyx_t_1, __pyx_t_2, __pyx_t_3);
+    goto __pyx_L1_error;
+    __pyx_L8_try_end:;
+  }
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":938
+ * # Versions of the import_* functions which are more suitable for
+ * # Cython code.
+ * cdef inline int import_array() except -1:             # <<<<<<<<<<<<<<
+ *     try:
+ *         __pyx_import_array()
+ */
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_7);
+  __Pyx_XDECREF(__pyx_t_8);
+  __Pyx_AddTraceback("numpy.import_array", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":944
+ *         raise ImportError("numpy.core.multiarray failed to import")
+ * 
+ * cdef inline int import_umath() except -1:             # <<<<<<<<<<<<<<
+ *     try:
+ *         _import_umath()
+ */
+
+static CYTHON_INLINE int __pyx_f_5numpy_import_umath(void) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  int __pyx_t_4;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  PyObject *__pyx_t_7 = NULL;
+  PyObject *__pyx_t_8 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("import_umath", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":945
+ * 
+ * cdef inline int import_umath() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         _import_umath()
+ *     except Exception:
+ */
+  {
+    __Pyx_PyThreadState_declare
+    __Pyx_PyThreadState_assign
+    __Pyx_ExceptionSave(&__pyx_t_1, &__pyx_t_2, &__pyx_t_3);
+    __Pyx_XGOTREF(__pyx_t_1);
+    __Pyx_XGOTREF(__pyx_t_2);
+    __Pyx_XGOTREF(__pyx_t_3);
+    /*try:*/ {
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":946
+ * cdef inline int import_umath() except -1:
+ *     try:
+ *         _import_umath()             # <<<<<<<<<<<<<<
+ *     except Exception:
+ *         raise ImportError("numpy.core.umath failed to import")
+ */
+      __pyx_t_4 = _import_umath(); if (unlikely(__pyx_t_4 == ((int)-1))) __PYX_ERR(3, 946, __pyx_L3_error)
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":945
+ * 
+ * cdef inline int import_umath() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         _import_umath()
+ *     except Exception:
+ */
+    }
+    __Pyx_XDECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_XDECREF(__pyx_t_2); __pyx_t_2 = 0;
+    __Pyx_XDECREF(__pyx_t_3); __pyx_t_3 = 0;
+    goto __pyx_L8_try_end;
+    __pyx_L3_error:;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":947
+ *     try:
+ *         _import_umath()
+ *     except Exception:             # <<<<<<<<<<<<<<
+ *         raise ImportError("numpy.core.umath failed to import")
+ * 
+ */
+    __pyx_t_4 = __Pyx_PyErr_ExceptionMatches(((PyObject *)(&((PyTypeObject*)PyExc_Exception)[0])));
+    if (__pyx_t_4) {
+      __Pyx_AddTraceback("numpy.import_umath", __pyx_clineno, __pyx_lineno, __pyx_filename);
+      if (__Pyx_GetException(&__pyx_t_5, &__pyx_t_6, &__pyx_t_7) < 0) __PYX_ERR(3, 947, __pyx_L5_except_error)
+      __Pyx_GOTREF(__pyx_t_5);
+      __Pyx_GOTREF(__pyx_t_6);
+      __Pyx_GOTREF(__pyx_t_7);
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":948
+ *         _import_umath()
+ *     except Exception:
+ *         raise ImportError("numpy.core.umath failed to import")             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline int import_ufunc() except -1:
+ */
+      __pyx_t_8 = __Pyx_PyObject_Call(__pyx_builtin_ImportError, __pyx_tuple__4, NULL); if (unlikely(!__pyx_t_8)) __PYX_ERR(3, 948, __pyx_L5_except_error)
+      __Pyx_GOTREF(__pyx_t_8);
+      __Pyx_Raise(__pyx_t_8, 0, 0, 0);
+      __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+      __PYX_ERR(3, 948, __pyx_L5_except_error)
+    }
+    goto __pyx_L5_except_error;
+    __pyx_L5_except_error:;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":945
+ * 
+ * cdef inline int import_umath() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         _import_umath()
+ *     except Exception:
+ */
+    __Pyx_XGIVEREF(__pyx_t_1);
+    __Pyx_XGIVEREF(__pyx_t_2);
+    __Pyx_XGIVEREF(__pyx_t_3);
+    __Pyx_ExceptionReset(__pyx_t_1, __pyx_t_2, __pyx_t_3);
+    goto __pyx_L1_error;
+    __pyx_L8_try_end:;
+  }
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":944
+ *         raise ImportError("numpy.core.multiarray failed to import")
+ * 
+ * cdef inline int import_umath() except -1:             # <<<<<<<<<<<<<<
+ *     try:
+ *         _import_umath()
+ */
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_7);
+  __Pyx_XDECREF(__pyx_t_8);
+  __Pyx_AddTraceback("numpy.import_umath", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":950
+ *         raise ImportError("numpy.core.umath failed to import")
+ * 
+ * cdef inline int import_ufunc() except -1:             # <<<<<<<<<<<<<<
+ *     try:
+ *         _import_umath()
+ */
+
+static CYTHON_INLINE int __pyx_f_5numpy_import_ufunc(void) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  int __pyx_t_4;
+  PyObject *__pyx_t_5 = NULL;
+  PyObject *__pyx_t_6 = NULL;
+  PyObject *__pyx_t_7 = NULL;
+  PyObject *__pyx_t_8 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("import_ufunc", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":951
+ * 
+ * cdef inline int import_ufunc() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         _import_umath()
+ *     except Exception:
+ */
+  {
+    __Pyx_PyThreadState_declare
+    __Pyx_PyThreadState_assign
+    __Pyx_ExceptionSave(&__pyx_t_1, &__pyx_t_2, &__pyx_t_3);
+    __Pyx_XGOTREF(__pyx_t_1);
+    __Pyx_XGOTREF(__pyx_t_2);
+    __Pyx_XGOTREF(__pyx_t_3);
+    /*try:*/ {
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":952
+ * cdef inline int import_ufunc() except -1:
+ *     try:
+ *         _import_umath()             # <<<<<<<<<<<<<<
+ *     except Exception:
+ *         raise ImportError("numpy.core.umath failed to import")
+ */
+      __pyx_t_4 = _import_umath(); if (unlikely(__pyx_t_4 == ((int)-1))) __PYX_ERR(3, 952, __pyx_L3_error)
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":951
+ * 
+ * cdef inline int import_ufunc() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         _import_umath()
+ *     except Exception:
+ */
+    }
+    __Pyx_XDECREF(__pyx_t_1); __pyx_t_1 = 0;
+    __Pyx_XDECREF(__pyx_t_2); __pyx_t_2 = 0;
+    __Pyx_XDECREF(__pyx_t_3); __pyx_t_3 = 0;
+    goto __pyx_L8_try_end;
+    __pyx_L3_error:;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":953
+ *     try:
+ *         _import_umath()
+ *     except Exception:             # <<<<<<<<<<<<<<
+ *         raise ImportError("numpy.core.umath failed to import")
+ * 
+ */
+    __pyx_t_4 = __Pyx_PyErr_ExceptionMatches(((PyObject *)(&((PyTypeObject*)PyExc_Exception)[0])));
+    if (__pyx_t_4) {
+      __Pyx_AddTraceback("numpy.import_ufunc", __pyx_clineno, __pyx_lineno, __pyx_filename);
+      if (__Pyx_GetException(&__pyx_t_5, &__pyx_t_6, &__pyx_t_7) < 0) __PYX_ERR(3, 953, __pyx_L5_except_error)
+      __Pyx_GOTREF(__pyx_t_5);
+      __Pyx_GOTREF(__pyx_t_6);
+      __Pyx_GOTREF(__pyx_t_7);
+
+      /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":954
+ *         _import_umath()
+ *     except Exception:
+ *         raise ImportError("numpy.core.umath failed to import")             # <<<<<<<<<<<<<<
+ * 
+ * cdef extern from *:
+ */
+      __pyx_t_8 = __Pyx_PyObject_Call(__pyx_builtin_ImportError, __pyx_tuple__4, NULL); if (unlikely(!__pyx_t_8)) __PYX_ERR(3, 954, __pyx_L5_except_error)
+      __Pyx_GOTREF(__pyx_t_8);
+      __Pyx_Raise(__pyx_t_8, 0, 0, 0);
+      __Pyx_DECREF(__pyx_t_8); __pyx_t_8 = 0;
+      __PYX_ERR(3, 954, __pyx_L5_except_error)
+    }
+    goto __pyx_L5_except_error;
+    __pyx_L5_except_error:;
+
+    /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":951
+ * 
+ * cdef inline int import_ufunc() except -1:
+ *     try:             # <<<<<<<<<<<<<<
+ *         _import_umath()
+ *     except Exception:
+ */
+    __Pyx_XGIVEREF(__pyx_t_1);
+    __Pyx_XGIVEREF(__pyx_t_2);
+    __Pyx_XGIVEREF(__pyx_t_3);
+    __Pyx_ExceptionReset(__pyx_t_1, __pyx_t_2, __pyx_t_3);
+    goto __pyx_L1_error;
+    __pyx_L8_try_end:;
+  }
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":950
+ *         raise ImportError("numpy.core.umath failed to import")
+ * 
+ * cdef inline int import_ufunc() except -1:             # <<<<<<<<<<<<<<
+ *     try:
+ *         _import_umath()
+ */
+
+  /* function exit code */
+  __pyx_r = 0;
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_XDECREF(__pyx_t_6);
+  __Pyx_XDECREF(__pyx_t_7);
+  __Pyx_XDECREF(__pyx_t_8);
+  __Pyx_AddTraceback("numpy.import_ufunc", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = -1;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":964
+ * 
+ * 
+ * cdef inline bint is_timedelta64_object(object obj):             # <<<<<<<<<<<<<<
+ *     """
+ *     Cython equivalent of `isinstance(obj, np.timedelta64)`
+ */
+
+static CYTHON_INLINE int __pyx_f_5numpy_is_timedelta64_object(PyObject *__pyx_v_obj) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("is_timedelta64_object", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":976
+ *     bool
+ *     """
+ *     return PyObject_TypeCheck(obj, &PyTimedeltaArrType_Type)             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  __pyx_r = PyObject_TypeCheck(__pyx_v_obj, (&PyTimedeltaArrType_Type));
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":964
+ * 
+ * 
+ * cdef inline bint is_timedelta64_object(object obj):             # <<<<<<<<<<<<<<
+ *     """
+ *     Cython equivalent of `isinstance(obj, np.timedelta64)`
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":979
+ * 
+ * 
+ * cdef inline bint is_datetime64_object(object obj):             # <<<<<<<<<<<<<<
+ *     """
+ *     Cython equivalent of `isinstance(obj, np.datetime64)`
+ */
+
+static CYTHON_INLINE int __pyx_f_5numpy_is_datetime64_object(PyObject *__pyx_v_obj) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("is_datetime64_object", 0);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":991
+ *     bool
+ *     """
+ *     return PyObject_TypeCheck(obj, &PyDatetimeArrType_Type)             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  __pyx_r = PyObject_TypeCheck(__pyx_v_obj, (&PyDatetimeArrType_Type));
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":979
+ * 
+ * 
+ * cdef inline bint is_datetime64_object(object obj):             # <<<<<<<<<<<<<<
+ *     """
+ *     Cython equivalent of `isinstance(obj, np.datetime64)`
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":994
+ * 
+ * 
+ * cdef inline npy_datetime get_datetime64_value(object obj) nogil:             # <<<<<<<<<<<<<<
+ *     """
+ *     returns the int64 value underlying scalar numpy datetime64 object
+ */
+
+static CYTHON_INLINE npy_datetime __pyx_f_5numpy_get_datetime64_value(PyObject *__pyx_v_obj) {
+  npy_datetime __pyx_r;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1001
+ *     also needed.  That can be found using `get_datetime64_unit`.
+ *     """
+ *     return (<PyDatetimeScalarObject*>obj).obval             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  __pyx_r = ((PyDatetimeScalarObject *)__pyx_v_obj)->obval;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":994
+ * 
+ * 
+ * cdef inline npy_datetime get_datetime64_value(object obj) nogil:             # <<<<<<<<<<<<<<
+ *     """
+ *     returns the int64 value underlying scalar numpy datetime64 object
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1004
+ * 
+ * 
+ * cdef inline npy_timedelta get_timedelta64_value(object obj) nogil:             # <<<<<<<<<<<<<<
+ *     """
+ *     returns the int64 value underlying scalar numpy timedelta64 object
+ */
+
+static CYTHON_INLINE npy_timedelta __pyx_f_5numpy_get_timedelta64_value(PyObject *__pyx_v_obj) {
+  npy_timedelta __pyx_r;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1008
+ *     returns the int64 value underlying scalar numpy timedelta64 object
+ *     """
+ *     return (<PyTimedeltaScalarObject*>obj).obval             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  __pyx_r = ((PyTimedeltaScalarObject *)__pyx_v_obj)->obval;
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1004
+ * 
+ * 
+ * cdef inline npy_timedelta get_timedelta64_value(object obj) nogil:             # <<<<<<<<<<<<<<
+ *     """
+ *     returns the int64 value underlying scalar numpy timedelta64 object
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1011
+ * 
+ * 
+ * cdef inline NPY_DATETIMEUNIT get_datetime64_unit(object obj) nogil:             # <<<<<<<<<<<<<<
+ *     """
+ *     returns the unit part of the dtype for a numpy datetime64 object.
+ */
+
+static CYTHON_INLINE NPY_DATETIMEUNIT __pyx_f_5numpy_get_datetime64_unit(PyObject *__pyx_v_obj) {
+  NPY_DATETIMEUNIT __pyx_r;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1015
+ *     returns the unit part of the dtype for a numpy datetime64 object.
+ *     """
+ *     return <NPY_DATETIMEUNIT>(<PyDatetimeScalarObject*>obj).obmeta.base             # <<<<<<<<<<<<<<
+ */
+  __pyx_r = ((NPY_DATETIMEUNIT)((PyDatetimeScalarObject *)__pyx_v_obj)->obmeta.base);
+  goto __pyx_L0;
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":1011
+ * 
+ * 
+ * cdef inline NPY_DATETIMEUNIT get_datetime64_unit(object obj) nogil:             # <<<<<<<<<<<<<<
+ *     """
+ *     returns the unit part of the dtype for a numpy datetime64 object.
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "point.pxd":15
+ *     double x, y, z
+ * 
+ * cdef inline cPoint cPoint_new(double x, double y, double z):             # <<<<<<<<<<<<<<
+ *     cdef cPoint p = cPoint(x,y,z)
+ *     return p
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cPoint __pyx_f_5pysph_4base_5point_cPoint_new(double __pyx_v_x, double __pyx_v_y, double __pyx_v_z) {
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_p;
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_t_1;
+  __Pyx_RefNannySetupContext("cPoint_new", 0);
+
+  /* "point.pxd":16
+ * 
+ * cdef inline cPoint cPoint_new(double x, double y, double z):
+ *     cdef cPoint p = cPoint(x,y,z)             # <<<<<<<<<<<<<<
+ *     return p
+ * 
+ */
+  __pyx_t_1.x = __pyx_v_x;
+  __pyx_t_1.y = __pyx_v_y;
+  __pyx_t_1.z = __pyx_v_z;
+  __pyx_v_p = __pyx_t_1;
+
+  /* "point.pxd":17
+ * cdef inline cPoint cPoint_new(double x, double y, double z):
+ *     cdef cPoint p = cPoint(x,y,z)
+ *     return p             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cPoint cPoint_sub(cPoint pa, cPoint pb):
+ */
+  __pyx_r = __pyx_v_p;
+  goto __pyx_L0;
+
+  /* "point.pxd":15
+ *     double x, y, z
+ * 
+ * cdef inline cPoint cPoint_new(double x, double y, double z):             # <<<<<<<<<<<<<<
+ *     cdef cPoint p = cPoint(x,y,z)
+ *     return p
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":19
+ *     return p
+ * 
+ * cdef inline cPoint cPoint_sub(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return cPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cPoint __pyx_f_5pysph_4base_5point_cPoint_sub(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pb) {
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_sub", 0);
+
+  /* "point.pxd":20
+ * 
+ * cdef inline cPoint cPoint_sub(cPoint pa, cPoint pb):
+ *     return cPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cPoint cPoint_add(cPoint pa, cPoint pb):
+ */
+  __pyx_r = __pyx_f_5pysph_4base_5point_cPoint_new((__pyx_v_pa.x - __pyx_v_pb.x), (__pyx_v_pa.y - __pyx_v_pb.y), (__pyx_v_pa.z - __pyx_v_pb.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":19
+ *     return p
+ * 
+ * cdef inline cPoint cPoint_sub(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return cPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":22
+ *     return cPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline cPoint cPoint_add(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return cPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cPoint __pyx_f_5pysph_4base_5point_cPoint_add(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pb) {
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_add", 0);
+
+  /* "point.pxd":23
+ * 
+ * cdef inline cPoint cPoint_add(cPoint pa, cPoint pb):
+ *     return cPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double cPoint_dot(cPoint pa, cPoint pb):
+ */
+  __pyx_r = __pyx_f_5pysph_4base_5point_cPoint_new((__pyx_v_pa.x + __pyx_v_pb.x), (__pyx_v_pa.y + __pyx_v_pb.y), (__pyx_v_pa.z + __pyx_v_pb.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":22
+ *     return cPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline cPoint cPoint_add(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return cPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":25
+ *     return cPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline double cPoint_dot(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_dot(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pb) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_dot", 0);
+
+  /* "point.pxd":26
+ * 
+ * cdef inline double cPoint_dot(cPoint pa, cPoint pb):
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double cPoint_norm(cPoint p):
+ */
+  __pyx_r = (((__pyx_v_pa.x * __pyx_v_pb.x) + (__pyx_v_pa.y * __pyx_v_pb.y)) + (__pyx_v_pa.z * __pyx_v_pb.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":25
+ *     return cPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline double cPoint_dot(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":28
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ * cdef inline double cPoint_norm(cPoint p):             # <<<<<<<<<<<<<<
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_norm(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_p) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_norm", 0);
+
+  /* "point.pxd":29
+ * 
+ * cdef inline double cPoint_norm(cPoint p):
+ *     return p.x*p.x + p.y*p.y + p.z*p.z             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double cPoint_distance(cPoint pa, cPoint pb):
+ */
+  __pyx_r = (((__pyx_v_p.x * __pyx_v_p.x) + (__pyx_v_p.y * __pyx_v_p.y)) + (__pyx_v_p.z * __pyx_v_p.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":28
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ * cdef inline double cPoint_norm(cPoint p):             # <<<<<<<<<<<<<<
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":31
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ * cdef inline double cPoint_distance(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_distance(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pb) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_distance", 0);
+
+  /* "point.pxd":32
+ * 
+ * cdef inline double cPoint_distance(cPoint pa, cPoint pb):
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +             # <<<<<<<<<<<<<<
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ *                 (pa.z-pb.z)*(pa.z-pb.z)
+ */
+  __pyx_r = sqrt(((((__pyx_v_pa.x - __pyx_v_pb.x) * (__pyx_v_pa.x - __pyx_v_pb.x)) + ((__pyx_v_pa.y - __pyx_v_pb.y) * (__pyx_v_pa.y - __pyx_v_pb.y))) + ((__pyx_v_pa.z - __pyx_v_pb.z) * (__pyx_v_pa.z - __pyx_v_pb.z))));
+  goto __pyx_L0;
+
+  /* "point.pxd":31
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ * cdef inline double cPoint_distance(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":37
+ *                 )
+ * 
+ * cdef inline double cPoint_distance2(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_distance2(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pb) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_distance2", 0);
+
+  /* "point.pxd":38
+ * 
+ * cdef inline double cPoint_distance2(cPoint pa, cPoint pb):
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +             # <<<<<<<<<<<<<<
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ */
+  __pyx_r = ((((__pyx_v_pa.x - __pyx_v_pb.x) * (__pyx_v_pa.x - __pyx_v_pb.x)) + ((__pyx_v_pa.y - __pyx_v_pb.y) * (__pyx_v_pa.y - __pyx_v_pb.y))) + ((__pyx_v_pa.z - __pyx_v_pb.z) * (__pyx_v_pa.z - __pyx_v_pb.z)));
+  goto __pyx_L0;
+
+  /* "point.pxd":37
+ *                 )
+ * 
+ * cdef inline double cPoint_distance2(cPoint pa, cPoint pb):             # <<<<<<<<<<<<<<
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":41
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ * cdef inline double cPoint_length(cPoint pa):             # <<<<<<<<<<<<<<
+ *     return sqrt(cPoint_norm(pa))
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cPoint_length(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_pa) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_length", 0);
+
+  /* "point.pxd":42
+ * 
+ * cdef inline double cPoint_length(cPoint pa):
+ *     return sqrt(cPoint_norm(pa))             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cPoint cPoint_scale(cPoint p, double k):
+ */
+  __pyx_r = sqrt(__pyx_f_5pysph_4base_5point_cPoint_norm(__pyx_v_pa));
+  goto __pyx_L0;
+
+  /* "point.pxd":41
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ * cdef inline double cPoint_length(cPoint pa):             # <<<<<<<<<<<<<<
+ *     return sqrt(cPoint_norm(pa))
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":44
+ *     return sqrt(cPoint_norm(pa))
+ * 
+ * cdef inline cPoint cPoint_scale(cPoint p, double k):             # <<<<<<<<<<<<<<
+ *     return cPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cPoint __pyx_f_5pysph_4base_5point_cPoint_scale(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_p, double __pyx_v_k) {
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cPoint_scale", 0);
+
+  /* "point.pxd":45
+ * 
+ * cdef inline cPoint cPoint_scale(cPoint p, double k):
+ *     return cPoint_new(p.x*k, p.y*k, p.z*k)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cPoint normalized(cPoint p):
+ */
+  __pyx_r = __pyx_f_5pysph_4base_5point_cPoint_new((__pyx_v_p.x * __pyx_v_k), (__pyx_v_p.y * __pyx_v_k), (__pyx_v_p.z * __pyx_v_k));
+  goto __pyx_L0;
+
+  /* "point.pxd":44
+ *     return sqrt(cPoint_norm(pa))
+ * 
+ * cdef inline cPoint cPoint_scale(cPoint p, double k):             # <<<<<<<<<<<<<<
+ *     return cPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":47
+ *     return cPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ * cdef inline cPoint normalized(cPoint p):             # <<<<<<<<<<<<<<
+ *     cdef double norm = cPoint_length(p)
+ *     return cPoint_new(p.x/norm, p.y/norm, p.z/norm)
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cPoint __pyx_f_5pysph_4base_5point_normalized(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_p) {
+  double __pyx_v_norm;
+  struct __pyx_t_5pysph_4base_5point_cPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("normalized", 0);
+
+  /* "point.pxd":48
+ * 
+ * cdef inline cPoint normalized(cPoint p):
+ *     cdef double norm = cPoint_length(p)             # <<<<<<<<<<<<<<
+ *     return cPoint_new(p.x/norm, p.y/norm, p.z/norm)
+ * 
+ */
+  __pyx_v_norm = __pyx_f_5pysph_4base_5point_cPoint_length(__pyx_v_p);
+
+  /* "point.pxd":49
+ * cdef inline cPoint normalized(cPoint p):
+ *     cdef double norm = cPoint_length(p)
+ *     return cPoint_new(p.x/norm, p.y/norm, p.z/norm)             # <<<<<<<<<<<<<<
+ * 
+ * cdef class Point:
+ */
+  if (unlikely(__pyx_v_norm == 0)) {
+    PyErr_SetString(PyExc_ZeroDivisionError, "float division");
+    __PYX_ERR(4, 49, __pyx_L1_error)
+  }
+  if (unlikely(__pyx_v_norm == 0)) {
+    PyErr_SetString(PyExc_ZeroDivisionError, "float division");
+    __PYX_ERR(4, 49, __pyx_L1_error)
+  }
+  if (unlikely(__pyx_v_norm == 0)) {
+    PyErr_SetString(PyExc_ZeroDivisionError, "float division");
+    __PYX_ERR(4, 49, __pyx_L1_error)
+  }
+  __pyx_r = __pyx_f_5pysph_4base_5point_cPoint_new((__pyx_v_p.x / __pyx_v_norm), (__pyx_v_p.y / __pyx_v_norm), (__pyx_v_p.z / __pyx_v_norm));
+  goto __pyx_L0;
+
+  /* "point.pxd":47
+ *     return cPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ * cdef inline cPoint normalized(cPoint p):             # <<<<<<<<<<<<<<
+ *     cdef double norm = cPoint_length(p)
+ *     return cPoint_new(p.x/norm, p.y/norm, p.z/norm)
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_WriteUnraisable("pysph.base.point.normalized", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __Pyx_pretend_to_initialize(&__pyx_r);
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":64
+ *     cdef cPoint to_cPoint(self)
+ * 
+ * cdef inline Point Point_new(double x, double y, double z):             # <<<<<<<<<<<<<<
+ *     cdef Point p = Point.__new__(Point)
+ *     p.x = x
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_Point *__pyx_f_5pysph_4base_5point_Point_new(double __pyx_v_x, double __pyx_v_y, double __pyx_v_z) {
+  struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_p = 0;
+  struct __pyx_obj_5pysph_4base_5point_Point *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_new", 0);
+
+  /* "point.pxd":65
+ * 
+ * cdef inline Point Point_new(double x, double y, double z):
+ *     cdef Point p = Point.__new__(Point)             # <<<<<<<<<<<<<<
+ *     p.x = x
+ *     p.y = y
+ */
+  __pyx_t_1 = __Pyx_tp_new(((PyObject *)__pyx_ptype_5pysph_4base_5point_Point), __pyx_empty_tuple); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 65, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5pysph_4base_5point_Point)))) __PYX_ERR(4, 65, __pyx_L1_error)
+  __pyx_v_p = ((struct __pyx_obj_5pysph_4base_5point_Point *)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* "point.pxd":66
+ * cdef inline Point Point_new(double x, double y, double z):
+ *     cdef Point p = Point.__new__(Point)
+ *     p.x = x             # <<<<<<<<<<<<<<
+ *     p.y = y
+ *     p.z = z
+ */
+  __pyx_t_1 = PyFloat_FromDouble(__pyx_v_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 66, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (__Pyx_PyObject_SetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_x, __pyx_t_1) < 0) __PYX_ERR(4, 66, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "point.pxd":67
+ *     cdef Point p = Point.__new__(Point)
+ *     p.x = x
+ *     p.y = y             # <<<<<<<<<<<<<<
+ *     p.z = z
+ *     return p
+ */
+  __pyx_t_1 = PyFloat_FromDouble(__pyx_v_y); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 67, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (__Pyx_PyObject_SetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_y, __pyx_t_1) < 0) __PYX_ERR(4, 67, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "point.pxd":68
+ *     p.x = x
+ *     p.y = y
+ *     p.z = z             # <<<<<<<<<<<<<<
+ *     return p
+ * 
+ */
+  __pyx_t_1 = PyFloat_FromDouble(__pyx_v_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 68, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (__Pyx_PyObject_SetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_z, __pyx_t_1) < 0) __PYX_ERR(4, 68, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "point.pxd":69
+ *     p.y = y
+ *     p.z = z
+ *     return p             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline Point Point_sub(Point pa, Point pb):
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __Pyx_INCREF(((PyObject *)__pyx_v_p));
+  __pyx_r = __pyx_v_p;
+  goto __pyx_L0;
+
+  /* "point.pxd":64
+ *     cdef cPoint to_cPoint(self)
+ * 
+ * cdef inline Point Point_new(double x, double y, double z):             # <<<<<<<<<<<<<<
+ *     cdef Point p = Point.__new__(Point)
+ *     p.x = x
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.point.Point_new", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XDECREF((PyObject *)__pyx_v_p);
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":71
+ *     return p
+ * 
+ * cdef inline Point Point_sub(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return Point_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_Point *__pyx_f_5pysph_4base_5point_Point_sub(struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pa, struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pb) {
+  struct __pyx_obj_5pysph_4base_5point_Point *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  double __pyx_t_4;
+  double __pyx_t_5;
+  double __pyx_t_6;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_sub", 0);
+
+  /* "point.pxd":72
+ * 
+ * cdef inline Point Point_sub(Point pa, Point pb):
+ *     return Point_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline Point Point_add(Point pa, Point pb):
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_4 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_4 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = PyNumber_Subtract(__pyx_t_3, __pyx_t_2); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_5 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_5 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_6 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_6 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = ((PyObject *)__pyx_f_5pysph_4base_5point_Point_new(__pyx_t_4, __pyx_t_5, __pyx_t_6)); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 72, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_r = ((struct __pyx_obj_5pysph_4base_5point_Point *)__pyx_t_3);
+  __pyx_t_3 = 0;
+  goto __pyx_L0;
+
+  /* "point.pxd":71
+ *     return p
+ * 
+ * cdef inline Point Point_sub(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return Point_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_AddTraceback("pysph.base.point.Point_sub", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":74
+ *     return Point_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline Point Point_add(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return Point_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_Point *__pyx_f_5pysph_4base_5point_Point_add(struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pa, struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pb) {
+  struct __pyx_obj_5pysph_4base_5point_Point *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  double __pyx_t_4;
+  double __pyx_t_5;
+  double __pyx_t_6;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_add", 0);
+
+  /* "point.pxd":75
+ * 
+ * cdef inline Point Point_add(Point pa, Point pb):
+ *     return Point_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double Point_length(Point p):
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Add(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_4 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_4 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = PyNumber_Add(__pyx_t_3, __pyx_t_2); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_5 = __pyx_PyFloat_AsDouble(__pyx_t_1); if (unlikely((__pyx_t_5 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Add(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_6 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_6 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = ((PyObject *)__pyx_f_5pysph_4base_5point_Point_new(__pyx_t_4, __pyx_t_5, __pyx_t_6)); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 75, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_r = ((struct __pyx_obj_5pysph_4base_5point_Point *)__pyx_t_3);
+  __pyx_t_3 = 0;
+  goto __pyx_L0;
+
+  /* "point.pxd":74
+ *     return Point_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline Point Point_add(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return Point_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_AddTraceback("pysph.base.point.Point_add", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":77
+ *     return Point_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline double Point_length(Point p):             # <<<<<<<<<<<<<<
+ *     return sqrt(p.x*p.x + p.y*p.y + p.z*p.z)
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_Point_length(struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_p) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  double __pyx_t_5;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_length", 0);
+
+  /* "point.pxd":78
+ * 
+ * cdef inline double Point_length(Point p):
+ *     return sqrt(p.x*p.x + p.y*p.y + p.z*p.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double Point_length2(Point p):
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Multiply(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_y); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_y); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = PyNumber_Multiply(__pyx_t_2, __pyx_t_1); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyNumber_Add(__pyx_t_3, __pyx_t_4); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_z); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_z); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = PyNumber_Multiply(__pyx_t_4, __pyx_t_3); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = PyNumber_Add(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_5 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_5 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 78, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_r = sqrt(__pyx_t_5);
+  goto __pyx_L0;
+
+  /* "point.pxd":77
+ *     return Point_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline double Point_length(Point p):             # <<<<<<<<<<<<<<
+ *     return sqrt(p.x*p.x + p.y*p.y + p.z*p.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_WriteUnraisable("pysph.base.point.Point_length", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":80
+ *     return sqrt(p.x*p.x + p.y*p.y + p.z*p.z)
+ * 
+ * cdef inline double Point_length2(Point p):             # <<<<<<<<<<<<<<
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_Point_length2(struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_p) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  double __pyx_t_5;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_length2", 0);
+
+  /* "point.pxd":81
+ * 
+ * cdef inline double Point_length2(Point p):
+ *     return p.x*p.x + p.y*p.y + p.z*p.z             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double Point_distance(Point pa, Point pb):
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Multiply(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_y); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_y); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = PyNumber_Multiply(__pyx_t_2, __pyx_t_1); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyNumber_Add(__pyx_t_3, __pyx_t_4); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_z); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_p), __pyx_n_s_z); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = PyNumber_Multiply(__pyx_t_4, __pyx_t_3); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = PyNumber_Add(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_5 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_5 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 81, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_r = __pyx_t_5;
+  goto __pyx_L0;
+
+  /* "point.pxd":80
+ *     return sqrt(p.x*p.x + p.y*p.y + p.z*p.z)
+ * 
+ * cdef inline double Point_length2(Point p):             # <<<<<<<<<<<<<<
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_WriteUnraisable("pysph.base.point.Point_length2", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":83
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ * cdef inline double Point_distance(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_Point_distance(struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pa, struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pb) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  double __pyx_t_6;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_distance", 0);
+
+  /* "point.pxd":84
+ * 
+ * cdef inline double Point_distance(Point pa, Point pb):
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +             # <<<<<<<<<<<<<<
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ *                 (pa.z-pb.z)*(pa.z-pb.z)
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = PyNumber_Subtract(__pyx_t_2, __pyx_t_1); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyNumber_Multiply(__pyx_t_3, __pyx_t_4); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+  /* "point.pxd":85
+ * cdef inline double Point_distance(Point pa, Point pb):
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +             # <<<<<<<<<<<<<<
+ *                 (pa.z-pb.z)*(pa.z-pb.z)
+ *                 )
+ */
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = PyNumber_Subtract(__pyx_t_4, __pyx_t_3); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_5 = PyNumber_Subtract(__pyx_t_3, __pyx_t_4); if (unlikely(!__pyx_t_5)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = PyNumber_Multiply(__pyx_t_2, __pyx_t_5); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+
+  /* "point.pxd":84
+ * 
+ * cdef inline double Point_distance(Point pa, Point pb):
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +             # <<<<<<<<<<<<<<
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ *                 (pa.z-pb.z)*(pa.z-pb.z)
+ */
+  __pyx_t_5 = PyNumber_Add(__pyx_t_1, __pyx_t_4); if (unlikely(!__pyx_t_5)) __PYX_ERR(4, 84, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+  /* "point.pxd":86
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ *                 (pa.z-pb.z)*(pa.z-pb.z)             # <<<<<<<<<<<<<<
+ *                 )
+ * 
+ */
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = PyNumber_Subtract(__pyx_t_4, __pyx_t_1); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_4); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = PyNumber_Multiply(__pyx_t_2, __pyx_t_3); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 86, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+
+  /* "point.pxd":85
+ * cdef inline double Point_distance(Point pa, Point pb):
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +             # <<<<<<<<<<<<<<
+ *                 (pa.z-pb.z)*(pa.z-pb.z)
+ *                 )
+ */
+  __pyx_t_3 = PyNumber_Add(__pyx_t_5, __pyx_t_4); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_6 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_6 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 85, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+
+  /* "point.pxd":84
+ * 
+ * cdef inline double Point_distance(Point pa, Point pb):
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +             # <<<<<<<<<<<<<<
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ *                 (pa.z-pb.z)*(pa.z-pb.z)
+ */
+  __pyx_r = sqrt(__pyx_t_6);
+  goto __pyx_L0;
+
+  /* "point.pxd":83
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ * cdef inline double Point_distance(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return sqrt((pa.x-pb.x)*(pa.x-pb.x) +
+ *                 (pa.y-pb.y)*(pa.y-pb.y) +
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_WriteUnraisable("pysph.base.point.Point_distance", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":89
+ *                 )
+ * 
+ * cdef inline double Point_distance2(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_Point_distance2(struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pa, struct __pyx_obj_5pysph_4base_5point_Point *__pyx_v_pb) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  PyObject *__pyx_t_4 = NULL;
+  PyObject *__pyx_t_5 = NULL;
+  double __pyx_t_6;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_distance2", 0);
+
+  /* "point.pxd":90
+ * 
+ * cdef inline double Point_distance2(Point pa, Point pb):
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +             # <<<<<<<<<<<<<<
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ */
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = PyNumber_Subtract(__pyx_t_2, __pyx_t_1); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyNumber_Multiply(__pyx_t_3, __pyx_t_4); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = PyNumber_Subtract(__pyx_t_4, __pyx_t_3); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_5 = PyNumber_Subtract(__pyx_t_3, __pyx_t_4); if (unlikely(!__pyx_t_5)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = PyNumber_Multiply(__pyx_t_2, __pyx_t_5); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __pyx_t_5 = PyNumber_Add(__pyx_t_1, __pyx_t_4); if (unlikely(!__pyx_t_5)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_5);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+
+  /* "point.pxd":91
+ * cdef inline double Point_distance2(Point pa, Point pb):
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +
+ *                     (pa.z-pb.z)*(pa.z-pb.z))             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline Point Point_from_cPoint(cPoint p):
+ */
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = PyNumber_Subtract(__pyx_t_4, __pyx_t_1); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_4 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_4); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_4 = PyNumber_Multiply(__pyx_t_2, __pyx_t_3); if (unlikely(!__pyx_t_4)) __PYX_ERR(4, 91, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_4);
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+
+  /* "point.pxd":90
+ * 
+ * cdef inline double Point_distance2(Point pa, Point pb):
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +             # <<<<<<<<<<<<<<
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ */
+  __pyx_t_3 = PyNumber_Add(__pyx_t_5, __pyx_t_4); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_5); __pyx_t_5 = 0;
+  __Pyx_DECREF(__pyx_t_4); __pyx_t_4 = 0;
+  __pyx_t_6 = __pyx_PyFloat_AsDouble(__pyx_t_3); if (unlikely((__pyx_t_6 == (double)-1) && PyErr_Occurred())) __PYX_ERR(4, 90, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_r = __pyx_t_6;
+  goto __pyx_L0;
+
+  /* "point.pxd":89
+ *                 )
+ * 
+ * cdef inline double Point_distance2(Point pa, Point pb):             # <<<<<<<<<<<<<<
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) + (pa.y-pb.y)*(pa.y-pb.y) +
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_XDECREF(__pyx_t_4);
+  __Pyx_XDECREF(__pyx_t_5);
+  __Pyx_WriteUnraisable("pysph.base.point.Point_distance2", __pyx_clineno, __pyx_lineno, __pyx_filename, 1, 0);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":93
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ * cdef inline Point Point_from_cPoint(cPoint p):             # <<<<<<<<<<<<<<
+ *     return Point_new(p.x, p.y, p.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_Point *__pyx_f_5pysph_4base_5point_Point_from_cPoint(struct __pyx_t_5pysph_4base_5point_cPoint __pyx_v_p) {
+  struct __pyx_obj_5pysph_4base_5point_Point *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("Point_from_cPoint", 0);
+
+  /* "point.pxd":94
+ * 
+ * cdef inline Point Point_from_cPoint(cPoint p):
+ *     return Point_new(p.x, p.y, p.z)             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __pyx_t_1 = ((PyObject *)__pyx_f_5pysph_4base_5point_Point_new(__pyx_v_p.x, __pyx_v_p.y, __pyx_v_p.z)); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 94, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = ((struct __pyx_obj_5pysph_4base_5point_Point *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "point.pxd":93
+ *                     (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ * cdef inline Point Point_from_cPoint(cPoint p):             # <<<<<<<<<<<<<<
+ *     return Point_new(p.x, p.y, p.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.point.Point_from_cPoint", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":102
+ *     int x, y, z
+ * 
+ * cdef inline cIntPoint cIntPoint_new(int x, int y, int z):             # <<<<<<<<<<<<<<
+ *     cdef cIntPoint p = cIntPoint(x,y,z)
+ *     return p
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_f_5pysph_4base_5point_cIntPoint_new(int __pyx_v_x, int __pyx_v_y, int __pyx_v_z) {
+  struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_p;
+  struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_t_1;
+  __Pyx_RefNannySetupContext("cIntPoint_new", 0);
+
+  /* "point.pxd":103
+ * 
+ * cdef inline cIntPoint cIntPoint_new(int x, int y, int z):
+ *     cdef cIntPoint p = cIntPoint(x,y,z)             # <<<<<<<<<<<<<<
+ *     return p
+ * 
+ */
+  __pyx_t_1.x = __pyx_v_x;
+  __pyx_t_1.y = __pyx_v_y;
+  __pyx_t_1.z = __pyx_v_z;
+  __pyx_v_p = __pyx_t_1;
+
+  /* "point.pxd":104
+ * cdef inline cIntPoint cIntPoint_new(int x, int y, int z):
+ *     cdef cIntPoint p = cIntPoint(x,y,z)
+ *     return p             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cIntPoint cIntPoint_sub(cIntPoint pa, cIntPoint pb):
+ */
+  __pyx_r = __pyx_v_p;
+  goto __pyx_L0;
+
+  /* "point.pxd":102
+ *     int x, y, z
+ * 
+ * cdef inline cIntPoint cIntPoint_new(int x, int y, int z):             # <<<<<<<<<<<<<<
+ *     cdef cIntPoint p = cIntPoint(x,y,z)
+ *     return p
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":106
+ *     return p
+ * 
+ * cdef inline cIntPoint cIntPoint_sub(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return cIntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_f_5pysph_4base_5point_cIntPoint_sub(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pb) {
+  struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_sub", 0);
+
+  /* "point.pxd":107
+ * 
+ * cdef inline cIntPoint cIntPoint_sub(cIntPoint pa, cIntPoint pb):
+ *     return cIntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cIntPoint cIntPoint_add(cIntPoint pa, cIntPoint pb):
+ */
+  __pyx_r = __pyx_f_5pysph_4base_5point_cIntPoint_new((__pyx_v_pa.x - __pyx_v_pb.x), (__pyx_v_pa.y - __pyx_v_pb.y), (__pyx_v_pa.z - __pyx_v_pb.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":106
+ *     return p
+ * 
+ * cdef inline cIntPoint cIntPoint_sub(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return cIntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":109
+ *     return cIntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline cIntPoint cIntPoint_add(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return cIntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_f_5pysph_4base_5point_cIntPoint_add(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pb) {
+  struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_add", 0);
+
+  /* "point.pxd":110
+ * 
+ * cdef inline cIntPoint cIntPoint_add(cIntPoint pa, cIntPoint pb):
+ *     return cIntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline long cIntPoint_dot(cIntPoint pa, cIntPoint pb):
+ */
+  __pyx_r = __pyx_f_5pysph_4base_5point_cIntPoint_new((__pyx_v_pa.x + __pyx_v_pb.x), (__pyx_v_pa.y + __pyx_v_pb.y), (__pyx_v_pa.z + __pyx_v_pb.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":109
+ *     return cIntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline cIntPoint cIntPoint_add(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return cIntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":112
+ *     return cIntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline long cIntPoint_dot(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ */
+
+static CYTHON_INLINE long __pyx_f_5pysph_4base_5point_cIntPoint_dot(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pb) {
+  long __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_dot", 0);
+
+  /* "point.pxd":113
+ * 
+ * cdef inline long cIntPoint_dot(cIntPoint pa, cIntPoint pb):
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline long cIntPoint_norm(cIntPoint p):
+ */
+  __pyx_r = (((__pyx_v_pa.x * __pyx_v_pb.x) + (__pyx_v_pa.y * __pyx_v_pb.y)) + (__pyx_v_pa.z * __pyx_v_pb.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":112
+ *     return cIntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline long cIntPoint_dot(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":115
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ * cdef inline long cIntPoint_norm(cIntPoint p):             # <<<<<<<<<<<<<<
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ */
+
+static CYTHON_INLINE long __pyx_f_5pysph_4base_5point_cIntPoint_norm(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_p) {
+  long __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_norm", 0);
+
+  /* "point.pxd":116
+ * 
+ * cdef inline long cIntPoint_norm(cIntPoint p):
+ *     return p.x*p.x + p.y*p.y + p.z*p.z             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline double cIntPoint_length(cIntPoint pa):
+ */
+  __pyx_r = (((__pyx_v_p.x * __pyx_v_p.x) + (__pyx_v_p.y * __pyx_v_p.y)) + (__pyx_v_p.z * __pyx_v_p.z));
+  goto __pyx_L0;
+
+  /* "point.pxd":115
+ *     return pa.x*pb.x + pa.y*pb.y + pa.z*pb.z
+ * 
+ * cdef inline long cIntPoint_norm(cIntPoint p):             # <<<<<<<<<<<<<<
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":118
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ * cdef inline double cIntPoint_length(cIntPoint pa):             # <<<<<<<<<<<<<<
+ *     return sqrt(<double>cIntPoint_norm(pa))
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cIntPoint_length(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_length", 0);
+
+  /* "point.pxd":119
+ * 
+ * cdef inline double cIntPoint_length(cIntPoint pa):
+ *     return sqrt(<double>cIntPoint_norm(pa))             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline long cIntPoint_distance2(cIntPoint pa, cIntPoint pb):
+ */
+  __pyx_r = sqrt(((double)__pyx_f_5pysph_4base_5point_cIntPoint_norm(__pyx_v_pa)));
+  goto __pyx_L0;
+
+  /* "point.pxd":118
+ *     return p.x*p.x + p.y*p.y + p.z*p.z
+ * 
+ * cdef inline double cIntPoint_length(cIntPoint pa):             # <<<<<<<<<<<<<<
+ *     return sqrt(<double>cIntPoint_norm(pa))
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":121
+ *     return sqrt(<double>cIntPoint_norm(pa))
+ * 
+ * cdef inline long cIntPoint_distance2(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) +
+ *             (pa.y-pb.y)*(pa.y-pb.y) +
+ */
+
+static CYTHON_INLINE long __pyx_f_5pysph_4base_5point_cIntPoint_distance2(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pb) {
+  long __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_distance2", 0);
+
+  /* "point.pxd":123
+ * cdef inline long cIntPoint_distance2(cIntPoint pa, cIntPoint pb):
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) +
+ *             (pa.y-pb.y)*(pa.y-pb.y) +             # <<<<<<<<<<<<<<
+ *             (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ */
+  __pyx_r = ((((__pyx_v_pa.x - __pyx_v_pb.x) * (__pyx_v_pa.x - __pyx_v_pb.x)) + ((__pyx_v_pa.y - __pyx_v_pb.y) * (__pyx_v_pa.y - __pyx_v_pb.y))) + ((__pyx_v_pa.z - __pyx_v_pb.z) * (__pyx_v_pa.z - __pyx_v_pb.z)));
+  goto __pyx_L0;
+
+  /* "point.pxd":121
+ *     return sqrt(<double>cIntPoint_norm(pa))
+ * 
+ * cdef inline long cIntPoint_distance2(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return ((pa.x-pb.x)*(pa.x-pb.x) +
+ *             (pa.y-pb.y)*(pa.y-pb.y) +
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":126
+ *             (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ * cdef inline double cIntPoint_distance(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return sqrt(<double>cIntPoint_distance2(pa, pb))
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_5point_cIntPoint_distance(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pb) {
+  double __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_distance", 0);
+
+  /* "point.pxd":127
+ * 
+ * cdef inline double cIntPoint_distance(cIntPoint pa, cIntPoint pb):
+ *     return sqrt(<double>cIntPoint_distance2(pa, pb))             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline cIntPoint cIntPoint_scale(cIntPoint p, int k):
+ */
+  __pyx_r = sqrt(((double)__pyx_f_5pysph_4base_5point_cIntPoint_distance2(__pyx_v_pa, __pyx_v_pb)));
+  goto __pyx_L0;
+
+  /* "point.pxd":126
+ *             (pa.z-pb.z)*(pa.z-pb.z))
+ * 
+ * cdef inline double cIntPoint_distance(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return sqrt(<double>cIntPoint_distance2(pa, pb))
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":129
+ *     return sqrt(<double>cIntPoint_distance2(pa, pb))
+ * 
+ * cdef inline cIntPoint cIntPoint_scale(cIntPoint p, int k):             # <<<<<<<<<<<<<<
+ *     return cIntPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_f_5pysph_4base_5point_cIntPoint_scale(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_p, int __pyx_v_k) {
+  struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_r;
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("cIntPoint_scale", 0);
+
+  /* "point.pxd":130
+ * 
+ * cdef inline cIntPoint cIntPoint_scale(cIntPoint p, int k):
+ *     return cIntPoint_new(p.x*k, p.y*k, p.z*k)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline bint cIntPoint_is_equal(cIntPoint pa, cIntPoint pb):
+ */
+  __pyx_r = __pyx_f_5pysph_4base_5point_cIntPoint_new((__pyx_v_p.x * __pyx_v_k), (__pyx_v_p.y * __pyx_v_k), (__pyx_v_p.z * __pyx_v_k));
+  goto __pyx_L0;
+
+  /* "point.pxd":129
+ *     return sqrt(<double>cIntPoint_distance2(pa, pb))
+ * 
+ * cdef inline cIntPoint cIntPoint_scale(cIntPoint p, int k):             # <<<<<<<<<<<<<<
+ *     return cIntPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":132
+ *     return cIntPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ * cdef inline bint cIntPoint_is_equal(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return (pa.x == pb.x and pa.y == pb.y and pa.z == pb.z)
+ * 
+ */
+
+static CYTHON_INLINE int __pyx_f_5pysph_4base_5point_cIntPoint_is_equal(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pa, struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_pb) {
+  int __pyx_r;
+  __Pyx_RefNannyDeclarations
+  int __pyx_t_1;
+  int __pyx_t_2;
+  __Pyx_RefNannySetupContext("cIntPoint_is_equal", 0);
+
+  /* "point.pxd":133
+ * 
+ * cdef inline bint cIntPoint_is_equal(cIntPoint pa, cIntPoint pb):
+ *     return (pa.x == pb.x and pa.y == pb.y and pa.z == pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef class IntPoint:
+ */
+  __pyx_t_2 = ((__pyx_v_pa.x == __pyx_v_pb.x) != 0);
+  if (__pyx_t_2) {
+  } else {
+    __pyx_t_1 = __pyx_t_2;
+    goto __pyx_L3_bool_binop_done;
+  }
+  __pyx_t_2 = ((__pyx_v_pa.y == __pyx_v_pb.y) != 0);
+  if (__pyx_t_2) {
+  } else {
+    __pyx_t_1 = __pyx_t_2;
+    goto __pyx_L3_bool_binop_done;
+  }
+  __pyx_t_2 = ((__pyx_v_pa.z == __pyx_v_pb.z) != 0);
+  __pyx_t_1 = __pyx_t_2;
+  __pyx_L3_bool_binop_done:;
+  __pyx_r = __pyx_t_1;
+  goto __pyx_L0;
+
+  /* "point.pxd":132
+ *     return cIntPoint_new(p.x*k, p.y*k, p.z*k)
+ * 
+ * cdef inline bint cIntPoint_is_equal(cIntPoint pa, cIntPoint pb):             # <<<<<<<<<<<<<<
+ *     return (pa.x == pb.x and pa.y == pb.y and pa.z == pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":144
+ *     cdef IntPoint copy(self)
+ * 
+ * cdef inline IntPoint IntPoint_sub(IntPoint pa, IntPoint pb):             # <<<<<<<<<<<<<<
+ *     return IntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_f_5pysph_4base_5point_IntPoint_sub(struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_v_pa, struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_v_pb) {
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  int __pyx_t_4;
+  int __pyx_t_5;
+  int __pyx_t_6;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("IntPoint_sub", 0);
+
+  /* "point.pxd":145
+ * 
+ * cdef inline IntPoint IntPoint_sub(IntPoint pa, IntPoint pb):
+ *     return IntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline IntPoint IntPoint_add(IntPoint pa, IntPoint pb):
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_3); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = PyNumber_Subtract(__pyx_t_3, __pyx_t_2); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_5 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_5 == (int)-1) && PyErr_Occurred())) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Subtract(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_6 = __Pyx_PyInt_As_int(__pyx_t_3); if (unlikely((__pyx_t_6 == (int)-1) && PyErr_Occurred())) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = ((PyObject *)__pyx_f_5pysph_4base_5point_IntPoint_new(__pyx_t_4, __pyx_t_5, __pyx_t_6)); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 145, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_r = ((struct __pyx_obj_5pysph_4base_5point_IntPoint *)__pyx_t_3);
+  __pyx_t_3 = 0;
+  goto __pyx_L0;
+
+  /* "point.pxd":144
+ *     cdef IntPoint copy(self)
+ * 
+ * cdef inline IntPoint IntPoint_sub(IntPoint pa, IntPoint pb):             # <<<<<<<<<<<<<<
+ *     return IntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_AddTraceback("pysph.base.point.IntPoint_sub", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":147
+ *     return IntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline IntPoint IntPoint_add(IntPoint pa, IntPoint pb):             # <<<<<<<<<<<<<<
+ *     return IntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_f_5pysph_4base_5point_IntPoint_add(struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_v_pa, struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_v_pb) {
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  PyObject *__pyx_t_3 = NULL;
+  int __pyx_t_4;
+  int __pyx_t_5;
+  int __pyx_t_6;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("IntPoint_add", 0);
+
+  /* "point.pxd":148
+ * 
+ * cdef inline IntPoint IntPoint_add(IntPoint pa, IntPoint pb):
+ *     return IntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline IntPoint IntPoint_new(int x, int y, int z):
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_x); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_x); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Add(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_4 = __Pyx_PyInt_As_int(__pyx_t_3); if (unlikely((__pyx_t_4 == (int)-1) && PyErr_Occurred())) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_y); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_y); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_1 = PyNumber_Add(__pyx_t_3, __pyx_t_2); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_5 = __Pyx_PyInt_As_int(__pyx_t_1); if (unlikely((__pyx_t_5 == (int)-1) && PyErr_Occurred())) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pa), __pyx_n_s_z); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_t_2 = __Pyx_PyObject_GetAttrStr(((PyObject *)__pyx_v_pb), __pyx_n_s_z); if (unlikely(!__pyx_t_2)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __pyx_t_3 = PyNumber_Add(__pyx_t_1, __pyx_t_2); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+  __pyx_t_6 = __Pyx_PyInt_As_int(__pyx_t_3); if (unlikely((__pyx_t_6 == (int)-1) && PyErr_Occurred())) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_3); __pyx_t_3 = 0;
+  __pyx_t_3 = ((PyObject *)__pyx_f_5pysph_4base_5point_IntPoint_new(__pyx_t_4, __pyx_t_5, __pyx_t_6)); if (unlikely(!__pyx_t_3)) __PYX_ERR(4, 148, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_3);
+  __pyx_r = ((struct __pyx_obj_5pysph_4base_5point_IntPoint *)__pyx_t_3);
+  __pyx_t_3 = 0;
+  goto __pyx_L0;
+
+  /* "point.pxd":147
+ *     return IntPoint_new(pa.x-pb.x, pa.y-pb.y, pa.z-pb.z)
+ * 
+ * cdef inline IntPoint IntPoint_add(IntPoint pa, IntPoint pb):             # <<<<<<<<<<<<<<
+ *     return IntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  __Pyx_XDECREF(__pyx_t_3);
+  __Pyx_AddTraceback("pysph.base.point.IntPoint_add", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":150
+ *     return IntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline IntPoint IntPoint_new(int x, int y, int z):             # <<<<<<<<<<<<<<
+ *     cdef IntPoint p = IntPoint.__new__(IntPoint)
+ *     p.data.x = x
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_f_5pysph_4base_5point_IntPoint_new(int __pyx_v_x, int __pyx_v_y, int __pyx_v_z) {
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_v_p = 0;
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("IntPoint_new", 0);
+
+  /* "point.pxd":151
+ * 
+ * cdef inline IntPoint IntPoint_new(int x, int y, int z):
+ *     cdef IntPoint p = IntPoint.__new__(IntPoint)             # <<<<<<<<<<<<<<
+ *     p.data.x = x
+ *     p.data.y = y
+ */
+  __pyx_t_1 = __Pyx_tp_new(((PyObject *)__pyx_ptype_5pysph_4base_5point_IntPoint), __pyx_empty_tuple); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 151, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (!(likely(__Pyx_TypeTest(__pyx_t_1, __pyx_ptype_5pysph_4base_5point_IntPoint)))) __PYX_ERR(4, 151, __pyx_L1_error)
+  __pyx_v_p = ((struct __pyx_obj_5pysph_4base_5point_IntPoint *)__pyx_t_1);
+  __pyx_t_1 = 0;
+
+  /* "point.pxd":152
+ * cdef inline IntPoint IntPoint_new(int x, int y, int z):
+ *     cdef IntPoint p = IntPoint.__new__(IntPoint)
+ *     p.data.x = x             # <<<<<<<<<<<<<<
+ *     p.data.y = y
+ *     p.data.z = z
+ */
+  __pyx_v_p->data.x = __pyx_v_x;
+
+  /* "point.pxd":153
+ *     cdef IntPoint p = IntPoint.__new__(IntPoint)
+ *     p.data.x = x
+ *     p.data.y = y             # <<<<<<<<<<<<<<
+ *     p.data.z = z
+ *     return p
+ */
+  __pyx_v_p->data.y = __pyx_v_y;
+
+  /* "point.pxd":154
+ *     p.data.x = x
+ *     p.data.y = y
+ *     p.data.z = z             # <<<<<<<<<<<<<<
+ *     return p
+ * 
+ */
+  __pyx_v_p->data.z = __pyx_v_z;
+
+  /* "point.pxd":155
+ *     p.data.y = y
+ *     p.data.z = z
+ *     return p             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline IntPoint IntPoint_from_cIntPoint(cIntPoint p):
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __Pyx_INCREF(((PyObject *)__pyx_v_p));
+  __pyx_r = __pyx_v_p;
+  goto __pyx_L0;
+
+  /* "point.pxd":150
+ *     return IntPoint_new(pa.x+pb.x, pa.y+pb.y, pa.z+pb.z)
+ * 
+ * cdef inline IntPoint IntPoint_new(int x, int y, int z):             # <<<<<<<<<<<<<<
+ *     cdef IntPoint p = IntPoint.__new__(IntPoint)
+ *     p.data.x = x
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.point.IntPoint_new", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XDECREF((PyObject *)__pyx_v_p);
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "point.pxd":157
+ *     return p
+ * 
+ * cdef inline IntPoint IntPoint_from_cIntPoint(cIntPoint p):             # <<<<<<<<<<<<<<
+ *     return IntPoint_new(p.x, p.y, p.z)
+ */
+
+static CYTHON_INLINE struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_f_5pysph_4base_5point_IntPoint_from_cIntPoint(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_p) {
+  struct __pyx_obj_5pysph_4base_5point_IntPoint *__pyx_r = NULL;
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("IntPoint_from_cIntPoint", 0);
+
+  /* "point.pxd":158
+ * 
+ * cdef inline IntPoint IntPoint_from_cIntPoint(cIntPoint p):
+ *     return IntPoint_new(p.x, p.y, p.z)             # <<<<<<<<<<<<<<
+ */
+  __Pyx_XDECREF(((PyObject *)__pyx_r));
+  __pyx_t_1 = ((PyObject *)__pyx_f_5pysph_4base_5point_IntPoint_new(__pyx_v_p.x, __pyx_v_p.y, __pyx_v_p.z)); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 158, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_r = ((struct __pyx_obj_5pysph_4base_5point_IntPoint *)__pyx_t_1);
+  __pyx_t_1 = 0;
+  goto __pyx_L0;
+
+  /* "point.pxd":157
+ *     return p
+ * 
+ * cdef inline IntPoint IntPoint_from_cIntPoint(cIntPoint p):             # <<<<<<<<<<<<<<
+ *     return IntPoint_new(p.x, p.y, p.z)
+ */
+
+  /* function exit code */
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_AddTraceback("pysph.base.point.IntPoint_from_cIntPoint", __pyx_clineno, __pyx_lineno, __pyx_filename);
+  __pyx_r = 0;
+  __pyx_L0:;
+  __Pyx_XGIVEREF((PyObject *)__pyx_r);
+  __Pyx_RefNannyFinishContext();
+  return __pyx_r;
+}
+
+/* "pysph/base/nnps_base.pxd":33
+ * ctypedef unsigned int* ZOLTAN_ID_PTR
+ * 
+ * cdef inline double norm2(double x, double y, double z) nogil:             # <<<<<<<<<<<<<<
+ *     return x*x + y*y + z*z
+ * 
+ */
+
+static CYTHON_INLINE double __pyx_f_5pysph_4base_9nnps_base_norm2(double __pyx_v_x, double __pyx_v_y, double __pyx_v_z) {
+  double __pyx_r;
+
+  /* "pysph/base/nnps_base.pxd":34
+ * 
+ * cdef inline double norm2(double x, double y, double z) nogil:
+ *     return x*x + y*y + z*z             # <<<<<<<<<<<<<<
+ * 
+ * @cython.cdivision(True)
+ */
+  __pyx_r = (((__pyx_v_x * __pyx_v_x) + (__pyx_v_y * __pyx_v_y)) + (__pyx_v_z * __pyx_v_z));
+  goto __pyx_L0;
+
+  /* "pysph/base/nnps_base.pxd":33
+ * ctypedef unsigned int* ZOLTAN_ID_PTR
+ * 
+ * cdef inline double norm2(double x, double y, double z) nogil:             # <<<<<<<<<<<<<<
+ *     return x*x + y*y + z*z
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "pysph/base/nnps_base.pxd":37
+ * 
+ * @cython.cdivision(True)
+ * cdef inline int real_to_int(double real_val, double step) nogil:             # <<<<<<<<<<<<<<
+ *     """ Return the bin index to which the given position belongs.
+ * 
+ */
+
+static CYTHON_INLINE int __pyx_f_5pysph_4base_9nnps_base_real_to_int(double __pyx_v_real_val, double __pyx_v_step) {
+  int __pyx_v_ret_val;
+  int __pyx_r;
+
+  /* "pysph/base/nnps_base.pxd":52
+ *     -1
+ *     """
+ *     cdef int ret_val = <int>floor( real_val/step )             # <<<<<<<<<<<<<<
+ * 
+ *     return ret_val
+ */
+  __pyx_v_ret_val = ((int)floor((__pyx_v_real_val / __pyx_v_step)));
+
+  /* "pysph/base/nnps_base.pxd":54
+ *     cdef int ret_val = <int>floor( real_val/step )
+ * 
+ *     return ret_val             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline void find_cell_id_raw(double x, double y, double z, double
+ */
+  __pyx_r = __pyx_v_ret_val;
+  goto __pyx_L0;
+
+  /* "pysph/base/nnps_base.pxd":37
+ * 
+ * @cython.cdivision(True)
+ * cdef inline int real_to_int(double real_val, double step) nogil:             # <<<<<<<<<<<<<<
+ *     """ Return the bin index to which the given position belongs.
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "pysph/base/nnps_base.pxd":56
+ *     return ret_val
+ * 
+ * cdef inline void find_cell_id_raw(double x, double y, double z, double             # <<<<<<<<<<<<<<
+ *                            cell_size, int *ix, int *iy, int *iz) nogil:
+ *     """ Find the cell index for the corresponding point
+ */
+
+static CYTHON_INLINE void __pyx_f_5pysph_4base_9nnps_base_find_cell_id_raw(double __pyx_v_x, double __pyx_v_y, double __pyx_v_z, double __pyx_v_cell_size, int *__pyx_v_ix, int *__pyx_v_iy, int *__pyx_v_iz) {
+
+  /* "pysph/base/nnps_base.pxd":76
+ * 
+ *     """
+ *     ix[0] = real_to_int(x, cell_size)             # <<<<<<<<<<<<<<
+ *     iy[0] = real_to_int(y, cell_size)
+ *     iz[0] = real_to_int(z, cell_size)
+ */
+  (__pyx_v_ix[0]) = __pyx_f_5pysph_4base_9nnps_base_real_to_int(__pyx_v_x, __pyx_v_cell_size);
+
+  /* "pysph/base/nnps_base.pxd":77
+ *     """
+ *     ix[0] = real_to_int(x, cell_size)
+ *     iy[0] = real_to_int(y, cell_size)             # <<<<<<<<<<<<<<
+ *     iz[0] = real_to_int(z, cell_size)
+ * 
+ */
+  (__pyx_v_iy[0]) = __pyx_f_5pysph_4base_9nnps_base_real_to_int(__pyx_v_y, __pyx_v_cell_size);
+
+  /* "pysph/base/nnps_base.pxd":78
+ *     ix[0] = real_to_int(x, cell_size)
+ *     iy[0] = real_to_int(y, cell_size)
+ *     iz[0] = real_to_int(z, cell_size)             # <<<<<<<<<<<<<<
+ * 
+ * @cython.boundscheck(False)
+ */
+  (__pyx_v_iz[0]) = __pyx_f_5pysph_4base_9nnps_base_real_to_int(__pyx_v_z, __pyx_v_cell_size);
+
+  /* "pysph/base/nnps_base.pxd":56
+ *     return ret_val
+ * 
+ * cdef inline void find_cell_id_raw(double x, double y, double z, double             # <<<<<<<<<<<<<<
+ *                            cell_size, int *ix, int *iy, int *iz) nogil:
+ *     """ Find the cell index for the corresponding point
+ */
+
+  /* function exit code */
+}
+
+/* "pysph/base/nnps_base.pxd":82
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long flatten_raw(int x, int y, int z, int* ncells_per_dim,             # <<<<<<<<<<<<<<
+ *         int dim) nogil:
+ *     """Return a flattened index for a cell
+ */
+
+static CYTHON_INLINE long __pyx_f_5pysph_4base_9nnps_base_flatten_raw(int __pyx_v_x, int __pyx_v_y, int __pyx_v_z, int *__pyx_v_ncells_per_dim, CYTHON_UNUSED int __pyx_v_dim) {
+  long __pyx_v_ncx;
+  long __pyx_v_ncy;
+  long __pyx_r;
+
+  /* "pysph/base/nnps_base.pxd":91
+ * 
+ *     """
+ *     cdef long ncx = ncells_per_dim[0]             # <<<<<<<<<<<<<<
+ *     cdef long ncy = ncells_per_dim[1]
+ * 
+ */
+  __pyx_v_ncx = (__pyx_v_ncells_per_dim[0]);
+
+  /* "pysph/base/nnps_base.pxd":92
+ *     """
+ *     cdef long ncx = ncells_per_dim[0]
+ *     cdef long ncy = ncells_per_dim[1]             # <<<<<<<<<<<<<<
+ * 
+ *     return <long>( x + ncx * y + ncx*ncy * z )
+ */
+  __pyx_v_ncy = (__pyx_v_ncells_per_dim[1]);
+
+  /* "pysph/base/nnps_base.pxd":94
+ *     cdef long ncy = ncells_per_dim[1]
+ * 
+ *     return <long>( x + ncx * y + ncx*ncy * z )             # <<<<<<<<<<<<<<
+ * 
+ * 
+ */
+  __pyx_r = ((long)((__pyx_v_x + (__pyx_v_ncx * __pyx_v_y)) + ((__pyx_v_ncx * __pyx_v_ncy) * __pyx_v_z)));
+  goto __pyx_L0;
+
+  /* "pysph/base/nnps_base.pxd":82
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long flatten_raw(int x, int y, int z, int* ncells_per_dim,             # <<<<<<<<<<<<<<
+ *         int dim) nogil:
+ *     """Return a flattened index for a cell
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "pysph/base/nnps_base.pxd":99
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long flatten(cIntPoint cid, IntArray ncells_per_dim, int dim) nogil:             # <<<<<<<<<<<<<<
+ *     """Return a flattened index for a cell
+ * 
+ */
+
+static CYTHON_INLINE long __pyx_f_5pysph_4base_9nnps_base_flatten(struct __pyx_t_5pysph_4base_5point_cIntPoint __pyx_v_cid, struct __pyx_obj_7cyarray_6carray_IntArray *__pyx_v_ncells_per_dim, int __pyx_v_dim) {
+  long __pyx_r;
+
+  /* "pysph/base/nnps_base.pxd":107
+ * 
+ *     """
+ *     return flatten_raw(cid.x, cid.y, cid.z, ncells_per_dim.data, dim)             # <<<<<<<<<<<<<<
+ * 
+ * @cython.boundscheck(False)
+ */
+  __pyx_r = __pyx_f_5pysph_4base_9nnps_base_flatten_raw(__pyx_v_cid.x, __pyx_v_cid.y, __pyx_v_cid.z, __pyx_v_ncells_per_dim->data, __pyx_v_dim);
+  goto __pyx_L0;
+
+  /* "pysph/base/nnps_base.pxd":99
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long flatten(cIntPoint cid, IntArray ncells_per_dim, int dim) nogil:             # <<<<<<<<<<<<<<
+ *     """Return a flattened index for a cell
+ * 
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+
+/* "pysph/base/nnps_base.pxd":111
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long get_valid_cell_index(int cid_x, int cid_y, int cid_z,             # <<<<<<<<<<<<<<
+ *         int* ncells_per_dim, int dim, int n_cells) nogil:
+ *     """Return the flattened index for a valid cell"""
+ */
+
+static CYTHON_INLINE long __pyx_f_5pysph_4base_9nnps_base_get_valid_cell_index(int __pyx_v_cid_x, int __pyx_v_cid_y, int __pyx_v_cid_z, int *__pyx_v_ncells_per_dim, int __pyx_v_dim, int __pyx_v_n_cells) {
+  long __pyx_v_ncx;
+  long __pyx_v_ncy;
+  long __pyx_v_ncz;
+  long __pyx_v_cell_index;
+  int __pyx_v_is_valid;
+  long __pyx_r;
+  int __pyx_t_1;
+  int __pyx_t_2;
+  int __pyx_t_3;
+
+  /* "pysph/base/nnps_base.pxd":114
+ *         int* ncells_per_dim, int dim, int n_cells) nogil:
+ *     """Return the flattened index for a valid cell"""
+ *     cdef long ncx = ncells_per_dim[0]             # <<<<<<<<<<<<<<
+ *     cdef long ncy = ncells_per_dim[1]
+ *     cdef long ncz = ncells_per_dim[2]
+ */
+  __pyx_v_ncx = (__pyx_v_ncells_per_dim[0]);
+
+  /* "pysph/base/nnps_base.pxd":115
+ *     """Return the flattened index for a valid cell"""
+ *     cdef long ncx = ncells_per_dim[0]
+ *     cdef long ncy = ncells_per_dim[1]             # <<<<<<<<<<<<<<
+ *     cdef long ncz = ncells_per_dim[2]
+ * 
+ */
+  __pyx_v_ncy = (__pyx_v_ncells_per_dim[1]);
+
+  /* "pysph/base/nnps_base.pxd":116
+ *     cdef long ncx = ncells_per_dim[0]
+ *     cdef long ncy = ncells_per_dim[1]
+ *     cdef long ncz = ncells_per_dim[2]             # <<<<<<<<<<<<<<
+ * 
+ *     cdef long cell_index = -1
+ */
+  __pyx_v_ncz = (__pyx_v_ncells_per_dim[2]);
+
+  /* "pysph/base/nnps_base.pxd":118
+ *     cdef long ncz = ncells_per_dim[2]
+ * 
+ *     cdef long cell_index = -1             # <<<<<<<<<<<<<<
+ * 
+ *     # basic test for valid indices. Since we bin the particles with
+ */
+  __pyx_v_cell_index = -1L;
+
+  /* "pysph/base/nnps_base.pxd":123
+ *     # respect to the origin, negative indices can never occur.
+ *     cdef bint is_valid = (
+ *         (ncx > cid_x > -1) and (ncy > cid_y > -1) and (ncz > cid_z > -1)             # <<<<<<<<<<<<<<
+ *     )
+ * 
+ */
+  __pyx_t_2 = (__pyx_v_ncx > __pyx_v_cid_x);
+  if (__pyx_t_2) {
+    __pyx_t_2 = (__pyx_v_cid_x > -1L);
+  }
+  __pyx_t_3 = (__pyx_t_2 != 0);
+  if (__pyx_t_3) {
+  } else {
+    __pyx_t_1 = __pyx_t_3;
+    goto __pyx_L3_bool_binop_done;
+  }
+  __pyx_t_3 = (__pyx_v_ncy > __pyx_v_cid_y);
+  if (__pyx_t_3) {
+    __pyx_t_3 = (__pyx_v_cid_y > -1L);
+  }
+  __pyx_t_2 = (__pyx_t_3 != 0);
+  if (__pyx_t_2) {
+  } else {
+    __pyx_t_1 = __pyx_t_2;
+    goto __pyx_L3_bool_binop_done;
+  }
+  __pyx_t_2 = (__pyx_v_ncz > __pyx_v_cid_z);
+  if (__pyx_t_2) {
+    __pyx_t_2 = (__pyx_v_cid_z > -1L);
+  }
+  __pyx_t_3 = (__pyx_t_2 != 0);
+  __pyx_t_1 = __pyx_t_3;
+  __pyx_L3_bool_binop_done:;
+  __pyx_v_is_valid = __pyx_t_1;
+
+  /* "pysph/base/nnps_base.pxd":127
+ * 
+ *     # Given the validity of the cells, return the flattened cell index
+ *     if is_valid:             # <<<<<<<<<<<<<<
+ *         cell_index = flatten_raw(cid_x, cid_y, cid_z, ncells_per_dim, dim)
+ * 
+ */
+  __pyx_t_1 = (__pyx_v_is_valid != 0);
+  if (__pyx_t_1) {
+
+    /* "pysph/base/nnps_base.pxd":128
+ *     # Given the validity of the cells, return the flattened cell index
+ *     if is_valid:
+ *         cell_index = flatten_raw(cid_x, cid_y, cid_z, ncells_per_dim, dim)             # <<<<<<<<<<<<<<
+ * 
+ *         if not (-1 < cell_index < n_cells):
+ */
+    __pyx_v_cell_index = __pyx_f_5pysph_4base_9nnps_base_flatten_raw(__pyx_v_cid_x, __pyx_v_cid_y, __pyx_v_cid_z, __pyx_v_ncells_per_dim, __pyx_v_dim);
+
+    /* "pysph/base/nnps_base.pxd":130
+ *         cell_index = flatten_raw(cid_x, cid_y, cid_z, ncells_per_dim, dim)
+ * 
+ *         if not (-1 < cell_index < n_cells):             # <<<<<<<<<<<<<<
+ *             cell_index = -1
+ * 
+ */
+    __pyx_t_1 = (-1L < __pyx_v_cell_index);
+    if (__pyx_t_1) {
+      __pyx_t_1 = (__pyx_v_cell_index < __pyx_v_n_cells);
+    }
+    __pyx_t_3 = ((!(__pyx_t_1 != 0)) != 0);
+    if (__pyx_t_3) {
+
+      /* "pysph/base/nnps_base.pxd":131
+ * 
+ *         if not (-1 < cell_index < n_cells):
+ *             cell_index = -1             # <<<<<<<<<<<<<<
+ * 
+ *     return cell_index
+ */
+      __pyx_v_cell_index = -1L;
+
+      /* "pysph/base/nnps_base.pxd":130
+ *         cell_index = flatten_raw(cid_x, cid_y, cid_z, ncells_per_dim, dim)
+ * 
+ *         if not (-1 < cell_index < n_cells):             # <<<<<<<<<<<<<<
+ *             cell_index = -1
+ * 
+ */
+    }
+
+    /* "pysph/base/nnps_base.pxd":127
+ * 
+ *     # Given the validity of the cells, return the flattened cell index
+ *     if is_valid:             # <<<<<<<<<<<<<<
+ *         cell_index = flatten_raw(cid_x, cid_y, cid_z, ncells_per_dim, dim)
+ * 
+ */
+  }
+
+  /* "pysph/base/nnps_base.pxd":133
+ *             cell_index = -1
+ * 
+ *     return cell_index             # <<<<<<<<<<<<<<
+ * 
+ * cdef cIntPoint find_cell_id(cPoint pnt, double cell_size)
+ */
+  __pyx_r = __pyx_v_cell_index;
+  goto __pyx_L0;
+
+  /* "pysph/base/nnps_base.pxd":111
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long get_valid_cell_index(int cid_x, int cid_y, int cid_z,             # <<<<<<<<<<<<<<
+ *         int* ncells_per_dim, int dim, int n_cells) nogil:
+ *     """Return the flattened index for a valid cell"""
+ */
+
+  /* function exit code */
+  __pyx_L0:;
+  return __pyx_r;
+}
+static struct __pyx_vtabstruct_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS;
+
+static PyObject *__pyx_tp_new_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS(PyTypeObject *t, PyObject *a, PyObject *k) {
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *p;
+  PyObject *o = __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_new(t, a, k);
+  if (unlikely(!o)) return 0;
+  p = ((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)o);
+  p->__pyx_base.__pyx_base.__pyx_vtab = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase*)__pyx_vtabptr_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS;
+  p->src = ((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *)Py_None); Py_INCREF(Py_None);
+  p->dst = ((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *)Py_None); Py_INCREF(Py_None);
+  p->pids = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  p->pid_keys = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  p->cids = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  p->cid_to_idx = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  p->max_cid = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  p->dst_to_src = Py_None; Py_INCREF(Py_None);
+  p->overflow_cid_to_idx = Py_None; Py_INCREF(Py_None);
+  p->curr_cid = Py_None; Py_INCREF(Py_None);
+  p->max_cid_src = Py_None; Py_INCREF(Py_None);
+  p->helper = Py_None; Py_INCREF(Py_None);
+  p->radix_sort = Py_None; Py_INCREF(Py_None);
+  p->make_vec = Py_None; Py_INCREF(Py_None);
+  p->neighbor_cid_counts = Py_None; Py_INCREF(Py_None);
+  p->neighbor_cids = Py_None; Py_INCREF(Py_None);
+  p->octrees = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  p->leaf_size = Py_None; Py_INCREF(Py_None);
+  return o;
+}
+
+static void __pyx_tp_dealloc_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS(PyObject *o) {
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *p = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)o;
+  #if CYTHON_USE_TP_FINALIZE
+  if (unlikely(PyType_HasFeature(Py_TYPE(o), Py_TPFLAGS_HAVE_FINALIZE) && Py_TYPE(o)->tp_finalize) && !__Pyx_PyObject_GC_IsFinalized(o)) {
+    if (PyObject_CallFinalizerFromDealloc(o)) return;
+  }
+  #endif
+  PyObject_GC_UnTrack(o);
+  Py_CLEAR(p->src);
+  Py_CLEAR(p->dst);
+  Py_CLEAR(p->pids);
+  Py_CLEAR(p->pid_keys);
+  Py_CLEAR(p->cids);
+  Py_CLEAR(p->cid_to_idx);
+  Py_CLEAR(p->max_cid);
+  Py_CLEAR(p->dst_to_src);
+  Py_CLEAR(p->overflow_cid_to_idx);
+  Py_CLEAR(p->curr_cid);
+  Py_CLEAR(p->max_cid_src);
+  Py_CLEAR(p->helper);
+  Py_CLEAR(p->radix_sort);
+  Py_CLEAR(p->make_vec);
+  Py_CLEAR(p->neighbor_cid_counts);
+  Py_CLEAR(p->neighbor_cids);
+  Py_CLEAR(p->octrees);
+  Py_CLEAR(p->leaf_size);
+  PyObject_GC_Track(o);
+  if (likely(__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS)) __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_dealloc(o); else __Pyx_call_next_tp_dealloc(o, __pyx_tp_dealloc_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS);
+}
+
+static int __pyx_tp_traverse_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS(PyObject *o, visitproc v, void *a) {
+  int e;
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *p = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)o;
+  e = ((likely(__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS)) ? ((__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_traverse) ? __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_traverse(o, v, a) : 0) : __Pyx_call_next_tp_traverse(o, v, a, __pyx_tp_traverse_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS)); if (e) return e;
+  if (p->src) {
+    e = (*v)(((PyObject *)p->src), a); if (e) return e;
+  }
+  if (p->dst) {
+    e = (*v)(((PyObject *)p->dst), a); if (e) return e;
+  }
+  if (p->pids) {
+    e = (*v)(p->pids, a); if (e) return e;
+  }
+  if (p->pid_keys) {
+    e = (*v)(p->pid_keys, a); if (e) return e;
+  }
+  if (p->cids) {
+    e = (*v)(p->cids, a); if (e) return e;
+  }
+  if (p->cid_to_idx) {
+    e = (*v)(p->cid_to_idx, a); if (e) return e;
+  }
+  if (p->max_cid) {
+    e = (*v)(p->max_cid, a); if (e) return e;
+  }
+  if (p->dst_to_src) {
+    e = (*v)(p->dst_to_src, a); if (e) return e;
+  }
+  if (p->overflow_cid_to_idx) {
+    e = (*v)(p->overflow_cid_to_idx, a); if (e) return e;
+  }
+  if (p->curr_cid) {
+    e = (*v)(p->curr_cid, a); if (e) return e;
+  }
+  if (p->max_cid_src) {
+    e = (*v)(p->max_cid_src, a); if (e) return e;
+  }
+  if (p->helper) {
+    e = (*v)(p->helper, a); if (e) return e;
+  }
+  if (p->radix_sort) {
+    e = (*v)(p->radix_sort, a); if (e) return e;
+  }
+  if (p->make_vec) {
+    e = (*v)(p->make_vec, a); if (e) return e;
+  }
+  if (p->neighbor_cid_counts) {
+    e = (*v)(p->neighbor_cid_counts, a); if (e) return e;
+  }
+  if (p->neighbor_cids) {
+    e = (*v)(p->neighbor_cids, a); if (e) return e;
+  }
+  if (p->octrees) {
+    e = (*v)(p->octrees, a); if (e) return e;
+  }
+  if (p->leaf_size) {
+    e = (*v)(p->leaf_size, a); if (e) return e;
+  }
+  return 0;
+}
+
+static int __pyx_tp_clear_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS(PyObject *o) {
+  PyObject* tmp;
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *p = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)o;
+  if (likely(__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS)) { if (__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_clear) __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_clear(o); } else __Pyx_call_next_tp_clear(o, __pyx_tp_clear_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS);
+  tmp = ((PyObject*)p->src);
+  p->src = ((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->dst);
+  p->dst = ((struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper *)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->pids);
+  p->pids = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->pid_keys);
+  p->pid_keys = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->cids);
+  p->cids = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->cid_to_idx);
+  p->cid_to_idx = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->max_cid);
+  p->max_cid = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->dst_to_src);
+  p->dst_to_src = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->overflow_cid_to_idx);
+  p->overflow_cid_to_idx = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->curr_cid);
+  p->curr_cid = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->max_cid_src);
+  p->max_cid_src = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->helper);
+  p->helper = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->radix_sort);
+  p->radix_sort = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->make_vec);
+  p->make_vec = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->neighbor_cid_counts);
+  p->neighbor_cid_counts = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->neighbor_cids);
+  p->neighbor_cids = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->octrees);
+  p->octrees = ((PyObject*)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  tmp = ((PyObject*)p->leaf_size);
+  p->leaf_size = Py_None; Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  return 0;
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pids(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pids(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4pids_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pid_keys(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pid_keys(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8pid_keys_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cids(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cids(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4cids_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cid_to_idx(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cid_to_idx(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10cid_to_idx_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_max_cid(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_max_cid(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7max_cid_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_dst_to_src(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_dst_to_src(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10dst_to_src_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_allow_sort(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_allow_sort(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10allow_sort_3__set__(o, v);
+  }
+  else {
+    PyErr_SetString(PyExc_NotImplementedError, "__del__");
+    return -1;
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cid_counts(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cid_counts(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_19neighbor_cid_counts_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cids(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cids(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13neighbor_cids_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_octrees(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_octrees(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7octrees_5__del__(o);
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_elementwise(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_elementwise(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15use_elementwise_3__set__(o, v);
+  }
+  else {
+    PyErr_SetString(PyExc_NotImplementedError, "__del__");
+    return -1;
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_partitions(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_partitions(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14use_partitions_3__set__(o, v);
+  }
+  else {
+    PyErr_SetString(PyExc_NotImplementedError, "__del__");
+    return -1;
+  }
+}
+
+static PyObject *__pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_leaf_size(PyObject *o, CYTHON_UNUSED void *x) {
+  return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_1__get__(o);
+}
+
+static int __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_leaf_size(PyObject *o, PyObject *v, CYTHON_UNUSED void *x) {
+  if (v) {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_3__set__(o, v);
+  }
+  else {
+    return __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9leaf_size_5__del__(o);
+  }
+}
+
+static PyMethodDef __pyx_methods_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS[] = {
+  {"_bin", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_3_bin, METH_O, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_2_bin},
+  {"get_spatially_ordered_indices", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_5get_spatially_ordered_indices, METH_O, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_4get_spatially_ordered_indices},
+  {"_refresh", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_7_refresh, METH_NOARGS, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_6_refresh},
+  {"set_context", (PyCFunction)(void*)(PyCFunctionWithKeywords)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_9set_context, METH_VARARGS|METH_KEYWORDS, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_8set_context},
+  {"get_kernel_args", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_11get_kernel_args, METH_O, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_10get_kernel_args},
+  {"__reduce_cython__", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_13__reduce_cython__, METH_NOARGS, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_12__reduce_cython__},
+  {"__setstate_cython__", (PyCFunction)__pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_15__setstate_cython__, METH_O, __pyx_doc_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_14__setstate_cython__},
+  {0, 0, 0, 0}
+};
+
+static struct PyGetSetDef __pyx_getsets_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS[] = {
+  {(char *)"pids", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pids, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pids, (char *)"pids: list", 0},
+  {(char *)"pid_keys", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pid_keys, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_pid_keys, (char *)"pid_keys: list", 0},
+  {(char *)"cids", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cids, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cids, (char *)"cids: list", 0},
+  {(char *)"cid_to_idx", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cid_to_idx, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_cid_to_idx, (char *)"cid_to_idx: list", 0},
+  {(char *)"max_cid", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_max_cid, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_max_cid, (char *)"max_cid: list", 0},
+  {(char *)"dst_to_src", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_dst_to_src, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_dst_to_src, (char *)"dst_to_src: object", 0},
+  {(char *)"allow_sort", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_allow_sort, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_allow_sort, (char *)"allow_sort: 'bool'", 0},
+  {(char *)"neighbor_cid_counts", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cid_counts, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cid_counts, (char *)"neighbor_cid_counts: object", 0},
+  {(char *)"neighbor_cids", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cids, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_neighbor_cids, (char *)"neighbor_cids: object", 0},
+  {(char *)"octrees", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_octrees, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_octrees, (char *)"octrees: list", 0},
+  {(char *)"use_elementwise", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_elementwise, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_elementwise, (char *)"use_elementwise: 'bool'", 0},
+  {(char *)"use_partitions", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_partitions, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_use_partitions, (char *)"use_partitions: 'bool'", 0},
+  {(char *)"leaf_size", __pyx_getprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_leaf_size, __pyx_setprop_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_leaf_size, (char *)"leaf_size: object", 0},
+  {0, 0, 0, 0, 0}
+};
+
+static PyTypeObject __pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS = {
+  PyVarObject_HEAD_INIT(0, 0)
+  "pysph.base.octree_gpu_nnps.OctreeGPUNNPS", /*tp_name*/
+  sizeof(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS), /*tp_basicsize*/
+  0, /*tp_itemsize*/
+  __pyx_tp_dealloc_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS, /*tp_dealloc*/
+  #if PY_VERSION_HEX < 0x030800b4
+  0, /*tp_print*/
+  #endif
+  #if PY_VERSION_HEX >= 0x030800b4
+  0, /*tp_vectorcall_offset*/
+  #endif
+  0, /*tp_getattr*/
+  0, /*tp_setattr*/
+  #if PY_MAJOR_VERSION < 3
+  0, /*tp_compare*/
+  #endif
+  #if PY_MAJOR_VERSION >= 3
+  0, /*tp_as_async*/
+  #endif
+  0, /*tp_repr*/
+  0, /*tp_as_number*/
+  0, /*tp_as_sequence*/
+  0, /*tp_as_mapping*/
+  0, /*tp_hash*/
+  0, /*tp_call*/
+  0, /*tp_str*/
+  0, /*tp_getattro*/
+  0, /*tp_setattro*/
+  0, /*tp_as_buffer*/
+  Py_TPFLAGS_DEFAULT|Py_TPFLAGS_HAVE_VERSION_TAG|Py_TPFLAGS_CHECKTYPES|Py_TPFLAGS_HAVE_NEWBUFFER|Py_TPFLAGS_BASETYPE|Py_TPFLAGS_HAVE_GC, /*tp_flags*/
+  "OctreeGPUNNPS(int dim, list particles, double radius_scale=2.0, int ghost_layers=1, domain=None, bool fixed_h=False, bool cache=True, bool sort_gids=False, allow_sort=False, leaf_size=32, bool use_elementwise=False, bool use_partitions=False, backend=None)", /*tp_doc*/
+  __pyx_tp_traverse_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS, /*tp_traverse*/
+  __pyx_tp_clear_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS, /*tp_clear*/
+  0, /*tp_richcompare*/
+  0, /*tp_weaklistoffset*/
+  0, /*tp_iter*/
+  0, /*tp_iternext*/
+  __pyx_methods_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS, /*tp_methods*/
+  0, /*tp_members*/
+  __pyx_getsets_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS, /*tp_getset*/
+  0, /*tp_base*/
+  0, /*tp_dict*/
+  0, /*tp_descr_get*/
+  0, /*tp_descr_set*/
+  0, /*tp_dictoffset*/
+  __pyx_pw_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_1__init__, /*tp_init*/
+  0, /*tp_alloc*/
+  __pyx_tp_new_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS, /*tp_new*/
+  0, /*tp_free*/
+  0, /*tp_is_gc*/
+  0, /*tp_bases*/
+  0, /*tp_mro*/
+  0, /*tp_cache*/
+  0, /*tp_subclasses*/
+  0, /*tp_weaklist*/
+  0, /*tp_del*/
+  0, /*tp_version_tag*/
+  #if PY_VERSION_HEX >= 0x030400a1
+  0, /*tp_finalize*/
+  #endif
+  #if PY_VERSION_HEX >= 0x030800b1 && (!CYTHON_COMPILING_IN_PYPY || PYPY_VERSION_NUM >= 0x07030800)
+  0, /*tp_vectorcall*/
+  #endif
+  #if PY_VERSION_HEX >= 0x030800b4 && PY_VERSION_HEX < 0x03090000
+  0, /*tp_print*/
+  #endif
+  #if CYTHON_COMPILING_IN_PYPY && PY_VERSION_HEX >= 0x03090000 && PY_VERSION_HEX < 0x030a0000
+  0, /*tp_pypy_flags*/
+  #endif
+};
+
+static struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *__pyx_freelist_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices[8];
+static int __pyx_freecount_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices = 0;
+
+static PyObject *__pyx_tp_new_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices(PyTypeObject *t, CYTHON_UNUSED PyObject *a, CYTHON_UNUSED PyObject *k) {
+  PyObject *o;
+  if (CYTHON_COMPILING_IN_CPYTHON && likely((__pyx_freecount_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices > 0) & (t->tp_basicsize == sizeof(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices)))) {
+    o = (PyObject*)__pyx_freelist_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices[--__pyx_freecount_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices];
+    memset(o, 0, sizeof(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices));
+    (void) PyObject_INIT(o, t);
+    PyObject_GC_Track(o);
+  } else {
+    o = (*t->tp_alloc)(t, 0);
+    if (unlikely(!o)) return 0;
+  }
+  return o;
+}
+
+static void __pyx_tp_dealloc_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices(PyObject *o) {
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *p = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *)o;
+  PyObject_GC_UnTrack(o);
+  Py_CLEAR(p->__pyx_v_self);
+  if (CYTHON_COMPILING_IN_CPYTHON && ((__pyx_freecount_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices < 8) & (Py_TYPE(o)->tp_basicsize == sizeof(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices)))) {
+    __pyx_freelist_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices[__pyx_freecount_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices++] = ((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *)o);
+  } else {
+    (*Py_TYPE(o)->tp_free)(o);
+  }
+}
+
+static int __pyx_tp_traverse_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices(PyObject *o, visitproc v, void *a) {
+  int e;
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *p = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *)o;
+  if (p->__pyx_v_self) {
+    e = (*v)(((PyObject *)p->__pyx_v_self), a); if (e) return e;
+  }
+  return 0;
+}
+
+static int __pyx_tp_clear_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices(PyObject *o) {
+  PyObject* tmp;
+  struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *p = (struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices *)o;
+  tmp = ((PyObject*)p->__pyx_v_self);
+  p->__pyx_v_self = ((struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *)Py_None); Py_INCREF(Py_None);
+  Py_XDECREF(tmp);
+  return 0;
+}
+
+static PyTypeObject __pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices = {
+  PyVarObject_HEAD_INIT(0, 0)
+  "pysph.base.octree_gpu_nnps.__pyx_scope_struct__get_spatially_ordered_indices", /*tp_name*/
+  sizeof(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices), /*tp_basicsize*/
+  0, /*tp_itemsize*/
+  __pyx_tp_dealloc_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices, /*tp_dealloc*/
+  #if PY_VERSION_HEX < 0x030800b4
+  0, /*tp_print*/
+  #endif
+  #if PY_VERSION_HEX >= 0x030800b4
+  0, /*tp_vectorcall_offset*/
+  #endif
+  0, /*tp_getattr*/
+  0, /*tp_setattr*/
+  #if PY_MAJOR_VERSION < 3
+  0, /*tp_compare*/
+  #endif
+  #if PY_MAJOR_VERSION >= 3
+  0, /*tp_as_async*/
+  #endif
+  0, /*tp_repr*/
+  0, /*tp_as_number*/
+  0, /*tp_as_sequence*/
+  0, /*tp_as_mapping*/
+  0, /*tp_hash*/
+  0, /*tp_call*/
+  0, /*tp_str*/
+  0, /*tp_getattro*/
+  0, /*tp_setattro*/
+  0, /*tp_as_buffer*/
+  Py_TPFLAGS_DEFAULT|Py_TPFLAGS_HAVE_VERSION_TAG|Py_TPFLAGS_CHECKTYPES|Py_TPFLAGS_HAVE_NEWBUFFER|Py_TPFLAGS_HAVE_GC, /*tp_flags*/
+  0, /*tp_doc*/
+  __pyx_tp_traverse_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices, /*tp_traverse*/
+  __pyx_tp_clear_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices, /*tp_clear*/
+  0, /*tp_richcompare*/
+  0, /*tp_weaklistoffset*/
+  0, /*tp_iter*/
+  0, /*tp_iternext*/
+  0, /*tp_methods*/
+  0, /*tp_members*/
+  0, /*tp_getset*/
+  0, /*tp_base*/
+  0, /*tp_dict*/
+  0, /*tp_descr_get*/
+  0, /*tp_descr_set*/
+  0, /*tp_dictoffset*/
+  0, /*tp_init*/
+  0, /*tp_alloc*/
+  __pyx_tp_new_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices, /*tp_new*/
+  0, /*tp_free*/
+  0, /*tp_is_gc*/
+  0, /*tp_bases*/
+  0, /*tp_mro*/
+  0, /*tp_cache*/
+  0, /*tp_subclasses*/
+  0, /*tp_weaklist*/
+  0, /*tp_del*/
+  0, /*tp_version_tag*/
+  #if PY_VERSION_HEX >= 0x030400a1
+  0, /*tp_finalize*/
+  #endif
+  #if PY_VERSION_HEX >= 0x030800b1 && (!CYTHON_COMPILING_IN_PYPY || PYPY_VERSION_NUM >= 0x07030800)
+  0, /*tp_vectorcall*/
+  #endif
+  #if PY_VERSION_HEX >= 0x030800b4 && PY_VERSION_HEX < 0x03090000
+  0, /*tp_print*/
+  #endif
+  #if CYTHON_COMPILING_IN_PYPY && PY_VERSION_HEX >= 0x03090000 && PY_VERSION_HEX < 0x030a0000
+  0, /*tp_pypy_flags*/
+  #endif
+};
+
+static PyMethodDef __pyx_methods[] = {
+  {0, 0, 0, 0}
+};
+
+#if PY_MAJOR_VERSION >= 3
+#if CYTHON_PEP489_MULTI_PHASE_INIT
+static PyObject* __pyx_pymod_create(PyObject *spec, PyModuleDef *def); /*proto*/
+static int __pyx_pymod_exec_octree_gpu_nnps(PyObject* module); /*proto*/
+static PyModuleDef_Slot __pyx_moduledef_slots[] = {
+  {Py_mod_create, (void*)__pyx_pymod_create},
+  {Py_mod_exec, (void*)__pyx_pymod_exec_octree_gpu_nnps},
+  {0, NULL}
+};
+#endif
+
+static struct PyModuleDef __pyx_moduledef = {
+    PyModuleDef_HEAD_INIT,
+    "octree_gpu_nnps",
+    0, /* m_doc */
+  #if CYTHON_PEP489_MULTI_PHASE_INIT
+    0, /* m_size */
+  #else
+    -1, /* m_size */
+  #endif
+    __pyx_methods /* m_methods */,
+  #if CYTHON_PEP489_MULTI_PHASE_INIT
+    __pyx_moduledef_slots, /* m_slots */
+  #else
+    NULL, /* m_reload */
+  #endif
+    NULL, /* m_traverse */
+    NULL, /* m_clear */
+    NULL /* m_free */
+};
+#endif
+#ifndef CYTHON_SMALL_CODE
+#if defined(__clang__)
+    #define CYTHON_SMALL_CODE
+#elif defined(__GNUC__) && (__GNUC__ > 4 || (__GNUC__ == 4 && __GNUC_MINOR__ >= 3))
+    #define CYTHON_SMALL_CODE __attribute__((cold))
+#else
+    #define CYTHON_SMALL_CODE
+#endif
+#endif
+
+static __Pyx_StringTabEntry __pyx_string_tab[] = {
+  {&__pyx_n_s_ImportError, __pyx_k_ImportError, sizeof(__pyx_k_ImportError), 0, 0, 1, 1},
+  {&__pyx_kp_s_Incompatible_checksums_0x_x_vs_0, __pyx_k_Incompatible_checksums_0x_x_vs_0, sizeof(__pyx_k_Incompatible_checksums_0x_x_vs_0), 0, 0, 1, 0},
+  {&__pyx_n_s_OctreeGPUNNPS, __pyx_k_OctreeGPUNNPS, sizeof(__pyx_k_OctreeGPUNNPS), 0, 0, 1, 1},
+  {&__pyx_kp_u_Octree_NNPS_by_default_uses_sing, __pyx_k_Octree_NNPS_by_default_uses_sing, sizeof(__pyx_k_Octree_NNPS_by_default_uses_sing), 0, 1, 0, 0},
+  {&__pyx_kp_u_Octree_NNPS_with_given_leaf_size, __pyx_k_Octree_NNPS_with_given_leaf_size, sizeof(__pyx_k_Octree_NNPS_with_given_leaf_size), 0, 1, 0, 0},
+  {&__pyx_n_s_PickleError, __pyx_k_PickleError, sizeof(__pyx_k_PickleError), 0, 0, 1, 1},
+  {&__pyx_n_s_PointTree, __pyx_k_PointTree, sizeof(__pyx_k_PointTree), 0, 0, 1, 1},
+  {&__pyx_n_s_allow_sort, __pyx_k_allow_sort, sizeof(__pyx_k_allow_sort), 0, 0, 1, 1},
+  {&__pyx_n_s_backend, __pyx_k_backend, sizeof(__pyx_k_backend), 0, 0, 1, 1},
+  {&__pyx_n_s_bin, __pyx_k_bin, sizeof(__pyx_k_bin), 0, 0, 1, 1},
+  {&__pyx_n_s_cache, __pyx_k_cache, sizeof(__pyx_k_cache), 0, 0, 1, 1},
+  {&__pyx_n_s_cids, __pyx_k_cids, sizeof(__pyx_k_cids), 0, 0, 1, 1},
+  {&__pyx_n_s_cline_in_traceback, __pyx_k_cline_in_traceback, sizeof(__pyx_k_cline_in_traceback), 0, 0, 1, 1},
+  {&__pyx_n_s_data, __pyx_k_data, sizeof(__pyx_k_data), 0, 0, 1, 1},
+  {&__pyx_n_s_dev, __pyx_k_dev, sizeof(__pyx_k_dev), 0, 0, 1, 1},
+  {&__pyx_n_s_dict, __pyx_k_dict, sizeof(__pyx_k_dict), 0, 0, 1, 1},
+  {&__pyx_n_s_dim, __pyx_k_dim, sizeof(__pyx_k_dim), 0, 0, 1, 1},
+  {&__pyx_n_s_domain, __pyx_k_domain, sizeof(__pyx_k_domain), 0, 0, 1, 1},
+  {&__pyx_n_s_dst_index, __pyx_k_dst_index, sizeof(__pyx_k_dst_index), 0, 0, 1, 1},
+  {&__pyx_n_s_find_neighbor_cids, __pyx_k_find_neighbor_cids, sizeof(__pyx_k_find_neighbor_cids), 0, 0, 1, 1},
+  {&__pyx_n_s_find_neighbor_lengths, __pyx_k_find_neighbor_lengths, sizeof(__pyx_k_find_neighbor_lengths), 0, 0, 1, 1},
+  {&__pyx_n_s_find_neighbor_lengths_elementwis, __pyx_k_find_neighbor_lengths_elementwis, sizeof(__pyx_k_find_neighbor_lengths_elementwis), 0, 0, 1, 1},
+  {&__pyx_n_s_find_neighbors, __pyx_k_find_neighbors, sizeof(__pyx_k_find_neighbors), 0, 0, 1, 1},
+  {&__pyx_n_s_find_neighbors_elementwise, __pyx_k_find_neighbors_elementwise, sizeof(__pyx_k_find_neighbors_elementwise), 0, 0, 1, 1},
+  {&__pyx_n_s_fixed_h, __pyx_k_fixed_h, sizeof(__pyx_k_fixed_h), 0, 0, 1, 1},
+  {&__pyx_n_s_float32, __pyx_k_float32, sizeof(__pyx_k_float32), 0, 0, 1, 1},
+  {&__pyx_n_s_get_kernel_args, __pyx_k_get_kernel_args, sizeof(__pyx_k_get_kernel_args), 0, 0, 1, 1},
+  {&__pyx_n_s_get_spatially_ordered_indices_lo, __pyx_k_get_spatially_ordered_indices_lo, sizeof(__pyx_k_get_spatially_ordered_indices_lo), 0, 0, 1, 1},
+  {&__pyx_n_s_getstate, __pyx_k_getstate, sizeof(__pyx_k_getstate), 0, 0, 1, 1},
+  {&__pyx_n_s_ghost_layers, __pyx_k_ghost_layers, sizeof(__pyx_k_ghost_layers), 0, 0, 1, 1},
+  {&__pyx_n_s_gpu, __pyx_k_gpu, sizeof(__pyx_k_gpu), 0, 0, 1, 1},
+  {&__pyx_n_s_h, __pyx_k_h, sizeof(__pyx_k_h), 0, 0, 1, 1},
+  {&__pyx_n_s_hmin, __pyx_k_hmin, sizeof(__pyx_k_hmin), 0, 0, 1, 1},
+  {&__pyx_n_s_import, __pyx_k_import, sizeof(__pyx_k_import), 0, 0, 1, 1},
+  {&__pyx_n_s_init, __pyx_k_init, sizeof(__pyx_k_init), 0, 0, 1, 1},
+  {&__pyx_n_s_is_valid_nnps_wgs, __pyx_k_is_valid_nnps_wgs, sizeof(__pyx_k_is_valid_nnps_wgs), 0, 0, 1, 1},
+  {&__pyx_n_s_leaf_size, __pyx_k_leaf_size, sizeof(__pyx_k_leaf_size), 0, 0, 1, 1},
+  {&__pyx_n_s_main, __pyx_k_main, sizeof(__pyx_k_main), 0, 0, 1, 1},
+  {&__pyx_n_s_name, __pyx_k_name, sizeof(__pyx_k_name), 0, 0, 1, 1},
+  {&__pyx_n_s_new, __pyx_k_new, sizeof(__pyx_k_new), 0, 0, 1, 1},
+  {&__pyx_n_s_np, __pyx_k_np, sizeof(__pyx_k_np), 0, 0, 1, 1},
+  {&__pyx_n_s_numpy, __pyx_k_numpy, sizeof(__pyx_k_numpy), 0, 0, 1, 1},
+  {&__pyx_kp_u_numpy_core_multiarray_failed_to, __pyx_k_numpy_core_multiarray_failed_to, sizeof(__pyx_k_numpy_core_multiarray_failed_to), 0, 1, 0, 0},
+  {&__pyx_kp_u_numpy_core_umath_failed_to_impor, __pyx_k_numpy_core_umath_failed_to_impor, sizeof(__pyx_k_numpy_core_umath_failed_to_impor), 0, 1, 0, 0},
+  {&__pyx_n_s_pa, __pyx_k_pa, sizeof(__pyx_k_pa), 0, 0, 1, 1},
+  {&__pyx_n_s_particles, __pyx_k_particles, sizeof(__pyx_k_particles), 0, 0, 1, 1},
+  {&__pyx_n_s_pbounds, __pyx_k_pbounds, sizeof(__pyx_k_pbounds), 0, 0, 1, 1},
+  {&__pyx_n_s_pickle, __pyx_k_pickle, sizeof(__pyx_k_pickle), 0, 0, 1, 1},
+  {&__pyx_n_s_pids, __pyx_k_pids, sizeof(__pyx_k_pids), 0, 0, 1, 1},
+  {&__pyx_n_s_pysph_base_octree_gpu_nnps, __pyx_k_pysph_base_octree_gpu_nnps, sizeof(__pyx_k_pysph_base_octree_gpu_nnps), 0, 0, 1, 1},
+  {&__pyx_kp_s_pysph_base_octree_gpu_nnps_pyx, __pyx_k_pysph_base_octree_gpu_nnps_pyx, sizeof(__pyx_k_pysph_base_octree_gpu_nnps_pyx), 0, 0, 1, 0},
+  {&__pyx_n_s_pysph_base_tree_point_tree, __pyx_k_pysph_base_tree_point_tree, sizeof(__pyx_k_pysph_base_tree_point_tree), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_PickleError, __pyx_k_pyx_PickleError, sizeof(__pyx_k_pyx_PickleError), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_checksum, __pyx_k_pyx_checksum, sizeof(__pyx_k_pyx_checksum), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_result, __pyx_k_pyx_result, sizeof(__pyx_k_pyx_result), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_state, __pyx_k_pyx_state, sizeof(__pyx_k_pyx_state), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_type, __pyx_k_pyx_type, sizeof(__pyx_k_pyx_type), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_unpickle_OctreeGPUNNPS, __pyx_k_pyx_unpickle_OctreeGPUNNPS, sizeof(__pyx_k_pyx_unpickle_OctreeGPUNNPS), 0, 0, 1, 1},
+  {&__pyx_n_s_pyx_vtable, __pyx_k_pyx_vtable, sizeof(__pyx_k_pyx_vtable), 0, 0, 1, 1},
+  {&__pyx_n_s_radius_scale, __pyx_k_radius_scale, sizeof(__pyx_k_radius_scale), 0, 0, 1, 1},
+  {&__pyx_n_s_range, __pyx_k_range, sizeof(__pyx_k_range), 0, 0, 1, 1},
+  {&__pyx_n_s_reduce, __pyx_k_reduce, sizeof(__pyx_k_reduce), 0, 0, 1, 1},
+  {&__pyx_n_s_reduce_cython, __pyx_k_reduce_cython, sizeof(__pyx_k_reduce_cython), 0, 0, 1, 1},
+  {&__pyx_n_s_reduce_ex, __pyx_k_reduce_ex, sizeof(__pyx_k_reduce_ex), 0, 0, 1, 1},
+  {&__pyx_n_s_refresh, __pyx_k_refresh, sizeof(__pyx_k_refresh), 0, 0, 1, 1},
+  {&__pyx_n_s_refresh_2, __pyx_k_refresh_2, sizeof(__pyx_k_refresh_2), 0, 0, 1, 1},
+  {&__pyx_n_s_set_context, __pyx_k_set_context, sizeof(__pyx_k_set_context), 0, 0, 1, 1},
+  {&__pyx_n_s_set_node_bounds, __pyx_k_set_node_bounds, sizeof(__pyx_k_set_node_bounds), 0, 0, 1, 1},
+  {&__pyx_n_s_setstate, __pyx_k_setstate, sizeof(__pyx_k_setstate), 0, 0, 1, 1},
+  {&__pyx_n_s_setstate_cython, __pyx_k_setstate_cython, sizeof(__pyx_k_setstate_cython), 0, 0, 1, 1},
+  {&__pyx_n_s_sort, __pyx_k_sort, sizeof(__pyx_k_sort), 0, 0, 1, 1},
+  {&__pyx_n_s_sort_gids, __pyx_k_sort_gids, sizeof(__pyx_k_sort_gids), 0, 0, 1, 1},
+  {&__pyx_n_s_src_index, __pyx_k_src_index, sizeof(__pyx_k_src_index), 0, 0, 1, 1},
+  {&__pyx_kp_s_stringsource, __pyx_k_stringsource, sizeof(__pyx_k_stringsource), 0, 0, 1, 0},
+  {&__pyx_n_s_test, __pyx_k_test, sizeof(__pyx_k_test), 0, 0, 1, 1},
+  {&__pyx_n_s_unique_cid_count, __pyx_k_unique_cid_count, sizeof(__pyx_k_unique_cid_count), 0, 0, 1, 1},
+  {&__pyx_n_s_unique_cids, __pyx_k_unique_cids, sizeof(__pyx_k_unique_cids), 0, 0, 1, 1},
+  {&__pyx_n_s_update, __pyx_k_update, sizeof(__pyx_k_update), 0, 0, 1, 1},
+  {&__pyx_n_s_use_double, __pyx_k_use_double, sizeof(__pyx_k_use_double), 0, 0, 1, 1},
+  {&__pyx_n_s_use_elementwise, __pyx_k_use_elementwise, sizeof(__pyx_k_use_elementwise), 0, 0, 1, 1},
+  {&__pyx_n_s_use_partitions, __pyx_k_use_partitions, sizeof(__pyx_k_use_partitions), 0, 0, 1, 1},
+  {&__pyx_n_s_warn, __pyx_k_warn, sizeof(__pyx_k_warn), 0, 0, 1, 1},
+  {&__pyx_n_s_warnings, __pyx_k_warnings, sizeof(__pyx_k_warnings), 0, 0, 1, 1},
+  {&__pyx_n_s_x, __pyx_k_x, sizeof(__pyx_k_x), 0, 0, 1, 1},
+  {&__pyx_n_s_y, __pyx_k_y, sizeof(__pyx_k_y), 0, 0, 1, 1},
+  {&__pyx_n_s_z, __pyx_k_z, sizeof(__pyx_k_z), 0, 0, 1, 1},
+  {0, 0, 0, 0, 0, 0, 0}
+};
+static CYTHON_SMALL_CODE int __Pyx_InitCachedBuiltins(void) {
+  __pyx_builtin_range = __Pyx_GetBuiltinName(__pyx_n_s_range); if (!__pyx_builtin_range) __PYX_ERR(0, 34, __pyx_L1_error)
+  __pyx_builtin_ImportError = __Pyx_GetBuiltinName(__pyx_n_s_ImportError); if (!__pyx_builtin_ImportError) __PYX_ERR(3, 942, __pyx_L1_error)
+  return 0;
+  __pyx_L1_error:;
+  return -1;
+}
+
+static CYTHON_SMALL_CODE int __Pyx_InitCachedConstants(void) {
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__Pyx_InitCachedConstants", 0);
+
+  /* "pysph/base/octree_gpu_nnps.pyx":64
+ * 
+ *     def get_spatially_ordered_indices(self, int pa_index):
+ *         def update():             # <<<<<<<<<<<<<<
+ *             self.octrees[pa_index]._sort()
+ * 
+ */
+  __pyx_codeobj_ = (PyObject*)__Pyx_PyCode_New(0, 0, 0, 0, CO_OPTIMIZED|CO_NEWLOCALS, __pyx_empty_bytes, __pyx_empty_tuple, __pyx_empty_tuple, __pyx_empty_tuple, __pyx_empty_tuple, __pyx_empty_tuple, __pyx_kp_s_pysph_base_octree_gpu_nnps_pyx, __pyx_n_s_update, 64, __pyx_empty_bytes); if (unlikely(!__pyx_codeobj_)) __PYX_ERR(0, 64, __pyx_L1_error)
+
+  /* "(tree fragment)":4
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ *     if __pyx_checksum not in (0x8c26135, 0xd6f865e, 0xdcdb650):             # <<<<<<<<<<<<<<
+ *         from pickle import PickleError as __pyx_PickleError
+ *         raise __pyx_PickleError("Incompatible checksums (0x%x vs (0x8c26135, 0xd6f865e, 0xdcdb650) = (_last_domain_size, allow_sort, backend, cache, cell_shifts, cell_size, cid_to_idx, cids, curr_cid, current_cache, dim, domain, dst, dst_index, dst_src, dst_to_src, dtype, dtype_max, helper, hmin, is_periodic, leaf_size, make_vec, max_cid, max_cid_src, n_cells, n_updates, narrays, neighbor_cid_counts, neighbor_cids, octrees, overflow_cid_to_idx, pa_wrappers, particles, pid_keys, pids, queue, radius_scale, radius_scale2, radix_sort, sort_gids, src, src_index, total_update_time, update_time, use_cache, use_double, use_elementwise, use_partitions, xmax, xmin))" % __pyx_checksum)
+ */
+  __pyx_tuple__2 = PyTuple_Pack(3, __pyx_int_146956597, __pyx_int_225412702, __pyx_int_231585360); if (unlikely(!__pyx_tuple__2)) __PYX_ERR(2, 4, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_tuple__2);
+  __Pyx_GIVEREF(__pyx_tuple__2);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":942
+ *         __pyx_import_array()
+ *     except Exception:
+ *         raise ImportError("numpy.core.multiarray failed to import")             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline int import_umath() except -1:
+ */
+  __pyx_tuple__3 = PyTuple_Pack(1, __pyx_kp_u_numpy_core_multiarray_failed_to); if (unlikely(!__pyx_tuple__3)) __PYX_ERR(3, 942, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_tuple__3);
+  __Pyx_GIVEREF(__pyx_tuple__3);
+
+  /* "../.pyenv/versions/3.10.13/lib/python3.10/site-packages/numpy/__init__.pxd":948
+ *         _import_umath()
+ *     except Exception:
+ *         raise ImportError("numpy.core.umath failed to import")             # <<<<<<<<<<<<<<
+ * 
+ * cdef inline int import_ufunc() except -1:
+ */
+  __pyx_tuple__4 = PyTuple_Pack(1, __pyx_kp_u_numpy_core_umath_failed_to_impor); if (unlikely(!__pyx_tuple__4)) __PYX_ERR(3, 948, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_tuple__4);
+  __Pyx_GIVEREF(__pyx_tuple__4);
+
+  /* "(tree fragment)":1
+ * def __pyx_unpickle_OctreeGPUNNPS(__pyx_type, long __pyx_checksum, __pyx_state):             # <<<<<<<<<<<<<<
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ */
+  __pyx_tuple__5 = PyTuple_Pack(5, __pyx_n_s_pyx_type, __pyx_n_s_pyx_checksum, __pyx_n_s_pyx_state, __pyx_n_s_pyx_PickleError, __pyx_n_s_pyx_result); if (unlikely(!__pyx_tuple__5)) __PYX_ERR(2, 1, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_tuple__5);
+  __Pyx_GIVEREF(__pyx_tuple__5);
+  __pyx_codeobj__6 = (PyObject*)__Pyx_PyCode_New(3, 0, 5, 0, CO_OPTIMIZED|CO_NEWLOCALS, __pyx_empty_bytes, __pyx_empty_tuple, __pyx_empty_tuple, __pyx_tuple__5, __pyx_empty_tuple, __pyx_empty_tuple, __pyx_kp_s_stringsource, __pyx_n_s_pyx_unpickle_OctreeGPUNNPS, 1, __pyx_empty_bytes); if (unlikely(!__pyx_codeobj__6)) __PYX_ERR(2, 1, __pyx_L1_error)
+  __Pyx_RefNannyFinishContext();
+  return 0;
+  __pyx_L1_error:;
+  __Pyx_RefNannyFinishContext();
+  return -1;
+}
+
+static CYTHON_SMALL_CODE int __Pyx_InitGlobals(void) {
+  if (__Pyx_InitStrings(__pyx_string_tab) < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_int_32 = PyInt_FromLong(32); if (unlikely(!__pyx_int_32)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_int_146956597 = PyInt_FromLong(146956597L); if (unlikely(!__pyx_int_146956597)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_int_225412702 = PyInt_FromLong(225412702L); if (unlikely(!__pyx_int_225412702)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_int_231585360 = PyInt_FromLong(231585360L); if (unlikely(!__pyx_int_231585360)) __PYX_ERR(0, 1, __pyx_L1_error)
+  return 0;
+  __pyx_L1_error:;
+  return -1;
+}
+
+static CYTHON_SMALL_CODE int __Pyx_modinit_global_init_code(void); /*proto*/
+static CYTHON_SMALL_CODE int __Pyx_modinit_variable_export_code(void); /*proto*/
+static CYTHON_SMALL_CODE int __Pyx_modinit_function_export_code(void); /*proto*/
+static CYTHON_SMALL_CODE int __Pyx_modinit_type_init_code(void); /*proto*/
+static CYTHON_SMALL_CODE int __Pyx_modinit_type_import_code(void); /*proto*/
+static CYTHON_SMALL_CODE int __Pyx_modinit_variable_import_code(void); /*proto*/
+static CYTHON_SMALL_CODE int __Pyx_modinit_function_import_code(void); /*proto*/
+
+static int __Pyx_modinit_global_init_code(void) {
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__Pyx_modinit_global_init_code", 0);
+  /*--- Global init code ---*/
+  __Pyx_RefNannyFinishContext();
+  return 0;
+}
+
+static int __Pyx_modinit_variable_export_code(void) {
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__Pyx_modinit_variable_export_code", 0);
+  /*--- Variable export code ---*/
+  __Pyx_RefNannyFinishContext();
+  return 0;
+}
+
+static int __Pyx_modinit_function_export_code(void) {
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__Pyx_modinit_function_export_code", 0);
+  /*--- Function export code ---*/
+  __Pyx_RefNannyFinishContext();
+  return 0;
+}
+
+static int __Pyx_modinit_type_init_code(void) {
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__Pyx_modinit_type_init_code", 0);
+  /*--- Type init code ---*/
+  __pyx_t_1 = PyImport_ImportModule("pysph.base.gpu_nnps_base"); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.gpu_nnps_base", "GPUNNPS", sizeof(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNNPS = (struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNNPS*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNNPS)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS = &__pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.__pyx_base = *__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNNPS;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.__pyx_base.__pyx_base.set_context = (PyObject *(*)(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase *, int, int, int __pyx_skip_dispatch))__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_set_context;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.__pyx_base.find_neighbor_lengths = (void (*)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, PyObject *))__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_find_neighbor_lengths;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.__pyx_base.find_nearest_neighbors_gpu = (void (*)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, PyObject *, PyObject *))__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_find_nearest_neighbors_gpu;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.__pyx_base._bin = (PyObject *(*)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int, int __pyx_skip_dispatch))__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__bin;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.__pyx_base._refresh = (PyObject *(*)(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNNPS *, int __pyx_skip_dispatch))__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS__refresh;
+  __pyx_vtable_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.get_kernel_args = (PyObject *(*)(struct __pyx_obj_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS *, PyObject *, int __pyx_skip_dispatch))__pyx_f_5pysph_4base_15octree_gpu_nnps_13OctreeGPUNNPS_get_kernel_args;
+  __pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.tp_base = __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNNPS;
+  if (PyType_Ready(&__pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS) < 0) __PYX_ERR(0, 6, __pyx_L1_error)
+  #if PY_VERSION_HEX < 0x030800B1
+  __pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.tp_print = 0;
+  #endif
+  if ((CYTHON_USE_TYPE_SLOTS && CYTHON_USE_PYTYPE_LOOKUP) && likely(!__pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.tp_dictoffset && __pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.tp_getattro == PyObject_GenericGetAttr)) {
+    __pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.tp_getattro = __Pyx_PyObject_GenericGetAttr;
+  }
+  if (__Pyx_SetVtable(__pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS.tp_dict, __pyx_vtabptr_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS) < 0) __PYX_ERR(0, 6, __pyx_L1_error)
+  if (PyObject_SetAttr(__pyx_m, __pyx_n_s_OctreeGPUNNPS, (PyObject *)&__pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS) < 0) __PYX_ERR(0, 6, __pyx_L1_error)
+  if (__Pyx_setup_reduce((PyObject*)&__pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS) < 0) __PYX_ERR(0, 6, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS = &__pyx_type_5pysph_4base_15octree_gpu_nnps_OctreeGPUNNPS;
+  if (PyType_Ready(&__pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices) < 0) __PYX_ERR(0, 63, __pyx_L1_error)
+  #if PY_VERSION_HEX < 0x030800B1
+  __pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices.tp_print = 0;
+  #endif
+  if ((CYTHON_USE_TYPE_SLOTS && CYTHON_USE_PYTYPE_LOOKUP) && likely(!__pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices.tp_dictoffset && __pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices.tp_getattro == PyObject_GenericGetAttr)) {
+    __pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices.tp_getattro = __Pyx_PyObject_GenericGetAttrNoDict;
+  }
+  __pyx_ptype_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices = &__pyx_type_5pysph_4base_15octree_gpu_nnps___pyx_scope_struct__get_spatially_ordered_indices;
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_RefNannyFinishContext();
+  return 0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_RefNannyFinishContext();
+  return -1;
+}
+
+static int __Pyx_modinit_type_import_code(void) {
+  __Pyx_RefNannyDeclarations
+  PyObject *__pyx_t_1 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannySetupContext("__Pyx_modinit_type_import_code", 0);
+  /*--- Type import code ---*/
+  __pyx_t_1 = PyImport_ImportModule(__Pyx_BUILTIN_MODULE_NAME); if (unlikely(!__pyx_t_1)) __PYX_ERR(5, 9, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_7cpython_4type_type = __Pyx_ImportType_0_29_37(__pyx_t_1, __Pyx_BUILTIN_MODULE_NAME, "type", 
+  #if defined(PYPY_VERSION_NUM) && PYPY_VERSION_NUM < 0x050B0000
+  sizeof(PyTypeObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyTypeObject),
+  #else
+  sizeof(PyHeapTypeObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyHeapTypeObject),
+  #endif
+  __Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cpython_4type_type) __PYX_ERR(5, 9, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyImport_ImportModule("numpy"); if (unlikely(!__pyx_t_1)) __PYX_ERR(3, 199, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_5numpy_dtype = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "dtype", sizeof(PyArray_Descr), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyArray_Descr),__Pyx_ImportType_CheckSize_Ignore_0_29_37); if (!__pyx_ptype_5numpy_dtype) __PYX_ERR(3, 199, __pyx_L1_error)
+  __pyx_ptype_5numpy_flatiter = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "flatiter", sizeof(PyArrayIterObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyArrayIterObject),__Pyx_ImportType_CheckSize_Ignore_0_29_37); if (!__pyx_ptype_5numpy_flatiter) __PYX_ERR(3, 222, __pyx_L1_error)
+  __pyx_ptype_5numpy_broadcast = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "broadcast", sizeof(PyArrayMultiIterObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyArrayMultiIterObject),__Pyx_ImportType_CheckSize_Ignore_0_29_37); if (!__pyx_ptype_5numpy_broadcast) __PYX_ERR(3, 226, __pyx_L1_error)
+  __pyx_ptype_5numpy_ndarray = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "ndarray", sizeof(PyArrayObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyArrayObject),__Pyx_ImportType_CheckSize_Ignore_0_29_37); if (!__pyx_ptype_5numpy_ndarray) __PYX_ERR(3, 238, __pyx_L1_error)
+  __pyx_ptype_5numpy_generic = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "generic", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_generic) __PYX_ERR(3, 767, __pyx_L1_error)
+  __pyx_ptype_5numpy_number = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "number", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_number) __PYX_ERR(3, 769, __pyx_L1_error)
+  __pyx_ptype_5numpy_integer = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "integer", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_integer) __PYX_ERR(3, 771, __pyx_L1_error)
+  __pyx_ptype_5numpy_signedinteger = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "signedinteger", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_signedinteger) __PYX_ERR(3, 773, __pyx_L1_error)
+  __pyx_ptype_5numpy_unsignedinteger = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "unsignedinteger", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_unsignedinteger) __PYX_ERR(3, 775, __pyx_L1_error)
+  __pyx_ptype_5numpy_inexact = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "inexact", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_inexact) __PYX_ERR(3, 777, __pyx_L1_error)
+  __pyx_ptype_5numpy_floating = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "floating", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_floating) __PYX_ERR(3, 779, __pyx_L1_error)
+  __pyx_ptype_5numpy_complexfloating = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "complexfloating", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_complexfloating) __PYX_ERR(3, 781, __pyx_L1_error)
+  __pyx_ptype_5numpy_flexible = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "flexible", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_flexible) __PYX_ERR(3, 783, __pyx_L1_error)
+  __pyx_ptype_5numpy_character = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "character", sizeof(PyObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyObject),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5numpy_character) __PYX_ERR(3, 785, __pyx_L1_error)
+  __pyx_ptype_5numpy_ufunc = __Pyx_ImportType_0_29_37(__pyx_t_1, "numpy", "ufunc", sizeof(PyUFuncObject), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(PyUFuncObject),__Pyx_ImportType_CheckSize_Ignore_0_29_37); if (!__pyx_ptype_5numpy_ufunc) __PYX_ERR(3, 824, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyImport_ImportModule("cyarray.carray"); if (unlikely(!__pyx_t_1)) __PYX_ERR(6, 21, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_7cyarray_6carray_BaseArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "BaseArray", sizeof(struct __pyx_obj_7cyarray_6carray_BaseArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_BaseArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_BaseArray) __PYX_ERR(6, 21, __pyx_L1_error)
+  __pyx_vtabptr_7cyarray_6carray_BaseArray = (struct __pyx_vtabstruct_7cyarray_6carray_BaseArray*)__Pyx_GetVtable(__pyx_ptype_7cyarray_6carray_BaseArray->tp_dict); if (unlikely(!__pyx_vtabptr_7cyarray_6carray_BaseArray)) __PYX_ERR(6, 21, __pyx_L1_error)
+  __pyx_ptype_7cyarray_6carray_LongArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "LongArray", sizeof(struct __pyx_obj_7cyarray_6carray_LongArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_LongArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_LongArray) __PYX_ERR(6, 22, __pyx_L1_error)
+  __pyx_vtabptr_7cyarray_6carray_LongArray = (struct __pyx_vtabstruct_7cyarray_6carray_LongArray*)__Pyx_GetVtable(__pyx_ptype_7cyarray_6carray_LongArray->tp_dict); if (unlikely(!__pyx_vtabptr_7cyarray_6carray_LongArray)) __PYX_ERR(6, 22, __pyx_L1_error)
+  __pyx_ptype_7cyarray_6carray_BaseArrayIter = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "BaseArrayIter", sizeof(struct __pyx_obj_7cyarray_6carray_BaseArrayIter), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_BaseArrayIter),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_BaseArrayIter) __PYX_ERR(6, 24, __pyx_L1_error)
+  __pyx_ptype_7cyarray_6carray_IntArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "IntArray", sizeof(struct __pyx_obj_7cyarray_6carray_IntArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_IntArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_IntArray) __PYX_ERR(6, 57, __pyx_L1_error)
+  __pyx_vtabptr_7cyarray_6carray_IntArray = (struct __pyx_vtabstruct_7cyarray_6carray_IntArray*)__Pyx_GetVtable(__pyx_ptype_7cyarray_6carray_IntArray->tp_dict); if (unlikely(!__pyx_vtabptr_7cyarray_6carray_IntArray)) __PYX_ERR(6, 57, __pyx_L1_error)
+  __pyx_ptype_7cyarray_6carray_UIntArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "UIntArray", sizeof(struct __pyx_obj_7cyarray_6carray_UIntArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_UIntArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_UIntArray) __PYX_ERR(6, 87, __pyx_L1_error)
+  __pyx_vtabptr_7cyarray_6carray_UIntArray = (struct __pyx_vtabstruct_7cyarray_6carray_UIntArray*)__Pyx_GetVtable(__pyx_ptype_7cyarray_6carray_UIntArray->tp_dict); if (unlikely(!__pyx_vtabptr_7cyarray_6carray_UIntArray)) __PYX_ERR(6, 87, __pyx_L1_error)
+  __pyx_ptype_7cyarray_6carray_FloatArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "FloatArray", sizeof(struct __pyx_obj_7cyarray_6carray_FloatArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_FloatArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_FloatArray) __PYX_ERR(6, 147, __pyx_L1_error)
+  __pyx_vtabptr_7cyarray_6carray_FloatArray = (struct __pyx_vtabstruct_7cyarray_6carray_FloatArray*)__Pyx_GetVtable(__pyx_ptype_7cyarray_6carray_FloatArray->tp_dict); if (unlikely(!__pyx_vtabptr_7cyarray_6carray_FloatArray)) __PYX_ERR(6, 147, __pyx_L1_error)
+  __pyx_ptype_7cyarray_6carray_DoubleArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "cyarray.carray", "DoubleArray", sizeof(struct __pyx_obj_7cyarray_6carray_DoubleArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_7cyarray_6carray_DoubleArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_7cyarray_6carray_DoubleArray) __PYX_ERR(6, 177, __pyx_L1_error)
+  __pyx_vtabptr_7cyarray_6carray_DoubleArray = (struct __pyx_vtabstruct_7cyarray_6carray_DoubleArray*)__Pyx_GetVtable(__pyx_ptype_7cyarray_6carray_DoubleArray->tp_dict); if (unlikely(!__pyx_vtabptr_7cyarray_6carray_DoubleArray)) __PYX_ERR(6, 177, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyImport_ImportModule("pysph.base.particle_array"); if (unlikely(!__pyx_t_1)) __PYX_ERR(7, 34, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_5pysph_4base_14particle_array_ParticleArray = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.particle_array", "ParticleArray", sizeof(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_14particle_array_ParticleArray),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_14particle_array_ParticleArray) __PYX_ERR(7, 34, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_14particle_array_ParticleArray = (struct __pyx_vtabstruct_5pysph_4base_14particle_array_ParticleArray*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_14particle_array_ParticleArray->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_14particle_array_ParticleArray)) __PYX_ERR(7, 34, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyImport_ImportModule("pysph.base.point"); if (unlikely(!__pyx_t_1)) __PYX_ERR(4, 51, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_5pysph_4base_5point_Point = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.point", "Point", sizeof(struct __pyx_obj_5pysph_4base_5point_Point), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_5point_Point),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_5point_Point) __PYX_ERR(4, 51, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_5point_Point = (struct __pyx_vtabstruct_5pysph_4base_5point_Point*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_5point_Point->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_5point_Point)) __PYX_ERR(4, 51, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_5point_IntPoint = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.point", "IntPoint", sizeof(struct __pyx_obj_5pysph_4base_5point_IntPoint), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_5point_IntPoint),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_5point_IntPoint) __PYX_ERR(4, 135, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_5point_IntPoint = (struct __pyx_vtabstruct_5pysph_4base_5point_IntPoint*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_5point_IntPoint->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_5point_IntPoint)) __PYX_ERR(4, 135, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyImport_ImportModule("pysph.base.nnps_base"); if (unlikely(!__pyx_t_1)) __PYX_ERR(8, 140, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "NNPSParticleArrayWrapper", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper) __PYX_ERR(8, 140, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_NNPSParticleArrayWrapper)) __PYX_ERR(8, 140, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_DomainManager = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "DomainManager", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_DomainManager), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_DomainManager),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_DomainManager) __PYX_ERR(8, 153, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_DomainManagerBase = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "DomainManagerBase", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_DomainManagerBase), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_DomainManagerBase),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_DomainManagerBase) __PYX_ERR(8, 158, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_DomainManagerBase = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_DomainManagerBase*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_DomainManagerBase->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_DomainManagerBase)) __PYX_ERR(8, 158, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_CPUDomainManager = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "CPUDomainManager", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_CPUDomainManager),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_CPUDomainManager) __PYX_ERR(8, 190, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_CPUDomainManager = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_CPUDomainManager*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_CPUDomainManager->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_CPUDomainManager)) __PYX_ERR(8, 190, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_Cell = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "Cell", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_Cell), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_Cell),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_Cell) __PYX_ERR(8, 223, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_Cell = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_Cell*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_Cell->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_Cell)) __PYX_ERR(8, 223, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_NeighborCache = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "NeighborCache", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_NeighborCache),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_NeighborCache) __PYX_ERR(8, 253, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_NeighborCache = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NeighborCache*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_NeighborCache->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_NeighborCache)) __PYX_ERR(8, 253, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_NNPSBase = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "NNPSBase", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_NNPSBase),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_NNPSBase) __PYX_ERR(8, 277, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_NNPSBase = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPSBase*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_NNPSBase->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_NNPSBase)) __PYX_ERR(8, 277, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_9nnps_base_NNPS = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.nnps_base", "NNPS", sizeof(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_9nnps_base_NNPS),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_9nnps_base_NNPS) __PYX_ERR(8, 317, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_9nnps_base_NNPS = (struct __pyx_vtabstruct_5pysph_4base_9nnps_base_NNPS*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_9nnps_base_NNPS->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_9nnps_base_NNPS)) __PYX_ERR(8, 317, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = PyImport_ImportModule("pysph.base.gpu_nnps_base"); if (unlikely(!__pyx_t_1)) __PYX_ERR(9, 35, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNeighborCache = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.gpu_nnps_base", "GPUNeighborCache", sizeof(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_GPUNeighborCache),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNeighborCache) __PYX_ERR(9, 35, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNeighborCache = (struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_GPUNeighborCache*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_13gpu_nnps_base_GPUNeighborCache->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_GPUNeighborCache)) __PYX_ERR(9, 35, __pyx_L1_error)
+  __pyx_ptype_5pysph_4base_13gpu_nnps_base_BruteForceNNPS = __Pyx_ImportType_0_29_37(__pyx_t_1, "pysph.base.gpu_nnps_base", "BruteForceNNPS", sizeof(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_BruteForceNNPS), __PYX_GET_STRUCT_ALIGNMENT_0_29_37(struct __pyx_obj_5pysph_4base_13gpu_nnps_base_BruteForceNNPS),__Pyx_ImportType_CheckSize_Warn_0_29_37); if (!__pyx_ptype_5pysph_4base_13gpu_nnps_base_BruteForceNNPS) __PYX_ERR(9, 106, __pyx_L1_error)
+  __pyx_vtabptr_5pysph_4base_13gpu_nnps_base_BruteForceNNPS = (struct __pyx_vtabstruct_5pysph_4base_13gpu_nnps_base_BruteForceNNPS*)__Pyx_GetVtable(__pyx_ptype_5pysph_4base_13gpu_nnps_base_BruteForceNNPS->tp_dict); if (unlikely(!__pyx_vtabptr_5pysph_4base_13gpu_nnps_base_BruteForceNNPS)) __PYX_ERR(9, 106, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_RefNannyFinishContext();
+  return 0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_RefNannyFinishContext();
+  return -1;
+}
+
+static int __Pyx_modinit_variable_import_code(void) {
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__Pyx_modinit_variable_import_code", 0);
+  /*--- Variable import code ---*/
+  __Pyx_RefNannyFinishContext();
+  return 0;
+}
+
+static int __Pyx_modinit_function_import_code(void) {
+  __Pyx_RefNannyDeclarations
+  __Pyx_RefNannySetupContext("__Pyx_modinit_function_import_code", 0);
+  /*--- Function import code ---*/
+  __Pyx_RefNannyFinishContext();
+  return 0;
+}
+
+
+#ifndef CYTHON_NO_PYINIT_EXPORT
+#define __Pyx_PyMODINIT_FUNC PyMODINIT_FUNC
+#elif PY_MAJOR_VERSION < 3
+#ifdef __cplusplus
+#define __Pyx_PyMODINIT_FUNC extern "C" void
+#else
+#define __Pyx_PyMODINIT_FUNC void
+#endif
+#else
+#ifdef __cplusplus
+#define __Pyx_PyMODINIT_FUNC extern "C" PyObject *
+#else
+#define __Pyx_PyMODINIT_FUNC PyObject *
+#endif
+#endif
+
+
+#if PY_MAJOR_VERSION < 3
+__Pyx_PyMODINIT_FUNC initoctree_gpu_nnps(void) CYTHON_SMALL_CODE; /*proto*/
+__Pyx_PyMODINIT_FUNC initoctree_gpu_nnps(void)
+#else
+__Pyx_PyMODINIT_FUNC PyInit_octree_gpu_nnps(void) CYTHON_SMALL_CODE; /*proto*/
+__Pyx_PyMODINIT_FUNC PyInit_octree_gpu_nnps(void)
+#if CYTHON_PEP489_MULTI_PHASE_INIT
+{
+  return PyModuleDef_Init(&__pyx_moduledef);
+}
+static CYTHON_SMALL_CODE int __Pyx_check_single_interpreter(void) {
+    #if PY_VERSION_HEX >= 0x030700A1
+    static PY_INT64_T main_interpreter_id = -1;
+    PY_INT64_T current_id = PyInterpreterState_GetID(PyThreadState_Get()->interp);
+    if (main_interpreter_id == -1) {
+        main_interpreter_id = current_id;
+        return (unlikely(current_id == -1)) ? -1 : 0;
+    } else if (unlikely(main_interpreter_id != current_id))
+    #else
+    static PyInterpreterState *main_interpreter = NULL;
+    PyInterpreterState *current_interpreter = PyThreadState_Get()->interp;
+    if (!main_interpreter) {
+        main_interpreter = current_interpreter;
+    } else if (unlikely(main_interpreter != current_interpreter))
+    #endif
+    {
+        PyErr_SetString(
+            PyExc_ImportError,
+            "Interpreter change detected - this module can only be loaded into one interpreter per process.");
+        return -1;
+    }
+    return 0;
+}
+static CYTHON_SMALL_CODE int __Pyx_copy_spec_to_module(PyObject *spec, PyObject *moddict, const char* from_name, const char* to_name, int allow_none) {
+    PyObject *value = PyObject_GetAttrString(spec, from_name);
+    int result = 0;
+    if (likely(value)) {
+        if (allow_none || value != Py_None) {
+            result = PyDict_SetItemString(moddict, to_name, value);
+        }
+        Py_DECREF(value);
+    } else if (PyErr_ExceptionMatches(PyExc_AttributeError)) {
+        PyErr_Clear();
+    } else {
+        result = -1;
+    }
+    return result;
+}
+static CYTHON_SMALL_CODE PyObject* __pyx_pymod_create(PyObject *spec, CYTHON_UNUSED PyModuleDef *def) {
+    PyObject *module = NULL, *moddict, *modname;
+    if (__Pyx_check_single_interpreter())
+        return NULL;
+    if (__pyx_m)
+        return __Pyx_NewRef(__pyx_m);
+    modname = PyObject_GetAttrString(spec, "name");
+    if (unlikely(!modname)) goto bad;
+    module = PyModule_NewObject(modname);
+    Py_DECREF(modname);
+    if (unlikely(!module)) goto bad;
+    moddict = PyModule_GetDict(module);
+    if (unlikely(!moddict)) goto bad;
+    if (unlikely(__Pyx_copy_spec_to_module(spec, moddict, "loader", "__loader__", 1) < 0)) goto bad;
+    if (unlikely(__Pyx_copy_spec_to_module(spec, moddict, "origin", "__file__", 1) < 0)) goto bad;
+    if (unlikely(__Pyx_copy_spec_to_module(spec, moddict, "parent", "__package__", 1) < 0)) goto bad;
+    if (unlikely(__Pyx_copy_spec_to_module(spec, moddict, "submodule_search_locations", "__path__", 0) < 0)) goto bad;
+    return module;
+bad:
+    Py_XDECREF(module);
+    return NULL;
+}
+
+
+static CYTHON_SMALL_CODE int __pyx_pymod_exec_octree_gpu_nnps(PyObject *__pyx_pyinit_module)
+#endif
+#endif
+{
+  PyObject *__pyx_t_1 = NULL;
+  PyObject *__pyx_t_2 = NULL;
+  int __pyx_lineno = 0;
+  const char *__pyx_filename = NULL;
+  int __pyx_clineno = 0;
+  __Pyx_RefNannyDeclarations
+  #if CYTHON_PEP489_MULTI_PHASE_INIT
+  if (__pyx_m) {
+    if (__pyx_m == __pyx_pyinit_module) return 0;
+    PyErr_SetString(PyExc_RuntimeError, "Module 'octree_gpu_nnps' has already been imported. Re-initialisation is not supported.");
+    return -1;
+  }
+  #elif PY_MAJOR_VERSION >= 3
+  if (__pyx_m) return __Pyx_NewRef(__pyx_m);
+  #endif
+  #if CYTHON_REFNANNY
+__Pyx_RefNanny = __Pyx_RefNannyImportAPI("refnanny");
+if (!__Pyx_RefNanny) {
+  PyErr_Clear();
+  __Pyx_RefNanny = __Pyx_RefNannyImportAPI("Cython.Runtime.refnanny");
+  if (!__Pyx_RefNanny)
+      Py_FatalError("failed to import 'refnanny' module");
+}
+#endif
+  __Pyx_RefNannySetupContext("__Pyx_PyMODINIT_FUNC PyInit_octree_gpu_nnps(void)", 0);
+  if (__Pyx_check_binary_version() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #ifdef __Pxy_PyFrame_Initialize_Offsets
+  __Pxy_PyFrame_Initialize_Offsets();
+  #endif
+  __pyx_empty_tuple = PyTuple_New(0); if (unlikely(!__pyx_empty_tuple)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_empty_bytes = PyBytes_FromStringAndSize("", 0); if (unlikely(!__pyx_empty_bytes)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __pyx_empty_unicode = PyUnicode_FromStringAndSize("", 0); if (unlikely(!__pyx_empty_unicode)) __PYX_ERR(0, 1, __pyx_L1_error)
+  #ifdef __Pyx_CyFunction_USED
+  if (__pyx_CyFunction_init() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  #ifdef __Pyx_FusedFunction_USED
+  if (__pyx_FusedFunction_init() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  #ifdef __Pyx_Coroutine_USED
+  if (__pyx_Coroutine_init() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  #ifdef __Pyx_Generator_USED
+  if (__pyx_Generator_init() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  #ifdef __Pyx_AsyncGen_USED
+  if (__pyx_AsyncGen_init() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  #ifdef __Pyx_StopAsyncIteration_USED
+  if (__pyx_StopAsyncIteration_init() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  /*--- Library function declarations ---*/
+  /*--- Threads initialization code ---*/
+  #if defined(WITH_THREAD) && PY_VERSION_HEX < 0x030700F0 && defined(__PYX_FORCE_INIT_THREADS) && __PYX_FORCE_INIT_THREADS
+  PyEval_InitThreads();
+  #endif
+  /*--- Module creation code ---*/
+  #if CYTHON_PEP489_MULTI_PHASE_INIT
+  __pyx_m = __pyx_pyinit_module;
+  Py_INCREF(__pyx_m);
+  #else
+  #if PY_MAJOR_VERSION < 3
+  __pyx_m = Py_InitModule4("octree_gpu_nnps", __pyx_methods, 0, 0, PYTHON_API_VERSION); Py_XINCREF(__pyx_m);
+  #else
+  __pyx_m = PyModule_Create(&__pyx_moduledef);
+  #endif
+  if (unlikely(!__pyx_m)) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  __pyx_d = PyModule_GetDict(__pyx_m); if (unlikely(!__pyx_d)) __PYX_ERR(0, 1, __pyx_L1_error)
+  Py_INCREF(__pyx_d);
+  __pyx_b = PyImport_AddModule(__Pyx_BUILTIN_MODULE_NAME); if (unlikely(!__pyx_b)) __PYX_ERR(0, 1, __pyx_L1_error)
+  Py_INCREF(__pyx_b);
+  __pyx_cython_runtime = PyImport_AddModule((char *) "cython_runtime"); if (unlikely(!__pyx_cython_runtime)) __PYX_ERR(0, 1, __pyx_L1_error)
+  Py_INCREF(__pyx_cython_runtime);
+  if (PyObject_SetAttrString(__pyx_m, "__builtins__", __pyx_b) < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  /*--- Initialize various global constants etc. ---*/
+  if (__Pyx_InitGlobals() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #if PY_MAJOR_VERSION < 3 && (__PYX_DEFAULT_STRING_ENCODING_IS_ASCII || __PYX_DEFAULT_STRING_ENCODING_IS_DEFAULT)
+  if (__Pyx_init_sys_getdefaultencoding_params() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+  if (__pyx_module_is_main_pysph__base__octree_gpu_nnps) {
+    if (PyObject_SetAttr(__pyx_m, __pyx_n_s_name, __pyx_n_s_main) < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  }
+  #if PY_MAJOR_VERSION >= 3
+  {
+    PyObject *modules = PyImport_GetModuleDict(); if (unlikely(!modules)) __PYX_ERR(0, 1, __pyx_L1_error)
+    if (!PyDict_GetItemString(modules, "pysph.base.octree_gpu_nnps")) {
+      if (unlikely(PyDict_SetItemString(modules, "pysph.base.octree_gpu_nnps", __pyx_m) < 0)) __PYX_ERR(0, 1, __pyx_L1_error)
+    }
+  }
+  #endif
+  /*--- Builtin init code ---*/
+  if (__Pyx_InitCachedBuiltins() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  /*--- Constants init code ---*/
+  if (__Pyx_InitCachedConstants() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  /*--- Global type/function init code ---*/
+  (void)__Pyx_modinit_global_init_code();
+  (void)__Pyx_modinit_variable_export_code();
+  (void)__Pyx_modinit_function_export_code();
+  if (unlikely(__Pyx_modinit_type_init_code() < 0)) __PYX_ERR(0, 1, __pyx_L1_error)
+  if (unlikely(__Pyx_modinit_type_import_code() < 0)) __PYX_ERR(0, 1, __pyx_L1_error)
+  (void)__Pyx_modinit_variable_import_code();
+  (void)__Pyx_modinit_function_import_code();
+  /*--- Execution code ---*/
+  #if defined(__Pyx_Generator_USED) || defined(__Pyx_Coroutine_USED)
+  if (__Pyx_patch_abc() < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  #endif
+
+  /* "pysph/base/octree_gpu_nnps.pyx":2
+ * #cython: embedsignature=True
+ * import numpy as np             # <<<<<<<<<<<<<<
+ * cimport numpy as np
+ * from pysph.base.tree.point_tree import PointTree
+ */
+  __pyx_t_1 = __Pyx_Import(__pyx_n_s_numpy, 0, 0); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 2, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (PyDict_SetItem(__pyx_d, __pyx_n_s_np, __pyx_t_1) < 0) __PYX_ERR(0, 2, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":4
+ * import numpy as np
+ * cimport numpy as np
+ * from pysph.base.tree.point_tree import PointTree             # <<<<<<<<<<<<<<
+ * 
+ * cdef class OctreeGPUNNPS(GPUNNPS):
+ */
+  __pyx_t_1 = PyList_New(1); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 4, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  __Pyx_INCREF(__pyx_n_s_PointTree);
+  __Pyx_GIVEREF(__pyx_n_s_PointTree);
+  PyList_SET_ITEM(__pyx_t_1, 0, __pyx_n_s_PointTree);
+  __pyx_t_2 = __Pyx_Import(__pyx_n_s_pysph_base_tree_point_tree, __pyx_t_1, 0); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 4, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __pyx_t_1 = __Pyx_ImportFrom(__pyx_t_2, __pyx_n_s_PointTree); if (unlikely(!__pyx_t_1)) __PYX_ERR(0, 4, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_1);
+  if (PyDict_SetItem(__pyx_d, __pyx_n_s_PointTree, __pyx_t_1) < 0) __PYX_ERR(0, 4, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_1); __pyx_t_1 = 0;
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+
+  /* "(tree fragment)":1
+ * def __pyx_unpickle_OctreeGPUNNPS(__pyx_type, long __pyx_checksum, __pyx_state):             # <<<<<<<<<<<<<<
+ *     cdef object __pyx_PickleError
+ *     cdef object __pyx_result
+ */
+  __pyx_t_2 = PyCFunction_NewEx(&__pyx_mdef_5pysph_4base_15octree_gpu_nnps_1__pyx_unpickle_OctreeGPUNNPS, NULL, __pyx_n_s_pysph_base_octree_gpu_nnps); if (unlikely(!__pyx_t_2)) __PYX_ERR(2, 1, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  if (PyDict_SetItem(__pyx_d, __pyx_n_s_pyx_unpickle_OctreeGPUNNPS, __pyx_t_2) < 0) __PYX_ERR(2, 1, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+
+  /* "pysph/base/octree_gpu_nnps.pyx":1
+ * #cython: embedsignature=True             # <<<<<<<<<<<<<<
+ * import numpy as np
+ * cimport numpy as np
+ */
+  __pyx_t_2 = __Pyx_PyDict_NewPresized(0); if (unlikely(!__pyx_t_2)) __PYX_ERR(0, 1, __pyx_L1_error)
+  __Pyx_GOTREF(__pyx_t_2);
+  if (PyDict_SetItem(__pyx_d, __pyx_n_s_test, __pyx_t_2) < 0) __PYX_ERR(0, 1, __pyx_L1_error)
+  __Pyx_DECREF(__pyx_t_2); __pyx_t_2 = 0;
+
+  /* "pysph/base/nnps_base.pxd":111
+ * @cython.boundscheck(False)
+ * @cython.wraparound(False)
+ * cdef inline long get_valid_cell_index(int cid_x, int cid_y, int cid_z,             # <<<<<<<<<<<<<<
+ *         int* ncells_per_dim, int dim, int n_cells) nogil:
+ *     """Return the flattened index for a valid cell"""
+ */
+
+  /*--- Wrapped vars code ---*/
+
+  goto __pyx_L0;
+  __pyx_L1_error:;
+  __Pyx_XDECREF(__pyx_t_1);
+  __Pyx_XDECREF(__pyx_t_2);
+  if (__pyx_m) {
+    if (__pyx_d) {
+      __Pyx_AddTraceback("init pysph.base.octree_gpu_nnps", __pyx_clineno, __pyx_lineno, __pyx_filename);
+    }
+    Py_CLEAR(__pyx_m);
+  } else if (!PyErr_Occurred()) {
+    PyErr_SetString(PyExc_ImportError, "init pysph.base.octree_gpu_nnps");
+  }
+  __pyx_L0:;
+  __Pyx_RefNannyFinishContext();
+  #if CYTHON_PEP489_MULTI_PHASE_INIT
+  return (__pyx_m != NULL) ? 0 : -1;
+  #elif PY_MAJOR_VERSION >= 3
+  return __pyx_m;
+  #else
+  return;
+  #endif
+}
+
+/* --- Runtime support code --- */
+/* Refnanny */
+#if CYTHON_REFNANNY
+static __Pyx_RefNannyAPIStruct *__Pyx_RefNannyImportAPI(const char *modname) {
+    PyObject *m = NULL, *p = NULL;
+    void *r = NULL;
+    m = PyImport_ImportModule(modname);
+    if (!m) goto end;
+    p = PyObject_GetAttrString(m, "RefNannyAPI");
+    if (!p) goto end;
+    r = PyLong_AsVoidPtr(p);
+end:
+    Py_XDECREF(p);
+    Py_XDECREF(m);
+    return (__Pyx_RefNannyAPIStruct *)r;
+}
+#endif
+
+/* PyObjectGetAttrStr */
+#if CYTHON_USE_TYPE_SLOTS
+static CYTHON_INLINE PyObject* __Pyx_PyObject_GetAttrStr(PyObject* obj, PyObject* attr_name) {
+    PyTypeObject* tp = Py_TYPE(obj);
+    if (likely(tp->tp_getattro))
+        return tp->tp_getattro(obj, attr_name);
+#if PY_MAJOR_VERSION < 3
+    if (likely(tp->tp_getattr))
+        return tp->tp_getattr(obj, PyString_AS_STRING(attr_name));
+#endif
+    return PyObject_GetAttr(obj, attr_name);
+}
+#endif
+
+/* GetBuiltinName */
+static PyObject *__Pyx_GetBuiltinName(PyObject *name) {
+    PyObject* result = __Pyx_PyObject_GetAttrStr(__pyx_b, name);
+    if (unlikely(!result)) {
+        PyErr_Format(PyExc_NameError,
+#if PY_MAJOR_VERSION >= 3
+            "name '%U' is not defined", name);
+#else
+            "name '%.200s' is not defined", PyString_AS_STRING(name));
+#endif
+    }
+    return result;
+}
+
+/* RaiseArgTupleInvalid */
+static void __Pyx_RaiseArgtupleInvalid(
+    const char* func_name,
+    int exact,
+    Py_ssize_t num_min,
+    Py_ssize_t num_max,
+    Py_ssize_t num_found)
+{
+    Py_ssize_t num_expected;
+    const char *more_or_less;
+    if (num_found < num_min) {
+        num_expected = num_min;
+        more_or_less = "at least";
+    } else {
+        num_expected = num_max;
+        more_or_less = "at most";
+    }
+    if (exact) {
+        more_or_less = "exactly";
+    }
+    PyErr_Format(PyExc_TypeError,
+                 "%.200s() takes %.8s %" CYTHON_FORMAT_SSIZE_T "d positional argument%.1s (%" CYTHON_FORMAT_SSIZE_T "d given)",
+                 func_name, more_or_less, num_expected,
+                 (num_expected == 1) ? "" : "s", num_found);
+}
+
+/* RaiseDoubleKeywords */
+static void __Pyx_RaiseDoubleKeywordsError(
+    const char* func_name,
+    PyObject* kw_name)
+{
+    PyErr_Format(PyExc_TypeError,
+        #if PY_MAJOR_VERSION >= 3
+        "%s() got multiple values for keyword argument '%U'", func_name, kw_name);
+        #else
+        "%s() got multiple values for keyword argument '%s'", func_name,
+        PyString_AsString(kw_name));
+        #endif
+}
+
+/* ParseKeywords */
+static int __Pyx_ParseOptionalKeywords(
+    PyObject *kwds,
+    PyObject **argnames[],
+    PyObject *kwds2,
+    PyObject *values[],
+    Py_ssize_t num_pos_args,
+    const char* function_name)
+{
+    PyObject *key = 0, *value = 0;
+    Py_ssize_t pos = 0;
+    PyObject*** name;
+    PyObject*** first_kw_arg = argnames + num_pos_args;
+    while (PyDict_Next(kwds, &pos, &key, &value)) {
+        name = first_kw_arg;
+        while (*name && (**name != key)) name++;
+        if (*name) {
+            values[name-argnames] = value;
+            continue;
+        }
+        name = first_kw_arg;
+        #if PY_MAJOR_VERSION < 3
+        if (likely(PyString_Check(key))) {
+            while (*name) {
+                if ((CYTHON_COMPILING_IN_PYPY || PyString_GET_SIZE(**name) == PyString_GET_SIZE(key))
+                        && _PyString_Eq(**name, key)) {
+                    values[name-argnames] = value;
+                    break;
+                }
+                name++;
+            }
+            if (*name) continue;
+            else {
+                PyObject*** argname = argnames;
+                while (argname != first_kw_arg) {
+                    if ((**argname == key) || (
+                            (CYTHON_COMPILING_IN_PYPY || PyString_GET_SIZE(**argname) == PyString_GET_SIZE(key))
+                             && _PyString_Eq(**argname, key))) {
+                        goto arg_passed_twice;
+                    }
+                    argname++;
+                }
+            }
+        } else
+        #endif
+        if (likely(PyUnicode_Check(key))) {
+            while (*name) {
+                int cmp = (**name == key) ? 0 :
+                #if !CYTHON_COMPILING_IN_PYPY && PY_MAJOR_VERSION >= 3
+                    (__Pyx_PyUnicode_GET_LENGTH(**name) != __Pyx_PyUnicode_GET_LENGTH(key)) ? 1 :
+                #endif
+                    PyUnicode_Compare(**name, key);
+                if (cmp < 0 && unlikely(PyErr_Occurred())) goto bad;
+                if (cmp == 0) {
+                    values[name-argnames] = value;
+                    break;
+                }
+                name++;
+            }
+            if (*name) continue;
+            else {
+                PyObject*** argname = argnames;
+                while (argname != first_kw_arg) {
+                    int cmp = (**argname == key) ? 0 :
+                    #if !CYTHON_COMPILING_IN_PYPY && PY_MAJOR_VERSION >= 3
+                        (__Pyx_PyUnicode_GET_LENGTH(**argname) != __Pyx_PyUnicode_GET_LENGTH(key)) ? 1 :
+                    #endif
+                        PyUnicode_Compare(**argname, key);
+                    if (cmp < 0 && unlikely(PyErr_Occurred())) goto bad;
+                    if (cmp == 0) goto arg_passed_twice;
+                    argname++;
+                }
+            }
+        } else
+            goto invalid_keyword_type;
+        if (kwds2) {
+            if (unlikely(PyDict_SetItem(kwds2, key, value))) goto bad;
+        } else {
+            goto invalid_keyword;
+        }
+    }
+    return 0;
+arg_passed_twice:
+    __Pyx_RaiseDoubleKeywordsError(function_name, key);
+    goto bad;
+invalid_keyword_type:
+    PyErr_Format(PyExc_TypeError,
+        "%.200s() keywords must be strings", function_name);
+    goto bad;
+invalid_keyword:
+    PyErr_Format(PyExc_TypeError,
+    #if PY_MAJOR_VERSION < 3
+        "%.200s() got an unexpected keyword argument '%.200s'",
+        function_name, PyString_AsString(key));
+    #else
+        "%s() got an unexpected keyword argument '%U'",
+        function_name, key);
+    #endif
+bad:
+    return -1;
+}
+
+/* ArgTypeTest */
+static int __Pyx__ArgTypeTest(PyObject *obj, PyTypeObject *type, const char *name, int exact)
+{
+    if (unlikely(!type)) {
+        PyErr_SetString(PyExc_SystemError, "Missing type object");
+        return 0;
+    }
+    else if (exact) {
+        #if PY_MAJOR_VERSION == 2
+        if ((type == &PyBaseString_Type) && likely(__Pyx_PyBaseString_CheckExact(obj))) return 1;
+        #endif
+    }
+    else {
+        if (likely(__Pyx_TypeCheck(obj, type))) return 1;
+    }
+    PyErr_Format(PyExc_TypeError,
+        "Argument '%.200s' has incorrect type (expected %.200s, got %.200s)",
+        name, type->tp_name, Py_TYPE(obj)->tp_name);
+    return 0;
+}
+
+/* PyObjectCall */
+#if CYTHON_COMPILING_IN_CPYTHON
+static CYTHON_INLINE PyObject* __Pyx_PyObject_Call(PyObject *func, PyObject *arg, PyObject *kw) {
+    PyObject *result;
+    ternaryfunc call = Py_TYPE(func)->tp_call;
+    if (unlikely(!call))
+        return PyObject_Call(func, arg, kw);
+    if (unlikely(Py_EnterRecursiveCall((char*)" while calling a Python object")))
+        return NULL;
+    result = (*call)(func, arg, kw);
+    Py_LeaveRecursiveCall();
+    if (unlikely(!result) && unlikely(!PyErr_Occurred())) {
+        PyErr_SetString(
+            PyExc_SystemError,
+            "NULL result without error in PyObject_Call");
+    }
+    return result;
+}
+#endif
+
+/* Import */
+static PyObject *__Pyx_Import(PyObject *name, PyObject *from_list, int level) {
+    PyObject *empty_list = 0;
+    PyObject *module = 0;
+    PyObject *global_dict = 0;
+    PyObject *empty_dict = 0;
+    PyObject *list;
+    #if PY_MAJOR_VERSION < 3
+    PyObject *py_import;
+    py_import = __Pyx_PyObject_GetAttrStr(__pyx_b, __pyx_n_s_import);
+    if (!py_import)
+        goto bad;
+    #endif
+    if (from_list)
+        list = from_list;
+    else {
+        empty_list = PyList_New(0);
+        if (!empty_list)
+            goto bad;
+        list = empty_list;
+    }
+    global_dict = PyModule_GetDict(__pyx_m);
+    if (!global_dict)
+        goto bad;
+    empty_dict = PyDict_New();
+    if (!empty_dict)
+        goto bad;
+    {
+        #if PY_MAJOR_VERSION >= 3
+        if (level == -1) {
+            if ((1) && (strchr(__Pyx_MODULE_NAME, '.'))) {
+                module = PyImport_ImportModuleLevelObject(
+                    name, global_dict, empty_dict, list, 1);
+                if (!module) {
+                    if (!PyErr_ExceptionMatches(PyExc_ImportError))
+                        goto bad;
+                    PyErr_Clear();
+                }
+            }
+            level = 0;
+        }
+        #endif
+        if (!module) {
+            #if PY_MAJOR_VERSION < 3
+            PyObject *py_level = PyInt_FromLong(level);
+            if (!py_level)
+                goto bad;
+            module = PyObject_CallFunctionObjArgs(py_import,
+                name, global_dict, empty_dict, list, py_level, (PyObject *)NULL);
+            Py_DECREF(py_level);
+            #else
+            module = PyImport_ImportModuleLevelObject(
+                name, global_dict, empty_dict, list, level);
+            #endif
+        }
+    }
+bad:
+    #if PY_MAJOR_VERSION < 3
+    Py_XDECREF(py_import);
+    #endif
+    Py_XDECREF(empty_list);
+    Py_XDECREF(empty_dict);
+    return module;
+}
+
+/* ImportFrom */
+static PyObject* __Pyx_ImportFrom(PyObject* module, PyObject* name) {
+    PyObject* value = __Pyx_PyObject_GetAttrStr(module, name);
+    if (unlikely(!value) && PyErr_ExceptionMatches(PyExc_AttributeError)) {
+        PyErr_Format(PyExc_ImportError,
+        #if PY_MAJOR_VERSION < 3
+            "cannot import name %.230s", PyString_AS_STRING(name));
+        #else
+            "cannot import name %S", name);
+        #endif
+    }
+    return value;
+}
+
+/* PyCFunctionFastCall */
+#if CYTHON_FAST_PYCCALL
+static CYTHON_INLINE PyObject * __Pyx_PyCFunction_FastCall(PyObject *func_obj, PyObject **args, Py_ssize_t nargs) {
+    PyCFunctionObject *func = (PyCFunctionObject*)func_obj;
+    PyCFunction meth = PyCFunction_GET_FUNCTION(func);
+    PyObject *self = PyCFunction_GET_SELF(func);
+    int flags = PyCFunction_GET_FLAGS(func);
+    assert(PyCFunction_Check(func));
+    assert(METH_FASTCALL == (flags & ~(METH_CLASS | METH_STATIC | METH_COEXIST | METH_KEYWORDS | METH_STACKLESS)));
+    assert(nargs >= 0);
+    assert(nargs == 0 || args != NULL);
+    /* _PyCFunction_FastCallDict() must not be called with an exception set,
+       because it may clear it (directly or indirectly) and so the
+       caller loses its exception */
+    assert(!PyErr_Occurred());
+    if ((PY_VERSION_HEX < 0x030700A0) || unlikely(flags & METH_KEYWORDS)) {
+        return (*((__Pyx_PyCFunctionFastWithKeywords)(void*)meth)) (self, args, nargs, NULL);
+    } else {
+        return (*((__Pyx_PyCFunctionFast)(void*)meth)) (self, args, nargs);
+    }
+}
+#endif
+
+/* PyFunctionFastCall */
+#if CYTHON_FAST_PYCALL
+static PyObject* __Pyx_PyFunction_FastCallNoKw(PyCodeObject *co, PyObject **args, Py_ssize_t na,
+                                               PyObject *globals) {
+    PyFrameObject *f;
+    PyThreadState *tstate = __Pyx_PyThreadState_Current;
+    PyObject **fastlocals;
+    Py_ssize_t i;
+    PyObject *result;
+    assert(globals != NULL);
+    /* XXX Perhaps we should create a specialized
+       PyFrame_New() that doesn't take locals, but does
+       take builtins without sanity checking them.
+       */
+    assert(tstate != NULL);
+    f = PyFrame_New(tstate, co, globals, NULL);
+    if (f == NULL) {
+        return NULL;
+    }
+    fastlocals = __Pyx_PyFrame_GetLocalsplus(f);
+    for (i = 0; i < na; i++) {
+        Py_INCREF(*args);
+        fastlocals[i] = *args++;
+    }
+    result = PyEval_EvalFrameEx(f,0);
+    ++tstate->recursion_depth;
+    Py_DECREF(f);
+    --tstate->recursion_depth;
+    return result;
+}
+#if 1 || PY_VERSION_HEX < 0x030600B1
+static PyObject *__Pyx_PyFunction_FastCallDict(PyObject *func, PyObject **args, Py_ssize_t nargs, PyObject *kwargs) {
+    PyCodeObject *co = (PyCodeObject *)PyFunction_GET_CODE(func);
+    PyObject *globals = PyFunction_GET_GLOBALS(func);
+    PyObject *argdefs = PyFunction_GET_DEFAULTS(func);
+    PyObject *closure;
+#if PY_MAJOR_VERSION >= 3
+    PyObject *kwdefs;
+#endif
+    PyObject *kwtuple, **k;
+    PyObject **d;
+    Py_ssize_t nd;
+    Py_ssize_t nk;
+    PyObject *result;
+    assert(kwargs == NULL || PyDict_Check(kwargs));
+    nk = kwargs ? PyDict_Size(kwargs) : 0;
+    if (Py_EnterRecursiveCall((char*)" while calling a Python object")) {
+        return NULL;
+    }
+    if (
+#if PY_MAJOR_VERSION >= 3
+            co->co_kwonlyargcount == 0 &&
+#endif
+            likely(kwargs == NULL || nk == 0) &&
+            co->co_flags == (CO_OPTIMIZED | CO_NEWLOCALS | CO_NOFREE)) {
+        if (argdefs == NULL && co->co_argcount == nargs) {
+            result = __Pyx_PyFunction_FastCallNoKw(co, args, nargs, globals);
+            goto done;
+        }
+        else if (nargs == 0 && argdefs != NULL
+                 && co->co_argcount == Py_SIZE(argdefs)) {
+            /* function called with no arguments, but all parameters have
+               a default value: use default values as arguments .*/
+            args = &PyTuple_GET_ITEM(argdefs, 0);
+            result =__Pyx_PyFunction_FastCallNoKw(co, args, Py_SIZE(argdefs), globals);
+            goto done;
+        }
+    }
+    if (kwargs != NULL) {
+        Py_ssize_t pos, i;
+        kwtuple = PyTuple_New(2 * nk);
+        if (kwtuple == NULL) {
+            result = NULL;
+            goto done;
+        }
+        k = &PyTuple_GET_ITEM(kwtuple, 0);
+        pos = i = 0;
+        while (PyDict_Next(kwargs, &pos, &k[i], &k[i+1])) {
+            Py_INCREF(k[i]);
+            Py_INCREF(k[i+1]);
+            i += 2;
+        }
+        nk = i / 2;
+    }
+    else {
+        kwtuple = NULL;
+        k = NULL;
+    }
+    closure = PyFunction_GET_CLOSURE(func);
+#if PY_MAJOR_VERSION >= 3
+    kwdefs = PyFunction_GET_KW_DEFAULTS(func);
+#endif
+    if (argdefs != NULL) {
+        d = &PyTuple_GET_ITEM(argdefs, 0);
+        nd = Py_SIZE(argdefs);
+    }
+    else {
+        d = NULL;
+        nd = 0;
+    }
+#if PY_MAJOR_VERSION >= 3
+    result = PyEval_EvalCodeEx((PyObject*)co, globals, (PyObject *)NULL,
+                               args, (int)nargs,
+                               k, (int)nk,
+                               d, (int)nd, kwdefs, closure);
+#else
+    result = PyEval_EvalCodeEx(co, globals, (PyObject *)NULL,
+                               args, (int)nargs,
+                               k, (int)nk,
+                               d, (int)nd, closure);
+#endif
+    Py_XDECREF(kwtuple);
+done:
+    Py_LeaveRecursiveCall();
+    return result;
+}
+#endif
+#endif
+
+/* PyObjectCall2Args */
+static CYTHON_UNUSED PyObject* __Pyx_PyObject_Call2Args(PyObject* function, PyObject* arg1, PyObject* arg2) {
+    PyObject *args, *result = NULL;
+    #if CYTHON_FAST_PYCALL
+    if (PyFunction_Check(function)) {
+        PyObject *args[2] = {arg1, arg2};
+        return __Pyx_PyFunction_FastCall(function, args, 2);
+    }
+    #endif
+    #if CYTHON_FAST_PYCCALL
+    if (__Pyx_PyFastCFunction_Check(function)) {
+        PyObject *args[2] = {arg1, arg2};
+        return __Pyx_PyCFunction_FastCall(function, args, 2);
+    }
+    #endif
+    args = PyTuple_New(2);
+    if (unlikely(!args)) goto done;
+    Py_INCREF(arg1);
+    PyTuple_SET_ITEM(args, 0, arg1);
+    Py_INCREF(arg2);
+    PyTuple_SET_ITEM(args, 1, arg2);
+    Py_INCREF(function);
+    result = __Pyx_PyObject_Call(function, args, NULL);
+    Py_DECREF(args);
+    Py_DECREF(function);
+done:
+    return result;
+}
+
+/* PyObjectCallMethO */
+#if CYTHON_COMPILING_IN_CPYTHON
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallMethO(PyObject *func, PyObject *arg) {
+    PyObject *self, *result;
+    PyCFunction cfunc;
+    cfunc = PyCFunction_GET_FUNCTION(func);
+    self = PyCFunction_GET_SELF(func);
+    if (unlikely(Py_EnterRecursiveCall((char*)" while calling a Python object")))
+        return NULL;
+    result = cfunc(self, arg);
+    Py_LeaveRecursiveCall();
+    if (unlikely(!result) && unlikely(!PyErr_Occurred())) {
+        PyErr_SetString(
+            PyExc_SystemError,
+            "NULL result without error in PyObject_Call");
+    }
+    return result;
+}
+#endif
+
+/* PyObjectCallOneArg */
+#if CYTHON_COMPILING_IN_CPYTHON
+static PyObject* __Pyx__PyObject_CallOneArg(PyObject *func, PyObject *arg) {
+    PyObject *result;
+    PyObject *args = PyTuple_New(1);
+    if (unlikely(!args)) return NULL;
+    Py_INCREF(arg);
+    PyTuple_SET_ITEM(args, 0, arg);
+    result = __Pyx_PyObject_Call(func, args, NULL);
+    Py_DECREF(args);
+    return result;
+}
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallOneArg(PyObject *func, PyObject *arg) {
+#if CYTHON_FAST_PYCALL
+    if (PyFunction_Check(func)) {
+        return __Pyx_PyFunction_FastCall(func, &arg, 1);
+    }
+#endif
+    if (likely(PyCFunction_Check(func))) {
+        if (likely(PyCFunction_GET_FLAGS(func) & METH_O)) {
+            return __Pyx_PyObject_CallMethO(func, arg);
+#if CYTHON_FAST_PYCCALL
+        } else if (__Pyx_PyFastCFunction_Check(func)) {
+            return __Pyx_PyCFunction_FastCall(func, &arg, 1);
+#endif
+        }
+    }
+    return __Pyx__PyObject_CallOneArg(func, arg);
+}
+#else
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallOneArg(PyObject *func, PyObject *arg) {
+    PyObject *result;
+    PyObject *args = PyTuple_Pack(1, arg);
+    if (unlikely(!args)) return NULL;
+    result = __Pyx_PyObject_Call(func, args, NULL);
+    Py_DECREF(args);
+    return result;
+}
+#endif
+
+/* PyDictVersioning */
+#if CYTHON_USE_DICT_VERSIONS && CYTHON_USE_TYPE_SLOTS
+static CYTHON_INLINE PY_UINT64_T __Pyx_get_tp_dict_version(PyObject *obj) {
+    PyObject *dict = Py_TYPE(obj)->tp_dict;
+    return likely(dict) ? __PYX_GET_DICT_VERSION(dict) : 0;
+}
+static CYTHON_INLINE PY_UINT64_T __Pyx_get_object_dict_version(PyObject *obj) {
+    PyObject **dictptr = NULL;
+    Py_ssize_t offset = Py_TYPE(obj)->tp_dictoffset;
+    if (offset) {
+#if CYTHON_COMPILING_IN_CPYTHON
+        dictptr = (likely(offset > 0)) ? (PyObject **) ((char *)obj + offset) : _PyObject_GetDictPtr(obj);
+#else
+        dictptr = _PyObject_GetDictPtr(obj);
+#endif
+    }
+    return (dictptr && *dictptr) ? __PYX_GET_DICT_VERSION(*dictptr) : 0;
+}
+static CYTHON_INLINE int __Pyx_object_dict_version_matches(PyObject* obj, PY_UINT64_T tp_dict_version, PY_UINT64_T obj_dict_version) {
+    PyObject *dict = Py_TYPE(obj)->tp_dict;
+    if (unlikely(!dict) || unlikely(tp_dict_version != __PYX_GET_DICT_VERSION(dict)))
+        return 0;
+    return obj_dict_version == __Pyx_get_object_dict_version(obj);
+}
+#endif
+
+/* GetModuleGlobalName */
+#if CYTHON_USE_DICT_VERSIONS
+static PyObject *__Pyx__GetModuleGlobalName(PyObject *name, PY_UINT64_T *dict_version, PyObject **dict_cached_value)
+#else
+static CYTHON_INLINE PyObject *__Pyx__GetModuleGlobalName(PyObject *name)
+#endif
+{
+    PyObject *result;
+#if !CYTHON_AVOID_BORROWED_REFS
+#if CYTHON_COMPILING_IN_CPYTHON && PY_VERSION_HEX >= 0x030500A1
+    result = _PyDict_GetItem_KnownHash(__pyx_d, name, ((PyASCIIObject *) name)->hash);
+    __PYX_UPDATE_DICT_CACHE(__pyx_d, result, *dict_cached_value, *dict_version)
+    if (likely(result)) {
+        return __Pyx_NewRef(result);
+    } else if (unlikely(PyErr_Occurred())) {
+        return NULL;
+    }
+#else
+    result = PyDict_GetItem(__pyx_d, name);
+    __PYX_UPDATE_DICT_CACHE(__pyx_d, result, *dict_cached_value, *dict_version)
+    if (likely(result)) {
+        return __Pyx_NewRef(result);
+    }
+#endif
+#else
+    result = PyObject_GetItem(__pyx_d, name);
+    __PYX_UPDATE_DICT_CACHE(__pyx_d, result, *dict_cached_value, *dict_version)
+    if (likely(result)) {
+        return __Pyx_NewRef(result);
+    }
+    PyErr_Clear();
+#endif
+    return __Pyx_GetBuiltinName(name);
+}
+
+/* GetItemInt */
+static PyObject *__Pyx_GetItemInt_Generic(PyObject *o, PyObject* j) {
+    PyObject *r;
+    if (!j) return NULL;
+    r = PyObject_GetItem(o, j);
+    Py_DECREF(j);
+    return r;
+}
+static CYTHON_INLINE PyObject *__Pyx_GetItemInt_List_Fast(PyObject *o, Py_ssize_t i,
+                                                              CYTHON_NCP_UNUSED int wraparound,
+                                                              CYTHON_NCP_UNUSED int boundscheck) {
+#if CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS
+    Py_ssize_t wrapped_i = i;
+    if (wraparound & unlikely(i < 0)) {
+        wrapped_i += PyList_GET_SIZE(o);
+    }
+    if ((!boundscheck) || likely(__Pyx_is_valid_index(wrapped_i, PyList_GET_SIZE(o)))) {
+        PyObject *r = PyList_GET_ITEM(o, wrapped_i);
+        Py_INCREF(r);
+        return r;
+    }
+    return __Pyx_GetItemInt_Generic(o, PyInt_FromSsize_t(i));
+#else
+    return PySequence_GetItem(o, i);
+#endif
+}
+static CYTHON_INLINE PyObject *__Pyx_GetItemInt_Tuple_Fast(PyObject *o, Py_ssize_t i,
+                                                              CYTHON_NCP_UNUSED int wraparound,
+                                                              CYTHON_NCP_UNUSED int boundscheck) {
+#if CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS
+    Py_ssize_t wrapped_i = i;
+    if (wraparound & unlikely(i < 0)) {
+        wrapped_i += PyTuple_GET_SIZE(o);
+    }
+    if ((!boundscheck) || likely(__Pyx_is_valid_index(wrapped_i, PyTuple_GET_SIZE(o)))) {
+        PyObject *r = PyTuple_GET_ITEM(o, wrapped_i);
+        Py_INCREF(r);
+        return r;
+    }
+    return __Pyx_GetItemInt_Generic(o, PyInt_FromSsize_t(i));
+#else
+    return PySequence_GetItem(o, i);
+#endif
+}
+static CYTHON_INLINE PyObject *__Pyx_GetItemInt_Fast(PyObject *o, Py_ssize_t i, int is_list,
+                                                     CYTHON_NCP_UNUSED int wraparound,
+                                                     CYTHON_NCP_UNUSED int boundscheck) {
+#if CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS && CYTHON_USE_TYPE_SLOTS
+    if (is_list || PyList_CheckExact(o)) {
+        Py_ssize_t n = ((!wraparound) | likely(i >= 0)) ? i : i + PyList_GET_SIZE(o);
+        if ((!boundscheck) || (likely(__Pyx_is_valid_index(n, PyList_GET_SIZE(o))))) {
+            PyObject *r = PyList_GET_ITEM(o, n);
+            Py_INCREF(r);
+            return r;
+        }
+    }
+    else if (PyTuple_CheckExact(o)) {
+        Py_ssize_t n = ((!wraparound) | likely(i >= 0)) ? i : i + PyTuple_GET_SIZE(o);
+        if ((!boundscheck) || likely(__Pyx_is_valid_index(n, PyTuple_GET_SIZE(o)))) {
+            PyObject *r = PyTuple_GET_ITEM(o, n);
+            Py_INCREF(r);
+            return r;
+        }
+    } else {
+        PySequenceMethods *m = Py_TYPE(o)->tp_as_sequence;
+        if (likely(m && m->sq_item)) {
+            if (wraparound && unlikely(i < 0) && likely(m->sq_length)) {
+                Py_ssize_t l = m->sq_length(o);
+                if (likely(l >= 0)) {
+                    i += l;
+                } else {
+                    if (!PyErr_ExceptionMatches(PyExc_OverflowError))
+                        return NULL;
+                    PyErr_Clear();
+                }
+            }
+            return m->sq_item(o, i);
+        }
+    }
+#else
+    if (is_list || PySequence_Check(o)) {
+        return PySequence_GetItem(o, i);
+    }
+#endif
+    return __Pyx_GetItemInt_Generic(o, PyInt_FromSsize_t(i));
+}
+
+/* PyObjectCallNoArg */
+#if CYTHON_COMPILING_IN_CPYTHON
+static CYTHON_INLINE PyObject* __Pyx_PyObject_CallNoArg(PyObject *func) {
+#if CYTHON_FAST_PYCALL
+    if (PyFunction_Check(func)) {
+        return __Pyx_PyFunction_FastCall(func, NULL, 0);
+    }
+#endif
+#if defined(__Pyx_CyFunction_USED) && defined(NDEBUG)
+    if (likely(PyCFunction_Check(func) || __Pyx_CyFunction_Check(func)))
+#else
+    if (likely(PyCFunction_Check(func)))
+#endif
+    {
+        if (likely(PyCFunction_GET_FLAGS(func) & METH_NOARGS)) {
+            return __Pyx_PyObject_CallMethO(func, NULL);
+        }
+    }
+    return __Pyx_PyObject_Call(func, __pyx_empty_tuple, NULL);
+}
+#endif
+
+/* None */
+static CYTHON_INLINE void __Pyx_RaiseClosureNameError(const char *varname) {
+    PyErr_Format(PyExc_NameError, "free variable '%s' referenced before assignment in enclosing scope", varname);
+}
+
+/* FetchCommonType */
+static PyTypeObject* __Pyx_FetchCommonType(PyTypeObject* type) {
+    PyObject* fake_module;
+    PyTypeObject* cached_type = NULL;
+    fake_module = PyImport_AddModule((char*) "_cython_" CYTHON_ABI);
+    if (!fake_module) return NULL;
+    Py_INCREF(fake_module);
+    cached_type = (PyTypeObject*) PyObject_GetAttrString(fake_module, type->tp_name);
+    if (cached_type) {
+        if (!PyType_Check((PyObject*)cached_type)) {
+            PyErr_Format(PyExc_TypeError,
+                "Shared Cython type %.200s is not a type object",
+                type->tp_name);
+            goto bad;
+        }
+        if (cached_type->tp_basicsize != type->tp_basicsize) {
+            PyErr_Format(PyExc_TypeError,
+                "Shared Cython type %.200s has the wrong size, try recompiling",
+                type->tp_name);
+            goto bad;
+        }
+    } else {
+        if (!PyErr_ExceptionMatches(PyExc_AttributeError)) goto bad;
+        PyErr_Clear();
+        if (PyType_Ready(type) < 0) goto bad;
+        if (PyObject_SetAttrString(fake_module, type->tp_name, (PyObject*) type) < 0)
+            goto bad;
+        Py_INCREF(type);
+        cached_type = type;
+    }
+done:
+    Py_DECREF(fake_module);
+    return cached_type;
+bad:
+    Py_XDECREF(cached_type);
+    cached_type = NULL;
+    goto done;
+}
+
+/* CythonFunctionShared */
+#include <structmember.h>
+static PyObject *
+__Pyx_CyFunction_get_doc(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *closure)
+{
+    if (unlikely(op->func_doc == NULL)) {
+        if (op->func.m_ml->ml_doc) {
+#if PY_MAJOR_VERSION >= 3
+            op->func_doc = PyUnicode_FromString(op->func.m_ml->ml_doc);
+#else
+            op->func_doc = PyString_FromString(op->func.m_ml->ml_doc);
+#endif
+            if (unlikely(op->func_doc == NULL))
+                return NULL;
+        } else {
+            Py_INCREF(Py_None);
+            return Py_None;
+        }
+    }
+    Py_INCREF(op->func_doc);
+    return op->func_doc;
+}
+static int
+__Pyx_CyFunction_set_doc(__pyx_CyFunctionObject *op, PyObject *value, CYTHON_UNUSED void *context)
+{
+    PyObject *tmp = op->func_doc;
+    if (value == NULL) {
+        value = Py_None;
+    }
+    Py_INCREF(value);
+    op->func_doc = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_name(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context)
+{
+    if (unlikely(op->func_name == NULL)) {
+#if PY_MAJOR_VERSION >= 3
+        op->func_name = PyUnicode_InternFromString(op->func.m_ml->ml_name);
+#else
+        op->func_name = PyString_InternFromString(op->func.m_ml->ml_name);
+#endif
+        if (unlikely(op->func_name == NULL))
+            return NULL;
+    }
+    Py_INCREF(op->func_name);
+    return op->func_name;
+}
+static int
+__Pyx_CyFunction_set_name(__pyx_CyFunctionObject *op, PyObject *value, CYTHON_UNUSED void *context)
+{
+    PyObject *tmp;
+#if PY_MAJOR_VERSION >= 3
+    if (unlikely(value == NULL || !PyUnicode_Check(value)))
+#else
+    if (unlikely(value == NULL || !PyString_Check(value)))
+#endif
+    {
+        PyErr_SetString(PyExc_TypeError,
+                        "__name__ must be set to a string object");
+        return -1;
+    }
+    tmp = op->func_name;
+    Py_INCREF(value);
+    op->func_name = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_qualname(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context)
+{
+    Py_INCREF(op->func_qualname);
+    return op->func_qualname;
+}
+static int
+__Pyx_CyFunction_set_qualname(__pyx_CyFunctionObject *op, PyObject *value, CYTHON_UNUSED void *context)
+{
+    PyObject *tmp;
+#if PY_MAJOR_VERSION >= 3
+    if (unlikely(value == NULL || !PyUnicode_Check(value)))
+#else
+    if (unlikely(value == NULL || !PyString_Check(value)))
+#endif
+    {
+        PyErr_SetString(PyExc_TypeError,
+                        "__qualname__ must be set to a string object");
+        return -1;
+    }
+    tmp = op->func_qualname;
+    Py_INCREF(value);
+    op->func_qualname = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_self(__pyx_CyFunctionObject *m, CYTHON_UNUSED void *closure)
+{
+    PyObject *self;
+    self = m->func_closure;
+    if (self == NULL)
+        self = Py_None;
+    Py_INCREF(self);
+    return self;
+}
+static PyObject *
+__Pyx_CyFunction_get_dict(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context)
+{
+    if (unlikely(op->func_dict == NULL)) {
+        op->func_dict = PyDict_New();
+        if (unlikely(op->func_dict == NULL))
+            return NULL;
+    }
+    Py_INCREF(op->func_dict);
+    return op->func_dict;
+}
+static int
+__Pyx_CyFunction_set_dict(__pyx_CyFunctionObject *op, PyObject *value, CYTHON_UNUSED void *context)
+{
+    PyObject *tmp;
+    if (unlikely(value == NULL)) {
+        PyErr_SetString(PyExc_TypeError,
+               "function's dictionary may not be deleted");
+        return -1;
+    }
+    if (unlikely(!PyDict_Check(value))) {
+        PyErr_SetString(PyExc_TypeError,
+               "setting function's dictionary to a non-dict");
+        return -1;
+    }
+    tmp = op->func_dict;
+    Py_INCREF(value);
+    op->func_dict = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_globals(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context)
+{
+    Py_INCREF(op->func_globals);
+    return op->func_globals;
+}
+static PyObject *
+__Pyx_CyFunction_get_closure(CYTHON_UNUSED __pyx_CyFunctionObject *op, CYTHON_UNUSED void *context)
+{
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+static PyObject *
+__Pyx_CyFunction_get_code(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context)
+{
+    PyObject* result = (op->func_code) ? op->func_code : Py_None;
+    Py_INCREF(result);
+    return result;
+}
+static int
+__Pyx_CyFunction_init_defaults(__pyx_CyFunctionObject *op) {
+    int result = 0;
+    PyObject *res = op->defaults_getter((PyObject *) op);
+    if (unlikely(!res))
+        return -1;
+    #if CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS
+    op->defaults_tuple = PyTuple_GET_ITEM(res, 0);
+    Py_INCREF(op->defaults_tuple);
+    op->defaults_kwdict = PyTuple_GET_ITEM(res, 1);
+    Py_INCREF(op->defaults_kwdict);
+    #else
+    op->defaults_tuple = PySequence_ITEM(res, 0);
+    if (unlikely(!op->defaults_tuple)) result = -1;
+    else {
+        op->defaults_kwdict = PySequence_ITEM(res, 1);
+        if (unlikely(!op->defaults_kwdict)) result = -1;
+    }
+    #endif
+    Py_DECREF(res);
+    return result;
+}
+static int
+__Pyx_CyFunction_set_defaults(__pyx_CyFunctionObject *op, PyObject* value, CYTHON_UNUSED void *context) {
+    PyObject* tmp;
+    if (!value) {
+        value = Py_None;
+    } else if (value != Py_None && !PyTuple_Check(value)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "__defaults__ must be set to a tuple object");
+        return -1;
+    }
+    Py_INCREF(value);
+    tmp = op->defaults_tuple;
+    op->defaults_tuple = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_defaults(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context) {
+    PyObject* result = op->defaults_tuple;
+    if (unlikely(!result)) {
+        if (op->defaults_getter) {
+            if (__Pyx_CyFunction_init_defaults(op) < 0) return NULL;
+            result = op->defaults_tuple;
+        } else {
+            result = Py_None;
+        }
+    }
+    Py_INCREF(result);
+    return result;
+}
+static int
+__Pyx_CyFunction_set_kwdefaults(__pyx_CyFunctionObject *op, PyObject* value, CYTHON_UNUSED void *context) {
+    PyObject* tmp;
+    if (!value) {
+        value = Py_None;
+    } else if (value != Py_None && !PyDict_Check(value)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "__kwdefaults__ must be set to a dict object");
+        return -1;
+    }
+    Py_INCREF(value);
+    tmp = op->defaults_kwdict;
+    op->defaults_kwdict = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_kwdefaults(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context) {
+    PyObject* result = op->defaults_kwdict;
+    if (unlikely(!result)) {
+        if (op->defaults_getter) {
+            if (__Pyx_CyFunction_init_defaults(op) < 0) return NULL;
+            result = op->defaults_kwdict;
+        } else {
+            result = Py_None;
+        }
+    }
+    Py_INCREF(result);
+    return result;
+}
+static int
+__Pyx_CyFunction_set_annotations(__pyx_CyFunctionObject *op, PyObject* value, CYTHON_UNUSED void *context) {
+    PyObject* tmp;
+    if (!value || value == Py_None) {
+        value = NULL;
+    } else if (!PyDict_Check(value)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "__annotations__ must be set to a dict object");
+        return -1;
+    }
+    Py_XINCREF(value);
+    tmp = op->func_annotations;
+    op->func_annotations = value;
+    Py_XDECREF(tmp);
+    return 0;
+}
+static PyObject *
+__Pyx_CyFunction_get_annotations(__pyx_CyFunctionObject *op, CYTHON_UNUSED void *context) {
+    PyObject* result = op->func_annotations;
+    if (unlikely(!result)) {
+        result = PyDict_New();
+        if (unlikely(!result)) return NULL;
+        op->func_annotations = result;
+    }
+    Py_INCREF(result);
+    return result;
+}
+static PyGetSetDef __pyx_CyFunction_getsets[] = {
+    {(char *) "func_doc", (getter)__Pyx_CyFunction_get_doc, (setter)__Pyx_CyFunction_set_doc, 0, 0},
+    {(char *) "__doc__",  (getter)__Pyx_CyFunction_get_doc, (setter)__Pyx_CyFunction_set_doc, 0, 0},
+    {(char *) "func_name", (getter)__Pyx_CyFunction_get_name, (setter)__Pyx_CyFunction_set_name, 0, 0},
+    {(char *) "__name__", (getter)__Pyx_CyFunction_get_name, (setter)__Pyx_CyFunction_set_name, 0, 0},
+    {(char *) "__qualname__", (getter)__Pyx_CyFunction_get_qualname, (setter)__Pyx_CyFunction_set_qualname, 0, 0},
+    {(char *) "__self__", (getter)__Pyx_CyFunction_get_self, 0, 0, 0},
+    {(char *) "func_dict", (getter)__Pyx_CyFunction_get_dict, (setter)__Pyx_CyFunction_set_dict, 0, 0},
+    {(char *) "__dict__", (getter)__Pyx_CyFunction_get_dict, (setter)__Pyx_CyFunction_set_dict, 0, 0},
+    {(char *) "func_globals", (getter)__Pyx_CyFunction_get_globals, 0, 0, 0},
+    {(char *) "__globals__", (getter)__Pyx_CyFunction_get_globals, 0, 0, 0},
+    {(char *) "func_closure", (getter)__Pyx_CyFunction_get_closure, 0, 0, 0},
+    {(char *) "__closure__", (getter)__Pyx_CyFunction_get_closure, 0, 0, 0},
+    {(char *) "func_code", (getter)__Pyx_CyFunction_get_code, 0, 0, 0},
+    {(char *) "__code__", (getter)__Pyx_CyFunction_get_code, 0, 0, 0},
+    {(char *) "func_defaults", (getter)__Pyx_CyFunction_get_defaults, (setter)__Pyx_CyFunction_set_defaults, 0, 0},
+    {(char *) "__defaults__", (getter)__Pyx_CyFunction_get_defaults, (setter)__Pyx_CyFunction_set_defaults, 0, 0},
+    {(char *) "__kwdefaults__", (getter)__Pyx_CyFunction_get_kwdefaults, (setter)__Pyx_CyFunction_set_kwdefaults, 0, 0},
+    {(char *) "__annotations__", (getter)__Pyx_CyFunction_get_annotations, (setter)__Pyx_CyFunction_set_annotations, 0, 0},
+    {0, 0, 0, 0, 0}
+};
+static PyMemberDef __pyx_CyFunction_members[] = {
+    {(char *) "__module__", T_OBJECT, offsetof(PyCFunctionObject, m_module), PY_WRITE_RESTRICTED, 0},
+    {0, 0, 0,  0, 0}
+};
+static PyObject *
+__Pyx_CyFunction_reduce(__pyx_CyFunctionObject *m, CYTHON_UNUSED PyObject *args)
+{
+#if PY_MAJOR_VERSION >= 3
+    Py_INCREF(m->func_qualname);
+    return m->func_qualname;
+#else
+    return PyString_FromString(m->func.m_ml->ml_name);
+#endif
+}
+static PyMethodDef __pyx_CyFunction_methods[] = {
+    {"__reduce__", (PyCFunction)__Pyx_CyFunction_reduce, METH_VARARGS, 0},
+    {0, 0, 0, 0}
+};
+#if PY_VERSION_HEX < 0x030500A0
+#define __Pyx_CyFunction_weakreflist(cyfunc) ((cyfunc)->func_weakreflist)
+#else
+#define __Pyx_CyFunction_weakreflist(cyfunc) ((cyfunc)->func.m_weakreflist)
+#endif
+static PyObject *__Pyx_CyFunction_Init(__pyx_CyFunctionObject *op, PyMethodDef *ml, int flags, PyObject* qualname,
+                                       PyObject *closure, PyObject *module, PyObject* globals, PyObject* code) {
+    if (unlikely(op == NULL))
+        return NULL;
+    op->flags = flags;
+    __Pyx_CyFunction_weakreflist(op) = NULL;
+    op->func.m_ml = ml;
+    op->func.m_self = (PyObject *) op;
+    Py_XINCREF(closure);
+    op->func_closure = closure;
+    Py_XINCREF(module);
+    op->func.m_module = module;
+    op->func_dict = NULL;
+    op->func_name = NULL;
+    Py_INCREF(qualname);
+    op->func_qualname = qualname;
+    op->func_doc = NULL;
+    op->func_classobj = NULL;
+    op->func_globals = globals;
+    Py_INCREF(op->func_globals);
+    Py_XINCREF(code);
+    op->func_code = code;
+    op->defaults_pyobjects = 0;
+    op->defaults_size = 0;
+    op->defaults = NULL;
+    op->defaults_tuple = NULL;
+    op->defaults_kwdict = NULL;
+    op->defaults_getter = NULL;
+    op->func_annotations = NULL;
+    return (PyObject *) op;
+}
+static int
+__Pyx_CyFunction_clear(__pyx_CyFunctionObject *m)
+{
+    Py_CLEAR(m->func_closure);
+    Py_CLEAR(m->func.m_module);
+    Py_CLEAR(m->func_dict);
+    Py_CLEAR(m->func_name);
+    Py_CLEAR(m->func_qualname);
+    Py_CLEAR(m->func_doc);
+    Py_CLEAR(m->func_globals);
+    Py_CLEAR(m->func_code);
+    Py_CLEAR(m->func_classobj);
+    Py_CLEAR(m->defaults_tuple);
+    Py_CLEAR(m->defaults_kwdict);
+    Py_CLEAR(m->func_annotations);
+    if (m->defaults) {
+        PyObject **pydefaults = __Pyx_CyFunction_Defaults(PyObject *, m);
+        int i;
+        for (i = 0; i < m->defaults_pyobjects; i++)
+            Py_XDECREF(pydefaults[i]);
+        PyObject_Free(m->defaults);
+        m->defaults = NULL;
+    }
+    return 0;
+}
+static void __Pyx__CyFunction_dealloc(__pyx_CyFunctionObject *m)
+{
+    if (__Pyx_CyFunction_weakreflist(m) != NULL)
+        PyObject_ClearWeakRefs((PyObject *) m);
+    __Pyx_CyFunction_clear(m);
+    PyObject_GC_Del(m);
+}
+static void __Pyx_CyFunction_dealloc(__pyx_CyFunctionObject *m)
+{
+    PyObject_GC_UnTrack(m);
+    __Pyx__CyFunction_dealloc(m);
+}
+static int __Pyx_CyFunction_traverse(__pyx_CyFunctionObject *m, visitproc visit, void *arg)
+{
+    Py_VISIT(m->func_closure);
+    Py_VISIT(m->func.m_module);
+    Py_VISIT(m->func_dict);
+    Py_VISIT(m->func_name);
+    Py_VISIT(m->func_qualname);
+    Py_VISIT(m->func_doc);
+    Py_VISIT(m->func_globals);
+    Py_VISIT(m->func_code);
+    Py_VISIT(m->func_classobj);
+    Py_VISIT(m->defaults_tuple);
+    Py_VISIT(m->defaults_kwdict);
+    if (m->defaults) {
+        PyObject **pydefaults = __Pyx_CyFunction_Defaults(PyObject *, m);
+        int i;
+        for (i = 0; i < m->defaults_pyobjects; i++)
+            Py_VISIT(pydefaults[i]);
+    }
+    return 0;
+}
+static PyObject *__Pyx_CyFunction_descr_get(PyObject *func, PyObject *obj, PyObject *type)
+{
+#if PY_MAJOR_VERSION < 3
+    __pyx_CyFunctionObject *m = (__pyx_CyFunctionObject *) func;
+    if (m->flags & __Pyx_CYFUNCTION_STATICMETHOD) {
+        Py_INCREF(func);
+        return func;
+    }
+    if (m->flags & __Pyx_CYFUNCTION_CLASSMETHOD) {
+        if (type == NULL)
+            type = (PyObject *)(Py_TYPE(obj));
+        return __Pyx_PyMethod_New(func, type, (PyObject *)(Py_TYPE(type)));
+    }
+    if (obj == Py_None)
+        obj = NULL;
+#endif
+    return __Pyx_PyMethod_New(func, obj, type);
+}
+static PyObject*
+__Pyx_CyFunction_repr(__pyx_CyFunctionObject *op)
+{
+#if PY_MAJOR_VERSION >= 3
+    return PyUnicode_FromFormat("<cyfunction %U at %p>",
+                                op->func_qualname, (void *)op);
+#else
+    return PyString_FromFormat("<cyfunction %s at %p>",
+                               PyString_AsString(op->func_qualname), (void *)op);
+#endif
+}
+static PyObject * __Pyx_CyFunction_CallMethod(PyObject *func, PyObject *self, PyObject *arg, PyObject *kw) {
+    PyCFunctionObject* f = (PyCFunctionObject*)func;
+    PyCFunction meth = f->m_ml->ml_meth;
+    Py_ssize_t size;
+    switch (f->m_ml->ml_flags & (METH_VARARGS | METH_KEYWORDS | METH_NOARGS | METH_O)) {
+    case METH_VARARGS:
+        if (likely(kw == NULL || PyDict_Size(kw) == 0))
+            return (*meth)(self, arg);
+        break;
+    case METH_VARARGS | METH_KEYWORDS:
+        return (*(PyCFunctionWithKeywords)(void*)meth)(self, arg, kw);
+    case METH_NOARGS:
+        if (likely(kw == NULL || PyDict_Size(kw) == 0)) {
+            size = PyTuple_GET_SIZE(arg);
+            if (likely(size == 0))
+                return (*meth)(self, NULL);
+            PyErr_Format(PyExc_TypeError,
+                "%.200s() takes no arguments (%" CYTHON_FORMAT_SSIZE_T "d given)",
+                f->m_ml->ml_name, size);
+            return NULL;
+        }
+        break;
+    case METH_O:
+        if (likely(kw == NULL || PyDict_Size(kw) == 0)) {
+            size = PyTuple_GET_SIZE(arg);
+            if (likely(size == 1)) {
+                PyObject *result, *arg0;
+                #if CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS
+                arg0 = PyTuple_GET_ITEM(arg, 0);
+                #else
+                arg0 = PySequence_ITEM(arg, 0); if (unlikely(!arg0)) return NULL;
+                #endif
+                result = (*meth)(self, arg0);
+                #if !(CYTHON_ASSUME_SAFE_MACROS && !CYTHON_AVOID_BORROWED_REFS)
+                Py_DECREF(arg0);
+                #endif
+                return result;
+            }
+            PyErr_Format(PyExc_TypeError,
+                "%.200s() takes exactly one argument (%" CYTHON_FORMAT_SSIZE_T "d given)",
+                f->m_ml->ml_name, size);
+            return NULL;
+        }
+        break;
+    default:
+        PyErr_SetString(PyExc_SystemError, "Bad call flags in "
+                        "__Pyx_CyFunction_Call. METH_OLDARGS is no "
+                        "longer supported!");
+        return NULL;
+    }
+    PyErr_Format(PyExc_TypeError, "%.200s() takes no keyword arguments",
+                 f->m_ml->ml_name);
+    return NULL;
+}
+static CYTHON_INLINE PyObject *__Pyx_CyFunction_Call(PyObject *func, PyObject *arg, PyObject *kw) {
+    return __Pyx_CyFunction_CallMethod(func, ((PyCFunctionObject*)func)->m_self, arg, kw);
+}
+static PyObject *__Pyx_CyFunction_CallAsMethod(PyObject *func, PyObject *args, PyObject *kw) {
+    PyObject *result;
+    __pyx_CyFunctionObject *cyfunc = (__pyx_CyFunctionObject *) func;
+    if ((cyfunc->flags & __Pyx_CYFUNCTION_CCLASS) && !(cyfunc->flags & __Pyx_CYFUNCTION_STATICMETHOD)) {
+        Py_ssize_t argc;
+        PyObject *new_args;
+        PyObject *self;
+        argc = PyTuple_GET_SIZE(args);
+        new_args = PyTuple_GetSlice(args, 1, argc);
+        if (unlikely(!new_args))
+            return NULL;
+        self = PyTuple_GetItem(args, 0);
+        if (unlikely(!self)) {
+            Py_DECREF(new_args);
+#if PY_MAJOR_VERSION > 2
+            PyErr_Format(PyExc_TypeError,
+                         "unbound method %.200S() needs an argument",
+                         cyfunc->func_qualname);
+#else
+            PyErr_SetString(PyExc_TypeError,
+                            "unbound method needs an argument");
+#endif
+            return NULL;
+        }
+        result = __Pyx_CyFunction_CallMethod(func, self, new_args, kw);
+        Py_DECREF(new_args);
+    } else {
+        result = __Pyx_CyFunction_Call(func, args, kw);
+    }
+    return result;
+}
+static PyTypeObject __pyx_CyFunctionType_type = {
+    PyVarObject_HEAD_INIT(0, 0)
+    "cython_function_or_method",
+    sizeof(__pyx_CyFunctionObject),
+    0,
+    (destructor) __Pyx_CyFunction_dealloc,
+    0,
+    0,
+    0,
+#if PY_MAJOR_VERSION < 3
+    0,
+#else
+    0,
+#endif
+    (reprfunc) __Pyx_CyFunction_repr,
+    0,
+    0,
+    0,
+    0,
+    __Pyx_CyFunction_CallAsMethod,
+    0,
+    0,
+    0,
+    0,
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    0,
+    (traverseproc) __Pyx_CyFunction_traverse,
+    (inquiry) __Pyx_CyFunction_clear,
+    0,
+#if PY_VERSION_HEX < 0x030500A0
+    offsetof(__pyx_CyFunctionObject, func_weakreflist),
+#else
+    offsetof(PyCFunctionObject, m_weakreflist),
+#endif
+    0,
+    0,
+    __pyx_CyFunction_methods,
+    __pyx_CyFunction_members,
+    __pyx_CyFunction_getsets,
+    0,
+    0,
+    __Pyx_CyFunction_descr_get,
+    0,
+    offsetof(__pyx_CyFunctionObject, func_dict),
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+    0,
+#if PY_VERSION_HEX >= 0x030400a1
+    0,
+#endif
+#if PY_VERSION_HEX >= 0x030800b1 && (!CYTHON_COMPILING_IN_PYPY || PYPY_VERSION_NUM >= 0x07030800)
+    0,
+#endif
+#if PY_VERSION_HEX >= 0x030800b4 && PY_VERSION_HEX < 0x03090000
+    0,
+#endif
+#if PY_VERSION_HEX >= 0x030C0000
+    0,
+#endif
+#if CYTHON_COMPILING_IN_PYPY && PY_VERSION_HEX >= 0x03090000 && PY_VERSION_HEX < 0x030a0000
+    0,
+#endif
+};
+static int __pyx_CyFunction_init(void) {
+    __pyx_CyFunctionType = __Pyx_FetchCommonType(&__pyx_CyFunctionType_type);
+    if (unlikely(__pyx_CyFunctionType == NULL)) {
+        return -1;
+    }
+    return 0;
+}
+static CYTHON_INLINE void *__Pyx_CyFunction_InitDefaults(PyObject *func, size_t size, int pyobjects) {
+    __pyx_CyFunctionObject *m = (__pyx_CyFunctionObject *) func;
+    m->defaults = PyObject_Malloc(size);
+    if (unlikely(!m->defaults))
+        return PyErr_NoMemory();
+    memset(m->defaults, 0, size);
+    m->defaults_pyobjects = pyobjects;
+    m->defaults_size = size;
+    return m->defaults;
+}
+static CYTHON_INLINE void __Pyx_CyFunction_SetDefaultsTuple(PyObject *func, PyObject *tuple) {
+    __pyx_CyFunctionObject *m = (__pyx_CyFunctionObject *) func;
+    m->defaults_tuple = tuple;
+    Py_INCREF(tuple);
+}
+static CYTHON_INLINE void __Pyx_CyFunction_SetDefaultsKwDict(PyObject *func, PyObject *dict) {
+    __pyx_CyFunctionObject *m = (__pyx_CyFunctionObject *) func;
+    m->defaults_kwdict = dict;
+    Py_INCREF(dict);
+}
+static CYTHON_INLINE void __Pyx_CyFunction_SetAnnotationsDict(PyObject *func, PyObject *dict) {
+    __pyx_CyFunctionObject *m = (__pyx_CyFunctionObject *) func;
+    m->func_annotations = dict;
+    Py_INCREF(dict);
+}
+
+/* CythonFunction */
+static PyObject *__Pyx_CyFunction_New(PyMethodDef *ml, int flags, PyObject* qualname,
+                                      PyObject *closure, PyObject *module, PyObject* globals, PyObject* code) {
+    PyObject *op = __Pyx_CyFunction_Init(
+        PyObject_GC_New(__pyx_CyFunctionObject, __pyx_CyFunctionType),
+        ml, flags, qualname, closure, module, globals, code
+    );
+    if (likely(op)) {
+        PyObject_GC_Track(op);
+    }
+    return op;
+}
+
+/* RaiseTooManyValuesToUnpack */
+static CYTHON_INLINE void __Pyx_RaiseTooManyValuesError(Py_ssize_t expected) {
+    PyErr_Format(PyExc_ValueError,
+                 "too many values to unpack (expected %" CYTHON_FORMAT_SSIZE_T "d)", expected);
+}
+
+/* RaiseNeedMoreValuesToUnpack */
+static CYTHON_INLINE void __Pyx_RaiseNeedMoreValuesError(Py_ssize_t index) {
+    PyErr_Format(PyExc_ValueError,
+                 "need more than %" CYTHON_FORMAT_SSIZE_T "d value%.1s to unpack",
+                 index, (index == 1) ? "" : "s");
+}
+
+/* IterFinish */
+static CYTHON_INLINE int __Pyx_IterFinish(void) {
+#if CYTHON_FAST_THREAD_STATE
+    PyThreadState *tstate = __Pyx_PyThreadState_Current;
+    PyObject* exc_type = tstate->curexc_type;
+    if (unlikely(exc_type)) {
+        if (likely(__Pyx_PyErr_GivenExceptionMatches(exc_type, PyExc_StopIteration))) {
+            PyObject *exc_value, *exc_tb;
+            exc_value = tstate->curexc_value;
+            exc_tb = tstate->curexc_traceback;
+            tstate->curexc_type = 0;
+            tstate->curexc_value = 0;
+            tstate->curexc_traceback = 0;
+            Py_DECREF(exc_type);
+            Py_XDECREF(exc_value);
+            Py_XDECREF(exc_tb);
+            return 0;
+        } else {
+            return -1;
+        }
+    }
+    return 0;
+#else
+    if (unlikely(PyErr_Occurred())) {
+        if (likely(PyErr_ExceptionMatches(PyExc_StopIteration))) {
+            PyErr_Clear();
+            return 0;
+        } else {
+            return -1;
+        }
+    }
+    return 0;
+#endif
+}
+
+/* UnpackItemEndCheck */
+static int __Pyx_IternextUnpackEndCheck(PyObject *retval, Py_ssize_t expected) {
+    if (unlikely(retval)) {
+        Py_DECREF(retval);
+        __Pyx_RaiseTooManyValuesError(expected);
+        return -1;
+    }
+    return __Pyx_IterFinish();
+}
+
+/* PyErrFetchRestore */
+#if CYTHON_FAST_THREAD_STATE
+static CYTHON_INLINE void __Pyx_ErrRestoreInState(PyThreadState *tstate, PyObject *type, PyObject *value, PyObject *tb) {
+    PyObject *tmp_type, *tmp_value, *tmp_tb;
+    tmp_type = tstate->curexc_type;
+    tmp_value = tstate->curexc_value;
+    tmp_tb = tstate->curexc_traceback;
+    tstate->curexc_type = type;
+    tstate->curexc_value = value;
+    tstate->curexc_traceback = tb;
+    Py_XDECREF(tmp_type);
+    Py_XDECREF(tmp_value);
+    Py_XDECREF(tmp_tb);
+}
+static CYTHON_INLINE void __Pyx_ErrFetchInState(PyThreadState *tstate, PyObject **type, PyObject **value, PyObject **tb) {
+    *type = tstate->curexc_type;
+    *value = tstate->curexc_value;
+    *tb = tstate->curexc_traceback;
+    tstate->curexc_type = 0;
+    tstate->curexc_value = 0;
+    tstate->curexc_traceback = 0;
+}
+#endif
+
+/* WriteUnraisableException */
+static void __Pyx_WriteUnraisable(const char *name, CYTHON_UNUSED int clineno,
+                                  CYTHON_UNUSED int lineno, CYTHON_UNUSED const char *filename,
+                                  int full_traceback, CYTHON_UNUSED int nogil) {
+    PyObject *old_exc, *old_val, *old_tb;
+    PyObject *ctx;
+    __Pyx_PyThreadState_declare
+#ifdef WITH_THREAD
+    PyGILState_STATE state;
+    if (nogil)
+        state = PyGILState_Ensure();
+    else state = (PyGILState_STATE)0;
+#endif
+    __Pyx_PyThreadState_assign
+    __Pyx_ErrFetch(&old_exc, &old_val, &old_tb);
+    if (full_traceback) {
+        Py_XINCREF(old_exc);
+        Py_XINCREF(old_val);
+        Py_XINCREF(old_tb);
+        __Pyx_ErrRestore(old_exc, old_val, old_tb);
+        PyErr_PrintEx(1);
+    }
+    #if PY_MAJOR_VERSION < 3
+    ctx = PyString_FromString(name);
+    #else
+    ctx = PyUnicode_FromString(name);
+    #endif
+    __Pyx_ErrRestore(old_exc, old_val, old_tb);
+    if (!ctx) {
+        PyErr_WriteUnraisable(Py_None);
+    } else {
+        PyErr_WriteUnraisable(ctx);
+        Py_DECREF(ctx);
+    }
+#ifdef WITH_THREAD
+    if (nogil)
+        PyGILState_Release(state);
+#endif
+}
+
+/* PyErrExceptionMatches */
+#if CYTHON_FAST_THREAD_STATE
+static int __Pyx_PyErr_ExceptionMatchesTuple(PyObject *exc_type, PyObject *tuple) {
+    Py_ssize_t i, n;
+    n = PyTuple_GET_SIZE(tuple);
+#if PY_MAJOR_VERSION >= 3
+    for (i=0; i<n; i++) {
+        if (exc_type == PyTuple_GET_ITEM(tuple, i)) return 1;
+    }
+#endif
+    for (i=0; i<n; i++) {
+        if (__Pyx_PyErr_GivenExceptionMatches(exc_type, PyTuple_GET_ITEM(tuple, i))) return 1;
+    }
+    return 0;
+}
+static CYTHON_INLINE int __Pyx_PyErr_ExceptionMatchesInState(PyThreadState* tstate, PyObject* err) {
+    PyObject *exc_type = tstate->curexc_type;
+    if (exc_type == err) return 1;
+    if (unlikely(!exc_type)) return 0;
+    if (unlikely(PyTuple_Check(err)))
+        return __Pyx_PyErr_ExceptionMatchesTuple(exc_type, err);
+    return __Pyx_PyErr_GivenExceptionMatches(exc_type, err);
+}
+#endif
+
+/* GetAttr */
+static CYTHON_INLINE PyObject *__Pyx_GetAttr(PyObject *o, PyObject *n) {
+#if CYTHON_USE_TYPE_SLOTS
+#if PY_MAJOR_VERSION >= 3
+    if (likely(PyUnicode_Check(n)))
+#else
+    if (likely(PyString_Check(n)))
+#endif
+        return __Pyx_PyObject_GetAttrStr(o, n);
+#endif
+    return PyObject_GetAttr(o, n);
+}
+
+/* GetAttr3 */
+static PyObject *__Pyx_GetAttr3Default(PyObject *d) {
+    __Pyx_PyThreadState_declare
+    __Pyx_PyThreadState_assign
+    if (unlikely(!__Pyx_PyErr_ExceptionMatches(PyExc_AttributeError)))
+        return NULL;
+    __Pyx_PyErr_Clear();
+    Py_INCREF(d);
+    return d;
+}
+static CYTHON_INLINE PyObject *__Pyx_GetAttr3(PyObject *o, PyObject *n, PyObject *d) {
+    PyObject *r = __Pyx_GetAttr(o, n);
+    return (likely(r)) ? r : __Pyx_GetAttr3Default(d);
+}
+
+/* RaiseException */
+#if PY_MAJOR_VERSION < 3
+static void __Pyx_Raise(PyObject *type, PyObject *value, PyObject *tb,
+                        CYTHON_UNUSED PyObject *cause) {
+    __Pyx_PyThreadState_declare
+    Py_XINCREF(type);
+    if (!value || value == Py_None)
+        value = NULL;
+    else
+        Py_INCREF(value);
+    if (!tb || tb == Py_None)
+        tb = NULL;
+    else {
+        Py_INCREF(tb);
+        if (!PyTraceBack_Check(tb)) {
+            PyErr_SetString(PyExc_TypeError,
+                "raise: arg 3 must be a traceback or None");
+            goto raise_error;
+        }
+    }
+    if (PyType_Check(type)) {
+#if CYTHON_COMPILING_IN_PYPY
+        if (!value) {
+            Py_INCREF(Py_None);
+            value = Py_None;
+        }
+#endif
+        PyErr_NormalizeException(&type, &value, &tb);
+    } else {
+        if (value) {
+            PyErr_SetString(PyExc_TypeError,
+                "instance exception may not have a separate value");
+            goto raise_error;
+        }
+        value = type;
+        type = (PyObject*) Py_TYPE(type);
+        Py_INCREF(type);
+        if (!PyType_IsSubtype((PyTypeObject *)type, (PyTypeObject *)PyExc_BaseException)) {
+            PyErr_SetString(PyExc_TypeError,
+                "raise: exception class must be a subclass of BaseException");
+            goto raise_error;
+        }
+    }
+    __Pyx_PyThreadState_assign
+    __Pyx_ErrRestore(type, value, tb);
+    return;
+raise_error:
+    Py_XDECREF(value);
+    Py_XDECREF(type);
+    Py_XDECREF(tb);
+    return;
+}
+#else
+static void __Pyx_Raise(PyObject *type, PyObject *value, PyObject *tb, PyObject *cause) {
+    PyObject* owned_instance = NULL;
+    if (tb == Py_None) {
+        tb = 0;
+    } else if (tb && !PyTraceBack_Check(tb)) {
+        PyErr_SetString(PyExc_TypeError,
+            "raise: arg 3 must be a traceback or None");
+        goto bad;
+    }
+    if (value == Py_None)
+        value = 0;
+    if (PyExceptionInstance_Check(type)) {
+        if (value) {
+            PyErr_SetString(PyExc_TypeError,
+                "instance exception may not have a separate value");
+            goto bad;
+        }
+        value = type;
+        type = (PyObject*) Py_TYPE(value);
+    } else if (PyExceptionClass_Check(type)) {
+        PyObject *instance_class = NULL;
+        if (value && PyExceptionInstance_Check(value)) {
+            instance_class = (PyObject*) Py_TYPE(value);
+            if (instance_class != type) {
+                int is_subclass = PyObject_IsSubclass(instance_class, type);
+                if (!is_subclass) {
+                    instance_class = NULL;
+                } else if (unlikely(is_subclass == -1)) {
+                    goto bad;
+                } else {
+                    type = instance_class;
+                }
+            }
+        }
+        if (!instance_class) {
+            PyObject *args;
+            if (!value)
+                args = PyTuple_New(0);
+            else if (PyTuple_Check(value)) {
+                Py_INCREF(value);
+                args = value;
+            } else
+                args = PyTuple_Pack(1, value);
+            if (!args)
+                goto bad;
+            owned_instance = PyObject_Call(type, args, NULL);
+            Py_DECREF(args);
+            if (!owned_instance)
+                goto bad;
+            value = owned_instance;
+            if (!PyExceptionInstance_Check(value)) {
+                PyErr_Format(PyExc_TypeError,
+                             "calling %R should have returned an instance of "
+                             "BaseException, not %R",
+                             type, Py_TYPE(value));
+                goto bad;
+            }
+        }
+    } else {
+        PyErr_SetString(PyExc_TypeError,
+            "raise: exception class must be a subclass of BaseException");
+        goto bad;
+    }
+    if (cause) {
+        PyObject *fixed_cause;
+        if (cause == Py_None) {
+            fixed_cause = NULL;
+        } else if (PyExceptionClass_Check(cause)) {
+            fixed_cause = PyObject_CallObject(cause, NULL);
+            if (fixed_cause == NULL)
+                goto bad;
+        } else if (PyExceptionInstance_Check(cause)) {
+            fixed_cause = cause;
+            Py_INCREF(fixed_cause);
+        } else {
+            PyErr_SetString(PyExc_TypeError,
+                            "exception causes must derive from "
+                            "BaseException");
+            goto bad;
+        }
+        PyException_SetCause(value, fixed_cause);
+    }
+    PyErr_SetObject(type, value);
+    if (tb) {
+#if CYTHON_FAST_THREAD_STATE
+        PyThreadState *tstate = __Pyx_PyThreadState_Current;
+        PyObject* tmp_tb = tstate->curexc_traceback;
+        if (tb != tmp_tb) {
+            Py_INCREF(tb);
+            tstate->curexc_traceback = tb;
+            Py_XDECREF(tmp_tb);
+        }
+#else
+        PyObject *tmp_type, *tmp_value, *tmp_tb;
+        PyErr_Fetch(&tmp_type, &tmp_value, &tmp_tb);
+        Py_INCREF(tb);
+        PyErr_Restore(tmp_type, tmp_value, tb);
+        Py_XDECREF(tmp_tb);
+#endif
+    }
+bad:
+    Py_XDECREF(owned_instance);
+    return;
+}
+#endif
+
+/* ExtTypeTest */
+static CYTHON_INLINE int __Pyx_TypeTest(PyObject *obj, PyTypeObject *type) {
+    if (unlikely(!type)) {
+        PyErr_SetString(PyExc_SystemError, "Missing type object");
+        return 0;
+    }
+    if (likely(__Pyx_TypeCheck(obj, type)))
+        return 1;
+    PyErr_Format(PyExc_TypeError, "Cannot convert %.200s to %.200s",
+                 Py_TYPE(obj)->tp_name, type->tp_name);
+    return 0;
+}
+
+/* HasAttr */
+static CYTHON_INLINE int __Pyx_HasAttr(PyObject *o, PyObject *n) {
+    PyObject *r;
+    if (unlikely(!__Pyx_PyBaseString_Check(n))) {
+        PyErr_SetString(PyExc_TypeError,
+                        "hasattr(): attribute name must be string");
+        return -1;
+    }
+    r = __Pyx_GetAttr(o, n);
+    if (unlikely(!r)) {
+        PyErr_Clear();
+        return 0;
+    } else {
+        Py_DECREF(r);
+        return 1;
+    }
+}
+
+/* GetTopmostException */
+#if CYTHON_USE_EXC_INFO_STACK
+static _PyErr_StackItem *
+__Pyx_PyErr_GetTopmostException(PyThreadState *tstate)
+{
+    _PyErr_StackItem *exc_info = tstate->exc_info;
+    while ((exc_info->exc_type == NULL || exc_info->exc_type == Py_None) &&
+           exc_info->previous_item != NULL)
+    {
+        exc_info = exc_info->previous_item;
+    }
+    return exc_info;
+}
+#endif
+
+/* SaveResetException */
+#if CYTHON_FAST_THREAD_STATE
+static CYTHON_INLINE void __Pyx__ExceptionSave(PyThreadState *tstate, PyObject **type, PyObject **value, PyObject **tb) {
+    #if CYTHON_USE_EXC_INFO_STACK
+    _PyErr_StackItem *exc_info = __Pyx_PyErr_GetTopmostException(tstate);
+    *type = exc_info->exc_type;
+    *value = exc_info->exc_value;
+    *tb = exc_info->exc_traceback;
+    #else
+    *type = tstate->exc_type;
+    *value = tstate->exc_value;
+    *tb = tstate->exc_traceback;
+    #endif
+    Py_XINCREF(*type);
+    Py_XINCREF(*value);
+    Py_XINCREF(*tb);
+}
+static CYTHON_INLINE void __Pyx__ExceptionReset(PyThreadState *tstate, PyObject *type, PyObject *value, PyObject *tb) {
+    PyObject *tmp_type, *tmp_value, *tmp_tb;
+    #if CYTHON_USE_EXC_INFO_STACK
+    _PyErr_StackItem *exc_info = tstate->exc_info;
+    tmp_type = exc_info->exc_type;
+    tmp_value = exc_info->exc_value;
+    tmp_tb = exc_info->exc_traceback;
+    exc_info->exc_type = type;
+    exc_info->exc_value = value;
+    exc_info->exc_traceback = tb;
+    #else
+    tmp_type = tstate->exc_type;
+    tmp_value = tstate->exc_value;
+    tmp_tb = tstate->exc_traceback;
+    tstate->exc_type = type;
+    tstate->exc_value = value;
+    tstate->exc_traceback = tb;
+    #endif
+    Py_XDECREF(tmp_type);
+    Py_XDECREF(tmp_value);
+    Py_XDECREF(tmp_tb);
+}
+#endif
+
+/* GetException */
+#if CYTHON_FAST_THREAD_STATE
+static int __Pyx__GetException(PyThreadState *tstate, PyObject **type, PyObject **value, PyObject **tb)
+#else
+static int __Pyx_GetException(PyObject **type, PyObject **value, PyObject **tb)
+#endif
+{
+    PyObject *local_type, *local_value, *local_tb;
+#if CYTHON_FAST_THREAD_STATE
+    PyObject *tmp_type, *tmp_value, *tmp_tb;
+    local_type = tstate->curexc_type;
+    local_value = tstate->curexc_value;
+    local_tb = tstate->curexc_traceback;
+    tstate->curexc_type = 0;
+    tstate->curexc_value = 0;
+    tstate->curexc_traceback = 0;
+#else
+    PyErr_Fetch(&local_type, &local_value, &local_tb);
+#endif
+    PyErr_NormalizeException(&local_type, &local_value, &local_tb);
+#if CYTHON_FAST_THREAD_STATE
+    if (unlikely(tstate->curexc_type))
+#else
+    if (unlikely(PyErr_Occurred()))
+#endif
+        goto bad;
+    #if PY_MAJOR_VERSION >= 3
+    if (local_tb) {
+        if (unlikely(PyException_SetTraceback(local_value, local_tb) < 0))
+            goto bad;
+    }
+    #endif
+    Py_XINCREF(local_tb);
+    Py_XINCREF(local_type);
+    Py_XINCREF(local_value);
+    *type = local_type;
+    *value = local_value;
+    *tb = local_tb;
+#if CYTHON_FAST_THREAD_STATE
+    #if CYTHON_USE_EXC_INFO_STACK
+    {
+        _PyErr_StackItem *exc_info = tstate->exc_info;
+        tmp_type = exc_info->exc_type;
+        tmp_value = exc_info->exc_value;
+        tmp_tb = exc_info->exc_traceback;
+        exc_info->exc_type = local_type;
+        exc_info->exc_value = local_value;
+        exc_info->exc_traceback = local_tb;
+    }
+    #else
+    tmp_type = tstate->exc_type;
+    tmp_value = tstate->exc_value;
+    tmp_tb = tstate->exc_traceback;
+    tstate->exc_type = local_type;
+    tstate->exc_value = local_value;
+    tstate->exc_traceback = local_tb;
+    #endif
+    Py_XDECREF(tmp_type);
+    Py_XDECREF(tmp_value);
+    Py_XDECREF(tmp_tb);
+#else
+    PyErr_SetExcInfo(local_type, local_value, local_tb);
+#endif
+    return 0;
+bad:
+    *type = 0;
+    *value = 0;
+    *tb = 0;
+    Py_XDECREF(local_type);
+    Py_XDECREF(local_value);
+    Py_XDECREF(local_tb);
+    return -1;
+}
+
+/* PyObjectSetAttrStr */
+#if CYTHON_USE_TYPE_SLOTS
+static CYTHON_INLINE int __Pyx_PyObject_SetAttrStr(PyObject* obj, PyObject* attr_name, PyObject* value) {
+    PyTypeObject* tp = Py_TYPE(obj);
+    if (likely(tp->tp_setattro))
+        return tp->tp_setattro(obj, attr_name, value);
+#if PY_MAJOR_VERSION < 3
+    if (likely(tp->tp_setattr))
+        return tp->tp_setattr(obj, PyString_AS_STRING(attr_name), value);
+#endif
+    return PyObject_SetAttr(obj, attr_name, value);
+}
+#endif
+
+/* CallNextTpDealloc */
+static void __Pyx_call_next_tp_dealloc(PyObject* obj, destructor current_tp_dealloc) {
+    PyTypeObject* type = Py_TYPE(obj);
+    while (type && type->tp_dealloc != current_tp_dealloc)
+        type = type->tp_base;
+    while (type && type->tp_dealloc == current_tp_dealloc)
+        type = type->tp_base;
+    if (type)
+        type->tp_dealloc(obj);
+}
+
+/* CallNextTpTraverse */
+static int __Pyx_call_next_tp_traverse(PyObject* obj, visitproc v, void *a, traverseproc current_tp_traverse) {
+    PyTypeObject* type = Py_TYPE(obj);
+    while (type && type->tp_traverse != current_tp_traverse)
+        type = type->tp_base;
+    while (type && type->tp_traverse == current_tp_traverse)
+        type = type->tp_base;
+    if (type && type->tp_traverse)
+        return type->tp_traverse(obj, v, a);
+    return 0;
+}
+
+/* CallNextTpClear */
+static void __Pyx_call_next_tp_clear(PyObject* obj, inquiry current_tp_clear) {
+    PyTypeObject* type = Py_TYPE(obj);
+    while (type && type->tp_clear != current_tp_clear)
+        type = type->tp_base;
+    while (type && type->tp_clear == current_tp_clear)
+        type = type->tp_base;
+    if (type && type->tp_clear)
+        type->tp_clear(obj);
+}
+
+/* TypeImport */
+#ifndef __PYX_HAVE_RT_ImportType_0_29_37
+#define __PYX_HAVE_RT_ImportType_0_29_37
+static PyTypeObject *__Pyx_ImportType_0_29_37(PyObject *module, const char *module_name, const char *class_name,
+    size_t size, size_t alignment, enum __Pyx_ImportType_CheckSize_0_29_37 check_size)
+{
+    PyObject *result = 0;
+    char warning[200];
+    Py_ssize_t basicsize;
+    Py_ssize_t itemsize;
+#ifdef Py_LIMITED_API
+    PyObject *py_basicsize;
+    PyObject *py_itemsize;
+#endif
+    result = PyObject_GetAttrString(module, class_name);
+    if (!result)
+        goto bad;
+    if (!PyType_Check(result)) {
+        PyErr_Format(PyExc_TypeError,
+            "%.200s.%.200s is not a type object",
+            module_name, class_name);
+        goto bad;
+    }
+#ifndef Py_LIMITED_API
+    basicsize = ((PyTypeObject *)result)->tp_basicsize;
+    itemsize = ((PyTypeObject *)result)->tp_itemsize;
+#else
+    py_basicsize = PyObject_GetAttrString(result, "__basicsize__");
+    if (!py_basicsize)
+        goto bad;
+    basicsize = PyLong_AsSsize_t(py_basicsize);
+    Py_DECREF(py_basicsize);
+    py_basicsize = 0;
+    if (basicsize == (Py_ssize_t)-1 && PyErr_Occurred())
+        goto bad;
+    py_itemsize = PyObject_GetAttrString(result, "__itemsize__");
+    if (!py_itemsize)
+        goto bad;
+    itemsize = PyLong_AsSsize_t(py_itemsize);
+    Py_DECREF(py_itemsize);
+    py_itemsize = 0;
+    if (itemsize == (Py_ssize_t)-1 && PyErr_Occurred())
+        goto bad;
+#endif
+    if (itemsize) {
+        if (size % alignment) {
+            alignment = size % alignment;
+        }
+        if (itemsize < (Py_ssize_t)alignment)
+            itemsize = (Py_ssize_t)alignment;
+    }
+    if ((size_t)(basicsize + itemsize) < size) {
+        PyErr_Format(PyExc_ValueError,
+            "%.200s.%.200s size changed, may indicate binary incompatibility. "
+            "Expected %zd from C header, got %zd from PyObject",
+            module_name, class_name, size, basicsize);
+        goto bad;
+    }
+    if (check_size == __Pyx_ImportType_CheckSize_Error_0_29_37 && (size_t)basicsize != size) {
+        PyErr_Format(PyExc_ValueError,
+            "%.200s.%.200s size changed, may indicate binary incompatibility. "
+            "Expected %zd from C header, got %zd from PyObject",
+            module_name, class_name, size, basicsize);
+        goto bad;
+    }
+    else if (check_size == __Pyx_ImportType_CheckSize_Warn_0_29_37 && (size_t)basicsize > size) {
+        PyOS_snprintf(warning, sizeof(warning),
+            "%s.%s size changed, may indicate binary incompatibility. "
+            "Expected %zd from C header, got %zd from PyObject",
+            module_name, class_name, size, basicsize);
+        if (PyErr_WarnEx(NULL, warning, 0) < 0) goto bad;
+    }
+    return (PyTypeObject *)result;
+bad:
+    Py_XDECREF(result);
+    return NULL;
+}
+#endif
+
+/* GetVTable */
+static void* __Pyx_GetVtable(PyObject *dict) {
+    void* ptr;
+    PyObject *ob = PyObject_GetItem(dict, __pyx_n_s_pyx_vtable);
+    if (!ob)
+        goto bad;
+#if PY_VERSION_HEX >= 0x02070000
+    ptr = PyCapsule_GetPointer(ob, 0);
+#else
+    ptr = PyCObject_AsVoidPtr(ob);
+#endif
+    if (!ptr && !PyErr_Occurred())
+        PyErr_SetString(PyExc_RuntimeError, "invalid vtable found for imported type");
+    Py_DECREF(ob);
+    return ptr;
+bad:
+    Py_XDECREF(ob);
+    return NULL;
+}
+
+/* PyObject_GenericGetAttrNoDict */
+#if CYTHON_USE_TYPE_SLOTS && CYTHON_USE_PYTYPE_LOOKUP && PY_VERSION_HEX < 0x03070000
+static PyObject *__Pyx_RaiseGenericGetAttributeError(PyTypeObject *tp, PyObject *attr_name) {
+    PyErr_Format(PyExc_AttributeError,
+#if PY_MAJOR_VERSION >= 3
+                 "'%.50s' object has no attribute '%U'",
+                 tp->tp_name, attr_name);
+#else
+                 "'%.50s' object has no attribute '%.400s'",
+                 tp->tp_name, PyString_AS_STRING(attr_name));
+#endif
+    return NULL;
+}
+static CYTHON_INLINE PyObject* __Pyx_PyObject_GenericGetAttrNoDict(PyObject* obj, PyObject* attr_name) {
+    PyObject *descr;
+    PyTypeObject *tp = Py_TYPE(obj);
+    if (unlikely(!PyString_Check(attr_name))) {
+        return PyObject_GenericGetAttr(obj, attr_name);
+    }
+    assert(!tp->tp_dictoffset);
+    descr = _PyType_Lookup(tp, attr_name);
+    if (unlikely(!descr)) {
+        return __Pyx_RaiseGenericGetAttributeError(tp, attr_name);
+    }
+    Py_INCREF(descr);
+    #if PY_MAJOR_VERSION < 3
+    if (likely(PyType_HasFeature(Py_TYPE(descr), Py_TPFLAGS_HAVE_CLASS)))
+    #endif
+    {
+        descrgetfunc f = Py_TYPE(descr)->tp_descr_get;
+        if (unlikely(f)) {
+            PyObject *res = f(descr, obj, (PyObject *)tp);
+            Py_DECREF(descr);
+            return res;
+        }
+    }
+    return descr;
+}
+#endif
+
+/* PyObject_GenericGetAttr */
+#if CYTHON_USE_TYPE_SLOTS && CYTHON_USE_PYTYPE_LOOKUP && PY_VERSION_HEX < 0x03070000
+static PyObject* __Pyx_PyObject_GenericGetAttr(PyObject* obj, PyObject* attr_name) {
+    if (unlikely(Py_TYPE(obj)->tp_dictoffset)) {
+        return PyObject_GenericGetAttr(obj, attr_name);
+    }
+    return __Pyx_PyObject_GenericGetAttrNoDict(obj, attr_name);
+}
+#endif
+
+/* SetVTable */
+static int __Pyx_SetVtable(PyObject *dict, void *vtable) {
+#if PY_VERSION_HEX >= 0x02070000
+    PyObject *ob = PyCapsule_New(vtable, 0, 0);
+#else
+    PyObject *ob = PyCObject_FromVoidPtr(vtable, 0);
+#endif
+    if (!ob)
+        goto bad;
+    if (PyDict_SetItem(dict, __pyx_n_s_pyx_vtable, ob) < 0)
+        goto bad;
+    Py_DECREF(ob);
+    return 0;
+bad:
+    Py_XDECREF(ob);
+    return -1;
+}
+
+/* PyObjectGetAttrStrNoError */
+static void __Pyx_PyObject_GetAttrStr_ClearAttributeError(void) {
+    __Pyx_PyThreadState_declare
+    __Pyx_PyThreadState_assign
+    if (likely(__Pyx_PyErr_ExceptionMatches(PyExc_AttributeError)))
+        __Pyx_PyErr_Clear();
+}
+static CYTHON_INLINE PyObject* __Pyx_PyObject_GetAttrStrNoError(PyObject* obj, PyObject* attr_name) {
+    PyObject *result;
+#if CYTHON_COMPILING_IN_CPYTHON && CYTHON_USE_TYPE_SLOTS && PY_VERSION_HEX >= 0x030700B1
+    PyTypeObject* tp = Py_TYPE(obj);
+    if (likely(tp->tp_getattro == PyObject_GenericGetAttr)) {
+        return _PyObject_GenericGetAttrWithDict(obj, attr_name, NULL, 1);
+    }
+#endif
+    result = __Pyx_PyObject_GetAttrStr(obj, attr_name);
+    if (unlikely(!result)) {
+        __Pyx_PyObject_GetAttrStr_ClearAttributeError();
+    }
+    return result;
+}
+
+/* SetupReduce */
+static int __Pyx_setup_reduce_is_named(PyObject* meth, PyObject* name) {
+  int ret;
+  PyObject *name_attr;
+  name_attr = __Pyx_PyObject_GetAttrStr(meth, __pyx_n_s_name);
+  if (likely(name_attr)) {
+      ret = PyObject_RichCompareBool(name_attr, name, Py_EQ);
+  } else {
+      ret = -1;
+  }
+  if (unlikely(ret < 0)) {
+      PyErr_Clear();
+      ret = 0;
+  }
+  Py_XDECREF(name_attr);
+  return ret;
+}
+static int __Pyx_setup_reduce(PyObject* type_obj) {
+    int ret = 0;
+    PyObject *object_reduce = NULL;
+    PyObject *object_getstate = NULL;
+    PyObject *object_reduce_ex = NULL;
+    PyObject *reduce = NULL;
+    PyObject *reduce_ex = NULL;
+    PyObject *reduce_cython = NULL;
+    PyObject *setstate = NULL;
+    PyObject *setstate_cython = NULL;
+    PyObject *getstate = NULL;
+#if CYTHON_USE_PYTYPE_LOOKUP
+    getstate = _PyType_Lookup((PyTypeObject*)type_obj, __pyx_n_s_getstate);
+#else
+    getstate = __Pyx_PyObject_GetAttrStrNoError(type_obj, __pyx_n_s_getstate);
+    if (!getstate && PyErr_Occurred()) {
+        goto __PYX_BAD;
+    }
+#endif
+    if (getstate) {
+#if CYTHON_USE_PYTYPE_LOOKUP
+        object_getstate = _PyType_Lookup(&PyBaseObject_Type, __pyx_n_s_getstate);
+#else
+        object_getstate = __Pyx_PyObject_GetAttrStrNoError((PyObject*)&PyBaseObject_Type, __pyx_n_s_getstate);
+        if (!object_getstate && PyErr_Occurred()) {
+            goto __PYX_BAD;
+        }
+#endif
+        if (object_getstate != getstate) {
+            goto __PYX_GOOD;
+        }
+    }
+#if CYTHON_USE_PYTYPE_LOOKUP
+    object_reduce_ex = _PyType_Lookup(&PyBaseObject_Type, __pyx_n_s_reduce_ex); if (!object_reduce_ex) goto __PYX_BAD;
+#else
+    object_reduce_ex = __Pyx_PyObject_GetAttrStr((PyObject*)&PyBaseObject_Type, __pyx_n_s_reduce_ex); if (!object_reduce_ex) goto __PYX_BAD;
+#endif
+    reduce_ex = __Pyx_PyObject_GetAttrStr(type_obj, __pyx_n_s_reduce_ex); if (unlikely(!reduce_ex)) goto __PYX_BAD;
+    if (reduce_ex == object_reduce_ex) {
+#if CYTHON_USE_PYTYPE_LOOKUP
+        object_reduce = _PyType_Lookup(&PyBaseObject_Type, __pyx_n_s_reduce); if (!object_reduce) goto __PYX_BAD;
+#else
+        object_reduce = __Pyx_PyObject_GetAttrStr((PyObject*)&PyBaseObject_Type, __pyx_n_s_reduce); if (!object_reduce) goto __PYX_BAD;
+#endif
+        reduce = __Pyx_PyObject_GetAttrStr(type_obj, __pyx_n_s_reduce); if (unlikely(!reduce)) goto __PYX_BAD;
+        if (reduce == object_reduce || __Pyx_setup_reduce_is_named(reduce, __pyx_n_s_reduce_cython)) {
+            reduce_cython = __Pyx_PyObject_GetAttrStrNoError(type_obj, __pyx_n_s_reduce_cython);
+            if (likely(reduce_cython)) {
+                ret = PyDict_SetItem(((PyTypeObject*)type_obj)->tp_dict, __pyx_n_s_reduce, reduce_cython); if (unlikely(ret < 0)) goto __PYX_BAD;
+                ret = PyDict_DelItem(((PyTypeObject*)type_obj)->tp_dict, __pyx_n_s_reduce_cython); if (unlikely(ret < 0)) goto __PYX_BAD;
+            } else if (reduce == object_reduce || PyErr_Occurred()) {
+                goto __PYX_BAD;
+            }
+            setstate = __Pyx_PyObject_GetAttrStr(type_obj, __pyx_n_s_setstate);
+            if (!setstate) PyErr_Clear();
+            if (!setstate || __Pyx_setup_reduce_is_named(setstate, __pyx_n_s_setstate_cython)) {
+                setstate_cython = __Pyx_PyObject_GetAttrStrNoError(type_obj, __pyx_n_s_setstate_cython);
+                if (likely(setstate_cython)) {
+                    ret = PyDict_SetItem(((PyTypeObject*)type_obj)->tp_dict, __pyx_n_s_setstate, setstate_cython); if (unlikely(ret < 0)) goto __PYX_BAD;
+                    ret = PyDict_DelItem(((PyTypeObject*)type_obj)->tp_dict, __pyx_n_s_setstate_cython); if (unlikely(ret < 0)) goto __PYX_BAD;
+                } else if (!setstate || PyErr_Occurred()) {
+                    goto __PYX_BAD;
+                }
+            }
+            PyType_Modified((PyTypeObject*)type_obj);
+        }
+    }
+    goto __PYX_GOOD;
+__PYX_BAD:
+    if (!PyErr_Occurred())
+        PyErr_Format(PyExc_RuntimeError, "Unable to initialize pickling for %s", ((PyTypeObject*)type_obj)->tp_name);
+    ret = -1;
+__PYX_GOOD:
+#if !CYTHON_USE_PYTYPE_LOOKUP
+    Py_XDECREF(object_reduce);
+    Py_XDECREF(object_reduce_ex);
+    Py_XDECREF(object_getstate);
+    Py_XDECREF(getstate);
+#endif
+    Py_XDECREF(reduce);
+    Py_XDECREF(reduce_ex);
+    Py_XDECREF(reduce_cython);
+    Py_XDECREF(setstate);
+    Py_XDECREF(setstate_cython);
+    return ret;
+}
+
+/* CLineInTraceback */
+#ifndef CYTHON_CLINE_IN_TRACEBACK
+static int __Pyx_CLineForTraceback(CYTHON_UNUSED PyThreadState *tstate, int c_line) {
+    PyObject *use_cline;
+    PyObject *ptype, *pvalue, *ptraceback;
+#if CYTHON_COMPILING_IN_CPYTHON
+    PyObject **cython_runtime_dict;
+#endif
+    if (unlikely(!__pyx_cython_runtime)) {
+        return c_line;
+    }
+    __Pyx_ErrFetchInState(tstate, &ptype, &pvalue, &ptraceback);
+#if CYTHON_COMPILING_IN_CPYTHON
+    cython_runtime_dict = _PyObject_GetDictPtr(__pyx_cython_runtime);
+    if (likely(cython_runtime_dict)) {
+        __PYX_PY_DICT_LOOKUP_IF_MODIFIED(
+            use_cline, *cython_runtime_dict,
+            __Pyx_PyDict_GetItemStr(*cython_runtime_dict, __pyx_n_s_cline_in_traceback))
+    } else
+#endif
+    {
+      PyObject *use_cline_obj = __Pyx_PyObject_GetAttrStr(__pyx_cython_runtime, __pyx_n_s_cline_in_traceback);
+      if (use_cline_obj) {
+        use_cline = PyObject_Not(use_cline_obj) ? Py_False : Py_True;
+        Py_DECREF(use_cline_obj);
+      } else {
+        PyErr_Clear();
+        use_cline = NULL;
+      }
+    }
+    if (!use_cline) {
+        c_line = 0;
+        (void) PyObject_SetAttr(__pyx_cython_runtime, __pyx_n_s_cline_in_traceback, Py_False);
+    }
+    else if (use_cline == Py_False || (use_cline != Py_True && PyObject_Not(use_cline) != 0)) {
+        c_line = 0;
+    }
+    __Pyx_ErrRestoreInState(tstate, ptype, pvalue, ptraceback);
+    return c_line;
+}
+#endif
+
+/* CodeObjectCache */
+static int __pyx_bisect_code_objects(__Pyx_CodeObjectCacheEntry* entries, int count, int code_line) {
+    int start = 0, mid = 0, end = count - 1;
+    if (end >= 0 && code_line > entries[end].code_line) {
+        return count;
+    }
+    while (start < end) {
+        mid = start + (end - start) / 2;
+        if (code_line < entries[mid].code_line) {
+            end = mid;
+        } else if (code_line > entries[mid].code_line) {
+             start = mid + 1;
+        } else {
+            return mid;
+        }
+    }
+    if (code_line <= entries[mid].code_line) {
+        return mid;
+    } else {
+        return mid + 1;
+    }
+}
+static PyCodeObject *__pyx_find_code_object(int code_line) {
+    PyCodeObject* code_object;
+    int pos;
+    if (unlikely(!code_line) || unlikely(!__pyx_code_cache.entries)) {
+        return NULL;
+    }
+    pos = __pyx_bisect_code_objects(__pyx_code_cache.entries, __pyx_code_cache.count, code_line);
+    if (unlikely(pos >= __pyx_code_cache.count) || unlikely(__pyx_code_cache.entries[pos].code_line != code_line)) {
+        return NULL;
+    }
+    code_object = __pyx_code_cache.entries[pos].code_object;
+    Py_INCREF(code_object);
+    return code_object;
+}
+static void __pyx_insert_code_object(int code_line, PyCodeObject* code_object) {
+    int pos, i;
+    __Pyx_CodeObjectCacheEntry* entries = __pyx_code_cache.entries;
+    if (unlikely(!code_line)) {
+        return;
+    }
+    if (unlikely(!entries)) {
+        entries = (__Pyx_CodeObjectCacheEntry*)PyMem_Malloc(64*sizeof(__Pyx_CodeObjectCacheEntry));
+        if (likely(entries)) {
+            __pyx_code_cache.entries = entries;
+            __pyx_code_cache.max_count = 64;
+            __pyx_code_cache.count = 1;
+            entries[0].code_line = code_line;
+            entries[0].code_object = code_object;
+            Py_INCREF(code_object);
+        }
+        return;
+    }
+    pos = __pyx_bisect_code_objects(__pyx_code_cache.entries, __pyx_code_cache.count, code_line);
+    if ((pos < __pyx_code_cache.count) && unlikely(__pyx_code_cache.entries[pos].code_line == code_line)) {
+        PyCodeObject* tmp = entries[pos].code_object;
+        entries[pos].code_object = code_object;
+        Py_DECREF(tmp);
+        return;
+    }
+    if (__pyx_code_cache.count == __pyx_code_cache.max_count) {
+        int new_max = __pyx_code_cache.max_count + 64;
+        entries = (__Pyx_CodeObjectCacheEntry*)PyMem_Realloc(
+            __pyx_code_cache.entries, ((size_t)new_max) * sizeof(__Pyx_CodeObjectCacheEntry));
+        if (unlikely(!entries)) {
+            return;
+        }
+        __pyx_code_cache.entries = entries;
+        __pyx_code_cache.max_count = new_max;
+    }
+    for (i=__pyx_code_cache.count; i>pos; i--) {
+        entries[i] = entries[i-1];
+    }
+    entries[pos].code_line = code_line;
+    entries[pos].code_object = code_object;
+    __pyx_code_cache.count++;
+    Py_INCREF(code_object);
+}
+
+/* AddTraceback */
+#include "compile.h"
+#include "frameobject.h"
+#include "traceback.h"
+#if PY_VERSION_HEX >= 0x030b00a6
+  #ifndef Py_BUILD_CORE
+    #define Py_BUILD_CORE 1
+  #endif
+  #include "internal/pycore_frame.h"
+#endif
+static PyCodeObject* __Pyx_CreateCodeObjectForTraceback(
+            const char *funcname, int c_line,
+            int py_line, const char *filename) {
+    PyCodeObject *py_code = NULL;
+    PyObject *py_funcname = NULL;
+    #if PY_MAJOR_VERSION < 3
+    PyObject *py_srcfile = NULL;
+    py_srcfile = PyString_FromString(filename);
+    if (!py_srcfile) goto bad;
+    #endif
+    if (c_line) {
+        #if PY_MAJOR_VERSION < 3
+        py_funcname = PyString_FromFormat( "%s (%s:%d)", funcname, __pyx_cfilenm, c_line);
+        if (!py_funcname) goto bad;
+        #else
+        py_funcname = PyUnicode_FromFormat( "%s (%s:%d)", funcname, __pyx_cfilenm, c_line);
+        if (!py_funcname) goto bad;
+        funcname = PyUnicode_AsUTF8(py_funcname);
+        if (!funcname) goto bad;
+        #endif
+    }
+    else {
+        #if PY_MAJOR_VERSION < 3
+        py_funcname = PyString_FromString(funcname);
+        if (!py_funcname) goto bad;
+        #endif
+    }
+    #if PY_MAJOR_VERSION < 3
+    py_code = __Pyx_PyCode_New(
+        0,
+        0,
+        0,
+        0,
+        0,
+        __pyx_empty_bytes, /*PyObject *code,*/
+        __pyx_empty_tuple, /*PyObject *consts,*/
+        __pyx_empty_tuple, /*PyObject *names,*/
+        __pyx_empty_tuple, /*PyObject *varnames,*/
+        __pyx_empty_tuple, /*PyObject *freevars,*/
+        __pyx_empty_tuple, /*PyObject *cellvars,*/
+        py_srcfile,   /*PyObject *filename,*/
+        py_funcname,  /*PyObject *name,*/
+        py_line,
+        __pyx_empty_bytes  /*PyObject *lnotab*/
+    );
+    Py_DECREF(py_srcfile);
+    #else
+    py_code = PyCode_NewEmpty(filename, funcname, py_line);
+    #endif
+    Py_XDECREF(py_funcname);  // XDECREF since it's only set on Py3 if cline
+    return py_code;
+bad:
+    Py_XDECREF(py_funcname);
+    #if PY_MAJOR_VERSION < 3
+    Py_XDECREF(py_srcfile);
+    #endif
+    return NULL;
+}
+static void __Pyx_AddTraceback(const char *funcname, int c_line,
+                               int py_line, const char *filename) {
+    PyCodeObject *py_code = 0;
+    PyFrameObject *py_frame = 0;
+    PyThreadState *tstate = __Pyx_PyThreadState_Current;
+    PyObject *ptype, *pvalue, *ptraceback;
+    if (c_line) {
+        c_line = __Pyx_CLineForTraceback(tstate, c_line);
+    }
+    py_code = __pyx_find_code_object(c_line ? -c_line : py_line);
+    if (!py_code) {
+        __Pyx_ErrFetchInState(tstate, &ptype, &pvalue, &ptraceback);
+        py_code = __Pyx_CreateCodeObjectForTraceback(
+            funcname, c_line, py_line, filename);
+        if (!py_code) {
+            /* If the code object creation fails, then we should clear the
+               fetched exception references and propagate the new exception */
+            Py_XDECREF(ptype);
+            Py_XDECREF(pvalue);
+            Py_XDECREF(ptraceback);
+            goto bad;
+        }
+        __Pyx_ErrRestoreInState(tstate, ptype, pvalue, ptraceback);
+        __pyx_insert_code_object(c_line ? -c_line : py_line, py_code);
+    }
+    py_frame = PyFrame_New(
+        tstate,            /*PyThreadState *tstate,*/
+        py_code,           /*PyCodeObject *code,*/
+        __pyx_d,    /*PyObject *globals,*/
+        0                  /*PyObject *locals*/
+    );
+    if (!py_frame) goto bad;
+    __Pyx_PyFrame_SetLineNumber(py_frame, py_line);
+    PyTraceBack_Here(py_frame);
+bad:
+    Py_XDECREF(py_code);
+    Py_XDECREF(py_frame);
+}
+
+/* CIntFromPyVerify */
+#define __PYX_VERIFY_RETURN_INT(target_type, func_type, func_value)\
+    __PYX__VERIFY_RETURN_INT(target_type, func_type, func_value, 0)
+#define __PYX_VERIFY_RETURN_INT_EXC(target_type, func_type, func_value)\
+    __PYX__VERIFY_RETURN_INT(target_type, func_type, func_value, 1)
+#define __PYX__VERIFY_RETURN_INT(target_type, func_type, func_value, exc)\
+    {\
+        func_type value = func_value;\
+        if (sizeof(target_type) < sizeof(func_type)) {\
+            if (unlikely(value != (func_type) (target_type) value)) {\
+                func_type zero = 0;\
+                if (exc && unlikely(value == (func_type)-1 && PyErr_Occurred()))\
+                    return (target_type) -1;\
+                if (is_unsigned && unlikely(value < zero))\
+                    goto raise_neg_overflow;\
+                else\
+                    goto raise_overflow;\
+            }\
+        }\
+        return (target_type) value;\
+    }
+
+/* Declarations */
+#if CYTHON_CCOMPLEX
+  #ifdef __cplusplus
+    static CYTHON_INLINE __pyx_t_float_complex __pyx_t_float_complex_from_parts(float x, float y) {
+      return ::std::complex< float >(x, y);
+    }
+  #else
+    static CYTHON_INLINE __pyx_t_float_complex __pyx_t_float_complex_from_parts(float x, float y) {
+      return x + y*(__pyx_t_float_complex)_Complex_I;
+    }
+  #endif
+#else
+    static CYTHON_INLINE __pyx_t_float_complex __pyx_t_float_complex_from_parts(float x, float y) {
+      __pyx_t_float_complex z;
+      z.real = x;
+      z.imag = y;
+      return z;
+    }
+#endif
+
+/* Arithmetic */
+#if CYTHON_CCOMPLEX
+#else
+    static CYTHON_INLINE int __Pyx_c_eq_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+       return (a.real == b.real) && (a.imag == b.imag);
+    }
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_sum_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+        __pyx_t_float_complex z;
+        z.real = a.real + b.real;
+        z.imag = a.imag + b.imag;
+        return z;
+    }
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_diff_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+        __pyx_t_float_complex z;
+        z.real = a.real - b.real;
+        z.imag = a.imag - b.imag;
+        return z;
+    }
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_prod_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+        __pyx_t_float_complex z;
+        z.real = a.real * b.real - a.imag * b.imag;
+        z.imag = a.real * b.imag + a.imag * b.real;
+        return z;
+    }
+    #if 1
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_quot_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+        if (b.imag == 0) {
+            return __pyx_t_float_complex_from_parts(a.real / b.real, a.imag / b.real);
+        } else if (fabsf(b.real) >= fabsf(b.imag)) {
+            if (b.real == 0 && b.imag == 0) {
+                return __pyx_t_float_complex_from_parts(a.real / b.real, a.imag / b.imag);
+            } else {
+                float r = b.imag / b.real;
+                float s = (float)(1.0) / (b.real + b.imag * r);
+                return __pyx_t_float_complex_from_parts(
+                    (a.real + a.imag * r) * s, (a.imag - a.real * r) * s);
+            }
+        } else {
+            float r = b.real / b.imag;
+            float s = (float)(1.0) / (b.imag + b.real * r);
+            return __pyx_t_float_complex_from_parts(
+                (a.real * r + a.imag) * s, (a.imag * r - a.real) * s);
+        }
+    }
+    #else
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_quot_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+        if (b.imag == 0) {
+            return __pyx_t_float_complex_from_parts(a.real / b.real, a.imag / b.real);
+        } else {
+            float denom = b.real * b.real + b.imag * b.imag;
+            return __pyx_t_float_complex_from_parts(
+                (a.real * b.real + a.imag * b.imag) / denom,
+                (a.imag * b.real - a.real * b.imag) / denom);
+        }
+    }
+    #endif
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_neg_float(__pyx_t_float_complex a) {
+        __pyx_t_float_complex z;
+        z.real = -a.real;
+        z.imag = -a.imag;
+        return z;
+    }
+    static CYTHON_INLINE int __Pyx_c_is_zero_float(__pyx_t_float_complex a) {
+       return (a.real == 0) && (a.imag == 0);
+    }
+    static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_conj_float(__pyx_t_float_complex a) {
+        __pyx_t_float_complex z;
+        z.real =  a.real;
+        z.imag = -a.imag;
+        return z;
+    }
+    #if 1
+        static CYTHON_INLINE float __Pyx_c_abs_float(__pyx_t_float_complex z) {
+          #if !defined(HAVE_HYPOT) || defined(_MSC_VER)
+            return sqrtf(z.real*z.real + z.imag*z.imag);
+          #else
+            return hypotf(z.real, z.imag);
+          #endif
+        }
+        static CYTHON_INLINE __pyx_t_float_complex __Pyx_c_pow_float(__pyx_t_float_complex a, __pyx_t_float_complex b) {
+            __pyx_t_float_complex z;
+            float r, lnr, theta, z_r, z_theta;
+            if (b.imag == 0 && b.real == (int)b.real) {
+                if (b.real < 0) {
+                    float denom = a.real * a.real + a.imag * a.imag;
+                    a.real = a.real / denom;
+                    a.imag = -a.imag / denom;
+                    b.real = -b.real;
+                }
+                switch ((int)b.real) {
+                    case 0:
+                        z.real = 1;
+                        z.imag = 0;
+                        return z;
+                    case 1:
+                        return a;
+                    case 2:
+                        return __Pyx_c_prod_float(a, a);
+                    case 3:
+                        z = __Pyx_c_prod_float(a, a);
+                        return __Pyx_c_prod_float(z, a);
+                    case 4:
+                        z = __Pyx_c_prod_float(a, a);
+                        return __Pyx_c_prod_float(z, z);
+                }
+            }
+            if (a.imag == 0) {
+                if (a.real == 0) {
+                    return a;
+                } else if ((b.imag == 0) && (a.real >= 0)) {
+                    z.real = powf(a.real, b.real);
+                    z.imag = 0;
+                    return z;
+                } else if (a.real > 0) {
+                    r = a.real;
+                    theta = 0;
+                } else {
+                    r = -a.real;
+                    theta = atan2f(0.0, -1.0);
+                }
+            } else {
+                r = __Pyx_c_abs_float(a);
+                theta = atan2f(a.imag, a.real);
+            }
+            lnr = logf(r);
+            z_r = expf(lnr * b.real - theta * b.imag);
+            z_theta = theta * b.real + lnr * b.imag;
+            z.real = z_r * cosf(z_theta);
+            z.imag = z_r * sinf(z_theta);
+            return z;
+        }
+    #endif
+#endif
+
+/* Declarations */
+#if CYTHON_CCOMPLEX
+  #ifdef __cplusplus
+    static CYTHON_INLINE __pyx_t_double_complex __pyx_t_double_complex_from_parts(double x, double y) {
+      return ::std::complex< double >(x, y);
+    }
+  #else
+    static CYTHON_INLINE __pyx_t_double_complex __pyx_t_double_complex_from_parts(double x, double y) {
+      return x + y*(__pyx_t_double_complex)_Complex_I;
+    }
+  #endif
+#else
+    static CYTHON_INLINE __pyx_t_double_complex __pyx_t_double_complex_from_parts(double x, double y) {
+      __pyx_t_double_complex z;
+      z.real = x;
+      z.imag = y;
+      return z;
+    }
+#endif
+
+/* Arithmetic */
+#if CYTHON_CCOMPLEX
+#else
+    static CYTHON_INLINE int __Pyx_c_eq_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+       return (a.real == b.real) && (a.imag == b.imag);
+    }
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_sum_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+        __pyx_t_double_complex z;
+        z.real = a.real + b.real;
+        z.imag = a.imag + b.imag;
+        return z;
+    }
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_diff_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+        __pyx_t_double_complex z;
+        z.real = a.real - b.real;
+        z.imag = a.imag - b.imag;
+        return z;
+    }
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_prod_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+        __pyx_t_double_complex z;
+        z.real = a.real * b.real - a.imag * b.imag;
+        z.imag = a.real * b.imag + a.imag * b.real;
+        return z;
+    }
+    #if 1
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_quot_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+        if (b.imag == 0) {
+            return __pyx_t_double_complex_from_parts(a.real / b.real, a.imag / b.real);
+        } else if (fabs(b.real) >= fabs(b.imag)) {
+            if (b.real == 0 && b.imag == 0) {
+                return __pyx_t_double_complex_from_parts(a.real / b.real, a.imag / b.imag);
+            } else {
+                double r = b.imag / b.real;
+                double s = (double)(1.0) / (b.real + b.imag * r);
+                return __pyx_t_double_complex_from_parts(
+                    (a.real + a.imag * r) * s, (a.imag - a.real * r) * s);
+            }
+        } else {
+            double r = b.real / b.imag;
+            double s = (double)(1.0) / (b.imag + b.real * r);
+            return __pyx_t_double_complex_from_parts(
+                (a.real * r + a.imag) * s, (a.imag * r - a.real) * s);
+        }
+    }
+    #else
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_quot_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+        if (b.imag == 0) {
+            return __pyx_t_double_complex_from_parts(a.real / b.real, a.imag / b.real);
+        } else {
+            double denom = b.real * b.real + b.imag * b.imag;
+            return __pyx_t_double_complex_from_parts(
+                (a.real * b.real + a.imag * b.imag) / denom,
+                (a.imag * b.real - a.real * b.imag) / denom);
+        }
+    }
+    #endif
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_neg_double(__pyx_t_double_complex a) {
+        __pyx_t_double_complex z;
+        z.real = -a.real;
+        z.imag = -a.imag;
+        return z;
+    }
+    static CYTHON_INLINE int __Pyx_c_is_zero_double(__pyx_t_double_complex a) {
+       return (a.real == 0) && (a.imag == 0);
+    }
+    static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_conj_double(__pyx_t_double_complex a) {
+        __pyx_t_double_complex z;
+        z.real =  a.real;
+        z.imag = -a.imag;
+        return z;
+    }
+    #if 1
+        static CYTHON_INLINE double __Pyx_c_abs_double(__pyx_t_double_complex z) {
+          #if !defined(HAVE_HYPOT) || defined(_MSC_VER)
+            return sqrt(z.real*z.real + z.imag*z.imag);
+          #else
+            return hypot(z.real, z.imag);
+          #endif
+        }
+        static CYTHON_INLINE __pyx_t_double_complex __Pyx_c_pow_double(__pyx_t_double_complex a, __pyx_t_double_complex b) {
+            __pyx_t_double_complex z;
+            double r, lnr, theta, z_r, z_theta;
+            if (b.imag == 0 && b.real == (int)b.real) {
+                if (b.real < 0) {
+                    double denom = a.real * a.real + a.imag * a.imag;
+                    a.real = a.real / denom;
+                    a.imag = -a.imag / denom;
+                    b.real = -b.real;
+                }
+                switch ((int)b.real) {
+                    case 0:
+                        z.real = 1;
+                        z.imag = 0;
+                        return z;
+                    case 1:
+                        return a;
+                    case 2:
+                        return __Pyx_c_prod_double(a, a);
+                    case 3:
+                        z = __Pyx_c_prod_double(a, a);
+                        return __Pyx_c_prod_double(z, a);
+                    case 4:
+                        z = __Pyx_c_prod_double(a, a);
+                        return __Pyx_c_prod_double(z, z);
+                }
+            }
+            if (a.imag == 0) {
+                if (a.real == 0) {
+                    return a;
+                } else if ((b.imag == 0) && (a.real >= 0)) {
+                    z.real = pow(a.real, b.real);
+                    z.imag = 0;
+                    return z;
+                } else if (a.real > 0) {
+                    r = a.real;
+                    theta = 0;
+                } else {
+                    r = -a.real;
+                    theta = atan2(0.0, -1.0);
+                }
+            } else {
+                r = __Pyx_c_abs_double(a);
+                theta = atan2(a.imag, a.real);
+            }
+            lnr = log(r);
+            z_r = exp(lnr * b.real - theta * b.imag);
+            z_theta = theta * b.real + lnr * b.imag;
+            z.real = z_r * cos(z_theta);
+            z.imag = z_r * sin(z_theta);
+            return z;
+        }
+    #endif
+#endif
+
+/* CIntToPy */
+static CYTHON_INLINE PyObject* __Pyx_PyInt_From_int(int value) {
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic push
+#pragma GCC diagnostic ignored "-Wconversion"
+#endif
+    const int neg_one = (int) -1, const_zero = (int) 0;
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic pop
+#endif
+    const int is_unsigned = neg_one > const_zero;
+    if (is_unsigned) {
+        if (sizeof(int) < sizeof(long)) {
+            return PyInt_FromLong((long) value);
+        } else if (sizeof(int) <= sizeof(unsigned long)) {
+            return PyLong_FromUnsignedLong((unsigned long) value);
+#ifdef HAVE_LONG_LONG
+        } else if (sizeof(int) <= sizeof(unsigned PY_LONG_LONG)) {
+            return PyLong_FromUnsignedLongLong((unsigned PY_LONG_LONG) value);
+#endif
+        }
+    } else {
+        if (sizeof(int) <= sizeof(long)) {
+            return PyInt_FromLong((long) value);
+#ifdef HAVE_LONG_LONG
+        } else if (sizeof(int) <= sizeof(PY_LONG_LONG)) {
+            return PyLong_FromLongLong((PY_LONG_LONG) value);
+#endif
+        }
+    }
+    {
+        int one = 1; int little = (int)*(unsigned char *)&one;
+        unsigned char *bytes = (unsigned char *)&value;
+        return _PyLong_FromByteArray(bytes, sizeof(int),
+                                     little, !is_unsigned);
+    }
+}
+
+/* CIntFromPy */
+static CYTHON_INLINE int __Pyx_PyInt_As_int(PyObject *x) {
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic push
+#pragma GCC diagnostic ignored "-Wconversion"
+#endif
+    const int neg_one = (int) -1, const_zero = (int) 0;
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic pop
+#endif
+    const int is_unsigned = neg_one > const_zero;
+#if PY_MAJOR_VERSION < 3
+    if (likely(PyInt_Check(x))) {
+        if (sizeof(int) < sizeof(long)) {
+            __PYX_VERIFY_RETURN_INT(int, long, PyInt_AS_LONG(x))
+        } else {
+            long val = PyInt_AS_LONG(x);
+            if (is_unsigned && unlikely(val < 0)) {
+                goto raise_neg_overflow;
+            }
+            return (int) val;
+        }
+    } else
+#endif
+    if (likely(PyLong_Check(x))) {
+        if (is_unsigned) {
+#if CYTHON_USE_PYLONG_INTERNALS
+            const digit* digits = ((PyLongObject*)x)->ob_digit;
+            switch (Py_SIZE(x)) {
+                case  0: return (int) 0;
+                case  1: __PYX_VERIFY_RETURN_INT(int, digit, digits[0])
+                case 2:
+                    if (8 * sizeof(int) > 1 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 2 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, unsigned long, (((((unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) >= 2 * PyLong_SHIFT) {
+                            return (int) (((((int)digits[1]) << PyLong_SHIFT) | (int)digits[0]));
+                        }
+                    }
+                    break;
+                case 3:
+                    if (8 * sizeof(int) > 2 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 3 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, unsigned long, (((((((unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) >= 3 * PyLong_SHIFT) {
+                            return (int) (((((((int)digits[2]) << PyLong_SHIFT) | (int)digits[1]) << PyLong_SHIFT) | (int)digits[0]));
+                        }
+                    }
+                    break;
+                case 4:
+                    if (8 * sizeof(int) > 3 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 4 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, unsigned long, (((((((((unsigned long)digits[3]) << PyLong_SHIFT) | (unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) >= 4 * PyLong_SHIFT) {
+                            return (int) (((((((((int)digits[3]) << PyLong_SHIFT) | (int)digits[2]) << PyLong_SHIFT) | (int)digits[1]) << PyLong_SHIFT) | (int)digits[0]));
+                        }
+                    }
+                    break;
+            }
+#endif
+#if CYTHON_COMPILING_IN_CPYTHON && PY_VERSION_HEX < 0x030C00A7
+            if (unlikely(Py_SIZE(x) < 0)) {
+                goto raise_neg_overflow;
+            }
+#else
+            {
+                int result = PyObject_RichCompareBool(x, Py_False, Py_LT);
+                if (unlikely(result < 0))
+                    return (int) -1;
+                if (unlikely(result == 1))
+                    goto raise_neg_overflow;
+            }
+#endif
+            if (sizeof(int) <= sizeof(unsigned long)) {
+                __PYX_VERIFY_RETURN_INT_EXC(int, unsigned long, PyLong_AsUnsignedLong(x))
+#ifdef HAVE_LONG_LONG
+            } else if (sizeof(int) <= sizeof(unsigned PY_LONG_LONG)) {
+                __PYX_VERIFY_RETURN_INT_EXC(int, unsigned PY_LONG_LONG, PyLong_AsUnsignedLongLong(x))
+#endif
+            }
+        } else {
+#if CYTHON_USE_PYLONG_INTERNALS
+            const digit* digits = ((PyLongObject*)x)->ob_digit;
+            switch (Py_SIZE(x)) {
+                case  0: return (int) 0;
+                case -1: __PYX_VERIFY_RETURN_INT(int, sdigit, (sdigit) (-(sdigit)digits[0]))
+                case  1: __PYX_VERIFY_RETURN_INT(int,  digit, +digits[0])
+                case -2:
+                    if (8 * sizeof(int) - 1 > 1 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 2 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, long, -(long) (((((unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) - 1 > 2 * PyLong_SHIFT) {
+                            return (int) (((int)-1)*(((((int)digits[1]) << PyLong_SHIFT) | (int)digits[0])));
+                        }
+                    }
+                    break;
+                case 2:
+                    if (8 * sizeof(int) > 1 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 2 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, unsigned long, (((((unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) - 1 > 2 * PyLong_SHIFT) {
+                            return (int) ((((((int)digits[1]) << PyLong_SHIFT) | (int)digits[0])));
+                        }
+                    }
+                    break;
+                case -3:
+                    if (8 * sizeof(int) - 1 > 2 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 3 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, long, -(long) (((((((unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) - 1 > 3 * PyLong_SHIFT) {
+                            return (int) (((int)-1)*(((((((int)digits[2]) << PyLong_SHIFT) | (int)digits[1]) << PyLong_SHIFT) | (int)digits[0])));
+                        }
+                    }
+                    break;
+                case 3:
+                    if (8 * sizeof(int) > 2 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 3 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, unsigned long, (((((((unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) - 1 > 3 * PyLong_SHIFT) {
+                            return (int) ((((((((int)digits[2]) << PyLong_SHIFT) | (int)digits[1]) << PyLong_SHIFT) | (int)digits[0])));
+                        }
+                    }
+                    break;
+                case -4:
+                    if (8 * sizeof(int) - 1 > 3 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 4 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, long, -(long) (((((((((unsigned long)digits[3]) << PyLong_SHIFT) | (unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) - 1 > 4 * PyLong_SHIFT) {
+                            return (int) (((int)-1)*(((((((((int)digits[3]) << PyLong_SHIFT) | (int)digits[2]) << PyLong_SHIFT) | (int)digits[1]) << PyLong_SHIFT) | (int)digits[0])));
+                        }
+                    }
+                    break;
+                case 4:
+                    if (8 * sizeof(int) > 3 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 4 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(int, unsigned long, (((((((((unsigned long)digits[3]) << PyLong_SHIFT) | (unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(int) - 1 > 4 * PyLong_SHIFT) {
+                            return (int) ((((((((((int)digits[3]) << PyLong_SHIFT) | (int)digits[2]) << PyLong_SHIFT) | (int)digits[1]) << PyLong_SHIFT) | (int)digits[0])));
+                        }
+                    }
+                    break;
+            }
+#endif
+            if (sizeof(int) <= sizeof(long)) {
+                __PYX_VERIFY_RETURN_INT_EXC(int, long, PyLong_AsLong(x))
+#ifdef HAVE_LONG_LONG
+            } else if (sizeof(int) <= sizeof(PY_LONG_LONG)) {
+                __PYX_VERIFY_RETURN_INT_EXC(int, PY_LONG_LONG, PyLong_AsLongLong(x))
+#endif
+            }
+        }
+        {
+#if CYTHON_COMPILING_IN_PYPY && !defined(_PyLong_AsByteArray)
+            PyErr_SetString(PyExc_RuntimeError,
+                            "_PyLong_AsByteArray() not available in PyPy, cannot convert large numbers");
+#else
+            int val;
+            PyObject *v = __Pyx_PyNumber_IntOrLong(x);
+ #if PY_MAJOR_VERSION < 3
+            if (likely(v) && !PyLong_Check(v)) {
+                PyObject *tmp = v;
+                v = PyNumber_Long(tmp);
+                Py_DECREF(tmp);
+            }
+ #endif
+            if (likely(v)) {
+                int one = 1; int is_little = (int)*(unsigned char *)&one;
+                unsigned char *bytes = (unsigned char *)&val;
+                int ret = _PyLong_AsByteArray((PyLongObject *)v,
+                                              bytes, sizeof(val),
+                                              is_little, !is_unsigned);
+                Py_DECREF(v);
+                if (likely(!ret))
+                    return val;
+            }
+#endif
+            return (int) -1;
+        }
+    } else {
+        int val;
+        PyObject *tmp = __Pyx_PyNumber_IntOrLong(x);
+        if (!tmp) return (int) -1;
+        val = __Pyx_PyInt_As_int(tmp);
+        Py_DECREF(tmp);
+        return val;
+    }
+raise_overflow:
+    PyErr_SetString(PyExc_OverflowError,
+        "value too large to convert to int");
+    return (int) -1;
+raise_neg_overflow:
+    PyErr_SetString(PyExc_OverflowError,
+        "can't convert negative value to int");
+    return (int) -1;
+}
+
+/* CIntToPy */
+static CYTHON_INLINE PyObject* __Pyx_PyInt_From_long(long value) {
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic push
+#pragma GCC diagnostic ignored "-Wconversion"
+#endif
+    const long neg_one = (long) -1, const_zero = (long) 0;
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic pop
+#endif
+    const int is_unsigned = neg_one > const_zero;
+    if (is_unsigned) {
+        if (sizeof(long) < sizeof(long)) {
+            return PyInt_FromLong((long) value);
+        } else if (sizeof(long) <= sizeof(unsigned long)) {
+            return PyLong_FromUnsignedLong((unsigned long) value);
+#ifdef HAVE_LONG_LONG
+        } else if (sizeof(long) <= sizeof(unsigned PY_LONG_LONG)) {
+            return PyLong_FromUnsignedLongLong((unsigned PY_LONG_LONG) value);
+#endif
+        }
+    } else {
+        if (sizeof(long) <= sizeof(long)) {
+            return PyInt_FromLong((long) value);
+#ifdef HAVE_LONG_LONG
+        } else if (sizeof(long) <= sizeof(PY_LONG_LONG)) {
+            return PyLong_FromLongLong((PY_LONG_LONG) value);
+#endif
+        }
+    }
+    {
+        int one = 1; int little = (int)*(unsigned char *)&one;
+        unsigned char *bytes = (unsigned char *)&value;
+        return _PyLong_FromByteArray(bytes, sizeof(long),
+                                     little, !is_unsigned);
+    }
+}
+
+/* CIntFromPy */
+static CYTHON_INLINE long __Pyx_PyInt_As_long(PyObject *x) {
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic push
+#pragma GCC diagnostic ignored "-Wconversion"
+#endif
+    const long neg_one = (long) -1, const_zero = (long) 0;
+#ifdef __Pyx_HAS_GCC_DIAGNOSTIC
+#pragma GCC diagnostic pop
+#endif
+    const int is_unsigned = neg_one > const_zero;
+#if PY_MAJOR_VERSION < 3
+    if (likely(PyInt_Check(x))) {
+        if (sizeof(long) < sizeof(long)) {
+            __PYX_VERIFY_RETURN_INT(long, long, PyInt_AS_LONG(x))
+        } else {
+            long val = PyInt_AS_LONG(x);
+            if (is_unsigned && unlikely(val < 0)) {
+                goto raise_neg_overflow;
+            }
+            return (long) val;
+        }
+    } else
+#endif
+    if (likely(PyLong_Check(x))) {
+        if (is_unsigned) {
+#if CYTHON_USE_PYLONG_INTERNALS
+            const digit* digits = ((PyLongObject*)x)->ob_digit;
+            switch (Py_SIZE(x)) {
+                case  0: return (long) 0;
+                case  1: __PYX_VERIFY_RETURN_INT(long, digit, digits[0])
+                case 2:
+                    if (8 * sizeof(long) > 1 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 2 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, unsigned long, (((((unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) >= 2 * PyLong_SHIFT) {
+                            return (long) (((((long)digits[1]) << PyLong_SHIFT) | (long)digits[0]));
+                        }
+                    }
+                    break;
+                case 3:
+                    if (8 * sizeof(long) > 2 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 3 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, unsigned long, (((((((unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) >= 3 * PyLong_SHIFT) {
+                            return (long) (((((((long)digits[2]) << PyLong_SHIFT) | (long)digits[1]) << PyLong_SHIFT) | (long)digits[0]));
+                        }
+                    }
+                    break;
+                case 4:
+                    if (8 * sizeof(long) > 3 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 4 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, unsigned long, (((((((((unsigned long)digits[3]) << PyLong_SHIFT) | (unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) >= 4 * PyLong_SHIFT) {
+                            return (long) (((((((((long)digits[3]) << PyLong_SHIFT) | (long)digits[2]) << PyLong_SHIFT) | (long)digits[1]) << PyLong_SHIFT) | (long)digits[0]));
+                        }
+                    }
+                    break;
+            }
+#endif
+#if CYTHON_COMPILING_IN_CPYTHON && PY_VERSION_HEX < 0x030C00A7
+            if (unlikely(Py_SIZE(x) < 0)) {
+                goto raise_neg_overflow;
+            }
+#else
+            {
+                int result = PyObject_RichCompareBool(x, Py_False, Py_LT);
+                if (unlikely(result < 0))
+                    return (long) -1;
+                if (unlikely(result == 1))
+                    goto raise_neg_overflow;
+            }
+#endif
+            if (sizeof(long) <= sizeof(unsigned long)) {
+                __PYX_VERIFY_RETURN_INT_EXC(long, unsigned long, PyLong_AsUnsignedLong(x))
+#ifdef HAVE_LONG_LONG
+            } else if (sizeof(long) <= sizeof(unsigned PY_LONG_LONG)) {
+                __PYX_VERIFY_RETURN_INT_EXC(long, unsigned PY_LONG_LONG, PyLong_AsUnsignedLongLong(x))
+#endif
+            }
+        } else {
+#if CYTHON_USE_PYLONG_INTERNALS
+            const digit* digits = ((PyLongObject*)x)->ob_digit;
+            switch (Py_SIZE(x)) {
+                case  0: return (long) 0;
+                case -1: __PYX_VERIFY_RETURN_INT(long, sdigit, (sdigit) (-(sdigit)digits[0]))
+                case  1: __PYX_VERIFY_RETURN_INT(long,  digit, +digits[0])
+                case -2:
+                    if (8 * sizeof(long) - 1 > 1 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 2 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, long, -(long) (((((unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) - 1 > 2 * PyLong_SHIFT) {
+                            return (long) (((long)-1)*(((((long)digits[1]) << PyLong_SHIFT) | (long)digits[0])));
+                        }
+                    }
+                    break;
+                case 2:
+                    if (8 * sizeof(long) > 1 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 2 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, unsigned long, (((((unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) - 1 > 2 * PyLong_SHIFT) {
+                            return (long) ((((((long)digits[1]) << PyLong_SHIFT) | (long)digits[0])));
+                        }
+                    }
+                    break;
+                case -3:
+                    if (8 * sizeof(long) - 1 > 2 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 3 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, long, -(long) (((((((unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) - 1 > 3 * PyLong_SHIFT) {
+                            return (long) (((long)-1)*(((((((long)digits[2]) << PyLong_SHIFT) | (long)digits[1]) << PyLong_SHIFT) | (long)digits[0])));
+                        }
+                    }
+                    break;
+                case 3:
+                    if (8 * sizeof(long) > 2 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 3 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, unsigned long, (((((((unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) - 1 > 3 * PyLong_SHIFT) {
+                            return (long) ((((((((long)digits[2]) << PyLong_SHIFT) | (long)digits[1]) << PyLong_SHIFT) | (long)digits[0])));
+                        }
+                    }
+                    break;
+                case -4:
+                    if (8 * sizeof(long) - 1 > 3 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 4 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, long, -(long) (((((((((unsigned long)digits[3]) << PyLong_SHIFT) | (unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) - 1 > 4 * PyLong_SHIFT) {
+                            return (long) (((long)-1)*(((((((((long)digits[3]) << PyLong_SHIFT) | (long)digits[2]) << PyLong_SHIFT) | (long)digits[1]) << PyLong_SHIFT) | (long)digits[0])));
+                        }
+                    }
+                    break;
+                case 4:
+                    if (8 * sizeof(long) > 3 * PyLong_SHIFT) {
+                        if (8 * sizeof(unsigned long) > 4 * PyLong_SHIFT) {
+                            __PYX_VERIFY_RETURN_INT(long, unsigned long, (((((((((unsigned long)digits[3]) << PyLong_SHIFT) | (unsigned long)digits[2]) << PyLong_SHIFT) | (unsigned long)digits[1]) << PyLong_SHIFT) | (unsigned long)digits[0])))
+                        } else if (8 * sizeof(long) - 1 > 4 * PyLong_SHIFT) {
+                            return (long) ((((((((((long)digits[3]) << PyLong_SHIFT) | (long)digits[2]) << PyLong_SHIFT) | (long)digits[1]) << PyLong_SHIFT) | (long)digits[0])));
+                        }
+                    }
+                    break;
+            }
+#endif
+            if (sizeof(long) <= sizeof(long)) {
+                __PYX_VERIFY_RETURN_INT_EXC(long, long, PyLong_AsLong(x))
+#ifdef HAVE_LONG_LONG
+            } else if (sizeof(long) <= sizeof(PY_LONG_LONG)) {
+                __PYX_VERIFY_RETURN_INT_EXC(long, PY_LONG_LONG, PyLong_AsLongLong(x))
+#endif
+            }
+        }
+        {
+#if CYTHON_COMPILING_IN_PYPY && !defined(_PyLong_AsByteArray)
+            PyErr_SetString(PyExc_RuntimeError,
+                            "_PyLong_AsByteArray() not available in PyPy, cannot convert large numbers");
+#else
+            long val;
+            PyObject *v = __Pyx_PyNumber_IntOrLong(x);
+ #if PY_MAJOR_VERSION < 3
+            if (likely(v) && !PyLong_Check(v)) {
+                PyObject *tmp = v;
+                v = PyNumber_Long(tmp);
+                Py_DECREF(tmp);
+            }
+ #endif
+            if (likely(v)) {
+                int one = 1; int is_little = (int)*(unsigned char *)&one;
+                unsigned char *bytes = (unsigned char *)&val;
+                int ret = _PyLong_AsByteArray((PyLongObject *)v,
+                                              bytes, sizeof(val),
+                                              is_little, !is_unsigned);
+                Py_DECREF(v);
+                if (likely(!ret))
+                    return val;
+            }
+#endif
+            return (long) -1;
+        }
+    } else {
+        long val;
+        PyObject *tmp = __Pyx_PyNumber_IntOrLong(x);
+        if (!tmp) return (long) -1;
+        val = __Pyx_PyInt_As_long(tmp);
+        Py_DECREF(tmp);
+        return val;
+    }
+raise_overflow:
+    PyErr_SetString(PyExc_OverflowError,
+        "value too large to convert to long");
+    return (long) -1;
+raise_neg_overflow:
+    PyErr_SetString(PyExc_OverflowError,
+        "can't convert negative value to long");
+    return (long) -1;
+}
+
+/* FastTypeChecks */
+#if CYTHON_COMPILING_IN_CPYTHON
+static int __Pyx_InBases(PyTypeObject *a, PyTypeObject *b) {
+    while (a) {
+        a = a->tp_base;
+        if (a == b)
+            return 1;
+    }
+    return b == &PyBaseObject_Type;
+}
+static CYTHON_INLINE int __Pyx_IsSubtype(PyTypeObject *a, PyTypeObject *b) {
+    PyObject *mro;
+    if (a == b) return 1;
+    mro = a->tp_mro;
+    if (likely(mro)) {
+        Py_ssize_t i, n;
+        n = PyTuple_GET_SIZE(mro);
+        for (i = 0; i < n; i++) {
+            if (PyTuple_GET_ITEM(mro, i) == (PyObject *)b)
+                return 1;
+        }
+        return 0;
+    }
+    return __Pyx_InBases(a, b);
+}
+#if PY_MAJOR_VERSION == 2
+static int __Pyx_inner_PyErr_GivenExceptionMatches2(PyObject *err, PyObject* exc_type1, PyObject* exc_type2) {
+    PyObject *exception, *value, *tb;
+    int res;
+    __Pyx_PyThreadState_declare
+    __Pyx_PyThreadState_assign
+    __Pyx_ErrFetch(&exception, &value, &tb);
+    res = exc_type1 ? PyObject_IsSubclass(err, exc_type1) : 0;
+    if (unlikely(res == -1)) {
+        PyErr_WriteUnraisable(err);
+        res = 0;
+    }
+    if (!res) {
+        res = PyObject_IsSubclass(err, exc_type2);
+        if (unlikely(res == -1)) {
+            PyErr_WriteUnraisable(err);
+            res = 0;
+        }
+    }
+    __Pyx_ErrRestore(exception, value, tb);
+    return res;
+}
+#else
+static CYTHON_INLINE int __Pyx_inner_PyErr_GivenExceptionMatches2(PyObject *err, PyObject* exc_type1, PyObject *exc_type2) {
+    int res = exc_type1 ? __Pyx_IsSubtype((PyTypeObject*)err, (PyTypeObject*)exc_type1) : 0;
+    if (!res) {
+        res = __Pyx_IsSubtype((PyTypeObject*)err, (PyTypeObject*)exc_type2);
+    }
+    return res;
+}
+#endif
+static int __Pyx_PyErr_GivenExceptionMatchesTuple(PyObject *exc_type, PyObject *tuple) {
+    Py_ssize_t i, n;
+    assert(PyExceptionClass_Check(exc_type));
+    n = PyTuple_GET_SIZE(tuple);
+#if PY_MAJOR_VERSION >= 3
+    for (i=0; i<n; i++) {
+        if (exc_type == PyTuple_GET_ITEM(tuple, i)) return 1;
+    }
+#endif
+    for (i=0; i<n; i++) {
+        PyObject *t = PyTuple_GET_ITEM(tuple, i);
+        #if PY_MAJOR_VERSION < 3
+        if (likely(exc_type == t)) return 1;
+        #endif
+        if (likely(PyExceptionClass_Check(t))) {
+            if (__Pyx_inner_PyErr_GivenExceptionMatches2(exc_type, NULL, t)) return 1;
+        } else {
+        }
+    }
+    return 0;
+}
+static CYTHON_INLINE int __Pyx_PyErr_GivenExceptionMatches(PyObject *err, PyObject* exc_type) {
+    if (likely(err == exc_type)) return 1;
+    if (likely(PyExceptionClass_Check(err))) {
+        if (likely(PyExceptionClass_Check(exc_type))) {
+            return __Pyx_inner_PyErr_GivenExceptionMatches2(err, NULL, exc_type);
+        } else if (likely(PyTuple_Check(exc_type))) {
+            return __Pyx_PyErr_GivenExceptionMatchesTuple(err, exc_type);
+        } else {
+        }
+    }
+    return PyErr_GivenExceptionMatches(err, exc_type);
+}
+static CYTHON_INLINE int __Pyx_PyErr_GivenExceptionMatches2(PyObject *err, PyObject *exc_type1, PyObject *exc_type2) {
+    assert(PyExceptionClass_Check(exc_type1));
+    assert(PyExceptionClass_Check(exc_type2));
+    if (likely(err == exc_type1 || err == exc_type2)) return 1;
+    if (likely(PyExceptionClass_Check(err))) {
+        return __Pyx_inner_PyErr_GivenExceptionMatches2(err, exc_type1, exc_type2);
+    }
+    return (PyErr_GivenExceptionMatches(err, exc_type1) || PyErr_GivenExceptionMatches(err, exc_type2));
+}
+#endif
+
+/* CheckBinaryVersion */
+static int __Pyx_check_binary_version(void) {
+    char ctversion[5];
+    int same=1, i, found_dot;
+    const char* rt_from_call = Py_GetVersion();
+    PyOS_snprintf(ctversion, 5, "%d.%d", PY_MAJOR_VERSION, PY_MINOR_VERSION);
+    found_dot = 0;
+    for (i = 0; i < 4; i++) {
+        if (!ctversion[i]) {
+            same = (rt_from_call[i] < '0' || rt_from_call[i] > '9');
+            break;
+        }
+        if (rt_from_call[i] != ctversion[i]) {
+            same = 0;
+            break;
+        }
+    }
+    if (!same) {
+        char rtversion[5] = {'\0'};
+        char message[200];
+        for (i=0; i<4; ++i) {
+            if (rt_from_call[i] == '.') {
+                if (found_dot) break;
+                found_dot = 1;
+            } else if (rt_from_call[i] < '0' || rt_from_call[i] > '9') {
+                break;
+            }
+            rtversion[i] = rt_from_call[i];
+        }
+        PyOS_snprintf(message, sizeof(message),
+                      "compiletime version %s of module '%.100s' "
+                      "does not match runtime version %s",
+                      ctversion, __Pyx_MODULE_NAME, rtversion);
+        return PyErr_WarnEx(NULL, message, 1);
+    }
+    return 0;
+}
+
+/* InitStrings */
+static int __Pyx_InitStrings(__Pyx_StringTabEntry *t) {
+    while (t->p) {
+        #if PY_MAJOR_VERSION < 3
+        if (t->is_unicode) {
+            *t->p = PyUnicode_DecodeUTF8(t->s, t->n - 1, NULL);
+        } else if (t->intern) {
+            *t->p = PyString_InternFromString(t->s);
+        } else {
+            *t->p = PyString_FromStringAndSize(t->s, t->n - 1);
+        }
+        #else
+        if (t->is_unicode | t->is_str) {
+            if (t->intern) {
+                *t->p = PyUnicode_InternFromString(t->s);
+            } else if (t->encoding) {
+                *t->p = PyUnicode_Decode(t->s, t->n - 1, t->encoding, NULL);
+            } else {
+                *t->p = PyUnicode_FromStringAndSize(t->s, t->n - 1);
+            }
+        } else {
+            *t->p = PyBytes_FromStringAndSize(t->s, t->n - 1);
+        }
+        #endif
+        if (!*t->p)
+            return -1;
+        if (PyObject_Hash(*t->p) == -1)
+            return -1;
+        ++t;
+    }
+    return 0;
+}
+
+static CYTHON_INLINE PyObject* __Pyx_PyUnicode_FromString(const char* c_str) {
+    return __Pyx_PyUnicode_FromStringAndSize(c_str, (Py_ssize_t)strlen(c_str));
+}
+static CYTHON_INLINE const char* __Pyx_PyObject_AsString(PyObject* o) {
+    Py_ssize_t ignore;
+    return __Pyx_PyObject_AsStringAndSize(o, &ignore);
+}
+#if __PYX_DEFAULT_STRING_ENCODING_IS_ASCII || __PYX_DEFAULT_STRING_ENCODING_IS_DEFAULT
+#if !CYTHON_PEP393_ENABLED
+static const char* __Pyx_PyUnicode_AsStringAndSize(PyObject* o, Py_ssize_t *length) {
+    char* defenc_c;
+    PyObject* defenc = _PyUnicode_AsDefaultEncodedString(o, NULL);
+    if (!defenc) return NULL;
+    defenc_c = PyBytes_AS_STRING(defenc);
+#if __PYX_DEFAULT_STRING_ENCODING_IS_ASCII
+    {
+        char* end = defenc_c + PyBytes_GET_SIZE(defenc);
+        char* c;
+        for (c = defenc_c; c < end; c++) {
+            if ((unsigned char) (*c) >= 128) {
+                PyUnicode_AsASCIIString(o);
+                return NULL;
+            }
+        }
+    }
+#endif
+    *length = PyBytes_GET_SIZE(defenc);
+    return defenc_c;
+}
+#else
+static CYTHON_INLINE const char* __Pyx_PyUnicode_AsStringAndSize(PyObject* o, Py_ssize_t *length) {
+    if (unlikely(__Pyx_PyUnicode_READY(o) == -1)) return NULL;
+#if __PYX_DEFAULT_STRING_ENCODING_IS_ASCII
+    if (likely(PyUnicode_IS_ASCII(o))) {
+        *length = PyUnicode_GET_LENGTH(o);
+        return PyUnicode_AsUTF8(o);
+    } else {
+        PyUnicode_AsASCIIString(o);
+        return NULL;
+    }
+#else
+    return PyUnicode_AsUTF8AndSize(o, length);
+#endif
+}
+#endif
+#endif
+static CYTHON_INLINE const char* __Pyx_PyObject_AsStringAndSize(PyObject* o, Py_ssize_t *length) {
+#if __PYX_DEFAULT_STRING_ENCODING_IS_ASCII || __PYX_DEFAULT_STRING_ENCODING_IS_DEFAULT
+    if (
+#if PY_MAJOR_VERSION < 3 && __PYX_DEFAULT_STRING_ENCODING_IS_ASCII
+            __Pyx_sys_getdefaultencoding_not_ascii &&
+#endif
+            PyUnicode_Check(o)) {
+        return __Pyx_PyUnicode_AsStringAndSize(o, length);
+    } else
+#endif
+#if (!CYTHON_COMPILING_IN_PYPY) || (defined(PyByteArray_AS_STRING) && defined(PyByteArray_GET_SIZE))
+    if (PyByteArray_Check(o)) {
+        *length = PyByteArray_GET_SIZE(o);
+        return PyByteArray_AS_STRING(o);
+    } else
+#endif
+    {
+        char* result;
+        int r = PyBytes_AsStringAndSize(o, &result, length);
+        if (unlikely(r < 0)) {
+            return NULL;
+        } else {
+            return result;
+        }
+    }
+}
+static CYTHON_INLINE int __Pyx_PyObject_IsTrue(PyObject* x) {
+   int is_true = x == Py_True;
+   if (is_true | (x == Py_False) | (x == Py_None)) return is_true;
+   else return PyObject_IsTrue(x);
+}
+static CYTHON_INLINE int __Pyx_PyObject_IsTrueAndDecref(PyObject* x) {
+    int retval;
+    if (unlikely(!x)) return -1;
+    retval = __Pyx_PyObject_IsTrue(x);
+    Py_DECREF(x);
+    return retval;
+}
+static PyObject* __Pyx_PyNumber_IntOrLongWrongResultType(PyObject* result, const char* type_name) {
+#if PY_MAJOR_VERSION >= 3
+    if (PyLong_Check(result)) {
+        if (PyErr_WarnFormat(PyExc_DeprecationWarning, 1,
+                "__int__ returned non-int (type %.200s).  "
+                "The ability to return an instance of a strict subclass of int "
+                "is deprecated, and may be removed in a future version of Python.",
+                Py_TYPE(result)->tp_name)) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        return result;
+    }
+#endif
+    PyErr_Format(PyExc_TypeError,
+                 "__%.4s__ returned non-%.4s (type %.200s)",
+                 type_name, type_name, Py_TYPE(result)->tp_name);
+    Py_DECREF(result);
+    return NULL;
+}
+static CYTHON_INLINE PyObject* __Pyx_PyNumber_IntOrLong(PyObject* x) {
+#if CYTHON_USE_TYPE_SLOTS
+  PyNumberMethods *m;
+#endif
+  const char *name = NULL;
+  PyObject *res = NULL;
+#if PY_MAJOR_VERSION < 3
+  if (likely(PyInt_Check(x) || PyLong_Check(x)))
+#else
+  if (likely(PyLong_Check(x)))
+#endif
+    return __Pyx_NewRef(x);
+#if CYTHON_USE_TYPE_SLOTS
+  m = Py_TYPE(x)->tp_as_number;
+  #if PY_MAJOR_VERSION < 3
+  if (m && m->nb_int) {
+    name = "int";
+    res = m->nb_int(x);
+  }
+  else if (m && m->nb_long) {
+    name = "long";
+    res = m->nb_long(x);
+  }
+  #else
+  if (likely(m && m->nb_int)) {
+    name = "int";
+    res = m->nb_int(x);
+  }
+  #endif
+#else
+  if (!PyBytes_CheckExact(x) && !PyUnicode_CheckExact(x)) {
+    res = PyNumber_Int(x);
+  }
+#endif
+  if (likely(res)) {
+#if PY_MAJOR_VERSION < 3
+    if (unlikely(!PyInt_Check(res) && !PyLong_Check(res))) {
+#else
+    if (unlikely(!PyLong_CheckExact(res))) {
+#endif
+        return __Pyx_PyNumber_IntOrLongWrongResultType(res, name);
+    }
+  }
+  else if (!PyErr_Occurred()) {
+    PyErr_SetString(PyExc_TypeError,
+                    "an integer is required");
+  }
+  return res;
+}
+static CYTHON_INLINE Py_ssize_t __Pyx_PyIndex_AsSsize_t(PyObject* b) {
+  Py_ssize_t ival;
+  PyObject *x;
+#if PY_MAJOR_VERSION < 3
+  if (likely(PyInt_CheckExact(b))) {
+    if (sizeof(Py_ssize_t) >= sizeof(long))
+        return PyInt_AS_LONG(b);
+    else
+        return PyInt_AsSsize_t(b);
+  }
+#endif
+  if (likely(PyLong_CheckExact(b))) {
+    #if CYTHON_USE_PYLONG_INTERNALS
+    const digit* digits = ((PyLongObject*)b)->ob_digit;
+    const Py_ssize_t size = Py_SIZE(b);
+    if (likely(__Pyx_sst_abs(size) <= 1)) {
+        ival = likely(size) ? digits[0] : 0;
+        if (size == -1) ival = -ival;
+        return ival;
+    } else {
+      switch (size) {
+         case 2:
+           if (8 * sizeof(Py_ssize_t) > 2 * PyLong_SHIFT) {
+             return (Py_ssize_t) (((((size_t)digits[1]) << PyLong_SHIFT) | (size_t)digits[0]));
+           }
+           break;
+         case -2:
+           if (8 * sizeof(Py_ssize_t) > 2 * PyLong_SHIFT) {
+             return -(Py_ssize_t) (((((size_t)digits[1]) << PyLong_SHIFT) | (size_t)digits[0]));
+           }
+           break;
+         case 3:
+           if (8 * sizeof(Py_ssize_t) > 3 * PyLong_SHIFT) {
+             return (Py_ssize_t) (((((((size_t)digits[2]) << PyLong_SHIFT) | (size_t)digits[1]) << PyLong_SHIFT) | (size_t)digits[0]));
+           }
+           break;
+         case -3:
+           if (8 * sizeof(Py_ssize_t) > 3 * PyLong_SHIFT) {
+             return -(Py_ssize_t) (((((((size_t)digits[2]) << PyLong_SHIFT) | (size_t)digits[1]) << PyLong_SHIFT) | (size_t)digits[0]));
+           }
+           break;
+         case 4:
+           if (8 * sizeof(Py_ssize_t) > 4 * PyLong_SHIFT) {
+             return (Py_ssize_t) (((((((((size_t)digits[3]) << PyLong_SHIFT) | (size_t)digits[2]) << PyLong_SHIFT) | (size_t)digits[1]) << PyLong_SHIFT) | (size_t)digits[0]));
+           }
+           break;
+         case -4:
+           if (8 * sizeof(Py_ssize_t) > 4 * PyLong_SHIFT) {
+             return -(Py_ssize_t) (((((((((size_t)digits[3]) << PyLong_SHIFT) | (size_t)digits[2]) << PyLong_SHIFT) | (size_t)digits[1]) << PyLong_SHIFT) | (size_t)digits[0]));
+           }
+           break;
+      }
+    }
+    #endif
+    return PyLong_AsSsize_t(b);
+  }
+  x = PyNumber_Index(b);
+  if (!x) return -1;
+  ival = PyInt_AsSsize_t(x);
+  Py_DECREF(x);
+  return ival;
+}
+static CYTHON_INLINE Py_hash_t __Pyx_PyIndex_AsHash_t(PyObject* o) {
+  if (sizeof(Py_hash_t) == sizeof(Py_ssize_t)) {
+    return (Py_hash_t) __Pyx_PyIndex_AsSsize_t(o);
+#if PY_MAJOR_VERSION < 3
+  } else if (likely(PyInt_CheckExact(o))) {
+    return PyInt_AS_LONG(o);
+#endif
+  } else {
+    Py_ssize_t ival;
+    PyObject *x;
+    x = PyNumber_Index(o);
+    if (!x) return -1;
+    ival = PyInt_AsLong(x);
+    Py_DECREF(x);
+    return ival;
+  }
+}
+static CYTHON_INLINE PyObject * __Pyx_PyBool_FromLong(long b) {
+  return b ? __Pyx_NewRef(Py_True) : __Pyx_NewRef(Py_False);
+}
+static CYTHON_INLINE PyObject * __Pyx_PyInt_FromSize_t(size_t ival) {
+    return PyInt_FromSize_t(ival);
+}
+
+
+#endif /* Py_PYTHON_H */
@@ -1,5 +1,7 @@
 #cython: embedsignature=True
 
+import numpy as np
+
 from .nnps_base cimport *
 from .octree cimport Octree, CompressedOctree, cOctreeNode
 
@@ -49,6 +51,22 @@ cdef class OctreeNNPS(NNPS):
     cpdef get_depth(self, int pa_index):
         return (<Octree>self.tree[pa_index]).depth
 
+    def get_bin_occupancy(self, int pa_index):
+        """Return the maximum number of particles in a leaf and the number
+        of particles in each occupied leaf of the `pa_index` array.
+        """
+        cdef Octree tree = self.tree[pa_index]
+        cdef cOctreeNode* leaf
+        occupancy = []
+        if tree.root != NULL:
+            tree.c_get_leaf_cells()
+            for leaf in deref(tree.leaf_cells):
+                if leaf.num_particles > 0:
+                    occupancy.append(leaf.num_particles)
+        return (dict(kind='leaves',
+                     leaf_max_particles=self.leaf_max_particles),
+                np.asarray(occupancy, dtype=np.int64))
+
     cpdef set_context(self, int src_index, int dst_index):
         """Set context for nearest neighbor searches.
 
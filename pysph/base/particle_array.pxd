@@ -58,7 +58,7 @@ cdef class ParticleArray:
     cdef public long num_real_particles
 
     # a list of props to be used for load balancing
-    cdef list lb_props
+    cdef public list lb_props
 
     ########################################
     # OpenCL/accelerator related attributes.
@@ -22,8 +22,6 @@ from cpython cimport *
 from cython cimport *
 
 from compyle.config import get_config
-from compyle.array import Array, get_backend, to_device
-from pysph.base.device_helper import DeviceHelper
 
 # Maximum value of an unsigned int
 cdef extern from "limits.h":
@@ -63,6 +61,24 @@ cpdef int get_remote_tag():
 cpdef int get_ghost_tag():
     return Ghost
 
+
+def get_backend(backend=None):
+    """Return the backend to use, as ``compyle.array.get_backend`` does.
+
+    This avoids importing ``compyle.array``, which is slow to import, unless
+    a GPU backend is actually used.
+    """
+    if not backend:
+        cfg = get_config()
+        if cfg.use_opencl:
+            return 'opencl'
+        elif cfg.use_cuda:
+            return 'cuda'
+        else:
+            return 'cython'
+    else:
+        return backend
+
 cdef class ParticleArray:
     """
     Class to represent a collection of particles.
@@ -149,6 +165,7 @@ cdef class ParticleArray:
         self.output_property_arrays = []
 
         if self.backend is not 'cython':
+            from pysph.base.device_helper import DeviceHelper
             h = DeviceHelper(self, backend=self.backend)
             self.set_device_helper(h)
         else:
@@ -463,6 +480,7 @@ cdef class ParticleArray:
 
         """
         if self.gpu is not None and self.backend is not 'cython':
+            from compyle.array import Array, to_device
             if type(indices) != Array:
                 if isinstance(indices, BaseArray):
                     indices = indices.get_npy_array()
@@ -557,6 +575,7 @@ cdef class ParticleArray:
             self._check_property(prop)
 
         if self.gpu is not None and self.backend is not 'cython':
+            from compyle.array import to_device
             gpu_particle_props = {}
             for prop, ary in particle_props.items():
                 if prop in self.gpu.properties:
@@ -1223,10 +1242,15 @@ cdef class ParticleArray:
         prop_names = props if props else src.properties.keys()
 
         for prop_name in prop_names:
+            stride = src.stride.get(prop_name, 1)
+            if (prop_name in self.properties and
+                    self.stride.get(prop_name, 1) != stride):
+                # The stride was changed in the source, add it again.
+                self.remove_property(prop_name)
+                self.stride.pop(prop_name, None)
             if prop_name not in self.properties:
                 prop_type = src.properties[prop_name].get_c_type()
                 prop_default = src.default_values[prop_name]
-                stride = src.stride.get(prop_name, 1)
                 self.add_property(
                     name=prop_name, type=prop_type,
                     default=prop_default, stride=stride
@@ -1267,6 +1291,7 @@ cdef class ParticleArray:
 
         """
         if self.gpu is not None and self.backend is not 'cython':
+            from compyle.array import Array, to_device
             if type(indices) != Array:
                 indices = to_device(
                         numpy.array(indices, dtype=numpy.uint32),
@@ -1413,6 +1438,7 @@ cdef class ParticleArray:
         if self.properties.has_key(prop_name):
             self.properties.pop(prop_name)
             self.default_values.pop(prop_name)
+            self.stride.pop(prop_name, None)
         if prop_name in self.output_property_arrays:
             self.output_property_arrays.remove(prop_name)
         if self.gpu is not None:
@@ -5,6 +5,9 @@ import numpy as np
 
 from cyarray.carray import BaseArray
 
+# Communicator used instead of MPI.COMM_WORLD, see set_reduce_comm.
+_reduce_comm = None
+
 
 def _check_operation(op):
     """Raise an exception if the wrong operation is given.
@@ -57,11 +60,26 @@ def mpi_reduce_array(array, op='sum'):
 
     """
     np_array = _get_npy_array(array)
+    if _reduce_comm is not None:
+        return _reduce_comm.allreduce(np_array, op=op)
     from mpi4py import MPI
+    if not MPI.Is_initialized():
+        # A serial run where mpi4py was imported without initializing MPI.
+        return np_array
     ops = {'sum': MPI.SUM, 'prod': MPI.PROD,
            'max': MPI.MAX, 'min': MPI.MIN}
     return MPI.COMM_WORLD.allreduce(np_array, op=ops[op])
 
+def set_reduce_comm(comm):
+    """Use the given communicator for the parallel reductions.
+
+    The communicator must provide ``allreduce(obj, op)`` with the operation
+    given as a string, this is used for runs with the shared memory
+    parallel manager. Passing None uses MPI again.
+    """
+    global _reduce_comm
+    _reduce_comm = comm
+
 # This is just to keep syntax highlighters happy in editors while writing
 # equations.
 parallel_reduce_array = mpi_reduce_array
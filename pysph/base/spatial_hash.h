@@ -12,134 +12,184 @@
 #define p2 19349663
 #define p3 83492791
 
+// The table is grown when the fraction of occupied slots exceeds this.
+#define MAX_LOAD_FACTOR 0.5
+
 using namespace std;
 
+// A cell of the hash table.  The indices of the particles in the cell are
+// the `count` entries starting at `indices`, these are only valid after
+// `HashTable::build` is called.
 class HashEntry
 {
-private:
-    long long int key;
 public:
     int c_x, c_y, c_z;
     double h_max;
-    HashEntry* next;
-    vector <unsigned int> indices;
+    unsigned int start;
+    unsigned int count;
+    unsigned int* indices;
 
-    HashEntry(long long int key, int idx, double h, int c_x, int c_y, int c_z)
+    HashEntry(double h, int c_x, int c_y, int c_z)
     {
-        this->key = key;
-        this->indices.push_back(idx);
         this->h_max = h;
         this->c_x = c_x;
         this->c_y = c_y;
         this->c_z = c_z;
-        this->next = NULL;
+        this->start = 0;
+        this->count = 0;
+        this->indices = NULL;
     }
 
-    inline long long int get_key()
+    inline unsigned int* get_indices()
     {
-        return this->key;
+        return this->indices;
     }
+};
 
-    inline vector <unsigned int> *get_indices()
+// A spatial hash using open addressing with linear probing.  The slots
+// store the position of the cell in a flat array of cells.  Particles are
+// added with `add` and once all are added, `build` sorts the particle
+// indices by cell (a counting sort) into one contiguous array so no
+// allocation is done per cell.  The storage is reused by `clear`.
+class HashTable
+{
+private:
+    vector <int> slots;
+    vector <HashEntry> cells;
+    // The cell of each particle added and its index, in the order added.
+    vector <unsigned int> particle_cells;
+    vector <unsigned int> particle_ids;
+    vector <unsigned int> arena;
+    long long int mask;
+
+    inline long long int find_slot(int i, int j, int k)
     {
-        return &this->indices;
-    } 
+        long long int key = this->hash(i, j, k);
+        int cid;
+        while((cid = this->slots[key]) >= 0)
+        {
+            const HashEntry& cell = this->cells[cid];
+            if(cell.c_x==i && cell.c_y==j && cell.c_z==k)
+                break;
+            key = (key + 1) & this->mask;
+        }
+        return key;
+    }
 
-    inline void add(unsigned int idx, double h)
+    void resize(long long int size)
     {
-        this->indices.push_back(idx);
-        this->h_max = max(this->h_max, h);
+        this->table_size = size;
+        this->mask = size - 1;
+        this->slots.assign(size, -1);
+        for(size_t cid=0; cid<this->cells.size(); cid++)
+        {
+            const HashEntry& cell = this->cells[cid];
+            this->slots[this->find_slot(cell.c_x, cell.c_y, cell.c_z)] = cid;
+        }
     }
-};
 
-class HashTable
-{
-private:
-    HashEntry** hashtable;
 public:
     long long int table_size;
-    
+
     HashTable(long long int table_size)
     {
-        this->table_size = table_size;
-        this->hashtable = new HashEntry*[table_size];
-        for(int i=0; i<table_size; i++)
-        {
-            this->hashtable[i] = NULL;
-        }
+        // The size is rounded up to a power of two for cheap wrapping.
+        long long int size = 16;
+        while(size < table_size)
+            size *= 2;
+        this->resize(size);
     }
 
     inline long long int hash(long long int i, long long int j, long long int k)
     {
-        return ((i*p1)^(j*p2)^(k*p3))%this->table_size;
+        unsigned long long int h = (i*p1)^(j*p2)^(k*p3);
+        // Mix the high bits into the low bits which are used for the slot.
+        h ^= h >> 33;
+        h *= 0xff51afd7ed558ccdULL;
+        h ^= h >> 33;
+        return (long long int)(h & this->mask);
     }
 
     void add(int i, int j, int k, int idx, double h)
     {
-        long long int key = this->hash(i,j,k);
-        HashEntry* prev = NULL;
-        HashEntry* entry = this->hashtable[key];
-        while(entry!=NULL)
+        long long int key = this->find_slot(i, j, k);
+        int cid = this->slots[key];
+        if(cid < 0)
         {
-            if(entry->c_x==i && entry->c_y==j && entry->c_z==k)
-                break;
-            prev = entry;
-            entry = entry->next;
+            cid = this->cells.size();
+            this->cells.push_back(HashEntry(h, i, j, k));
+            this->slots[key] = cid;
+            if(this->cells.size() > MAX_LOAD_FACTOR*this->table_size)
+                this->resize(2*this->table_size);
         }
-        if(entry!=NULL)
-            entry->add(idx, h);
-        else
+        HashEntry& cell = this->cells[cid];
+        cell.count++;
+        cell.h_max = max(cell.h_max, h);
+        this->particle_cells.push_back(cid);
+        this->particle_ids.push_back(idx);
+    }
+
+    // Lay out the particle indices of each cell contiguously.  This must be
+    // called after the particles are added and before `get` is used.
+    void build()
+    {
+        size_t n_cells = this->cells.size();
+        unsigned int offset = 0;
+        for(size_t cid=0; cid<n_cells; cid++)
         {
-            entry = new HashEntry(key, idx, h, i, j, k);
-            if(prev==NULL)
-                this->hashtable[key] = entry;
-            else
-                prev->next = entry;
+            this->cells[cid].start = offset;
+            offset += this->cells[cid].count;
+        }
+        this->arena.resize(offset);
+        unsigned int* arena = this->arena.data();
+        vector <unsigned int> filled(n_cells, 0);
+        for(size_t p=0; p<this->particle_ids.size(); p++)
+        {
+            unsigned int cid = this->particle_cells[p];
+            HashEntry& cell = this->cells[cid];
+            arena[cell.start + filled[cid]++] = this->particle_ids[p];
+        }
+        for(size_t cid=0; cid<n_cells; cid++)
+        {
+            HashEntry& cell = this->cells[cid];
+            cell.indices = arena + cell.start;
         }
     }
 
     HashEntry* get(int i, int j, int k)
     {
-        long long int key = this->hash(i,j,k);
-        HashEntry* entry = this->hashtable[key];
-        while(entry!=NULL)
-        {
-            if(entry->c_x==i && entry->c_y==j && entry->c_z==k)
-                return entry;
-            entry = entry->next;
-        }
-        return NULL;
+        int cid = this->slots[this->find_slot(i, j, k)];
+        if(cid < 0)
+            return NULL;
+        return &this->cells[cid];
     }
 
-    int number_of_particles()
+    // Remove all the particles, keeping the allocated storage.
+    void clear()
     {
-        HashEntry* curr = NULL;
-        int num_particles = 0;
-        for(int i=0; i<this->table_size; i++)
-        {
-            curr = this->hashtable[i];
-            while(curr!=NULL)
-            {
-                num_particles += curr->indices.size();
-                curr = curr->next;
-            }
-        }
-        return num_particles;
+        fill(this->slots.begin(), this->slots.end(), -1);
+        this->cells.clear();
+        this->particle_cells.clear();
+        this->particle_ids.clear();
+        this->arena.clear();
     }
 
-    ~HashTable()
+    int number_of_cells()
     {
-        for(int i=0; i<this->table_size; i++)
-        {
-            HashEntry* entry = this->hashtable[i];
-            while(entry!=NULL)
-            {
-                HashEntry* prev = entry;
-                entry = entry->next;
-                delete prev;
-            }
-        }
-        delete[] this->hashtable;
+        return this->cells.size();
+    }
+
+    // Store the number of particles in each cell in `counts`, which must
+    // have `number_of_cells()` entries.
+    void get_counts(unsigned int* counts)
+    {
+        for(size_t cid=0; cid<this->cells.size(); cid++)
+            counts[cid] = this->cells[cid].count;
+    }
+
+    int number_of_particles()
+    {
+        return this->particle_ids.size();
     }
 };
 
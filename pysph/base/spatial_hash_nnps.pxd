@@ -1,20 +1,23 @@
 # cython: language_level=3, embedsignature=True
 # distutils: language=c++
-from libcpp.vector cimport vector
-
 from .nnps_base cimport *
 
 #Imports for SpatialHashNNPS
 cdef extern from "spatial_hash.h":
     cdef cppclass HashEntry:
         double h_max
+        unsigned int count
 
-        vector[unsigned int] *get_indices() nogil
+        unsigned int* get_indices() nogil
 
     cdef cppclass HashTable:
         HashTable(long long int) nogil except +
         void add(int, int, int, int, double) nogil
+        void build() nogil
+        void clear() nogil
         HashEntry* get(int, int, int) nogil
+        int number_of_cells() nogil
+        void get_counts(unsigned int*) nogil
 
 # NNPS using Spatial Hashing algorithm
 cdef class SpatialHashNNPS(NNPS):
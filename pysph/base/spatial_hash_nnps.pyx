@@ -1,9 +1,10 @@
 # cython: language_level=3, embedsignature=True
 # distutils: language=c++
 
+import numpy as np
+
 # malloc and friends
 from libc.stdlib cimport malloc, free
-from libcpp.vector cimport vector
 
 # Cython for compiler directives
 cimport cython
@@ -35,6 +36,10 @@ cdef class SpatialHashNNPS(NNPS):
             cache, sort_gids
         )
 
+        # The bins only depend on the positions and the cell size.
+        self.supports_h_padding = True
+        self.supports_append = True
+
         self.src_index = 0
         self.dst_index = 0
         self.sort_gids = sort_gids
@@ -68,6 +73,19 @@ cdef class SpatialHashNNPS(NNPS):
 
     #### Public protocol ################################################
 
+    def get_bin_occupancy(self, int pa_index):
+        """Return the size of the cells and the number of particles in each
+        occupied cell of the `pa_index` array.
+        """
+        cdef HashTable* table = self.hashtable[pa_index]
+        cdef int n_cells = table.number_of_cells()
+        counts = np.zeros(n_cells, dtype=np.uint32)
+        cdef unsigned int[:] _counts = counts
+        if n_cells > 0:
+            table.get_counts(&_counts[0])
+        return (dict(kind='cells', cell_size=self.cell_size),
+                counts.astype(np.int64))
+
     cpdef set_context(self, int src_index, int dst_index):
         """Set context for nearest neighbor searches.
 
@@ -116,7 +134,7 @@ cdef class SpatialHashNNPS(NNPS):
         cdef unsigned int i, j, k
 
         cdef HashEntry* candidate_cell
-        cdef vector[unsigned int] *candidates
+        cdef unsigned int* candidates
 
         find_cell_id_raw(
                 x - xmin[0],
@@ -142,9 +160,9 @@ cdef class SpatialHashNNPS(NNPS):
             if candidate_cell == NULL:
                 continue
             candidates = candidate_cell.get_indices()
-            candidate_size = candidates.size()
+            candidate_size = candidate_cell.count
             for j from 0<=j<candidate_size:
-                k = (candidates[0])[j]
+                k = candidates[j]
                 hj2 = self.radius_scale2*src_h_ptr[k]*src_h_ptr[k]
                 xij2 = norm2(
                         src_x_ptr[k] - x,
@@ -183,8 +201,7 @@ cdef class SpatialHashNNPS(NNPS):
     cpdef _refresh(self):
         cdef int i
         for i from 0<=i<self.narrays:
-            del self.hashtable[i]
-            self.hashtable[i] = new HashTable(self.table_size)
+            self.hashtable[i].clear()
         self.current_hash = self.hashtable[self.src_index]
 
     cpdef _bin(self, int pa_index, UIntArray indices):
@@ -213,6 +230,8 @@ cdef class SpatialHashNNPS(NNPS):
                     )
             self._add_to_hashtable(pa_index, idx, src_h_ptr[idx], c_x, c_y, c_z)
 
+        self.hashtable[pa_index].build()
+
 
 #############################################################################
 cdef class ExtendedSpatialHashNNPS(NNPS):
@@ -274,6 +293,19 @@ cdef class ExtendedSpatialHashNNPS(NNPS):
 
     #### Public protocol ################################################
 
+    def get_bin_occupancy(self, int pa_index):
+        """Return the size of the cells and the number of particles in each
+        occupied cell of the `pa_index` array.
+        """
+        cdef HashTable* table = self.hashtable[pa_index]
+        cdef int n_cells = table.number_of_cells()
+        counts = np.zeros(n_cells, dtype=np.uint32)
+        cdef unsigned int[:] _counts = counts
+        if n_cells > 0:
+            table.get_counts(&_counts[0])
+        return (dict(kind='cells', cell_size=self.h_sub),
+                counts.astype(np.int64))
+
     cpdef set_context(self, int src_index, int dst_index):
         """Set context for nearest neighbor searches.
 
@@ -322,7 +354,7 @@ cdef class ExtendedSpatialHashNNPS(NNPS):
         cdef unsigned int i, j, k
 
         cdef HashEntry* candidate_cell
-        cdef vector[unsigned int] *candidates
+        cdef unsigned int* candidates
 
         find_cell_id_raw(
                 x - xmin[0],
@@ -351,9 +383,9 @@ cdef class ExtendedSpatialHashNNPS(NNPS):
             if candidate_cell == NULL:
                 continue
             candidates = candidate_cell.get_indices()
-            candidate_size = candidates.size()
+            candidate_size = candidate_cell.count
             for j from 0<=j<candidate_size:
-                k = (candidates[0])[j]
+                k = candidates[j]
                 hj2 = self.radius_scale2*src_h_ptr[k]*src_h_ptr[k]
                 xij2 = norm2(
                         src_x_ptr[k] - x,
@@ -462,8 +494,7 @@ cdef class ExtendedSpatialHashNNPS(NNPS):
     cpdef _refresh(self):
         cdef int i
         for i from 0<=i<self.narrays:
-            del self.hashtable[i]
-            self.hashtable[i] = new HashTable(self.table_size)
+            self.hashtable[i].clear()
         self.current_hash = self.hashtable[self.src_index]
 
     @cython.cdivision(True)
@@ -494,3 +525,5 @@ cdef class ExtendedSpatialHashNNPS(NNPS):
                     &c_x, &c_y, &c_z
                     )
             self._add_to_hashtable(pa_index, idx, src_h_ptr[idx], c_x, c_y, c_z)
+
+        self.hashtable[pa_index].build()
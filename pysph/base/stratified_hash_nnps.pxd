@@ -1,7 +1,5 @@
 # cython: language_level=3, embedsignature=True
 # distutils: language=c++
-from libcpp.vector cimport vector
-
 from .nnps_base cimport *
 
 ctypedef unsigned int u_int
@@ -18,14 +16,17 @@ cdef extern from 'math.h':
 cdef extern from "spatial_hash.h":
     cdef cppclass HashEntry:
         double h_max
+        unsigned int count
 
-        vector[unsigned int] *get_indices() nogil
+        unsigned int* get_indices() nogil
 
     cdef cppclass HashTable:
         long long int table_size
 
         HashTable(long long int) nogil except +
         void add(int, int, int, int, double) nogil
+        void build() nogil
+        void clear() nogil
         HashEntry* get(int, int, int) nogil
         int number_of_particles() nogil
 
@@ -3,7 +3,6 @@
 # malloc and friends
 from libc.stdlib cimport malloc, free
 from libc.stdio cimport printf
-from libcpp.vector cimport vector
 
 from .nnps_base cimport *
 
@@ -145,7 +144,7 @@ cdef class StratifiedHashNNPS(NNPS):
         cdef int c_x, c_y, c_z
         cdef double* xmin = self.xmin.data
         cdef unsigned int i, j, k, n
-        cdef vector[unsigned int] *candidates
+        cdef unsigned int* candidates
         cdef int candidate_size = 0
 
         cdef double xij2 = 0
@@ -195,9 +194,9 @@ cdef class StratifiedHashNNPS(NNPS):
                 if candidate_cell == NULL:
                     continue
                 candidates = candidate_cell.get_indices()
-                candidate_size = candidates.size()
+                candidate_size = candidate_cell.count
                 for k from 0<=k<candidate_size:
-                    n = (candidates[0])[k]
+                    n = candidates[k]
                     hj2 = self.radius_scale2*src_h_ptr[n]*src_h_ptr[n]
                     xij2 = norm2(
                             src_x_ptr[n] - x,
@@ -288,9 +287,10 @@ cdef class StratifiedHashNNPS(NNPS):
             current_hash = self.hashtable[i]
             current_cells = self.cell_sizes[i]
             for j from 0<=j<self.num_levels:
-                if current_hash[j] != NULL:
-                    del current_hash[j]
-                current_hash[j] = new HashTable(self.table_size)
+                if current_hash[j] == NULL:
+                    current_hash[j] = new HashTable(self.table_size)
+                else:
+                    current_hash[j].clear()
                 current_cells[j] = 0
         self.current_hash = self.hashtable[self.src_index]
         self.current_cells = self.cell_sizes[self.src_index]
@@ -327,3 +327,6 @@ cdef class StratifiedHashNNPS(NNPS):
                     &c_x, &c_y, &c_z
                     )
             current_hash[hash_id].add(c_x, c_y, c_z, idx, src_h_ptr[idx])
+
+        for i from 0<=i<self.num_levels:
+            current_hash[i].build()
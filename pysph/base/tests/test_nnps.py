@@ -11,6 +11,7 @@ from numpy import random
 from pysph.base.point import IntPoint, Point
 from pysph.base.utils import get_particle_array
 from pysph.base import nnps
+from pysph.base.nnps_base import count_neighbors
 from compyle.config import get_config
 
 # Carrays from PyZoltan
@@ -1170,6 +1171,169 @@ def test_neighbor_cache_update_doesnt_leak():
     assert new_length == old_length
 
 
+def _check_neighbors_with_brute_force(nps, n):
+    nbrs = UIntArray()
+    bf_nbrs = UIntArray()
+    nps.set_context(0, 0)
+    for i in range(n):
+        nps.get_nearest_particles(0, 0, i, nbrs)
+        nps.brute_force_neighbors(0, 0, i, bf_nbrs)
+        assert sorted(nbrs) == sorted(bf_nbrs), 'Failed for particle: %d' % i
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_h_padding_reuses_bins_when_only_h_changes(cache):
+    # Given
+    numpy.random.seed(123)
+    x, y, z = numpy.random.random((3, 500))
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.05)
+    nps = nnps.LinkedListNNPS(dim=3, particles=[pa], cache=cache)
+    nps.set_h_padding(0.2)
+    nps.update()
+    cell_size = nps.cell_size
+
+    # When
+    pa.h[:] = 0.055
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    assert nps.cell_size == cell_size
+    _check_neighbors_with_brute_force(nps, 500)
+
+    # When
+    pa.h[:] = 0.07
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    assert nps.cell_size > cell_size
+    _check_neighbors_with_brute_force(nps, 500)
+
+
+def test_h_padding_rebins_when_particles_move():
+    # Given
+    numpy.random.seed(123)
+    x, y, z = numpy.random.random((3, 500))
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.05)
+    nps = nnps.LinkedListNNPS(dim=3, particles=[pa])
+    nps.set_h_padding(0.2)
+    nps.update()
+
+    # When
+    pa.x[:] = numpy.random.random(500)
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    _check_neighbors_with_brute_force(nps, 500)
+
+
+def test_h_padding_is_not_supported_by_tree_nnps():
+    x, y, z = numpy.random.random((3, 10))
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.05)
+    nps = nnps.OctreeNNPS(dim=3, particles=[pa])
+    with pytest.raises(ValueError):
+        nps.set_h_padding(0.2)
+    with pytest.raises(ValueError):
+        nnps.LinkedListNNPS(dim=3, particles=[pa]).set_h_padding(-0.1)
+
+
+@pytest.mark.parametrize(
+    "cls", [nnps.LinkedListNNPS, nnps.OctreeNNPS, nnps.StratifiedSFCNNPS]
+)
+def test_reuse_unchanged_bins(cls):
+    # Given
+    numpy.random.seed(123)
+    x, y, z = numpy.random.random((3, 500))
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.05)
+    nps = cls(dim=3, particles=[pa])
+    nps.set_reuse_unchanged_bins(True)
+    nps.update()
+
+    # When
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    assert nps.n_reused_bins == 1
+    _check_neighbors_with_brute_force(nps, 500)
+
+    # When
+    pa.h[:] = 0.07
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    # A larger h needs larger cells so the particles are binned again.
+    assert nps.n_reused_bins == 1
+    _check_neighbors_with_brute_force(nps, 500)
+
+    # When
+    pa.x[:] = numpy.random.random(500)
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    assert nps.n_reused_bins == 1
+    _check_neighbors_with_brute_force(nps, 500)
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+@pytest.mark.parametrize(
+    "cls", [nnps.LinkedListNNPS, nnps.SpatialHashNNPS, nnps.BoxSortNNPS]
+)
+def test_end_update_bins_particles_appended_after_begin_update(cls, dim):
+    # Given
+    numpy.random.seed(123)
+    x, y, z = numpy.random.random((3, 400))*0.8 + 0.1
+    if dim == 2:
+        z[:] = 0.0
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.05)
+    nps = cls(dim=dim, particles=[pa])
+    n_updates = nps.n_updates
+
+    # When
+    nps.begin_update(halo_width=0.1)
+    # The remote particles of a parallel run are appended after the local
+    # particles have been binned.
+    xr, yr, zr = numpy.random.random((3, 100))*0.9 + 0.05
+    if dim == 2:
+        zr[:] = 0.0
+    pa.add_particles(x=xr, y=yr, z=zr, h=numpy.ones(100)*0.05)
+    nps.end_update()
+
+    # Then
+    assert nps.n_updates == n_updates + 1
+    if nps.supports_append:
+        # The bounds were padded by the halo width and not recomputed.
+        xmin = nps.xmin.get_npy_array()[:dim]
+        expect = [x.min() - 0.1, y.min() - 0.1, z.min() - 0.1][:dim]
+        assert numpy.all(xmin <= expect)
+    _check_neighbors_with_brute_force(nps, 500)
+
+
+@pytest.mark.parametrize("cls", [nnps.LinkedListNNPS, nnps.SpatialHashNNPS])
+def test_end_update_falls_back_to_update_outside_bounds(cls):
+    # Given
+    numpy.random.seed(123)
+    x, y, z = numpy.random.random((3, 400))*0.5
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.05)
+    nps = cls(dim=3, particles=[pa])
+    n_updates = nps.n_updates
+
+    # When
+    nps.begin_update(halo_width=0.1)
+    xr, yr, zr = numpy.random.random((3, 100)) + 0.5
+    pa.add_particles(x=xr, y=yr, z=zr, h=numpy.ones(100)*0.05)
+    nps.end_update()
+
+    # Then
+    assert nps.n_updates == n_updates + 1
+    assert nps.xmax.get_npy_array()[0] >= xr.max()
+    _check_neighbors_with_brute_force(nps, 500)
+
+
 nnps_classes = [
     nnps.BoxSortNNPS,
     nnps.CellIndexingNNPS,
@@ -1233,6 +1397,138 @@ def test_large_number_of_neighbors_spatial_hash():
     assert nbrs.length == len(x)
 
 
+@pytest.mark.parametrize("cls", [nnps.SpatialHashNNPS,
+                                 nnps.ExtendedSpatialHashNNPS])
+def test_spatial_hash_grows_small_table(cls):
+    # Given
+    numpy.random.seed(123)
+    x, y, z = numpy.random.random((3, 2000))
+    pa = get_particle_array(name='fluid', x=x, y=y, z=z, h=0.04)
+
+    # When
+    nps = cls(dim=3, particles=[pa], table_size=16)
+
+    # Then
+    _check_neighbors_with_brute_force(nps, 2000)
+
+    # When
+    pa.x[:] = numpy.random.random(2000)
+    nps.update_domain()
+    nps.update()
+
+    # Then
+    _check_neighbors_with_brute_force(nps, 2000)
+
+
+@pytest.mark.parametrize("cls", [nnps.LinkedListNNPS,
+                                 nnps.SpatialHashNNPS,
+                                 nnps.ExtendedSpatialHashNNPS,
+                                 nnps.OctreeNNPS])
+def test_neighbor_statistics(cls):
+    # Given
+    x, y = numpy.mgrid[0:1:0.05, 0:1:0.05]
+    fluid = get_particle_array(name='fluid', x=x.ravel(), y=y.ravel(),
+                               h=0.06)
+    solid = get_particle_array(name='solid', x=x[0], y=y[0] - 0.05,
+                               h=0.06)
+    nps = cls(dim=2, particles=[fluid, solid], radius_scale=2.0)
+
+    # When
+    stats = nps.get_neighbor_statistics(1, 0, bins=4)
+
+    # Then
+    counts = []
+    nbrs = UIntArray()
+    for i in range(400):
+        nps.get_nearest_particles(1, 0, i, nbrs)
+        counts.append(nbrs.length)
+    assert (stats['src'], stats['dst']) == ('solid', 'fluid')
+    assert (stats['n_src'], stats['n_dst']) == (20, 400)
+    nb = stats['neighbors']
+    assert nb['total'] == sum(counts)
+    assert (nb['min'], nb['max']) == (min(counts), max(counts))
+    assert sum(nb['histogram']) == 400
+    assert len(nb['bin_edges']) == 5
+    assert 0 < stats['accept_ratio'] <= 1
+    assert stats['candidates']['total'] >= nb['total']
+    assert stats['cells']['total'] == 20
+    assert nps.n_updates == 1
+    assert nps.total_update_time == nps.update_time > 0
+
+    # When
+    nps.update()
+
+    # Then
+    assert nps.n_updates == 2
+    assert nps.total_update_time >= nps.update_time
+
+
+def test_bin_occupancy_is_that_of_the_nnps():
+    # Given
+    x, y = numpy.mgrid[0:1:0.05, 0:1:0.05]
+    pa = get_particle_array(name='fluid', x=x.ravel(), y=y.ravel(), h=0.06)
+    ll = nnps.LinkedListNNPS(dim=2, particles=[pa], radius_scale=2.0)
+    sh = nnps.ExtendedSpatialHashNNPS(dim=2, particles=[pa],
+                                      radius_scale=2.0, H=3)
+    octree = nnps.OctreeNNPS(dim=2, particles=[pa], radius_scale=2.0,
+                             leaf_max_particles=5)
+
+    # When
+    ll_info, ll_occ = ll.get_bin_occupancy(0)
+    sh_info, sh_occ = sh.get_bin_occupancy(0)
+    oct_info, oct_occ = octree.get_bin_occupancy(0)
+
+    # Then
+    heads = ll.heads[0].get_npy_array()
+    assert ll_info == dict(kind='cells', cell_size=ll.cell_size)
+    assert len(ll_occ) == numpy.count_nonzero(heads != 2**32 - 1)
+    assert sh_info['kind'] == 'cells'
+    assert sh_info['cell_size'] == pytest.approx(sh.cell_size/3)
+    assert len(sh_occ) > len(ll_occ)
+    assert oct_info == dict(kind='leaves', leaf_max_particles=5)
+    assert 0 < oct_occ.max() <= 5
+    for occ in (ll_occ, sh_occ, oct_occ):
+        assert occ.sum() == 400
+        assert occ.min() > 0
+
+    # When
+    pa.x[:] *= 2.0
+    octree.update_domain()
+    octree.update()
+
+    # Then
+    assert octree.get_bin_occupancy(0)[1].sum() == 400
+
+
+@pytest.mark.parametrize("openmp", [False, True])
+@pytest.mark.parametrize("cache", [False, True])
+def test_count_neighbors(cache, openmp):
+    # Given
+    cfg = get_config()
+    use_openmp = cfg.use_openmp
+    cfg.use_openmp = openmp
+    x, y = numpy.mgrid[0:1:0.05, 0:1:0.05]
+    fluid = get_particle_array(name='fluid', x=x.ravel(), y=y.ravel(),
+                               h=0.06)
+    solid = get_particle_array(name='solid', x=x[0], y=y[0] - 0.05,
+                               h=0.06)
+    nps = nnps.LinkedListNNPS(dim=2, particles=[fluid, solid], cache=cache)
+
+    # When
+    try:
+        total = count_neighbors(nps, 1, 0)
+    finally:
+        cfg.use_openmp = use_openmp
+
+    # Then
+    expect = 0
+    nbrs = UIntArray()
+    for i in range(400):
+        nps.get_nearest_particles(1, 0, i, nbrs)
+        expect += nbrs.length
+    assert total == expect > 0
+
+
 def test_large_number_of_neighbors_octree():
     x = numpy.random.random(1 << 14) * 0.1
     y = x.copy()
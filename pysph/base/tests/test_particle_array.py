@@ -1065,6 +1065,22 @@ class ParticleArrayTestCPU(unittest.TestCase, ParticleArrayTest):
         self.assertEqual(len(p1.c), len(p2.c))
         check_array(p1.c, p2.c)
 
+    def test_ensure_properties_updates_changed_strides(self):
+        # Given
+        src = particle_array.ParticleArray(x={'data': numpy.arange(4.0)})
+        src.add_property('a', stride=2)
+        dest = src.empty_clone()
+        src.remove_property('a')
+        src.add_property('a', stride=3)
+
+        # When
+        dest.ensure_properties(src)
+        src.extract_particles([1, 2], dest_array=dest)
+
+        # Then
+        self.assertEqual(dest.stride['a'], 3)
+        self.assertEqual(len(dest.properties['a']), 6)
+
     def test_set(self):
         """
         Tests the set function.
@@ -497,6 +497,25 @@ def get_particles_info(particles):
     return info
 
 
+def get_memory_usage(particles):
+    """Return the memory used by the properties of the particles.
+
+    Returns
+    -------
+
+    An OrderedDict keyed on the array name with an OrderedDict of the
+    number of bytes used by each property, sorted by the property name.
+
+    """
+    usage = OrderedDict()
+    for parray in particles:
+        usage[parray.name] = OrderedDict(
+            (name, prop.get_npy_array().nbytes)
+            for name, prop in sorted(parray.properties.items())
+        )
+    return usage
+
+
 def create_dummy_particles(info):
     """Returns a replica (empty) of a list of particles"""
     particles = []
@@ -37,6 +37,9 @@ cdef class ZOrderNNPS(NNPS):
             cache, sort_gids
         )
 
+        # The bins only depend on the positions and the cell size.
+        self.supports_h_padding = True
+
         self.radius_scale2 = radius_scale*radius_scale
         cdef NNPSParticleArrayWrapper pa_wrapper
         cdef int i, num_particles
@@ -587,6 +590,7 @@ cdef class ExtendedZOrderNNPS(ZOrderNNPS):
             self, dim, particles, radius_scale, ghost_layers, domain,
             cache, sort_gids, H=H, asymmetric=asymmetric
         )
+        self.supports_h_padding = False
 
     def __cinit__(self, int dim, list particles, double radius_scale = 2.0,
             int ghost_layers = 1, domain=None, bint fixed_h = False,
@@ -0,0 +1,34 @@
+"""Benchmarks for the core parts of PySPH.
+
+The benchmarks follow the conventions of airspeed velocity (asv): each
+benchmark is a class with optional ``params``, ``param_names``, ``setup``
+and ``teardown`` and ``time_*`` methods that are timed.  They may be run
+with asv or offline using ``pysph bench`` (see :mod:`pysph.benchmarks.runner`)
+which saves machine readable results that can be compared against a
+baseline.
+
+"""
+
+import os
+
+#: Environment variable setting the largest problem size that is run.
+MAX_PARTICLES_ENV = 'PYSPH_BENCH_MAX_PARTICLES'
+
+
+def get_max_particles():
+    """Return the largest number of particles a benchmark should use.
+
+    This is set using the ``PYSPH_BENCH_MAX_PARTICLES`` environment variable
+    and defaults to 1e5 so that a full run completes in a few minutes.
+    """
+    return int(float(os.environ.get(MAX_PARTICLES_ENV, 1e5)))
+
+
+def skip_if_too_large(n):
+    """Skip a benchmark (as asv does) if `n` is larger than the maximum
+    number of particles.
+    """
+    if n > get_max_particles():
+        raise NotImplementedError(
+            'Skipping %d particles, see %s.' % (n, MAX_PARTICLES_ENV)
+        )
@@ -0,0 +1,37 @@
+"""Benchmarks for generating and compiling the code for a simulation.
+"""
+
+import shutil
+from tempfile import mkdtemp
+
+from pysph.sph.sph_compiler import SPHCompiler
+from pysph.benchmarks.bench_schemes import setup_case
+
+
+class Compile(object):
+    """Time to generate the code and to build it without any cache."""
+    params = [['dam_break_2d:wcsph', 'elliptical_drop:wcsph',
+               'taylor_green:edac']]
+    param_names = ['case']
+    number = 1
+    repeat = 1
+    timeout = 1200
+
+    def setup(self, case):
+        self.root = mkdtemp()
+        app = setup_case(case, self.root)
+        solver = app.solver
+        self.compiler = SPHCompiler(
+            solver.acceleration_evals, solver.integrator
+        )
+        self.code = self.compiler._get_code()
+
+    def teardown(self, case):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_generate_code(self, case):
+        self.compiler._get_code()
+
+    def time_compile(self, case):
+        helper = self.compiler.acceleration_eval_helpers[0]
+        helper.compile(self.code, root=self.root)
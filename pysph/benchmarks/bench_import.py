@@ -0,0 +1,25 @@
+"""Benchmarks for the time to import the commonly used modules.
+
+Short jobs and post-processing scripts pay this on every run.  Each import
+is done in a new Python process so nothing is already imported, the time
+includes starting the interpreter which is timed separately as ``python``.
+"""
+
+import subprocess
+import sys
+
+
+def _run_python(code):
+    subprocess.check_call([sys.executable, '-c', code])
+
+
+class Import(object):
+    """Time to start Python and import a module."""
+    params = [['python', 'pysph', 'pysph.solver.utils',
+               'pysph.solver.application', 'pysph.solver.solver',
+               'pysph.tools.cli']]
+    param_names = ['module']
+    repeat = 5
+
+    def time_import(self, module):
+        _run_python('pass' if module == 'python' else 'import ' + module)
@@ -0,0 +1,71 @@
+"""Benchmarks for binning particles and finding neighbors.
+"""
+
+import numpy as np
+
+from pysph.base import nnps
+from pysph.base.utils import get_particle_array
+from pysph.benchmarks import skip_if_too_large
+
+
+NNPS_CLASSES = {
+    'linked_list': nnps.LinkedListNNPS,
+    'spatial_hash': nnps.SpatialHashNNPS,
+    'z_order': nnps.ZOrderNNPS,
+    'stratified_sfc': nnps.StratifiedSFCNNPS,
+    'octree': nnps.OctreeNNPS,
+}
+
+SIZES = [10000, 100000, 1000000, 10000000]
+
+
+def make_random_particles(n, dim, seed=123):
+    """Uniformly distributed particles in the unit square/cube with about
+    50 (2D) or 60 (3D) neighbors each.
+    """
+    rng = np.random.RandomState(seed)
+    dx = (1.0/n)**(1.0/dim)
+    x, y, z = np.zeros((3, n))
+    x[:] = rng.random_sample(n)
+    y[:] = rng.random_sample(n)
+    if dim == 3:
+        z[:] = rng.random_sample(n)
+    h = np.ones(n)*1.2*dx
+    return get_particle_array(name='fluid', x=x, y=y, z=z, h=h)
+
+
+class NNPSUpdate(object):
+    """Time to bin the particles."""
+    params = [sorted(NNPS_CLASSES), [2, 3], SIZES]
+    param_names = ['nnps', 'dim', 'n']
+    timeout = 600
+
+    def setup(self, name, dim, n):
+        skip_if_too_large(n)
+        self.pa = make_random_particles(n, dim)
+        self.nps = NNPS_CLASSES[name](
+            dim=dim, particles=[self.pa], radius_scale=2.0, cache=True
+        )
+
+    def time_update(self, name, dim, n):
+        self.nps.update()
+
+
+class NNPSQuery(object):
+    """Time to find the neighbors of all the particles once binned."""
+    params = [sorted(NNPS_CLASSES), [2, 3], SIZES]
+    param_names = ['nnps', 'dim', 'n']
+    timeout = 600
+
+    def setup(self, name, dim, n):
+        skip_if_too_large(n)
+        self.pa = make_random_particles(n, dim)
+        self.nps = NNPS_CLASSES[name](
+            dim=dim, particles=[self.pa], radius_scale=2.0, cache=True
+        )
+        self.nps.set_context(0, 0)
+
+    def time_find_all_neighbors(self, name, dim, n):
+        cache = self.nps.cache[0]
+        cache.update()
+        cache.find_all_neighbors()
@@ -0,0 +1,44 @@
+"""Benchmarks for dumping and loading the solution.
+"""
+
+import os
+import shutil
+from tempfile import mkdtemp
+
+from pysph.benchmarks import skip_if_too_large
+from pysph.benchmarks.bench_nnps import make_random_particles
+from pysph.solver.utils import dump, load
+
+
+def _solver_data():
+    return {'t': 0.0, 'dt': 1e-4, 'count': 0}
+
+
+class Output(object):
+    """Time to dump and load a particle array in the supported formats."""
+    params = [['npz', 'hdf5'], [10000, 100000, 1000000]]
+    param_names = ['format', 'n']
+    timeout = 600
+
+    def setup(self, fmt, n):
+        skip_if_too_large(n)
+        if fmt == 'hdf5':
+            try:
+                import h5py  # noqa: F401
+            except ImportError:
+                raise NotImplementedError('h5py is not installed.')
+        self.root = mkdtemp()
+        self.pa = make_random_particles(n, dim=3)
+        self.pa.add_output_arrays(['x', 'y', 'z', 'h', 'm', 'rho', 'p',
+                                   'u', 'v', 'w'])
+        self.fname = os.path.join(self.root, 'bench.' + fmt)
+        dump(self.fname, [self.pa], _solver_data())
+
+    def teardown(self, fmt, n):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_dump(self, fmt, n):
+        dump(self.fname, [self.pa], _solver_data())
+
+    def time_load(self, fmt, n):
+        load(self.fname)
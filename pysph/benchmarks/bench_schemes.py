@@ -0,0 +1,71 @@
+"""Benchmarks for the schemes on a few canonical examples.
+
+Each case is an example application with one of its schemes.  The timings
+are for evaluating the accelerations (including the neighbor update) and
+for a full integrator step at the default resolution of the example.
+"""
+
+import importlib
+import shutil
+from tempfile import mkdtemp
+
+
+CASES = {
+    'dam_break_2d:wcsph': ('pysph.examples.dam_break_2d', 'DamBreak2D'),
+    'dam_break_2d:edac': ('pysph.examples.dam_break_2d', 'DamBreak2D'),
+    'elliptical_drop:wcsph': (
+        'pysph.examples.elliptical_drop', 'EllipticalDrop'
+    ),
+    'elliptical_drop:iisph': (
+        'pysph.examples.elliptical_drop', 'EllipticalDrop'
+    ),
+    'taylor_green:tvf': ('pysph.examples.taylor_green', 'TaylorGreen'),
+    'taylor_green:edac': ('pysph.examples.taylor_green', 'TaylorGreen'),
+}
+
+
+def setup_case(case, output_dir, args=None):
+    """Create and setup the example application for the given case.
+
+    Parameters
+    ----------
+
+    case: str
+        One of the keys of CASES, the example and scheme separated by ':'.
+    output_dir: str
+        Directory for the output of the application.
+    args: list
+        Additional command line arguments for the application.
+    """
+    module, cls_name = CASES[case]
+    scheme = case.split(':')[1]
+    cls = getattr(importlib.import_module(module), cls_name)
+    app = cls(fname='bench', output_dir=output_dir)
+    argv = ['-d', output_dir, '--disable-output', '-q', '--scheme', scheme]
+    if args is not None:
+        argv.extend(args)
+    app.setup(argv)
+    return app
+
+
+class SchemeStep(object):
+    """Time to compute the accelerations and to take an integrator step."""
+    params = [sorted(CASES)]
+    param_names = ['case']
+    timeout = 600
+
+    def setup(self, case):
+        self.root = mkdtemp()
+        self.app = setup_case(case, self.root)
+        solver = self.app.solver
+        solver.integrator.initial_acceleration(solver.t, solver.dt)
+
+    def teardown(self, case):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_compute_accelerations(self, case):
+        self.app.solver.integrator.compute_accelerations()
+
+    def time_integrator_step(self, case):
+        solver = self.app.solver
+        solver.integrator.step(solver.t, solver.dt)
@@ -0,0 +1,247 @@
+"""Run the PySPH benchmarks and compare them against a baseline.
+
+This runs the asv style benchmarks in this package without needing asv or
+network access.  For example::
+
+    $ pysph bench -b nnps -o results.json
+    $ pysph bench -b nnps --compare results.json
+
+The results are saved as JSON along with information about the machine
+and the PySPH version so they can be tracked for regressions.
+"""
+
+from __future__ import print_function
+
+from argparse import ArgumentParser
+import datetime
+import importlib
+import itertools
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import pysph
+from pysph.benchmarks import MAX_PARTICLES_ENV
+
+
+BENCHMARK_MODULES = [
+    'bench_nnps', 'bench_schemes', 'bench_output', 'bench_compile',
+    'bench_import'
+]
+
+RESULTS_VERSION = 1
+
+
+def discover(pattern=None, modules=None):
+    """Return a list of (name, cls, method_name) for all the benchmarks.
+
+    Parameters
+    ----------
+
+    pattern: str
+        Only benchmarks whose full name matches this regular expression
+        are returned.
+    modules: list
+        Names of the modules in this package to look in, defaults to all.
+    """
+    if modules is None:
+        modules = BENCHMARK_MODULES
+    regex = re.compile(pattern) if pattern else None
+    benchmarks = []
+    for mod_name in modules:
+        mod = importlib.import_module('pysph.benchmarks.' + mod_name)
+        for cls_name in sorted(dir(mod)):
+            cls = getattr(mod, cls_name)
+            if not isinstance(cls, type) or cls.__module__ != mod.__name__:
+                continue
+            for meth in sorted(dir(cls)):
+                if not meth.startswith('time_'):
+                    continue
+                name = '%s.%s.%s' % (mod_name, cls_name, meth)
+                if regex is None or regex.search(name):
+                    benchmarks.append((name, cls, meth))
+    return benchmarks
+
+
+def get_param_combinations(cls):
+    params = getattr(cls, 'params', None)
+    if not params:
+        return [()]
+    if not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def run_benchmark(cls, method, params=(), repeat=None, number=None):
+    """Time the method of the benchmark class for the given parameters.
+
+    As done by asv, ``setup`` and ``teardown`` are called around each
+    repeat and the benchmark is skipped if ``setup`` raises a
+    NotImplementedError.
+
+    Returns the list of times (in seconds) for each repeat or None if the
+    benchmark was skipped.
+    """
+    if repeat is None:
+        repeat = getattr(cls, 'repeat', 3)
+    if number is None:
+        number = getattr(cls, 'number', 1)
+    times = []
+    for i in range(repeat):
+        obj = cls()
+        if hasattr(obj, 'setup'):
+            try:
+                obj.setup(*params)
+            except NotImplementedError:
+                return None
+        func = getattr(obj, method)
+        try:
+            start = time.perf_counter()
+            for j in range(number):
+                func(*params)
+            times.append((time.perf_counter() - start)/number)
+        finally:
+            if hasattr(obj, 'teardown'):
+                obj.teardown(*params)
+    return times
+
+
+def get_machine_info():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(pysph.__file__))
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(
+        machine=platform.node(), platform=platform.platform(),
+        processor=platform.processor(), cpu_count=os.cpu_count(),
+        python=platform.python_version(), numpy=np.__version__,
+        pysph=pysph.__version__, commit=commit,
+    )
+
+
+def run(pattern=None, repeat=None, modules=None, verbose=True):
+    """Run the benchmarks and return the results as a dictionary.
+    """
+    results = []
+    for name, cls, meth in discover(pattern, modules):
+        for params in get_param_combinations(cls):
+            times = run_benchmark(cls, meth, params, repeat=repeat)
+            entry = dict(name=name, params=[str(x) for x in params])
+            if times is None:
+                entry.update(time=None, times=[])
+            else:
+                entry.update(time=min(times), times=times)
+            results.append(entry)
+            if verbose:
+                print(format_entry(entry))
+                sys.stdout.flush()
+    return dict(
+        version=RESULTS_VERSION,
+        date=datetime.datetime.now().isoformat(),
+        max_particles=os.environ.get(MAX_PARTICLES_ENV),
+        info=get_machine_info(),
+        results=results
+    )
+
+
+def format_entry(entry):
+    name = '%s(%s)' % (entry['name'], ', '.join(entry['params']))
+    t = entry['time']
+    value = 'skipped' if t is None else '%.4g s' % t
+    return '%-70s %s' % (name, value)
+
+
+def compare(results, baseline, factor=1.2):
+    """Compare the results against the baseline.
+
+    Returns a list of (name, params, baseline_time, time) for the benchmarks
+    that are slower than the baseline by more than the given factor.
+    """
+    old = {}
+    for entry in baseline['results']:
+        old[(entry['name'], tuple(entry['params']))] = entry['time']
+    slower = []
+    for entry in results['results']:
+        key = (entry['name'], tuple(entry['params']))
+        t_old = old.get(key)
+        t_new = entry['time']
+        if t_old is None or t_new is None:
+            continue
+        if t_new > factor*t_old:
+            slower.append((entry['name'], entry['params'], t_old, t_new))
+    return slower
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog='pysph bench', description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        '-b', '--bench', action='store', dest='bench', default=None,
+        help='Only run benchmarks matching this regular expression.'
+    )
+    parser.add_argument(
+        '-l', '--list', action='store_true', dest='list', default=False,
+        help='List the benchmarks and exit.'
+    )
+    parser.add_argument(
+        '--max-particles', action='store', type=float, dest='max_particles',
+        default=None,
+        help='Skip problem sizes with more particles (default 1e5).'
+    )
+    parser.add_argument(
+        '--repeat', action='store', type=int, dest='repeat', default=None,
+        help='Number of times each benchmark is repeated.'
+    )
+    parser.add_argument(
+        '-o', '--output', action='store', dest='output', default=None,
+        help='Save the results to this JSON file.'
+    )
+    parser.add_argument(
+        '--compare', action='store', dest='compare', default=None,
+        help='Compare the results with this JSON file of baseline results.'
+    )
+    parser.add_argument(
+        '--factor', action='store', type=float, dest='factor', default=1.2,
+        help='Report benchmarks slower than the baseline by this factor.'
+    )
+    options = parser.parse_args(argv)
+
+    if options.list:
+        for name, cls, meth in discover(options.bench):
+            print(name)
+        return
+
+    if options.max_particles is not None:
+        os.environ[MAX_PARTICLES_ENV] = str(int(options.max_particles))
+
+    results = run(options.bench, repeat=options.repeat)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, options.factor)
+        for name, params, t_old, t_new in slower:
+            print('SLOWER: %s(%s) %.4g s -> %.4g s (%.2fx)' % (
+                name, ', '.join(params), t_old, t_new, t_new/t_old
+            ))
+        if slower:
+            sys.exit(1)
+        print('No benchmark is slower than the baseline by %gx.' %
+              options.factor)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import os
+import unittest
+
+from pysph.benchmarks import MAX_PARTICLES_ENV, get_max_particles
+from pysph.benchmarks.runner import (
+    compare, discover, get_param_combinations, run, run_benchmark
+)
+
+
+class Counter(object):
+    params = [[1, 2], ['a']]
+    param_names = ['n', 'name']
+    repeat = 2
+
+    def setup(self, n, name):
+        if n > 1:
+            raise NotImplementedError()
+        self.calls = []
+
+    def teardown(self, n, name):
+        Counter.last_calls = list(self.calls)
+
+    def time_call(self, n, name):
+        self.calls.append((n, name))
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self._env = os.environ.get(MAX_PARTICLES_ENV)
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop(MAX_PARTICLES_ENV, None)
+        else:
+            os.environ[MAX_PARTICLES_ENV] = self._env
+
+    def test_param_combinations(self):
+        self.assertEqual(get_param_combinations(Counter),
+                         [(1, 'a'), (2, 'a')])
+        self.assertEqual(get_param_combinations(object), [()])
+
+    def test_run_benchmark_calls_setup_and_teardown(self):
+        # When
+        times = run_benchmark(Counter, 'time_call', (1, 'a'), number=3)
+
+        # Then
+        self.assertEqual(len(times), 2)
+        self.assertEqual(Counter.last_calls, [(1, 'a')]*3)
+
+    def test_run_benchmark_skips_when_setup_is_not_implemented(self):
+        self.assertIsNone(run_benchmark(Counter, 'time_call', (2, 'a')))
+
+    def test_discover_filters_benchmarks(self):
+        names = [x[0] for x in discover('NNPSUpdate')]
+        self.assertEqual(names, ['bench_nnps.NNPSUpdate.time_update'])
+
+    def test_run_and_compare(self):
+        # Given
+        os.environ[MAX_PARTICLES_ENV] = '10000'
+        self.assertEqual(get_max_particles(), 10000)
+
+        # When
+        results = run('NNPSUpdate', repeat=1, verbose=False)
+
+        # Then
+        entries = results['results']
+        timed = [x for x in entries if x['time'] is not None]
+        self.assertEqual(len(timed), 10)
+        self.assertTrue(all(x['params'][2] == '10000' for x in timed))
+        self.assertEqual(results['info']['cpu_count'], os.cpu_count())
+
+        # When
+        slower = compare(results, results)
+
+        # Then
+        self.assertEqual(slower, [])
+
+        # When
+        baseline = dict(results=[dict(x) for x in entries])
+        baseline['results'][0]['time'] = entries[0]['time']/10.0
+        slower = compare(results, baseline, factor=2.0)
+
+        # Then
+        self.assertEqual(len(slower), 1)
+        self.assertEqual(slower[0][0], entries[0]['name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
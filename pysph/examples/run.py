@@ -169,6 +169,12 @@ def main(argv=None):
         "--cat", action="store_true", default=False, dest="cat",
         help="Show/cat the example code on stdout"
     )
+    parser.add_argument(
+        "--batch", action="store", default=None, dest="batch",
+        metavar="SPEC",
+        help="Run the matrix of examples in the given JSON/YAML file, use "
+        "'--batch -h' for the options"
+    )
     parser.add_argument(
         "args", type=str, nargs="?",
         help='''optional example name (for example both cavity or
@@ -179,6 +185,12 @@ def main(argv=None):
         parser.print_help()
         sys.exit()
 
+    if '--batch' in argv:
+        # The remaining arguments are for the batch runner.
+        from pysph.tools.batch import main as batch_main
+        idx = argv.index('--batch')
+        return batch_main(argv[:idx] + argv[idx + 1:])
+
     options, extra = parser.parse_known_args(argv)
     if options.list:
         return list_examples(examples)
@@ -51,6 +51,20 @@ cdef class ParticleArrayExchange:
     cdef public int nprops
     cdef public double lb_weight
 
+    # props exchanged for remote particles (a subset of lb_props)
+    cdef public list remote_props
+
+    # number of bytes per particle when the lb/remote props are packed
+    cdef public int msg_nbytes
+    cdef public int remote_msg_nbytes
+
+    # state of a posted (non-blocking) remote exchange
+    cdef public bint exchange_posted
+    cdef ZComm _zcomm
+    cdef np.ndarray _sendbuf
+    cdef np.ndarray _recvbuf
+    cdef int _recv_count
+
     # Import/Export lists for particles
     cdef public UIntArray exportParticleGlobalids
     cdef public UIntArray exportParticleLocalids
@@ -66,7 +80,10 @@ cdef class ParticleArrayExchange:
     # Member functions
     ############################################################################
     # exchange data given send and receive lists
-    cdef exchange_data(self, ZComm zcomm, dict sendbufs, int count)
+    cdef exchange_data(self, ZComm zcomm, np.ndarray sendbuf, int count)
+
+    # copy a packed receive buffer into the particle properties
+    cdef _unpack_recvbuf(self, np.ndarray recvbuf, int count, list props)
 
 # base class for all parallel managers
 cdef class ParallelManager:
@@ -84,6 +101,12 @@ cdef class ParallelManager:
     cdef public int lb_freq              # load balancing frequency
     cdef public int lb_count             # counter for current lb step
 
+    # adaptive load balancing based on the measured compute times
+    cdef public double lb_imbalance      # max/mean time to repartition
+    cdef public double compute_time      # compute time since last check
+    cdef public double cost_factor       # relative cost of local particles
+    cdef public double imbalance         # last measured max/mean time
+
     cdef public int ncells_local         # number of local cells
     cdef public int ncells_remote        # number of remote cells
     cdef public int ncells_total         # total number of cells
@@ -108,6 +131,13 @@ cdef class ParallelManager:
     cdef public bint initial_update
     cdef public bint update_cell_sizes
 
+    # persistent halo mode: remote export lists are reused across steps
+    cdef public bint persistent_halo
+    cdef public dict halo_cell_procs     # cell id -> neighboring procs
+    cdef public double halo_cell_size    # cell size for the cached procs
+    cdef public dict halo_cell_exports   # cell id -> export entries
+    cdef public int n_reused_cells       # cells with reused export entries
+
     # number of arrays
     cdef int narrays
 
@@ -8,6 +8,7 @@ cimport numpy as np
 import mpi4py.MPI as mpi
 
 from cpython.list cimport PyList_Append, PyList_GET_SIZE
+from libc.string cimport memcmp, memcpy
 
 from compyle.profile import profile_ctx, ProfileContext
 
@@ -41,6 +42,77 @@ cpdef get_strided_indices(np.ndarray indices, int stride):
         return np.ravel(np.column_stack(args))
 
 
+cdef UIntArray _copy_uint(UIntArray src):
+    cdef UIntArray dest = UIntArray(src.length)
+    if src.length > 0:
+        memcpy(dest.data, src.data, src.length*sizeof(unsigned int))
+    return dest
+
+
+cdef void _extend_uint(UIntArray dest, UIntArray src):
+    cdef long start = dest.length
+    dest.resize(start + src.length)
+    if src.length > 0:
+        memcpy(&dest.data[start], src.data, src.length*sizeof(unsigned int))
+
+
+cdef void _extend_int(IntArray dest, IntArray src):
+    cdef long start = dest.length
+    dest.resize(start + src.length)
+    if src.length > 0:
+        memcpy(&dest.data[start], src.data, src.length*sizeof(int))
+
+
+cdef bint _same_uint(UIntArray a, UIntArray b):
+    if a.length != b.length:
+        return False
+    return a.length == 0 or \
+        memcmp(a.data, b.data, a.length*sizeof(unsigned int)) == 0
+
+
+cdef list _get_cell_exports(Cell cell, np.ndarray nbrprocs, int narrays):
+    """Return the particle indices of a cell and their remote export entries
+    for each array.
+    """
+    cdef list exports = []
+    cdef UIntArray lindices, gindices, exportLocalids, exportGlobalids
+    cdef IntArray exportProcs
+    cdef int pa_index, nbrproc, indexi, num_particles
+
+    for pa_index in range(narrays):
+        lindices = cell.lindices[pa_index]
+        gindices = cell.gindices[pa_index]
+        num_particles = lindices.length
+
+        exportLocalids = UIntArray()
+        exportGlobalids = UIntArray()
+        exportProcs = IntArray()
+        for nbrproc in nbrprocs:
+            for indexi in range( num_particles ):
+                exportLocalids.append( lindices.data[indexi] )
+                exportGlobalids.append( gindices.data[indexi] )
+                exportProcs.append( nbrproc )
+
+        exports.append((
+            _copy_uint(lindices), _copy_uint(gindices),
+            exportLocalids, exportGlobalids, exportProcs
+        ))
+    return exports
+
+
+cdef bint _same_cell_particles(Cell cell, list exports, int narrays):
+    """Return True if the cell has the same particles, with the same local
+    indices, as when its export entries were computed.
+    """
+    cdef int pa_index
+    for pa_index in range(narrays):
+        lindices, gindices = exports[pa_index][:2]
+        if not (_same_uint(cell.lindices[pa_index], lindices) and
+                _same_uint(cell.gindices[pa_index], gindices)):
+            return False
+    return True
+
+
 ################################################################
 # ParticleArrayExchange
 ################################################################w
@@ -86,6 +158,10 @@ cdef class ParticleArrayExchange:
 
         self.lb_props = lb_props
         self.nprops = len( lb_props )
+
+        # props sent for remote particles, defaults to the lb_props
+        self.remote_props = list(lb_props)
+        self.update_msg_nbytes()
         # If an lb_weight  constant is present in the array, this
         # is the weight to use for the load balancing for those particles.
         if 'lb_weight' in pa.constants:
@@ -96,6 +172,7 @@ cdef class ParticleArrayExchange:
         # exchange flags
         self.lb_exchange = True
         self.remote_exchange = True
+        self.exchange_posted = False
 
     def lb_exchange_data(self):
         """Share particle info after Zoltan_LB_Balance
@@ -130,7 +207,7 @@ cdef class ParticleArrayExchange:
         numImport = zcomm.nreturn
 
         # extract particles to be exported
-        cdef dict sendbufs = self.get_sendbufs( exportLocalids )
+        cdef np.ndarray sendbuf = self.get_packed_sendbuf( exportLocalids )
 
         # remove particles to be exported
         pa.remove_particles(exportLocalids, align=True)
@@ -146,7 +223,7 @@ cdef class ParticleArrayExchange:
         self.extend(count, newsize)
 
         # exchange data
-        self.exchange_data(zcomm, sendbufs, count)
+        self.exchange_data(zcomm, sendbuf, count)
 
         # set all particle tags to local
         self.set_tag(count, newsize, Local)
@@ -167,78 +244,111 @@ cdef class ParticleArrayExchange:
         The arrays must now be re-sized to (num_particles + numImport)
         to reflect the new particles that come in as remote particles.
 
+        This is a blocking call and is equivalent to calling
+        'post_remote_exchange' followed by 'wait_remote_exchange'.
+
         """
-        _p = ProfileContext('PAExchange.remote_exchange_data')
-        # data arrays
-        cdef ParticleArray pa = self.pa
+        self.post_remote_exchange()
+        self.wait_remote_exchange()
 
+    def post_remote_exchange(self):
+        """Post the non-blocking sends and receives for remote particles.
+
+        All the remote_props of the exported particles are packed into
+        a single buffer so that only one message is sent to each
+        neighboring processor. The data is not available until
+        'wait_remote_exchange' is called.
+
+        """
+        _p = ProfileContext('PAExchange.post_remote_exchange')
         # Export lists
-        cdef UIntArray exportGlobalids = self.exportParticleGlobalids
         cdef UIntArray exportLocalids = self.exportParticleLocalids
         cdef IntArray exportProcs = self.exportParticleProcs
         cdef int numImport, numExport = self.numParticleExport
 
-        # current number of particles
-        cdef int current_size = self.num_local
-        cdef int count, new_size
-
-        # MPI communicator
-        cdef object comm = self.comm
-
         # zoltan communicator
         cdef int dtag = self.data_tag_remote
-        cdef ZComm zcomm = ZComm(comm, dtag, numExport, exportProcs.get_npy_array())
+        cdef ZComm zcomm = ZComm(self.comm, dtag, numExport, exportProcs.get_npy_array())
         numImport = zcomm.nreturn
 
-        # old and new sizes
-        count = current_size
-        newsize = current_size + numImport
+        # the send and receive buffers must live until the wait
+        self._sendbuf = self.get_packed_sendbuf(
+            exportLocalids, self.remote_props
+        )
+        self._recvbuf = np.empty(
+            shape=(numImport, self.remote_msg_nbytes), dtype=np.uint8
+        )
+        self._recv_count = self.num_local
+        self._zcomm = zcomm
+
+        zcomm.set_nbytes( self.remote_msg_nbytes )
+        zcomm.Comm_Do_Post( self._sendbuf, self._recvbuf )
+
+        self.exchange_posted = True
+        _p.stop()
+
+    def wait_remote_exchange(self):
+        """Complete a posted remote exchange.
+
+        The received data is appended to the particle array and the
+        new particles are tagged as Remote.
+
+        """
+        if not self.exchange_posted:
+            return
 
-        # copy particles to be exported
-        cdef dict sendbufs = self.get_sendbufs( exportLocalids )
+        _p = ProfileContext('PAExchange.wait_remote_exchange')
+        cdef ZComm zcomm = self._zcomm
+        cdef int count = self._recv_count
+        cdef int newsize = count + self._recvbuf.shape[0]
 
-        # update the size of the array
-        self.extend(current_size, newsize)
-        self.exchange_data(zcomm, sendbufs, count)
+        zcomm.Comm_Do_Wait( self._sendbuf, self._recvbuf )
+
+        # update the size of the array and copy the received data
+        self.extend(count, newsize)
+        self._unpack_recvbuf(self._recvbuf, count, self.remote_props)
 
         # set tags for all received particles as Remote
         self.set_tag(count, newsize, Remote)
-        pa.align_particles()
+        self.pa.align_particles()
 
         # store the number of remote particles
-        self.num_remote = newsize - current_size
-        _p.stop()
+        self.num_remote = newsize - count
 
-    cdef exchange_data(self, ZComm zcomm, dict sendbufs, int count):
-        cdef ParticleArray pa = self.pa
-        cdef str prop
-        cdef int prop_tag, stride, nbytes, i, nprops = self.nprops
-
-        cdef np.ndarray prop_arr, sendbuf, recvbuf
+        # release the communication buffers
+        self._zcomm = None
+        self._sendbuf = None
+        self._recvbuf = None
+        self.exchange_posted = False
+        _p.stop()
 
-        cdef list props = self.lb_props
+    cdef exchange_data(self, ZComm zcomm, np.ndarray sendbuf, int count):
+        cdef np.ndarray recvbuf = np.empty(
+            shape=(zcomm.nreturn, self.msg_nbytes), dtype=np.uint8
+        )
 
         with profile_ctx('PAExchange.exchange_data'):
-            for i in range(nprops):
-                prop = props[i]
-
-                prop_arr = pa.properties[prop].get_npy_array()
-                nbytes = prop_arr.dtype.itemsize
-                stride = pa.stride.get(prop, 1)
+            # all the props are sent in one message
+            zcomm.set_nbytes( self.msg_nbytes )
+            zcomm.Comm_Do( sendbuf, recvbuf )
 
-                # the send and receive buffers
-                sendbuf = sendbufs[prop]
-                recvbuf = prop_arr[count*stride:]
+        self._unpack_recvbuf(recvbuf, count, self.lb_props)
 
-                # tag for this property
-                prop_tag = i
+    cdef _unpack_recvbuf(self, np.ndarray recvbuf, int count, list props):
+        cdef ParticleArray pa = self.pa
+        cdef str prop
+        cdef int stride, nbytes, offset = 0
+        cdef int nrecv = recvbuf.shape[0]
+        cdef np.ndarray prop_arr, dest
 
-                # set the nbytes and tag for the zoltan communicator
-                zcomm.set_nbytes( nbytes*stride )
-                zcomm.set_tag( prop_tag )
+        for prop in props:
+            prop_arr = pa.properties[prop].get_npy_array()
+            stride = pa.stride.get(prop, 1)
+            nbytes = prop_arr.dtype.itemsize*stride
 
-                # exchange the data
-                zcomm.Comm_Do( sendbuf, recvbuf )
+            dest = prop_arr[count*stride:(count + nrecv)*stride].view(np.uint8)
+            dest.reshape(nrecv, nbytes)[:] = recvbuf[:, offset:offset + nbytes]
+            offset += nbytes
 
     def remove_remote_particles(self):
         self.num_local = self.pa.get_number_of_particles(real=True)
@@ -316,7 +426,7 @@ cdef class ParticleArrayExchange:
             # resize does not set the values to any defaults.
             self.pa.extend(newsize - currentsize)
 
-    def get_sendbufs(self, UIntArray exportIndices):
+    def get_sendbufs(self, UIntArray exportIndices, list props=None):
         cdef ParticleArray pa = self.pa
         cdef dict sendbufs = {}
         cdef str prop
@@ -330,13 +440,96 @@ cdef class ParticleArrayExchange:
             if stride > 1:
                 s_indices[stride] = get_strided_indices(indices, stride)
 
-        for prop in self.lb_props:
+        if props is None:
+            props = self.lb_props
+
+        for prop in props:
             prop_arr = pa.properties[prop].get_npy_array()
             stride = pa.stride.get(prop, 1)
             sendbufs[prop] = prop_arr[s_indices[stride]]
 
         return sendbufs
 
+    def get_packed_sendbuf(self, UIntArray exportIndices, list props=None):
+        """Pack the given props (default lb_props) of the particles into
+        one buffer.
+
+        The returned array has a row of bytes for each particle with the
+        props laid out in the order given.
+
+        """
+        cdef ParticleArray pa = self.pa
+        cdef int nsend = exportIndices.length
+        cdef int nbytes, offset = 0
+        cdef str prop
+        cdef np.ndarray data
+
+        if props is None:
+            props = self.lb_props
+
+        cdef dict sendbufs = self.get_sendbufs(exportIndices, props)
+        cdef np.ndarray packed = np.empty(
+            shape=(nsend, self._get_nbytes(props)), dtype=np.uint8
+        )
+
+        for prop in props:
+            data = np.ascontiguousarray(sendbufs[prop]).view(np.uint8)
+            nbytes = pa.properties[prop].get_npy_array().dtype.itemsize*\
+                pa.stride.get(prop, 1)
+            packed[:, offset:offset + nbytes] = data.reshape(nsend, nbytes)
+            offset += nbytes
+
+        return packed
+
+    def set_remote_props(self, list props):
+        """Set the props that are sent for remote particles.
+
+        The other props of the remote particles are set to their
+        defaults. The props must be a subset of the lb_props.
+
+        """
+        cdef str prop
+        for prop in props:
+            if prop not in self.lb_props:
+                msg = 'Remote prop %s of %s is not an lb_prop'%(
+                    prop, self.pa.name)
+                raise ValueError(msg)
+
+        self.remote_props = sorted(props)
+        self.update_msg_nbytes()
+
+    def update_lb_props(self):
+        """Re-read the lb_props of the particle array.
+
+        This must be called when properties are removed from the array
+        after the exchange is created, props that are no longer present
+        are also dropped from the remote props.
+
+        """
+        lb_props = list(self.pa.get_lb_props())
+        lb_props.sort()
+
+        self.lb_props = lb_props
+        self.nprops = len( lb_props )
+        self.remote_props = [x for x in self.remote_props if x in lb_props]
+        self.update_msg_nbytes()
+
+    def update_msg_nbytes(self):
+        """Compute the packed size of the lb/remote props for one particle.
+        """
+        self.msg_nbytes = self._get_nbytes(self.lb_props)
+        self.remote_msg_nbytes = self._get_nbytes(self.remote_props)
+
+    def _get_nbytes(self, list props):
+        cdef ParticleArray pa = self.pa
+        cdef str prop
+        cdef int nbytes = 0
+
+        for prop in props:
+            nbytes += pa.properties[prop].get_npy_array().dtype.itemsize*\
+                pa.stride.get(prop, 1)
+        return nbytes
+
 # #################################################################
 # # ParallelManager extension classes
 # #################################################################
@@ -440,6 +633,13 @@ cdef class ParallelManager:
         self.initial_update = True
         self.update_cell_sizes = update_cell_sizes
 
+        # persistent halo mode is off by default
+        self.persistent_halo = False
+        self.halo_cell_procs = {}
+        self.halo_cell_size = 0.0
+        self.halo_cell_exports = {}
+        self.n_reused_cells = 0
+
         # update the particle global ids at startup
         self.update_particle_gids()
         self.local_bin()
@@ -448,6 +648,12 @@ cdef class ParallelManager:
         self.lb_count = 0
         self.lb_freq = 1
 
+        # adaptive load balancing is off by default
+        self.lb_imbalance = 0.0
+        self.compute_time = 0.0
+        self.cost_factor = 1.0
+        self.imbalance = 1.0
+
         # array for global reduction of time steps
         self.dt_sendbuf = np.array( [1.0], dtype=np.float64 )
 
@@ -510,26 +716,231 @@ cdef class ParallelManager:
             self.num_global[i] = pa_exchange.num_global
 
     def update(self):
-        _p = ProfileContext("ParallelManager.update")
+        """Update the partition and exchange remote particles.
+
+        This is a blocking call and is equivalent to calling
+        'begin_update' followed by 'end_update'.
+
+        """
+        self.begin_update()
+        self.end_update()
+
+    def begin_update(self):
+        """Repartition or migrate particles and post the remote exchange.
+
+        The remote particles of all the arrays are exchanged together,
+        see 'post_remote_exchange'.  Their data is in flight when this
+        returns and local work not needing the remote particles, like
+        binning the local particles, may be done before calling
+        'end_update'.
+
+        """
+        _p = ProfileContext("ParallelManager.begin_update")
         cdef int lb_freq = self.lb_freq
         cdef int lb_count = self.lb_count
+        cdef bint repartition
 
         lb_count += 1
 
         # remove remote particles from a previous step
         self.remove_remote_particles()
 
-        if ( lb_count == lb_freq ):
+        repartition = ( lb_count == lb_freq )
+        if repartition and self.lb_imbalance > 0:
+            repartition = self.check_imbalance()
+
+        if repartition:
             with profile_ctx('ParallelManager.update_partition'):
-                self.update_partition()
+                self.update_partition(blocking=False)
             self.lb_count = 0
         else:
             with profile_ctx('ParallelManager.migrate_partition'):
-                self.migrate_partition()
-            self.lb_count = lb_count
+                self.migrate_partition(blocking=False)
+            # the count is reset if the imbalance check did not repartition
+            self.lb_count = lb_count % lb_freq
         _p.stop()
 
-    def update_partition(self):
+    def end_update(self):
+        """Wait for the remote exchange posted by 'begin_update'."""
+        with profile_ctx('ParallelManager.end_update'):
+            self.finish_remote_exchange()
+
+    def get_halo_width(self):
+        """Return the distance from the local particles within which the
+        remote particles are expected.
+
+        """
+        return (self.ghost_layers + 1)*self.cell_size
+
+    def add_compute_time(self, double time):
+        """Add to the time spent computing on this processor.
+
+        This is used to decide when to repartition if an imbalance
+        threshold is set with 'set_lb_imbalance'.
+
+        """
+        self.compute_time += time
+
+    def check_imbalance(self):
+        """Measure the load imbalance across processors.
+
+        The ratio of the maximum to the mean compute time since the last
+        check is computed and True is returned if it exceeds the
+        threshold. The relative cost of the particles on this processor
+        is also updated and used to weight the cells when repartitioning.
+
+        """
+        cdef int i, num_local = 0
+        for i in range(self.narrays):
+            num_local += self.num_local[i]
+
+        data = np.array(
+            self.comm.allgather((self.compute_time, num_local)),
+            dtype=np.float64
+        )
+        times, counts = data[:, 0], data[:, 1]
+        self.compute_time = 0.0
+
+        mean_time = np.mean(times)
+        if mean_time <= 0 or np.sum(counts) == 0:
+            self.imbalance = 1.0
+            self.cost_factor = 1.0
+            return False
+
+        self.imbalance = np.max(times)/mean_time
+
+        # time per particle here relative to that over all processors
+        if num_local > 0:
+            self.cost_factor = ((times[self.rank]/num_local) /
+                                (np.sum(times)/np.sum(counts)))
+        else:
+            self.cost_factor = 1.0
+
+        return self.imbalance > self.lb_imbalance
+
+    def set_persistent_halo(self, bint value):
+        """Reuse the remote particle lists across steps.
+
+        In this mode the neighboring processors of each cell are cached
+        until the partition is updated.  The remote export entries of
+        each cell are also kept and only recomputed for the cells whose
+        particles have changed, `n_reused_cells` is the number of cells
+        whose entries were reused by the last update.
+
+        """
+        self.persistent_halo = value
+        self.invalidate_halo()
+
+    def invalidate_halo(self):
+        """Discard any cached remote particle information."""
+        self.halo_cell_procs.clear()
+        self.halo_cell_exports.clear()
+
+    def update_lb_props(self):
+        """Re-read the lb_props of all the particle arrays, see
+        :py:meth:`ParticleArrayExchange.update_lb_props`.
+
+        """
+        cdef ParticleArrayExchange pa_exchange
+        for pa_exchange in self.pa_exchanges:
+            pa_exchange.update_lb_props()
+
+    def set_remote_props(self, dict remote_props):
+        """Set the props sent for remote particles.
+
+        Parameters
+        ----------
+
+        remote_props : dict
+            Mapping of array name to the list of props to send for
+            the remote particles of that array. Arrays not in the
+            dict send all their lb_props. Props that are not among
+            the lb_props of the array (for example constants) are
+            ignored.
+
+        """
+        cdef ParticleArrayExchange pa_exchange
+        for pa_exchange in self.pa_exchanges:
+            name = pa_exchange.pa.name
+            if name in remote_props:
+                pa_exchange.set_remote_props(
+                    [x for x in remote_props[name]
+                     if x in pa_exchange.lb_props]
+                )
+
+    def get_exchange_info(self):
+        """Return the data exchanged for remote particles on this rank.
+
+        A list with a dictionary for each array is returned giving the
+        number of props and bytes per particle that are migrated and
+        sent for remote particles, and the bytes sent and received in
+        the last remote exchange.
+
+        """
+        cdef ParticleArrayExchange pa_exchange
+        cdef list info = []
+        for pa_exchange in self.pa_exchanges:
+            info.append(dict(
+                name=pa_exchange.pa.name,
+                nprops=pa_exchange.nprops,
+                nremote_props=len(pa_exchange.remote_props),
+                msg_nbytes=pa_exchange.msg_nbytes,
+                remote_msg_nbytes=pa_exchange.remote_msg_nbytes,
+                num_remote=pa_exchange.num_remote,
+                bytes_sent=(pa_exchange.numParticleExport *
+                            pa_exchange.remote_msg_nbytes),
+                bytes_received=(pa_exchange.num_remote *
+                                pa_exchange.remote_msg_nbytes),
+            ))
+        return info
+
+    def update_remote_lists(self):
+        """Compute the remote particle export lists.
+
+        In the persistent halo mode the cached information is discarded
+        when the cell size changes.
+
+        """
+        if self.persistent_halo and self.halo_cell_size != self.cell_size:
+            self.invalidate_halo()
+            self.halo_cell_size = self.cell_size
+
+        self.compute_remote_particles()
+
+    def post_remote_exchange(self):
+        """Post the remote exchange for all arrays at once.
+
+        The messages for all the arrays are then in flight together
+        rather than waiting for each array in turn. The export lists
+        must have been computed with 'compute_remote_particles'.
+
+        """
+        cdef ParticleArrayExchange pa_exchange
+        with profile_ctx('ParallelManager.post_remote_exchange'):
+            for pa_exchange in self.pa_exchanges:
+                pa_exchange.post_remote_exchange()
+
+    def finish_remote_exchange(self):
+        """Wait for any posted remote exchange and index the remote particles.
+        """
+        cdef ParticleArrayExchange pa_exchange
+        cdef bint posted = False
+        cdef int i
+
+        for pa_exchange in self.pa_exchanges:
+            if pa_exchange.exchange_posted:
+                pa_exchange.wait_remote_exchange()
+                posted = True
+
+        if posted:
+            # update the local cell map to accommodate remote particles
+            self.update_remote_data()
+
+            # set the particle pids now that we have the partitions
+            for i in range(self.narrays):
+                self.particles[i].set_pid( self.rank )
+
+    def update_partition(self, bint blocking=True):
         """Update the partition.
 
         This is the main entry point for the parallel manager. Given
@@ -561,6 +972,9 @@ cdef class ParallelManager:
 
         (g) Update the local cell map to accommodate remote particles.
 
+        If `blocking` is False, steps (f) and (g) are only started and
+        must be completed with a call to 'finish_remote_exchange'.
+
         Notes
         -----
 
@@ -587,6 +1001,9 @@ cdef class ParallelManager:
             with profile_ctx('ParallelManager.load_balance'):
                 self.load_balance()
 
+            # the cached cell neighbors are invalid for a new partition
+            self.invalidate_halo()
+
             # move the data to the new partitions
             if self.changes == 1:
                 self.create_particle_lists()
@@ -599,20 +1016,13 @@ cdef class ParallelManager:
                 self.update_local_data()
 
             # compute remote particles and exchange data
-            self.compute_remote_particles()
+            self.update_remote_lists()
+            self.post_remote_exchange()
 
-            for i in range(self.narrays):
-                self.pa_exchanges[i].remote_exchange_data()
+            if blocking:
+                self.finish_remote_exchange()
 
-            # update the local cell map to accommodate remote particles
-            self.update_remote_data()
-
-            # set the particle pids now that we have the partitions
-            for i in range(self.narrays):
-                pa = self.particles[i]
-                pa.set_pid( self.rank )
-
-    def migrate_partition(self):
+    def migrate_partition(self, bint blocking=True):
         # migrate particles
         self.migrate_particles()
 
@@ -620,16 +1030,11 @@ cdef class ParallelManager:
         self.update_local_data()
 
         # compute remote particles and exchange data
-        self.compute_remote_particles()
-        for i in range(self.narrays):
-            self.pa_exchanges[i].remote_exchange_data()
-
-        # update the local cell map to accomodate remotes
-        self.update_remote_data()
+        self.update_remote_lists()
+        self.post_remote_exchange()
 
-        # set the particle pids
-        for i in range(self.narrays):
-            self.particles[i].set_pid( self.rank )
+        if blocking:
+            self.finish_remote_exchange()
 
     def remove_remote_particles(self):
         """Remove remote particles"""
@@ -724,6 +1129,7 @@ cdef class ParallelManager:
         cdef int narrays = self.narrays
         cdef int layers = self.ghost_layers
         cdef double lb_weight = self.pa_exchanges[pa_index].lb_weight
+        lb_weight *= self.cost_factor
 
         # now bin the particles
         num_particles = indices.length
@@ -850,9 +1256,43 @@ cdef class ParallelManager:
             ncells_local=self.ncells_local, ncells_total=self.ncells_total
         )
 
+    def get_cell_nbr_count(self, Cell cell):
+        """Return the number of particles in a cell and its neighbors."""
+        cdef dict cell_map = self.cell_map
+        cdef IntPoint cellid = IntPoint(0, 0, 0)
+        cdef cIntPoint cid = cell._cid
+        cdef UIntArray lindices
+        cdef Cell nbr
+        cdef int ix, iy, iz, count = 0
+
+        for ix in range(cid.x - 1, cid.x + 2):
+            for iy in range(cid.y - 1, cid.y + 2):
+                for iz in range(cid.z - 1, cid.z + 2):
+                    cellid.data.x = ix; cellid.data.y = iy
+                    cellid.data.z = iz
+
+                    if cellid in cell_map:
+                        nbr = cell_map[ cellid ]
+                        for lindices in nbr.lindices:
+                            count += lindices.length
+        return count
+
     def set_lb_freq(self, int lb_freq):
         self.lb_freq = lb_freq
 
+    def set_lb_imbalance(self, double lb_imbalance):
+        """Repartition only when the load is imbalanced.
+
+        Every 'lb_freq' updates, the ratio of the maximum to the mean
+        compute time across processors is checked and the partition is
+        only updated if it exceeds 'lb_imbalance'. The cells are then
+        weighted by the measured cost of their particles and their
+        neighbors. A value of zero (the default) repartitions every
+        'lb_freq' updates.
+
+        """
+        self.lb_imbalance = lb_imbalance
+
     def load_balance(self):
         raise NotImplementedError("ParallelManager::load_balance")
 
@@ -1188,6 +1628,14 @@ cdef class ZoltanParallelManager(ParallelManager):
         cdef UIntArray exportGlobalids, exportLocalids
         cdef IntArray exportProcs
 
+        # cached neighboring processors and export entries for the cells
+        cdef bint use_cache = self.persistent_halo
+        cdef dict halo_cell_procs = self.halo_cell_procs
+        cdef dict halo_cell_exports = self.halo_cell_exports
+        cdef dict cell_exports = {}
+        cdef list exports
+        cdef int n_reused_cells = 0
+
         # reset the export lists
         for pa_index in range(narrays):
             pa_exchange = self.pa_exchanges[pa_index]
@@ -1196,18 +1644,24 @@ cdef class ZoltanParallelManager(ParallelManager):
         # Chaeck for each cell
         for cell in cell_list:
 
-            # get the bounding box for this cell
-            boxmin = cell.boxmin; boxmax = cell.boxmax
+            cell_key = (cell._cid.x, cell._cid.y, cell._cid.z)
+            if use_cache and cell_key in halo_cell_procs:
+                nbrprocs = halo_cell_procs[cell_key]
+            else:
+                # get the bounding box for this cell
+                boxmin = cell.boxmin; boxmax = cell.boxmax
 
-            numprocs = pz.Zoltan_Box_PP_Assign(
-                boxmin.x, boxmin.y, boxmin.z,
-                boxmax.x, boxmax.y, boxmax.z)
+                numprocs = pz.Zoltan_Box_PP_Assign(
+                    boxmin.x, boxmin.y, boxmin.z,
+                    boxmax.x, boxmax.y, boxmax.z)
 
-            # the array of processors that this box intersects with
-            procs = pz.procs
+                # the array of processors that this box intersects with
+                procs = pz.procs
 
-            # array of neighboring processors
-            nbrprocs = procs[np.where( (procs != -1) * (procs != rank) )[0]]
+                # array of neighboring processors
+                nbrprocs = procs[np.where( (procs != -1) * (procs != rank) )[0]]
+                if use_cache:
+                    halo_cell_procs[cell_key] = nbrprocs
 
             if nbrprocs.size > 0:
                 cell.is_boundary = True
@@ -1216,6 +1670,28 @@ cdef class ZoltanParallelManager(ParallelManager):
                 cell.nbrprocs.resize( nbrprocs.size )
                 cell.nbrprocs.set_data( nbrprocs )
 
+                if use_cache:
+                    # reuse the export entries of the cell unless its
+                    # particles have changed
+                    exports = halo_cell_exports.get(cell_key)
+                    if exports is not None and \
+                       _same_cell_particles(cell, exports, narrays):
+                        n_reused_cells += 1
+                    else:
+                        exports = _get_cell_exports(cell, nbrprocs, narrays)
+                    cell_exports[cell_key] = exports
+
+                    for pa_index in range(narrays):
+                        pa_exchange = self.pa_exchanges[pa_index]
+                        entries = exports[pa_index]
+                        _extend_uint(pa_exchange.exportParticleLocalids,
+                                     entries[2])
+                        _extend_uint(pa_exchange.exportParticleGlobalids,
+                                     entries[3])
+                        _extend_int(pa_exchange.exportParticleProcs,
+                                    entries[4])
+                    continue
+
                 # populate the particle export lists for each array
                 for pa_index in range(narrays):
                     pa_exchange = self.pa_exchanges[pa_index]
@@ -1237,6 +1713,11 @@ cdef class ZoltanParallelManager(ParallelManager):
                             exportGlobalids.append( gindices.data[indexi] )
                             exportProcs.append( nbrproc )
 
+        # only the entries of the current cells are kept
+        if use_cache:
+            self.halo_cell_exports = cell_exports
+        self.n_reused_cells = n_reused_cells
+
         # set the numParticleExport for each array
         for pa_index in range(narrays):
             pa_exchange = self.pa_exchanges[pa_index]
@@ -1366,6 +1847,9 @@ cdef class ZoltanParallelManagerGeometric(ZoltanParallelManager):
         # the weights array for PyZoltan
         cdef DoubleArray weights = pz.weights
 
+        # weight the cells by their neighbors for adaptive balancing
+        cdef bint nbr_weights = self.lb_imbalance > 0
+
         cdef int i
         cdef Cell cell
         cdef cPoint centroid
@@ -1384,6 +1868,8 @@ cdef class ZoltanParallelManagerGeometric(ZoltanParallelManager):
 
             # weights are defined as cell.size/num_total
             weights.data[i] = num_global_objects1 * cell.size
+            if nbr_weights:
+                weights.data[i] *= self.get_cell_nbr_count(cell)
 
             x.data[i] = centroid.x
             y.data[i] = centroid.y
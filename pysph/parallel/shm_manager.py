@@ -0,0 +1,693 @@
+"""Parallel runs on a single node without MPI or Zoltan.
+
+The processes are forked from the running script and communicate with
+``multiprocessing`` queues for small messages and with
+``multiprocessing.shared_memory`` buffers for the particle data.
+
+:py:class:`SharedMemoryComm` implements the subset of the mpi4py
+communicator used by the solver, output and controller and
+:py:class:`SharedMemoryParallelManager` decomposes the domain into slabs
+along the longest axis and exchanges the migrating and remote particles
+through the shared buffers.
+
+"""
+
+import atexit
+from functools import reduce
+import multiprocessing
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import os
+import queue
+import sys
+
+import numpy as np
+
+from compyle.profile import profile_ctx
+
+from pysph.base.utils import ParticleTAGS
+
+
+Local = ParticleTAGS.Local
+Remote = ParticleTAGS.Remote
+
+# Tags for the messages, the collectives are called in the same order on
+# all processes so these only need to be unique per operation.
+_BCAST, _GATHER, _SCATTER, _EXCHANGE = range(4)
+
+_REDUCE_OPS = {
+    'sum': np.add, 'prod': np.multiply,
+    'max': np.maximum, 'min': np.minimum
+}
+
+
+def fork_processes(nprocs):
+    """Fork ``nprocs - 1`` processes and return the communicator.
+
+    The calling process is rank 0 and the forked processes continue from
+    where this function was called with the ranks 1 to ``nprocs - 1``, just
+    as each process of an MPI run executes the whole script. Rank 0 waits
+    for the other processes at exit.
+
+    """
+    if not hasattr(os, 'fork'):
+        raise RuntimeError('Shared memory runs need os.fork.')
+
+    ctx = multiprocessing.get_context('fork')
+    # All the processes must use the same tracker for the shared memory.
+    resource_tracker.ensure_running()
+    queues = [ctx.Queue() for i in range(nprocs)]
+    barrier = ctx.Barrier(nprocs)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    rank = 0
+    children = []
+    for i in range(1, nprocs):
+        pid = os.fork()
+        if pid == 0:
+            rank = i
+            children = []
+            break
+        children.append(pid)
+
+    comm = SharedMemoryComm(rank, nprocs, queues, barrier)
+
+    excepthook = sys.excepthook
+
+    def _abort(*args):
+        # Do not leave the other processes waiting on this one and do not
+        # wait at exit for messages that will never be read.
+        barrier.abort()
+        for q in queues:
+            q.cancel_join_thread()
+        excepthook(*args)
+
+    sys.excepthook = _abort
+    atexit.register(_finalize, comm, children)
+    return comm
+
+
+def _finalize(comm, children):
+    comm.free()
+    failed = False
+    for pid in children:
+        status = os.waitpid(pid, 0)[1]
+        failed = failed or status != 0
+    if failed:
+        print('Shared memory run: a process exited with an error.')
+        sys.stdout.flush()
+        os._exit(1)
+
+
+class SharedMemoryComm(object):
+    """A communicator for processes on one node.
+
+    Only the parts of the mpi4py interface used in PySPH are provided, the
+    reductions take the operation as one of 'sum', 'prod', 'max', 'min'.
+    Arrays are exchanged using :py:meth:`post_exchange` and
+    :py:meth:`wait_exchange` which copy the data into shared memory blocks
+    that are kept for the subsequent exchanges.
+
+    """
+    def __init__(self, rank, size, queues, barrier, timeout=1.0):
+        self.rank = rank
+        self.size = size
+        self.timeout = timeout
+        self._queues = queues
+        self._barrier = barrier
+        self._pending = []
+        # shared memory blocks this process sends from, keyed by dest.
+        self._send_blocks = {}
+        # blocks attached to for receiving, keyed by source.
+        self._recv_blocks = {}
+        # blocks to unlink once the current exchange is complete.
+        self._stale_blocks = []
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.size
+
+    def send(self, obj, dest, tag=0):
+        self._queues[dest].put((self.rank, tag, obj))
+
+    def recv(self, source, tag=0):
+        for i, (src, t, obj) in enumerate(self._pending):
+            if src == source and t == tag:
+                del self._pending[i]
+                return obj
+
+        inbox = self._queues[self.rank]
+        while True:
+            try:
+                src, t, obj = inbox.get(timeout=self.timeout)
+            except queue.Empty:
+                if self._barrier.broken:
+                    raise RuntimeError(
+                        'Rank %d: another process has failed.' % self.rank
+                    )
+                continue
+            if src == source and t == tag:
+                return obj
+            self._pending.append((src, t, obj))
+
+    def barrier(self):
+        self._barrier.wait()
+
+    def bcast(self, obj, root=0):
+        if self.rank == root:
+            for dest in range(self.size):
+                if dest != root:
+                    self.send(obj, dest, _BCAST)
+            return obj
+        else:
+            return self.recv(root, _BCAST)
+
+    def gather(self, obj, root=0):
+        if self.rank == root:
+            result = []
+            for src in range(self.size):
+                if src == root:
+                    result.append(obj)
+                else:
+                    result.append(self.recv(src, _GATHER))
+            return result
+        else:
+            self.send(obj, root, _GATHER)
+            return None
+
+    def scatter(self, objs, root=0):
+        if self.rank == root:
+            for dest in range(self.size):
+                if dest != root:
+                    self.send(objs[dest], dest, _SCATTER)
+            return objs[root]
+        else:
+            return self.recv(root, _SCATTER)
+
+    def allgather(self, obj):
+        return self.bcast(self.gather(obj))
+
+    def allreduce(self, obj, op='sum'):
+        result = self.gather(obj)
+        if self.rank == 0:
+            result = reduce(_REDUCE_OPS[op], result)
+        return self.bcast(result)
+
+    def post_exchange(self, sendbufs):
+        """Post the arrays to be sent to the other processes.
+
+        Parameters
+        ----------
+
+        sendbufs : list
+            A ``(meta, array)`` for every rank, ``meta`` is any small
+            picklable object and ``array`` a numpy array or None. The entry
+            for this rank is ignored.
+
+        """
+        for dest in range(self.size):
+            if dest == self.rank:
+                continue
+            meta, buf = sendbufs[dest]
+            name = None
+            if buf is not None and buf.nbytes > 0:
+                shm = self._get_send_block(dest, buf.nbytes)
+                np.ndarray(buf.shape, buf.dtype, buffer=shm.buf)[:] = buf
+                name = shm.name
+                shape, dtype = buf.shape, buf.dtype.str
+            else:
+                shape, dtype = (0,), np.dtype(np.uint8).str
+            self.send((meta, name, shape, dtype), dest, _EXCHANGE)
+
+    def wait_exchange(self):
+        """Receive the arrays posted by the other processes.
+
+        Returns a list with a ``(meta, array)`` for every rank, the entry
+        for this rank is None.
+
+        """
+        result = [None]*self.size
+        for src in range(self.size):
+            if src == self.rank:
+                continue
+            meta, name, shape, dtype = self.recv(src, _EXCHANGE)
+            if name is None:
+                data = np.empty(shape, dtype)
+            else:
+                shm = self._get_recv_block(src, name)
+                data = np.ndarray(shape, dtype, buffer=shm.buf).copy()
+            result[src] = (meta, data)
+
+        # The send blocks may only be reused once everyone has read them.
+        self.barrier()
+        for shm in self._stale_blocks:
+            shm.close()
+            shm.unlink()
+        self._stale_blocks = []
+        return result
+
+    def free(self):
+        """Release the shared memory blocks."""
+        for shm in self._recv_blocks.values():
+            shm.close()
+        for shm in list(self._send_blocks.values()) + self._stale_blocks:
+            shm.close()
+            shm.unlink()
+        self._recv_blocks.clear()
+        self._send_blocks.clear()
+        self._stale_blocks = []
+
+    def _get_send_block(self, dest, nbytes):
+        shm = self._send_blocks.get(dest)
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                self._stale_blocks.append(shm)
+            # leave some room to grow so the block is rarely replaced.
+            shm = SharedMemory(create=True, size=int(1.5*nbytes))
+            self._send_blocks[dest] = shm
+        return shm
+
+    def _get_recv_block(self, src, name):
+        shm = self._recv_blocks.get(src)
+        if shm is None or shm.name != name:
+            if shm is not None:
+                shm.close()
+            shm = SharedMemory(name=name)
+            self._recv_blocks[src] = shm
+        return shm
+
+
+def get_nbytes(pa, props):
+    """Return the number of bytes of the given props for one particle."""
+    nbytes = 0
+    for prop in props:
+        stride = pa.stride.get(prop, 1)
+        nbytes += pa.properties[prop].get_npy_array().itemsize*stride
+    return nbytes
+
+
+def pack_particles(pa, indices, props):
+    """Return the props of the particles as a uint8 array of shape
+    (len(indices), nbytes)."""
+    n = len(indices)
+    columns = []
+    for prop in props:
+        stride = pa.stride.get(prop, 1)
+        data = pa.properties[prop].get_npy_array().reshape(-1, stride)
+        data = np.ascontiguousarray(data[indices])
+        columns.append(data.view(np.uint8).reshape(n, data.itemsize*stride))
+    if len(columns) == 0:
+        return np.empty((n, 0), dtype=np.uint8)
+    return np.hstack(columns)
+
+
+def unpack_particles(pa, buf, start, props):
+    """Copy the packed props of the particles into the array from the
+    index ``start``, the array must be large enough."""
+    n = buf.shape[0]
+    offset = 0
+    for prop in props:
+        stride = pa.stride.get(prop, 1)
+        data = pa.properties[prop].get_npy_array().reshape(-1, stride)
+        dest = data[start:start + n].view(np.uint8)
+        nbytes = dest.shape[1]
+        dest[:] = buf[:, offset:offset + nbytes]
+        offset += nbytes
+
+
+class SharedMemoryParallelManager(object):
+    """Distribute the particles among the processes of a
+    :py:class:`SharedMemoryComm`.
+
+    The domain is cut into slabs along its longest axis such that each
+    process has about the same weight of particles. The cuts are only
+    recomputed every ``lb_freq`` updates and particles leaving a slab are
+    migrated to their new process on every update. The particles within
+    ``ghost_layers*radius_scale*hmax`` of another slab are sent to that
+    process as remote particles.
+
+    This provides the same interface to the solver as the Zoltan based
+    parallel managers.
+
+    """
+    def __init__(self, dim, particles, comm, radius_scale=2.0,
+                 ghost_layers=2.0):
+        self.dim = dim
+        self.particles = particles
+        self.narrays = len(particles)
+        self.comm = comm
+        self.rank = comm.Get_rank()
+        self.size = comm.Get_size()
+
+        self.radius_scale = radius_scale
+        self.ghost_layers = ghost_layers
+
+        # the interior cuts of the slabs along the axis
+        self.axis = 0
+        self.cuts = np.zeros(self.size - 1)
+        # the width of the halo of remote particles around the slabs
+        self.halo_width = 0.0
+
+        self.lb_props = [pa.get_lb_props() for pa in particles]
+        self.remote_props = [list(props) for props in self.lb_props]
+
+        self.num_local = [0]*self.narrays
+        self.num_remote = [0]*self.narrays
+        self.bytes_sent = [0]*self.narrays
+        self.bytes_received = [0]*self.narrays
+
+        self.lb_freq = 10
+        self.lb_count = 0
+        self.initial_update = True
+
+        self.lb_imbalance = 0.0
+        self.compute_time = 0.0
+        self.cost_factor = 1.0
+        self.imbalance = 1.0
+
+    def update(self):
+        """Update the partition and exchange remote particles.
+
+        This is a blocking call and is equivalent to calling
+        'begin_update' followed by 'end_update'.
+
+        """
+        self.begin_update()
+        self.end_update()
+
+    def begin_update(self):
+        """Repartition or migrate particles and post the remote exchange.
+
+        Local work not needing the remote particles may be done before
+        calling 'end_update'.
+
+        """
+        self.remove_remote_particles()
+
+        if self.initial_update:
+            self.update_particle_gids()
+
+        lb_count = self.lb_count + 1
+        repartition = self.initial_update or lb_count == self.lb_freq
+        if repartition and self.lb_imbalance > 0 and not self.initial_update:
+            repartition = self.check_imbalance()
+
+        if repartition:
+            with profile_ctx('SharedMemoryParallelManager.update_partition'):
+                self.update_partition()
+            self.lb_count = 0
+        else:
+            self.lb_count = lb_count % self.lb_freq
+
+        with profile_ctx('SharedMemoryParallelManager.migrate_partition'):
+            self.migrate_partition()
+        self.post_remote_exchange()
+
+    def end_update(self):
+        """Wait for the remote exchange posted by 'begin_update'."""
+        with profile_ctx('SharedMemoryParallelManager.end_update'):
+            self.finish_remote_exchange()
+
+    def get_halo_width(self):
+        """Return the distance from the local particles within which the
+        remote particles are expected.
+
+        """
+        return self.halo_width
+
+    def update_time_steps(self, local_dt):
+        """Peform a reduction to compute the globally stable time steps"""
+        return self.comm.allreduce(local_dt, op='min')
+
+    def set_lb_freq(self, lb_freq):
+        self.lb_freq = lb_freq
+
+    def set_lb_imbalance(self, lb_imbalance):
+        """Only repartition when the load imbalance exceeds this.
+
+        See 'check_imbalance'.
+
+        """
+        self.lb_imbalance = lb_imbalance
+
+    def add_compute_time(self, time):
+        """Add to the time spent computing on this process."""
+        self.compute_time += time
+
+    def check_imbalance(self):
+        """Measure the load imbalance across processes.
+
+        The ratio of the maximum to the mean compute time since the last
+        check is computed and True is returned if it exceeds the
+        threshold. The relative cost of the particles on this process is
+        used to weight them when repartitioning.
+
+        """
+        num_local = sum(self.num_local)
+        data = np.array(
+            self.comm.allgather((self.compute_time, num_local)),
+            dtype=np.float64
+        )
+        times, counts = data[:, 0], data[:, 1]
+        self.compute_time = 0.0
+
+        mean_time = np.mean(times)
+        if mean_time <= 0 or np.sum(counts) == 0:
+            self.imbalance = 1.0
+            self.cost_factor = 1.0
+            return False
+
+        self.imbalance = np.max(times)/mean_time
+        if num_local > 0:
+            self.cost_factor = ((times[self.rank]/num_local) /
+                                (np.sum(times)/np.sum(counts)))
+        else:
+            self.cost_factor = 1.0
+
+        return self.imbalance > self.lb_imbalance
+
+    def update_lb_props(self):
+        """Re-read the lb_props of the particle arrays, to be called when
+        properties are removed from the arrays after the manager is
+        created.  Props that are no longer present are also dropped from
+        the remote props.
+        """
+        for i, pa in enumerate(self.particles):
+            self.lb_props[i] = pa.get_lb_props()
+            self.remote_props[i] = [
+                prop for prop in self.remote_props[i]
+                if prop in self.lb_props[i]
+            ]
+
+    def set_remote_props(self, remote_props):
+        """Set the props sent for remote particles.
+
+        Parameters
+        ----------
+
+        remote_props : dict
+            Mapping of array name to the list of props to send for
+            the remote particles of that array, props that are not
+            load balanced are ignored.
+
+        """
+        for i, pa in enumerate(self.particles):
+            if pa.name in remote_props:
+                props = remote_props[pa.name]
+                self.remote_props[i] = [
+                    prop for prop in self.lb_props[i] if prop in props
+                ]
+
+    def get_exchange_info(self):
+        """Return a list of dicts, one per array, with the number of props
+        and bytes sent for the remote particles."""
+        info = []
+        for i, pa in enumerate(self.particles):
+            info.append(dict(
+                name=pa.name,
+                nprops=len(self.lb_props[i]),
+                nremote_props=len(self.remote_props[i]),
+                msg_nbytes=get_nbytes(pa, self.lb_props[i]),
+                remote_msg_nbytes=get_nbytes(pa, self.remote_props[i]),
+                num_remote=self.num_remote[i],
+                bytes_sent=self.bytes_sent[i],
+                bytes_received=self.bytes_received[i],
+            ))
+        return info
+
+    def remove_remote_particles(self):
+        for i, pa in enumerate(self.particles):
+            num_local = pa.get_number_of_particles(real=True)
+            pa.resize(num_local)
+            pa.align_particles()
+            self.num_local[i] = num_local
+            self.num_remote[i] = 0
+
+    def update_particle_gids(self):
+        """Number the particles sequentially starting from rank 0."""
+        counts = np.array(self.comm.allgather(self.num_local))
+        offsets = np.cumsum(counts, axis=0) - counts
+        for i, pa in enumerate(self.particles):
+            n = self.num_local[i]
+            gid = pa.properties['gid'].get_npy_array()
+            gid[:n] = offsets[self.rank, i] + np.arange(n)
+
+    def update_partition(self):
+        """Compute the slab cuts along the longest axis.
+
+        A histogram of the particle weights along the axis is summed over
+        all processes and the cuts are placed such that each slab has the
+        same weight.
+
+        """
+        lo, hi = self._compute_bounds()
+        self.axis = axis = int(np.argmax(hi - lo))
+        lo, hi = lo[axis], hi[axis]
+        if not hi > lo:
+            hi = lo + 1.0
+
+        nbins = 256*self.size
+        hist = np.zeros(nbins)
+        for pa in self.particles:
+            coords = self._get_coords(pa, axis)
+            if 'lb_weight' in pa.constants:
+                weight = pa.constants.get('lb_weight')[0]
+            else:
+                weight = 1.0
+            hist += np.histogram(coords, bins=nbins, range=(lo, hi))[0] * \
+                weight*self.cost_factor
+
+        hist = self.comm.allreduce(hist, op='sum')
+        cdf = np.concatenate(([0.0], np.cumsum(hist)))
+        edges = np.linspace(lo, hi, nbins + 1)
+        targets = cdf[-1]*np.arange(1, self.size)/self.size
+        self.cuts = np.interp(targets, cdf, edges)
+
+    def migrate_partition(self):
+        """Send the particles outside this slab to their process."""
+        sendbufs = [None]*self.size
+        exports = []
+        for pa in self.particles:
+            owner = np.searchsorted(
+                self.cuts, self._get_coords(pa, self.axis), side='right'
+            )
+            exports.append((owner, np.where(owner != self.rank)[0]))
+
+        for dest in range(self.size):
+            if dest == self.rank:
+                continue
+            bufs = []
+            for i, pa in enumerate(self.particles):
+                owner, indices = exports[i]
+                indices = indices[owner[indices] == dest]
+                bufs.append(pack_particles(pa, indices, self.lb_props[i]))
+            sendbufs[dest] = self._join(bufs)
+
+        for i, pa in enumerate(self.particles):
+            indices = exports[i][1]
+            if len(indices) > 0:
+                pa.remove_particles(indices.astype(np.int64))
+
+        self.comm.post_exchange(sendbufs)
+        recvbufs = self.comm.wait_exchange()
+        for i, pa in enumerate(self.particles):
+            bufs = [self._split(recvbufs[src], i, self.lb_props)
+                    for src in range(self.size) if src != self.rank]
+            self._append(pa, bufs, self.lb_props[i], Local)
+            pa.properties['pid'].get_npy_array()[:] = self.rank
+            pa.align_particles()
+            self.num_local[i] = pa.get_number_of_particles()
+
+    def post_remote_exchange(self):
+        """Post the particles within the halo of the other slabs."""
+        hmax = 0.0
+        for pa in self.particles:
+            if pa.get_number_of_particles() > 0:
+                hmax = max(
+                    hmax, np.max(pa.properties['h'].get_npy_array())
+                )
+        hmax = self.comm.allreduce(hmax, op='max')
+        width = self.ghost_layers*self.radius_scale*hmax
+        self.halo_width = width
+
+        lower = np.concatenate(([-np.inf], self.cuts)) - width
+        upper = np.concatenate((self.cuts, [np.inf])) + width
+
+        sendbufs = [None]*self.size
+        self.bytes_sent = [0]*self.narrays
+        coords = [self._get_coords(pa, self.axis) for pa in self.particles]
+        for dest in range(self.size):
+            if dest == self.rank:
+                continue
+            bufs = []
+            for i, pa in enumerate(self.particles):
+                c = coords[i]
+                indices = np.where((c >= lower[dest]) & (c < upper[dest]))[0]
+                buf = pack_particles(pa, indices, self.remote_props[i])
+                self.bytes_sent[i] += buf.nbytes
+                bufs.append(buf)
+            sendbufs[dest] = self._join(bufs)
+
+        self.comm.post_exchange(sendbufs)
+
+    def finish_remote_exchange(self):
+        """Receive the remote particles and append them to the arrays."""
+        recvbufs = self.comm.wait_exchange()
+        for i, pa in enumerate(self.particles):
+            bufs = [self._split(recvbufs[src], i, self.remote_props)
+                    for src in range(self.size) if src != self.rank]
+            count = pa.get_number_of_particles()
+            self._append(pa, bufs, self.remote_props[i], Remote)
+            pa.align_particles()
+            self.num_remote[i] = pa.get_number_of_particles() - count
+            self.bytes_received[i] = sum(buf.nbytes for buf in bufs)
+
+    # Private interface. #################################################
+    def _compute_bounds(self):
+        lo = np.empty(3)
+        lo[:] = np.inf
+        hi = -lo
+        for pa in self.particles:
+            if pa.get_number_of_particles() == 0:
+                continue
+            for j in range(3):
+                x = self._get_coords(pa, j)
+                lo[j] = min(lo[j], np.min(x))
+                hi[j] = max(hi[j], np.max(x))
+        lo = self.comm.allreduce(lo, op='min')
+        hi = self.comm.allreduce(hi, op='max')
+        # only cut along the axes of the problem
+        hi[self.dim:] = lo[self.dim:]
+        return lo, hi
+
+    def _get_coords(self, pa, axis):
+        return pa.properties['xyz'[axis]].get_npy_array()
+
+    def _join(self, bufs):
+        counts = [buf.shape[0] for buf in bufs]
+        data = np.concatenate([buf.ravel() for buf in bufs])
+        return counts, data
+
+    def _split(self, recvbuf, index, props):
+        # props is the list of props sent for each array.
+        counts, data = recvbuf
+        nbytes = [get_nbytes(pa, props[i])
+                  for i, pa in enumerate(self.particles)]
+        start = sum(counts[i]*nbytes[i] for i in range(index))
+        end = start + counts[index]*nbytes[index]
+        return data[start:end].reshape(counts[index], nbytes[index])
+
+    def _append(self, pa, bufs, props, tag):
+        start = pa.get_number_of_particles()
+        nrecv = sum(buf.shape[0] for buf in bufs)
+        if nrecv == 0:
+            return
+        pa.extend(nrecv)
+        for buf in bufs:
+            unpack_particles(pa, buf, start, props)
+            start += buf.shape[0]
+        pa.properties['tag'].get_npy_array()[-nrecv:] = tag
@@ -60,7 +60,8 @@ class ExampleTestCase(unittest.TestCase):
         return cmd_line
 
     def run_example(self, filename, nprocs=2, timeout=300, atol=1e-14,
-                    serial_kwargs=None, extra_parallel_kwargs=None):
+                    serial_kwargs=None, extra_parallel_kwargs=None,
+                    shm=False):
         """Run an example and compare the results in serial and parallel.
 
         Parameters:
@@ -86,6 +87,9 @@ class ExampleTestCase(unittest.TestCase):
         extra_parallel_kwargs: dict
             The extra options to pass for the parallel run.
 
+        shm: bool
+            Run in parallel with the shared memory processes instead of MPI.
+
         """
         if serial_kwargs is None:
             serial_kwargs = {}
@@ -94,6 +98,10 @@ class ExampleTestCase(unittest.TestCase):
 
         parallel_kwargs = dict(serial_kwargs)
         parallel_kwargs.update(extra_parallel_kwargs)
+        launch_nprocs = nprocs
+        if shm:
+            parallel_kwargs.update(shm_procs=nprocs)
+            launch_nprocs = 1
 
         prefix = os.path.splitext(os.path.basename(filename))[0]
         # dir1 is for the serial run
@@ -116,7 +124,7 @@ class ExampleTestCase(unittest.TestCase):
 
             # run the example script in parallel
             run_parallel_script.run(
-                filename=filename, args=parallel_args, nprocs=nprocs,
+                filename=filename, args=parallel_args, nprocs=launch_nprocs,
                 timeout=timeout, path=MY_DIR
             )
 
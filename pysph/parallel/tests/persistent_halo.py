@@ -0,0 +1,87 @@
+"""Test the reuse of the remote export entries in the persistent halo mode.
+
+The particles are moved a little between updates so some particles change
+cells. The export entries of the other cells should be reused and the
+export lists should be the same as those computed without the persistent
+halo mode.
+
+"""
+import mpi4py.MPI as mpi
+import numpy as np
+
+from pysph.base.utils import get_particle_array_wcsph
+from pysph.parallel.parallel_manager import ZoltanParallelManagerGeometric
+
+
+def create_manager(comm, x, y, h, persistent):
+    pa = get_particle_array_wcsph(name='fluid', x=x, y=y, h=h)
+    pm = ZoltanParallelManagerGeometric(dim=2, particles=[pa], comm=comm)
+    pm.pz.set_lb_method("RCB")
+    pm.pz.Zoltan_Set_Param("DEBUG_LEVEL", "0")
+    pm.set_persistent_halo(persistent)
+    return pa, pm
+
+
+def move(pa, dt):
+    n = pa.num_real_particles
+    x, y = pa.x[:n].copy(), pa.y[:n].copy()
+    # a rotation about the centre of the domain
+    pa.x[:n] = x - dt*(y - 0.5)
+    pa.y[:n] = y + dt*(x - 0.5)
+
+
+def check_export_lists(pm, pm_ref):
+    for pae, pae_ref in zip(pm.pa_exchanges, pm_ref.pa_exchanges):
+        assert pae.numParticleExport == pae_ref.numParticleExport
+        for name in ('exportParticleLocalids', 'exportParticleGlobalids',
+                     'exportParticleProcs'):
+            np.testing.assert_array_equal(
+                getattr(pae, name).get_npy_array(),
+                getattr(pae_ref, name).get_npy_array()
+            )
+
+
+def main():
+    comm = mpi.COMM_WORLD
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+
+    numMyPoints = 1 << 10
+    dx = np.sqrt(1.0/(size*numMyPoints))
+    np.random.seed(rank)
+    x = np.random.random(numMyPoints)
+    y = np.random.random(numMyPoints)
+    h = np.ones_like(x)*1.3*dx
+
+    pa, pm = create_manager(comm, x, y, h, persistent=True)
+    pa_ref, pm_ref = create_manager(comm, x, y, h, persistent=False)
+
+    # partition the particles once and then only migrate them.
+    pm.update()
+    pm_ref.update()
+    check_export_lists(pm, pm_ref)
+    pm.set_lb_freq(1000)
+    pm_ref.set_lb_freq(1000)
+
+    for step in range(5):
+        move(pa, 0.01)
+        move(pa_ref, 0.01)
+        pm.update()
+        pm_ref.update()
+
+        check_export_lists(pm, pm_ref)
+        np.testing.assert_array_equal(
+            pa.get('gid', only_real_particles=False),
+            pa_ref.get('gid', only_real_particles=False)
+        )
+
+        n_boundary = len(pm.halo_cell_exports)
+        n_reused = comm.allreduce(pm.n_reused_cells)
+        assert 0 <= pm.n_reused_cells <= n_boundary
+        assert pm_ref.n_reused_cells == 0
+        # most of the cells are unchanged by the small motion.
+        assert n_reused > 0, "No export entries were reused."
+
+
+if __name__ == '__main__':
+    main()
@@ -125,24 +125,47 @@ def main():
 
     GID = np.array(range(25), dtype=np.uint32)
 
-    # create the local particle arrays and exchange objects
-    pa = get_particle_array_wcsph(name='test', x=x, y=y, gid=gid)
-    pa.add_property('a', data=a, stride=stride)
+    def create_exchange(name, pa_index):
+        # create the local particle array and exchange object
+        pa = get_particle_array_wcsph(name=name, x=x, y=y, gid=gid)
+        pa.add_property('a', data=a, stride=stride)
 
-    pae = ParticleArrayExchange(pa_index=0, pa=pa, comm=comm)
+        pae = ParticleArrayExchange(pa_index=pa_index, pa=pa, comm=comm)
 
-    # set the export indices for each array
-    pae.reset_lists()
-    pae.numParticleExport = numExport
-    pae.exportParticleLocalids.resize(numExport)
-    pae.exportParticleLocalids.set_data(exportLocalids)
+        # set the export indices for the array
+        pae.reset_lists()
+        pae.numParticleExport = numExport
+        pae.exportParticleLocalids.resize(numExport)
+        pae.exportParticleLocalids.set_data(exportLocalids)
 
-    pae.exportParticleProcs.resize(numExport)
-    pae.exportParticleProcs.set_data(exportProcs)
+        pae.exportParticleProcs.resize(numExport)
+        pae.exportParticleProcs.set_data(exportProcs)
+        return pa, pae
+
+    pa, pae = create_exchange('test', 0)
 
     # call remote_exchange data with these lists
     pae.remote_exchange_data()
 
+    # post the exchange for two more arrays before waiting for either as
+    # the parallel manager does, this should give the same data.
+    pa1, pae1 = create_exchange('test1', 1)
+    pa2, pae2 = create_exchange('test2', 2)
+    pae1.post_remote_exchange()
+    pae2.post_remote_exchange()
+    assert pae1.exchange_posted and pae2.exchange_posted
+    pae2.wait_remote_exchange()
+    pae1.wait_remote_exchange()
+    assert not pae1.exchange_posted
+
+    for other in (pa1, pa2):
+        assert (other.num_real_particles == numPoints)
+        for prop in ('x', 'y', 'a', 'gid', 'tag'):
+            np.testing.assert_array_equal(
+                other.get(prop, only_real_particles=False),
+                pa.get(prop, only_real_particles=False)
+            )
+
     # the added particles should be remote
     tag = pa.get('tag', only_real_particles=False)
     assert (pa.num_real_particles == numPoints)
@@ -58,6 +58,12 @@ class ParticleArrayExchangeTestCase(unittest.TestCase):
             filename='remote_exchange.py', nprocs=4, path=path
         )
 
+    @mark.parallel
+    def test_persistent_halo_reuses_unchanged_cells(self):
+        run_parallel_script.run(
+            filename='persistent_halo.py', nprocs=4, path=path
+        )
+
 
 class SummationDensityTestCase(unittest.TestCase):
     @classmethod
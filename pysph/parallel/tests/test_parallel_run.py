@@ -69,6 +69,77 @@ class ParallelTests(ExampleTestCase):
             extra_parallel_kwargs=extra_parallel_kwargs
         )
 
+    @mark.parallel
+    def test_ldcavity_persistent_halo(self):
+        max_steps = 150
+        serial_kwargs = dict(max_steps=max_steps, pfreq=500, sort_gids=None)
+        extra_parallel_kwargs = dict(
+            ghost_layers=2, lb_freq=5, persistent_halo=None
+        )
+        self.run_example(
+            'cavity.py', nprocs=4, atol=1e-14, serial_kwargs=serial_kwargs,
+            extra_parallel_kwargs=extra_parallel_kwargs
+        )
+
+    @mark.parallel
+    def test_ldcavity_exchange_source_props(self):
+        max_steps = 150
+        serial_kwargs = dict(max_steps=max_steps, pfreq=500, sort_gids=None)
+        extra_parallel_kwargs = dict(
+            ghost_layers=2, lb_freq=5, exchange_source_props=None
+        )
+        self.run_example(
+            'cavity.py', nprocs=4, atol=1e-14, serial_kwargs=serial_kwargs,
+            extra_parallel_kwargs=extra_parallel_kwargs
+        )
+
+    @mark.parallel
+    def test_ldcavity_adaptive_load_balance(self):
+        max_steps = 150
+        serial_kwargs = dict(max_steps=max_steps, pfreq=500, sort_gids=None)
+        extra_parallel_kwargs = dict(
+            ghost_layers=2, lb_freq=5, lb_imbalance=1.1
+        )
+        self.run_example(
+            'cavity.py', nprocs=4, atol=1e-14, serial_kwargs=serial_kwargs,
+            extra_parallel_kwargs=extra_parallel_kwargs
+        )
+
+
+class SharedMemoryParallelTests(ExampleTestCase):
+
+    def test_ldcavity_example(self):
+        max_steps = 150
+        serial_kwargs = dict(max_steps=max_steps, pfreq=500, sort_gids=None)
+        extra_parallel_kwargs = dict(ghost_layers=2, lb_freq=5)
+        self.run_example(
+            'cavity.py', nprocs=3, atol=1e-14, serial_kwargs=serial_kwargs,
+            extra_parallel_kwargs=extra_parallel_kwargs, shm=True
+        )
+
+    @mark.slow
+    def test_elliptical_drop_example(self):
+        serial_kwargs = dict(sort_gids=None, kernel='CubicSpline', tf=0.0038)
+        extra_parallel_kwargs = dict(ghost_layers=1, lb_freq=5)
+        self.run_example(
+            'elliptical_drop.py', nprocs=2, atol=1e-11,
+            serial_kwargs=serial_kwargs,
+            extra_parallel_kwargs=extra_parallel_kwargs, shm=True
+        )
+
+    def test_elliptical_drop_prune_properties(self):
+        serial_kwargs = dict(
+            sort_gids=None, kernel='CubicSpline', max_steps=20,
+            prune_properties=None
+        )
+        extra_parallel_kwargs = dict(ghost_layers=1, lb_freq=5)
+        self.run_example(
+            'elliptical_drop.py', nprocs=2, atol=1e-11,
+            serial_kwargs=serial_kwargs,
+            extra_parallel_kwargs=extra_parallel_kwargs, shm=True
+        )
+
+
 if __name__ == '__main__':
     import unittest
     unittest.main()
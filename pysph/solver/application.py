@@ -3,6 +3,7 @@ from argparse import ArgumentDefaultsHelpFormatter
 import atexit
 from compyle.utils import ArgumentParser
 import glob
+import importlib
 import inspect
 import json
 import logging
@@ -16,36 +17,77 @@ import time
 import numpy as np
 import warnings
 
-# PySPH imports.
+# PySPH imports.  The NNPS, the kernels, the equations and the parallel
+# modules are slow to import and are only imported when they are used, so
+# that importing this module (e.g. for a short post-processing run) is fast.
 from pysph.base import utils
-from pysph.base.utils import is_overloaded_method
+from pysph.base.utils import get_memory_usage, is_overloaded_method
 
-from pysph.base.nnps import LinkedListNNPS, BoxSortNNPS, SpatialHashNNPS, \
-    ExtendedSpatialHashNNPS, CellIndexingNNPS, StratifiedHashNNPS, \
-    StratifiedSFCNNPS, OctreeNNPS, CompressedOctreeNNPS, ZOrderNNPS
-
-from pysph.base import kernels
 from compyle.config import get_config
 from compyle.profile import print_profile, profile2csv, get_profile_info
-from .controller import CommandManager
 from .utils import mkdir, load, get_files, get_free_port, is_using_ipython
+from .output import COMPRESSION_CODECS, parse_encoding
 
 # conditional parallel imports
 from pysph import has_mpi, has_zoltan, in_parallel
 
-if in_parallel():
-    from pysph.parallel.parallel_manager import ZoltanParallelManagerGeometric
-    import mpi4py.MPI as mpi
-
 logger = logging.getLogger(__name__)
 
+# The CPU NNPS classes as named by the --nnps option, given as the module and
+# the name of the class so only the module of the NNPS used is imported.
+NNPS_CLASSES = {
+    'box': ('pysph.base.box_sort_nnps', 'BoxSortNNPS'),
+    'll': ('pysph.base.linked_list_nnps', 'LinkedListNNPS'),
+    'sh': ('pysph.base.spatial_hash_nnps', 'SpatialHashNNPS'),
+    'esh': ('pysph.base.spatial_hash_nnps', 'ExtendedSpatialHashNNPS'),
+    'strat_hash': ('pysph.base.stratified_hash_nnps', 'StratifiedHashNNPS'),
+    'strat_sfc': ('pysph.base.stratified_sfc_nnps', 'StratifiedSFCNNPS'),
+    'tree': ('pysph.base.octree_nnps', 'OctreeNNPS'),
+    'ci': ('pysph.base.cell_indexing_nnps', 'CellIndexingNNPS'),
+    'sfc': ('pysph.base.z_order_nnps', 'ZOrderNNPS'),
+    'comp_tree': ('pysph.base.octree_nnps', 'CompressedOctreeNNPS'),
+}
+
+# The NNPS algorithms (as named by the --nnps option) that are timed when
+# using '--nnps auto'.
+AUTO_NNPS_CANDIDATES = ['ll', 'sh', 'ci', 'sfc', 'strat_sfc', 'tree']
+
+# Calibrate again if the number of particles changes by more than this
+# fraction or the ratio of the largest to smallest h by more than this factor.
+AUTO_NNPS_COUNT_CHANGE = 0.25
+AUTO_NNPS_H_RATIO_CHANGE = 1.5
+
 
 def list_all_kernels():
     """Return list of available kernels.
     """
+    from pysph.base import kernels
     return [n for n in dir(kernels) if inspect.isclass(getattr(kernels, n))]
 
 
+def get_kernel_class(name):
+    """Return the kernel class with the given name.
+    """
+    from pysph.base import kernels
+    return getattr(kernels, name)
+
+
+def get_nnps_class(name):
+    """Return the CPU NNPS class with the given name (as used by the --nnps
+    option), only its module is imported.
+    """
+    module, cls = NNPS_CLASSES[name]
+    return getattr(importlib.import_module(module), cls)
+
+
+def _format_bytes(n_bytes):
+    for unit in ('B', 'KB', 'MB'):
+        if n_bytes < 1024:
+            return '%.1f %s' % (n_bytes, unit)
+        n_bytes /= 1024.0
+    return '%.1f GB' % n_bytes
+
+
 ##############################################################################
 # `Application` class.
 ##############################################################################
@@ -178,6 +220,10 @@ class Application(object):
 
         self.solver = None
         self.nnps = None
+        self._nnps_auto = False
+        self._nnps_stats = []
+        self._nnps_stats_pending = False
+        self._nnps_workload = None
         self.scheme = None
         self.tools = []
         self.parallel_manager = None
@@ -194,6 +240,7 @@ class Application(object):
         self.num_procs = 1
         self.rank = 0
         if in_parallel():
+            import mpi4py.MPI as mpi
             if not mpi.Is_initialized():
                 mpi.Init()
             self.comm = comm = mpi.COMM_WORLD
@@ -344,6 +391,16 @@ class Application(object):
             default=0.3,
             help="CFL number for adaptive time steps")
 
+        # --fuse-dt-reductions
+        parser.add_argument(
+            "--fuse-dt-reductions",
+            action="store_true",
+            dest="fuse_dt_reductions",
+            default=False,
+            help="Find the adaptive time step constraints in the integrator "
+            "stepper loops instead of in separate passes over the "
+            "particles (Cython backend only).")
+
         # -q/--quiet.
         parser.add_argument(
             "-q",
@@ -397,10 +454,55 @@ class Application(object):
         parser.add_argument(
             "-z",
             "--compress-output",
-            action="store_true",
+            nargs="?",
+            const="gzip",
+            choices=COMPRESSION_CODECS,
             dest="compress_output",
             default=False,
-            help="Compress generated output files.")
+            help="Compress generated output files, optionally with the "
+            "given codec (gzip by default, lz4 and zstd need hdf5plugin).")
+
+        # --output-encoding
+        parser.add_argument(
+            "--output-encoding",
+            action="append",
+            dest="output_encoding",
+            default=[],
+            metavar="PROPS=ENCODING",
+            help="Dump the given comma separated properties (or '*' for "
+            "all) with a reduced precision, the encoding is 'float32' or "
+            "'quantize:tol' to store integers with a step of tol times the "
+            "range of the values, e.g. 'x,y,z=quantize:1e-6'.  May be "
+            "given more than once.")
+
+        # --lod-output
+        parser.add_argument(
+            "--lod-output",
+            action="store_true",
+            dest="lod_output",
+            default=False,
+            help="Dump the particles in a random order so viewers can "
+            "quickly load a fraction of them as a representative sample.")
+
+        # --report-memory
+        parser.add_argument(
+            "--report-memory",
+            action="store_true",
+            dest="report_memory",
+            default=False,
+            help="Report the memory used by each property of the particles "
+            "and the properties that are not used, the report is also saved "
+            "to memory_report.json in the output directory.")
+
+        # --prune-properties
+        parser.add_argument(
+            "--prune-properties",
+            action="store_true",
+            dest="prune_properties",
+            default=False,
+            help="Remove the properties of the particles that are not used "
+            "by the equations, the integrator or the output. Tools and "
+            "callbacks using the removed properties will fail.")
 
         # --output-remote
         parser.add_argument(
@@ -477,6 +579,33 @@ class Application(object):
             help="Only perform post-processing and exit."
         )
 
+        parser.add_argument(
+            '--compile-only', action="store_true",
+            dest="compile_only", default=False,
+            help="Only setup the case and compile the generated code and "
+            "exit, this is used to populate the cache before many runs."
+        )
+
+        # --ensemble
+        parser.add_argument(
+            "--ensemble",
+            action="store",
+            type=int,
+            dest="ensemble",
+            default=1,
+            help="Run this many replicas of the case together in the same "
+            "particle arrays, see the perturb_replica method.  Each replica "
+            "is saved in its own directory.  Equations with reduce or "
+            "py_initialize methods and iterated groups are not supported.")
+        parser.add_argument(
+            "--ensemble-spacing",
+            action="store",
+            type=float,
+            dest="ensemble_spacing",
+            default=2.0,
+            help="Space between the replicas of an ensemble along x as a "
+            "multiple of the extent of the particles.")
+
         # Restart options
         restart = parser.add_argument_group("Restart options",
                                             "Restart options for PySPH")
@@ -506,7 +635,7 @@ class Application(object):
             dest="nnps",
             choices=[
                 'box', 'll', 'sh', 'esh', 'ci', 'sfc', 'comp_tree',
-                'strat_hash', 'strat_sfc', 'tree', 'gpu_octree'
+                'strat_hash', 'strat_sfc', 'tree', 'gpu_octree', 'auto'
             ],
             default='ll',
             help="Use one of box-sort ('box') or "
@@ -519,7 +648,29 @@ class Application(object):
             "the stratified sfc algorithm ('strat_sfc') or "
             "the octree algorithm ('tree') or "
             "the compressed octree algorithm ('comp_tree') or "
-            "the gpu octree algorithm ('gpu_octree')")
+            "the gpu octree algorithm ('gpu_octree') or "
+            "pick the fastest CPU algorithm, with or without caching, by "
+            "timing the accelerations with each of them ('auto')")
+
+        nnps_options.add_argument(
+            "--nnps-recheck-freq",
+            dest="nnps_recheck_freq",
+            type=int,
+            default=0,
+            help="With '--nnps auto', check the number of particles and the "
+            "spread of h every so many iterations and pick the NNPS again "
+            "if they have changed significantly (0 disables the check).")
+
+        nnps_options.add_argument(
+            "--nnps-stats",
+            action="store",
+            dest="nnps_stats",
+            type=int,
+            default=0,
+            help="Every so many iterations and at the end, save the "
+            "neighbor counts, the candidate particles, the cell occupancy "
+            "and the update times for each interacting pair of arrays to "
+            "nnps_stats.json in the output directory (0 disables this).")
 
         nnps_options.add_argument(
             "--spatial-hash-sub-factor",
@@ -540,7 +691,8 @@ class Application(object):
             dest="table_size",
             type=int,
             default=131072,
-            help="Table size for SpatialHashNNPS and ExtendedSpatialHashNNPS")
+            help="Initial table size for SpatialHashNNPS and "
+            "ExtendedSpatialHashNNPS, the table grows as needed")
 
         nnps_options.add_argument(
             "--stratified-grid-num-levels",
@@ -572,6 +724,15 @@ class Application(object):
             default=self.cache_nnps,
             help="Option to enable the use of neighbor caching.")
 
+        nnps_options.add_argument(
+            "--nnps-h-padding",
+            dest="nnps_h_padding",
+            type=float,
+            default=0.0,
+            help="Pad the NNPS cell size by this fraction so particles are "
+            "not binned again when only their smoothing lengths change, "
+            "for example in variable h iterations.")
+
         nnps_options.add_argument(
             "--sort-gids",
             dest="sort_gids",
@@ -654,6 +815,35 @@ class Application(object):
             type=int,
             help=('The frequency for load balancing'))
 
+        zoltan.add_argument(
+            "--lb-imbalance",
+            action='store',
+            dest='lb_imbalance',
+            default=0.0,
+            type=float,
+            help=('Only load balance (checked every lb-freq updates) when '
+                  'the ratio of the maximum to the mean compute time across '
+                  'processors exceeds this, the cells are then weighted by '
+                  'the measured cost. Zero load balances every lb-freq '
+                  'updates.'))
+
+        zoltan.add_argument(
+            "--persistent-halo",
+            action="store_true",
+            dest="persistent_halo",
+            default=False,
+            help=("Reuse the remote particle export entries of the cells "
+                  "whose particles are unchanged between load balancing "
+                  "steps"))
+
+        zoltan.add_argument(
+            "--exchange-source-props",
+            action="store_true",
+            dest="exchange_source_props",
+            default=False,
+            help=("Only send the properties used by the equations for the "
+                  "remote particles, migrated particles send all lb_props"))
+
         zoltan.add_argument(
             "--zoltan-debug-level",
             action="store",
@@ -681,6 +871,17 @@ class Application(object):
             type=float,
             help=("""Kernel scale factor for the parallel update"""))
 
+        # --shm-procs
+        parallel_options.add_argument(
+            "--shm-procs",
+            action="store",
+            dest="shm_procs",
+            default=0,
+            type=int,
+            help=("Run in parallel with this many processes on this node "
+                  "exchanging particles through shared memory, this does "
+                  "not need MPI or Zoltan"))
+
         # --parallel-output-mode
         parallel_options.add_argument(
             "--parallel-output-mode",
@@ -722,6 +923,17 @@ class Application(object):
                   " given 'auto' (8800+ means first available port "
                   "number 8800 onwards);"))
 
+        interfaces.add_argument(
+            "--stream",
+            action="store",
+            dest="stream",
+            metavar="[HOST:] PORT",
+            default=None,
+            help=("Stream selected particle properties to subscribers "
+                  "(see pysph.solver.solver_interfaces.StreamClient) "
+                  "without pausing the solver; HOST=127.0.0.1 by default, "
+                  "PORT=0 picks a free port."))
+
         interfaces.add_argument(
             "--octree-leaf-size",
             dest="octree_leaf_size",
@@ -839,6 +1051,41 @@ class Application(object):
             'Running on {host} with address {ip}'.format(host=host, ip=ip)
         )
 
+    def _create_ensemble(self):
+        """Stack the replicas of the particles for the --ensemble option.
+        """
+        from .ensemble import (
+            check_ensemble_equations, get_replica_offset, make_ensemble
+        )
+        options = self.options
+        solver = self.solver
+        n_replicas = options.ensemble
+        if self.num_procs > 1:
+            raise ValueError("'--ensemble' cannot be used in parallel.")
+        if is_overloaded_method(self.create_inlet_outlet):
+            raise ValueError("'--ensemble' cannot be used with inlets.")
+        manager = getattr(self.domain, 'manager', None)
+        if manager is not None and (manager.is_periodic or
+                                    manager.is_mirror):
+            raise ValueError(
+                "'--ensemble' cannot be used with periodic or mirrored "
+                "domains."
+            )
+        check_ensemble_equations(self.equations)
+        kernel = solver.kernel
+        if options.kernel is not None:
+            kernel = get_kernel_class(options.kernel)(dim=solver.dim)
+        offset = get_replica_offset(
+            self.particles, options.ensemble_spacing, kernel.radius_scale
+        )
+        self.particles = make_ensemble(
+            self.particles, n_replicas, offset, self.perturb_replica
+        )
+        solver.set_ensemble(n_replicas, offset)
+        self._message('Running %d replicas, %g apart along x.' % (
+            n_replicas, offset
+        ))
+
     def _create_inlet_outlet(self, inlet_outlet_factory):
         """Create the inlets and outlets if needed.
 
@@ -947,6 +1194,198 @@ class Application(object):
         if options.profile:
             config.profile = options.profile
 
+    def _create_cpu_nnps(self, name, kernel, fixed_h, cache):
+        """Create the CPU NNPS with the given name (as used by the --nnps
+        option) for the particles of the application.
+        """
+        options = self.options
+        solver = self.solver
+        kw = dict(
+            dim=solver.dim, particles=self.particles,
+            radius_scale=kernel.radius_scale, domain=self.domain, cache=cache,
+            sort_gids=options.sort_gids
+        )
+        if name != 'box':
+            kw['fixed_h'] = fixed_h
+        if name in ('sh', 'esh', 'strat_hash'):
+            kw['table_size'] = options.table_size
+        if name == 'esh':
+            kw.update(H=options.H, approximate=options.approximate_nnps)
+        if name in ('strat_hash', 'strat_sfc'):
+            kw['num_levels'] = options.num_levels
+        if name in ('tree', 'comp_tree'):
+            kw['leaf_max_particles'] = options.leaf_max_particles
+        nnps = get_nnps_class(name)(**kw)
+        return nnps
+
+    def _configure_nnps(self, nnps):
+        options = self.options
+        if options.nnps_h_padding > 0:
+            nnps.set_h_padding(options.nnps_h_padding)
+        if self.num_procs > 1:
+            nnps.set_in_parallel(True)
+
+    def _setup_nnps(self, nnps):
+        self._configure_nnps(nnps)
+        self.nnps = nnps
+        self.solver.set_nnps(nnps)
+
+    def _time_nnps(self, nnps, queries):
+        """Return the time to update the NNPS and find the neighbors for
+        the given ``(dst_index, src_index)`` queries.
+        """
+        from pysph.base.nnps_base import count_neighbors
+        start = time.time()
+        nnps.update()
+        for dst_index, src_index in queries:
+            count_neighbors(nnps, src_index, dst_index)
+        return time.time() - start
+
+    def _get_nnps_workload(self):
+        n = 0
+        hmin, hmax = np.inf, 0.0
+        for pa in self.particles:
+            h = pa.get('h', only_real_particles=True)
+            n += len(h)
+            if len(h) > 0:
+                hmin = min(hmin, h.min())
+                hmax = max(hmax, h.max())
+        h_ratio = hmax/hmin if hmin > 0 else 1.0
+        return n, h_ratio
+
+    def _select_nnps(self):
+        """Use the fastest of the candidate NNPS for '--nnps auto'.
+
+        Each of the AUTO_NNPS_CANDIDATES, with and without caching the
+        neighbors, is updated and queried for the neighbors that one
+        evaluation of the equations needs, a few times on the actual
+        particles, and the fastest combination is used.  The equations are
+        not evaluated.  In parallel, the choice of the root is used on all
+        the processors.
+        """
+        from pysph.sph.acceleration_eval import get_neighbor_queries
+        solver = self.solver
+        kernel = solver.kernel
+        fixed_h = solver.fixed_h or self.options.fixed_h
+        need_padding = self.options.nnps_h_padding > 0
+        index = dict((pa.name, i) for i, pa in enumerate(self.particles))
+        queries = [
+            (index[dest], index[src])
+            for dest, src in get_neighbor_queries(solver.acceleration_evals)
+        ]
+        timings = []
+        for name in AUTO_NNPS_CANDIDATES:
+            for cache in (False, True):
+                nnps = self._create_cpu_nnps(name, kernel, fixed_h, cache)
+                if need_padding and not nnps.supports_h_padding:
+                    continue
+                self._configure_nnps(nnps)
+                times = [self._time_nnps(nnps, queries) for i in range(3)]
+                timings.append((min(times), name, cache))
+
+        if self.num_procs > 1:
+            timings = self.comm.bcast(timings, root=0)
+        timings.sort()
+        for t, name, cache in timings:
+            logger.info('NNPS %s (cache=%s): %.4g secs', name, cache, t)
+        t, name, cache = timings[0]
+        self._message('Using the fastest NNPS: %s (cache=%s)' % (name, cache))
+        self._setup_nnps(self._create_cpu_nnps(name, kernel, fixed_h, cache))
+        self._nnps_workload = self._get_nnps_workload()
+
+    def _check_nnps_workload(self, solver):
+        if (solver.count + 1) % self.options.nnps_recheck_freq != 0:
+            return
+        n0, h_ratio0 = self._nnps_workload
+        n, h_ratio = self._get_nnps_workload()
+        changed = (
+            abs(n - n0) > AUTO_NNPS_COUNT_CHANGE*max(n0, 1) or
+            max(h_ratio/h_ratio0, h_ratio0/h_ratio) > AUTO_NNPS_H_RATIO_CHANGE
+        )
+        if self.num_procs > 1:
+            changed = self.comm.bcast(changed, root=0)
+        if changed:
+            logger.info('Particle count or h changed, selecting the NNPS.')
+            self._select_nnps()
+
+    def _report_memory(self):
+        from pysph.sph.acceleration_eval import get_used_props
+        solver = self.solver
+        used = get_used_props(solver.acceleration_evals, solver.integrator)
+        report = {}
+        lines = ['Memory used by the particle properties:']
+        for name, usage in get_memory_usage(self.particles).items():
+            props = used.get(name)
+            unused = [] if props is None else sorted(set(usage) - props)
+            report[name] = dict(
+                properties=usage, unused=unused,
+                removed=solver.removed_props.get(name, [])
+            )
+            lines.append('  %s: %s in %d properties, %s unused' % (
+                name, _format_bytes(sum(usage.values())), len(usage),
+                _format_bytes(sum(usage[x] for x in unused))
+            ))
+            for prop, n_bytes in sorted(usage.items(), key=lambda x: -x[1]):
+                lines.append('    %-20s %10s%s' % (
+                    prop, _format_bytes(n_bytes),
+                    ' (unused)' if prop in unused else ''
+                ))
+            if report[name]['removed']:
+                lines.append('    removed: %s' % (
+                    ', '.join(report[name]['removed'])
+                ))
+        self._message('\n'.join(lines))
+
+        data = [report]
+        if self.num_procs > 1:
+            data = self.comm.gather(report, root=0)
+        if self.rank == 0:
+            fname = join(self.output_dir, 'memory_report.json')
+            with open(fname, 'w') as f:
+                json.dump(dict(ranks=data), f, indent=2)
+
+    def _get_nnps_pairs(self):
+        """Return the sorted (dest, source) names of the interacting
+        arrays.
+        """
+        pairs = set()
+        for a_eval in self.solver.acceleration_evals:
+            for equation in a_eval.all_group.equations:
+                if not equation.no_source:
+                    pairs.update(
+                        (equation.dest, src) for src in equation.sources
+                    )
+        return sorted(pairs)
+
+    def _collect_nnps_stats(self, solver):
+        if (solver.count + 1) % self.options.nnps_stats != 0:
+            return
+        # The particles have moved since the solver's NNPS was last updated,
+        # so the statistics are collected right after its next update.
+        self._nnps_stats_pending = True
+
+    def _on_nnps_update(self, t, nnps):
+        if not self._nnps_stats_pending:
+            return
+        self._nnps_stats_pending = False
+        self._add_nnps_stats(t, self.solver.count, nnps)
+
+    def _add_nnps_stats(self, t, count, nnps):
+        timing = dict(
+            last=nnps.update_time, total=nnps.total_update_time,
+            count=nnps.n_updates
+        )
+        names = [pa.name for pa in self.particles]
+        pairs = []
+        for dest, src in self._get_nnps_pairs():
+            pairs.append(nnps.get_neighbor_statistics(
+                names.index(src), names.index(dest)
+            ))
+        self._nnps_stats.append(dict(
+            t=t, count=count, nnps=nnps.__class__.__name__,
+            update_time=timing, pairs=pairs
+        ))
+
     def _configure_solver(self):
         """Configures the application using the options from the
         command-line.
@@ -962,7 +1401,7 @@ class Application(object):
 
         kernel = solver.kernel
         if options.kernel is not None:
-            kernel = getattr(kernels, options.kernel)(dim=solver.dim)
+            kernel = get_kernel_class(options.kernel)(dim=solver.dim)
             solver.kernel = kernel
 
         # This should be called before an NNPS is created as the particles are
@@ -1004,117 +1443,20 @@ class Application(object):
                         cache=True,
                         sort_gids=options.sort_gids)
 
-            elif options.nnps == 'box':
-                nnps = BoxSortNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    cache=cache,
-                    sort_gids=options.sort_gids)
-
-            elif options.nnps == 'll':
-                nnps = LinkedListNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    sort_gids=options.sort_gids)
-
-            elif options.nnps == 'sh':
-                nnps = SpatialHashNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    table_size=options.table_size,
-                    sort_gids=options.sort_gids)
-
-            elif options.nnps == 'esh':
-                nnps = ExtendedSpatialHashNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    H=options.H,
-                    table_size=options.table_size,
-                    sort_gids=options.sort_gids,
-                    approximate=options.approximate_nnps)
-
-            elif options.nnps == 'strat_hash':
-                nnps = StratifiedHashNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    table_size=options.table_size,
-                    sort_gids=options.sort_gids,
-                    num_levels=options.num_levels)
-
-            elif options.nnps == 'strat_sfc':
-                nnps = StratifiedSFCNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    sort_gids=options.sort_gids,
-                    num_levels=options.num_levels)
-
-            elif options.nnps == 'tree':
-                nnps = OctreeNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    leaf_max_particles=options.leaf_max_particles,
-                    sort_gids=options.sort_gids)
-
-            elif options.nnps == 'ci':
-                nnps = CellIndexingNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    sort_gids=options.sort_gids)
-
-            elif options.nnps == 'sfc':
-                nnps = ZOrderNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    sort_gids=options.sort_gids)
-
-            elif options.nnps == 'comp_tree':
-                nnps = CompressedOctreeNNPS(
-                    dim=solver.dim,
-                    particles=self.particles,
-                    radius_scale=kernel.radius_scale,
-                    domain=self.domain,
-                    fixed_h=fixed_h,
-                    cache=cache,
-                    leaf_max_particles=options.leaf_max_particles,
-                    sort_gids=options.sort_gids)
+            elif options.nnps == 'auto':
+                # Selected once the solver has been setup.
+                self._nnps_auto = True
+                nnps = self._create_cpu_nnps('ll', kernel, fixed_h, cache)
+            else:
+                nnps = self._create_cpu_nnps(
+                    options.nnps, kernel, fixed_h, cache
+                )
 
             self.nnps = nnps
 
         nnps = self.nnps
+        if options.nnps_h_padding > 0:
+            nnps.set_h_padding(options.nnps_h_padding)
 
         # inform NNPS if it's working in parallel
         if self.num_procs > 1:
@@ -1133,10 +1475,8 @@ class Application(object):
         # Setup the solver output file name
         fname = options.fname
 
-        if in_parallel():
-            rank = self.rank
-            if self.num_procs > 1:
-                fname += '_' + str(rank)
+        if self.num_procs > 1:
+            fname += '_' + str(self.rank)
 
         # set the rank for the solver
         solver.rank = self.rank
@@ -1151,6 +1491,11 @@ class Application(object):
         solver.set_output_fname(fname)
 
         solver.set_compress_output(options.compress_output)
+        solver.set_lod_output(options.lod_output)
+        if options.output_encoding:
+            solver.set_output_encoding(
+                parse_encoding(options.output_encoding)
+            )
         # disable_output
         solver.set_disable_output(options.disable_output)
 
@@ -1189,6 +1534,12 @@ class Application(object):
         if options.n_damp is not None:
             solver.set_n_damp(options.n_damp)
 
+        if options.fuse_dt_reductions:
+            solver.integrator.set_fuse_dt_reductions(True)
+
+        if options.prune_properties:
+            solver.set_prune_props(True)
+
         # setup the solver. This is where the code is compiled
         solver.setup(
             particles=self.particles,
@@ -1197,7 +1548,32 @@ class Application(object):
             kernel=kernel,
             fixed_h=fixed_h)
 
+        if self.parallel_manager is not None and solver.removed_props:
+            # The parallel manager was created before the unused
+            # properties were removed.
+            self.parallel_manager.update_lb_props()
+
+        if self._nnps_auto:
+            self._select_nnps()
+            if options.nnps_recheck_freq > 0:
+                solver.add_post_step_callback(self._check_nnps_workload)
+
+        if options.nnps_stats > 0:
+            if options.with_opencl or options.with_cuda:
+                raise RuntimeError(
+                    '--nnps-stats is not supported with the GPU NNPS.'
+                )
+            solver.add_post_step_callback(self._collect_nnps_stats)
+            solver.integrator.set_nnps_update_callback(self._on_nnps_update)
+
+        if options.report_memory:
+            self._report_memory()
+
+        if self.parallel_manager is not None:
+            self._setup_remote_props()
+
         # add solver interfaces
+        from .controller import CommandManager
         self.command_manager = CommandManager(solver, self.comm)
         solver.set_command_handler(self.command_manager.execute_commands)
 
@@ -1206,6 +1582,23 @@ class Application(object):
             self._stop_interfaces()
             self._interfaces = []
 
+        # The stream server publishes on all the processors.
+        if options.stream:
+            from pysph.solver.controller import StreamServer
+            addr = options.stream
+            idx = addr.find(':')
+            host = '127.0.0.1' if idx == -1 else addr[:idx]
+            port = int(addr[idx + 1:])
+            server = StreamServer((host, port), comm=self.comm)
+            server.start()
+            self._interfaces.append(server)
+            self.command_manager.add_stream_server(server)
+            if self.rank == 0:
+                _used_ports.append(server.address[1])
+                self._message(
+                    'Streaming particle data on %s:%d' % server.address
+                )
+
         if self.rank == 0:
             if sys.platform == 'win32':
                 auto = "pysph@127.0.0.1:8800+"
@@ -1272,6 +1665,25 @@ class Application(object):
         self._configure_global_config()
         self._configure_solver()
 
+    def _setup_shared_memory_comm(self):
+        """Fork the processes for a shared memory parallel run.
+
+        Each process continues with the setup with its own rank, as is done
+        for MPI runs.
+        """
+        nprocs = self.options.shm_procs
+        if nprocs < 2:
+            return
+        if self.num_procs > 1:
+            raise ValueError("Cannot use '--shm-procs' when running with MPI")
+
+        from pysph.base.reduce_array import set_reduce_comm
+        from pysph.parallel.shm_manager import fork_processes
+        self.comm = comm = fork_processes(nprocs)
+        self.num_procs = comm.Get_size()
+        self.rank = comm.Get_rank()
+        set_reduce_comm(comm)
+
     def _setup_parallel_manager_and_initial_load_balance(self):
         """This will automatically distribute the particles among processors
         if this is a parallel run.
@@ -1284,6 +1696,32 @@ class Application(object):
 
         self.parallel_manager = None
         if num_procs > 1:
+            from pysph.parallel.shm_manager import (
+                SharedMemoryComm, SharedMemoryParallelManager
+            )
+        if num_procs > 1 and isinstance(comm, SharedMemoryComm):
+            radius_scale = (options.parallel_scale_factor *
+                            solver.kernel.radius_scale)
+            self.parallel_manager = pm = SharedMemoryParallelManager(
+                dim=solver.dim,
+                particles=self.particles,
+                comm=comm,
+                ghost_layers=options.ghost_layers,
+                radius_scale=radius_scale
+            )
+            pm.update()
+            pm.initial_update = False
+
+            if options.lb_freq < 1:
+                raise ValueError("Invalid lb_freq %d" % options.lb_freq)
+            pm.set_lb_freq(options.lb_freq)
+
+            if options.lb_imbalance > 0:
+                pm.set_lb_imbalance(options.lb_imbalance)
+
+        elif num_procs > 1:
+            from pysph.parallel.parallel_manager import \
+                ZoltanParallelManagerGeometric
             options = self.options
 
             if options.with_zoltan:
@@ -1336,6 +1774,9 @@ class Application(object):
                 pm.set_zoltan_rcb_directions(
                     str(options.zoltan_rcb_set_direction))
 
+            if options.persistent_halo:
+                pm.set_persistent_halo(True)
+
             # set zoltan options
             pm.pz.Zoltan_Set_Param("DEBUG_LEVEL", options.zoltan_debug_level)
             pm.pz.Zoltan_Set_Param("DEBUG_MEMORY", "0")
@@ -1350,12 +1791,35 @@ class Application(object):
                 raise ValueError("Invalid lb_freq %d" % lb_freq)
             pm.set_lb_freq(lb_freq)
 
+            if options.lb_imbalance > 0:
+                pm.set_lb_imbalance(options.lb_imbalance)
+
             # wait till the initial partition is done
             comm.barrier()
 
         # set the solver's parallel manager
         solver.set_parallel_manager(self.parallel_manager)
 
+    def _setup_remote_props(self):
+        """Restrict the remote particle properties if requested and report
+        the amount of data exchanged for the remote particles.
+        """
+        pm = self.parallel_manager
+        if self.options.exchange_source_props:
+            from pysph.sph.acceleration_eval import get_remote_props
+            remote_props = get_remote_props(self.solver.acceleration_evals)
+            pm.set_remote_props(remote_props)
+
+        for info in pm.get_exchange_info():
+            logger.info(
+                'Rank %d: array %s sends %d of %d props (%d of %d bytes) '
+                'per remote particle, %d bytes sent and %d bytes received '
+                'per update', self.rank, info['name'], info['nremote_props'],
+                info['nprops'], info['remote_msg_nbytes'],
+                info['msg_nbytes'], info['bytes_sent'],
+                info['bytes_received']
+            )
+
     def _setup_solver_callbacks(self, obj):
         """Setup any solver callbacks given an object with any of `pre_step`,
         `post_step' and `post_stage`
@@ -1394,6 +1858,42 @@ class Application(object):
             info.update(kw)
             with open(filename, 'w') as f:
                 json.dump(info, f)
+            if self.solver is not None and self.solver.ensemble is not None:
+                self._write_replica_info(filename, info)
+
+    def _write_replica_info(self, filename, info):
+        # Each replica directory has an info file so that it may be viewed
+        # and post-processed like the output of a single run.
+        from .ensemble import get_replica_dir
+        n_replicas, offset = self.solver.ensemble
+        for k in range(n_replicas):
+            path = get_replica_dir(self.output_dir, k)
+            data = dict(info, output_dir=path, replica=k)
+            if 'n_particles' in data:
+                data['n_particles'] = dict(
+                    (name, n//n_replicas)
+                    for name, n in data['n_particles'].items()
+                )
+            with open(join(path, basename(filename)), 'w') as f:
+                json.dump(data, f)
+
+    def _get_particle_counts(self):
+        """Return the number of (real) particles in each array over all the
+        processors.
+        """
+        in_parallel = self.num_procs > 1
+        counts = dict(
+            (pa.name, pa.get_number_of_particles(real=in_parallel))
+            for pa in self.particles
+        )
+        if in_parallel:
+            all_counts = self.comm.gather(counts, root=0)
+            if self.rank == 0:
+                counts = dict(
+                    (name, sum(c[name] for c in all_counts))
+                    for name in counts
+                )
+        return counts
 
     def _write_profile_info(self):
         # Note that this is called when the run method ends and NOT
@@ -1407,6 +1907,24 @@ class Application(object):
             profile2csv(fname, info=data)
         if self.options.profile and self.rank == 0:
             print_profile()
+        if self.options.nnps_stats > 0:
+            self._write_nnps_stats()
+
+    def _write_nnps_stats(self):
+        solver = self.solver
+        if not self._nnps_stats or self._nnps_stats[-1]['count'] != \
+                solver.count:
+            # The run is over so the solver's NNPS can be updated for the
+            # particles of the last step.
+            self._nnps_stats_pending = True
+            solver.integrator.update_nnps()
+        data = [self._nnps_stats]
+        if self.num_procs > 1:
+            data = self.comm.gather(self._nnps_stats, root=0)
+        if self.rank == 0:
+            fname = join(self.output_dir, 'nnps_stats.json')
+            with open(fname, 'w') as f:
+                json.dump(dict(ranks=data), f, indent=2)
 
     def _log_solver_info(self, solver):
         sep = '-'*70
@@ -1535,6 +2053,11 @@ class Application(object):
             interactively.
         """
         self.setup(argv)
+        if self.options.compile_only:
+            self._message('Compiled the code, exiting as --compile-only '
+                          'was given.')
+            # Exit so that any app.post_process call is skipped.
+            sys.exit(0)
         self.solve()
 
     def set_args(self, args):
@@ -1565,6 +2088,7 @@ class Application(object):
 
             self._parse_command_line(force=argv is not None)
             self._process_command_line()
+            self._setup_shared_memory_comm()
             self._setup_logging()
             self._configure_global_config()
 
@@ -1583,6 +2107,9 @@ class Application(object):
             if self.domain is None:
                 self.domain = self.create_domain()
 
+            if self.options.ensemble > 1:
+                self._create_ensemble()
+
             self.nnps = self.create_nnps()
 
             self._configure_solver()
@@ -1613,7 +2140,9 @@ class Application(object):
         run_duration = end_time - start_time
         self._message("Run took: %.5f secs" % (run_duration))
         self._write_info(
-            self.info_filename, completed=True, cpu_time=run_duration
+            self.info_filename, completed=True, cpu_time=run_duration,
+            n_steps=int(self.solver.count),
+            n_particles=self._get_particle_counts()
         )
 
         self._stop_interfaces()
@@ -1731,6 +2260,18 @@ class Application(object):
         """
         pass
 
+    def perturb_replica(self, particles, replica):
+        """If overloaded, this is called with the list of particle arrays of
+        each replica when running an ensemble with the ``--ensemble`` option.
+        The method may change the properties of the particles to perturb
+        the initial conditions of the replica, the particles of all the
+        replicas are then stacked together.
+
+        For example a replica dependent random perturbation may be added
+        using ``numpy.random.RandomState(replica)``.
+        """
+        pass
+
     def post_stage(self, current_time, dt, stage):
         """If overloaded, this is called automatically after each integrator
         stage, i.e. if the integrator is a two stage integrator it will be
@@ -1,11 +1,21 @@
 ''' Implement infrastructure for the solver to add various interfaces '''
 
 from functools import wraps
+import json
+import socket
+import struct
 import threading
 try:
     from thread import LockType
 except ImportError:
     from _thread import LockType
+try:
+    from queue import Queue, Empty, Full
+except ImportError:
+    from Queue import Queue, Empty, Full
+
+import numpy as np
+
 from pysph.base.particle_array import ParticleArray
 
 import logging
@@ -206,7 +216,8 @@ class CommandManager(object):
     lazy_methods = set(('get_particle_array_names', 'get_named_particle_array',
                 'get_particle_array_combined', 'get_particle_array_from_procs'))
 
-    active_methods = set(('get_status', 'get_task_lock', 'set_log_level'))
+    active_methods = set(('get_status', 'get_task_lock', 'set_log_level',
+                          'get_stream_address'))
 
     def __init__(self, solver, comm=None):
         if comm is not None:
@@ -231,6 +242,7 @@ class CommandManager(object):
         self.queue_lock_map = {}
         self.results = {}
         self.pause = set([])
+        self.stream_server = None
 
     @on_root_proc
     def add_interface(self, callable, block=True):
@@ -254,6 +266,14 @@ class CommandManager(object):
         l = self.func_dict[interval] = self.func_dict.get(interval, [])
         l.append(callable)
 
+    def add_stream_server(self, server):
+        ''' publish frames to the subscribers of the given `StreamServer`
+
+        This must be called on all the processors in a parallel run.
+        '''
+        self.stream_server = server
+        self.add_function(server.publish)
+
     def execute_commands(self, solver):
         ''' called by the solver after each timestep '''
         # TODO: first synchronize all the controllers in different processes
@@ -282,7 +302,15 @@ class CommandManager(object):
 
     def sync_commands(self):
         ''' send the pending commands to all the procs in parallel run '''
-        self.queue_dict, self.queue, self.pause = self.comm.bcast((self.queue_dict, self.queue, self.pause))
+        server = self.stream_server
+        generation = None
+        if server is not None and self.rank == 0:
+            generation = server.get_generation()
+        self.queue_dict, self.queue, self.pause, generation = self.comm.bcast(
+            (self.queue_dict, self.queue, self.pause, generation)
+        )
+        if server is not None and self.comm.Get_size() > 1:
+            server.sync(generation)
 
 
     def run_queued_commands(self):
@@ -408,6 +436,12 @@ class CommandManager(object):
         ''' set the logging level '''
         logger.setLevel(level)
 
+    def get_stream_address(self):
+        ''' get the (host, port) to subscribe to streamed frames, if any '''
+        if self.stream_server is None:
+            return None
+        return self.stream_server.address
+
     dispatch_dict = {'get':get_prop, 'set':set_prop}
 
     for meth in solver_methods:
@@ -445,3 +479,348 @@ class CommandManager(object):
                 return str(lock_id)
         else:
             raise RuntimeError('Invalid dispatch on method: '+meth)
+
+
+###############################################################################
+# Streaming selected particle properties to subscribers.
+###############################################################################
+
+FRAME_HEADER = struct.Struct('<Q')
+
+
+def encode_frame(info, data):
+    ''' encode the solver `info` (a dict) and the `data` to a binary frame
+
+    `data` is a list of (array_name, [(prop, ndarray), ...]).  The frame is
+    the length of a JSON header followed by the header and the raw bytes of
+    the arrays.
+    '''
+    arrays = []
+    chunks = []
+    for name, props in data:
+        desc = []
+        for prop, arr in props:
+            arr = np.ascontiguousarray(arr)
+            desc.append([prop, arr.dtype.str, len(arr)])
+            chunks.append(arr.tobytes())
+        arrays.append([name, desc])
+    header = dict(info)
+    header['arrays'] = arrays
+    header = json.dumps(header).encode('utf-8')
+    return b''.join([FRAME_HEADER.pack(len(header)), header] + chunks)
+
+
+def decode_frame(header, payload):
+    ''' decode a frame given the header bytes and the payload bytes
+
+    Returns the solver info (a dict) and a dict of array name to a dict of
+    the property arrays.
+    '''
+    info = json.loads(header.decode('utf-8'))
+    arrays = info.pop('arrays')
+    data = {}
+    offset = 0
+    for name, desc in arrays:
+        props = data[name] = {}
+        for prop, dtype, n in desc:
+            dtype = np.dtype(dtype)
+            props[prop] = np.frombuffer(
+                payload, dtype=dtype, count=n, offset=offset
+            )
+            offset += n*dtype.itemsize
+    return info, data
+
+
+def get_frame_payload_size(header):
+    ''' size in bytes of the payload following the given header '''
+    info = json.loads(header.decode('utf-8'))
+    size = 0
+    for name, desc in info['arrays']:
+        for prop, dtype, n in desc:
+            size += n*np.dtype(dtype).itemsize
+    return size
+
+
+class Subscription(object):
+    ''' Selection of the particle data streamed to a subscriber
+
+    Parameters
+    ----------
+
+    props: list
+        Properties to stream, only the real particles are sent.
+    arrays: list
+        Names of the particle arrays, all the arrays if None.
+    freq: int
+        Send a frame every `freq` iterations.
+    stride: int
+        Only send every `stride`-th particle (decimation).
+    bounds: list
+        Only send the particles inside (xmin, xmax, ymin, ymax, zmin, zmax).
+    dtype: str
+        Convert the data to this numeric dtype (e.g. 'float32') if given.
+    '''
+    def __init__(self, props, arrays=None, freq=1, stride=1, bounds=None,
+                 dtype=None):
+        self.props = list(props)
+        self.arrays = None if arrays is None else list(arrays)
+        self.freq = max(int(freq), 1)
+        self.stride = max(int(stride), 1)
+        self.bounds = None if bounds is None else [float(x) for x in bounds]
+        if self.bounds is not None and len(self.bounds) != 6:
+            raise ValueError('bounds must be (xmin, xmax, ymin, ymax, '
+                             'zmin, zmax).')
+        if dtype is not None:
+            dt = np.dtype(dtype)
+            if dt.kind not in 'biuf':
+                raise ValueError('dtype must be numeric, got %r.' % dtype)
+            dtype = dt.name
+        self.dtype = dtype
+
+    def to_dict(self):
+        return dict(props=self.props, arrays=self.arrays, freq=self.freq,
+                    stride=self.stride, bounds=self.bounds, dtype=self.dtype)
+
+    def is_due(self, count):
+        return count % self.freq == 0
+
+    def select(self, particles):
+        ''' return the selected data as a list of (name, [(prop, array)])
+
+        The arrays are copies and may be used after the solver continues.
+        '''
+        result = []
+        for pa in particles:
+            if self.arrays is not None and pa.name not in self.arrays:
+                continue
+            n = pa.get_number_of_particles(real=True)
+            idx = slice(0, n, self.stride)
+            if self.bounds is not None:
+                x, y, z = pa.get('x', 'y', 'z', only_real_particles=True)
+                b = self.bounds
+                mask = ((x >= b[0]) & (x <= b[1]) & (y >= b[2]) &
+                        (y <= b[3]) & (z >= b[4]) & (z <= b[5]))
+                idx = np.flatnonzero(mask)[::self.stride]
+            props = []
+            for prop in self.props:
+                if prop not in pa.properties or pa.stride.get(prop, 1) > 1:
+                    continue
+                arr = pa.get(prop, only_real_particles=True)
+                props.append((prop, np.array(arr[idx], dtype=self.dtype)))
+            result.append((pa.name, props))
+        return result
+
+
+class _Subscriber(object):
+    ''' A connected subscriber with its own sending thread
+
+    Only the latest frame is kept, frames are dropped if the subscriber is
+    slower than the solver so the solver never waits on the network.
+    '''
+    def __init__(self, conn, subscription):
+        self.conn = conn
+        self.subscription = subscription
+        self.alive = True
+        self.dropped = 0
+        self._queue = Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._send_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def push(self, frame):
+        try:
+            self._queue.put_nowait(frame)
+        except Full:
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except Empty:
+                pass
+            self._queue.put_nowait(frame)
+
+    def close(self):
+        self.alive = False
+        self._queue.put(None)
+
+    def _send_loop(self):
+        while self.alive:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            try:
+                self.conn.sendall(frame)
+            except (OSError, socket.error):
+                self.alive = False
+        try:
+            self.conn.close()
+        except (OSError, socket.error):
+            pass
+
+
+class StreamServer(object):
+    ''' Stream selected particle properties to subscribers over a socket
+
+    Subscribers connect to `address` and send one line of JSON with the
+    arguments of a :class:`Subscription` within `handshake_timeout` seconds.
+    Every `freq` iterations the selected data is copied in the solver thread
+    and sent as a binary frame (see `encode_frame`) by a separate thread for
+    each subscriber.  In
+    parallel the selected data is gathered on the root, which alone listens
+    for subscribers, so this must be created on all the processors.
+
+    In parallel the subscriptions are sent to all the processors only when
+    they change, along with the commands in
+    :meth:`CommandManager.sync_commands`, see :meth:`sync`.
+
+    Use :class:`pysph.solver.solver_interfaces.StreamClient` to subscribe.
+    '''
+    def __init__(self, address=('127.0.0.1', 0), comm=None,
+                 handshake_timeout=10.0):
+        self.comm = DummyComm() if comm is None else comm
+        self.handshake_timeout = handshake_timeout
+        self.rank = self.comm.Get_rank()
+        self.subscribers = []
+        self.address = None
+        self._lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        # Bumped whenever the subscribers change.
+        self._generation = 0
+        self._synced = None
+        # (subscription, subscriber) as of the last sync, the subscriber
+        # is None on the other processors.
+        self._active = []
+        if self.rank == 0:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(tuple(address))
+            sock.listen(5)
+            self._sock = sock
+            self.address = sock.getsockname()[:2]
+
+    def start(self):
+        ''' start accepting subscribers in a daemon thread '''
+        if self._sock is not None:
+            self._thread = threading.Thread(target=self._accept_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        ''' stop accepting subscribers and disconnect the existing ones '''
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except (OSError, socket.error):
+                pass
+            self._sock = None
+        with self._lock:
+            for sub in self.subscribers:
+                sub.close()
+            self.subscribers = []
+            self._generation += 1
+
+    def add_subscriber(self, conn, subscription):
+        with self._lock:
+            self.subscribers.append(_Subscriber(conn, subscription))
+            self._generation += 1
+
+    def get_generation(self):
+        ''' drop the disconnected subscribers and return a number that
+        changes whenever the subscribers change '''
+        with self._lock:
+            alive = [x for x in self.subscribers if x.alive]
+            if len(alive) != len(self.subscribers):
+                self.subscribers = alive
+                self._generation += 1
+            return self._generation
+
+    def sync(self, generation):
+        ''' send the subscriptions from the root to all the processors if
+        the `generation` (from the root's :meth:`get_generation`) changed
+        since the last call
+
+        This must be called on all the processors with the same
+        `generation`.
+        '''
+        if generation == self._synced:
+            return
+        self._synced = generation
+        subscribers = []
+        if self.rank == 0:
+            with self._lock:
+                subscribers = list(self.subscribers)
+        specs = self.comm.bcast(
+            [x.subscription.to_dict() for x in subscribers]
+        )
+        if self.rank != 0:
+            subscribers = [None]*len(specs)
+        self._active = [
+            (Subscription(**spec), sub)
+            for spec, sub in zip(specs, subscribers)
+        ]
+
+    def publish(self, solver):
+        ''' send a frame to the subscribers that are due at this iteration
+
+        This is called by the solver thread on all the processors.
+        '''
+        count = solver.count
+        info = dict(t=solver.t, dt=solver.dt, count=count)
+        if self.comm.Get_size() > 1:
+            for subscription, sub in self._active:
+                if not subscription.is_due(count):
+                    continue
+                data = subscription.select(solver.particles)
+                data = self._combine(self.comm.gather(data))
+                if sub is not None and sub.alive:
+                    sub.push(encode_frame(info, data))
+            return
+
+        with self._lock:
+            self.subscribers = [x for x in self.subscribers if x.alive]
+            due = [x for x in self.subscribers
+                   if x.subscription.is_due(count)]
+        for sub in due:
+            data = sub.subscription.select(solver.particles)
+            sub.push(encode_frame(info, data))
+
+    def _combine(self, data_from_procs):
+        if data_from_procs is None:
+            return None
+        result = []
+        for items in zip(*data_from_procs):
+            name = items[0][0]
+            props = []
+            for j, (prop, arr) in enumerate(items[0][1]):
+                props.append(
+                    (prop, np.concatenate([x[1][j][1] for x in items]))
+                )
+            result.append((name, props))
+        return result
+
+    def _accept_loop(self):
+        while self._sock is not None:
+            try:
+                conn, addr = self._sock.accept()
+            except (OSError, socket.error):
+                break
+            # A slow or silent client must not hold up the other ones.
+            thread = threading.Thread(target=self._handshake,
+                                      args=(conn, addr))
+            thread.daemon = True
+            thread.start()
+
+    def _handshake(self, conn, addr):
+        try:
+            conn.settimeout(self.handshake_timeout)
+            with conn.makefile('rb') as f:
+                request = f.readline()
+            subscription = Subscription(**json.loads(request.decode()))
+            conn.settimeout(None)
+        except Exception as e:
+            logger.warning('Invalid stream subscription from %s: %s',
+                           addr, e)
+            conn.close()
+            return
+        logger.info('Streaming %s to %s', subscription.to_dict(), addr)
+        self.add_subscriber(conn, subscription)
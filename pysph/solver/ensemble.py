@@ -0,0 +1,158 @@
+"""Run many replicas of a small case together in one solver.
+
+The particles of each replica are stacked into the same particle arrays and
+marked with the integer ``replica`` property.  Each replica is shifted along
+the x axis so that it is further from the others than the kernel support and
+no neighbors are found across the replicas.  All the replicas are then
+integrated with one compiled module in one pass over all the particles, with
+the time step being the smallest of the replicas.
+
+The output is split so that each replica is saved without the shift in its
+own directory, see :py:func:`split_replicas`.
+
+Equations that work on a whole particle array at once, i.e. those with a
+``reduce`` or ``py_initialize`` method (for example the rigid body
+equations that sum over each ``body_id``), and groups that are iterated
+to convergence would mix the replicas.  These are not supported, see
+:py:func:`check_ensemble_equations`.
+"""
+
+import os
+
+import numpy
+
+REPLICA = 'replica'
+
+
+def get_replica_dir(output_dir, replica):
+    """Return the output directory of the replica, creating it if needed.
+    """
+    path = os.path.join(output_dir, 'replica_%04d' % replica)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return path
+
+
+def get_replica_offset(particles, spacing=2.0, radius_scale=2.0):
+    """Return the distance along x between the replicas of the particles.
+
+    This is `spacing` times the extent of the particles along x plus twice
+    the largest kernel support, so there is room for the particles to move.
+    """
+    x = [pa.x for pa in particles if pa.get_number_of_particles() > 0]
+    h = [pa.h for pa in particles if pa.get_number_of_particles() > 0]
+    if not x:
+        return 0.0
+    x = numpy.concatenate(x)
+    support = radius_scale*max(numpy.max(x) for x in h)
+    return spacing*(x.max() - x.min()) + 2.0*support
+
+
+def _copy(pa):
+    return pa.extract_particles(numpy.arange(pa.get_number_of_particles()))
+
+
+def make_ensemble(particles, n_replicas, offset, perturb=None):
+    """Return particle arrays with `n_replicas` copies of the `particles`.
+
+    The particles of replica ``k`` have the ``replica`` property set to ``k``
+    and are shifted by ``k*offset`` along x.  If given, ``perturb(arrays,
+    k)`` is called with the list of particle arrays of each replica before
+    they are shifted to change the initial conditions of the replica.
+    """
+    replicas = []
+    for k in range(n_replicas):
+        arrays = [_copy(pa) for pa in particles]
+        for pa in arrays:
+            pa.add_property(REPLICA, type='int', default=k)
+            getattr(pa, REPLICA)[:] = k
+        if perturb is not None:
+            perturb(arrays, k)
+        for pa in arrays:
+            pa.x += k*offset
+        replicas.append(arrays)
+
+    result = replicas[0]
+    for arrays in replicas[1:]:
+        for dest, src in zip(result, arrays):
+            dest.append_parray(src)
+    for pa in result:
+        pa.gid[:] = numpy.arange(pa.get_number_of_particles())
+    return result
+
+
+def _walk_equations(equations):
+    from pysph.sph.equation import Group
+    for item in equations:
+        if isinstance(item, Group):
+            yield item, None
+            for result in _walk_equations(item.equations):
+                yield result
+        else:
+            yield None, item
+
+
+def check_ensemble_equations(equations):
+    """Raise a ValueError if the `equations` cannot be run as an ensemble.
+
+    The replicas share the particle arrays, so equations with a ``reduce``
+    or ``py_initialize`` method and groups with ``iterate=True`` would see
+    all of the replicas together.
+    """
+    from pysph.sph.equation import MultiStageEquations
+    if isinstance(equations, MultiStageEquations):
+        stages = equations.groups
+    else:
+        stages = [equations]
+    for stage in stages:
+        for group, equation in _walk_equations(stage):
+            if group is not None and group.iterate:
+                raise ValueError(
+                    "'--ensemble' cannot be used with iterated groups."
+                )
+            for method in ('reduce', 'py_initialize'):
+                if equation is not None and hasattr(equation, method):
+                    raise ValueError(
+                        "'--ensemble' cannot be used with %s as it has a "
+                        "'%s' method." % (equation.__class__.__name__, method)
+                    )
+
+
+def split_replicas(particles, n_replicas, offset):
+    """Return a list with the particle arrays of each replica.
+
+    The shift of the replicas is removed so each replica looks like a
+    single run of the case.
+    """
+    result = []
+    for k in range(n_replicas):
+        arrays = []
+        for pa in particles:
+            indices = numpy.where(getattr(pa, REPLICA) == k)[0]
+            replica = pa.extract_particles(indices)
+            replica.x -= k*offset
+            arrays.append(replica)
+        result.append(arrays)
+    return result
+
+
+def replica_reduce(pa, values, n_replicas, op='sum'):
+    """Reduce the `values` of the particles of `pa` over each replica.
+
+    `op` is one of 'sum', 'min' or 'max'.  Returns an array with the result
+    for each replica.  This is useful in callbacks to compute quantities
+    such as the energy of each replica.
+    """
+    replica = getattr(pa, REPLICA)
+    values = numpy.asarray(values, dtype=float)
+    if op == 'sum':
+        return numpy.bincount(replica, weights=values, minlength=n_replicas)
+    elif op == 'min':
+        result = numpy.full(n_replicas, numpy.inf)
+        numpy.minimum.at(result, replica, values)
+    elif op == 'max':
+        result = numpy.full(n_replicas, -numpy.inf)
+        numpy.maximum.at(result, replica, values)
+    else:
+        raise ValueError("Unknown reduction '%s', use sum, min or max." % op)
+    return result
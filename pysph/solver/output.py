@@ -2,6 +2,8 @@
 An interface to output the data in various format
 """
 
+import json
+import logging
 import numpy
 import os
 import sys
@@ -10,8 +12,16 @@ from pysph.base.particle_array import ParticleArray
 from pysph.base.utils import get_particles_info, get_particle_array
 from pysph import has_h5py
 
+logger = logging.getLogger(__name__)
+
 output_formats = ('hdf5', 'npz')
 COMPRESSION_LEVEL = 6
+# The codecs that may be used to compress the output, lz4 and zstd need the
+# hdf5plugin package and are only used for HDF5 files.
+COMPRESSION_CODECS = ('gzip', 'lz4', 'zstd')
+# Seed for the permutation of level-of-detail output.  A fixed seed keeps
+# the particle order the same across snapshots with the same particles.
+LOD_SEED = 0
 
 
 def _to_str(s):
@@ -50,14 +60,155 @@ def gather_array_data(all_array_data, comm):
     return all_array_data
 
 
+def _get_num_particles(array_data, properties):
+    """Return the number of particles in the given output array data.
+    """
+    for prop, data in array_data.items():
+        stride = properties[prop].get('stride', 1)
+        return len(data)//max(stride, 1)
+    return 0
+
+
+def _select_rows(data, stride, index):
+    """Select the particles given by `index` (an index array or a slice) from
+    the data of a property with the given stride.
+    """
+    if stride > 1:
+        n = len(data)//stride
+        return numpy.asarray(data[:n*stride]).reshape(n, stride)[index].ravel()
+    else:
+        return data[index]
+
+
+def _get_load_count(n, fraction):
+    return min(n, int(numpy.ceil(n*fraction)))
+
+
+def _get_quantize_tolerance(enc):
+    kind, _, tol = enc.partition(':')
+    try:
+        tol = float(tol)
+    except ValueError:
+        tol = None
+    if kind != 'quantize' or tol is None or not 0.0 < tol < 1.0:
+        raise ValueError(
+            "Unknown output encoding '%s', use 'float32' or 'quantize:tol' "
+            "with tol in (0, 1)." % enc
+        )
+    return tol
+
+
+def parse_encoding(specs):
+    """Parse the encodings of the output properties.
+
+    Each spec is a string ``'props=encoding'`` where `props` is a comma
+    separated list of property names, or ``*`` for all the floating point
+    properties, and `encoding` is one of:
+
+    - ``float32``: save the values in single precision.
+    - ``quantize:tol``: save the values as integers with a step that is
+      `tol` times the range of the values of the property in the snapshot,
+      e.g. the extent of the particles for the positions or about twice the
+      largest speed for the velocities.  The error is at most half a step.
+
+    Returns a dictionary mapping the property names to the encodings.
+    """
+    encoding = {}
+    for spec in specs:
+        props, sep, enc = spec.partition('=')
+        enc = enc.strip()
+        if not sep or not props.strip():
+            raise ValueError(
+                "Output encoding '%s' should be 'props=encoding'." % spec
+            )
+        if enc != 'float32':
+            _get_quantize_tolerance(enc)
+        for prop in props.split(','):
+            encoding[prop.strip()] = enc
+    return encoding
+
+
+def _shuffle(data):
+    # Group the n-th bytes of all the values together, this makes the
+    # slowly changing high bytes of floats compress much better.
+    itemsize = data.dtype.itemsize
+    return numpy.ascontiguousarray(
+        data.view(numpy.uint8).reshape(-1, itemsize).T
+    ).ravel()
+
+
+def _unshuffle(data, dtype):
+    dtype = numpy.dtype(dtype)
+    data = numpy.asarray(data, dtype=numpy.uint8)
+    return numpy.ascontiguousarray(
+        data.reshape(dtype.itemsize, -1).T
+    ).view(dtype).ravel()
+
+
+def encode_property(data, enc=None, shuffle=False):
+    """Encode the data of a property with the given encoding, see
+    :py:func:`parse_encoding`, and byte shuffle it if `shuffle` is True.
+
+    Returns the encoded data and a list of the steps to decode it, which is
+    empty if the data is unchanged.
+    """
+    data = numpy.asarray(data)
+    steps = []
+    if enc == 'float32':
+        data = data.astype(numpy.float32)
+        steps.append(dict(kind='float32'))
+    elif enc is not None and len(data) > 0:
+        tol = _get_quantize_tolerance(enc)
+        lo, hi = float(data.min()), float(data.max())
+        step = tol*(hi - lo) if hi > lo else 1.0
+        q = numpy.rint((data - lo)/step)
+        for dtype in (numpy.uint8, numpy.uint16, numpy.uint32, numpy.uint64):
+            if q.max() <= numpy.iinfo(dtype).max:
+                break
+        data = q.astype(dtype)
+        steps.append(dict(kind='quantize', offset=lo, step=step))
+    if shuffle and data.dtype.itemsize > 1:
+        steps.append(dict(kind='shuffle', dtype=data.dtype.str))
+        data = _shuffle(data)
+    return data, steps
+
+
+def decode_property(data, steps):
+    """Decode the data of a property encoded by
+    :py:func:`encode_property`.
+    """
+    for info in reversed(steps):
+        kind = info['kind']
+        if kind == 'shuffle':
+            data = _unshuffle(data, info['dtype'])
+        elif kind == 'quantize':
+            data = info['offset'] + numpy.asarray(data, dtype=float)*\
+                info['step']
+        elif kind == 'float32':
+            data = numpy.asarray(data, dtype=float)
+    return data
+
+
 class Output(object):
-    """ Class that handles output for simulation """
+    """ Class that handles output for simulation
+
+    If `lod` is True, the particles of each array are saved in a random
+    order which is marked in the file.  Any prefix of the saved particles is
+    then a uniform subsample of the array, so a viewer can load a fraction
+    of a large snapshot quickly, see :py:func:`load`.
+
+    The `encoding` maps property names to a reduced precision encoding, see
+    :py:func:`parse_encoding`, and `compress` may be True or one of the
+    COMPRESSION_CODECS.  The data is decoded when loaded.
+    """
     def __init__(self, detailed_output=False, only_real=True, mpi_comm=None,
-                 compress=False):
+                 compress=False, lod=False, encoding=None):
         self.compress = compress
         self.detailed_output = detailed_output
         self.only_real = only_real
         self.mpi_comm = mpi_comm
+        self.lod = lod
+        self.encoding = encoding
 
     def dump(self, fname, particles, solver_data):
         self.particle_data = dict(get_particles_info(particles))
@@ -74,11 +225,67 @@ class Output(object):
             )
         self.solver_data = solver_data
         if mpi_comm is None or mpi_comm.Get_rank() == 0:
+            if self.lod:
+                self._permute_for_lod()
+            if self.encoding or self._shuffle_in_numpy():
+                self._encode()
             self._dump(fname)
 
-    def load(self, fname):
+    def load(self, fname, fraction=None):
+        """Load the file, if `fraction` is given only that fraction of the
+        particles in each array are loaded.
+        """
+        if fraction is not None and not 0.0 < fraction <= 1.0:
+            raise ValueError('fraction must be in (0, 1], got %s' % fraction)
+        self.fraction = fraction
         return self._load(fname)
 
+    def _permute_for_lod(self):
+        for name, array_data in self.all_array_data.items():
+            properties = self.particle_data[name]['properties']
+            n = _get_num_particles(array_data, properties)
+            perm = numpy.random.RandomState(LOD_SEED).permutation(n)
+            for prop, data in array_data.items():
+                stride = properties[prop].get('stride', 1)
+                array_data[prop] = _select_rows(data, stride, perm)
+            self.particle_data[name]['lod'] = True
+
+    def _shuffle_in_numpy(self):
+        """Return True if the data is to be byte shuffled before it is
+        saved, i.e. when the file format has no shuffle filter.
+        """
+        return False
+
+    def _encode(self):
+        encoding = self.encoding or {}
+        shuffle = self._shuffle_in_numpy()
+        for name, array_data in self.all_array_data.items():
+            properties = self.particle_data[name]['properties']
+            for prop, data in array_data.items():
+                enc = encoding.get(prop, encoding.get('*'))
+                if properties[prop]['type'] not in ('double', 'float'):
+                    enc = None
+                data, steps = encode_property(data, enc, shuffle)
+                if steps:
+                    array_data[prop] = data
+                    properties[prop]['encoding'] = steps
+
+    def _get_subset(self, n, lod):
+        """Return the index to select the particles to load out of `n` or
+        None if all are to be loaded.
+
+        For level-of-detail output the leading particles are used, otherwise
+        every few particles are picked.
+        """
+        fraction = getattr(self, 'fraction', None)
+        if fraction is None or fraction >= 1.0 or n == 0:
+            return None
+        if lod:
+            return slice(0, _get_load_count(n, fraction))
+        else:
+            step = max(1, int(round(1.0/fraction)))
+            return slice(0, n, step)
+
     def _dump(self, fname):
         """ Implement the method for writing the output to a file here """
         raise NotImplementedError()
@@ -116,6 +323,9 @@ def _get_dict_from_arrays(arrays):
 
 class NumpyOutput(Output):
 
+    def _shuffle_in_numpy(self):
+        return bool(self.compress)
+
     def _dump(self, filename):
         save_method = numpy.savez_compressed if self.compress else numpy.savez
         output_data = {"particles": self.particle_data,
@@ -147,8 +357,22 @@ class NumpyOutput(Output):
             particles = _get_dict_from_arrays(data["particles"])
 
             for array_name, array_info in particles.items():
-                for prop, data in array_info['arrays'].items():
-                    array_info['properties'][prop]['data'] = data
+                props = array_info['properties']
+                arrays = array_info['arrays']
+                for prop, data in arrays.items():
+                    steps = props[prop].pop('encoding', None)
+                    if steps:
+                        arrays[prop] = decode_property(data, steps)
+                index = self._get_subset(
+                    _get_num_particles(arrays, props),
+                    array_info.get('lod', False)
+                )
+                for prop, data in arrays.items():
+                    if index is not None:
+                        data = _select_rows(
+                            data, props[prop].get('stride', 1), index
+                        )
+                    props[prop]['data'] = data
                 array = ParticleArray(name=array_name,
                                       constants=array_info["constants"],
                                       **array_info["properties"])
@@ -171,6 +395,7 @@ class HDFOutput(Output):
             particles_grp = f.create_group('particles')
             for ptype, pdata in self.particle_data.items():
                 ptype_grp = particles_grp.create_group(ptype)
+                ptype_grp.attrs['lod'] = pdata.get('lod', False)
                 arrays_grp = ptype_grp.create_group('arrays')
                 data = self.all_array_data[ptype]
                 self._set_constants(pdata, ptype_grp)
@@ -183,6 +408,11 @@ class HDFOutput(Output):
         else:
             msg = "Install python-h5py to load this file"
             raise ImportError(msg)
+        try:
+            # Registers the filters to read lz4 or zstd compressed files.
+            import hdf5plugin  # noqa: F401
+        except ImportError:
+            pass
 
         ret = {}
         with h5py.File(fname, 'r') as f:
@@ -201,6 +431,10 @@ class HDFOutput(Output):
             arrays_grp = prop_array['arrays']
             constants = self._get_constants(const_grp)
             array = ParticleArray(_to_str(name), constants=constants)
+            index = self._get_subset(
+                self._get_num_particles(arrays_grp),
+                prop_array.attrs.get('lod', False)
+            )
 
             for pname, h5obj in arrays_grp.items():
                 prop_name = _to_str(h5obj.attrs['name'])
@@ -209,10 +443,23 @@ class HDFOutput(Output):
                 stride = h5obj.attrs.get('stride', 1)
                 if h5obj.attrs['stored']:
                     output_array.append(_to_str(pname))
+                    if index is None:
+                        data = numpy.array(h5obj)
+                    elif stride > 1:
+                        data = _select_rows(
+                            h5obj[:index.stop*stride], stride, index
+                        )
+                    else:
+                        # This only reads the selected part of the file.
+                        data = h5obj[index]
+                    steps = h5obj.attrs.get('encoding')
+                    if steps is not None:
+                        data = decode_property(
+                            data, json.loads(_to_str(steps))
+                        )
                     array.add_property(
                         prop_name, type=type_, default=default,
-                        data=numpy.array(h5obj),
-                        stride=stride
+                        data=data, stride=stride
                     )
                 else:
                     array.add_property(prop_name, type=type_, stride=stride)
@@ -220,6 +467,13 @@ class HDFOutput(Output):
             particles[str(name)] = array
         return particles
 
+    def _get_num_particles(self, arrays_grp):
+        for h5obj in arrays_grp.values():
+            if h5obj.attrs['stored']:
+                stride = max(h5obj.attrs.get('stride', 1), 1)
+                return h5obj.shape[0]//stride
+        return 0
+
     def _get_solver_data(self, grp):
         solver_data = {}
         for name, value in grp.attrs.items():
@@ -233,11 +487,28 @@ class HDFOutput(Output):
         return constants
 
     def _get_compress_options(self):
-        if self.compress:
-            return dict(compression="gzip",
-                        compression_opts=COMPRESSION_LEVEL)
-        else:
+        if not self.compress:
             return {}
+        codec = 'gzip' if self.compress is True else self.compress
+        if codec not in COMPRESSION_CODECS:
+            raise ValueError(
+                'Unknown compression %r, use one of %s' %
+                (codec, ', '.join(COMPRESSION_CODECS))
+            )
+        if codec != 'gzip':
+            try:
+                import hdf5plugin
+            except ImportError:
+                logger.warning(
+                    'hdf5plugin is needed for %s compression, using gzip.',
+                    codec
+                )
+                self.compress = 'gzip'
+            else:
+                plugin = hdf5plugin.LZ4 if codec == 'lz4' else hdf5plugin.Zstd
+                return dict(plugin(), shuffle=True)
+        return dict(compression="gzip", compression_opts=COMPRESSION_LEVEL,
+                    shuffle=True)
 
     def _set_constants(self, pdata, ptype_grp):
         pconstants = pdata['constants']
@@ -260,6 +531,8 @@ class HDFOutput(Output):
             for attname, value in attributes.items():
                 if value is None:
                     value = 'None'
+                elif attname == 'encoding':
+                    value = json.dumps(value)
                 prop.attrs[attname] = value
 
     def _set_solver_data(self, grp):
@@ -267,7 +540,7 @@ class HDFOutput(Output):
             grp.attrs[name] = data
 
 
-def load(fname):
+def load(fname, fraction=None):
     """
     Load the output data
 
@@ -275,6 +548,12 @@ def load(fname):
     ----------
     fname: str
         Name of the file or full path
+    fraction: float
+        Load only this fraction (in (0, 1]) of the particles of each array.
+        For files dumped with `lod=True` this is a random subsample, read
+        without loading the rest of the particles for HDF5 files.  For other
+        files every few particles are picked.  Loads all the particles if
+        None.
 
 
     Examples
@@ -297,14 +576,15 @@ def load(fname):
     elif fname.endswith('hdf5'):
         output = HDFOutput()
     if os.path.isfile(fname):
-        return output.load(fname)
+        return output.load(fname, fraction)
     else:
         msg = "File not present"
         raise RuntimeError(msg)
 
 
 def dump(filename, particles, solver_data, detailed_output=False,
-         only_real=True, mpi_comm=None, compress=False):
+         only_real=True, mpi_comm=None, compress=False, lod=False,
+         encoding=None):
 
     """
     Dump the given particles and solver data to the given filename.
@@ -330,8 +610,20 @@ def dump(filename, particles, solver_data, detailed_output=False,
     mpi_comm: mpi4pi.MPI.Intracomm
         An MPI communicator to use for parallel commmunications.
 
-    compress: bool
-        Specify if the  file is to be compressed or not.
+    compress: bool or str
+        Specify if the  file is to be compressed or not.  One of
+        COMPRESSION_CODECS may be given, lz4 and zstd are only used for HDF5
+        files when hdf5plugin is installed, gzip is used otherwise.  The
+        floating point data is byte shuffled to compress better.
+
+    lod: bool
+        Save the particles in a random order so a fraction of them can be
+        loaded as a representative subsample, see :py:func:`load`.
+
+    encoding: dict
+        Save the properties with a reduced precision, a dictionary mapping
+        the property names (or ``*`` for all) to the encodings, see
+        :py:func:`parse_encoding`.
 
     If `mpi_comm` is not passed or is set to None the local particles alone
     are dumped, otherwise only rank 0 dumps the output.
@@ -344,9 +636,13 @@ def dump(filename, particles, solver_data, detailed_output=False,
         filename = fname + '.hdf5'
     if filename.endswith('hdf5') and has_h5py():
         file_format = 'hdf5'
-        output = HDFOutput(detailed_output, only_real, mpi_comm, compress)
+        output = HDFOutput(
+            detailed_output, only_real, mpi_comm, compress, lod, encoding
+        )
     else:
-        output = NumpyOutput(detailed_output, only_real, mpi_comm, compress)
+        output = NumpyOutput(
+            detailed_output, only_real, mpi_comm, compress, lod, encoding
+        )
         file_format = 'npz'
     filename = fname + '.' + file_format
     output.dump(filename, particles, solver_data)
@@ -7,10 +7,13 @@ import numpy
 from compyle.profile import profile, profile_ctx
 # PySPH imports
 from pysph.base.kernels import CubicSpline
-from pysph.sph.acceleration_eval import make_acceleration_evals
+from pysph.sph.acceleration_eval import (
+    make_acceleration_evals, remove_unused_props
+)
 from pysph.sph.sph_compiler import SPHCompiler
 
 from pysph.solver.utils import ProgressBar, load, dump
+from pysph.solver.ensemble import get_replica_dir, split_replicas
 
 import logging
 logger = logging.getLogger(__name__)
@@ -116,6 +119,20 @@ class Solver(object):
 
         # Compress generated files.
         self.compress_output = False
+
+        # Dump the particles in a random order for partial loading.
+        self.lod_output = False
+
+        # The reduced precision encodings of the output properties.
+        self.output_encoding = None
+
+        # The number of replicas and their offset for an ensemble run.
+        self.ensemble = None
+
+        # Remove the properties that are not used.
+        self.prune_props = False
+        self.removed_props = {}
+
         self.disable_output = False
 
         # the process id for parallel runs
@@ -204,6 +221,10 @@ class Solver(object):
         self.acceleration_evals = make_acceleration_evals(
             particles, equations, self.kernel, mode
         )
+        if self.prune_props:
+            self.removed_props = remove_unused_props(
+                self.acceleration_evals, self.integrator
+            )
 
         sph_compiler = SPHCompiler(
             self.acceleration_evals, self.integrator
@@ -211,10 +232,7 @@ class Solver(object):
         sph_compiler.compile()
 
         # Set the nnps for all concerned objects.
-        self.nnps = nnps
-        for ae in self.acceleration_evals:
-            ae.set_nnps(nnps)
-        self.integrator.set_nnps(nnps)
+        self.set_nnps(nnps)
 
         # set the parallel manager for the integrator
         self.integrator.set_parallel_manager(self.pm)
@@ -386,6 +404,36 @@ class Solver(object):
         """
         self.compress_output = compress
 
+    def set_lod_output(self, lod):
+        """Dump the particles in a random order so viewers can load a
+        representative fraction of them quickly.
+        """
+        self.lod_output = lod
+
+    def set_ensemble(self, n_replicas, offset):
+        """Set the number of replicas of the case in the particles and the
+        distance along x between them, see :py:mod:`pysph.solver.ensemble`.
+        Each replica is then dumped in its own directory.
+        """
+        self.ensemble = (n_replicas, offset)
+
+    def set_output_encoding(self, encoding):
+        """Set the reduced precision encodings of the dumped properties, a
+        dictionary of property names to encodings, see
+        :py:func:`pysph.solver.output.parse_encoding`.
+        """
+        self.output_encoding = encoding
+
+    def set_prune_props(self, prune):
+        """Remove the properties of the particles that are not used by the
+        equations, the integrator or the output when the solver is setup.
+
+        This saves memory but any other code that uses the removed
+        properties, like a tool or a callback, will fail.  The removed
+        properties are saved in the `removed_props` attribute.
+        """
+        self.prune_props = prune
+
     def set_parallel_output_mode(self, mode="collected"):
         """Set the default solver dump mode in parallel.
 
@@ -410,6 +458,15 @@ class Solver(object):
         self.execute_commands = callable
         self.command_interval = command_interval
 
+    def set_nnps(self, nnps):
+        """Set the NNPS used by the acceleration evaluators and the
+        integrator.  This may be changed after the solver is setup.
+        """
+        self.nnps = nnps
+        for ae in self.acceleration_evals:
+            ae.set_nnps(nnps)
+        self.integrator.set_nnps(nnps)
+
     def set_parallel_manager(self, pm):
         self.pm = pm
 
@@ -567,10 +624,26 @@ class Solver(object):
         if self.parallel_output_mode == "collected" and self.in_parallel:
             comm = self.comm
 
-        dump(fname, self.particles, self._get_solver_data(),
-             detailed_output=self.detailed_output,
-             only_real=self.output_only_real, mpi_comm=comm,
-             compress=self.compress_output)
+        kw = dict(
+            detailed_output=self.detailed_output,
+            only_real=self.output_only_real, mpi_comm=comm,
+            compress=self.compress_output, lod=self.lod_output,
+            encoding=self.output_encoding
+        )
+        if self.ensemble is None:
+            dump(fname, self.particles, self._get_solver_data(), **kw)
+        else:
+            self._dump_replicas(fname, kw)
+
+    def _dump_replicas(self, fname, kw):
+        n_replicas, offset = self.ensemble
+        dirname, basename = os.path.split(fname)
+        replicas = split_replicas(self.particles, n_replicas, offset)
+        for k, particles in enumerate(replicas):
+            solver_data = self._get_solver_data()
+            solver_data['replica'] = k
+            dump(os.path.join(get_replica_dir(dirname, k), basename),
+                 particles, solver_data, **kw)
 
     def load_output(self, count):
         """Load particle data from dumped output file.
@@ -1,3 +1,4 @@
+import json
 import threading
 import os
 import socket
@@ -13,6 +14,10 @@ except ImportError:
 
 from multiprocessing.managers import BaseManager, BaseProxy
 
+from pysph.solver.controller import (
+    FRAME_HEADER, decode_frame, get_frame_payload_size
+)
+
 
 def get_authkey_bytes(authkey):
     if isinstance(authkey, bytes):
@@ -102,6 +107,53 @@ class MultiprocessingClient(BaseManager):
         return thr
 
 
+class StreamClient(object):
+    """ A client subscribing to the frames streamed by a solver
+
+    The solver must have a :class:`pysph.solver.controller.StreamServer`,
+    for example started with the ``--stream`` option of the application.
+    The keyword arguments are those of
+    :class:`pysph.solver.controller.Subscription`.
+
+    Usage::
+
+        client = StreamClient(('127.0.0.1', 8900), props=['x', 'y', 'p'],
+                              freq=10, stride=4)
+        info, data = client.recv()
+        p = data['fluid']['p']
+    """
+    def __init__(self, address, props, timeout=None, **kw):
+        subscription = dict(kw, props=list(props))
+        self.sock = socket.create_connection(tuple(address), timeout)
+        self.sock.sendall((json.dumps(subscription) + '\n').encode('utf-8'))
+
+    def _read(self, n):
+        buf = bytearray(n)
+        view = memoryview(buf)
+        pos = 0
+        while pos < n:
+            nbytes = self.sock.recv_into(view[pos:], n - pos)
+            if nbytes == 0:
+                raise EOFError('Stream closed by the solver.')
+            pos += nbytes
+        return bytes(buf)
+
+    def recv(self):
+        """ Block until the next frame is received and return it
+
+        Returns the solver info (a dict with 't', 'dt' and 'count') and a
+        dict of particle array name to a dict of the property arrays.
+        Raises EOFError when the solver closes the stream.
+        """
+        size = FRAME_HEADER.unpack(self._read(FRAME_HEADER.size))[0]
+        header = self._read(size)
+        payload = self._read(get_frame_payload_size(header))
+        return decode_frame(header, payload)
+
+    def close(self):
+        self.sock.close()
+
+
 class CrossDomainXMLRPCRequestHandler(SimpleXMLRPCRequestHandler,
                                       SimpleHTTPRequestHandler):
     """ SimpleXMLRPCRequestHandler subclass which attempts to do CORS
@@ -13,10 +13,13 @@ except ImportError:
 
 import os
 import shutil
+import subprocess
 import sys
 from tempfile import mkdtemp
 import time
 
+import numpy as np
+
 from pysph.solver.application import Application
 from pysph.solver.solver import Solver
 from pysph.solver.utils import get_free_port
@@ -166,3 +169,226 @@ class TestApplication(TestCase):
             port1 = get_free_port(9000)
             count += 1
         self.assertEqual(port1, port)
+
+
+class TestAutoNNPS(TestCase):
+
+    def setUp(self):
+        self.output_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_auto_nnps_is_selected_and_rechecked(self):
+        # Given
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '1e-4', '--disable-output',
+                '-q', '--nx', '20', '--nnps', 'auto',
+                '--nnps-recheck-freq', '1']
+
+        # When
+        app.run(args)
+
+        # Then
+        self.assertIs(app.solver.nnps, app.nnps)
+        for ae in app.solver.acceleration_evals:
+            self.assertIs(ae.nnps, app.nnps)
+        n = app.particles[0].get_number_of_particles()
+        self.assertEqual(app._nnps_workload, (n, 1.0))
+
+        # When
+        nnps = app.nnps
+        app._check_nnps_workload(app.solver)
+
+        # Then
+        self.assertIs(app.nnps, nnps)
+
+        # When
+        pa = app.particles[0]
+        pa.h[:n//2] *= 2.0
+        app._check_nnps_workload(app.solver)
+
+        # Then
+        self.assertIsNot(app.nnps, nnps)
+        self.assertIs(app.solver.nnps, app.nnps)
+        self.assertAlmostEqual(app._nnps_workload[1], 2.0)
+
+    def test_auto_nnps_does_not_evaluate_equations(self):
+        # Given
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '1e-4', '--disable-output',
+                '-q', '--nx', '20', '--nnps', 'auto']
+        app.run(args)
+        pa = app.particles[0]
+        props = ('au', 'av', 'arho', 'x', 'u')
+        expect = [pa.get(x).copy() for x in props]
+
+        # When
+        app._select_nnps()
+
+        # Then
+        for prop, value in zip(props, expect):
+            np.testing.assert_array_equal(pa.get(prop), value)
+
+
+class TestLazyImports(TestCase):
+
+    def test_nnps_classes_are_found_by_name(self):
+        # Given
+        from pysph.base import nnps
+        from pysph.solver.application import NNPS_CLASSES, get_nnps_class
+
+        # When/Then
+        for name, (module, cls_name) in NNPS_CLASSES.items():
+            self.assertIs(get_nnps_class(name), getattr(nnps, cls_name))
+
+    def test_importing_application_does_not_import_nnps(self):
+        # Given
+        code = ('import sys; import pysph.solver.application; '
+                'assert "pysph.base.nnps_base" not in sys.modules; '
+                'assert "pysph.sph.equation" not in sys.modules')
+
+        # When/Then
+        subprocess.check_call([sys.executable, '-c', code])
+
+
+class TestCompileOnly(TestCase):
+
+    def setUp(self):
+        self.output_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_compile_only_does_not_run(self):
+        # Given
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '4e-4', '--disable-output',
+                '-q', '--nx', '10']
+
+        # When/Then
+        with self.assertRaises(SystemExit):
+            app.run(args + ['--compile-only'])
+        self.assertEqual(app.solver.count, 0)
+        self.assertFalse(app.read_info(self.output_dir)['completed'])
+
+        # When
+        app = EllipticalDrop(fname='drop')
+        app.run(args)
+
+        # Then
+        info = app.read_info(self.output_dir)
+        self.assertTrue(info['completed'])
+        self.assertEqual(info['n_steps'], app.solver.count)
+        self.assertEqual(info['n_particles'], {'fluid': 316})
+
+
+class TestNNPSStats(TestCase):
+
+    def setUp(self):
+        self.output_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_nnps_stats_are_saved(self):
+        # Given
+        import json
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '4e-4', '--disable-output',
+                '-q', '--nx', '10', '--nnps-stats', '2']
+
+        # When
+        app.run(args)
+
+        # Then
+        fname = os.path.join(self.output_dir, 'nnps_stats.json')
+        with open(fname) as f:
+            data = json.load(f)
+        stats = data['ranks'][0]
+        self.assertEqual([x['count'] for x in stats[:2]], [2, 4])
+        self.assertEqual(stats[-1]['count'], app.solver.count)
+        pair = stats[0]['pairs'][0]
+        self.assertEqual((pair['dst'], pair['src']), ('fluid', 'fluid'))
+        n = app.particles[0].get_number_of_particles()
+        self.assertEqual(pair['n_dst'], n)
+        self.assertEqual(sum(pair['neighbors']['histogram']), n)
+        self.assertTrue(0 < pair['accept_ratio'] <= 1)
+        self.assertGreater(stats[-1]['update_time']['count'], 0)
+
+        self.assertEqual(stats[0]['nnps'], 'LinkedListNNPS')
+        self.assertEqual(pair['cells']['kind'], 'cells')
+        self.assertEqual(pair['cells']['total'], n)
+
+        # When
+        app1 = EllipticalDrop(fname='drop')
+        app1.run(args[:-2])
+
+        # Then
+        # The statistics are collected from the solver's NNPS after its own
+        # updates, only the final statistics need another update.
+        self.assertEqual(app.nnps.n_updates, app1.nnps.n_updates + 1)
+        self.assertEqual(stats[-1]['update_time']['count'],
+                         app.nnps.n_updates)
+        self.assertLess(stats[0]['update_time']['count'],
+                        stats[1]['update_time']['count'])
+        np.testing.assert_array_equal(app.particles[0].x,
+                                      app1.particles[0].x)
+
+    def test_nnps_stats_report_the_leaves_of_a_tree(self):
+        # Given
+        import json
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '4e-4', '--disable-output',
+                '-q', '--nx', '10', '--nnps-stats', '2', '--nnps', 'tree']
+
+        # When
+        app.run(args)
+
+        # Then
+        fname = os.path.join(self.output_dir, 'nnps_stats.json')
+        with open(fname) as f:
+            data = json.load(f)
+        stats = data['ranks'][0]
+        self.assertEqual(stats[0]['nnps'], 'OctreeNNPS')
+        cells = stats[0]['pairs'][0]['cells']
+        self.assertEqual(cells['kind'], 'leaves')
+        self.assertLessEqual(cells['max'], cells['leaf_max_particles'])
+        n = app.particles[0].get_number_of_particles()
+        self.assertEqual(cells['total'], n)
+
+
+class TestReportMemory(TestCase):
+
+    def setUp(self):
+        self.output_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_memory_is_reported_and_unused_props_removed(self):
+        # Given
+        import json
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '1e-4', '--disable-output',
+                '-q', '--nx', '10', '--report-memory', '--prune-properties']
+
+        # When
+        app.run(args)
+
+        # Then
+        fname = os.path.join(self.output_dir, 'memory_report.json')
+        with open(fname) as f:
+            report = json.load(f)['ranks'][0]['fluid']
+        self.assertEqual(report['removed'], ['div'])
+        self.assertEqual(report['unused'], [])
+        self.assertNotIn('div', report['properties'])
+        n = app.particles[0].get_number_of_particles()
+        self.assertEqual(report['properties']['rho'], 8*n)
+        self.assertNotIn('div', app.particles[0].properties)
@@ -0,0 +1,233 @@
+import socket
+import time
+import unittest
+
+import numpy as np
+
+from pysph.base.utils import get_particle_array
+from pysph.solver.controller import (
+    CommandManager, FRAME_HEADER, StreamServer, Subscription, decode_frame,
+    encode_frame
+)
+from pysph.solver.solver_interfaces import StreamClient
+
+
+class FakeSolver(object):
+    def __init__(self, particles):
+        self.particles = particles
+        self.t = 0.0
+        self.dt = 0.1
+        self.count = 0
+
+
+class FakeParallelComm(object):
+    """The root of a two processor run where both have the same data."""
+    def __init__(self):
+        self.nbcast = 0
+
+    def Get_size(self):
+        return 2
+
+    def Get_rank(self):
+        return 0
+
+    def bcast(self, data):
+        self.nbcast += 1
+        return data
+
+    def gather(self, data):
+        return [data, data]
+
+
+def _wait_for_subscribers(server, n=1):
+    for i in range(100):
+        if len(server.subscribers) >= n:
+            break
+        time.sleep(0.05)
+
+
+def _make_particles():
+    x = np.linspace(0, 1, 11)
+    fluid = get_particle_array(name='fluid', x=x, p=x*2)
+    solid = get_particle_array(name='solid', x=x[:3], p=x[:3])
+    return [fluid, solid]
+
+
+class TestStreaming(unittest.TestCase):
+    def test_frame_round_trip(self):
+        # Given
+        data = [('fluid', [('x', np.arange(3.0)),
+                           ('tag', np.arange(3, dtype=np.int32))]),
+                ('solid', [])]
+        info = dict(t=1.0, count=3)
+
+        # When
+        frame = encode_frame(info, data)
+        size = FRAME_HEADER.unpack(frame[:FRAME_HEADER.size])[0]
+        header = frame[FRAME_HEADER.size:FRAME_HEADER.size + size]
+        payload = frame[FRAME_HEADER.size + size:]
+        info1, data1 = decode_frame(header, payload)
+
+        # Then
+        self.assertEqual(info1, info)
+        np.testing.assert_array_equal(data1['fluid']['x'], np.arange(3.0))
+        self.assertEqual(data1['fluid']['tag'].dtype, np.int32)
+        self.assertEqual(data1['solid'], {})
+
+    def test_subscription_selects_decimated_region(self):
+        # Given
+        particles = _make_particles()
+        sub = Subscription(props=['x', 'p', 'junk'], arrays=['fluid'],
+                           stride=2, bounds=[0.15, 1, -1, 1, -1, 1],
+                           dtype='float32')
+
+        # When
+        data = sub.select(particles)
+
+        # Then
+        self.assertEqual(len(data), 1)
+        name, props = data[0]
+        self.assertEqual(name, 'fluid')
+        self.assertEqual([x[0] for x in props], ['x', 'p'])
+        x = props[0][1]
+        self.assertEqual(x.dtype, np.float32)
+        np.testing.assert_allclose(x, [0.2, 0.4, 0.6, 0.8, 1.0], rtol=1e-6)
+
+        # When
+        particles[0].x[:] = -1.0
+
+        # Then
+        np.testing.assert_allclose(props[0][1][0], 0.2, rtol=1e-6)
+
+    def test_server_streams_to_subscriber(self):
+        # Given
+        solver = FakeSolver(_make_particles())
+        server = StreamServer()
+        server.start()
+        self.addCleanup(server.stop)
+        cm = CommandManager(solver)
+        cm.add_stream_server(server)
+        client = StreamClient(cm.get_stream_address(), props=['p'],
+                              arrays=['fluid'], freq=2, timeout=10)
+        self.addCleanup(client.close)
+        for i in range(100):
+            if server.subscribers:
+                break
+            time.sleep(0.05)
+
+        # When
+        cm.execute_commands(solver)
+        info, data = client.recv()
+
+        # Then
+        self.assertEqual(info['count'], 0)
+        self.assertEqual(list(data.keys()), ['fluid'])
+        np.testing.assert_allclose(data['fluid']['p'],
+                                   np.linspace(0, 2, 11))
+
+        # When
+        for count in (1, 2):
+            solver.count = count
+            solver.t = count*0.1
+            cm.execute_commands(solver)
+        info, data = client.recv()
+
+        # Then
+        self.assertEqual(info['count'], 2)
+        self.assertAlmostEqual(info['t'], 0.2)
+
+    def test_silent_client_does_not_block_subscribers(self):
+        # Given
+        server = StreamServer(handshake_timeout=0.5)
+        server.start()
+        self.addCleanup(server.stop)
+        silent = socket.create_connection(tuple(server.address))
+        self.addCleanup(silent.close)
+
+        # When
+        client = StreamClient(server.address, props=['p'], timeout=10)
+        self.addCleanup(client.close)
+        for i in range(20):
+            if server.subscribers:
+                break
+            time.sleep(0.05)
+
+        # Then
+        self.assertEqual(len(server.subscribers), 1)
+
+        # When
+        silent.settimeout(5.0)
+
+        # Then
+        # The silent client is disconnected after the handshake timeout.
+        self.assertEqual(silent.recv(1), b'')
+        self.assertEqual(len(server.subscribers), 1)
+
+    def test_subscription_dtype_must_be_numeric(self):
+        # When/Then
+        with self.assertRaises(TypeError):
+            Subscription(props=['p'], dtype='bogus')
+        with self.assertRaises(ValueError):
+            Subscription(props=['p'], dtype='O')
+        self.assertEqual(Subscription(props=['p'], dtype='f4').dtype,
+                         'float32')
+
+    def test_invalid_subscription_is_rejected(self):
+        # Given
+        server = StreamServer()
+        server.start()
+        self.addCleanup(server.stop)
+
+        # When
+        client = StreamClient(server.address, props=['p'], dtype='bogus',
+                              timeout=5)
+        self.addCleanup(client.close)
+
+        # Then
+        with self.assertRaises(EOFError):
+            client.recv()
+        self.assertEqual(server.subscribers, [])
+
+    def test_parallel_subscriptions_are_sent_when_changed(self):
+        # Given
+        comm = FakeParallelComm()
+        solver = FakeSolver(_make_particles())
+        server = StreamServer(comm=comm)
+        server.start()
+        self.addCleanup(server.stop)
+        cm = CommandManager(solver, comm)
+        cm.add_stream_server(server)
+
+        # When
+        for count in range(5):
+            solver.count = count
+            cm.execute_commands(solver)
+
+        # Then
+        # One broadcast per step for the commands and one for the
+        # initial (empty) subscriptions.
+        self.assertEqual(comm.nbcast, 6)
+
+        # When
+        client = StreamClient(server.address, props=['p'],
+                              arrays=['fluid'], timeout=10)
+        self.addCleanup(client.close)
+        _wait_for_subscribers(server)
+        solver.count = 5
+        cm.execute_commands(solver)
+        info, data = client.recv()
+
+        # Then
+        self.assertEqual(comm.nbcast, 8)
+        self.assertEqual(info['count'], 5)
+        np.testing.assert_allclose(
+            data['fluid']['p'], np.tile(np.linspace(0, 2, 11), 2)
+        )
+
+    def test_stream_address_is_none_without_server(self):
+        cm = CommandManager(FakeSolver([]))
+        self.assertIsNone(cm.get_stream_address())
+
+
+if __name__ == '__main__':
+    unittest.main()
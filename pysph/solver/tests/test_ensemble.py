@@ -0,0 +1,130 @@
+import os
+import shutil
+from tempfile import mkdtemp
+import unittest
+
+import numpy as np
+
+from pysph.base.utils import get_particle_array
+from pysph.solver.ensemble import (
+    check_ensemble_equations, get_replica_offset, make_ensemble,
+    replica_reduce, split_replicas
+)
+from pysph.solver.utils import get_files, load
+
+
+def _make_particles():
+    x = np.linspace(0, 1, 5)
+    fluid = get_particle_array(name='fluid', x=x, h=0.1, u=x)
+    solid = get_particle_array(name='solid', x=x[:2] - 0.5, h=0.1)
+    return [fluid, solid]
+
+
+class TestEnsemble(unittest.TestCase):
+    def test_replicas_are_stacked_and_split(self):
+        # Given
+        particles = _make_particles()
+        offset = get_replica_offset(particles, spacing=2.0, radius_scale=2.0)
+
+        def perturb(arrays, k):
+            arrays[0].u += k
+
+        # When
+        fluid, solid = make_ensemble(particles, 3, offset, perturb)
+
+        # Then
+        self.assertAlmostEqual(offset, 2*1.5 + 0.4)
+        self.assertEqual(fluid.get_number_of_particles(), 15)
+        self.assertEqual(solid.get_number_of_particles(), 6)
+        np.testing.assert_array_equal(fluid.replica, np.repeat([0, 1, 2], 5))
+        np.testing.assert_array_equal(fluid.gid, np.arange(15))
+        np.testing.assert_allclose(fluid.x[5:10], particles[0].x + offset)
+        np.testing.assert_allclose(replica_reduce(fluid, fluid.u, 3),
+                                   [2.5, 7.5, 12.5])
+        np.testing.assert_allclose(replica_reduce(fluid, fluid.x, 3, 'min'),
+                                   [0.0, offset, 2*offset])
+
+        # When
+        replicas = split_replicas([fluid, solid], 3, offset)
+
+        # Then
+        self.assertEqual(len(replicas), 3)
+        fluid2, solid2 = replicas[2]
+        np.testing.assert_allclose(fluid2.x, particles[0].x)
+        np.testing.assert_allclose(fluid2.u, particles[0].u + 2)
+        np.testing.assert_allclose(solid2.x, particles[1].x)
+
+    def test_equations_over_whole_arrays_are_rejected(self):
+        # Given
+        from pysph.sph.basic_equations import SummationDensity
+        from pysph.sph.equation import Group, MultiStageEquations
+        from pysph.sph.rigid_body import RigidBodyMoments
+
+        density = SummationDensity(dest='fluid', sources=['fluid'])
+        moments = RigidBodyMoments(dest='body', sources=None)
+
+        # When/Then
+        check_ensemble_equations([Group(equations=[density])])
+        check_ensemble_equations([density])
+        with self.assertRaises(ValueError):
+            check_ensemble_equations([Group(equations=[density, moments])])
+        with self.assertRaises(ValueError):
+            check_ensemble_equations(MultiStageEquations([
+                [Group(equations=[density])],
+                [Group(equations=[Group(equations=[moments])])],
+            ]))
+        with self.assertRaises(ValueError):
+            check_ensemble_equations([
+                Group(equations=[density], iterate=True, max_iterations=2)
+            ])
+
+
+class TestEnsembleApplication(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_replicas_give_the_same_results(self):
+        # Given
+        from pysph.examples.elliptical_drop import EllipticalDrop
+        app = EllipticalDrop(fname='drop')
+        args = ['-d', self.output_dir, '--tf', '2e-4', '-q', '--nx', '10',
+                '--ensemble', '3']
+
+        # When
+        app.run(args)
+
+        # Then
+        data = []
+        for k in range(3):
+            path = os.path.join(self.output_dir, 'replica_%04d' % k)
+            files = get_files(path, 'drop')
+            self.assertTrue(len(files) > 1)
+            info = app.read_info(path)
+            self.assertEqual(info['replica'], k)
+            data.append(load(files[-1]))
+        for d in data:
+            self.assertEqual(d['solver_data']['t'], data[0]['solver_data']['t'])
+            np.testing.assert_allclose(
+                d['arrays']['fluid'].x, data[0]['arrays']['fluid'].x,
+                atol=1e-12
+            )
+        self.assertEqual(app.particles[0].get_number_of_particles(),
+                         3*data[0]['arrays']['fluid'].get_number_of_particles())
+
+    def test_rigid_bodies_are_rejected(self):
+        # Given
+        from pysph.examples.rigid_body.simple import SimpleRigidMotion
+        app = SimpleRigidMotion(fname='rigid')
+        args = ['-d', self.output_dir, '--tf', '1e-3', '-q',
+                '--ensemble', '2']
+
+        # When/Then
+        with self.assertRaises(ValueError):
+            app.run(args)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,7 @@ except ImportError:
 
 from pysph.base.utils import get_particle_array, get_particle_array_wcsph
 from pysph.solver.utils import dump, load, dump_v1, get_files, get_free_port
+from pysph.solver.output import parse_encoding
 
 
 class TestGetFiles(TestCase):
@@ -153,6 +154,93 @@ class TestOutputNumpy(TestCase):
         self.assertEqual(set(pa.output_property_arrays), set(output_arrays))
         self.assertEqual(set(pa1.output_property_arrays), set(output_arrays))
 
+    def test_dump_and_load_with_lod(self):
+        # Given
+        x = np.linspace(0, 1.0, 100)
+        pa = get_particle_array(name='fluid', x=x, y=2*x)
+        pa.add_property('A', stride=2)
+        pa.A[::2] = x
+        pa.A[1::2] = -x
+        pa.set_output_arrays(['x', 'y', 'A'])
+        fname = self._get_filename('simple')
+
+        # When
+        dump(fname, [pa], solver_data={}, lod=True)
+        pa1 = load(fname)['arrays']['fluid']
+
+        # Then
+        self.assertEqual(pa1.get_number_of_particles(), 100)
+        self.assertFalse(np.allclose(pa1.x, x))
+        np.testing.assert_array_equal(np.sort(pa1.x), x)
+        np.testing.assert_array_equal(pa1.y, 2*pa1.x)
+        np.testing.assert_array_equal(pa1.A[::2], pa1.x)
+        np.testing.assert_array_equal(pa1.A[1::2], -pa1.x)
+
+        # When
+        pa2 = load(fname, fraction=0.25)['arrays']['fluid']
+
+        # Then
+        self.assertEqual(pa2.get_number_of_particles(), 25)
+        np.testing.assert_array_equal(pa2.x, pa1.x[:25])
+        np.testing.assert_array_equal(pa2.A, pa1.A[:50])
+        self.assertTrue(pa2.x.min() < 0.25 and pa2.x.max() > 0.75)
+
+    def test_load_fraction_without_lod(self):
+        # Given
+        x = np.linspace(0, 1.0, 100)
+        pa = get_particle_array(name='fluid', x=x, y=2*x)
+        fname = self._get_filename('simple')
+        dump(fname, [pa], solver_data={})
+
+        # When
+        pa1 = load(fname, fraction=0.1)['arrays']['fluid']
+
+        # Then
+        np.testing.assert_array_equal(pa1.x, x[::10])
+        np.testing.assert_array_equal(pa1.y, 2*x[::10])
+        self.assertRaises(ValueError, load, fname, fraction=0.0)
+
+    def test_dump_and_load_with_encoding(self):
+        # Given
+        x = np.linspace(0, 2.0, 1000)
+        pa = get_particle_array(name='fluid', x=x, y=np.sin(x), u=x*x)
+        pa.add_property('A', stride=2)
+        pa.A[::2] = x
+        pa.A[1::2] = -x
+        pa.set_output_arrays(['x', 'y', 'u', 'A', 'tag'])
+        fname = self._get_filename('simple')
+        encoding = parse_encoding(['x,y=quantize:1e-5', '*=float32'])
+
+        # When
+        dump(fname, [pa], solver_data={}, compress=True, encoding=encoding,
+             lod=True)
+        pa1 = load(fname)['arrays']['fluid']
+        order = np.argsort(pa1.x)
+
+        # Then
+        self.assertEqual(pa1.x.dtype, np.float64)
+        np.testing.assert_allclose(pa1.x[order], x, atol=1e-5)
+        np.testing.assert_allclose(pa1.y[order], np.sin(x), atol=1e-5)
+        np.testing.assert_allclose(pa1.u[order], x*x, rtol=1e-6)
+        np.testing.assert_allclose(pa1.A[::2], pa1.x, atol=1e-5)
+        np.testing.assert_allclose(pa1.A[1::2], -pa1.x, atol=1e-5)
+        np.testing.assert_array_equal(pa1.tag, 0)
+
+        # When
+        pa2 = load(fname, fraction=0.1)['arrays']['fluid']
+
+        # Then
+        np.testing.assert_array_equal(pa2.x, pa1.x[:100])
+
+    def test_parse_encoding(self):
+        self.assertEqual(
+            parse_encoding(['x, y=quantize:1e-6', 'u=float32']),
+            {'x': 'quantize:1e-6', 'y': 'quantize:1e-6', 'u': 'float32'}
+        )
+        self.assertRaises(ValueError, parse_encoding, ['x=float16'])
+        self.assertRaises(ValueError, parse_encoding, ['x=quantize:2'])
+        self.assertRaises(ValueError, parse_encoding, ['quantize:1e-3'])
+
 
 class TestOutputHdf5(TestOutputNumpy):
     @skipUnless(has_h5py(), "h5py module is not present")
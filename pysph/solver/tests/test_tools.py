@@ -0,0 +1,178 @@
+import os
+import shutil
+from tempfile import mkdtemp
+import unittest
+
+import numpy as np
+
+from pysph.base.kernels import CubicSpline
+from pysph.examples.elliptical_drop import EllipticalDrop
+from pysph.examples.taylor_green import TaylorGreen
+from pysph.solver.tools import DensityCorrection, Probe, load_probe
+
+
+class DropWithProbe(EllipticalDrop):
+    def create_tools(self):
+        probe = Probe(self, props=['p', 'u'], freq=5)
+        probe.add_points('gauge', x=[0.0, 0.2], y=[0.0, 0.1])
+        probe.add_line('line', start=[-0.5, 0.0], end=[0.5, 0.0], n=11)
+        probe.add_plane('plane', origin=[-0.2, -0.2], u=[0.4, 0.0],
+                        v=[0.0, 0.4], nu=3, nv=4)
+        self.probe = probe
+        return [probe]
+
+
+class TaylorGreenWithPrivateNNPS(TaylorGreen):
+    def create_tools(self):
+        tools = super(TaylorGreenWithPrivateNNPS, self).create_tools()
+        # Without the solver's NNPS the tools create their own.
+        for tool in tools:
+            tool.nnps = None
+        return tools
+
+
+class DropWithDensityCorrection(EllipticalDrop):
+    share_nnps = True
+
+    def create_tools(self):
+        tool = DensityCorrection(self, ['fluid'], freq=1,
+                                 kernel=CubicSpline)
+        if not self.share_nnps:
+            tool.nnps = None
+        return [tool]
+
+
+class DropWithPrivateNNPS(DropWithDensityCorrection):
+    share_nnps = False
+
+
+class TestSharedNNPS(unittest.TestCase):
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _run(self, cls, args):
+        app = cls(fname='tg')
+        app.run(['-d', self.root, '--disable-output', '-q'] + args)
+        return app
+
+    def test_tools_sharing_nnps_match_private_nnps(self):
+        # Given
+        args = ['--scheme', 'edac', '--nx', '30', '--max-steps', '40',
+                '--shift-freq', '1']
+
+        # When
+        shared = self._run(TaylorGreen, args)
+        private = self._run(TaylorGreenWithPrivateNNPS, args)
+
+        # Then
+        self.assertTrue(shared.tools[0]._sph_eval.shares_nnps)
+        self.assertFalse(private.tools[0]._sph_eval.shares_nnps)
+        fluid, expect = shared.particles[0], private.particles[0]
+        for prop in ('x', 'y', 'u', 'v'):
+            np.testing.assert_allclose(
+                getattr(fluid, prop), getattr(expect, prop), atol=1e-14
+            )
+
+    def test_solver_reuses_bins_of_tool_update(self):
+        # Given
+        args = ['--nx', '20', '--max-steps', '20']
+
+        # When
+        shared = self._run(DropWithDensityCorrection, args)
+        private = self._run(DropWithPrivateNNPS, args)
+
+        # Then
+        nnps = shared.nnps
+        self.assertTrue(shared.tools[0]._sph_eval.shares_nnps)
+        # The EPEC integrator updates the NNPS first in each step, after
+        # the tool has updated it at the end of the previous step.
+        self.assertEqual(nnps.n_reused_bins, 19)
+        self.assertEqual(private.nnps.n_reused_bins, 0)
+        fluid, expect = shared.particles[0], private.particles[0]
+        # The neighbors are summed in a different order by the tool.
+        for prop in ('x', 'y', 'u', 'v', 'rho'):
+            np.testing.assert_allclose(
+                getattr(fluid, prop), getattr(expect, prop), rtol=1e-12,
+                atol=1e-12
+            )
+
+
+class TestProbe(unittest.TestCase):
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_probe_samples_sensors_during_run(self):
+        # Given
+        app = DropWithProbe(fname='drop')
+        args = ['-d', self.root, '--tf', '1e-4', '--disable-output',
+                '-q', '--nx', '20']
+
+        # When
+        app.run(args)
+
+        # Then
+        fname = os.path.join(self.root, 'drop_probe.bin')
+        self.assertEqual(app.probe.fname, fname)
+        data = load_probe(fname)
+        nt = len(data['t'])
+        self.assertEqual(nt, app.solver.count//5)
+        self.assertTrue(nt > 1)
+        self.assertTrue(np.all(np.diff(data['t']) > 0))
+        self.assertEqual(data['gauge']['p'].shape, (nt, 2))
+        self.assertEqual(data['line']['u'].shape, (nt, 11))
+        self.assertEqual(data['plane']['p'].shape, (nt, 3, 4))
+        np.testing.assert_allclose(data['line']['x'],
+                                   np.linspace(-0.5, 0.5, 11))
+        np.testing.assert_allclose(data['plane']['y'][0],
+                                   np.linspace(-0.2, 0.2, 4))
+
+        # The drop initially has u = -100 x.
+        u0 = data['line']['u'][0]
+        x = data['line']['x']
+        np.testing.assert_allclose(u0, -100*x, atol=2.0)
+
+    def test_probe_removes_records_after_restart_time(self):
+        # Given
+        app = EllipticalDrop(fname='drop')
+        app.setup(['-d', self.root, '--disable-output', '-q', '--nx', '10'])
+        probe = Probe(app, props=['p'])
+        probe.add_points('gauge', x=[0.0, 0.2])
+        for t in (0.1, 0.2, 0.3):
+            probe.sample(t)
+        # An incomplete record from an interrupted run.
+        with open(probe.fname, 'ab') as f:
+            f.write(b'\0'*12)
+
+        # When
+        probe = Probe(app, props=['p'])
+        probe.add_points('gauge', x=[0.0, 0.2])
+        probe.append = True
+        probe.restart_time = 0.2
+        probe.sample(0.25)
+
+        # Then
+        data = load_probe(probe.fname)
+        np.testing.assert_array_equal(data['t'], [0.1, 0.2, 0.25])
+        size = os.path.getsize(probe.fname)
+        with open(probe.fname, 'rb') as f:
+            header_size = len(f.readline())
+        self.assertEqual(size - header_size, 3*3*8)
+
+    def test_probe_requires_sensors(self):
+        # Given
+        app = EllipticalDrop(fname='drop')
+        app.setup(['-d', self.root, '--disable-output', '-q', '--nx', '10'])
+        probe = Probe(app, props=['p'])
+
+        # When/Then
+        self.assertRaises(RuntimeError, probe.sample, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
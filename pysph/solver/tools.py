@@ -96,7 +96,10 @@ class SimpleRemesher(Tool):
 
 class DensityCorrection(Tool):
     """
-    A tool to reinitialize the density of the fluid particles
+    A tool to reinitialize the density of the fluid particles.
+
+    The neighbor locator of the solver is reused when possible instead of
+    creating another one.
     """
 
     def __init__(self, app, arr_names, corr='shepard', freq=10, kernel=None):
@@ -126,13 +129,13 @@ class DensityCorrection(Tool):
         self.kernel = kernel
         self.dim = app.solver.dim
         self.particles = app.particles
+        self.nnps = app.nnps
         self.arrs = [get_array_by_name(self.particles, i) for i in self.names]
         options = ['shepard', 'mls2d_1', 'mls3d_1']
         assert self.corr in options, 'corr should be one of %s' % options
 
     def _get_sph_eval_shepard(self):
         from pysph.sph.wc.density_correction import ShepardFilter
-        from pysph.tools.sph_evaluator import SPHEvaluator
         from pysph.sph.equation import Group
         if self._sph_eval is None:
             arrs = self.arrs
@@ -142,16 +145,12 @@ class DensityCorrection(Tool):
                 arr.add_property('rhotmp')
                 eqns.append(Group(equations=[
                             ShepardFilter(name, [name])], real=False))
-            sph_eval = SPHEvaluator(
-                arrays=arrs, equations=eqns, dim=self.dim,
-                kernel=self.kernel(dim=self.dim))
-            return sph_eval
+            return self._create_sph_eval(eqns)
         else:
             return self._sph_eval
 
     def _get_sph_eval_mls2d_1(self):
         from pysph.sph.wc.density_correction import MLSFirstOrder2D
-        from pysph.tools.sph_evaluator import SPHEvaluator
         from pysph.sph.equation import Group
         if self._sph_eval is None:
             arrs = self.arrs
@@ -161,16 +160,12 @@ class DensityCorrection(Tool):
                 arr.add_property('rhotmp')
                 eqns.append(Group(equations=[
                             MLSFirstOrder2D(name, [name])], real=False))
-            sph_eval = SPHEvaluator(
-                arrays=arrs, equations=eqns, dim=self.dim,
-                kernel=self.kernel(dim=self.dim))
-            return sph_eval
+            return self._create_sph_eval(eqns)
         else:
             return self._sph_eval
 
     def _get_sph_eval_mls3d_1(self):
         from pysph.sph.wc.density_correction import MLSFirstOrder3D
-        from pysph.tools.sph_evaluator import SPHEvaluator
         from pysph.sph.equation import Group
         if self._sph_eval is None:
             arrs = self.arrs
@@ -180,13 +175,23 @@ class DensityCorrection(Tool):
                 arr.add_property('rhotmp')
                 eqns.append(Group(equations=[
                             MLSFirstOrder3D(name, [name])], real=False))
-            sph_eval = SPHEvaluator(
-                arrays=arrs, equations=eqns, dim=self.dim,
-                kernel=self.kernel(dim=self.dim))
-            return sph_eval
+            return self._create_sph_eval(eqns)
         else:
             return self._sph_eval
 
+    def _create_sph_eval(self, eqns):
+        from pysph.tools.sph_evaluator import SPHEvaluator, can_share_nnps
+        kernel = self.kernel(dim=self.dim)
+        # The solver's NNPS may only be shared if all its arrays are passed.
+        if can_share_nnps(self.nnps, self.particles, kernel):
+            arrs = self.particles
+        else:
+            arrs = self.arrs
+        return SPHEvaluator(
+            arrays=arrs, equations=eqns, dim=self.dim, kernel=kernel,
+            nnps=self.nnps
+        )
+
     def _get_sph_eval(self, corr):
         if corr == 'shepard':
             return self._get_sph_eval_shepard()
@@ -202,6 +207,253 @@ class DensityCorrection(Tool):
             pass
         elif self.count % self.freq == 0:
             self._sph_eval = self._get_sph_eval(self.corr)
+            if (self._sph_eval.shares_nnps and
+                    self._sph_eval.nnps is not solver.nnps):
+                # The solver's NNPS was replaced, e.g. with '--nnps auto'.
+                self._sph_eval.set_nnps(solver.nnps)
+            # The particles have moved since the solver last updated the
+            # NNPS, so it must be updated even when it is shared.
             self._sph_eval.update()
             self._sph_eval.evaluate()
         self.count += 1
+
+
+class Probe(Tool):
+    """A tool to sample particle properties at fixed sensors during a run.
+
+    Sensors are named collections of points, lines or planes.  The given
+    properties are interpolated onto all the sensors every `freq` steps and
+    appended to a compact binary time series file that may be read with
+    :py:func:`load_probe`.  This makes it possible to record gauges without
+    dumping the full particle data frequently.
+
+    The probes only work in serial runs.
+
+    Examples
+    --------
+
+    In the ``create_tools`` method of an application::
+
+        probe = Probe(self, props=['p'], freq=10)
+        probe.add_points('gauge', x=[0.5, 1.0], y=[0.1, 0.1])
+        probe.add_line('section', start=[0.0, 0.2], end=[1.0, 0.2], n=51)
+        return [probe]
+    """
+
+    def __init__(self, app, props, fname=None, freq=10, arrays=None,
+                 kernel=None, method='shepard'):
+        """Constructor.
+
+        Parameters
+        ----------
+
+        app : pysph.solver.application.Application
+            The application instance.
+        props : list(str)
+            List of properties to sample.
+        fname : str
+            Name of the output file.  Defaults to ``<fname>_probe.bin`` in
+            the output directory of the application.
+        freq : int
+            Number of steps between successive samples.
+        arrays : list(str)
+            Names of the particle arrays to interpolate from.  Defaults to
+            all the arrays.
+        kernel: any kernel from pysph.base.kernels
+            Defaults to the kernel used by the solver.
+        method : str
+            The interpolation method, one of 'shepard' or 'sph'.
+        """
+        import os
+        if app.num_procs > 1:
+            raise RuntimeError('Probe is not supported in parallel runs.')
+        if method not in ['shepard', 'sph']:
+            raise RuntimeError('%s method is not supported.' % method)
+        if fname is None:
+            fname = os.path.join(app.output_dir, app.fname + '_probe.bin')
+        self.fname = fname
+        self.props = list(props)
+        self.freq = freq
+        self.method = method
+        self.kernel = app.solver.kernel if kernel is None else kernel
+        if arrays is None:
+            self.arrays = list(app.particles)
+        else:
+            from pysph.solver.utils import get_array_by_name
+            self.arrays = [get_array_by_name(app.particles, name)
+                           for name in arrays]
+        self.append = app.options.restart_file is not None
+        # The solver time is that of the restart file when restarting.
+        self.restart_time = app.solver.t
+        self.sensors = []
+        self.interp = None
+
+    def add_points(self, name, x, y=None, z=None):
+        """Add a sensor made up of the given points.
+
+        Any of y, z that is not passed is taken to be 0.0.
+        """
+        import numpy as np
+        x = np.ravel(np.asarray(x, dtype=float))
+
+        def _get_array(_t):
+            if _t is None:
+                return np.zeros_like(x)
+            return np.ravel(np.asarray(_t, dtype=float))
+
+        self._add_sensor(name, 'points', (x.size,), x, _get_array(y),
+                         _get_array(z))
+
+    def add_line(self, name, start, end, n):
+        """Add a sensor with `n` equally spaced points from `start` to `end`
+        (both inclusive).
+        """
+        import numpy as np
+        start, end = self._get_point(start), self._get_point(end)
+        s = np.linspace(0.0, 1.0, n)
+        pts = start + s[:, None]*(end - start)
+        self._add_sensor(name, 'line', (n,), pts[:, 0], pts[:, 1], pts[:, 2])
+
+    def add_plane(self, name, origin, u, v, nu, nv):
+        """Add a sensor on the parallelogram spanned by the vectors `u` and
+        `v` from `origin`, with `nu` and `nv` points along `u` and `v`.
+
+        The sampled data for the plane is shaped as (nu, nv).
+        """
+        import numpy as np
+        origin = self._get_point(origin)
+        u, v = self._get_point(u), self._get_point(v)
+        su, sv = np.meshgrid(
+            np.linspace(0.0, 1.0, nu), np.linspace(0.0, 1.0, nv),
+            indexing='ij'
+        )
+        pts = (origin + su.ravel()[:, None]*u + sv.ravel()[:, None]*v)
+        self._add_sensor(name, 'plane', (nu, nv), pts[:, 0], pts[:, 1],
+                         pts[:, 2])
+
+    def sample(self, t):
+        """Interpolate the properties on all the sensors and append them to
+        the output file along with the time `t`.
+        """
+        import numpy as np
+        if self.interp is None:
+            self._setup()
+        else:
+            self.interp.update(update_domain=False)
+        result = self.interp.interpolate_many(self.props)
+        record = [np.array([t], dtype=np.float64)]
+        record.extend(
+            np.atleast_1d(result[prop]).astype(np.float64)
+            for prop in self.props
+        )
+        with open(self.fname, 'ab') as f:
+            np.concatenate(record).tofile(f)
+
+    def post_step(self, solver):
+        # The solver time and count are only updated after the post step
+        # callbacks are called.
+        if (solver.count + 1) % self.freq == 0:
+            self.sample(solver.t + solver.dt)
+
+    # Private protocol ###################################################
+
+    def _add_sensor(self, name, kind, shape, x, y, z):
+        if self.interp is not None:
+            raise RuntimeError('Sensors must be added before sampling.')
+        if name in [s['name'] for s in self.sensors]:
+            raise RuntimeError('Sensor %s already exists.' % name)
+        self.sensors.append(
+            dict(name=name, kind=kind, shape=shape, x=x, y=y, z=z)
+        )
+
+    def _get_point(self, p):
+        import numpy as np
+        result = np.zeros(3)
+        p = np.ravel(np.asarray(p, dtype=float))
+        result[:len(p)] = p
+        return result
+
+    def _get_header(self):
+        import json
+        sensors = []
+        for s in self.sensors:
+            sensors.append(dict(
+                name=s['name'], kind=s['kind'], shape=list(s['shape']),
+                x=s['x'].tolist(), y=s['y'].tolist(), z=s['z'].tolist()
+            ))
+        header = dict(version=1, props=self.props, sensors=sensors)
+        return json.dumps(header).encode('utf-8')
+
+    def _setup(self):
+        import os
+        import numpy as np
+        from pysph.tools.interpolator import Interpolator
+        if len(self.sensors) == 0:
+            raise RuntimeError('No sensors have been added to the probe.')
+        x, y, z = [np.concatenate([s[c] for s in self.sensors])
+                   for c in 'xyz']
+        self.interp = Interpolator(
+            self.arrays, x=x, y=y, z=z, kernel=self.kernel,
+            method=self.method
+        )
+        header = self._get_header()
+        if self.append and os.path.exists(self.fname):
+            with open(self.fname, 'rb+') as f:
+                old = f.readline().rstrip(b'\n')
+                if old == header:
+                    self._truncate_records(f, len(x))
+                    return
+        with open(self.fname, 'wb') as f:
+            f.write(header + b'\n')
+
+    def _truncate_records(self, f, npoints):
+        """Remove the records after the restart time (and any incomplete
+        record) from the file `f` positioned after the header.
+        """
+        import numpy as np
+        start = f.tell()
+        data = np.fromfile(f, dtype=np.float64)
+        size = 1 + len(self.props)*npoints
+        t = data[:(len(data)//size)*size:size]
+        before = np.nonzero(t <= self.restart_time)[0]
+        nt = before[-1] + 1 if len(before) > 0 else 0
+        f.truncate(start + nt*size*data.itemsize)
+
+
+def load_probe(fname):
+    """Load the time series saved by a :py:class:`Probe`.
+
+    Returns a dict with the array of sample times as ``'t'`` and a dict for
+    each sensor keyed on its name.  Each sensor has its coordinates ``'x'``,
+    ``'y'``, ``'z'`` and the sampled properties, the latter shaped as
+    ``(len(t),) + shape`` where shape is that of the sensor.
+    """
+    import json
+    import numpy as np
+    with open(fname, 'rb') as f:
+        header = json.loads(f.readline().decode('utf-8'))
+        data = np.fromfile(f, dtype=np.float64)
+
+    sensors = header['sensors']
+    props = header['props']
+    npoints = sum(int(np.prod(s['shape'])) for s in sensors)
+    size = 1 + len(props)*npoints
+    # Ignore any incomplete record from an interrupted run.
+    nt = len(data)//size
+    data = data[:nt*size].reshape(nt, size)
+
+    result = dict(t=data[:, 0])
+    for i, prop in enumerate(props):
+        values = data[:, 1 + i*npoints:1 + (i + 1)*npoints]
+        start = 0
+        for s in sensors:
+            n = int(np.prod(s['shape']))
+            sensor = result.setdefault(s['name'], {})
+            if 'x' not in sensor:
+                for c in 'xyz':
+                    sensor[c] = np.reshape(s[c], s['shape'])
+            sensor[prop] = values[:, start:start + n].reshape(
+                (nt,) + tuple(s['shape'])
+            )
+            start += n
+    return result
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from inspect import getfullargspec
 try:
     from collections import OrderedDict
 except ImportError:
@@ -90,6 +91,178 @@ def make_acceleration_evals(particle_arrays, equations, kernel,
     ]
 
 
+def get_remote_props(acceleration_evals):
+    """Return the properties of each array that are needed on remote
+    particles when the given acceleration evaluators are used.
+
+    These are the properties read from the sources (the ``s_*``
+    arguments) of any equation. Since remote particles are also
+    evaluated as destinations, an equation on an array that uses one of
+    these properties as a ``d_*`` argument needs all of its arguments on
+    the remote particles too. This is repeated until nothing changes.
+
+    Returns a dictionary mapping the array name to a sorted list of
+    property names. The basic properties needed for the neighbor
+    queries are always included.
+    """
+    equations = []
+    needed = defaultdict(lambda: set(['x', 'y', 'z', 'h', 'm', 'gid']))
+    for a_eval in acceleration_evals:
+        equations.extend(a_eval.all_group.equations)
+        for pa in a_eval.particle_arrays:
+            needed[pa.name]
+
+    used = []
+    for equation in equations:
+        _src, _dest = get_arrays_used_in_equation(equation)
+        used.append((equation, set(x[2:] for x in _src),
+                     set(x[2:] for x in _dest)))
+
+    for equation, src, dest in used:
+        if not equation.no_source:
+            for name in equation.sources:
+                needed[name].update(src)
+
+    changed = True
+    while changed:
+        changed = False
+        for equation, src, dest in used:
+            if not dest & needed[equation.dest]:
+                continue
+            if not dest <= needed[equation.dest]:
+                needed[equation.dest].update(dest)
+                changed = True
+            if not equation.no_source:
+                for name in equation.sources:
+                    if not src <= needed[name]:
+                        needed[name].update(src)
+                        changed = True
+
+    return dict((name, sorted(props)) for name, props in needed.items())
+
+
+def get_neighbor_queries(acceleration_evals):
+    """Return the neighbor queries made by one evaluation of each of the
+    given acceleration evaluators.
+
+    Returns a list of ``(dest, src)`` array names with an entry for each
+    group that loops over the neighbors of `dest` from `src`, so a pair
+    appears as many times as it is queried.  Iterated groups are counted
+    once.
+    """
+    queries = []
+    for a_eval in acceleration_evals:
+        groups = []
+        for group in a_eval.equation_groups:
+            if group.has_subgroups:
+                groups.extend(group.equations)
+            else:
+                groups.append(group)
+        for group in groups:
+            pairs = []
+            for equation in group.equations:
+                if equation.no_source:
+                    continue
+                for src in equation.sources:
+                    if (equation.dest, src) not in pairs:
+                        pairs.append((equation.dest, src))
+            queries.extend(pairs)
+    return queries
+
+
+# Properties that are always kept, these are used by the neighbor searches,
+# in parallel and by the integrator for the adaptive time step.
+ALWAYS_USED_PROPS = (
+    'x', 'y', 'z', 'h', 'm', 'gid', 'pid', 'tag', 'dt_cfl', 'dt_force',
+    'dt_visc', 'dt_adapt', 'replica'
+)
+
+
+def get_used_props(acceleration_evals, integrator=None):
+    """Return the properties of each array that are read or written by the
+    equations of the given acceleration evaluators, the integrator steppers
+    or the output, along with the ALWAYS_USED_PROPS.
+
+    Returns a dictionary mapping the array name to a set of property names,
+    or to None if all of its properties may be used.  This is the case when
+    Python code that cannot be inspected is passed the array or is called
+    for it, i.e. the ``reduce`` and ``py_initialize`` methods of equations,
+    the ``py_stage`` methods of steppers and the ``pre`` and ``post``
+    callbacks of groups.
+    """
+    used = {}
+
+    def _add(name, props):
+        if name not in used:
+            used[name] = set()
+        if used[name] is not None:
+            used[name].update(props)
+
+    for a_eval in acceleration_evals:
+        for pa in a_eval.particle_arrays:
+            _add(pa.name, ALWAYS_USED_PROPS)
+            _add(pa.name, pa.output_property_arrays)
+
+        groups = []
+        for group in a_eval.equation_groups:
+            groups.append(group)
+            if group.has_subgroups:
+                groups.extend(group.equations)
+        if any(g.pre is not None or g.post is not None for g in groups):
+            for pa in a_eval.particle_arrays:
+                used[pa.name] = None
+        for group in groups:
+            if group.converged_prop is not None:
+                for equation in group.equations:
+                    _add(equation.dest, [group.converged_prop])
+
+        for equation in a_eval.all_group.equations:
+            if hasattr(equation, 'reduce') or \
+                    hasattr(equation, 'py_initialize'):
+                used[equation.dest] = None
+            src, dest = get_arrays_used_in_equation(equation)
+            _add(equation.dest, [x[2:] for x in dest])
+            if not equation.no_source:
+                for name in equation.sources:
+                    _add(name, [x[2:] for x in src])
+
+    if integrator is not None:
+        for dest, stepper in integrator.steppers.items():
+            for method in dir(stepper):
+                if method.startswith('py_stage'):
+                    used[dest] = None
+                elif method.startswith('stage') or method == 'initialize':
+                    args = getfullargspec(getattr(stepper, method)).args
+                    _add(dest, [x[2:] for x in args if x.startswith('d_')])
+    return used
+
+
+def remove_unused_props(acceleration_evals, integrator=None):
+    """Remove the properties of the particle arrays that are not used, see
+    :py:func:`get_used_props`.  This must be called before the code is
+    generated.
+
+    Returns a dictionary mapping the array name to a sorted list of the
+    removed properties.
+    """
+    used = get_used_props(acceleration_evals, integrator)
+    removed = {}
+    for a_eval in acceleration_evals:
+        for pa in a_eval.particle_arrays:
+            props = used.get(pa.name)
+            if props is None or pa.name in removed:
+                continue
+            unused = sorted(set(pa.properties.keys()) - props)
+            for prop in unused:
+                pa.remove_property(prop)
+            if pa.lb_props is not None:
+                pa.set_lb_props(
+                    [x for x in pa.lb_props if x in pa.properties]
+                )
+            removed[pa.name] = unused
+    return removed
+
+
 ###############################################################################
 class MegaGroup(object):
     """A mega-group refactors actual equation Groups into a more
@@ -121,14 +294,18 @@ class MegaGroup(object):
     def _copy_props(self, group):
         for key in ('real', 'update_nnps', 'iterate', 'pre', 'post',
                     'max_iterations', 'min_iterations', 'has_subgroups',
-                    'condition', 'start_idx', 'stop_idx'):
+                    'condition', 'start_idx', 'stop_idx', 'converged_prop'):
             setattr(self, key, getattr(group, key))
 
     def _make_data(self, group):
         equations = group.equations
 
         if group.has_subgroups:
-            return [MegaGroup(g, self.Group) for g in equations]
+            sub_groups = [MegaGroup(g, self.Group) for g in equations]
+            # Sub-groups skip the particles converged in the parent group.
+            for g in sub_groups:
+                g.converged_prop = self.converged_prop
+            return sub_groups
 
         dest_list = []
         for equation in equations:
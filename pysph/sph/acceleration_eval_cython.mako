@@ -38,6 +38,7 @@ ${indent(all_eqs.get_py_initialize_code(), 0)}
 % if all_eqs.has_initialize():
 # Initialization for destination ${dest}.
 for d_idx in ${helper.get_parallel_range(group)}:
+    ${indent(helper.get_skip_converged(group, dest), 1)}
     ${indent(all_eqs.get_initialize_code(helper.object.kernel), 1)}
 % endif
 #######################################################################
@@ -47,6 +48,7 @@ for d_idx in ${helper.get_parallel_range(group)}:
 % if eqs_with_no_source.has_loop():
 # SPH Equations with no sources.
 for d_idx in ${helper.get_parallel_range(group)}:
+    ${indent(helper.get_skip_converged(group, dest), 1)}
     ${indent(eqs_with_no_source.get_loop_code(helper.object.kernel), 1)}
 % endif
 % endif
@@ -66,6 +68,7 @@ src_array_index = src.index
 
 % if eq_group.has_initialize_pair():
 for d_idx in ${helper.get_parallel_range(group)}:
+    ${indent(helper.get_skip_converged(group, dest), 1)}
     ${indent(eq_group.get_initialize_pair_code(helper.object.kernel), 1)}
 % endif
 
@@ -79,6 +82,7 @@ ${helper.get_parallel_block()}
     thread_id = threadid()
     ${indent(eq_group.get_variable_array_setup(), 1)}
     for d_idx in ${helper.get_parallel_range(group, nogil=False)}:
+        ${indent(helper.get_skip_converged(group, dest), 2)}
         ###############################################################
         ## Find and iterate over neighbors.
         ###############################################################
@@ -106,6 +110,7 @@ ${helper.get_parallel_block()}
 % if all_eqs.has_post_loop():
 # Post loop for destination ${dest}.
 for d_idx in ${helper.get_parallel_range(group)}:
+    ${indent(helper.get_skip_converged(group, dest), 1)}
     ${indent(all_eqs.get_post_loop_code(helper.object.kernel), 1)}
 % endif
 
@@ -126,6 +126,15 @@ class AccelerationEvalCythonHelper(object):
     ##########################################################################
     # Private interface.
     ##########################################################################
+    def _can_skip_converged(self, group, dest_name):
+        prop = group.converged_prop
+        if prop is None:
+            return False
+        for pa in self.object.particle_arrays:
+            if pa.name == dest_name:
+                return prop in pa.properties
+        return False
+
     def _compute_group_map(self):
         # Given all the groups, create a mapping from the group to an index of
         # sorts that can be used when adding the pre/post callback code.
@@ -158,10 +167,13 @@ class AccelerationEvalCythonHelper(object):
         )
         object.set_compiled_object(acceleration_eval)
 
-    def compile(self, code):
+    def compile(self, code, root=None):
         # Note, we do not add carray or particle_array as nnps_base would
         # have been rebuilt anyway if they changed.
-        root = expanduser(join('~', '.pysph', 'source', get_platform_dir()))
+        if root is None:
+            root = expanduser(
+                join('~', '.pysph', 'source', get_platform_dir())
+            )
         depends = ["pysph.base.nnps_base"]
         # Add pysph/base directory to inc_dirs for including spatial_hash.h
         # for SpatialHashNNPS
@@ -247,6 +259,9 @@ class AccelerationEvalCythonHelper(object):
         group = self.object.all_group
         src, dest = group.get_array_names()
         src.update(dest)
+        for g in self.object.mega_groups:
+            if g.converged_prop is not None:
+                src.add('d_' + g.converged_prop)
         return group.get_array_declarations(src, self.known_types)
 
     def get_dest_array_setup(self, dest_name, eqs_with_no_source, sources,
@@ -270,10 +285,20 @@ class AccelerationEvalCythonHelper(object):
         else:
             lines += ['NP_DEST = %s' % group.stop_idx]
 
+        if self._can_skip_converged(group, dest_name):
+            dest_arrays.add('d_' + group.converged_prop)
+
         lines += ['%s = dst.%s.data' % (n, n[2:])
                   for n in sorted(dest_arrays)]
         return '\n'.join(lines)
 
+    def get_skip_converged(self, group, dest_name):
+        if not self._can_skip_converged(group, dest_name):
+            return ''
+        return dedent('''\
+            if _iteration_count > 1 and d_%s[d_idx] != 0:
+                continue''' % group.converged_prop)
+
     def get_src_array_setup(self, src_name, eq_group):
         src_arrays, dest = eq_group.get_array_names()
         lines = ['NP_SRC = self.%s.size()' % src_name]
@@ -449,7 +449,8 @@ class Group(object):
 
     def __init__(self, equations, real=True, update_nnps=False, iterate=False,
                  max_iterations=1, min_iterations=0, pre=None, post=None,
-                 condition=None, start_idx=0, stop_idx=None):
+                 condition=None, start_idx=0, stop_idx=None,
+                 converged_prop=None):
         """Constructor.
 
         Parameters
@@ -505,6 +506,16 @@ class Group(object):
             that this works like a range stop parameter so the last value is
             not included.
 
+        converged_prop: str
+            Name of a per-particle property of the destination arrays that
+            the equations set to a non-zero value once a particle has
+            converged. This may only be used with iterate and, after the first
+            iteration, the converged particles are skipped in the subsequent
+            iterations of the group. The equations must therefore leave the
+            properties of converged particles unchanged. Destinations that do
+            not have the property are not skipped. Only the Cython backend
+            skips particles, other backends iterate over all of them.
+
         Notes
         -----
 
@@ -530,6 +541,9 @@ class Group(object):
         self.condition = condition
         self.start_idx = start_idx
         self.stop_idx = stop_idx
+        if converged_prop is not None and not iterate:
+            raise ValueError('converged_prop can only be used with iterate.')
+        self.converged_prop = converged_prop
 
         only_groups = [x for x in equations if isinstance(x, Group)]
         if (len(only_groups) > 0) and (len(only_groups) != len(equations)):
@@ -554,7 +568,8 @@ class Group(object):
         ignore = ['equations']
         if self.start_idx != 0:
             ignore.append('start_idx')
-        for prop in ['pre', 'post', 'condition', 'stop_idx']:
+        for prop in ['pre', 'post', 'condition', 'stop_idx',
+                     'converged_prop']:
             if getattr(self, prop) is None:
                 ignore.append(prop)
         kws = ', '.join(get_init_args(self, self.__init__, ignore))
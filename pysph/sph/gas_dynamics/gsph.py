@@ -20,6 +20,7 @@ LLXF = 7
 HLLCBall = 8
 HLLBall = 9
 HLLSY = 10
+Adaptive = 11
 
 # GSPHInterpolationType
 Delta = 0
@@ -42,6 +42,8 @@ def riemann_solve(method=1, rhol=0.0, rhor=1.0, pl=0.0, pr=1.0, ul=0.0, ur=1.0,
         return hll_ball(rhol, rhor, pl, pr, ul, ur, gamma, niter, tol, result)
     elif method == 10:
         return hllsy(rhol, rhor, pl, pr, ul, ur, gamma, niter, tol, result)
+    elif method == 11:
+        return adaptive(rhol, rhor, pl, pr, ul, ur, gamma, niter, tol, result)
 
 
 def non_diffusive(rhol=0.0, rhor=1.0, pl=0.0, pr=1.0, ul=0.0, ur=1.0,
@@ -286,6 +288,85 @@ def exact(rhol=0.0, rhor=1.0, pl=0.0, pr=1.0,
     return 0
 
 
+def adaptive(rhol=0.0, rhor=1.0, pl=0.0, pr=1.0,
+             ul=0.0, ur=1.0, gamma=1.4, niter=20, tol=1e-6,
+             result=[0.0, 0.0]):
+    """Adaptive non-iterative Riemann solver.
+
+    The star state is computed without iterations where a cheap solver is
+    accurate and the exact solver is only used for the remaining
+    interfaces.  In smooth regions, where the pressure ratio is small and
+    the primitive variable estimate lies between the left and right
+    pressures, the primitive variable (PVRS) solution is used.  When both
+    waves are rarefactions the two-rarefaction (TRRS) solution is used
+    which is exact for an ideal gas.  See section 9.5 of Toro, 'Riemann
+    Solvers and Numerical Methods for Fluid Dynamics', 2009.
+
+    Parameters
+    ----------
+    rhol, rhor: double: left and right density.
+    pl, pr: double: left and right pressure.
+    ul, ur: double: left and right speed.
+    gamma: double: Ratio of specific heats.
+    niter: int: Max number of iterations for the exact solver.
+    tol: double: Error tolerance for the exact solver.
+
+    result: list: List of length 2. Result will contain computed pstar, ustar
+
+    Returns
+    -------
+
+    Returns 0 if the value is computed correctly else 1 if the exact
+    solver did not converge or if there is an error.
+
+    """
+    cl, cr, cup, ppv, pmin, pmax = declare('double', 6)
+    pq, um, ptl, ptr, pm = declare('double', 5)
+    gamma1, gamma3, gamma4, gamma7 = declare('double', 4)
+
+    if ((rhol <= 0) or (rhor <= 0) or (pl <= 0) or (pr <= 0)):
+        result[0] = 0.0
+        result[1] = 0.0
+        return 1
+
+    gamma1 = 0.5*(gamma - 1.0)/gamma
+    gamma3 = 2.0*gamma/(gamma - 1.0)
+    gamma4 = 2.0/(gamma - 1.0)
+    gamma7 = 0.5*(gamma - 1.0)
+
+    cl = sqrt(gamma*pl/rhol)
+    cr = sqrt(gamma*pr/rhor)
+
+    # vacuum is generated, leave it to the exact solver.
+    if (gamma4*(cl + cr) <= (ur - ul)):
+        return exact(rhol, rhor, pl, pr, ul, ur, gamma, niter, tol, result)
+
+    # primitive variable estimate
+    cup = 0.25*(rhol + rhor)*(cl + cr)
+    ppv = max(0.0, 0.5*(pl + pr) + 0.5*(ul - ur)*cup)
+    pmin = min(pl, pr)
+    pmax = max(pl, pr)
+
+    if ((pmax/pmin <= 2.0) and (pmin <= ppv) and (ppv <= pmax)):
+        result[0] = ppv
+        result[1] = 0.5*(ul + ur) + 0.5*(pl - pr)/cup
+        return 0
+
+    if ppv < pmin:
+        # two-rarefaction solution, exact if both waves are rarefactions.
+        pq = (pl/pr)**gamma1
+        um = (pq*ul/cl + ur/cr + gamma4*(pq - 1.0))/(pq/cl + 1.0/cr)
+        ptl = 1.0 + gamma7*(ul - um)/cl
+        ptr = 1.0 + gamma7*(um - ur)/cr
+        pm = 0.5*(pl*ptl**gamma3 + pr*ptr**gamma3)
+        if pm <= pmin:
+            result[0] = pm
+            result[1] = um
+            return 0
+
+    return exact(rhol, rhor, pl, pr, ul, ur, gamma, niter, tol, result)
+
+
 def sample(pm=0.0, um=0.0, s=0.0, rhol=1.0, rhor=0.0, pl=1.0, pr=0.0,
            ul=1.0, ur=0.0, gamma=1.4, result=[0.0, 0.0, 0.0]):
     """Sample the solution to the Riemann problem.
@@ -974,7 +1055,7 @@ def hllsy(rhol=0.0, rhor=1.0, pl=0.0, pr=1.0, ul=0.0, ur=1.0,
 
 HELPERS = [
     SIGN, riemann_solve, non_diffusive,
-    ducowicz, exact, hll_ball, hllc,
+    ducowicz, exact, adaptive, hll_ball, hllc,
     hllc_ball, hlle, hllsy, llxf, roe,
     van_leer, prefun_exact
 ]
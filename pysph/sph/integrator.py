@@ -6,6 +6,8 @@ These classes are used to generate the code for the actual integrators
 from the `sph_eval` module.
 """
 
+import time
+
 from numpy import sqrt
 import numpy as np
 
@@ -46,6 +48,8 @@ class Integrator(object):
         self.c_integrator = None
         self._has_dt_adapt = None
         self.fixed_h = False
+        self.fuse_dt_reductions = False
+        self.nnps_update_callback = None
 
     def __repr__(self):
         name = self.__class__.__name__
@@ -59,10 +63,30 @@ class Integrator(object):
         else:
             return -1.0
 
+    def _get_fused_dt_reductions(self):
+        """Return the timestep reductions done by the compiled stepper loops
+        and the names of the arrays these include, see
+        `set_fuse_dt_reductions`.
+        """
+        get_dt_reductions = getattr(
+            self.c_integrator, 'get_dt_reductions', None
+        )
+        if not self.fuse_dt_reductions or get_dt_reductions is None:
+            return None, ()
+        reductions = get_dt_reductions()
+        if reductions is None:
+            return None, ()
+        return reductions, self.c_integrator.dt_reduction_arrays
+
     def _get_dt_adapt_factors(self):
         a_eval = self.acceleration_evals[0]
         factors = [-1.0, -1.0, -1.0]
+        reductions, done = self._get_fused_dt_reductions()
+        if reductions is not None:
+            factors = list(reductions[:3])
         for pa in a_eval.particle_arrays:
+            if pa.name in done:
+                continue
             prop_names = []
             for i, name in enumerate(('dt_cfl', 'dt_force', 'dt_visc')):
                 if name in pa.properties:
@@ -94,8 +118,11 @@ class Integrator(object):
             )
         if self._has_dt_adapt:
             dt_min = np.inf
+            reductions, done = self._get_fused_dt_reductions()
+            if reductions is not None:
+                dt_min = reductions[3]
             for pa in a_eval.particle_arrays:
-                if 'dt_adapt' in pa.properties:
+                if 'dt_adapt' in pa.properties and pa.name not in done:
                     if pa.gpu is not None:
                         if pa.gpu.get_number_of_particles() > 0:
                             from compyle.array import minimum
@@ -139,6 +166,18 @@ class Integrator(object):
 
         self.fixed_h = fixed_h
 
+    def set_fuse_dt_reductions(self, fuse):
+        """Find the maxima of the adaptive timestep properties, `dt_cfl`,
+        `dt_force`, `dt_visc` and the minimum of `dt_adapt`, in the stepper
+        loops that follow the last acceleration evaluation of a timestep
+        instead of in separate passes over the particles.
+
+        Only the real particles are considered.  This must be set before
+        the integrator is compiled and is only supported by the Cython
+        backend, it is ignored otherwise.
+        """
+        self.fuse_dt_reductions = fuse
+
     def set_nnps(self, nnps):
         self.nnps = nnps
         self.c_integrator.set_nnps(nnps)
@@ -263,6 +302,15 @@ class Integrator(object):
         """
         self.c_integrator.set_post_stage_callback(callback)
 
+    def set_nnps_update_callback(self, callback):
+        """This callback is called right after the NNPS is updated when the
+        accelerations are computed, i.e. when the NNPS is consistent with
+        the particles.
+
+        This callback is passed the current time value and the NNPS.
+        """
+        self.nnps_update_callback = callback
+
     def step(self, time, dt):
         """This function is called by the solver.
 
@@ -271,20 +319,45 @@ class Integrator(object):
         """
         self.c_integrator.step(time, dt)
 
+    def update_nnps(self):
+        """Update the parallel manager and the NNPS since the particles
+        have moved.
+        """
+        pm = self.parallel_manager
+        if pm:
+            # bin the local particles while the remote particles are
+            # exchanged.
+            pm.begin_update()
+            with profile_ctx('nnps.update'):
+                self.nnps.begin_update(pm.get_halo_width())
+            pm.end_update()
+            with profile_ctx('nnps.update'):
+                self.nnps.end_update()
+        else:
+            with profile_ctx('nnps.update'):
+                self.nnps.update()
+        if self.nnps_update_callback is not None:
+            self.nnps_update_callback(self.c_integrator.t, self.nnps)
+
     def compute_accelerations(self, index=0, update_nnps=True):
         if update_nnps:
             # update NNPS since particles have moved
-            if self.parallel_manager:
-                self.parallel_manager.update()
-            with profile_ctx('nnps.update'):
-                self.nnps.update()
+            self.update_nnps()
 
         # Evaluate
         c_integrator = self.c_integrator
+        if self.fuse_dt_reductions and \
+           hasattr(c_integrator, 'reset_dt_reductions'):
+            c_integrator.reset_dt_reductions()
         a_eval = self.acceleration_evals[index]
+        start = time.time()
         with profile_ctx('acceleration_eval_%d' % index):
             a_eval.compute(c_integrator.t, c_integrator.dt)
 
+        # used by the parallel manager to measure the load imbalance
+        if self.parallel_manager:
+            self.parallel_manager.add_compute_time(time.time() - start)
+
     @profile
     def initial_acceleration(self, t, dt):
         """Compute the initial accelerations if needed before the iterations start.
@@ -19,6 +19,11 @@ ${helper.get_helper_code()}
 
 ${helper.get_stepper_code()}
 
+# Doubles used by each thread for the timestep reductions, padded to avoid
+# false sharing.
+cdef enum:
+    DT_REDUCTION_STRIDE = 8
+
 
 # #############################################################################
 cdef class Integrator:
@@ -28,6 +33,12 @@ cdef class Integrator:
     cdef public double dt, t, orig_t
     cdef object _post_stage_callback
     cdef object steppers
+    # Per thread maxima of dt_cfl, dt_force, dt_visc and minimum of dt_adapt
+    # from the stepper loops following the last acceleration evaluation.
+    cdef double* _dt_reductions
+    cdef int _n_threads
+    cdef bint _dt_reductions_valid
+    cdef public tuple dt_reduction_arrays
 
     ${indent(helper.get_stepper_defs(), 1)}
 
@@ -36,11 +47,20 @@ cdef class Integrator:
         self.acceleration_eval = acceleration_eval
         self.steppers = steppers
         self._post_stage_callback = None
+        self._n_threads = get_number_of_threads()
+        self._dt_reductions = <double*>aligned_malloc(
+            sizeof(double)*DT_REDUCTION_STRIDE*self._n_threads
+        )
+        self.reset_dt_reductions()
+        self.dt_reduction_arrays = ${repr(tuple(helper.get_dt_reduction_dests()))}
         % for name in sorted(helper.object.steppers.keys()):
         self.${name} = acceleration_eval.${name}
         % endfor
         ${indent(helper.get_stepper_init(), 2)}
 
+    def __dealloc__(self):
+        aligned_free(self._dt_reductions)
+
     def set_nnps(self, NNPS nnps):
         pass
 
@@ -53,6 +73,34 @@ cdef class Integrator:
     cpdef compute_accelerations(self, int index=0, update_nnps=True):
         self.integrator.compute_accelerations(index, update_nnps)
 
+    cpdef reset_dt_reductions(self):
+        cdef int i
+        for i in range(self._n_threads):
+            self._dt_reductions[i*DT_REDUCTION_STRIDE] = -1.0
+            self._dt_reductions[i*DT_REDUCTION_STRIDE + 1] = -1.0
+            self._dt_reductions[i*DT_REDUCTION_STRIDE + 2] = -1.0
+            self._dt_reductions[i*DT_REDUCTION_STRIDE + 3] = INFINITY
+        self._dt_reductions_valid = False
+
+    def get_dt_reductions(self):
+        """Return the maximum dt_cfl, dt_force, dt_visc and the minimum
+        dt_adapt of the real particles in `dt_reduction_arrays` as computed
+        by the stepper loops since the last acceleration evaluation.
+
+        Returns None if these are not available.
+        """
+        cdef int i, j
+        cdef double* red
+        if not self._dt_reductions_valid:
+            return None
+        result = [-1.0, -1.0, -1.0, INFINITY]
+        for i in range(self._n_threads):
+            red = self._dt_reductions + i*DT_REDUCTION_STRIDE
+            for j in range(3):
+                result[j] = max(result[j], red[j])
+            result[3] = min(result[3], red[3])
+        return tuple(result)
+
     cpdef update_domain(self):
         self.integrator.update_domain()
 
@@ -90,6 +138,7 @@ cdef class Integrator:
         cdef long NP_DEST
         cdef long d_idx
         cdef ParticleArrayWrapper dst
+        cdef double* _dt_red
         cdef double dt = self.dt
         cdef double t = self.t
         ${indent(helper.get_array_declarations(method), 2)}
@@ -107,7 +156,11 @@ cdef class Integrator:
         ${indent(helper.get_array_setup(dest, method), 2)}
         for d_idx in ${helper.get_parallel_range("NP_DEST")}:
             ${indent(helper.get_stepper_loop(dest, method), 3)}
+            ${indent(helper.get_dt_reduction_code(dest, method), 3)}
         % endif
         % endfor
+        % if method in helper.get_fused_dt_methods():
+        self._dt_reductions_valid = True
+        % endif
         _prof.stop()
     % endfor
@@ -7,6 +7,7 @@ from the `sph_eval` module.
 """
 
 import inspect
+import re
 from os.path import join, dirname
 from textwrap import dedent
 from mako.template import Template
@@ -22,6 +23,10 @@ getfullargspec = getattr(
     inspect, 'getfullargspec', inspect.getargspec
 )
 
+# The properties reduced for adaptive time steps, the first three are
+# maximized and the last is minimized.
+DT_REDUCTION_PROPS = ('dt_cfl', 'dt_force', 'dt_visc', 'dt_adapt')
+
 
 class IntegratorCythonHelper(object):
     """A helper that generates Cython code for the Integrator class.
@@ -123,6 +128,8 @@ class IntegratorCythonHelper(object):
             s, d = get_array_names(self.get_args(dest, method))
             self._check_arrays_for_properties(dest, s | d)
             arrays.update(s | d)
+            if self.has_dt_reduction(dest, method):
+                arrays.update(self._get_dt_reduction_arrays(dest))
 
         known_types = self.acceleration_eval_helper.known_types
         decl = []
@@ -135,7 +142,10 @@ class IntegratorCythonHelper(object):
 
     def get_array_setup(self, dest, method):
         s, d = get_array_names(self.get_args(dest, method))
-        lines = ['%s = dst.%s.data' % (n, n[2:]) for n in sorted(s | d)]
+        arrays = s | d
+        if self.has_dt_reduction(dest, method):
+            arrays.update(self._get_dt_reduction_arrays(dest))
+        lines = ['%s = dst.%s.data' % (n, n[2:]) for n in sorted(arrays)]
         return '\n'.join(lines)
 
     def get_stepper_loop(self, dest, method):
@@ -161,6 +171,55 @@ class IntegratorCythonHelper(object):
     def has_stepper_loop(self, dest, method):
         return hasattr(self.object.steppers[dest], method)
 
+    def get_fused_dt_methods(self):
+        """Return the stepper methods into which the reductions of the
+        adaptive timestep properties are fused.
+
+        These are the methods called after the last acceleration evaluation
+        in `one_timestep` when the integrator asks for fused reductions.
+        """
+        if not getattr(self.object, 'fuse_dt_reductions', False):
+            return []
+        methods = self.get_stepper_method_wrapper_names()
+        fused = []
+        for line in self.get_timestep_code().splitlines():
+            if 'compute_accelerations(' in line:
+                fused = []
+            for method in methods:
+                if re.search(r'self\.%s\(' % method, line) and \
+                   method not in fused:
+                    fused.append(method)
+        return fused
+
+    def get_dt_reduction_dests(self):
+        """Return the destinations whose timestep properties are reduced in
+        the fused stepper loops.
+        """
+        methods = self.get_fused_dt_methods()
+        return sorted(
+            dest for dest in self.object.steppers
+            if any(self.has_stepper_loop(dest, m) for m in methods)
+        )
+
+    def has_dt_reduction(self, dest, method):
+        return (method in self.get_fused_dt_methods() and
+                self.has_stepper_loop(dest, method) and
+                len(self._get_dt_reduction_arrays(dest)) > 0)
+
+    def get_dt_reduction_code(self, dest, method):
+        if not self.has_dt_reduction(dest, method):
+            return ''
+        arrays = self._get_dt_reduction_arrays(dest)
+        lines = ['_dt_red = self._dt_reductions + '
+                 'threadid()*DT_REDUCTION_STRIDE']
+        for i, prop in enumerate(DT_REDUCTION_PROPS):
+            arr = 'd_' + prop
+            if arr in arrays:
+                func = 'fmin' if prop == 'dt_adapt' else 'fmax'
+                lines.append('_dt_red[{i}] = {func}(_dt_red[{i}], '
+                             '{arr}[d_idx])'.format(i=i, func=func, arr=arr))
+        return '\n'.join(lines)
+
     def get_stepper_method_wrapper_names(self):
         """Returns the names of the methods we should wrap.  For a 2 stage
         method this will return ('initialize', 'stage1', 'stage2')
@@ -186,6 +245,10 @@ class IntegratorCythonHelper(object):
     # Private interface.
     ##########################################################################
 
+    def _get_dt_reduction_arrays(self, dest):
+        pa = self._particle_arrays[dest]
+        return set('d_' + x for x in DT_REDUCTION_PROPS if x in pa.properties)
+
     def _check_arrays_for_properties(self, dest, args):
         """Given a particle array name and a set of arguments used by an
         integrator stepper method, check if the particle array has the
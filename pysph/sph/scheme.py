@@ -1047,7 +1047,8 @@ class GasDScheme(Scheme):
 
             equations.append(Group(
                 equations=g1, update_nnps=True, iterate=True,
-                max_iterations=self.max_density_iterations
+                max_iterations=self.max_density_iterations,
+                converged_prop='converged'
             ))
 
         elif self.adaptive_h_scheme == 'gsph':
@@ -14,7 +14,8 @@ from compyle.profile import get_profile_info
 from pysph.sph.equation import Equation, Group
 from pysph.sph.acceleration_eval import (
     AccelerationEval, MegaGroup, CythonGroup,
-    check_equation_array_properties
+    check_equation_array_properties, get_neighbor_queries, get_remote_props,
+    get_used_props, remove_unused_props
 )
 from pysph.sph.basic_equations import SummationDensity
 from pysph.base.kernels import CubicSpline
@@ -135,6 +136,166 @@ class TestCheckEquationArrayProps(unittest.TestCase):
         check_equation_array_properties(eq, [f])
 
 
+class EOSEquation(Equation):
+    def initialize(self, d_idx, d_p, d_rho):
+        d_p[d_idx] = d_rho[d_idx]
+
+
+class PressureGradient(Equation):
+    def initialize(self, d_idx, d_au):
+        d_au[d_idx] = 0.0
+
+    def loop(self, d_idx, d_au, s_idx, s_p, s_m, DWIJ):
+        d_au[d_idx] += s_m[s_idx] * s_p[s_idx] * DWIJ[0]
+
+
+class TestGetRemoteProps(unittest.TestCase):
+    def test_should_only_use_props_needed_on_remote_particles(self):
+        # Given
+        f = get_particle_array(name='f', x0=[0.0])
+        s = get_particle_array(name='s', x0=[0.0])
+        equations = [
+            Group(equations=[SummationDensity(dest='f', sources=['f', 's'])]),
+            Group(equations=[EOSEquation(dest='f', sources=None)]),
+            Group(equations=[PressureGradient(dest='f', sources=['f'])]),
+        ]
+        a_eval = AccelerationEval(
+            particle_arrays=[f, s], equations=equations,
+            kernel=CubicSpline(dim=1)
+        )
+
+        # When
+        props = get_remote_props([a_eval])
+
+        # Then
+        base = ['gid', 'h', 'm', 'x', 'y', 'z']
+        self.assertEqual(props['f'], sorted(base + ['p', 'rho']))
+        self.assertEqual(props['s'], base)
+
+
+class TestGetNeighborQueries(unittest.TestCase):
+    def test_should_list_queries_of_each_group(self):
+        # Given
+        f = get_particle_array(name='f', x0=[0.0])
+        s = get_particle_array(name='s', x0=[0.0])
+        equations = [
+            Group(equations=[
+                SummationDensity(dest='f', sources=['f', 's']),
+                SummationDensity(dest='s', sources=['f']),
+            ]),
+            Group(equations=[EOSEquation(dest='f', sources=None)]),
+            Group(equations=[
+                PressureGradient(dest='f', sources=['f']),
+                SummationDensity(dest='f', sources=['f']),
+            ]),
+        ]
+        a_eval = AccelerationEval(
+            particle_arrays=[f, s], equations=equations,
+            kernel=CubicSpline(dim=1)
+        )
+
+        # When
+        queries = get_neighbor_queries([a_eval])
+
+        # Then
+        self.assertEqual(
+            queries, [('f', 'f'), ('f', 's'), ('s', 'f'), ('f', 'f')]
+        )
+
+
+class ReduceEquation(Equation):
+    def initialize(self, d_idx, d_au):
+        d_au[d_idx] = 0.0
+
+    def reduce(self, dst, t, dt):
+        dst.p[:] = dst.au.sum()
+
+
+class TestUsedProps(unittest.TestCase):
+    def _make_a_eval(self, equations):
+        from pysph.sph.integrator import EulerIntegrator
+        from pysph.sph.integrator_step import IntegratorStep
+
+        class Step(IntegratorStep):
+            def stage1(self, d_idx, d_u, d_au, dt):
+                d_u[d_idx] += dt*d_au[d_idx]
+
+        self.f = get_particle_array(name='f', x=[0.0], junk=[1.0])
+        self.f.add_property('moment', stride=16)
+        self.f.set_output_arrays(['x', 'rho'])
+        self.s = get_particle_array(name='s', x=[0.0], junk=[1.0])
+        a_eval = AccelerationEval(
+            particle_arrays=[self.f, self.s], equations=equations,
+            kernel=CubicSpline(dim=1)
+        )
+        return a_eval, EulerIntegrator(f=Step())
+
+    def test_should_find_props_used_by_equations_and_steppers(self):
+        # Given
+        equations = [
+            Group(equations=[SummationDensity(dest='f', sources=['f', 's'])]),
+            Group(equations=[PressureGradient(dest='f', sources=['f'])]),
+        ]
+        a_eval, integrator = self._make_a_eval(equations)
+
+        # When
+        used = get_used_props([a_eval], integrator)
+
+        # Then
+        self.assertTrue({'rho', 'p', 'au', 'u'} <= used['f'])
+        self.assertFalse({'junk', 'moment', 'v', 'aw'} & used['f'])
+        self.assertIn('m', used['s'])
+        self.assertFalse({'junk', 'p'} & used['s'])
+
+        # When
+        removed = remove_unused_props([a_eval], integrator)
+
+        # Then
+        self.assertIn('moment', removed['f'])
+        self.assertIn('junk', removed['s'])
+        self.assertNotIn('moment', self.f.properties)
+        self.assertNotIn('moment', self.f.stride)
+        self.assertEqual(self.f.output_property_arrays, ['x', 'rho'])
+        self.assertEqual(sorted(self.f.properties), sorted(used['f'] & set(
+            self.f.properties
+        )))
+
+    def test_should_keep_all_props_with_python_methods(self):
+        # Given
+        equations = [ReduceEquation(dest='f', sources=None)]
+        a_eval, integrator = self._make_a_eval(equations)
+
+        # When
+        used = get_used_props([a_eval], integrator)
+        removed = remove_unused_props([a_eval], integrator)
+
+        # Then
+        self.assertIsNone(used['f'])
+        self.assertNotIn('f', removed)
+        self.assertIn('junk', self.f.properties)
+        self.assertIn('junk', removed['s'])
+
+    def test_should_update_lb_props(self):
+        # Given
+        from pysph.base.utils import get_particle_array_wcsph
+        equations = [
+            Group(equations=[SummationDensity(dest='f', sources=['f'])]),
+        ]
+        a_eval, integrator = self._make_a_eval(equations)
+        f = get_particle_array_wcsph(name='f', x=[0.0])
+        f.set_lb_props(list(f.properties.keys()))
+        a_eval.particle_arrays[0] = f
+
+        # When
+        removed = remove_unused_props([a_eval], integrator)
+
+        # Then
+        self.assertIn('cs', removed['f'])
+        self.assertNotIn('cs', f.lb_props)
+        self.assertIn('rho', f.lb_props)
+        self.assertTrue(set(f.lb_props) <= set(f.properties))
+
+
 class SimpleEquation(Equation):
     def __init__(self, dest, sources):
         super(SimpleEquation, self).__init__(dest, sources)
@@ -159,6 +320,29 @@ class SimpleEquation(Equation):
         return result
 
 
+class CountToTarget(Equation):
+    def __init__(self, dest, sources):
+        super(CountToTarget, self).__init__(dest, sources)
+        self.done = 1
+
+    def initialize(self, d_idx, d_av):
+        self.done = 1
+
+    def loop(self, d_idx, d_av, s_idx, s_m):
+        d_av[d_idx] += s_m[s_idx]
+
+    def post_loop(self, d_idx, d_u, d_rho, d_converged):
+        d_u[d_idx] += 1.0
+        if d_u[d_idx] < d_rho[d_idx]:
+            d_converged[d_idx] = 0
+            self.done = -1
+        else:
+            d_converged[d_idx] = 1
+
+    def converged(self):
+        return self.done
+
+
 class MixedTypeEquation(Equation):
     def initialize(self, d_idx, d_u, d_au, d_pid, d_tag):
         d_u[d_idx] = 0.0 + d_pid[d_idx]
@@ -278,7 +462,7 @@ class TestMegaGroup(unittest.TestCase):
         g = Group(
             equations=[], real=False, update_nnps=True, iterate=True,
             max_iterations=20, min_iterations=2, pre=nothing, post=nothing,
-            start_idx=1, stop_idx=2
+            start_idx=1, stop_idx=2, converged_prop='converged'
         )
 
         # When
@@ -286,7 +470,8 @@ class TestMegaGroup(unittest.TestCase):
 
         # Then
         props = ('real update_nnps iterate max_iterations condition '
-                 'min_iterations pre post start_idx stop_idx').split()
+                 'min_iterations pre post start_idx stop_idx '
+                 'converged_prop').split()
         for prop in props:
             self.assertEqual(getattr(mg, prop), getattr(g, prop))
 
@@ -395,6 +580,72 @@ class TestAccelerationEval1D(unittest.TestCase):
         expect = np.asarray([3., 4., 5., 5., 5., 5., 5., 5., 4., 3.])
         self.assertListEqual(list(pa.u), list(expect))
 
+    def test_should_skip_converged_particles_in_iterated_group(self):
+        # Given
+        pa = self.pa
+        pa.add_property('converged', type='int')
+        pa.rho[:] = np.arange(1, 11)
+        equations = [Group(
+            equations=[CountToTarget(dest='fluid', sources=['fluid'])],
+            iterate=True, max_iterations=20, converged_prop='converged'
+        )]
+        a_eval = self._make_accel_eval(equations)
+
+        # When
+        a_eval.compute(0.1, 0.1)
+
+        # Then
+        self.assertListEqual(list(pa.u), list(pa.rho))
+        self.assertListEqual(list(pa.converged), [1]*10)
+        # Converged particles do not look for neighbors.
+        nbrs = np.asarray([3., 4., 5., 5., 5., 5., 5., 5., 4., 3.])
+        self.assertListEqual(list(pa.av), list(nbrs*pa.rho))
+
+    def test_should_skip_converged_particles_in_nested_groups(self):
+        # Given
+        pa = self.pa
+        pa.add_property('converged', type='int')
+        pa.rho[:] = np.arange(1, 11)
+        equations = [Group(
+            equations=[
+                Group(equations=[
+                    CountToTarget(dest='fluid', sources=['fluid'])
+                ]),
+            ],
+            iterate=True, max_iterations=20, converged_prop='converged'
+        )]
+        a_eval = self._make_accel_eval(equations)
+
+        # When
+        a_eval.compute(0.1, 0.1)
+
+        # Then
+        self.assertListEqual(list(pa.u), list(pa.rho))
+
+    def test_should_iterate_all_particles_without_converged_prop(self):
+        # Given
+        pa = self.pa
+        pa.add_property('converged', type='int')
+        pa.rho[:] = np.arange(1, 11)
+        equations = [Group(
+            equations=[CountToTarget(dest='fluid', sources=['fluid'])],
+            iterate=True, max_iterations=20
+        )]
+        a_eval = self._make_accel_eval(equations)
+
+        # When
+        a_eval.compute(0.1, 0.1)
+
+        # Then
+        self.assertListEqual(list(pa.u), [10.0]*10)
+
+    def test_converged_prop_needs_iterated_group(self):
+        self.assertRaises(
+            ValueError, Group,
+            equations=[CountToTarget(dest='fluid', sources=['fluid'])],
+            converged_prop='converged'
+        )
+
     def test_should_run_reduce(self):
         # Given.
         pa = self.pa
@@ -13,6 +13,10 @@ from pysph.sph.acceleration_eval import AccelerationEval
 from pysph.base.kernels import CubicSpline
 from pysph.base.nnps import LinkedListNNPS
 from pysph.sph.sph_compiler import SPHCompiler
+from pysph.sph.acceleration_eval_cython_helper import (
+    AccelerationEvalCythonHelper
+)
+from pysph.sph.integrator_cython_helper import IntegratorCythonHelper
 from pysph.sph.integrator import (LeapFrogIntegrator, PECIntegrator,
                                   PEFRLIntegrator, EulerIntegrator)
 from pysph.sph.integrator_step import (
@@ -199,6 +203,110 @@ class TestIntegratorAdaptiveTimestep(TestIntegratorBase):
         self.assertEqual(dt, expect)
 
 
+class PECEulerStep(IntegratorStep):
+    def initialize(self):
+        pass
+
+    def stage1(self):
+        pass
+
+    def stage2(self, d_idx, d_x, d_u, dt):
+        d_x[d_idx] += dt*d_u[d_idx]
+
+
+class DtEquation(Equation):
+    def initialize(self, d_idx, d_x, d_au, d_dt_cfl, d_dt_force):
+        d_au[d_idx] = -d_x[d_idx]
+        d_dt_cfl[d_idx] = 1.0 + d_idx
+        d_dt_force[d_idx] = 2.0 + d_idx
+
+
+class TestFusedDtReductions(TestIntegratorBase):
+    def setUp(self):
+        super(TestFusedDtReductions, self).setUp()
+        self.pa.extend(2)
+        self.pa.align_particles()
+        for prop in ('dt_cfl', 'dt_force'):
+            self.pa.add_property(prop)
+        self.pa.h[:] = 1.0
+        x = np.asarray([1.0])
+        self.solid = get_particle_array(name='solid', x=x, h=0.5, m=1.0)
+        self.solid.add_property('dt_cfl')
+        self.solid.dt_cfl[:] = 10.0
+
+    def _setup_integrator(self, equations, integrator):
+        kernel = CubicSpline(dim=1)
+        arrays = [self.pa, self.solid]
+        a_eval = AccelerationEval(
+            particle_arrays=arrays, equations=equations, kernel=kernel
+        )
+        comp = SPHCompiler(a_eval, integrator=integrator)
+        comp.compile()
+        nnps = LinkedListNNPS(dim=kernel.dim, particles=arrays)
+        a_eval.set_nnps(nnps)
+        integrator.set_nnps(nnps)
+
+    def test_reductions_are_done_in_stepper_loop(self):
+        # Given
+        integrator = EulerIntegrator(fluid=EulerStep())
+        integrator.set_fuse_dt_reductions(True)
+        equations = [DtEquation(dest='fluid', sources=None)]
+        self._setup_integrator(equations=equations, integrator=integrator)
+        c_integrator = integrator.c_integrator
+
+        # Then
+        self.assertEqual(c_integrator.dt_reduction_arrays, ('fluid',))
+        self.assertIsNone(c_integrator.get_dt_reductions())
+
+        # When
+        integrator.step(0.0, 0.1)
+
+        # Then
+        reductions = c_integrator.get_dt_reductions()
+        self.assertEqual(reductions[:3], (3.0, 4.0, -1.0))
+        self.assertEqual(reductions[3], np.inf)
+        dt = integrator.compute_time_step(0.1, 0.5)
+        self.assertAlmostEqual(dt, 0.5*0.5/10.0)
+
+        # When
+        self.solid.dt_cfl[:] = 1.0
+        self.pa.dt_cfl[:] = 100.0
+        dt = integrator.compute_time_step(0.1, 0.5)
+
+        # Then
+        # The fluid values are those from the stepper loop.
+        self.assertAlmostEqual(dt, 0.5*0.5/3.0)
+
+        # When
+        integrator.compute_accelerations()
+
+        # Then
+        self.assertIsNone(c_integrator.get_dt_reductions())
+
+    def test_fused_methods_follow_last_acceleration_evaluation(self):
+        # Given
+        integrator = PECIntegrator(fluid=PECEulerStep())
+        integrator.set_fuse_dt_reductions(True)
+        equations = [DtEquation(dest='fluid', sources=None)]
+        self._setup_integrator(equations=equations, integrator=integrator)
+        helper = IntegratorCythonHelper(
+            integrator, AccelerationEvalCythonHelper(
+                integrator.acceleration_evals[0]
+            )
+        )
+
+        # When
+        integrator.step(0.0, 0.1)
+
+        # Then
+        self.assertEqual(helper.get_fused_dt_methods(), ['stage2'])
+        self.assertEqual(integrator.c_integrator.dt_reduction_arrays,
+                         ('fluid',))
+        self.assertEqual(
+            integrator.c_integrator.get_dt_reductions()[:2], (3.0, 4.0)
+        )
+
+
 class S1Step(IntegratorStep):
 
     def py_stage1(self, dest, t, dt):
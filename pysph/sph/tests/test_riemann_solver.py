@@ -4,7 +4,7 @@ from pytest import approx
 import pysph.sph.gas_dynamics.riemann_solver as R
 
 solvers = [
-    R.ducowicz, R.exact, R.hll_ball, R.hllc,
+    R.adaptive, R.ducowicz, R.exact, R.hll_ball, R.hllc,
     R.hllc_ball, R.hlle, R.hllsy, R.llxf, R.roe,
     R.van_leer
 ]
@@ -88,6 +88,33 @@ def test_van_leer():
     _check_woodward_collela(solver, rel=1e-2)
 
 
+def test_adaptive():
+    solver = R.adaptive
+    _check_shock_tube(solver, rel=1e-4)
+    _check_blastwave(solver, rel=1e-3)
+    _check_sjogreen(solver, abs=1e-4)
+    _check_woodward_collela(solver, rel=1e-4)
+
+
+def test_adaptive_matches_exact_for_smooth_states():
+    # Given
+    gamma = 1.4
+    rhol, pl, ul = 1.0, 1.0, 0.01
+    rhor, pr, ur = 1.05, 1.1, 0.0
+    expect = [0.0, 0.0]
+    R.exact(rhol, rhor, pl, pr, ul, ur, gamma, niter=20, tol=1e-6,
+            result=expect)
+
+    # When
+    result = [0.0, 0.0]
+    ret = R.adaptive(rhol, rhor, pl, pr, ul, ur, gamma, niter=20,
+                     tol=1e-6, result=result)
+
+    # Then
+    assert ret == 0
+    assert result == approx(expect, rel=1e-3)
+
+
 def test_ducowicz():
     solver = R.ducowicz
     _check_shock_tube(solver, rel=0.2)
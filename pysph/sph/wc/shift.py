@@ -214,6 +214,7 @@ class ShiftPositions(Tool):
         self.dt = app.solver.dt
         self.dim = app.solver.dim
         self.kernel = app.solver.kernel
+        self.nnps = app.nnps
         self.array = get_array_by_name(self.particles, array_name)
         self.freq = freq
         self.kind = shift_kind
@@ -225,7 +226,7 @@ class ShiftPositions(Tool):
         assert self.kind in options, 'shift_kind should be one of %s' % options
 
     def _get_sph_eval(self, kind):
-        from pysph.tools.sph_evaluator import SPHEvaluator
+        from pysph.tools.sph_evaluator import SPHEvaluator, can_share_nnps
         from pysph.sph.equation import Group
         if self._sph_eval is None:
             arr = self.array
@@ -254,9 +255,13 @@ class ShiftPositions(Tool):
                 eqns.append(Group(equations=[
                     CorrectVelocities(name, [name])]))
 
+            # Reuse the solver's NNPS if possible, this needs all its arrays.
+            arrays = [arr]
+            if can_share_nnps(self.nnps, self.particles, self.kernel):
+                arrays = self.particles
             sph_eval = SPHEvaluator(
-                arrays=[arr], equations=eqns, dim=self.dim,
-                kernel=self.kernel)
+                arrays=arrays, equations=eqns, dim=self.dim,
+                kernel=self.kernel, nnps=self.nnps)
             return sph_eval
         else:
             return self._sph_eval
@@ -266,6 +271,12 @@ class ShiftPositions(Tool):
             pass
         elif self.count % self.freq == 0:
             self._sph_eval = self._get_sph_eval(self.kind)
+            if (self._sph_eval.shares_nnps and
+                    self._sph_eval.nnps is not solver.nnps):
+                # The solver's NNPS was replaced, e.g. with '--nnps auto'.
+                self._sph_eval.set_nnps(solver.nnps)
+            # The particles have moved since the solver last updated the
+            # NNPS, so it must be updated even when it is shared.
             self._sph_eval.update()
             self._sph_eval.evaluate(dt=self.dt)
         self.count += 1
@@ -0,0 +1,312 @@
+"""Run a matrix of PySPH examples in parallel.
+
+The cases are given in a JSON or YAML (needs PyYAML) file, for example::
+
+    output_dir: nightly
+    timeout: 3600
+    args: [--max-steps, 100]
+    cases:
+      - example: elliptical_drop
+        matrix:
+          kernel: [CubicSpline, WendlandQuintic]
+          nnps: [ll, sh]
+      - example: cavity
+        args: --nx 25
+        timeout: 600
+
+Each entry of ``cases`` runs the example with its ``args`` after the common
+``args``, the ``matrix`` is expanded into one case for each combination of
+its values, a key ``name`` becomes the option ``--name`` and a value of True
+only passes the option.  Each case is run in a separate process with the
+output in ``<output_dir>/<case name>`` and is killed after ``timeout``
+seconds.  The processes share the available cores, see ``threads``.
+
+The code for all the cases is first compiled, the variants of an example are
+compiled one after the other so each distinct module is built only once while
+different examples are compiled in parallel.  A summary of the cases with the
+wall time, number of steps and particles is saved to ``summary.json``.
+
+"""
+
+from __future__ import print_function
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import multiprocessing
+import os
+from os.path import abspath, basename, dirname, exists, join, splitext
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+
+def load_spec(fname):
+    """Load the batch specification from a JSON or YAML file.
+    """
+    with open(fname) as f:
+        if fname.endswith('.json'):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(
+                'PyYAML is needed to read %s, install it or use a JSON file.'
+                % fname
+            )
+        return yaml.safe_load(f)
+
+
+def _as_list(args):
+    if args is None:
+        return []
+    elif isinstance(args, str):
+        return args.split()
+    return [str(x) for x in args]
+
+
+def _option_args(key, value):
+    opt = key if key.startswith('-') else '--' + key
+    if value is True:
+        return [opt]
+    elif value is False or value is None:
+        return []
+    return [opt, str(value)]
+
+
+def _get_case_name(name, params):
+    parts = [name]
+    for key, value in params:
+        parts.append('%s_%s' % (key.lstrip('-'), value))
+    return re.sub(r'[^\w.=-]+', '_', '_'.join(parts))
+
+
+def expand_cases(spec, output_dir=None):
+    """Return the list of cases in the specification.
+
+    Each case is a dictionary with the `name`, the `example` module, the
+    `args` to pass to it, the `output_dir` and the `timeout`.
+    """
+    from pysph.examples.run import guess_correct_module
+    if output_dir is None:
+        output_dir = spec.get('output_dir', 'batch_output')
+    common = _as_list(spec.get('args'))
+    cases = []
+    for entry in spec['cases']:
+        example = guess_correct_module(entry['example'])
+        matrix = entry.get('matrix') or {}
+        keys = list(matrix.keys())
+        values = [v if isinstance(v, list) else [v] for v in matrix.values()]
+        for combination in itertools.product(*values):
+            params = list(zip(keys, combination))
+            args = common + _as_list(entry.get('args'))
+            for key, value in params:
+                args.extend(_option_args(key, value))
+            name = _get_case_name(
+                entry.get('name', example.split('.')[-1]), params
+            )
+            cases.append(dict(
+                name=name, example=example, args=args,
+                output_dir=abspath(join(output_dir, name)),
+                timeout=entry.get('timeout', spec.get('timeout'))
+            ))
+    names = [c['name'] for c in cases]
+    duplicates = sorted(set(x for x in names if names.count(x) > 1))
+    if duplicates:
+        raise ValueError('Cases have the same name: %s, give them a name.'
+                         % ', '.join(duplicates))
+    return cases
+
+
+def get_command(case, output_dir=None, extra_args=()):
+    """Return the command line to run the case.
+    """
+    if output_dir is None:
+        output_dir = case['output_dir']
+    return ([sys.executable, '-m', case['example']] + case['args'] +
+            list(extra_args) + ['-d', output_dir])
+
+
+def _read_info(output_dir):
+    files = [x for x in os.listdir(output_dir) if x.endswith('.info')]
+    if not files:
+        return {}
+    with open(join(output_dir, files[0])) as f:
+        return json.load(f)
+
+
+def run_case(case, env=None, output_dir=None, extra_args=()):
+    """Run the case in a new process and return a summary of the run.
+    """
+    if output_dir is None:
+        output_dir = case['output_dir']
+    if not exists(output_dir):
+        os.makedirs(output_dir)
+    cmd = get_command(case, output_dir, extra_args)
+    result = dict(name=case['name'], example=case['example'], command=cmd,
+                  output_dir=output_dir)
+    start = time.time()
+    with open(join(output_dir, 'batch_output.txt'), 'w') as f:
+        try:
+            proc = subprocess.run(
+                cmd, stdout=f, stderr=subprocess.STDOUT, env=env,
+                timeout=case['timeout']
+            )
+        except subprocess.TimeoutExpired:
+            result.update(status='timeout', returncode=None)
+        else:
+            status = 'ok' if proc.returncode == 0 else 'failed'
+            result.update(status=status, returncode=proc.returncode)
+    result['wall_time'] = time.time() - start
+    info = _read_info(output_dir)
+    result['cpu_time'] = info.get('cpu_time')
+    result['n_steps'] = info.get('n_steps')
+    counts = info.get('n_particles')
+    result['n_particles'] = sum(counts.values()) if counts else None
+    return result
+
+
+def _get_env(threads, extra=None):
+    env = dict(os.environ)
+    env['OMP_NUM_THREADS'] = str(threads)
+    if extra:
+        env.update((k, str(v)) for k, v in extra.items())
+    return env
+
+
+def _precompile_example(cases, root, env):
+    results = []
+    for case in cases:
+        result = run_case(case, env, join(root, case['name']),
+                          ['--compile-only', '--disable-output'])
+        results.append(result)
+    return results
+
+
+def precompile(cases, root, jobs, env=None):
+    """Compile the code of all the cases using `jobs` processes.
+
+    The cases of an example are compiled in turn so that a module shared by
+    them is only compiled once.  Returns the summaries of the cases that
+    failed to compile.
+    """
+    groups = {}
+    for case in cases:
+        groups.setdefault(case['example'], []).append(case)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_precompile_example, group, root, env)
+            for group in groups.values()
+        ]
+        results = sum((f.result() for f in futures), [])
+    # Only the output of the cases that failed is kept.
+    failed = [r for r in results if r['status'] != 'ok']
+    for result in results:
+        if result['status'] == 'ok':
+            shutil.rmtree(result['output_dir'], ignore_errors=True)
+    if not failed:
+        shutil.rmtree(root, ignore_errors=True)
+    return failed
+
+
+def run_batch(cases, jobs=1, threads=None, env=None, compile_first=True,
+              output_dir='batch_output', verbose=True):
+    """Run the cases, `jobs` at a time, and return their summaries.
+
+    Each process uses `threads` OpenMP threads which defaults to sharing the
+    cores between the jobs.
+    """
+    if threads is None:
+        threads = max(1, multiprocessing.cpu_count()//jobs)
+    env = _get_env(threads, env)
+    if compile_first:
+        if verbose:
+            print('Compiling %d cases.' % len(cases))
+        failed = precompile(cases, join(output_dir, '_precompile'), jobs, env)
+        for result in failed:
+            print('Compiling %s failed, see %s.' % (
+                result['name'], result['output_dir']
+            ))
+
+    def _run(case):
+        result = run_case(case, env)
+        if verbose:
+            print('%-50s %-8s %10.2f s' % (
+                result['name'], result['status'], result['wall_time']
+            ))
+        return result
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_run, cases))
+
+
+def print_summary(results):
+    print('%-50s %-8s %10s %8s %12s' % (
+        'Case', 'Status', 'Time (s)', 'Steps', 'Particles'
+    ))
+    for r in results:
+        print('%-50s %-8s %10.2f %8s %12s' % (
+            r['name'], r['status'], r['wall_time'], r['n_steps'],
+            r['n_particles']
+        ))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='run --batch', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('spec', help='JSON or YAML file with the cases.')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='Number of cases to run at a time.'
+    )
+    parser.add_argument(
+        '--threads', type=int, default=None,
+        help='OpenMP threads for each case, defaults to the number of '
+        'cores divided by the number of jobs.'
+    )
+    parser.add_argument(
+        '-d', '--directory', dest='output_dir', default=None,
+        help='Output directory, overrides the output_dir of the file.'
+    )
+    parser.add_argument(
+        '--no-compile', action='store_false', dest='compile_first',
+        default=True,
+        help='Do not compile the code for all the cases first.'
+    )
+    parser.add_argument(
+        '--filter', default=None,
+        help='Only run the cases whose name matches this regular expression.'
+    )
+    options = parser.parse_args(argv)
+
+    spec = load_spec(options.spec)
+    output_dir = options.output_dir
+    if output_dir is None:
+        output_dir = spec.get(
+            'output_dir',
+            join(dirname(abspath(options.spec)),
+                 splitext(basename(options.spec))[0] + '_output')
+        )
+    cases = expand_cases(spec, output_dir)
+    if options.filter:
+        regex = re.compile(options.filter)
+        cases = [c for c in cases if regex.search(c['name'])]
+
+    results = run_batch(
+        cases, jobs=options.jobs,
+        threads=options.threads or spec.get('threads'),
+        env=spec.get('env'), compile_first=options.compile_first,
+        output_dir=output_dir
+    )
+    print_summary(results)
+    if not exists(output_dir):
+        os.makedirs(output_dir)
+    with open(join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+    if any(r['status'] != 'ok' for r in results):
+        sys.exit(1)
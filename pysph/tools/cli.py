@@ -50,6 +50,11 @@ def manage_cache(args):
     main(args)
 
 
+def run_benchmarks(args):
+    from pysph.benchmarks.runner import main
+    main(args)
+
+
 def main():
     parser = ArgumentParser(description=__doc__, add_help=False)
     parser.add_argument(
@@ -104,6 +109,13 @@ def main():
     )
     cache.set_defaults(func=manage_cache)
 
+    bench = subparsers.add_parser(
+        'bench',
+        help='Run the benchmarks and compare them with a baseline',
+        add_help=False
+    )
+    bench.set_defaults(func=run_benchmarks)
+
     if (len(sys.argv) == 1 or (len(sys.argv) > 1 and
                                sys.argv[1] in ['-h', '--help'])):
         parser.print_help()
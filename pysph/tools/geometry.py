@@ -809,9 +809,84 @@ def show_3d(points, **kw):
     mlab.axes(xlabel='X', ylabel='Y', zlabel='Z')
 
 
+def _get_packed_particles(add_opt_func, folder, dx, dim, geometry, params,
+                          packer_kw, layer=True, cache_dir=None,
+                          warm_start=False, levels=1):
+    """Return the packing with the given inputs from the cache, or pack the
+    particles (and the layer around them if `layer` is True) and save the
+    packing in the cache.
+
+    If `levels` is more than one, the particles are first packed at twice
+    the spacing (recursively) with a ten times looser tolerance and the
+    packing starts from this coarse packing with each particle split into
+    ``2**dim`` particles.
+    """
+    import os
+    from pysph.tools.packer import HDX, get_packing_folders, readdata
+    from pysph.tools.packing_cache import (
+        PackingCache, get_cache_dir, get_packing_key, refine_points
+    )
+    if cache_dir is None:
+        cache_dir = get_cache_dir(folder)
+    cache = PackingCache(cache_dir)
+    key = get_packing_key(geometry, dx, HDX, dim, params)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    nearby = None
+    if levels > 1:
+        # The coarse packing is only a starting point, it need not be
+        # converged as tightly as the final one.
+        tol = 10*(packer_kw.get('tol') or 1e-2)
+        coarse = _get_packed_particles(
+            add_opt_func, folder, 2*dx, dim, geometry, dict(params, tol=tol),
+            dict(packer_kw, tol=tol), layer=layer, cache_dir=cache_dir,
+            warm_start=warm_start, levels=levels - 1
+        )
+        nearby = coarse, 2
+    elif warm_start:
+        nearby = cache.find_nearby(geometry, dx, HDX, dim, params)
+
+    initial = None
+    if nearby is not None:
+        (xs, ys, zs, xf, yf, zf), factor = nearby
+        xyz = [np.concatenate((np.ravel(a), np.ravel(b)))
+               for a, b in ((xs, xf), (ys, yf), (zs, zf))]
+        if dim == 2:
+            xyz[2] = np.zeros_like(xyz[0])
+        initial = refine_points(*xyz, dx=dx*factor, factor=factor, dim=dim)
+
+    preprocess_folder, layer_folder, res_file = get_packing_folders(folder, dx)
+    # The results of the layer are appended to an existing file.
+    if os.path.exists(res_file):
+        os.remove(res_file)
+
+    from pysph.tools.packer import Packer, HexaToRectLayer
+    packer = Packer(
+        None, preprocess_folder, None, add_opt_func, dx, res_file, dim=dim,
+        initial=initial, **packer_kw
+    )
+    packer.run()
+    packer.post_process(packer.info_filename)
+
+    if layer:
+        hextorect = HexaToRectLayer(
+            None, layer_folder, None, add_opt_func, dx, res_file, dim=dim,
+            no_solid=True, **packer_kw
+        )
+        hextorect.run()
+        hextorect.post_process(hextorect.info_filename)
+
+    data = readdata(res_file)
+    cache.put(key, data, geometry, dx, HDX, dim, params)
+    return data
+
+
 def get_packed_periodic_packed_particles(add_opt_func, folder, dx, L, B, H=0,
                                          dim=2, dfreq=-1, pb=None, nu=None,
-                                         k=None, tol=1e-2):
+                                         k=None, tol=1e-2, cache_dir=None,
+                                         warm_start=False, levels=1):
     """ Creates a periodic packed 2D or 3D domain. It creates particles which
     are not aligned but packed such that the number density is uniform.
 
@@ -839,6 +914,16 @@ def get_packed_periodic_packed_particles(add_opt_func, folder, dx, L, B, H=0,
         coefficient of repulsion (default: 0.005*dx)
     tol : float
         tolerance value for convergence (default: 1e-2)
+    cache_dir : string
+        directory of the packing cache, see
+        :py:mod:`pysph.tools.packing_cache`
+    warm_start : bool
+        if True, start from a cached packing at a nearby spacing or at an
+        integer multiple of the spacing when there is one (default: False)
+    levels : int
+        number of levels of a coarse to fine packing, with 2 or 3 the
+        particles are first packed at 2 or 4 times the spacing and each
+        finer packing starts from the coarser one (default: 1)
 
     Returns
     -------
@@ -855,30 +940,21 @@ def get_packed_periodic_packed_particles(add_opt_func, folder, dx, L, B, H=0,
     zf: float
         z coordinate of fluid particles
     """
-    from pysph.tools.packer import get_packing_folders, readdata
-    import os
-    preprocess_folder, layer_folder, res_file = get_packing_folders(folder, dx)
-    no_solid = True
-
-    if os.path.exists(res_file):
-        return readdata(res_file)
-    else:
-        from pysph.tools.packer import Packer
-        packer = Packer(
-            None, preprocess_folder, None, add_opt_func, dx, res_file, dim=dim,
-            L=L, B=B, H=H, pb=pb, nu=nu, k=k, dfreq=dfreq, no_solid=no_solid,
-            tol=tol
-        )
-        packer.run()
-        packer.post_process(packer.info_filename)
-        return readdata(res_file)
+    from pysph.tools.packing_cache import hash_geometry
+    geometry = hash_geometry(L=L, B=B, H=H)
+    params = dict(pb=pb, nu=nu, k=k, dfreq=dfreq, tol=tol)
+    return _get_packed_particles(
+        add_opt_func, folder, dx, dim, geometry, params,
+        dict(L=L, B=B, H=H, no_solid=True, **params), layer=False,
+        cache_dir=cache_dir, warm_start=warm_start, levels=levels
+    )
 
 
 def get_packed_2d_particles_from_surface_coordinates(
         add_opt_func, folder, dx, x, y, pb=None, nu=None, k=None, scale=1.0,
         shift=False, dfreq=-1, invert_normal=False, hardpoints=None,
         use_prediction=False, filter_layers=False, reduce_dfreq=False,
-        tol=1e-2):
+        tol=1e-2, cache_dir=None, warm_start=False, levels=1):
     """ Creates a packed configuration of particles around the given
     coordinates of a 2D geometry.
 
@@ -916,6 +992,16 @@ def get_packed_2d_particles_from_surface_coordinates(
         if True, reduce projection frequency
     tol : float
         tolerance value for convergence (default: 1e-2)
+    cache_dir : string
+        directory of the packing cache, see
+        :py:mod:`pysph.tools.packing_cache`
+    warm_start : bool
+        if True, start from a cached packing at a nearby spacing or at an
+        integer multiple of the spacing when there is one (default: False)
+    levels : int
+        number of levels of a coarse to fine packing, with 2 or 3 the
+        particles are first packed at 2 or 4 times the spacing and each
+        finer packing starts from the coarser one (default: 1)
 
     Returns
     -------
@@ -933,40 +1019,27 @@ def get_packed_2d_particles_from_surface_coordinates(
         z coordinate of fluid particles
     """
 
-    from pysph.tools.packer import get_packing_folders, readdata
-    import os
-    preprocess_folder, layer_folder, res_file = get_packing_folders(folder, dx)
-
-    if os.path.exists(res_file):
-        return readdata(res_file)
-    else:
-        from pysph.tools.packer import Packer, HexaToRectLayer
-        packer = Packer(
-            None, preprocess_folder, None, add_opt_func, dx, res_file, dim=2,
-            x=x, y=y, pb=pb, nu=nu, k=k, dfreq=dfreq, hardpoints=hardpoints,
-            use_prediction=use_prediction, filter_layers=filter_layers,
-            reduce_dfreq=reduce_dfreq, tol=tol, scale=scale, shift=shift,
-            invert_normal=invert_normal)
-        packer.run()
-        packer.post_process(packer.info_filename)
-
-        hextorect = HexaToRectLayer(
-            None, layer_folder, None, add_opt_func, dx, res_file, dim=2, x=x,
-            y=y, pb=pb, nu=nu, k=k, dfreq=dfreq, hardpoints=hardpoints,
-            use_prediction=use_prediction, filter_layers=filter_layers,
-            reduce_dfreq=reduce_dfreq, tol=tol, scale=scale, shift=shift,
-            invert_normal=invert_normal, no_solid=True)
-        hextorect.run()
-        hextorect.post_process(hextorect.info_filename)
-
-        return readdata(res_file)
+    from pysph.tools.packing_cache import hash_geometry
+    geometry = hash_geometry(x=x, y=y, scale=scale)
+    params = dict(
+        pb=pb, nu=nu, k=k, dfreq=dfreq, hardpoints=hardpoints,
+        use_prediction=use_prediction, filter_layers=filter_layers,
+        reduce_dfreq=reduce_dfreq, tol=tol, shift=shift,
+        invert_normal=invert_normal
+    )
+    return _get_packed_particles(
+        add_opt_func, folder, dx, 2, geometry, params,
+        dict(x=x, y=y, scale=scale, **params), cache_dir=cache_dir,
+        warm_start=warm_start, levels=levels
+    )
 
 
 def get_packed_2d_particles_from_surface_file(
         add_opt_func, folder, dx, filename, pb=None, nu=None, k=None,
         scale=1.0, shift=False, dfreq=-1, invert_normal=False,
         hardpoints=None, use_prediction=False, filter_layers=False,
-        reduce_dfreq=False, tol=1e-2):
+        reduce_dfreq=False, tol=1e-2, cache_dir=None, warm_start=False,
+        levels=1):
     """ Creates a packed configuration of particles around the given geometry
     file containing the x, y coordinates.
 
@@ -1002,6 +1075,16 @@ def get_packed_2d_particles_from_surface_file(
         if True, reduce projection frequency
     tol : float
         tolerance value for convergence (default: 1e-2)
+    cache_dir : string
+        directory of the packing cache, see
+        :py:mod:`pysph.tools.packing_cache`
+    warm_start : bool
+        if True, start from a cached packing at a nearby spacing or at an
+        integer multiple of the spacing when there is one (default: False)
+    levels : int
+        number of levels of a coarse to fine packing, with 2 or 3 the
+        particles are first packed at 2 or 4 times the spacing and each
+        finer packing starts from the coarser one (default: 1)
 
     Returns
     -------
@@ -1019,41 +1102,27 @@ def get_packed_2d_particles_from_surface_file(
         z coordinate of fluid particles
     """
 
-    from pysph.tools.packer import get_packing_folders, readdata
-    import os
-    preprocess_folder, layer_folder, res_file = get_packing_folders(folder, dx)
-
-    if os.path.exists(res_file):
-        return readdata(res_file)
-    else:
-        from pysph.tools.packer import Packer, HexaToRectLayer
-        packer = Packer(
-            None, preprocess_folder, None, add_opt_func, dx, res_file, dim=2,
-            filename=filename, pb=pb, nu=nu, k=k, dfreq=dfreq,
-            hardpoints=hardpoints, use_prediction=use_prediction,
-            filter_layers=filter_layers, reduce_dfreq=reduce_dfreq, tol=tol,
-            scale=scale, shift=shift, invert_normal=invert_normal)
-        packer.run()
-        packer.post_process(packer.info_filename)
-
-        hextorect = HexaToRectLayer(
-            None, layer_folder, None, add_opt_func, dx, res_file, dim=2,
-            filename=filename, pb=pb, nu=nu, k=k, dfreq=dfreq,
-            hardpoints=hardpoints, use_prediction=use_prediction,
-            filter_layers=filter_layers, reduce_dfreq=reduce_dfreq, tol=tol,
-            scale=scale, shift=shift, invert_normal=invert_normal,
-            no_solid=True)
-        hextorect.run()
-        hextorect.post_process(hextorect.info_filename)
-
-        return readdata(res_file)
+    from pysph.tools.packing_cache import hash_geometry
+    geometry = hash_geometry(filename=filename, scale=scale)
+    params = dict(
+        pb=pb, nu=nu, k=k, dfreq=dfreq, hardpoints=hardpoints,
+        use_prediction=use_prediction, filter_layers=filter_layers,
+        reduce_dfreq=reduce_dfreq, tol=tol, shift=shift,
+        invert_normal=invert_normal
+    )
+    return _get_packed_particles(
+        add_opt_func, folder, dx, 2, geometry, params,
+        dict(filename=filename, scale=scale, **params), cache_dir=cache_dir,
+        warm_start=warm_start, levels=levels
+    )
 
 
 def get_packed_3d_particles_from_surface_file(
         add_opt_func, folder, dx, filename, pb=None, nu=None, k=None,
         scale=1.0, shift=False, dfreq=-1, invert_normal=False,
         hardpoints=None, use_prediction=False, filter_layers=False,
-        reduce_dfreq=False, tol=1e-2):
+        reduce_dfreq=False, tol=1e-2, cache_dir=None, warm_start=False,
+        levels=1):
     """ Creates a packed configuration of particles around the given STL
     file containing the x, y, z coordinates and normals.
 
@@ -1089,6 +1158,16 @@ def get_packed_3d_particles_from_surface_file(
         if True, reduce projection frequency
     tol : float
         tolerance value for convergence (default: 1e-2)
+    cache_dir : string
+        directory of the packing cache, see
+        :py:mod:`pysph.tools.packing_cache`
+    warm_start : bool
+        if True, start from a cached packing at a nearby spacing or at an
+        integer multiple of the spacing when there is one (default: False)
+    levels : int
+        number of levels of a coarse to fine packing, with 2 or 3 the
+        particles are first packed at 2 or 4 times the spacing and each
+        finer packing starts from the coarser one (default: 1)
 
     Returns
     -------
@@ -1105,34 +1184,19 @@ def get_packed_3d_particles_from_surface_file(
     zf: float
         z coordinate of fluid particles
     """
-    from pysph.tools.packer import get_packing_folders, readdata
-    import os
-    preprocess_folder, layer_folder, res_file = get_packing_folders(folder, dx)
-
-    if os.path.exists(res_file):
-        return readdata(res_file)
-    else:
-        from pysph.tools.packer import Packer, HexaToRectLayer
-        packer = Packer(
-            None, preprocess_folder, None, add_opt_func, dx, res_file, dim=3,
-            filename=filename, pb=pb, nu=nu, k=k, dfreq=dfreq,
-            hardpoints=hardpoints, use_prediction=use_prediction,
-            filter_layers=filter_layers, reduce_dfreq=reduce_dfreq, tol=tol,
-            scale=scale, shift=shift, invert_normal=invert_normal)
-        packer.run()
-        packer.post_process(packer.info_filename)
-
-        hextorect = HexaToRectLayer(
-            None, layer_folder, None, add_opt_func, dx, res_file, dim=3,
-            filename=filename, pb=pb, nu=nu, k=k, dfreq=dfreq,
-            hardpoints=hardpoints, use_prediction=use_prediction,
-            filter_layers=filter_layers, reduce_dfreq=reduce_dfreq, tol=tol,
-            scale=scale, shift=shift, invert_normal=invert_normal,
-            no_solid=True)
-        hextorect.run()
-        hextorect.post_process(hextorect.info_filename)
-
-        return readdata(res_file)
+    from pysph.tools.packing_cache import hash_geometry
+    geometry = hash_geometry(filename=filename, scale=scale)
+    params = dict(
+        pb=pb, nu=nu, k=k, dfreq=dfreq, hardpoints=hardpoints,
+        use_prediction=use_prediction, filter_layers=filter_layers,
+        reduce_dfreq=reduce_dfreq, tol=tol, shift=shift,
+        invert_normal=invert_normal
+    )
+    return _get_packed_particles(
+        add_opt_func, folder, dx, 3, geometry, params,
+        dict(filename=filename, scale=scale, **params), cache_dir=cache_dir,
+        warm_start=warm_start, levels=levels
+    )
 
 
 def create_fluid_around_packing(dx, xf, yf, L, B, zf=[0.0], H=0.0, **props):
@@ -38,6 +38,28 @@ class InterpolateSPH(Equation):
         d_prop[d_idx] += s_m[s_idx]/s_rho[s_idx]*WIJ*s_temp_prop[s_idx]
 
 
+class InterpolationWeights(Equation):
+    """Save the neighbors and kernel weights of each destination point.
+
+    At most ``d_max_nbrs[0]`` neighbors are saved for each point, ``d_nnbr``
+    is the number of neighbors found which may be larger. The index saved is
+    offset by the source's ``interp_offset`` constant so it is unique over
+    all the sources.
+    """
+    def initialize(self, d_idx, d_nnbr):
+        d_nnbr[d_idx] = 0
+
+    def loop(self, d_idx, s_idx, d_nnbr, d_nbr_idx, d_nbr_w, d_max_nbrs,
+             s_interp_offset, WIJ):
+        k, i = declare('int', 2)
+        k = d_nnbr[d_idx]
+        if k < d_max_nbrs[0]:
+            i = d_idx*d_max_nbrs[0] + k
+            d_nbr_idx[i] = s_idx + s_interp_offset[0]
+            d_nbr_w[i] = WIJ
+        d_nnbr[d_idx] += 1
+
+
 class SPHFirstOrderApproximationPreStep(Equation):
     def __init__(self, dest, sources, dim=1):
         self.dim = dim
@@ -207,7 +229,7 @@ class Interpolator(object):
 
     def __init__(self, particle_arrays, num_points=125000, kernel=None,
                  x=None, y=None, z=None, domain_manager=None,
-                 equations=None, method='shepard'):
+                 equations=None, method='shepard', cache_weights=False):
         """
         The x, y, z coordinates need not be specified, and if they are not,
         the bounds of the interpolated domain is automatically computed and
@@ -236,6 +258,11 @@ class Interpolator(object):
         method : str
             String with the following allowed methods: 'shepard', 'sph',
             'order1'
+        cache_weights : bool
+            Save the interpolation weights of the 'shepard' and 'sph'
+            methods so that further interpolations on the same particles
+            and points do not need a neighbor search. The weights are
+            discarded when the particles or points are updated.
         """
         self._set_particle_arrays(particle_arrays)
         bounds = get_bounding_box(self.particle_arrays)
@@ -251,6 +278,9 @@ class Interpolator(object):
         self.nnps = None
         self.equations = equations
         self.func_eval = None
+        self.weights_eval = None
+        self.cache_weights = cache_weights
+        self._weights = None
         self.domain_manager = domain_manager
         self.method = method
         if method not in ['sph', 'shepard', 'order1']:
@@ -333,6 +363,9 @@ class Interpolator(object):
         A numpy array suitably shaped with the property interpolated.
         """
         assert isinstance(comp, int), 'Error: only interger value is allowed'
+        if self.cache_weights and self._can_use_weights() and comp == 0:
+            return self._apply_weights(*self._get_weights(), prop=prop)
+
         for array in self.particle_arrays:
             if prop not in array.properties:
                 data = 0.0
@@ -355,6 +388,37 @@ class Interpolator(object):
         result.shape = self.shape
         return result.squeeze()
 
+    def interpolate_many(self, props, comp=0):
+        """Interpolate the given properties.
+
+        For the 'shepard' and 'sph' methods the interpolation weights are
+        computed in one neighbor pass and applied to each property.
+
+        Parameters
+        ----------
+
+        props: list
+            The names of the properties to interpolate.
+
+        comp: int
+            The component of the gradient required
+
+        Returns
+        -------
+        A dict of suitably shaped numpy arrays keyed on the property names.
+        """
+        if not self._can_use_weights():
+            return dict((prop, self.interpolate(prop, comp)) for prop in props)
+
+        if comp:
+            raise RuntimeError("Error: use 'order1' method to evaluate"
+                               "gradient")
+        rows, cols, weights = self._get_weights()
+        result = {}
+        for prop in props:
+            result[prop] = self._apply_weights(rows, cols, weights, prop)
+        return result
+
     def update(self, update_domain=True):
         """Update the NNPS when particles have moved.
 
@@ -367,6 +431,7 @@ class Interpolator(object):
         if update_domain:
             self.nnps.update_domain()
         self.nnps.update()
+        self._weights = None
 
     def update_particle_arrays(self, particle_arrays):
         """Call this for a new set of particle arrays which have the
@@ -380,9 +445,117 @@ class Interpolator(object):
         arrays = self.particle_arrays + [self.pa]
         self._create_nnps(arrays)
         self.func_eval.update_particle_arrays(arrays)
+        if self.weights_eval is not None:
+            self.weights_eval.update_particle_arrays(arrays)
+            self.weights_eval.set_nnps(self.nnps)
+        self._weights = None
 
     # ### Private protocol ###################################################
 
+    def _can_use_weights(self):
+        return self.equations is None and self.method in ['sph', 'shepard']
+
+    def _get_weights(self):
+        """Return the interpolation weights as (rows, cols, weights) where
+        the columns are indices into the concatenated source arrays.
+        """
+        if self._weights is not None:
+            return self._weights
+
+        if self.weights_eval is None:
+            self._compile_weights_eval()
+
+        offset = 0
+        for array in self.particle_arrays:
+            array.interp_offset[0] = offset
+            offset += array.get_number_of_particles()
+
+        pa = self.pa
+        self.weights_eval.compute(0.0, 0.1)  # These are junk arguments.
+        nnbr = pa.properties['nnbr'].get_npy_array()
+        max_nbrs = nnbr.max() if len(nnbr) > 0 else 0
+        if max_nbrs > pa.max_nbrs[0]:
+            # Not all neighbors were saved, make room and redo.
+            self._add_weight_props(pa, max_nbrs)
+            arrays = self.particle_arrays + [pa]
+            self.func_eval.update_particle_arrays(arrays)
+            self.weights_eval.update_particle_arrays(arrays)
+            self.weights_eval.compute(0.0, 0.1)
+
+        # Only the real points are needed and not any periodic ghosts.
+        npoints = pa.get_number_of_particles(real=True)
+        stride = pa.max_nbrs[0]
+        nnbr = pa.properties['nnbr'].get_npy_array()[:npoints]
+        nbr_idx = pa.properties['nbr_idx'].get_npy_array()
+        nbr_w = pa.properties['nbr_w'].get_npy_array()
+        mask = np.arange(stride) < nnbr[:, None]
+        rows = np.repeat(np.arange(npoints), nnbr)
+        cols = nbr_idx[:npoints*stride].reshape(-1, stride)[mask]
+        weights = nbr_w[:npoints*stride].reshape(-1, stride)[mask]
+
+        if self.method == 'sph':
+            m = np.concatenate(
+                [x.get('m', only_real_particles=False)
+                 for x in self.particle_arrays]
+            )
+            rho = np.concatenate(
+                [x.get('rho', only_real_particles=False)
+                 for x in self.particle_arrays]
+            )
+            weights *= m[cols]/rho[cols]
+        else:
+            number_density = np.bincount(
+                rows, weights=weights, minlength=npoints
+            )
+            scale = np.ones_like(number_density)
+            cond = number_density > 1e-12
+            scale[cond] = 1.0/number_density[cond]
+            weights *= scale[rows]
+
+        result = (rows, cols, weights)
+        if self.cache_weights:
+            self._weights = result
+        return result
+
+    def _apply_weights(self, rows, cols, weights, prop):
+        data = []
+        for array in self.particle_arrays:
+            n = array.get_number_of_particles()
+            if prop not in array.properties:
+                data.append(np.zeros(n))
+            else:
+                data.append(array.get(prop, only_real_particles=False))
+        data = np.concatenate(data)
+        result = np.bincount(
+            rows, weights=weights*data[cols],
+            minlength=self.pa.get_number_of_particles(real=True)
+        )
+        result.shape = self.shape
+        return result.squeeze()
+
+    def _add_weight_props(self, pa, max_nbrs=1):
+        if 'nnbr' not in pa.properties:
+            pa.add_property('nnbr', type='int')
+            pa.add_constant('max_nbrs', np.array([0], dtype=np.int32))
+        for prop in ('nbr_idx', 'nbr_w'):
+            if prop in pa.properties:
+                pa.remove_property(prop)
+        pa.add_property('nbr_idx', type='int', stride=max_nbrs)
+        pa.add_property('nbr_w', stride=max_nbrs)
+        pa.max_nbrs[0] = max_nbrs
+
+    def _compile_weights_eval(self):
+        pa = self.pa
+        names = [x.name for x in self.particle_arrays]
+        equations = [
+            InterpolationWeights(dest='interpolate', sources=names)
+        ]
+        arrays = self.particle_arrays + [pa]
+        self.weights_eval = AccelerationEval(arrays, equations, self.kernel)
+        compiler = SPHCompiler(self.weights_eval, None)
+        compiler.compile()
+        self.weights_eval.set_nnps(self.nnps)
+
     def _create_nnps(self, arrays):
         # create the neighbor locator object
         self.nnps = NNPS(dim=self.kernel.dim, particles=arrays,
@@ -416,6 +589,9 @@ class Interpolator(object):
         )
         if self.method in ['sph', 'shepard']:
             pa.add_property('prop')
+            if self._can_use_weights():
+                # The storage is resized when the weights are computed.
+                self._add_weight_props(pa)
         else:
             pa.add_property('moment', stride=16)
             pa.add_property('p_sph', stride=4)
@@ -470,6 +646,10 @@ class Interpolator(object):
         for array in self.particle_arrays:
             if 'temp_prop' not in array.properties:
                 array.add_property('temp_prop')
+            if 'interp_offset' not in array.constants:
+                array.add_constant(
+                    'interp_offset', np.array([0], dtype=np.int32)
+                )
 
 
 def main(fname, prop, npoint):
@@ -1,5 +1,6 @@
 import json
 import glob
+from collections import OrderedDict
 from pysph.solver.utils import load, get_files, mkdir
 from IPython.display import display, Image, clear_output, HTML
 import ipywidgets as widgets
@@ -22,15 +23,33 @@ class Viewer(object):
     Base class for viewers.
     '''
 
-    def __init__(self, path, cache=True):
+    def __init__(self, path, cache=True, cache_size=16, fraction=None):
+        '''
+        Parameters
+        ----------
+
+        path : str
+            Output directory or file.
+        cache : bool
+            Cache the loaded frames.
+        cache_size : int
+            Maximum number of frames cached, the least recently used frame
+            is dropped when this is exceeded.
+        fraction : float
+            Only load this fraction of the particles of each frame, see
+            `pysph.solver.utils.load`.  This is fast for output saved with
+            `--lod-output`.
+        '''
 
         self.path = path
         self.paths_list = get_files(path)
+        self.fraction = fraction
 
         # Caching #
         # Note : Caching is only used by get_frame and widget handlers.
+        self.cache_size = cache_size
         if cache:
-            self.cache = {}
+            self.cache = OrderedDict()
         else:
             self.cache = None
 
@@ -67,11 +86,15 @@ class Viewer(object):
 
         if self.cache is not None:
             if frame in self.cache:
+                self.cache.move_to_end(frame)
                 temp_data = self.cache[frame]
             else:
-                self.cache[frame] = temp_data = load(self.paths_list[frame])
+                temp_data = load(self.paths_list[frame], self.fraction)
+                self.cache[frame] = temp_data
+                while len(self.cache) > max(self.cache_size, 1):
+                    self.cache.popitem(last=False)
         else:
-            temp_data = load(self.paths_list[frame])
+            temp_data = load(self.paths_list[frame], self.fraction)
 
         return temp_data
 
@@ -692,6 +692,8 @@ class MayaviViewer(HasTraits):
     play_step = Int(1, enter_set=True, auto_set=False,
                     desc='steps between files played')
     loop = Bool(False, desc='if the animation is looped')
+    load_fraction = Range(0.001, 1.0, 1.0, enter_set=True, auto_set=False,
+                          desc='the fraction of the particles loaded')
     # This is len(files) - 1.
     _n_files = Int(0)
     _low = Int(0)
@@ -736,6 +738,7 @@ class MayaviViewer(HasTraits):
                                 Item(name='directory'),
                                 Item(name='current_file'),
                                 Item(name='file_count'),
+                                Item(name='load_fraction'),
                                 padding=0,
                             ),
                             HGroup(
@@ -1078,7 +1081,8 @@ class MayaviViewer(HasTraits):
         self._file_name = fname
         self.current_file = os.path.basename(fname)
         # Code to read the file, create particle array and setup the helper.
-        data = load(fname)
+        fraction = self.load_fraction if self.load_fraction < 1.0 else None
+        data = load(fname, fraction)
         solver_data = data["solver_data"]
         arrays = data["arrays"]
         self._solver_data = solver_data
@@ -1274,6 +1278,8 @@ etc.  The following traits are available:
 
   play          -- True/False: Play all stored data files.
   loop          -- True/False: Loop over data files.
+  load_fraction -- Fraction of the particles to load from each file, this is
+                   fast for output dumped with --lod-output.
 
 If a Python script is supplied, the code is executed in the same namespace as
 provided by the embedded Python shell, i.e. the following names are available
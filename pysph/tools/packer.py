@@ -14,6 +14,9 @@ from pysph.tools.geometry import remove_overlap_particles
 from pysph.tools.particle_packing import (
     ParticlePacking, calculate_normal_2d_surface, shift_surface_inside)
 
+# The h/dx ratio of the packed particles.
+HDX = 1.2
+
 
 def get_packing_folders(folder, dx):
     """Get all the required folder and files names for the packing.
@@ -64,8 +67,8 @@ class Packer(Application):
                  filter_layers=False, reduce_dfreq=False,
                  tol=1e-2, scale=1.0, shift=False,
                  invert_normal=False, pb=None, nu=None,
-                 k=None, dfreq=-1, no_solid=False):
-        self.hdx = 1.2
+                 k=None, dfreq=-1, no_solid=False, initial=None):
+        self.hdx = HDX
         self.dx = dx
         self.x = x
         self.y = y
@@ -89,6 +92,8 @@ class Packer(Application):
         self.k = k
         self.out = out
         self.no_solid = no_solid
+        # Particle positions (x, y, z) to start the packing from.
+        self.initial = initial
         self.add_opt_func = add_opt_func
 
         self.bound = self._get_bound()
@@ -173,11 +178,34 @@ class Packer(Application):
             boundary = get_particle_array(name='boundary')
             particles.extend([boundary, nodes])
 
+        if self.initial is not None:
+            self._use_initial_positions(particles[0], particles[1])
+
         s.setup_properties(particles)
         for pa in particles:
             pa.dt_adapt[:] = 1e20
         return particles
 
+    def _use_initial_positions(self, free, frozen):
+        """Replace the free particles by the initial positions inside the
+        bounding box, lattice particles are kept only where there are no
+        initial positions.
+        """
+        x, y, z = [np.asarray(t, dtype=float) for t in self.initial]
+        b = self.bound
+        inside = (x >= b[0]) & (x <= b[1]) & (y >= b[2]) & (y <= b[3])
+        if self.dim == 3:
+            inside &= (z >= b[4]) & (z <= b[5])
+        # Same m, h and rho as the scheme's free particle lattice, the
+        # lattice may be empty so these cannot be read off it.
+        pa = get_particle_array(
+            name=free.name, x=x[inside], y=y[inside], z=z[inside],
+            m=self.dx**self.dim, h=self.hdx*self.dx, rho=1.0
+        )
+        remove_overlap_particles(pa, frozen, self.dx, self.dim)
+        remove_overlap_particles(free, pa, self.dx, self.dim)
+        free.append_parray(pa)
+
     def create_scheme(self):
         hardpoints = self.hardpoints
         if self.no_solid:
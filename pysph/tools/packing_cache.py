@@ -0,0 +1,209 @@
+"""A content addressed cache of packed particle distributions.
+
+Packing the particles around a geometry runs a long relaxation so the packed
+particles are saved in a cache directory.  Each packing is keyed on a hash
+of the geometry, the particle spacing, ``hdx``, the packing parameters and
+the PySPH version, so different runs, and different machines sharing the
+directory, reuse a packing only when it was made with the same inputs.
+
+The directory is given by the ``PYSPH_PACKING_CACHE`` environment variable
+and defaults to the ``preprocess`` directory next to the output directory.
+A packing at a nearby or an integer multiple of the particle spacing can
+also be found to start a new packing from.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+from os.path import abspath, dirname, exists, join
+import tempfile
+
+import numpy as np
+
+import pysph
+
+
+PACKING_CACHE_ENV = 'PYSPH_PACKING_CACHE'
+
+FIELDS = ('xs', 'ys', 'zs', 'xf', 'yf', 'zf')
+
+
+def get_cache_dir(folder=None):
+    """Return the directory of the packing cache.
+
+    This is the value of the ``PYSPH_PACKING_CACHE`` environment variable,
+    or the ``preprocess`` directory next to the given output `folder`, or
+    ``~/.pysph/packing``.
+    """
+    path = os.environ.get(PACKING_CACHE_ENV)
+    if path:
+        return path
+    if folder is not None:
+        return join(dirname(abspath(folder)), 'preprocess')
+    return join(os.path.expanduser('~'), '.pysph', 'packing')
+
+
+def hash_geometry(x=None, y=None, z=None, filename=None, scale=1.0,
+                  **extra):
+    """Return a hash of the geometry to be packed.
+
+    The contents of the `filename` are used if it is given, otherwise the
+    coordinates.  Any extra keyword arguments (e.g. the size of a periodic
+    domain) are also hashed.
+    """
+    sha = hashlib.sha256()
+    if filename is not None:
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+    for name, value in (('x', x), ('y', y), ('z', z)):
+        if value is not None:
+            sha.update(name.encode())
+            sha.update(np.ascontiguousarray(value, dtype=np.float64).data)
+    sha.update(_dumps(dict(scale=scale, **extra)).encode())
+    return sha.hexdigest()
+
+
+def get_packing_key(geometry, dx, hdx, dim, params):
+    """Return the key of the packing of the `geometry`, a hash returned by
+    :py:func:`hash_geometry`, with the given spacing and the dictionary of
+    packing parameters.
+    """
+    data = dict(
+        geometry=geometry, dx=repr(float(dx)), hdx=repr(float(hdx)),
+        dim=dim, params=params, version=pysph.__version__
+    )
+    return hashlib.sha256(_dumps(data).encode()).hexdigest()
+
+
+def refine_points(x, y, z, dx, factor, dim):
+    """Split each point of a packing with spacing `dx` into `factor**dim`
+    points with a spacing of `dx/factor`.
+    """
+    offsets = ((np.arange(factor) + 0.5)/factor - 0.5)*dx
+    zero = np.zeros(1)
+    shifts = np.meshgrid(
+        offsets, offsets if dim > 1 else zero, offsets if dim > 2 else zero,
+        indexing='ij'
+    )
+    result = []
+    for c, s in zip((x, y, z), shifts):
+        c = np.asarray(c, dtype=np.float64)
+        result.append((c[:, None] + s.ravel()[None, :]).ravel())
+    return tuple(result)
+
+
+def _dumps(data):
+    return json.dumps(data, sort_keys=True, default=repr)
+
+
+def _write_atomic(fname, write):
+    # Write to a temporary file and rename it so that a concurrent reader
+    # never sees a partially written file.
+    fd, tmp = tempfile.mkstemp(dir=dirname(fname), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, fname)
+    finally:
+        if exists(tmp):
+            os.remove(tmp)
+
+
+class PackingCache(object):
+    """A directory of packed particle distributions.
+
+    Each packing is stored as ``<key>.npz`` with the coordinates of the
+    solid (``xs, ys, zs``) and fluid (``xf, yf, zf``) particles and a
+    ``<key>.json`` file with the inputs used to make it.
+    """
+    def __init__(self, directory=None):
+        self.directory = get_cache_dir() if directory is None else directory
+
+    def _get_path(self, key, ext):
+        return join(self.directory, key + ext)
+
+    def get(self, key):
+        """Return the tuple ``(xs, ys, zs, xf, yf, zf)`` of the packing with
+        the given key or None if it is not in the cache.
+        """
+        fname = self._get_path(key, '.npz')
+        if not exists(fname):
+            return None
+        with np.load(fname) as data:
+            return tuple(data[x] for x in FIELDS)
+
+    def put(self, key, data, geometry, dx, hdx, dim, params):
+        """Save the packing, a tuple ``(xs, ys, zs, xf, yf, zf)``, with the
+        inputs used to make it.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = dict(zip(FIELDS, [np.asarray(x) for x in data]))
+        info = dict(
+            key=key, geometry=geometry, dx=float(dx), hdx=float(hdx),
+            dim=dim, params=json.loads(_dumps(params)),
+            version=pysph.__version__,
+            date=datetime.datetime.now().isoformat(),
+            n_solid=len(arrays['xs']), n_fluid=len(arrays['xf'])
+        )
+        _write_atomic(self._get_path(key, '.npz'),
+                      lambda fname: _save_npz(arrays, fname))
+        _write_atomic(self._get_path(key, '.json'),
+                      lambda fname: _dump_json(info, fname))
+
+    def entries(self):
+        """Return the information of all the packings in the cache."""
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(join(self.directory, name)) as f:
+                    info = json.load(f)
+            except (IOError, ValueError):
+                continue
+            if exists(self._get_path(info.get('key', ''), '.npz')):
+                result.append(info)
+        return result
+
+    def find_nearby(self, geometry, dx, hdx, dim, params, tol=0.05):
+        """Find a packing of the same geometry and parameters whose spacing
+        is within a fraction `tol` of `dx` or of an integer multiple of it.
+
+        Returns ``(data, factor)`` where `data` is the packing and `factor`
+        the integer ratio of its spacing to `dx`, or None if there is no
+        such packing.  The closest spacing is preferred.
+        """
+        params = json.loads(_dumps(params))
+        best = None
+        for info in self.entries():
+            if (info['geometry'] != geometry or info['dim'] != dim or
+                    info['hdx'] != float(hdx) or info['params'] != params):
+                continue
+            ratio = info['dx']/dx
+            factor = int(round(ratio))
+            if factor < 1 or abs(ratio - factor) > tol*factor:
+                continue
+            rank = (factor, abs(ratio - factor))
+            if best is None or rank < best[0]:
+                best = (rank, info['key'], factor)
+        if best is None:
+            return None
+        data = self.get(best[1])
+        if data is None:
+            return None
+        return data, best[2]
+
+
+def _save_npz(arrays, fname):
+    # A file object is passed so numpy does not add a '.npz' extension.
+    with open(fname, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _dump_json(info, fname):
+    with open(fname, 'w') as f:
+        json.dump(info, f, indent=2)
@@ -6,15 +6,43 @@ This is handy for post-processing.
 
 """
 
+from compyle.config import get_config
+
 from pysph.base.kernels import Gaussian
 from pysph.base.nnps import LinkedListNNPS as NNPS
+from pysph.base.nnps_base import NNPS as CythonNNPS
 from pysph.sph.acceleration_eval import AccelerationEval
 from pysph.sph.sph_compiler import SPHCompiler
 
 
+def can_share_nnps(nnps, arrays, kernel, backend=None):
+    """Return True if the given NNPS can be used to evaluate equations on the
+    given arrays with the given kernel.
+
+    This requires that the NNPS is built for exactly the same particle arrays
+    in the same order, for the same dimension, with a search radius that
+    covers the support of the kernel and for the same backend.
+    """
+    if nnps is None:
+        return False
+    if len(nnps.particles) != len(arrays):
+        return False
+    if any(x is not y for x, y in zip(nnps.particles, arrays)):
+        return False
+    if nnps.dim != kernel.dim or nnps.radius_scale < kernel.radius_scale:
+        return False
+    if not backend:
+        cfg = get_config()
+        backend = 'cython'
+        if cfg.use_opencl or cfg.use_cuda:
+            backend = 'gpu'
+    return isinstance(nnps, CythonNNPS) == (backend == 'cython')
+
+
 class SPHEvaluator(object):
     def __init__(self, arrays, equations, dim, kernel=None,
-                 domain_manager=None, backend=None, nnps_factory=NNPS):
+                 domain_manager=None, backend=None, nnps_factory=NNPS,
+                 nnps=None):
         """Constructor.
 
         Parameters
@@ -27,6 +55,9 @@ class SPHEvaluator(object):
         backend: str: indicates the backend to use.
             one of ('opencl', 'cython', '', None)
         nnps_factory: A factory that creates an NNPSBase instance.
+        nnps: NNPSBase: an existing NNPS, typically that of the solver, to
+            use instead of creating a new one.  It is only used if
+            `can_share_nnps` is True for it and is otherwise ignored.
         """
         self.arrays = arrays
         self.equations = equations
@@ -44,7 +75,12 @@ class SPHEvaluator(object):
                                           backend=backend)
         compiler = SPHCompiler(self.func_eval, None)
         compiler.compile()
-        self._create_nnps(arrays)
+        if can_share_nnps(nnps, arrays, self.kernel, backend):
+            self.shares_nnps = True
+            self.set_nnps(nnps)
+        else:
+            self.shares_nnps = False
+            self._create_nnps(arrays)
 
     def evaluate(self, t=0.0, dt=0.1):
         """Evalute the SPH equations, dummy t and dt values can
@@ -60,11 +96,26 @@ class SPHEvaluator(object):
         Use this when the arrays are the same but the particles have themselves
         changed. If the particle arrays themselves change use the
         `update_particle_arrays` method instead.
+
+        This is also needed when sharing the NNPS of the solver if the
+        particles have moved since the solver last updated it, for example
+        in a post step callback.
         """
         if update_domain:
             self.nnps.update_domain()
         self.nnps.update()
 
+    def set_nnps(self, nnps):
+        """Use the given NNPS of the solver, for example when the solver's
+        NNPS is replaced.  This only makes sense when sharing the NNPS.
+        """
+        self.nnps = nnps
+        self.func_eval.set_nnps(nnps)
+        if isinstance(nnps, CythonNNPS):
+            # The solver's next update need not bin the particles again
+            # if they have not moved since this evaluator updated it.
+            nnps.set_reuse_unchanged_bins(True)
+
     def update_particle_arrays(self, arrays):
         """Call this for a new set of particle arrays which have the
         same properties as before.
@@ -73,8 +124,14 @@ class SPHEvaluator(object):
         each time you load a new file a new particle array is read with the
         same properties.  Call this function to reset the arrays.
         """
-        self._create_nnps(arrays)
-        self.func_eval.update_particle_arrays(arrays)
+        self.arrays = arrays
+        if self.shares_nnps and can_share_nnps(self.nnps, arrays,
+                                               self.kernel, self.backend):
+            self.func_eval.update_particle_arrays(arrays)
+        else:
+            self.shares_nnps = False
+            self._create_nnps(arrays)
+            self.func_eval.update_particle_arrays(arrays)
 
     # Private protocol ###################################################
     def _create_nnps(self, arrays):
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pysph.tools.batch import expand_cases, get_command, load_spec
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_matrix_is_expanded(self):
+        # Given
+        spec = dict(
+            args=['--max-steps', 10], timeout=60,
+            cases=[
+                dict(example='elliptical_drop', args='--nx 20',
+                     matrix=dict(kernel=['CubicSpline', 'Gaussian'],
+                                 nnps=['ll', 'sh'], openmp=True)),
+                dict(example='solid_mech/rings', name='rings',
+                     timeout=10),
+            ]
+        )
+
+        # When
+        cases = expand_cases(spec, self.root)
+
+        # Then
+        self.assertEqual(len(cases), 5)
+        case = cases[0]
+        self.assertEqual(
+            case['name'],
+            'elliptical_drop_kernel_CubicSpline_nnps_ll_openmp_True'
+        )
+        self.assertEqual(case['example'], 'pysph.examples.elliptical_drop')
+        self.assertEqual(case['args'], [
+            '--max-steps', '10', '--nx', '20', '--kernel', 'CubicSpline',
+            '--nnps', 'll', '--openmp'
+        ])
+        self.assertEqual(case['output_dir'],
+                         os.path.join(self.root, case['name']))
+        self.assertEqual(case['timeout'], 60)
+        self.assertEqual(len(set(c['name'] for c in cases)), 5)
+        rings = cases[-1]
+        self.assertEqual(rings['name'], 'rings')
+        self.assertEqual(rings['example'], 'pysph.examples.solid_mech.rings')
+        self.assertEqual(rings['timeout'], 10)
+
+        # When
+        cmd = get_command(rings)
+
+        # Then
+        self.assertEqual(cmd, [
+            sys.executable, '-m', 'pysph.examples.solid_mech.rings',
+            '--max-steps', '10', '-d', rings['output_dir']
+        ])
+
+    def test_duplicate_names_are_an_error(self):
+        spec = dict(cases=[dict(example='cavity'), dict(example='cavity')])
+        self.assertRaises(ValueError, expand_cases, spec, self.root)
+
+    def test_load_json_spec(self):
+        # Given
+        spec = dict(cases=[dict(example='cavity')])
+        fname = os.path.join(self.root, 'spec.json')
+        with open(fname, 'w') as f:
+            json.dump(spec, f)
+
+        # When/Then
+        self.assertEqual(load_spec(fname), spec)
+
+
+if __name__ == '__main__':
+    unittest.main()
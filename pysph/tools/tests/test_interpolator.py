@@ -339,6 +339,51 @@ class TestInterpolator(unittest.TestCase):
         # Then.
         self.assertRaises(RuntimeError, ip.interpolate, 'p', 1)
 
+    def test_interpolate_many_should_match_interpolate(self):
+        # Given
+        pa1 = self._make_2d_grid()
+        pa2 = self._make_2d_grid('solid')
+        pa2.p[:] = 4.0
+        pa2.remove_property('u')
+
+        for method in ('shepard', 'sph', 'order1'):
+            # When.
+            ip = Interpolator([pa1, pa2], num_points=1000,
+                              domain_manager=self._domain, method=method)
+            result = ip.interpolate_many(['p', 'u', 'rho'])
+
+            # Then.
+            self.assertEqual(sorted(result.keys()), ['p', 'rho', 'u'])
+            for prop in ('p', 'u', 'rho'):
+                expect = ip.interpolate(prop)
+                np.testing.assert_allclose(result[prop], expect, atol=1e-12)
+
+    def test_should_cache_weights(self):
+        # Given
+        pa = self._make_2d_grid()
+        ip = Interpolator([pa], num_points=1000, domain_manager=self._domain,
+                          cache_weights=True)
+
+        # When.
+        p = ip.interpolate('p')
+        weights = ip._weights
+        u = ip.interpolate_many(['u'])['u']
+
+        # Then.
+        self.assertIs(ip._weights, weights)
+        np.testing.assert_allclose(p, np.sin(ip.x * np.pi), rtol=5e-3)
+        np.testing.assert_allclose(u, np.cos(ip.x * np.pi), rtol=5e-3)
+
+        # When.
+        pa.x += 0.5
+        ip.update()
+        p = ip.interpolate('p')
+
+        # Then.
+        self.assertIsNot(ip._weights, weights)
+        np.testing.assert_allclose(p, np.sin((ip.x - 0.5) * np.pi),
+                                   rtol=5e-3, atol=1e-3)
+
 
 if __name__ == '__main__':
     unittest.main()
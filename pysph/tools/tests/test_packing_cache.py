@@ -0,0 +1,298 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pysph.tools.packing_cache import (
+    PACKING_CACHE_ENV, PackingCache, get_cache_dir, get_packing_key,
+    hash_geometry, refine_points
+)
+
+try:
+    from pysph.tools import packer
+except ImportError:
+    packer = None
+
+
+def _make_packing(n):
+    x = np.linspace(0, 1, n)
+    return x[:2], x[:2], np.zeros(2), x, x, np.zeros(n)
+
+
+class TestPackingCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = PackingCache(os.path.join(self.root, 'cache'))
+        self._env = os.environ.pop(PACKING_CACHE_ENV, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        if self._env is not None:
+            os.environ[PACKING_CACHE_ENV] = self._env
+
+    def test_key_depends_on_inputs(self):
+        # Given
+        x = np.linspace(0, 1, 10)
+        geometry = hash_geometry(x=x, y=x)
+        params = dict(pb=None, tol=1e-2)
+
+        # When
+        key = get_packing_key(geometry, 0.1, 1.2, 2, params)
+
+        # Then
+        self.assertEqual(key, get_packing_key(
+            hash_geometry(x=list(x), y=x), 0.1, 1.2, 2, dict(params)
+        ))
+        self.assertNotEqual(key, get_packing_key(
+            hash_geometry(x=x, y=x, scale=2.0), 0.1, 1.2, 2, params
+        ))
+        self.assertNotEqual(key, get_packing_key(
+            geometry, 0.05, 1.2, 2, params
+        ))
+        self.assertNotEqual(key, get_packing_key(
+            geometry, 0.1, 1.2, 2, dict(pb=1.0, tol=1e-2)
+        ))
+
+    def test_hash_geometry_uses_file_contents(self):
+        # Given
+        fname = os.path.join(self.root, 'geom.txt')
+        with open(fname, 'w') as f:
+            f.write('0 0\n1 1\n')
+        h1 = hash_geometry(filename=fname)
+
+        # When
+        with open(fname, 'w') as f:
+            f.write('0 0\n1 2\n')
+
+        # Then
+        self.assertNotEqual(h1, hash_geometry(filename=fname))
+
+    def test_put_and_get(self):
+        # Given
+        data = _make_packing(5)
+        key = get_packing_key('geom', 0.1, 1.2, 2, {})
+
+        # When
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, data, 'geom', 0.1, 1.2, 2, {})
+
+        # Then
+        result = PackingCache(self.cache.directory).get(key)
+        for expect, value in zip(data, result):
+            np.testing.assert_array_equal(value, expect)
+        info = self.cache.entries()
+        self.assertEqual(len(info), 1)
+        self.assertEqual(info[0]['n_fluid'], 5)
+        names = os.listdir(self.cache.directory)
+        self.assertEqual(sorted(names), [key + '.json', key + '.npz'])
+
+    def test_find_nearby(self):
+        # Given
+        params = dict(tol=1e-2)
+        for dx, n in ((0.2, 3), (0.101, 5)):
+            key = get_packing_key('geom', dx, 1.2, 2, params)
+            self.cache.put(key, _make_packing(n), 'geom', dx, 1.2, 2, params)
+
+        # When
+        data, factor = self.cache.find_nearby('geom', 0.1, 1.2, 2, params)
+
+        # Then
+        self.assertEqual(factor, 1)
+        self.assertEqual(len(data[3]), 5)
+
+        # When
+        data, factor = self.cache.find_nearby('geom', 0.05, 1.2, 2, params)
+
+        # Then
+        self.assertEqual(factor, 2)
+        self.assertEqual(len(data[3]), 5)
+
+        # Then
+        self.assertIsNone(self.cache.find_nearby('geom', 0.08, 1.2, 2,
+                                                 params))
+        self.assertIsNone(self.cache.find_nearby('other', 0.1, 1.2, 2,
+                                                 params))
+        self.assertIsNone(self.cache.find_nearby('geom', 0.1, 1.2, 2, {}))
+
+    def test_refine_points(self):
+        # When
+        x, y, z = refine_points([0.0], [0.0], [0.0], dx=0.2, factor=2,
+                                dim=2)
+
+        # Then
+        np.testing.assert_allclose(sorted(zip(x, y)), [
+            (-0.05, -0.05), (-0.05, 0.05), (0.05, -0.05), (0.05, 0.05)
+        ])
+        np.testing.assert_array_equal(z, 0.0)
+
+        # When
+        x, y, z = refine_points([0.0, 1.0], [0.0, 1.0], [0.0, 1.0], dx=0.1,
+                                factor=3, dim=3)
+
+        # Then
+        self.assertEqual(len(x), 54)
+        self.assertEqual(len(set(zip(x, y, z))), 54)
+
+    def test_cache_dir(self):
+        # When
+        path = get_cache_dir(os.path.join(self.root, 'case_output'))
+
+        # Then
+        self.assertEqual(path, os.path.join(self.root, 'preprocess'))
+
+        # When
+        os.environ[PACKING_CACHE_ENV] = self.root
+        try:
+            # Then
+            self.assertEqual(get_cache_dir('case_output'), self.root)
+        finally:
+            del os.environ[PACKING_CACHE_ENV]
+
+
+class FakePacker(object):
+    """Stands in for the packing Application, records its inputs and writes
+    a lattice at the given spacing as the packing.
+    """
+    calls = []
+
+    def __init__(self, fname, output_dir, domain, add_opt_func, dx, out,
+                 dim=None, initial=None, **kw):
+        self.dx = dx
+        self.out = out
+        self.info_filename = None
+        self.calls.append(dict(dx=dx, initial=initial, kw=kw))
+
+    def run(self):
+        pass
+
+    def post_process(self, info_fname):
+        xf = np.arange(0.0, 1.0, self.dx)
+        np.savez(self.out, xs=xf[:1], ys=xf[:1], zs=np.zeros(1),
+                 xf=xf, yf=xf, zf=np.zeros_like(xf))
+
+
+@unittest.skipIf(packer is None, 'numpy-stl is not installed')
+class TestGetPackedParticles(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.folder = os.path.join(self.root, 'case_output')
+        self.cache_dir = os.path.join(self.root, 'cache')
+        FakePacker.calls = []
+        patcher = mock.patch.object(packer, 'Packer', FakePacker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _pack(self, dx, **kw):
+        from pysph.tools.geometry import _get_packed_particles
+        return _get_packed_particles(
+            None, self.folder, dx, 2, 'geom', dict(tol=1e-2),
+            dict(tol=1e-2), layer=False, cache_dir=self.cache_dir, **kw
+        )
+
+    def test_cache_hit_does_not_pack(self):
+        # Given
+        data = _make_packing(5)
+        key = get_packing_key('geom', 0.1, packer.HDX, 2, dict(tol=1e-2))
+        PackingCache(self.cache_dir).put(
+            key, data, 'geom', 0.1, packer.HDX, 2, dict(tol=1e-2)
+        )
+
+        # When
+        result = self._pack(0.1)
+
+        # Then
+        self.assertEqual(FakePacker.calls, [])
+        for expect, value in zip(data, result):
+            np.testing.assert_array_equal(value, expect)
+
+    def test_no_warm_start_by_default(self):
+        # Given
+        self._pack(0.2)
+
+        # When
+        self._pack(0.1)
+
+        # Then
+        self.assertEqual(len(FakePacker.calls), 2)
+        self.assertIsNone(FakePacker.calls[1]['initial'])
+
+        # When
+        self._pack(0.05, warm_start=True)
+
+        # Then
+        initial = FakePacker.calls[2]['initial']
+        self.assertIsNotNone(initial)
+        # The 0.1 packing has 10 + 1 particles, each split in four.
+        self.assertEqual(len(initial[0]), 4*11)
+
+    def test_levels_start_from_coarse_packing(self):
+        # When
+        self._pack(0.1, levels=2)
+
+        # Then
+        coarse, fine = FakePacker.calls
+        self.assertEqual(coarse['dx'], 0.2)
+        self.assertIsNone(coarse['initial'])
+        self.assertAlmostEqual(coarse['kw']['tol'], 1e-1)
+        self.assertEqual(fine['dx'], 0.1)
+        self.assertEqual(fine['kw']['tol'], 1e-2)
+
+        xs, ys, zs, xf, yf, zf = PackingCache(self.cache_dir).get(
+            get_packing_key('geom', 0.2, packer.HDX, 2, dict(tol=1e-1))
+        )
+        x, y, z = refine_points(
+            np.concatenate((xs, xf)), np.concatenate((ys, yf)),
+            np.concatenate((zs, zf)), dx=0.2, factor=2, dim=2
+        )
+        for expect, value in zip((x, y, z), fine['initial']):
+            np.testing.assert_allclose(value, expect)
+        self.assertIsNotNone(PackingCache(self.cache_dir).get(
+            get_packing_key('geom', 0.1, packer.HDX, 2, dict(tol=1e-2))
+        ))
+
+        # When
+        self._pack(0.1, levels=2)
+
+        # Then
+        self.assertEqual(len(FakePacker.calls), 2)
+
+
+@unittest.skipIf(packer is None, 'numpy-stl is not installed')
+class TestPackerInitialPositions(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_initial_positions_without_free_lattice(self):
+        # Given
+        from pysph.base.utils import get_particle_array
+        initial = ([0.0, 0.25, 2.0], [0.0, 0.25, 0.0], [0.0, 0.0, 0.0])
+        app = packer.Packer(
+            None, os.path.join(self.root, 'packing'), None, lambda g: None,
+            0.1, os.path.join(self.root, 'out.npz'), dim=2, L=1.0, B=1.0,
+            initial=initial
+        )
+        free = get_particle_array(name='free')
+        frozen = get_particle_array(name='frozen', x=[-0.45], y=[-0.45])
+
+        # When
+        app._use_initial_positions(free, frozen)
+
+        # Then
+        np.testing.assert_array_equal(free.x, [0.0, 0.25])
+        np.testing.assert_array_equal(free.y, [0.0, 0.25])
+        np.testing.assert_allclose(free.m, 0.1**2)
+        np.testing.assert_allclose(free.h, packer.HDX*0.1)
+        np.testing.assert_array_equal(free.rho, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,10 @@ import unittest
 import numpy as np
 
 from pysph.base.utils import get_particle_array
-from pysph.base.nnps import DomainManager
+from pysph.base.kernels import CubicSpline, QuinticSpline
+from pysph.base.nnps import DomainManager, LinkedListNNPS
 from pysph.sph.basic_equations import SummationDensity
-from pysph.tools.sph_evaluator import SPHEvaluator
+from pysph.tools.sph_evaluator import SPHEvaluator, can_share_nnps
 
 
 class TestSPHEvaluator(unittest.TestCase):
@@ -71,6 +72,55 @@ class TestSPHEvaluator(unittest.TestCase):
         self.assertNotEqual(rho0, dest.rho[0])
         self.assertAlmostEqual(dest.rho[0], 7.0, places=1)
 
+    def test_should_share_compatible_nnps(self):
+        # Given
+        xd = [0.5]
+        hd = self.src.h[:1]
+        dest = get_particle_array(name='dest', x=xd, h=hd)
+        arrays = [dest, self.src]
+        kernel = CubicSpline(dim=1)
+        nnps = LinkedListNNPS(dim=1, particles=arrays, radius_scale=2.0)
+
+        # When
+        sph_eval = SPHEvaluator(
+            arrays=arrays, equations=self.equations, dim=1, kernel=kernel,
+            nnps=nnps
+        )
+        sph_eval.evaluate()
+
+        # Then
+        self.assertTrue(sph_eval.shares_nnps)
+        self.assertIs(sph_eval.nnps, nnps)
+        rho = dest.rho[0]
+        SPHEvaluator(
+            arrays=arrays, equations=self.equations, dim=1, kernel=kernel
+        ).evaluate()
+        self.assertAlmostEqual(rho, dest.rho[0], places=14)
+
+    def test_should_not_share_incompatible_nnps(self):
+        # Given
+        xd = [0.5]
+        hd = self.src.h[:1]
+        dest = get_particle_array(name='dest', x=xd, h=hd)
+        arrays = [dest, self.src]
+        kernel = CubicSpline(dim=1)
+        nnps = LinkedListNNPS(dim=1, particles=arrays, radius_scale=2.0)
+
+        # When/Then
+        self.assertTrue(can_share_nnps(nnps, arrays, kernel))
+        self.assertFalse(can_share_nnps(nnps, [self.src, dest], kernel))
+        self.assertFalse(can_share_nnps(nnps, [dest], kernel))
+        self.assertFalse(can_share_nnps(nnps, arrays, CubicSpline(dim=2)))
+        self.assertFalse(can_share_nnps(nnps, arrays, QuinticSpline(dim=1)))
+
+        sph_eval = SPHEvaluator(
+            arrays=[self.src, dest], equations=self.equations, dim=1,
+            kernel=kernel, nnps=nnps
+        )
+        sph_eval.evaluate()
+        self.assertFalse(sph_eval.shares_nnps)
+        self.assertAlmostEqual(dest.rho[0], 9.0, places=2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -402,7 +402,7 @@ def get_basic_extensions():
             sources=["pysph/base/spatial_hash_nnps.pyx"],
             depends=get_deps(
                 "pysph/base/nnps_base"
-            ),
+            ) + ["pysph/base/spatial_hash.h"],
             include_dirs=include_dirs,
             extra_compile_args=extra_compile_args + openmp_compile_args,
             extra_link_args=openmp_link_args,
@@ -445,7 +445,7 @@ def get_basic_extensions():
             sources=["pysph/base/stratified_hash_nnps.pyx"],
             depends=get_deps(
                 "pysph/base/nnps_base"
-            ),
+            ) + ["pysph/base/spatial_hash.h"],
             include_dirs=include_dirs,
             extra_compile_args=extra_compile_args + openmp_compile_args,
             extra_link_args=openmp_link_args,